@@ -1,16 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
-import numpy as np
-from statsmodels.tsa.stattools import adfuller
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.forecasting import adf_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -49,6 +54,55 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 每列一个时间序列
+    :return: AdfResult
+    """
+    return adf_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    adf_data = result.table.copy()
+    adf_data["Result Interpretation"] = [
+        texts["interpretation_stationary"] if p < 0.05 else texts["interpretation_non_stationary"]
+        for p in adf_data["p-value"]
+    ]
+    adf_data.columns = texts["columns_stats"]
+
+    # 绘制 p 值的柱状图
+    image_path = os.path.join(plot_dir, f"{stem}_adf_plot.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(result.table["Variable Name"], result.table["p-value"])
+    ax.set_xlabel('Variable Name')
+    ax.set_ylabel('p-value')
+    ax.set_title('ADF Test p-values for Each Variable')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.savefig(image_path)
+
+    doc = new_document()
+    doc.add_heading('ADF Test Results', 0)
+    add_dataframe_table(doc, adf_data)
+    doc.add_picture(image_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [image_path]
+
+
 class ADFTestAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -82,30 +136,6 @@ class ADFTestAnalysisApp:
             self.file_entry.config(foreground='gray')
 
     # 计算 ADF 检验的函数
-    def calculate_adf(self, X):
-        adf_data = pd.DataFrame()
-        adf_data["Variable Name"] = X.columns
-        adf_statistics = []
-        p_values = []
-        lags = []
-        interpretations = []
-
-        for col in X.columns:
-            result = adfuller(X[col])
-            adf_statistics.append(result[0])
-            p_values.append(result[1])
-            lags.append(result[2])
-            if result[1] < 0.05:
-                interpretations.append(languages[self.current_language]["interpretation_stationary"])
-            else:
-                interpretations.append(languages[self.current_language]["interpretation_non_stationary"])
-
-        adf_data["ADF Test Statistic"] = adf_statistics
-        adf_data["p-value"] = p_values
-        adf_data["Lags"] = lags
-        adf_data["Result Interpretation"] = interpretations
-        return adf_data
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -114,63 +144,24 @@ class ADFTestAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设所有列都是时间序列数据
-            X = df
-
-            # 计算 ADF 检验
-            adf_data = self.calculate_adf(X)
-
-            # 绘制 p 值的柱状图
-            plt.figure()
-            plt.bar(adf_data["Variable Name"], adf_data["p-value"])
-            plt.xlabel('Variable Name')
-            plt.ylabel('p-value')
-            plt.title('ADF Test p-values for Each Variable')
-            plt.xticks(rotation=45)
-
-            # 保存图片
-            image_path = os.path.splitext(file_path)[0] + '_adf_plot.png'
-            plt.savefig(image_path)
-            plt.close()
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('ADF Test Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(adf_data.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(adf_data.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in adf_data.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加图片
-                doc.add_picture(image_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -187,6 +178,7 @@ class ADFTestAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -194,7 +186,7 @@ class ADFTestAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -225,6 +217,10 @@ class ADFTestAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
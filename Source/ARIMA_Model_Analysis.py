@@ -1,17 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
-# import pmdarima as pm
-from statsmodels.tsa.arima.model import ARIMA
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.arima import FORECAST_STEPS, MAX_D, MAX_P, MAX_Q, arima_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -28,7 +33,13 @@ languages = {
         "analysis_error": "分析文件时出错: {}",
         "analysis_complete": "分析完成，结果已保存到 {}，相关图片已保存。",
         "no_save_path_selected": "未选择保存路径，结果未保存。",
-        "columns_stats": ["变量名", "ARIMA参数(p, d, q)", "AIC值", "BIC值"],
+        "columns_stats": ["变量名", "ARIMA参数(p, d, q)", "AIC值", "BIC值", "候选模型数", "搜索用时(秒)"],
+        "bounds_label": "阶数上限 p / d / q：",
+        "budget_label": "每列时间预算（秒，留空不限）：",
+        "parallel_check": "多列并行搜索",
+        "invalid_bounds": "阶数上限须为整数，时间预算须为数字。",
+        "timed_out": "以下变量的搜索在时间预算内未完成，结果为已搜索范围内 AIC 最小的模型：{}",
+        "column_error": "变量 {} 分析失败：{}",
         "switch_language_button_text": "切换语言"
     },
     "en": {
@@ -41,11 +52,89 @@ languages = {
         "analysis_error": "An error occurred while analyzing the file: {}",
         "analysis_complete": "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         "no_save_path_selected": "No save path selected. The results were not saved.",
-        "columns_stats": ["Variable Name", "ARIMA Parameters (p, d, q)", "AIC Value", "BIC Value"],
+        "columns_stats": ["Variable Name", "ARIMA Parameters (p, d, q)", "AIC Value", "BIC Value", "Models Fitted",
+                          "Search Seconds"],
+        "bounds_label": "Max order p / d / q: ",
+        "budget_label": "Time budget per column (s, blank for none): ",
+        "parallel_check": "Search columns in parallel",
+        "invalid_bounds": "The order bounds must be integers and the time budget must be a number.",
+        "timed_out": "The search did not finish within the time budget for: {}. The lowest-AIC model found so far is reported.",
+        "column_error": "Analysis of {} failed: {}",
         "switch_language_button_text": "Switch Language"
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，第一列为时间索引
+    """
+    return load_excel(file_path, index_col=0, parse_dates=True)
+
+
+def analyze(df, max_p=MAX_P, max_d=MAX_D, max_q=MAX_Q, time_budget=None, forecast_steps=FORECAST_STEPS,
+            parallel=True):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，每列为一条时间序列
+    :param max_p: p 的上限
+    :param max_d: d 的上限
+    :param max_q: q 的上限
+    :param time_budget: 每列的时间预算（秒），None 表示不限
+    :param forecast_steps: 预测步数
+    :param parallel: 是否在进程池中并行搜索各列
+    :return: ArimaResult
+    """
+    return arima_analysis(df, max_p=max_p, max_d=max_d, max_q=max_q, time_budget=time_budget,
+                          forecast_steps=forecast_steps, parallel=parallel)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和每列的预测图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading('ARIMA模型结果' if language == 'zh' else 'ARIMA Model Results', 0)
+    add_dataframe_table(doc, result.table, header=texts["columns_stats"])
+    if result.timed_out:
+        doc.add_paragraph(texts["timed_out"].format(", ".join(map(str, result.timed_out))))
+    for name, error in result.errors.items():
+        doc.add_paragraph(texts["column_error"].format(name, error))
+
+    image_paths = []
+    for i, (name, forecast) in enumerate(result.forecasts.items()):
+        series = result.series[name]
+        fig = new_figure()
+        ax = fig.subplots()
+        if not isinstance(forecast.index, pd.DatetimeIndex):
+            # 没有规则日期频率的序列按序号绘制
+            series = series.reset_index(drop=True)
+        ax.plot(series.index, series.to_numpy(), label='Original Data')
+        ax.plot(forecast.index, forecast.to_numpy(), label='Forecast')
+        ax.set_xlabel('Date')
+        ax.set_ylabel(str(name))
+        ax.set_title(f'ARIMA Model for {name}')
+        ax.legend()
+        image_path = os.path.join(plot_dir, f'{stem}_arima_{i + 1}.png')
+        fig.savefig(image_path)
+        image_paths.append(image_path)
+
+        doc.add_heading(f'ARIMA Model for {name}', level=1)
+        doc.add_picture(image_path, width=Inches(6))
+
+    doc.save(save_path)
+    return image_paths
+
+
 class ARIMAModelAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -78,54 +167,19 @@ class ARIMAModelAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    # 计算 ARIMA 模型的函数
-    def calculate_arima(self, X):
-        arima_data = pd.DataFrame()
-        arima_data["Variable Name"] = X.columns
-        arima_params = []
-        aic_values = []
-        bic_values = []
-
-        for col in X.columns:
-            try:
-                # 自动选择 ARIMA 参数
-                auto_arima = pm.auto_arima(X[col], seasonal=False, trace=False)
-                p, d, q = auto_arima.order
-                arima_params.append(f"({p}, {d}, {q})")
-
-                # 拟合 ARIMA 模型
-                model = ARIMA(X[col], order=(p, d, q))
-                model_fit = model.fit()
-
-                aic_values.append(model_fit.aic)
-                bic_values.append(model_fit.bic)
-
-                # 绘制时间序列图和预测图
-                plt.figure()
-                plt.plot(X[col], label='Original Data')
-                forecast = model_fit.get_forecast(steps=10)
-                forecast_mean = forecast.predicted_mean
-                plt.plot(pd.date_range(start=X.index[-1], periods=11, freq=X.index.freq)[1:], forecast_mean, label='Forecast')
-                plt.xlabel('Date')
-                plt.ylabel(col)
-                plt.title(f'ARIMA Model for {col}')
-                plt.legend()
-
-                # 保存图片
-                image_path = os.path.splitext(self.file_entry.get())[0] + f'_arima_{col}.png'
-                plt.savefig(image_path)
-                plt.close()
-
-            except Exception as e:
-                arima_params.append("Error")
-                aic_values.append(np.nan)
-                bic_values.append(np.nan)
-                print(f"Error analyzing {col}: {e}")
-
-        arima_data["ARIMA Parameters (p, d, q)"] = arima_params
-        arima_data["AIC Value"] = aic_values
-        arima_data["BIC Value"] = bic_values
-        return arima_data
+    def read_bounds(self):
+        """
+        读取阶数上限和时间预算输入框
+        :return: 传给 analyze 的参数
+        """
+        budget = self.budget_entry.get().strip()
+        return {
+            "max_p": int(self.max_p_entry.get()),
+            "max_d": int(self.max_d_entry.get()),
+            "max_q": int(self.max_q_entry.get()),
+            "time_budget": float(budget) if budget else None,
+            "parallel": self.parallel_var.get(),
+        }
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -136,53 +190,28 @@ class ARIMAModelAnalysisApp:
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, index_col=0, parse_dates=True)
-
-            # 假设所有列都是时间序列数据
-            X = df
-
-            # 计算 ARIMA 模型
-            arima_data = self.calculate_arima(X)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('ARIMA Model Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(arima_data.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(arima_data.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in arima_data.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加图片
-                for col in X.columns:
-                    image_path = os.path.splitext(file_path)[0] + f'_arima_{col}.png'
-                    if os.path.exists(image_path):
-                        doc.add_heading(f'ARIMA Model for {col}', level=1)
-                        doc.add_picture(image_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+            params = self.read_bounds()
+        except ValueError:
+            self.result_label.config(text=languages[self.current_language]["invalid_bounds"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, params=params,
+                             controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -198,7 +227,11 @@ class ARIMAModelAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
-        
+        self.bounds_label.config(text=languages[self.current_language]["bounds_label"])
+        self.budget_label.config(text=languages[self.current_language]["budget_label"])
+        self.parallel_check.config(text=languages[self.current_language]["parallel_check"])
+        self.job_panel.set_language(self.current_language)
+
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -206,7 +239,7 @@ class ARIMAModelAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 460
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -232,11 +265,39 @@ class ARIMAModelAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建阶数上限输入框
+        bounds_frame = ttk.Frame(frame)
+        bounds_frame.pack(pady=5)
+        self.bounds_label = ttk.Label(bounds_frame, text=languages[self.current_language]["bounds_label"])
+        self.bounds_label.pack(side=tk.LEFT)
+        self.max_p_entry, self.max_d_entry, self.max_q_entry = (ttk.Entry(bounds_frame, width=4) for _ in range(3))
+        for entry, default in ((self.max_p_entry, MAX_P), (self.max_d_entry, MAX_D), (self.max_q_entry, MAX_Q)):
+            entry.insert(0, str(default))
+            entry.pack(side=tk.LEFT, padx=2)
+
+        # 创建时间预算输入框
+        budget_frame = ttk.Frame(frame)
+        budget_frame.pack(pady=5)
+        self.budget_label = ttk.Label(budget_frame, text=languages[self.current_language]["budget_label"])
+        self.budget_label.pack(side=tk.LEFT)
+        self.budget_entry = ttk.Entry(budget_frame, width=6)
+        self.budget_entry.pack(side=tk.LEFT, padx=2)
+
+        # 创建并行搜索复选框
+        self.parallel_var = tk.BooleanVar(value=True)
+        self.parallel_check = ttk.Checkbutton(frame, text=languages[self.current_language]["parallel_check"],
+                                              variable=self.parallel_var)
+        self.parallel_check.pack(pady=5)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"], 
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,17 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-import pathlib
-import pingouin as pg
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.anova import ancova
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -60,6 +65,62 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，第一列为分组变量，最后一列为因变量，其余列为协变量
+    :return: AncovaResult
+    """
+    return ancova(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    title = '协方差分析结果' if language == 'zh' else 'Analysis of Covariance (ANCOVA) Results'
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading(title, 0)
+    add_dataframe_table(doc, result.table)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 第一个协变量与因变量的散点图，按组着色
+    plot_path = os.path.join(plot_dir, f"{stem}_ancova_plot.png")
+    covariate = result.covariates[0]
+    fig = new_figure()
+    ax = fig.subplots()
+    for group, group_data in result.data.groupby(result.group_var):
+        ax.scatter(group_data[covariate], group_data[result.dep_var], label=str(group))
+    ax.set_xlabel(covariate)
+    ax.set_ylabel(result.dep_var)
+    ax.set_title(title)
+    ax.legend()
+    fig.savefig(plot_path)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class ANCOVAAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -100,83 +161,24 @@ class ANCOVAAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设第一列是分组变量，最后一列是因变量，其余列是协变量
-            group_var = df.columns[0]
-            dep_var = df.columns[-1]
-            covar_vars = df.columns[1:-1]
-
-            # 进行协方差分析
-            ancova = pg.ancova(data=df, dv=dep_var, between=group_var, covar=covar_vars.tolist())
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["协方差分析" if self.current_language == 'zh' else "Analysis of Covariance (ANCOVA)"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "F", "p-unc", "np2"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([ancova, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('协方差分析结果' if self.current_language == 'zh' else 'Analysis of Covariance (ANCOVA) Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_index, col_name in enumerate(combined_df.columns):
-                    hdr_cells[col_index].text = col_name
-
-                # 添加数据行
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_index, value in enumerate(row):
-                        row_cells[col_index].text = str(value)
-
-                # 生成结果图片
-                plot_path = os.path.splitext(save_path)[0] + '_ancova_plot.png'
-                plt.figure()
-                for group in df[group_var].unique():
-                    group_data = df[df[group_var] == group]
-                    plt.scatter(group_data[covar_vars[0]], group_data[dep_var], label=group)
-                plt.xlabel(covar_vars[0])
-                plt.ylabel(dep_var)
-                plt.title('协方差分析结果' if self.current_language == 'zh' else 'Analysis of Covariance (ANCOVA) Results')
-                plt.legend()
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 将图片插入到Word文档中
-                doc.add_picture(plot_path, width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path, plot_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        # 设置 wraplength 属性让文本自动换行
+        result_msg = languages[self.current_language]["analysis_complete"].format(save_path, ", ".join(paths))
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -193,6 +195,7 @@ class ANCOVAAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -200,7 +203,7 @@ class ANCOVAAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -231,6 +234,10 @@ class ANCOVAAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
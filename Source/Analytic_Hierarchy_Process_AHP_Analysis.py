@@ -1,17 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.weighting import ahp
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -28,6 +33,8 @@ languages = {
         'analysis_error': "分析文件时出错: {}",
         'analysis_complete': "分析完成，结果已保存到 {}\n",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
+        'consistent_note': "一致性比率 CR = {:.4f} < 0.1，判断矩阵的一致性可以接受。",
+        'inconsistent_note': "一致性比率 CR = {:.4f} ≥ 0.1，判断矩阵的一致性不可接受，需要调整判断矩阵。",
         'switch_language_button_text': "切换语言",
         'explanation': {
             "特征向量": "反映各因素相对重要性的向量",
@@ -52,6 +59,8 @@ languages = {
         'analysis_error': "An error occurred while analyzing the file: {}",
         'analysis_complete': "Analysis completed. The results have been saved to {}\n",
         'no_save_path_selected': "No save path selected. The results were not saved.",
+        'consistent_note': "Consistency ratio CR = {:.4f} < 0.1, the consistency of the judgement matrix is acceptable.",
+        'inconsistent_note': "Consistency ratio CR = {:.4f} ≥ 0.1, the consistency of the judgement matrix is not acceptable and the matrix should be revised.",
         'switch_language_button_text': "Switch Language",
         'explanation': {
             "特征向量": "A vector reflecting the relative importance of each factor",
@@ -68,10 +77,82 @@ languages = {
     }
 }
 
-# 随机一致性指标 RI 表
-RI_TABLE = {
-    1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45
-}
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的判断矩阵
+    :return: AhpResult
+    """
+    return ahp(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    eigenvector = result.weights
+
+    # 整理数据
+    data = [
+        ["特征向量", eigenvector.tolist(), ""],
+        ["一致性指标 CI", result.ci, ""],
+        ["随机一致性指标 RI", result.ri, ""],
+        ["一致性比率 CR", result.cr, ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('层次分析法 AHP 分析结果' if language == 'zh' else 'Analytic Hierarchy Process (AHP) Analysis Results',
+                    0)
+    doc.add_paragraph('本报告展示了层次分析法(AHP)的分析结果，包括特征向量、一致性指标和一致性比率。')
+    doc.add_heading('统计量结果', 1)
+    add_table(doc, data, headers=headers)
+    note = texts['consistent_note'] if result.consistent else texts['inconsistent_note']
+    doc.add_paragraph(note.format(result.cr))
+    doc.add_heading('统计量解释说明', 1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读', 1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成特征向量柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_eigenvector.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(range(len(eigenvector)), eigenvector)
+    ax.set_title('特征向量柱状图' if language == 'zh' else 'Bar Chart of Eigenvector')
+    ax.set_xlabel('因素' if language == 'zh' else 'Factors')
+    ax.set_ylabel('权重' if language == 'zh' else 'Weights')
+    fig.savefig(img_path)
+    doc.add_heading('特征向量可视化', 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
 
 class AnalyticHierarchyProcessAHPApp:
     def __init__(self, root=None):
@@ -88,33 +169,6 @@ class AnalyticHierarchyProcessAHPApp:
             
         self.create_ui()
     
-    def ahp_analysis(self, data):
-        """
-        进行层次分析法 AHP 分析
-        :param data: 判断矩阵数据
-        :return: 特征向量、一致性指标 CI、一致性比率 CR
-        """
-        # 计算特征值和特征向量
-        eigenvalues, eigenvectors = np.linalg.eig(data)
-        max_eigenvalue = np.max(eigenvalues).real
-        index = np.argmax(eigenvalues)
-        eigenvector = eigenvectors[:, index].real
-        eigenvector = eigenvector / np.sum(eigenvector)
-
-        # 计算一致性指标 CI
-        n = data.shape[0]
-        CI = (max_eigenvalue - n) / (n - 1)
-
-        # 计算随机一致性指标 RI
-        RI = RI_TABLE.get(n, None)
-        if RI is None:
-            raise ValueError("判断矩阵阶数超出支持范围")
-
-        # 计算一致性比率 CR
-        CR = CI / RI
-
-        return eigenvector, CI, RI, CR
-        
     def select_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
         if file_path:
@@ -140,115 +194,24 @@ class AnalyticHierarchyProcessAHPApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行 AHP 分析
-            eigenvector, CI, RI, CR = self.ahp_analysis(data)
-
-            # 整理数据
-            data = [
-                ["特征向量", eigenvector.tolist(), ""],
-                ["一致性指标 CI", CI, ""],
-                ["随机一致性指标 RI", RI, ""],
-                ["一致性比率 CR", CR, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["特征向量", "一致性指标 CI", "随机一致性指标 RI", "一致性比率 CR"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["特征向量", "一致性指标 CI", "随机一致性指标 RI", "一致性比率 CR"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建Word文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading(
-                    '层次分析法 AHP 分析结果' if self.current_language == 'zh' else 'Analytic Hierarchy Process (AHP) Analysis Results',
-                    0)
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
 
-                # 添加分析说明
-                doc.add_paragraph('本报告展示了层次分析法(AHP)的分析结果，包括特征向量、一致性指标和一致性比率。')
-
-                # 添加统计量表格
-                doc.add_heading('统计量结果', 1)
-                table = doc.add_table(rows=1, cols=len(df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_index, col_name in enumerate(df.columns):
-                    hdr_cells[col_index].text = col_name
-
-                for index, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_index, value in enumerate(row):
-                        row_cells[col_index].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('统计量解释说明', 1)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_index, col_name in enumerate(explanation_df.columns):
-                    hdr_cells[col_index].text = col_name
-
-                for index, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_index, value in enumerate(row):
-                        row_cells[col_index].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('结果解读', 1)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_index, col_name in enumerate(interpretation_df.columns):
-                    hdr_cells[col_index].text = col_name
-
-                for index, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_index, value in enumerate(row):
-                        row_cells[col_index].text = str(value)
-
-                # 生成特征向量柱状图
-                fig, ax = plt.subplots()
-                ax.bar(range(len(eigenvector)), eigenvector)
-                ax.set_title('特征向量柱状图' if self.current_language == 'zh' else 'Bar Chart of Eigenvector')
-                ax.set_xlabel('因素' if self.current_language == 'zh' else 'Factors')
-                ax.set_ylabel('权重' if self.current_language == 'zh' else 'Weights')
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_eigenvector.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在Word文档中添加图片
-                doc.add_heading('特征向量可视化', 1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -261,6 +224,7 @@ class AnalyticHierarchyProcessAHPApp:
         self.file_entry.insert(0, languages[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -268,7 +232,7 @@ class AnalyticHierarchyProcessAHPApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -302,6 +266,10 @@ class AnalyticHierarchyProcessAHPApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,16 +1,20 @@
 import tkinter as tk
 from tkinter import filedialog
-import openpyxl
 import os
-import pandas as pd
-from scipy.stats import bartlett
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
-import numpy as np
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import ALPHA, bartlett_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_boxplot
+from dias.report import add_table, new_document
+
 # 定义语言字典
 languages = {
     "zh": {
@@ -45,6 +49,49 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列为一个样本，只使用数字单元格
+    :return: HomogeneityResult
+    """
+    return bartlett_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 根据 P 值进行结果解读
+    if result.p_value > ALPHA:
+        interpretation = texts["interpretation_accept"]
+    else:
+        interpretation = texts["interpretation_reject"]
+
+    doc = new_document()
+    doc.add_heading('Bartlett 检验结果', 0)
+    add_table(doc, [["Overall", result.statistic, result.p_value, "", interpretation]],
+              headers=["Column Name"] + texts["columns_stats"])
+
+    # 添加箱线图
+    boxplot_path = os.path.join(plot_dir, f"{stem}_boxplot.png")
+    render_boxplot(result.samples, boxplot_path)
+    doc.add_picture(boxplot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [boxplot_path]
+
+
 class BartlettTestApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -85,90 +132,24 @@ class BartlettTestApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active
-
-            rows = sheet.max_row
-            columns = sheet.max_column
-
-            data = []
-            columns_stats = languages[self.current_language]["columns_stats"]
-
-            column_data = []
-            column_names = []
-            for col_idx in range(1, columns + 1):
-                column_values = []
-                for row_idx in range(2, rows + 1):
-                    cell_value = sheet.cell(row=row_idx, column=col_idx).value
-                    if isinstance(cell_value, (int, float)):
-                        column_values.append(cell_value)
-
-                if column_values:
-                    col_name = sheet.cell(row=1, column=col_idx).value
-                    column_data.append(column_values)
-                    column_names.append(col_name)
-
-            if len(column_data) > 1:
-                # 进行 Bartlett 检验
-                bartlett_statistic, bartlett_p_value = bartlett(*column_data)
-
-                # 根据 P 值进行结果解读
-                if bartlett_p_value > 0.05:
-                    interpretation = languages[self.current_language]["interpretation_accept"]
-                else:
-                    interpretation = languages[self.current_language]["interpretation_reject"]
-
-                values = [bartlett_statistic, bartlett_p_value, None, interpretation]
-                data.append(["Overall"] + values)
-
-                # 绘制箱线图
-                plt.figure()
-                plt.boxplot(column_data, tick_labels=column_names)
-                plt.title("Boxplot of Columns")
-                plt.xlabel("Columns")
-                plt.ylabel("Values")
-                boxplot_path = os.path.splitext(file_path)[0] + '_boxplot.png'
-                plt.savefig(boxplot_path)
-                plt.close()
-
-            headers = ["Column Name"] + columns_stats
-            df = pd.DataFrame(data, columns=headers)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('Bartlett 检验结果', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=df.shape[0]+1, cols=df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-
-                for row_idx in range(df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(df.shape[1]):
-                        row_cells[col_idx].text = str(df.iloc[row_idx, col_idx])
-
-                # 添加箱线图
-                doc.add_picture(boxplot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -185,6 +166,7 @@ class BartlettTestApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -192,7 +174,7 @@ class BartlettTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -223,6 +205,10 @@ class BartlettTestApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
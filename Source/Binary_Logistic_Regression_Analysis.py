@@ -1,17 +1,20 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
-from sklearn.metrics import accuracy_score, roc_auc_score
 import matplotlib.pyplot as plt
-import statsmodels.api as sm
-from docx import Document
-from docx.shared import Pt
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import logistic_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_roc_curve
+from dias.report import add_dataframe_table, new_document
 
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
@@ -21,6 +24,10 @@ plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 languages = {
     'zh': {
         'title': "二元逻辑回归分析",
+        'report_title': "二元逻辑回归分析结果",
+        'target_note': "因变量：{}",
+        'statistics_heading': "模型统计量",
+        'coefficients_heading': "回归系数",
         'select_button_text': "选择文件",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
         'analyze_button_text': "分析文件",
@@ -42,6 +49,10 @@ languages = {
     },
     'en': {
         'title': "Binary Logistic Regression Analysis",
+        'report_title': "Binary Logistic Regression Analysis Results",
+        'target_note': "Dependent variable: {}",
+        'statistics_heading': "Model Statistics",
+        'coefficients_heading': "Coefficients",
         'select_button_text': "Select File",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
         'analyze_button_text': "Analyze File",
@@ -63,6 +74,50 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为取 0 / 1 的因变量，其余列为自变量
+    :return: RegressionResult
+    """
+    return logistic_regression(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['target_note'].format(result.target))
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = os.path.join(plot_dir, f"{stem}_logistic_regression_roc.png")
+    render_roc_curve(result.actual, result.fitted, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class BinaryLogisticRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -103,115 +158,24 @@ class BinaryLogisticRegressionAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1].values
-            y = df.iloc[:, -1].values
-
-            # 检查因变量是否在 [0, 1] 区间
-            if not all(0 <= val <= 1 for val in y):
-                raise ValueError("因变量的值必须在 [0, 1] 区间内。")
-
-            # 添加常数项
-            X_with_const = sm.add_constant(X)
-
-            # 进行二元逻辑回归分析
-            logit_model = sm.Logit(y, X_with_const).fit()
-            y_pred_proba = logit_model.predict(X_with_const)
-            y_pred = (y_pred_proba > 0.5).astype(int)
-
-            # 计算指标
-            coefficients = logit_model.params[1:]
-            intercept = logit_model.params[0]
-            accuracy = accuracy_score(y, y_pred)
-            auc = roc_auc_score(y, y_pred_proba)
-
-            # 计算 z 值和 p 值
-            z_values = logit_model.tvalues[1:]
-            p_values = logit_model.pvalues[1:]
-
-            # 准备数据
-            columns_stats = ["Coefficients", "z-value", "p-value", "Accuracy", "AUC"]
-            explanations = languages[self.current_language]['explanation']
-            data = [["Binary Logistic Regression"] + list(coefficients) + [intercept, accuracy, auc] + list(z_values) + list(p_values)]
-            headers = ["Model"] + [f"Coefficient_{i+1}" for i in range(len(coefficients))] + ["Intercept"] + columns_stats[3:] + [f"z-value_{i+1}" for i in range(len(z_values))] + [f"p-value_{i+1}" for i in range(len(p_values))]
-
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('二元逻辑回归分析结果' if self.current_language == 'zh' else 'Binary Logistic Regression Analysis Results', 0)
-
-                # 创建一个表格，行数为 DataFrame 的行数，列数为 DataFrame 的列数
-                table = doc.add_table(rows=transposed_df.shape[0], cols=transposed_df.shape[1])
-
-                # 填充表格数据
-                for row_idx in range(transposed_df.shape[0]):
-                    row_cells = table.rows[row_idx].cells
-                    for col_idx in range(transposed_df.shape[1]):
-                        cell = row_cells[col_idx]
-                        p = cell.paragraphs[0]
-                        run = p.add_run(str(transposed_df.iloc[row_idx, col_idx]))
-                        run.font.size = Pt(10)
-
-                # 调整表格列宽
-                for column in table.columns:
-                    for cell in column.cells:
-                        cell.width = Pt(80)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成 ROC 曲线
-                from sklearn.metrics import roc_curve
-                fpr, tpr, thresholds = roc_curve(y, y_pred_proba)
-                plt.figure(figsize=(10, 6))
-                plt.plot(fpr, tpr, label='ROC curve (area = %0.2f)' % auc)
-                plt.plot([0, 1], [0, 1], 'k--')
-                plt.xlim([0.0, 1.0])
-                plt.ylim([0.0, 1.05])
-                plt.xlabel('False Positive Rate')
-                plt.ylabel('True Positive Rate')
-                plt.title('Receiver Operating Characteristic')
-                plt.legend(loc="lower right")
-                img_name = "logistic_regression_roc.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Pt(400))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                result_msg += "\n" + languages[self.current_language]['images_saved'].format(save_dir)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -228,6 +192,7 @@ class BinaryLogisticRegressionAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -235,7 +200,7 @@ class BinaryLogisticRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -266,6 +231,10 @@ class BinaryLogisticRegressionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,14 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.weighting import critic_weights
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -67,6 +75,79 @@ languages = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，行为评价对象，列为指标
+    :return: CriticResult
+    """
+    return critic_weights(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    weights = result.weights
+
+    # 整理数据
+    data = [
+        ["原始数据矩阵", result.data.tolist(), ""],
+        ["标准差矩阵", result.std.tolist(), ""],
+        ["相关系数矩阵", result.correlation.tolist(), ""],
+        ["信息量矩阵", result.information.tolist(), ""],
+        ["指标权重", weights.tolist(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('分析结果', level=1)
+    add_table(doc, data, headers=headers)
+    doc.add_heading('解释说明', level=1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成指标权重柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_indicator_weights.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(range(len(weights)), weights)
+    ax.set_title('指标权重柱状图' if language == 'zh' else 'Bar Chart of Indicator Weights')
+    ax.set_xlabel('指标编号' if language == 'zh' else 'Indicator Number')
+    ax.set_ylabel('指标权重' if language == 'zh' else 'Indicator Weight')
+    fig.savefig(img_path)
+    doc.add_heading('指标权重柱状图', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class CRITICWeightingMethodAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,139 +180,32 @@ class CRITICWeightingMethodAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def critic_weight_method(self, data):
-        """
-        实现 CRITIC 权重法
-        :param data: 原始数据矩阵
-        :return: 标准差矩阵, 相关系数矩阵, 信息量矩阵, 指标权重
-        """
-        # 计算标准差矩阵
-        std_matrix = np.std(data, axis=0)
-
-        # 计算相关系数矩阵
-        corr_matrix = np.corrcoef(data, rowvar=False)
-
-        # 计算冲突性
-        conflict = 1 - corr_matrix
-
-        # 计算信息量矩阵
-        info_matrix = std_matrix * np.sum(conflict, axis=0)
-
-        # 计算指标权重
-        weights = info_matrix / np.sum(info_matrix)
-
-        return std_matrix, corr_matrix, info_matrix, weights
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
             self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行 CRITIC 权重法分析
-            std_matrix, corr_matrix, info_matrix, weights = self.critic_weight_method(data)
-
-            # 整理数据
-            data = [
-                ["原始数据矩阵", data.tolist(), ""],
-                ["标准差矩阵", std_matrix.tolist(), ""],
-                ["相关系数矩阵", corr_matrix.tolist(), ""],
-                ["信息量矩阵", info_matrix.tolist(), ""],
-                ["指标权重", weights.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["原始数据矩阵", "标准差矩阵", "相关系数矩阵", "信息量矩阵", "指标权重"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["原始数据矩阵", "标准差矩阵", "相关系数矩阵", "信息量矩阵", "指标权重"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                doc.add_heading('分析结果', level=1)
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for _, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('解释说明', level=1)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(explanation_df.columns):
-                    hdr_cells[i].text = header
-                for _, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('结果解读', level=1)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(interpretation_df.columns):
-                    hdr_cells[i].text = header
-                for _, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成指标权重柱状图
-                fig, ax = plt.subplots()
-                ax.bar(range(len(weights)), weights)
-                ax.set_title(
-                    '指标权重柱状图' if self.current_language == 'zh' else 'Bar Chart of Indicator Weights')
-                ax.set_xlabel('指标编号' if self.current_language == 'zh' else 'Indicator Number')
-                ax.set_ylabel('指标权重' if self.current_language == 'zh' else 'Indicator Weight')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_indicator_weights.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_heading('指标权重柱状图', level=1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -248,6 +222,7 @@ class CRITICWeightingMethodAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -255,7 +230,7 @@ class CRITICWeightingMethodAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -286,6 +261,10 @@ class CRITICWeightingMethodAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                               foreground="gray", cursor="hand2")
@@ -1,17 +1,21 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-import pathlib
-from sklearn.cross_decomposition import CCA
-from docx import Document
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multivariate import canonical_correlation
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
@@ -61,6 +65,64 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 前一半列为第一组变量，后一半列为第二组变量
+    :return: CanonicalResult
+    """
+    return canonical_correlation(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理结果
+    canonical_corr_df = pd.DataFrame({
+        '典型相关系数' if language == 'zh' else 'Canonical correlation coefficient': result.correlations
+    })
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_dataframe_table(doc, canonical_corr_df)
+    doc.add_paragraph()
+    add_dataframe_table(doc, explanation_df)
+    doc.add_paragraph()
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成结果图片
+    plot_path = os.path.join(plot_dir, f"{stem}_canonical_corr_plot.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.scatter(result.x_scores[:, 0], result.y_scores[:, 0])
+    ax.set_xlabel('第一组典型变量第一维' if language == 'zh' else 'First dimension of the first set of canonical variables')
+    ax.set_ylabel('第二组典型变量第一维' if language == 'zh' else 'First dimension of the second set of canonical variables')
+    ax.set_title('典型相关分析结果' if language == 'zh' else 'Canonical Correlation Analysis Results')
+    fig.savefig(plot_path)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class CanonicalCorrelationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -101,109 +163,24 @@ class CanonicalCorrelationAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设前半部分列是第一组变量，后半部分列是第二组变量
-            mid = len(df.columns) // 2
-            X = df.iloc[:, :mid]
-            Y = df.iloc[:, mid:]
-
-            # 进行典型相关分析
-            cca = CCA()
-            cca.fit(X, Y)
-            X_c, Y_c = cca.transform(X, Y)
-
-            # 计算典型相关系数
-            canonical_correlations = []
-            for i in range(min(X_c.shape[1], Y_c.shape[1])):
-                corr = np.corrcoef(X_c[:, i], Y_c[:, i])[0, 1]
-                canonical_correlations.append(corr)
-
-            # 整理结果
-            canonical_corr_df = pd.DataFrame({
-                '典型相关系数' if self.current_language == 'zh' else 'Canonical correlation coefficient': canonical_correlations
-            })
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["典型相关分析" if self.current_language == 'zh' else "Canonical Correlation Analysis"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "典型相关系数" if self.current_language == 'zh' else "Canonical correlation coefficient",
-                "典型变量" if self.current_language == 'zh' else "Canonical variables"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加典型相关系数表格
-                table = doc.add_table(rows=1, cols=len(canonical_corr_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(canonical_corr_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for _, row in canonical_corr_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_paragraph()
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for _, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_paragraph()
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for _, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 生成结果图片
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = desktop_path / 'canonical_corr_plot.png'
-                plt.figure()
-                plt.scatter(X_c[:, 0], Y_c[:, 0])
-                plt.xlabel(
-                    '第一组典型变量第一维' if self.current_language == 'zh' else 'First dimension of the first set of canonical variables')
-                plt.ylabel(
-                    '第二组典型变量第一维' if self.current_language == 'zh' else 'First dimension of the second set of canonical variables')
-                plt.title('典型相关分析结果' if self.current_language == 'zh' else 'Canonical Correlation Analysis Results')
-                plt.savefig(plot_path)
-                plt.close()
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                result_msg += "\n" + languages[self.current_language]['images_saved'].format(plot_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
+        result_msg += "\n" + languages[self.current_language]['images_saved'].format(paths[0])
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -220,6 +197,7 @@ class CanonicalCorrelationAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -227,7 +205,7 @@ class CanonicalCorrelationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -258,6 +236,10 @@ class CanonicalCorrelationAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,18 +1,23 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
 import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import chi_square_goodness_of_fit
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -21,6 +26,7 @@ plt.rcParams['axes.unicode_minus'] = False
 LANGUAGES = {
     'zh': {
         'title': "卡方拟合优度检验",
+        'expected_note': "理论频数已按观测频数的总和缩放，第二列也可以填写理论比例。",
         'select_button': "选择文件",
         'analyze_button': "分析文件",
         'file_not_found': "文件不存在，请重新选择。",
@@ -39,6 +45,7 @@ LANGUAGES = {
     },
     'en': {
         'title': "Chi-Square Goodness-of-Fit Test",
+        'expected_note': "The expected frequencies are scaled to the total of the observed frequencies, so the second column may also hold expected proportions.",
         'select_button': "Select File",
         'analyze_button': "Analyze File",
         'file_not_found': "The file does not exist. Please select again.",
@@ -57,6 +64,71 @@ LANGUAGES = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，第一列为观测频数，第二列为理论频数（或理论比例，按观测总数缩放）
+    :return: GoodnessOfFitResult
+    """
+    return chi_square_goodness_of_fit(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 整理结果
+    result_df = pd.DataFrame({
+        "统计量": ["卡方值", "自由度", "p值"] if zh else ["Chi-Square Value", "Degrees of Freedom", "p-value"],
+        "值": [result.chi2, result.dof, result.p_value]
+    })
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if zh else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if zh else "Interpretation")
+
+    # 合并数据、解释说明和结果解读
+    combined_df = pd.concat([result_df, explanation_df, interpretation_df], ignore_index=True)
+
+    doc = new_document()
+    doc.add_heading('卡方拟合优度检验结果' if zh else 'Chi-Square Goodness-of-Fit Test Results', 0)
+    add_dataframe_table(doc, combined_df)
+    doc.add_paragraph(texts['expected_note'])
+
+    # 生成结果图片
+    observed, expected = result.frequencies["Observed"], result.frequencies["Expected"]
+    plot_path = os.path.join(plot_dir, f"{stem}_chi_square_plot.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(np.arange(len(observed)), observed, label='观测频数' if zh else 'Observed Frequencies', alpha=0.7)
+    ax.bar(np.arange(len(expected)), expected, label='理论频数' if zh else 'Expected Frequencies', alpha=0.7)
+    ax.set_xlabel('类别' if zh else 'Categories')
+    ax.set_ylabel('频数' if zh else 'Frequencies')
+    ax.set_title('卡方拟合优度检验 - 观测频数 vs 理论频数' if zh
+                 else 'Chi-Square Goodness-of-Fit Test - Observed vs Expected Frequencies')
+    ax.legend()
+    fig.savefig(plot_path)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class ChiSquareGoodnessOfFitTestApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -92,93 +164,29 @@ class ChiSquareGoodnessOfFitTestApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设第一列是观测频数，第二列是理论频数
-            observed = df.iloc[:, 0]
-            expected = df.iloc[:, 1]
-
-            # 进行卡方拟合优度检验
-            chi2, p = stats.chisquare(observed, expected)
-
-            # 整理结果
-            result_df = pd.DataFrame({
-                "统计量": ["卡方值", "p值"],
-                "值": [chi2, p]
-            })
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["卡方拟合优度检验" if self.current_language == 'zh' else "Chi-Square Goodness-of-Fit Test"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "卡方值" if self.current_language == 'zh' else "Chi-Square Value",
-                "p值" if self.current_language == 'zh' else "p-value"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([result_df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('卡方拟合优度检验结果' if self.current_language == 'zh' else 'Chi-Square Goodness-of-Fit Test Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for _, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成结果图片
-                plot_path = os.path.splitext(save_path)[0] + '_chi_square_plot.png'
-                plt.figure()
-                plt.bar(np.arange(len(observed)), observed, label='观测频数' if self.current_language == 'zh' else 'Observed Frequencies', alpha=0.7)
-                plt.bar(np.arange(len(expected)), expected, label='理论频数' if self.current_language == 'zh' else 'Expected Frequencies', alpha=0.7)
-                plt.xlabel('类别' if self.current_language == 'zh' else 'Categories')
-                plt.ylabel('频数' if self.current_language == 'zh' else 'Frequencies')
-                plt.title(
-                    '卡方拟合优度检验 - 观测频数 vs 理论频数' if self.current_language == 'zh' else 'Chi-Square Goodness-of-Fit Test - Observed vs Expected Frequencies')
-                plt.legend()
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_picture(plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -191,6 +199,7 @@ class ChiSquareGoodnessOfFitTestApp:
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -198,7 +207,7 @@ class ChiSquareGoodnessOfFitTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -229,6 +238,10 @@ class ChiSquareGoodnessOfFitTestApp:
                                         command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]['switch_language'],
                                              foreground="gray", cursor="hand2")
@@ -1,18 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
 import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import ALPHA, chi_square_independence
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -21,6 +25,15 @@ plt.rcParams['axes.unicode_minus'] = False
 LANGUAGES = {
     'zh': {
         'title': "卡方检验",
+        'report_title': "卡方检验结果",
+        'crosstab_heading': "列联表",
+        'tests_heading': "卡方检验",
+        'test_columns': ["检验方法", "统计量", "自由度", "p值", "显著性（α=0.05）"],
+        'method_names': {"Pearson": "Pearson卡方", "Likelihood Ratio": "似然比卡方", "Yates Continuity Correction": "Yates校正卡方", "Fisher Exact (odds ratio)": "Fisher精确检验（统计量为优势比）", "Linear-by-Linear Association": "趋势卡方"},
+        'significant': "显著",
+        'not_significant': "不显著",
+        'effect_size': "效应量 {}: {:.4f}",
+        'sample_note': "样本量: {}，最小期望频数: {:.2f}",
         'select_button': "选择文件",
         'analyze_button': "分析文件",
         'file_not_found': "文件不存在，请重新选择。",
@@ -51,6 +64,15 @@ LANGUAGES = {
     },
     'en': {
         'title': "Chi-square test",
+        'report_title': "Chi-Square Test Results",
+        'crosstab_heading': "Contingency Table",
+        'tests_heading': "Chi-Square Tests",
+        'test_columns': ["Method", "Statistic", "df", "p-value", "Significance (α=0.05)"],
+        'method_names': {},
+        'significant': "Significant",
+        'not_significant': "Not significant",
+        'effect_size': "Effect size {}: {:.4f}",
+        'sample_note': "Sample size: {}, minimum expected frequency: {:.2f}",
         'select_button': "Select File",
         'analyze_button': "Analyze File",
         'file_not_found': "The file does not exist. Please select again.",
@@ -81,6 +103,68 @@ LANGUAGES = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，前两列为两个分类变量，每行为一个观测
+    :return: ContingencyResult
+    """
+    return chi_square_independence(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+
+    # 列联表
+    doc.add_heading(texts['crosstab_heading'], 1)
+    add_dataframe_table(doc, result.table, index=True,
+                        index_label=f"{result.table.index.name} \\ {result.table.columns.name}")
+
+    # 各检验方法的结果
+    doc.add_heading(texts['tests_heading'], 1)
+    tests = result.tests.copy()
+    tests["Method"] = tests["Method"].map(lambda name: texts['method_names'].get(name, name))
+    tests["Significant"] = np.where(tests["p-value"] < ALPHA, texts['significant'], texts['not_significant'])
+    add_dataframe_table(doc, tests.fillna(""), header=texts['test_columns'])
+    doc.add_paragraph(texts['effect_size'].format(result.effect_name, result.effect_size))
+    doc.add_paragraph(texts['sample_note'].format(result.nobs, result.min_expected))
+
+    # 添加解释说明和结果解读
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 各类别频数的分组柱状图
+    plot_path = os.path.join(plot_dir, f"{stem}_crosstab.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    result.table.plot.bar(ax=ax, rot=0)
+    ax.set_ylabel('频数' if language == 'zh' else 'Frequency')
+    ax.set_title(texts['crosstab_heading'])
+    fig.savefig(plot_path)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class ChiSquaredTestApp:
     def __init__(self, root=None):
         # 当前语言
@@ -112,34 +196,24 @@ class ChiSquaredTestApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
             return
-            
-        try:
-            # 读取Excel文件
-            df = pd.read_excel(file_path)
-            
-            # 执行卡方检验分析
-            # 这里应该根据实际需求实现卡方检验的逻辑
-            # 为简化示例，这里只是一个基本框架
-            
-            # 保存结果
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建Word文档并保存结果
-                doc = Document()
-                doc.add_heading('Chi-Square Test Results', 0)
-                
-                # 添加分析结果
-                # 这里应该添加实际的分析结果
-                
-                # 保存文档
-                doc.save(save_path)
-                
-                self.result_label.config(text=LANGUAGES[self.current_language]['analysis_success'].format(save_path))
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-                
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_success'].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
     
     def switch_language(self, event=None):
         self.current_language = 'zh' if self.current_language == 'en' else 'en'
@@ -147,6 +221,7 @@ class ChiSquaredTestApp:
         self.select_button.config(text=LANGUAGES[self.current_language]['select_button'])
         self.analyze_button.config(text=LANGUAGES[self.current_language]['analyze_button'])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]['switch_language'])
+        self.job_panel.set_language(self.current_language)
         
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -155,7 +230,7 @@ class ChiSquaredTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -184,6 +259,10 @@ class ChiSquaredTestApp:
                                         command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]['switch_language'],
                                              foreground="gray", cursor="hand2")
@@ -1,18 +1,21 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from sklearn.cluster import KMeans
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.clustering import K_MAX, K_MIN, kmeans_sweep
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -29,12 +32,30 @@ LANGUAGES = {
         'analysis_error': "分析文件时出错: {}",
         'switch_language': "切换语言",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
+        'k_range_label': "比较的 k 范围：",
+        'k_label': "采用的 k（留空按轮廓系数选择）：",
+        'parallel_check': "多进程并行计算各个 k",
+        'invalid_k': "k 须为正整数，且最小值不大于最大值。",
+        'report_title': "K-Means 聚类分析结果",
+        'comparison_heading': "不同 k 的比较",
+        'chosen_k': "采用 k = {}（{}），聚类算法：{}。",
+        'selected_by': {"Specified": "指定", "Silhouette": "轮廓系数最大"},
+        'centers_heading': "聚类中心",
+        'summary_heading': "各类的样本数和均值",
+        'assignments_note': "每个样本所属的类已保存到 {}。",
+        'elbow_title': "肘部法：组内平方和",
+        'scores_title': "轮廓系数和 Calinski-Harabasz 指数",
+        'scatter_title': "聚类结果可视化（k = {}）",
         'explanation': {
-            "聚类标签": "每个样本所属的聚类类别",
+            "Inertia": "各样本到所属聚类中心的距离平方和，随 k 增大而减小，下降明显变缓处（肘部）为合适的 k。",
+            "Silhouette": "轮廓系数，取值 -1 到 1，越大说明类内越紧密、类间越分离；样本较多时在随机抽取的样本上计算。",
+            "Calinski-Harabasz": "类间离散度与类内离散度之比，越大越好。",
+            "聚类标签": "每个样本所属的聚类类别，保存在 CSV 文件中",
             "聚类中心": "每个聚类的中心位置",
-            "聚类结果可视化": "将聚类结果以散点图形式展示"
+            "聚类结果可视化": "以前两个变量绘制的散点图，样本较多时只绘制随机抽取的部分样本"
         },
         'interpretation': {
+            "k 的选择": "结合肘部图和轮廓系数选择 k，轮廓系数低于 0.25 时聚类结构不明显",
             "聚类标签": "可用于区分不同样本所属的类别",
             "聚类中心": "代表每个聚类的典型特征",
             "聚类结果可视化": "直观展示样本的聚类分布情况"
@@ -50,12 +71,30 @@ LANGUAGES = {
         'analysis_error': "An error occurred while analyzing the file: {}",
         'switch_language': "Switch Language",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
+        'k_range_label': "Range of k to compare: ",
+        'k_label': "k to use (blank to pick by silhouette): ",
+        'parallel_check': "Fit each k in parallel processes",
+        'invalid_k': "k must be a positive integer and the minimum must not exceed the maximum.",
+        'report_title': "K-Means Clustering Analysis Results",
+        'comparison_heading': "Comparison of k",
+        'chosen_k': "k = {} is used ({}). Algorithm: {}.",
+        'selected_by': {"Specified": "specified", "Silhouette": "highest silhouette"},
+        'centers_heading': "Cluster Centers",
+        'summary_heading': "Cluster Sizes and Means",
+        'assignments_note': "The cluster of every sample has been saved to {}.",
+        'elbow_title': "Elbow Method: Inertia",
+        'scores_title': "Silhouette and Calinski-Harabasz Scores",
+        'scatter_title': "Visualization of Clustering Results (k = {})",
         'explanation': {
-            "聚类标签": "The cluster label to which each sample belongs",
+            "Inertia": "The sum of squared distances from each sample to its cluster center. It falls as k grows; the k where the decrease levels off (the elbow) is a good choice.",
+            "Silhouette": "Ranges from -1 to 1. Higher values mean tighter clusters that are better separated. For large data it is computed on a random sample.",
+            "Calinski-Harabasz": "The ratio of between-cluster to within-cluster dispersion. Higher is better.",
+            "聚类标签": "The cluster label to which each sample belongs, saved in the CSV file",
             "聚类中心": "The center position of each cluster",
-            "聚类结果可视化": "Visualize the clustering results in a scatter plot"
+            "聚类结果可视化": "A scatter plot of the first two variables; for large data only a random sample is plotted"
         },
         'interpretation': {
+            "k 的选择": "Choose k from the elbow plot together with the silhouette; a silhouette below 0.25 suggests weak cluster structure",
             "聚类标签": "Can be used to distinguish the categories to which different samples belong",
             "聚类中心": "Represents the typical characteristics of each cluster",
             "聚类结果可视化": "Visually show the clustering distribution of samples"
@@ -63,6 +102,120 @@ LANGUAGES = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df, k_min=K_MIN, k_max=K_MAX, k=None, parallel=True):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据
+    :param k_min: 比较的最小 k
+    :param k_max: 比较的最大 k
+    :param k: 采用的 k，None 时取轮廓系数最大的 k
+    :param parallel: 是否在进程池中并行计算各个 k
+    :return: KMeansResult
+    """
+    return kmeans_sweep(df, k_min=k_min, k_max=k_max, k=k, parallel=parallel)
+
+
+def plot_comparison(comparison, k, img_path, language='en'):
+    """
+    绘制肘部图和轮廓系数、Calinski-Harabasz 指数随 k 的变化，采用的 k 以虚线标出
+    """
+    texts = LANGUAGES[language]
+    fig = new_figure(figsize=(10, 4))
+    ax_elbow, ax_scores = fig.subplots(1, 2)
+    ax_elbow.plot(comparison["k"], comparison["Inertia"], marker='o')
+    ax_elbow.set_title(texts['elbow_title'])
+    ax_elbow.set_xlabel("k")
+    ax_scores.plot(comparison["k"], comparison["Silhouette"], marker='o', color='tab:blue', label="Silhouette")
+    ax_ch = ax_scores.twinx()
+    ax_ch.plot(comparison["k"], comparison["Calinski-Harabasz"], marker='s', color='tab:orange',
+               label="Calinski-Harabasz")
+    ax_scores.set_title(texts['scores_title'])
+    ax_scores.set_xlabel("k")
+    ax_scores.set_ylabel("Silhouette", color='tab:blue')
+    ax_ch.set_ylabel("Calinski-Harabasz", color='tab:orange')
+    for ax in (ax_elbow, ax_scores):
+        ax.axvline(k, color='gray', linestyle='--')
+        ax.set_xticks(comparison["k"])
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def plot_clusters(result, img_path, language='en'):
+    """
+    以前两个变量绘制聚类散点图和聚类中心
+    """
+    texts = LANGUAGES[language]
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.scatter(result.plot_data[:, 0], result.plot_data[:, 1], c=result.plot_labels, cmap='viridis', s=8)
+    centers = result.centers.to_numpy()
+    ax.scatter(centers[:, 0], centers[:, 1], marker='X', s=200, c='red')
+    ax.set_title(texts['scatter_title'].format(result.k))
+    ax.set_xlabel(result.centers.columns[0])
+    ax.set_ylabel(result.centers.columns[1])
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告、图片和每个样本所属类的 CSV 文件
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片和 CSV 文件的保存目录，默认与 Word 文档相同
+    :return: 图片和 CSV 文件的路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    csv_path = os.path.join(plot_dir, f"{stem}_clusters.csv")
+    result.assignments.to_csv(csv_path, index=False, encoding="utf-8-sig")
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_heading(texts['comparison_heading'], 1)
+    add_dataframe_table(doc, result.comparison.round(4))
+    doc.add_paragraph(texts['chosen_k'].format(result.k, texts['selected_by'][result.selected_by], result.algorithm))
+    doc.add_heading(texts['centers_heading'], 2)
+    add_dataframe_table(doc, result.centers.round(4), index=True, index_label="Cluster")
+    doc.add_heading(texts['summary_heading'], 2)
+    add_dataframe_table(doc, result.summary.round(4))
+    doc.add_paragraph(texts['assignments_note'].format(os.path.basename(csv_path)))
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_paths = [plot_comparison(result.comparison, result.k, os.path.join(plot_dir, f"{stem}_k_comparison.png"),
+                                 language)]
+    doc.add_picture(img_paths[0], width=Inches(6))
+    if result.plot_data.shape[1] >= 2:
+        img_paths.append(plot_clusters(result, os.path.join(plot_dir, f"{stem}_clustering_visualization.png"),
+                                       language))
+        doc.add_picture(img_paths[1], width=Inches(6))
+
+    doc.save(save_path)
+    return img_paths + [csv_path]
+
+
 class ClusteringAnalysisKMeansApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -95,18 +248,17 @@ class ClusteringAnalysisKMeansApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def clustering_analysis(self, data, n_clusters=3):
+    def read_params(self):
         """
-        进行聚类分析
-        :param data: 输入数据
-        :param n_clusters: 聚类的数量
-        :return: 聚类标签，聚类中心
+        读取 k 的范围、采用的 k 和并行选项
+        :return: 传给 analyze 的参数
         """
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        kmeans.fit(data)
-        labels = kmeans.labels_
-        centers = kmeans.cluster_centers_
-        return labels, centers
+        k_min, k_max = int(self.k_min_entry.get()), int(self.k_max_entry.get())
+        k = self.k_entry.get().strip()
+        k = int(k) if k else None
+        if k_min < 1 or k_max < k_min or (k is not None and k < 1):
+            raise ValueError
+        return {'k_min': k_min, 'k_max': k_max, 'k': k, 'parallel': self.parallel_var.get()}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -117,102 +269,27 @@ class ClusteringAnalysisKMeansApp:
             self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            original_data = df.values
-
-            # 进行聚类分析
-            labels, centers = self.clustering_analysis(original_data)
-
-            # 整理数据
-            data = [
-                ["聚类标签", labels.tolist(), ""],
-                ["聚类中心", centers.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["聚类标签", "聚类中心", "聚类结果可视化"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["聚类标签", "聚类中心", "聚类结果可视化"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格数据
-                doc.add_heading('分析结果', 1)
-                table = doc.add_table(rows=1, cols=len(df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for _, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading('解释说明', 2)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for _, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读
-                doc.add_heading('结果解读', 2)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for _, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成聚类结果可视化图片
-                if original_data.shape[1] >= 2:
-                    fig, ax = plt.subplots()
-                    # 确保 labels 是一维数组
-                    labels = np.asarray(labels).ravel()
-                    ax.scatter(original_data[:, 0], original_data[:, 1], c=labels, cmap='viridis')
-                    ax.scatter(centers[:, 0], centers[:, 1], marker='X', s=200, c='red')
-                    ax.set_title(
-                        '聚类结果可视化' if self.current_language == 'zh' else 'Visualization of Clustering Results')
-                    ax.set_xlabel('特征 1' if self.current_language == 'zh' else 'Feature 1')
-                    ax.set_ylabel('特征 2' if self.current_language == 'zh' else 'Feature 2')
-                    # 保存图片
-                    img_path = os.path.splitext(save_path)[0] + '_clustering_visualization.png'
-                    plt.savefig(img_path)
-                    plt.close()
-
-                    # 将图片插入到 Word 文档中
-                    doc.add_heading('聚类结果可视化', 2)
-                    doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=LANGUAGES[self.current_language]['invalid_k'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -220,6 +297,10 @@ class ClusteringAnalysisKMeansApp:
         self.select_button.config(text=LANGUAGES[self.current_language]['select_button'])
         self.analyze_button.config(text=LANGUAGES[self.current_language]['analyze_button'])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]['switch_language'])
+        self.k_range_label.config(text=LANGUAGES[self.current_language]['k_range_label'])
+        self.k_label.config(text=LANGUAGES[self.current_language]['k_label'])
+        self.parallel_check.config(text=LANGUAGES[self.current_language]['parallel_check'])
+        self.job_panel.set_language(self.current_language)
         # 切换语言时更新提示信息
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
@@ -232,7 +313,7 @@ class ClusteringAnalysisKMeansApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 460
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -258,11 +339,37 @@ class ClusteringAnalysisKMeansApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建 k 的范围和采用的 k 输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.k_range_label = ttk.Label(params_frame, text=LANGUAGES[self.current_language]['k_range_label'])
+        self.k_range_label.grid(row=0, column=0, sticky='e', pady=2)
+        range_frame = ttk.Frame(params_frame)
+        range_frame.grid(row=0, column=1, sticky='w', padx=2, pady=2)
+        self.k_min_entry, self.k_max_entry = (ttk.Entry(range_frame, width=4) for _ in range(2))
+        for entry, default in ((self.k_min_entry, K_MIN), (self.k_max_entry, K_MAX)):
+            entry.insert(0, str(default))
+            entry.pack(side=tk.LEFT, padx=2)
+        self.k_label = ttk.Label(params_frame, text=LANGUAGES[self.current_language]['k_label'])
+        self.k_label.grid(row=1, column=0, sticky='e', pady=2)
+        self.k_entry = ttk.Entry(params_frame, width=4)
+        self.k_entry.grid(row=1, column=1, sticky='w', padx=4, pady=2)
+
+        # 创建并行计算复选框
+        self.parallel_var = tk.BooleanVar(value=True)
+        self.parallel_check = ttk.Checkbutton(frame, text=LANGUAGES[self.current_language]['parallel_check'],
+                                              variable=self.parallel_var)
+        self.parallel_check.pack(pady=5)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=LANGUAGES[self.current_language]['analyze_button'], 
                                         command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]['switch_language'],
                                              foreground="gray", cursor="hand2")
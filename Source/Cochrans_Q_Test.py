@@ -4,11 +4,17 @@ from ttkbootstrap.dialogs import Messagebox
 import openpyxl
 import os
 import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 from scipy.stats import cochrans_q
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.dataset import load_excel
+
 # 定义语言字典
 LANGUAGES = {
     'zh': {
@@ -99,7 +105,7 @@ class CochransQTestApp:
             return
         try:
             # 打开 Excel 文件
-            df = pd.read_excel(file_path)
+            df = load_excel(file_path)
 
             # 检查数据是否为数值类型
             numerical_df = df.select_dtypes(include=[np.number])
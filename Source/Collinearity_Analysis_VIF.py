@@ -1,22 +1,30 @@
 import tkinter as tk
 from tkinter import filedialog
-import openpyxl
 import os
-import pandas as pd
+import sys
 import numpy as np
-from statsmodels.stats.outliers_influence import variance_inflation_factor
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
 import matplotlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.collinearity import CONDITION_INDEX_LIMIT, VIF_MODERATE, VIF_THRESHOLD, collinearity_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 matplotlib.rcParams['font.family'] = 'SimHei'
 # 解决负号显示问题
 matplotlib.rcParams['axes.unicode_minus'] = False
 
+# 柱状图最多显示的变量个数（按 VIF 从大到小）
+PLOT_VARIABLES = 50
+
 # 定义语言字典
 languages = {
     "zh": {
@@ -29,11 +37,24 @@ languages = {
         "analysis_error": "分析文件时出错: {}",
         "analysis_complete": "分析完成，结果已保存到 {}，相关图片已保存。",
         "no_save_path_selected": "未选择保存路径，结果未保存。",
-        "columns_stats": ["变量名", "方差膨胀因子（VIF）", "", "结果解读"],
+        "columns_stats": ["变量名", "方差膨胀因子（VIF）", "容忍度", "结果解读"],
         "interpretation_low_vif": "方差膨胀因子（VIF）小于 5，表明该变量与其他变量之间不存在严重的共线性。",
         "interpretation_medium_vif": "方差膨胀因子（VIF）在 5 到 10 之间，表明该变量与其他变量之间可能存在一定的共线性。",
         "interpretation_high_vif": "方差膨胀因子（VIF）大于 10，表明该变量与其他变量之间存在严重的共线性。",
-        "switch_language_button_text": "切换语言"
+        "interpretation_aliased": "该变量与其他变量精确线性相关，方差膨胀因子（VIF）为无穷大。",
+        "switch_language_button_text": "切换语言",
+        "eliminate_check": "逐步剔除 VIF 最大的变量",
+        "threshold_label": "VIF 阈值：",
+        "invalid_threshold": "VIF 阈值须为大于 1 的数。",
+        "report_title": "共线性分析 (VIF) 结果",
+        "vif_heading": "方差膨胀因子",
+        "condition_heading": "条件指数",
+        "condition_note": "最大条件指数为 {:.4g}（相关矩阵最大与最小特征值之比的平方根），超过 {} 时说明存在严重的共线性。",
+        "singular_note": "相关矩阵奇异，已改用伪逆计算，标为无穷大的变量之间存在精确的线性关系。",
+        "constant_note": "以下变量的方差为 0，未参与计算：{}",
+        "elimination_heading": "逐步剔除",
+        "elimination_note": "每次删去 VIF 最大的变量，直到所有变量的 VIF 小于 {:g}。",
+        "retained_heading": "剔除后保留的变量"
     },
     "en": {
         "title": "Collinearity Analysis (VIF)",
@@ -45,14 +66,113 @@ languages = {
         "analysis_error": "An error occurred while analyzing the file: {}",
         "analysis_complete": "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         "no_save_path_selected": "No save path selected. The results were not saved.",
-        "columns_stats": ["Variable Name", "Variance Inflation Factor (VIF)", "", "Result Interpretation"],
+        "columns_stats": ["Variable Name", "Variance Inflation Factor (VIF)", "Tolerance", "Result Interpretation"],
         "interpretation_low_vif": "The Variance Inflation Factor (VIF) is less than 5, indicating that there is no severe collinearity between this variable and other variables.",
         "interpretation_medium_vif": "The Variance Inflation Factor (VIF) is between 5 and 10, indicating that there may be some collinearity between this variable and other variables.",
         "interpretation_high_vif": "The Variance Inflation Factor (VIF) is greater than 10, indicating that there is severe collinearity between this variable and other variables.",
-        "switch_language_button_text": "Switch Language"
+        "interpretation_aliased": "This variable is an exact linear combination of other variables, so its Variance Inflation Factor (VIF) is infinite.",
+        "switch_language_button_text": "Switch Language",
+        "eliminate_check": "Drop the variable with the largest VIF step by step",
+        "threshold_label": "VIF threshold: ",
+        "invalid_threshold": "The VIF threshold must be a number greater than 1.",
+        "report_title": "Collinearity Analysis (VIF) Results",
+        "vif_heading": "Variance Inflation Factors",
+        "condition_heading": "Condition Indices",
+        "condition_note": "The largest condition index is {:.4g} (the square root of the ratio of the largest to the smallest eigenvalue of the correlation matrix). Values above {} indicate severe collinearity.",
+        "singular_note": "The correlation matrix is singular, so a pseudo-inverse was used. The variables marked as infinite are exactly linearly related.",
+        "constant_note": "These variables have zero variance and were left out: {}",
+        "elimination_heading": "Stepwise Elimination",
+        "elimination_note": "The variable with the largest VIF is dropped at each step until every VIF is below {:g}.",
+        "retained_heading": "Variables Retained"
     }
 }
 
+
+def interpret_vif(vif, texts):
+    """
+    VIF 的结果解读
+    """
+    if np.isinf(vif):
+        return texts["interpretation_aliased"]
+    if vif < VIF_MODERATE:
+        return texts["interpretation_low_vif"]
+    if vif < VIF_THRESHOLD:
+        return texts["interpretation_medium_vif"]
+    return texts["interpretation_high_vif"]
+
+
+def analyze(df, threshold=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量，其余列为自变量
+    :param threshold: VIF 阈值；指定时逐步删去 VIF 最大的变量
+    :return: CollinearityResult
+    """
+    return collinearity_analysis(df, threshold)
+
+
+def plot_vif(vif_data, path):
+    """
+    VIF 柱状图，变量较多时只画 VIF 最大的 PLOT_VARIABLES 个，无穷大的 VIF 不画
+    """
+    data = vif_data[np.isfinite(vif_data["Variance Inflation Factor (VIF)"])]
+    data = data.nlargest(PLOT_VARIABLES, "Variance Inflation Factor (VIF)")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(data["Variable Name"], data["Variance Inflation Factor (VIF)"])
+    ax.axhline(VIF_THRESHOLD, color='red', linestyle='--')
+    ax.set_xlabel('Variable Name')
+    ax.set_ylabel('Variance Inflation Factor (VIF)')
+    ax.set_title('Variance Inflation Factor (VIF) for Each Variable')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    vif_data = result.vif.copy()
+    vif_data["Result Interpretation"] = [interpret_vif(v, texts) for v in vif_data["Variance Inflation Factor (VIF)"]]
+
+    doc = new_document()
+    doc.add_heading(texts["report_title"], 0)
+    doc.add_heading(texts["vif_heading"], 1)
+    if result.singular:
+        doc.add_paragraph(texts["singular_note"])
+    if result.constant:
+        doc.add_paragraph(texts["constant_note"].format(", ".join(result.constant)))
+    add_dataframe_table(doc, vif_data, header=texts["columns_stats"])
+
+    doc.add_heading(texts["condition_heading"], 1)
+    doc.add_paragraph(texts["condition_note"].format(result.condition_number, CONDITION_INDEX_LIMIT))
+    add_dataframe_table(doc, result.condition)
+
+    if result.eliminated is not None:
+        doc.add_heading(texts["elimination_heading"], 1)
+        doc.add_paragraph(texts["elimination_note"].format(result.threshold))
+        add_dataframe_table(doc, result.eliminated)
+        doc.add_heading(texts["retained_heading"], 2)
+        add_dataframe_table(doc, result.retained)
+
+    img_path = os.path.join(plot_dir, f"{stem}_vif_plot.png")
+    plot_vif(result.vif, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class CollinearityAnalysisVIFApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -85,12 +205,17 @@ class CollinearityAnalysisVIFApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    # 计算方差膨胀因子（VIF）的函数
-    def calculate_vif(self, X):
-        vif_data = pd.DataFrame()
-        vif_data["Variable Name"] = X.columns
-        vif_data["Variance Inflation Factor (VIF)"] = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
-        return vif_data
+    def read_params(self):
+        """
+        读取逐步剔除选项和 VIF 阈值
+        :return: 传给 analyze 的参数
+        """
+        if not self.eliminate_var.get():
+            return {'threshold': None}
+        threshold = float(self.threshold_entry.get())
+        if not threshold > 1:
+            raise ValueError
+        return {'threshold': threshold}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -101,75 +226,27 @@ class CollinearityAnalysisVIFApp:
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列为因变量，其余为自变量
-            X = df.iloc[:, :-1]
-
-            # 计算方差膨胀因子（VIF）
-            vif_data = self.calculate_vif(X)
-
-            # 根据 VIF 值进行结果解读
-            interpretations = []
-            for vif in vif_data["Variance Inflation Factor (VIF)"]:
-                if vif < 5:
-                    interpretations.append(languages[self.current_language]["interpretation_low_vif"])
-                elif 5 <= vif < 10:
-                    interpretations.append(languages[self.current_language]["interpretation_medium_vif"])
-                else:
-                    interpretations.append(languages[self.current_language]["interpretation_high_vif"])
-
-            vif_data["Result Interpretation"] = interpretations
-
-            # 绘制 VIF 值的柱状图
-            plt.figure()
-            plt.bar(vif_data["Variable Name"], vif_data["Variance Inflation Factor (VIF)"])
-            plt.xlabel('Variable Name')
-            plt.ylabel('Variance Inflation Factor (VIF)')
-            plt.title('Variance Inflation Factor (VIF) for Each Variable')
-            plt.xticks(rotation=45)
-
-            # 保存图片
-            image_path = os.path.splitext(file_path)[0] + '_vif_plot.png'
-            plt.savefig(image_path)
-            plt.close()
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('共线性分析 (VIF) 结果', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(languages[self.current_language]["columns_stats"]))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(languages[self.current_language]["columns_stats"]):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in vif_data.iterrows():
-                    row_cells = table.add_row().cells
-                    row_cells[0].text = str(row['Variable Name'])
-                    row_cells[1].text = str(row['Variance Inflation Factor (VIF)'])
-                    row_cells[3].text = str(row['Result Interpretation'])
-
-                # 添加图片到文档
-                doc.add_picture(image_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=languages[self.current_language]["invalid_threshold"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -185,6 +262,9 @@ class CollinearityAnalysisVIFApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.eliminate_check.config(text=languages[self.current_language]["eliminate_check"])
+        self.threshold_label.config(text=languages[self.current_language]["threshold_label"])
+        self.job_panel.set_language(self.current_language)
         
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -193,7 +273,7 @@ class CollinearityAnalysisVIFApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 420
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -219,11 +299,28 @@ class CollinearityAnalysisVIFApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建逐步剔除复选框和 VIF 阈值输入框
+        self.eliminate_var = tk.BooleanVar(value=False)
+        self.eliminate_check = ttk.Checkbutton(frame, text=languages[self.current_language]["eliminate_check"],
+                                               variable=self.eliminate_var)
+        self.eliminate_check.pack(pady=5)
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.threshold_label = ttk.Label(params_frame, text=languages[self.current_language]["threshold_label"])
+        self.threshold_label.grid(row=0, column=0, sticky='e', pady=2)
+        self.threshold_entry = ttk.Entry(params_frame, width=8)
+        self.threshold_entry.insert(0, str(VIF_THRESHOLD))
+        self.threshold_entry.grid(row=0, column=1, sticky='w', padx=4, pady=2)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"], 
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,14 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import tkinter.simpledialog
 import matplotlib.pyplot as plt
-from statsmodels.formula.api import ols
-from statsmodels.stats import contrast
-from docx import Document
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.survey import conjoint_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
 
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
@@ -25,6 +33,12 @@ languages = {
         'no_save_path': "未选择保存路径，结果未保存。",
         'analysis_error': "分析文件时出错: {}",
         'switch_language': "切换语言",
+        'preference_prompt': "请输入偏好列的列名",
+        'attribute_prompt': "请输入属性列的列名（点击取消结束输入）",
+        'no_preference_column': "未输入有效的偏好列名，分析取消。",
+        'no_attribute_columns': "未输入有效的属性列名，分析取消。",
+        'empty_attribute_column': "输入的列名不能为空，请重新输入。",
+        'images_saved': "属性效应柱状图已保存到 {}",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
         'explanation': {
             "属性效应": "各属性对消费者偏好的影响程度。",
@@ -39,13 +53,19 @@ languages = {
     },
     'en': {
         'title': "Conjoint Analysis",
-        'select_button': "Select Files",
-        'analyze_button': "Analyze Files",
+        'select_button': "Select File",
+        'analyze_button': "Analyze File",
         'file_not_found': "The file does not exist. Please select again.",
         'analysis_success': "Analysis completed. The results have been saved to {}\n",
         'no_save_path': "No save path selected. The results were not saved.",
         'analysis_error': "An error occurred while analyzing the file: {}",
         'switch_language': "Switch Language",
+        'preference_prompt': "Please enter the name of the preference column",
+        'attribute_prompt': "Please enter the name of an attribute column (click Cancel to finish input)",
+        'no_preference_column': "No valid preference column name entered. Analysis canceled.",
+        'no_attribute_columns': "No valid attribute column names entered. Analysis canceled.",
+        'empty_attribute_column': "The column name entered cannot be empty. Please re-enter.",
+        'images_saved': "The attribute effects chart has been saved to {}",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
         'explanation': {
             "属性效应": "The influence of each attribute on consumer preferences.",
@@ -60,6 +80,73 @@ languages = {
     }
 }
 
+
+def analyze(df, preference_column=None, attribute_columns=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每行为一个产品组合
+    :param preference_column: 偏好列的列名，默认为最后一列
+    :param attribute_columns: 属性列的列名列表，默认为偏好列以外的所有列
+    :return: ConjointResult
+    """
+    return conjoint_analysis(df, preference_column, attribute_columns)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据：属性效应为各属性的相对重要性（%），属性水平效应为各水平的成分效用
+    all_data = [[f"{attr}_属性效应", effect] for attr, effect in result.importance.items()]
+    all_data.append(["R-squared", result.r_squared])
+    all_data += [[f"{attr}_{level}_属性水平效应", effect]
+                 for attr, level, effect in result.part_worths.itertuples(index=False)]
+    headers = ["指标", "数值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "指标_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "指标_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading(texts['title'], 0)
+    add_table(doc, all_data, headers=headers)
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成属性效应柱状图
+    plot_title = '属性效应' if language == 'zh' else 'Attribute Effects'
+    img_path = os.path.join(plot_dir, f"{stem}_attribute_effects.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(result.importance.index, result.importance.to_numpy())
+    ax.set_title(plot_title)
+    ax.set_ylabel('效应值' if language == 'zh' else 'Effect Value')
+    ax.set_xlabel('属性' if language == 'zh' else 'Attribute')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(img_path)
+    doc.add_heading(plot_title, level=2)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class ConjointAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -76,10 +163,10 @@ class ConjointAnalysisApp:
         self.create_ui()
     
     def select_file(self):
-        file_paths = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx;*.xls")])
-        if file_paths:
+        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+        if file_path:
             self.file_entry.delete(0, tk.END)
-            self.file_entry.insert(0, ", ".join(file_paths))
+            self.file_entry.insert(0, file_path)
             self.file_entry.config(foreground='black')
 
     def on_entry_click(self, event):
@@ -92,177 +179,61 @@ class ConjointAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def conjoint_analysis(self, data, attribute_columns, preference_column):
-        formula = f'{preference_column} ~ ' + ' + '.join(attribute_columns)
-        model = ols(formula, data=data).fit()
-
-        # 属性效应
-        attribute_effects = model.params.drop('Intercept')
-        # R-squared
-        r_squared = model.rsquared
-
-        all_results = {
-            "属性效应": attribute_effects,
-            "R-squared": r_squared
-        }
-
-        # 属性水平效应
-        attribute_level_effects = {}
-        for attr in attribute_columns:
-            contrast_results = contrast.ContrastResults(model.t_test_pairwise(attr))
-            attribute_level_effects[attr] = contrast_results.effect
-
-        all_results["属性水平效应"] = attribute_level_effects
-
-        return all_results
+    def read_params(self):
+        """
+        通过对话框输入偏好列和各属性列的列名
+        :return: 传给 analyze 的参数；取消输入时返回 None
+        """
+        texts = languages[self.current_language]
+        preference_column = tkinter.simpledialog.askstring("输入信息", texts["preference_prompt"])
+        if not preference_column:
+            self.result_label.config(text=texts["no_preference_column"])
+            return None
+        attribute_columns = []
+        while True:
+            attribute_column = tkinter.simpledialog.askstring("输入信息", texts["attribute_prompt"])
+            if attribute_column is None:
+                break
+            if attribute_column.strip():
+                attribute_columns.append(attribute_column.strip())
+            else:
+                self.result_label.config(text=texts["empty_attribute_column"])
+        if not attribute_columns:
+            self.result_label.config(text=texts["no_attribute_columns"])
+            return None
+        return {"preference_column": preference_column.strip(), "attribute_columns": attribute_columns}
 
     def analyze_file(self):
-        file_paths = self.file_entry.get().split(", ")
-        if not file_paths or file_paths[0] == languages[self.current_language]["file_entry_placeholder"]:
+        file_path = self.file_entry.get()
+        if file_path == languages[self.current_language]["file_entry_placeholder"]:
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
+            return
+        if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                self.result_label.config(text=languages[self.current_language]['file_not_found'])
-                return
-        try:
-            preference_column = tkinter.simpledialog.askstring("输入信息", "请输入偏好列的列名")
-            if not preference_column:
-                self.result_label.config(text="未输入有效的偏好列名，分析取消。")
-                return
-            attribute_columns = []
-            while True:
-                attribute_column = tkinter.simpledialog.askstring("输入信息", "请输入属性列的列名（点击取消结束输入）")
-                if attribute_column is None:
-                    break
-                if attribute_column.strip():
-                    attribute_columns.append(attribute_column.strip())
-                else:
-                    print("输入的列名不能为空，请重新输入。")
-
-            if not attribute_columns:
-                self.result_label.config(text="未输入有效的属性列名，分析取消。")
-                return
-
-            all_results = []
-            file_names = []
-            for file_path in file_paths:
-                # 打开 Excel 文件
-                df = pd.read_excel(file_path)
-
-                # 进行联合分析
-                conjoint_results = self.conjoint_analysis(df, attribute_columns, preference_column)
-                all_results.append(conjoint_results)
-                file_names.append(os.path.basename(file_path))
-
-            # 整理数据
-            all_data = []
-            for i, results in enumerate(all_results):
-                # 属性效应
-                for attr, effect in results["属性效应"].items():
-                    all_data.append([f"{file_names[i]}_{attr}_属性效应", effect])
-                # R-squared
-                all_data.append([f"{file_names[i]}_R-squared", results["R-squared"]])
-                # 属性水平效应
-                for attr, levels in results["属性水平效应"].items():
-                    for level, effect in levels.items():
-                        all_data.append([f"{file_names[i]}_{attr}_{level}_属性水平效应", effect])
-
-            headers = ["指标", "数值"]
-            df_result = pd.DataFrame(all_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["属性效应", "属性水平效应", "R-squared"])
-            explanation_df.insert(0, "指标_解释说明",
-                                "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["属性效应", "属性水平效应", "R-squared"])
-            interpretation_df.insert(0, "指标_结果解读",
-                                    "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row in df_result.values.tolist():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_paragraph()
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                exp_table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                exp_hdr_cells = exp_table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    exp_hdr_cells[col_idx].text = header
-                for row in explanation_df.values.tolist():
-                    exp_row_cells = exp_table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        exp_row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_paragraph()
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                interp_table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                interp_hdr_cells = interp_table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    interp_hdr_cells[col_idx].text = header
-                for row in interpretation_df.values.tolist():
-                    interp_row_cells = interp_table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        interp_row_cells[col_idx].text = str(value)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-                # 生成属性效应柱状图
-                attribute_effects = [result["属性效应"] for result in all_results]
-                all_attributes = []
-                all_effects = []
-                for effects in attribute_effects:
-                    for attr, effect in effects.items():
-                        all_attributes.append(attr)
-                        all_effects.append(effect)
-
-                fig, ax = plt.subplots()
-                ax.bar(all_attributes, all_effects)
-                ax.set_title('属性效应' if self.current_language == 'zh' else 'Attribute Effects')
-                ax.set_ylabel('效应值' if self.current_language == 'zh' else 'Effect Value')
-                ax.set_xlabel('属性' if self.current_language == 'zh' else 'Attribute')
-                plt.xticks(rotation=45)
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_attribute_effects.png'
-                plt.savefig(img_path)
-                plt.close()
+        params = self.read_params()
+        if params is None:
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
 
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
+    def on_analysis_done(self, save_path, paths):
+        result_msg = languages[self.current_language]['analysis_success'].format(save_path)
+        result_msg += languages[self.current_language]['images_saved'].format(paths[0])
+        self.result_label.config(text=result_msg, wraplength=400)
 
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
-    def switch_language(self, event):
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -277,6 +248,7 @@ class ConjointAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -284,7 +256,7 @@ class ConjointAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -315,6 +287,10 @@ class ConjointAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                               foreground="gray", cursor="hand2")
@@ -1,14 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.reliability import content_validity
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -75,6 +83,75 @@ LANGUAGES = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 专家评分数据，每列一个题项
+    :return: ContentValidityResult
+    """
+    return content_validity(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = [
+        ["平均内容效度比（CVR）", result.average_cvr, ""],
+        ["样本量", result.sample_sizes.to_dict(), ""],
+        ["均值", result.means.to_dict(), ""],
+        ["标准差", result.stds.to_dict(), ""],
+        ["中位数", result.medians.to_dict(), ""],
+        ["偏度", result.skewness.to_dict(), ""],
+        ["峰度", result.kurtosis.to_dict(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading(texts['title'], 0)
+    add_table(doc, data, headers=headers)
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成图片（均值柱状图）
+    plot_title = '变量均值柱状图' if language == 'zh' else 'Bar Chart of Variable Means'
+    img_path = os.path.join(plot_dir, f"{stem}.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    result.means.plot(kind='bar', ax=ax)
+    ax.set_title(plot_title)
+    ax.set_xlabel('变量' if language == 'zh' else 'Variables')
+    ax.set_ylabel('均值' if language == 'zh' else 'Mean')
+    fig.tight_layout()
+    fig.savefig(img_path)
+    doc.add_heading(plot_title, 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class ContentValidityAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -90,21 +167,6 @@ class ContentValidityAnalysisApp:
             
         self.create_ui()
 
-    def content_validity_analysis(self, data):
-        # 假设数据是专家对每个题项与测量内容相关性的评分（1 表示相关，0 表示不相关）
-        # 计算每个题项的内容效度比（CVR）
-        cvr_values = []
-        for column in data.columns:
-            n = len(data[column])
-            ne = data[column].sum()
-            cvr = (ne - n / 2) / (n / 2)
-            cvr_values.append(cvr)
-
-        # 计算平均内容效度比
-        average_cvr = np.mean(cvr_values)
-
-        return average_cvr
-        
     def select_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
         if file_path:
@@ -126,102 +188,29 @@ class ContentValidityAnalysisApp:
 
     def analyze_file(self):
         file_path = self.file_entry.get()
-        if file_path == LANGUAGES[self.current_language]['file_entry_placeholder']:
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行内容效度分析。")
-
-            # 进行内容效度分析
-            average_cvr = self.content_validity_analysis(numerical_df)
-
-            # 计算更多的统计指标
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-            stds = numerical_df.std()
-            medians = numerical_df.median()
-            skewnesses = numerical_df.skew()
-            kurtoses = numerical_df.kurt()
-
-            # 整理数据
-            data = [
-                ["平均内容效度比（CVR）", average_cvr, ""],
-                ["样本量", sample_sizes.to_dict(), ""],
-                ["均值", means.to_dict(), ""],
-                ["标准差", stds.to_dict(), ""],
-                ["中位数", medians.to_dict(), ""],
-                ["偏度", skewnesses.to_dict(), ""],
-                ["峰度", kurtoses.to_dict(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["平均内容效度比（CVR）", "样本量", "均值", "标准差", "中位数", "偏度", "峰度"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["平均内容效度比（CVR）", "样本量", "均值", "标准差", "中位数", "偏度", "峰度"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=combined_df.shape[0] + 1, cols=combined_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-
-                for row_idx, row in combined_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成图片（均值柱状图）
-                fig, ax = plt.subplots()
-                means.plot(kind='bar', ax=ax)
-                ax.set_title('变量均值柱状图' if self.current_language == 'zh' else 'Bar Chart of Variable Means')
-                ax.set_xlabel('变量' if self.current_language == 'zh' else 'Variables')
-                ax.set_ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -238,6 +227,7 @@ class ContentValidityAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
             self.file_entry.configure(style="Gray.TEntry")
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -245,7 +235,7 @@ class ContentValidityAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -275,6 +265,10 @@ class ContentValidityAnalysisApp:
                                         command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(self.root, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建语言切换标签
         self.language_label = ttk.Label(self.root, text=LANGUAGES[self.current_language]['switch_language'], cursor="hand2")
         self.language_label.pack(pady=10)
@@ -1,14 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import coupling_coordination
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -63,6 +71,79 @@ LANGUAGES = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，每列代表一个系统，每行为一个观测
+    :return: CouplingResult
+    """
+    return coupling_coordination(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 整理数据：整体结果按各系统的均值计算，逐行结果用于直方图
+    data = [
+        ["耦合度", result.coupling, ""],
+        ["耦合协调度", result.coordination, ""],
+        ["各行耦合度" if zh else "Coupling Degree by Row", result.row_coupling.tolist(), ""],
+        ["各行耦合协调度" if zh else "Coupling Coordination Degree by Row", result.row_coordination.tolist(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if zh else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if zh else "Interpretation")
+
+    doc = new_document()
+    add_table(doc, data, headers=headers)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成耦合度和耦合协调度分布直方图
+    img_path = os.path.join(plot_dir, f"{stem}_histograms.png")
+    fig = new_figure(figsize=(6, 8))
+    axes = fig.subplots(2, 1)
+    axes[0].hist(result.row_coupling, bins=10)
+    axes[0].set_title('耦合度分布直方图' if zh else 'Histogram of Coupling Degree Distribution')
+    axes[0].set_xlabel('耦合度' if zh else 'Coupling Degree')
+    axes[0].set_ylabel('频数' if zh else 'Frequency')
+    axes[1].hist(result.row_coordination, bins=10)
+    axes[1].set_title('耦合协调度分布直方图' if zh else 'Histogram of Coupling Coordination Degree Distribution')
+    axes[1].set_xlabel('耦合协调度' if zh else 'Coupling Coordination Degree')
+    axes[1].set_ylabel('频数' if zh else 'Frequency')
+    fig.tight_layout()
+    fig.savefig(img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class CouplingCoordinationDegreeModelAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -78,27 +159,6 @@ class CouplingCoordinationDegreeModelAnalysisApp:
             
         self.create_ui()
 
-    def coupling_coordination_degree(self, data):
-        """
-        计算耦合度和耦合协调度
-        :param data: 原始数据矩阵，每列代表一个系统
-        :return: 耦合度, 耦合协调度
-        """
-        n = data.shape[1]  # 系统数量
-        # 计算各系统的综合发展水平
-        u = np.mean(data, axis=0)
-
-        # 计算耦合度
-        C = n * np.power(np.prod(u), 1 / n) / np.sum(u)
-
-        # 计算综合发展指数
-        T = np.sum(u)
-
-        # 计算耦合协调度
-        D = np.sqrt(C * T)
-
-        return C, D
-        
     def select_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
         if file_path:
@@ -120,101 +180,29 @@ class CouplingCoordinationDegreeModelAnalysisApp:
 
     def analyze_file(self):
         file_path = self.file_entry.get()
-        if file_path == LANGUAGES[self.current_language]['file_entry_placeholder']:
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行耦合协调度分析
-            C, D = self.coupling_coordination_degree(data)
-
-            # 整理数据
-            data = [
-                ["耦合度", C, ""],
-                ["耦合协调度", D, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["耦合度", "耦合协调度", "耦合度分布直方图", "耦合协调度分布直方图"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["耦合度", "耦合协调度", "耦合度分布直方图", "耦合协调度分布直方图"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格数据
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row in combined_df.values:
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成耦合度和耦合协调度分布直方图
-                # 这里假设数据是多组的，若只有一组数据则需要调整逻辑
-                C_list = [C]
-                D_list = [D]
-                fig, axes = plt.subplots(2, 1, figsize=(6, 8))
-
-                axes[0].hist(C_list, bins=10)
-                axes[0].set_title(
-                    '耦合度分布直方图' if self.current_language == 'zh' else 'Histogram of Coupling Degree Distribution')
-                axes[0].set_xlabel('耦合度' if self.current_language == 'zh' else 'Coupling Degree')
-                axes[0].set_ylabel('频数' if self.current_language == 'zh' else 'Frequency')
-
-                axes[1].hist(D_list, bins=10)
-                axes[1].set_title(
-                    '耦合协调度分布直方图' if self.current_language == 'zh' else 'Histogram of Coupling Coordination Degree Distribution')
-                axes[1].set_xlabel('耦合协调度' if self.current_language == 'zh' else 'Coupling Coordination Degree')
-                axes[1].set_ylabel('频数' if self.current_language == 'zh' else 'Frequency')
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_histograms.png'
-                plt.tight_layout()
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -231,6 +219,7 @@ class CouplingCoordinationDegreeModelAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
             self.file_entry.configure(style="Gray.TEntry")
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -238,7 +227,7 @@ class CouplingCoordinationDegreeModelAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -268,6 +257,10 @@ class CouplingCoordinationDegreeModelAnalysisApp:
                                         command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(self.root, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建语言切换标签
         self.language_label = ttk.Label(self.root, text=LANGUAGES[self.current_language]['switch_language'], cursor="hand2")
         self.language_label.pack(pady=10)
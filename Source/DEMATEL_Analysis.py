@@ -1,13 +1,19 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
-import pandas as pd
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
-from docx.shared import Pt
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import dematel
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
@@ -59,6 +65,81 @@ languages = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的直接影响矩阵
+    :return: DematelResult
+    """
+    return dematel(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    explanations, interpretations = texts['explanation'], texts['interpretation']
+    factors = result.factors
+
+    doc = new_document()
+    title = doc.add_heading('DEMATEL 分析结果', level=1)
+    title.alignment = 1  # 居中对齐
+
+    # 添加综合影响矩阵
+    doc.add_heading('综合影响矩阵', level=2)
+    doc.add_paragraph(explanations["综合影响矩阵"])
+    doc.add_paragraph(interpretations["综合影响矩阵"])
+    add_dataframe_table(doc, result.total_relation, index=True)
+
+    # 添加原因度
+    doc.add_heading('原因度', level=2)
+    doc.add_paragraph(explanations["原因度"])
+    doc.add_paragraph(interpretations["原因度"])
+    add_dataframe_table(doc, result.causal_degree.to_frame('原因度'), index=True, index_label='因素')
+
+    # 添加中心度
+    doc.add_heading('中心度', level=2)
+    doc.add_paragraph(explanations["中心度"])
+    doc.add_paragraph(interpretations["中心度"])
+    add_dataframe_table(doc, result.centrality.to_frame('中心度'), index=True, index_label='因素')
+
+    # 生成原因度和中心度柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_charts.png")
+    fig = new_figure(figsize=(8, 10))
+    axes = fig.subplots(2, 1)
+    axes[0].bar(factors, result.causal_degree)
+    axes[0].set_title('原因度柱状图' if language == 'zh' else 'Bar Chart of Causal Degree')
+    axes[0].set_xlabel('因素' if language == 'zh' else 'Factors')
+    axes[0].set_ylabel('原因度' if language == 'zh' else 'Causal Degree')
+    axes[1].bar(factors, result.centrality)
+    axes[1].set_title('中心度柱状图' if language == 'zh' else 'Bar Chart of Centrality')
+    axes[1].set_xlabel('因素' if language == 'zh' else 'Factors')
+    axes[1].set_ylabel('中心度' if language == 'zh' else 'Centrality')
+    fig.tight_layout()
+    fig.savefig(img_path)
+    doc.add_heading('原因度和中心度柱状图', level=2)
+    doc.add_picture(img_path)
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class DEMATELAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -91,141 +172,32 @@ class DEMATELAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def dematel_analysis(self, data):
-        """
-        进行 DEMATEL 分析
-        :param data: 直接影响矩阵数据
-        :return: 综合影响矩阵、原因度、中心度
-        """
-        # 归一化直接影响矩阵
-        n = data.shape[0]
-        max_sum_row = np.max(np.sum(data, axis=1))
-        max_sum_col = np.max(np.sum(data, axis=0))
-        max_value = max(max_sum_row, max_sum_col)
-        D = data / max_value
-
-        # 计算综合影响矩阵
-        I = np.eye(n)
-        T = np.dot(D, np.linalg.inv(I - D))
-
-        # 计算原因度和中心度
-        sum_row = np.sum(T, axis=1)
-        sum_col = np.sum(T, axis=0)
-        causal_degree = sum_row - sum_col
-        centrality = sum_row + sum_col
-
-        return T, causal_degree, centrality
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行 DEMATEL 分析
-            T, causal_degree, centrality = self.dematel_analysis(data)
-
-            # 整理数据
-            factors = [f"因素{i + 1}" for i in range(data.shape[0])]
-            T_df = pd.DataFrame(T, index=factors, columns=factors)
-            causal_degree_df = pd.DataFrame(causal_degree, index=factors, columns=["原因度"])
-            centrality_df = pd.DataFrame(centrality, index=factors, columns=["中心度"])
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                document = Document()
-
-                # 添加标题
-                title = document.add_heading('DEMATEL 分析结果', level=1)
-                title.alignment = 1  # 居中对齐
-
-                # 添加综合影响矩阵
-                document.add_heading('综合影响矩阵', level=2)
-                document.add_paragraph(explanations["综合影响矩阵"])
-                document.add_paragraph(interpretations["综合影响矩阵"])
-                table = document.add_table(rows=len(T_df) + 1, cols=len(T_df.columns) + 1)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = ''
-                for col_idx, col_name in enumerate(T_df.columns):
-                    hdr_cells[col_idx + 1].text = col_name
-                for row_idx, row in enumerate(T_df.values):
-                    row_cells = table.rows[row_idx + 1].cells
-                    row_cells[0].text = T_df.index[row_idx]
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx + 1].text = str(value)
-
-                # 添加原因度
-                document.add_heading('原因度', level=2)
-                document.add_paragraph(explanations["原因度"])
-                document.add_paragraph(interpretations["原因度"])
-                table = document.add_table(rows=len(causal_degree_df) + 1, cols=len(causal_degree_df.columns) + 1)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = '因素'
-                hdr_cells[1].text = '原因度'
-                for row_idx, row in enumerate(causal_degree_df.values):
-                    row_cells = table.rows[row_idx + 1].cells
-                    row_cells[0].text = causal_degree_df.index[row_idx]
-                    row_cells[1].text = str(row[0])
-
-                # 添加中心度
-                document.add_heading('中心度', level=2)
-                document.add_paragraph(explanations["中心度"])
-                document.add_paragraph(interpretations["中心度"])
-                table = document.add_table(rows=len(centrality_df) + 1, cols=len(centrality_df.columns) + 1)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = '因素'
-                hdr_cells[1].text = '中心度'
-                for row_idx, row in enumerate(centrality_df.values):
-                    row_cells = table.rows[row_idx + 1].cells
-                    row_cells[0].text = centrality_df.index[row_idx]
-                    row_cells[1].text = str(row[0])
-
-                # 生成原因度和中心度柱状图
-                fig, axes = plt.subplots(2, 1, figsize=(8, 10))
-                axes[0].bar(factors, causal_degree)
-                axes[0].set_title('原因度柱状图' if self.current_language == 'zh' else 'Bar Chart of Causal Degree')
-                axes[0].set_xlabel('因素' if self.current_language == 'zh' else 'Factors')
-                axes[0].set_ylabel('原因度' if self.current_language == 'zh' else 'Causal Degree')
-
-                axes[1].bar(factors, centrality)
-                axes[1].set_title('中心度柱状图' if self.current_language == 'zh' else 'Bar Chart of Centrality')
-                axes[1].set_xlabel('因素' if self.current_language == 'zh' else 'Factors')
-                axes[1].set_ylabel('中心度' if self.current_language == 'zh' else 'Centrality')
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_charts.png'
-                plt.tight_layout()
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                document.add_heading('原因度和中心度柱状图', level=2)
-                document.add_picture(img_path)
-
-                # 保存 Word 文档
-                document.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -237,6 +209,7 @@ class DEMATELAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, languages[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -245,7 +218,7 @@ class DEMATELAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -276,6 +249,10 @@ class DEMATELAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
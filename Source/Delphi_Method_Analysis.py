@@ -1,14 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import delphi
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -64,6 +72,77 @@ languages = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的多轮评分数据，每一行代表一轮评分
+    :return: DelphiResult
+    """
+    return delphi(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = [
+        ["各轮评分均值", result.means.tolist(), ""],
+        ["各轮评分标准差", result.stds.tolist(), ""],
+        ["最终共识评分", [result.consensus], ""],
+        ["评分收敛情况", [result.converged], ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading(texts['title'], 0)
+    add_table(doc, data, headers=headers)
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成最后一轮评分分布柱状图
+    plot_title = '最后一轮评分分布柱状图' if language == 'zh' else 'Histogram of Scores in the Last Round'
+    img_path = os.path.join(plot_dir, f"{stem}_score_distribution.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.hist(result.last_round, bins=10)
+    ax.set_title(plot_title)
+    ax.set_xlabel('评分' if language == 'zh' else 'Scores')
+    ax.set_ylabel('频数' if language == 'zh' else 'Frequency')
+    fig.savefig(img_path)
+    doc.add_heading(plot_title, 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class DelphiMethodAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -96,127 +175,32 @@ class DelphiMethodAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def delphi_analysis(self, data):
-        """
-        进行德尔菲专家法分析
-        :param data: 专家多轮评分数据，每一行代表一轮评分
-        :return: 各轮评分均值、各轮评分标准差、最终共识评分、评分收敛情况
-        """
-        means = np.mean(data, axis=1)
-        stds = np.std(data, axis=1)
-        # 简单假设最后一轮评分的均值为最终共识评分
-        final_consensus_score = means[-1]
-        # 简单收敛标准：最后一轮标准差小于某个阈值
-        convergence_threshold = 1.0
-        convergence = stds[-1] < convergence_threshold
-        return means, stds, final_consensus_score, convergence
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行德尔菲分析
-            means, stds, final_consensus_score, convergence = self.delphi_analysis(data)
-
-            # 整理数据
-            result_data = [
-                ["各轮评分均值", means.tolist(), ""],
-                ["各轮评分标准差", stds.tolist(), ""],
-                ["最终共识评分", [final_consensus_score], ""],
-                ["评分收敛情况", [convergence], ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(result_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["各轮评分均值", "各轮评分标准差", "最终共识评分", "评分收敛情况"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["各轮评分均值", "各轮评分标准差", "最终共识评分", "评分收敛情况"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading(languages[self.current_language]['title'], 0)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for col, header in enumerate(headers):
-                    hdr_cells[col].text = header
-                for row in df.values:
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", 1)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col, header in enumerate(explanation_df.columns):
-                    hdr_cells[col].text = header
-                for row in explanation_df.values:
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", 1)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col].text = header
-                for row in interpretation_df.values:
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 生成最后一轮评分分布柱状图
-                fig, ax = plt.subplots()
-                ax.hist(data[-1], bins=10)
-                ax.set_title(
-                    '最后一轮评分分布柱状图' if self.current_language == 'zh' else 'Histogram of Scores in the Last Round')
-                ax.set_xlabel('评分' if self.current_language == 'zh' else 'Scores')
-                ax.set_ylabel('频数' if self.current_language == 'zh' else 'Frequency')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_score_distribution.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_heading("最后一轮评分分布柱状图" if self.current_language == 'zh' else 'Histogram of Scores in the Last Round', 1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文件
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -228,6 +212,7 @@ class DelphiMethodAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, languages[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -236,7 +221,7 @@ class DelphiMethodAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -267,6 +252,10 @@ class DelphiMethodAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -2,13 +2,20 @@ import tkinter as tk
 from tkinter import filedialog
 import os
 import numpy as np
-import pandas as pd
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
-from sklearn.cluster import DBSCAN
-from sklearn.metrics import silhouette_score
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.clustering import DENSITY_MIN_SAMPLES, density_clustering
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
@@ -26,13 +33,31 @@ languages = {
         "analysis_error": "分析文件时出错: {}",
         "switch_language": "切换语言",
         "file_entry_placeholder": "请输入待分析 Excel 文件的完整路径",
+        "eps_label": "邻域半径 eps（留空自动选择）：",
+        "min_samples_label": "核心点最小样本数 min_samples：",
+        "scale_check": "先将各变量标准化",
+        "invalid_params": "eps 须为正数，min_samples 须为正整数。",
+        "report_title": "密度聚类分析结果",
+        "parameters_heading": "聚类参数和结果",
+        "eps_mode": {"Auto": "k 距离曲线的拐点", "Specified": "指定"},
+        "comparison_heading": "不同 eps 的比较",
+        "summary_heading": "各类的样本数和均值（-1 为噪声点）",
+        "assignments_note": "每个样本所属的类已保存到 {}。",
+        "k_distance_title": "k 距离曲线（k = {}）",
+        "k_distance_xlabel": "样本（按 k 距离排序）",
+        "k_distance_ylabel": "到第 k 个近邻的距离",
+        "scatter_title": "密度聚类散点图",
+        "noise": "噪声",
         "explanation": {
-            "聚类结果": "每个样本所属的聚类类别",
-            "聚类散点图": "展示样本在二维空间中的分布及聚类结果",
-            "轮廓系数": "衡量聚类效果的指标，值越接近1表示聚类效果越好"
+            "eps": "两个样本相距不超过 eps 即互为邻居；勾选标准化时为标准化后的距离",
+            "min_samples": "邻居数（含自身）不少于 min_samples 的样本为核心点，相邻的核心点及其邻居构成一类",
+            "k 距离曲线": "每个样本到第 min_samples 个近邻的距离从小到大排列，曲线开始急剧上升处（拐点）即自动选择的 eps",
+            "聚类结果": "每个样本所属的聚类类别，保存在 CSV 文件中",
+            "轮廓系数": "衡量聚类效果的指标，值越接近1表示聚类效果越好；只在非噪声样本上计算，样本较多时抽样计算"
         },
         "interpretation": {
             "聚类结果": "可用于区分不同样本所属的类别，-1 表示噪声点",
+            "eps 的比较": "若 eps 略有变化聚类数就大幅改变，说明聚类结构不稳定，可调整 min_samples 后再试",
             "聚类散点图": "直观展示样本之间的聚类关系和分布情况",
             "轮廓系数": "若值接近1，说明聚类紧凑且分离度高；若值接近 -1，说明聚类效果差"
         }
@@ -47,13 +72,31 @@ languages = {
         "analysis_error": "An error occurred while analyzing the file: {}",
         "switch_language": "Switch Language",
         "file_entry_placeholder": "Please enter the full path of the Excel file to be analyzed",
+        "eps_label": "Neighborhood radius eps (blank for auto): ",
+        "min_samples_label": "Minimum samples of a core point: ",
+        "scale_check": "Standardize the variables first",
+        "invalid_params": "eps must be positive and min_samples must be a positive integer.",
+        "report_title": "Density-Based Clustering Analysis Results",
+        "parameters_heading": "Parameters and Results",
+        "eps_mode": {"Auto": "knee of the k-distance curve", "Specified": "specified"},
+        "comparison_heading": "Comparison of eps",
+        "summary_heading": "Cluster Sizes and Means (-1 is noise)",
+        "assignments_note": "The cluster of every sample has been saved to {}.",
+        "k_distance_title": "k-Distance Curve (k = {})",
+        "k_distance_xlabel": "Samples sorted by k-distance",
+        "k_distance_ylabel": "Distance to the k-th nearest neighbor",
+        "scatter_title": "Density-Based Clustering Scatter Plot",
+        "noise": "Noise",
         "explanation": {
-            "聚类结果": "The cluster label to which each sample belongs",
-            "聚类散点图": "Show the distribution of samples in a two-dimensional space and the clustering results",
-            "轮廓系数": "An index to measure the clustering effect. A value closer to 1 indicates better clustering."
+            "eps": "Two samples within eps of each other are neighbors. With standardization, this is the distance after standardizing.",
+            "min_samples": "A sample with at least min_samples neighbors (itself included) is a core point. Neighboring core points and their neighbors form a cluster.",
+            "k 距离曲线": "The distance from each sample to its min_samples-th nearest neighbor, sorted. The knee where the curve starts to rise sharply is the automatic eps.",
+            "聚类结果": "The cluster label to which each sample belongs, saved in the CSV file",
+            "轮廓系数": "An index to measure the clustering effect. A value closer to 1 indicates better clustering. It is computed on non-noise samples, on a random sample for large data."
         },
         "interpretation": {
             "聚类结果": "Can be used to distinguish the categories to which different samples belong. -1 represents noise points.",
+            "eps 的比较": "If a small change in eps changes the number of clusters a lot, the cluster structure is unstable; try another min_samples.",
             "聚类散点图": "Visually show the clustering relationship and distribution of samples.",
             "轮廓系数": "If the value is close to 1, the clusters are compact and well-separated. If close to -1, the clustering effect is poor."
         }
@@ -61,6 +104,115 @@ languages = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df, eps=None, min_samples=DENSITY_MIN_SAMPLES, scale=True):
+    """
+    无界面计算入口，界面和批处理共用
+    同一进程中对同一数据再次分析时复用已建立的邻居索引
+    :param df: load_data 读取的数据
+    :param eps: 邻域半径，None 时自动选择
+    :param min_samples: 形成核心点所需的最小样本数
+    :param scale: 是否先将各变量标准化
+    :return: DensityResult
+    """
+    return density_clustering(df, eps=eps, min_samples=min_samples, scale=scale)
+
+
+def plot_k_distance(result, img_path, language='en'):
+    """
+    绘制 k 距离曲线，采用的 eps 以虚线标出
+    """
+    texts = languages[language]
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(np.arange(1, len(result.k_distance) + 1), result.k_distance)
+    ax.axhline(result.eps, color='red', linestyle='--', label=f"eps = {result.eps:.4g}")
+    ax.set_title(texts['k_distance_title'].format(result.min_samples))
+    ax.set_xlabel(texts['k_distance_xlabel'])
+    ax.set_ylabel(texts['k_distance_ylabel'])
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def plot_clustering(result, names, img_path, language='en'):
+    """
+    以前两个变量绘制聚类散点图，噪声点用黑色表示
+    """
+    texts = languages[language]
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    data, labels = result.plot_data, result.plot_labels
+    noise = labels < 0
+    ax.scatter(data[~noise, 0], data[~noise, 1], c=labels[~noise], cmap='Spectral', s=8)
+    ax.scatter(data[noise, 0], data[noise, 1], c='black', s=4, label=texts['noise'])
+    ax.set_title(texts['scatter_title'])
+    ax.set_xlabel(names[0])
+    ax.set_ylabel(names[1])
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告、图片和每个样本所属类的 CSV 文件
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片和 CSV 文件的保存目录，默认与 Word 文档相同
+    :return: 图片和 CSV 文件的路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    csv_path = os.path.join(plot_dir, f"{stem}_clusters.csv")
+    result.assignments.to_csv(csv_path, index=False, encoding="utf-8-sig")
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_heading(texts['parameters_heading'], 1)
+    doc.add_paragraph(f"eps = {result.eps:.4g} ({texts['eps_mode'][result.eps_mode]}), "
+                      f"min_samples = {result.min_samples}")
+    doc.add_paragraph(f"Clusters = {result.n_clusters}, Noise = {result.noise}, "
+                      f"Silhouette = {result.silhouette:.4f}")
+    doc.add_heading(texts['comparison_heading'], 2)
+    add_dataframe_table(doc, result.comparison.round(4))
+    doc.add_heading(texts['summary_heading'], 2)
+    add_dataframe_table(doc, result.summary.round(4))
+    doc.add_paragraph(texts['assignments_note'].format(os.path.basename(csv_path)))
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_paths = [plot_k_distance(result, os.path.join(plot_dir, f"{stem}_k_distance.png"), language)]
+    names = list(result.summary.columns[3:])
+    if len(names) >= 2:
+        img_paths.append(plot_clustering(result, names,
+                                         os.path.join(plot_dir, f"{stem}_density_clustering_scatter.png"), language))
+    for img_path in img_paths:
+        doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return img_paths + [csv_path]
+
+
 class DensityBasedClusteringAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -93,43 +245,17 @@ class DensityBasedClusteringAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def density_clustering(self, data, eps=0.5, min_samples=5):
-        """
-        进行密度聚类分析
-        :param data: 输入数据
-        :param eps: 邻域的最大距离
-        :param min_samples: 形成核心点所需的最小样本数
-        :return: 聚类标签
-        """
-        model = DBSCAN(eps=eps, min_samples=min_samples)
-        labels = model.fit_predict(data)
-        return labels, model
-
-    def plot_clustering(self, data, labels, save_path):
+    def read_params(self):
         """
-        绘制聚类散点图
-        :param data: 输入数据
-        :param labels: 聚类标签
-        :param save_path: 图片保存路径
+        读取 eps、min_samples 和标准化选项
+        :return: 传给 analyze 的参数
         """
-        plt.figure(figsize=(10, 5))
-        unique_labels = set(labels)
-        colors = [plt.cm.Spectral(each) for each in np.linspace(0, 1, len(unique_labels))]
-        for k, col in zip(unique_labels, colors):
-            if k == -1:
-                # 噪声点用黑色表示
-                col = [0, 0, 0, 1]
-            class_member_mask = (labels == k)
-            xy = data[class_member_mask]
-            plt.plot(xy[:, 0], xy[:, 1], 'o', markerfacecolor=tuple(col),
-                     markeredgecolor='k', markersize=6)
-        plt.title('密度聚类散点图' if self.current_language == 'zh' else 'Density-Based Clustering Scatter Plot')
-        plt.xlabel('特征1' if self.current_language == 'zh' else 'Feature 1')
-        plt.ylabel('特征2' if self.current_language == 'zh' else 'Feature 2')
-        img_path = os.path.splitext(save_path)[0] + '_density_clustering_scatter.png'
-        plt.savefig(img_path)
-        plt.close()
-        return img_path
+        eps = self.eps_entry.get().strip()
+        eps = float(eps) if eps else None
+        min_samples = int(self.min_samples_entry.get())
+        if (eps is not None and not eps > 0) or min_samples < 1:
+            raise ValueError
+        return {'eps': eps, 'min_samples': min_samples, 'scale': self.scale_var.get()}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -140,101 +266,27 @@ class DensityBasedClusteringAnalysisApp:
             self.result_label.config(text=languages[self.current_language]['file_not_found'])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            original_data = df.values  # 使用新变量存储原始数据
-
-            # 进行密度聚类分析
-            labels, model = self.density_clustering(original_data)
-
-            # 计算轮廓系数
-            try:
-                silhouette_avg = silhouette_score(original_data, labels)
-            except ValueError:
-                silhouette_avg = "无法计算（可能只有一个聚类或所有样本为噪声点）"
-
-            # 整理数据
-            result_data = [
-                ["聚类结果", labels.tolist(), ""],
-                ["轮廓系数", silhouette_avg, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(result_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["聚类结果", "聚类散点图", "轮廓系数"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["聚类结果", "聚类散点图", "轮廓系数"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                document = Document()
-
-                # 添加标题
-                document.add_heading('密度聚类分析结果', 0)
-
-                # 添加分析结果表格
-                table = document.add_table(rows=1, cols=len(df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(df.columns):
-                    hdr_cells[col_idx].text = header
-                for _, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                document.add_heading('解释说明', level=1)
-                table = document.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for _, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                document.add_heading('结果解读', level=1)
-                table = document.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for _, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成聚类散点图
-                img_path = None
-                if original_data.shape[1] >= 2:
-                    img_path = self.plot_clustering(original_data, labels, save_path)
-                    if img_path:
-                        document.add_heading('聚类散点图', level=1)
-                        document.add_picture(img_path)
-
-                # 保存 Word 文档
-                document.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                if img_path is None:
-                    result_msg += "数据维度小于2，无法绘制散点图。"
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=languages[self.current_language]['invalid_params'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = languages[self.current_language]['analysis_success'].format(save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -242,6 +294,10 @@ class DensityBasedClusteringAnalysisApp:
         self.select_button.config(text=languages[self.current_language]['select_button'])
         self.analyze_button.config(text=languages[self.current_language]['analyze_button'])
         self.switch_language_label.config(text=languages[self.current_language]['switch_language'])
+        self.eps_label.config(text=languages[self.current_language]['eps_label'])
+        self.min_samples_label.config(text=languages[self.current_language]['min_samples_label'])
+        self.scale_check.config(text=languages[self.current_language]['scale_check'])
+        self.job_panel.set_language(self.current_language)
         # 切换语言时更新提示信息
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, languages[self.current_language]['file_entry_placeholder'])
@@ -254,7 +310,7 @@ class DensityBasedClusteringAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 460
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -280,11 +336,34 @@ class DensityBasedClusteringAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建 eps 和 min_samples 输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.eps_label = ttk.Label(params_frame, text=languages[self.current_language]['eps_label'])
+        self.eps_label.grid(row=0, column=0, sticky='e', pady=2)
+        self.eps_entry = ttk.Entry(params_frame, width=8)
+        self.eps_entry.grid(row=0, column=1, sticky='w', padx=4, pady=2)
+        self.min_samples_label = ttk.Label(params_frame, text=languages[self.current_language]['min_samples_label'])
+        self.min_samples_label.grid(row=1, column=0, sticky='e', pady=2)
+        self.min_samples_entry = ttk.Entry(params_frame, width=8)
+        self.min_samples_entry.insert(0, str(DENSITY_MIN_SAMPLES))
+        self.min_samples_entry.grid(row=1, column=1, sticky='w', padx=4, pady=2)
+
+        # 创建标准化复选框
+        self.scale_var = tk.BooleanVar(value=True)
+        self.scale_check = ttk.Checkbutton(frame, text=languages[self.current_language]['scale_check'],
+                                           variable=self.scale_var)
+        self.scale_check.pack(pady=5)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -307,4 +386,4 @@ def run_app():
 
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    run_app()
@@ -1,17 +1,23 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import numpy as np
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import openpyxl
-import statistics
-from scipy import stats
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias 计算层
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.descriptive import STAT_NAMES, descriptive_statistics, descriptive_statistics_stream
+from dias.dataset import iter_numeric_batches
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -28,6 +34,7 @@ languages = {
         "analysis_error": "分析文件时出错: {}",
         "images_saved": "图片已保存到 {}",
         "switch_language": "切换语言",
+        "exact_quantiles": "精确分位数和众数（再读取一次数据）",
         "file_entry_placeholder": "请输入待分析 Excel 文件的完整路径",
         "explanation": {
             "Mean": "均值是数据集中所有数值的平均值，反映了数据的集中趋势。",
@@ -54,6 +61,7 @@ languages = {
         "analysis_error": "An error occurred while analyzing the file: {}",
         "images_saved": "Images have been saved to {}",
         "switch_language": "Switch Language",
+        "exact_quantiles": "Exact quantiles and mode (reads the data twice)",
         "file_entry_placeholder": "Please enter the full path of the Excel file to be analyzed",
         "explanation": {
             "Mean": "The mean is the average of all values in the dataset, reflecting the central tendency of the data.",
@@ -73,6 +81,123 @@ languages = {
 }
 
 
+def analyze(df, exact=False):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :param exact: 是否精确计算分位数和众数
+    :return: DescriptiveResult
+    """
+    return descriptive_statistics(df, exact=exact)
+
+
+def analyze_path(file_path, exact=False):
+    """
+    以只读模式流式读取工作簿并计算，内存占用与行数无关
+    :param file_path: 工作簿路径
+    :param exact: 是否再读取一次数据，精确计算分位数和众数
+    :return: DescriptiveResult
+    """
+    return descriptive_statistics_stream(iter_numeric_batches(file_path),
+                                         iter_numeric_batches(file_path) if exact else None)
+
+
+def plot_column(column, img_path):
+    """
+    绘制单列的频度分布图、直方图、箱线图和散点图
+    精确模式下使用完整数据；流式模式下直方图由 t-digest 质心加权得到，箱线图使用草图分位数，散点图使用随机样本
+    """
+    col_name = column.name
+    fig = new_figure(figsize=(10, 8))
+    axes = fig.subplots(2, 2)
+    if column.values is not None:
+        values, weights = column.values, None
+        x, sample = np.arange(len(column.values)), column.values
+    else:
+        values, weights = column.digest.means, column.digest.weights
+        x, sample = column.sample.positions, column.sample.values
+    value_range = (column.digest.min, column.digest.max)
+
+    # 频度分布图
+    axes[0, 0].hist(values, bins=20, range=value_range, weights=weights, edgecolor='k')
+    axes[0, 0].set_title(f'Frequency Distribution - {col_name}')
+    axes[0, 0].set_xlabel('Value')
+    axes[0, 0].set_ylabel('Frequency')
+
+    # 直方图
+    axes[0, 1].hist(values, bins=20, range=value_range, weights=weights, density=True, edgecolor='k')
+    axes[0, 1].set_title(f'Histogram - {col_name}')
+    axes[0, 1].set_xlabel('Value')
+    axes[0, 1].set_ylabel('Density')
+
+    # 箱线图
+    if column.values is not None:
+        axes[1, 0].boxplot(column.values)
+    else:
+        q1, median, q3 = column.digest.quantile([0.25, 0.5, 0.75])
+        low = max(column.digest.min, q1 - 1.5 * (q3 - q1))
+        high = min(column.digest.max, q3 + 1.5 * (q3 - q1))
+        fliers = sample[(sample < low) | (sample > high)]
+        axes[1, 0].bxp([{'med': median, 'q1': q1, 'q3': q3, 'whislo': low, 'whishi': high, 'fliers': fliers}])
+    axes[1, 0].set_title(f'Box Plot - {col_name}')
+    axes[1, 0].set_ylabel('Value')
+
+    # 散点图（这里简单用索引作为 x 轴）
+    axes[1, 1].scatter(x, sample)
+    axes[1, 1].set_title(f'Scatter Plot - {col_name}')
+    axes[1, 1].set_xlabel('Index')
+    axes[1, 1].set_ylabel('Value')
+
+    fig.tight_layout()
+    fig.savefig(img_path)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    df = result.stats.reset_index()
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([languages[language]['explanation']])
+    explanation_df = explanation_df.reindex(columns=STAT_NAMES)
+    explanation_df.insert(0, "Column Name", "解释说明" if language == 'zh' else "Explanation")
+
+    # 合并数据和解释说明
+    combined_df = pd.concat([df, explanation_df], ignore_index=True)
+
+    # 转置数据框
+    transposed_df = combined_df.set_index('Column Name').T.reset_index().rename(
+        columns={'index': 'Column Name'})
+
+    # 创建一个新的 Word 文档
+    doc = new_document()
+
+    # 添加表格数据到 Word 文档
+    add_dataframe_table(doc, transposed_df)
+
+    # 图片默认保存在 Word 文档所在目录
+    save_dir = plot_dir or os.path.dirname(save_path)
+    img_paths = []
+    for column in result.columns:
+        img_path = os.path.join(save_dir, f"{column.name}_charts.png")
+        plot_column(column, img_path)
+        img_paths.append(img_path)
+
+        # 将图片插入到 Word 文档中
+        doc.add_heading(f'Charts for {column.name}', level=2)
+        doc.add_picture(img_path, width=Inches(6))
+
+    # 保存 Word 文档
+    doc.save(save_path)
+    return img_paths
+
+
 class DescriptiveStatisticsApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -113,149 +238,26 @@ class DescriptiveStatisticsApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]['file_not_found'])
             return
-        try:
-            # 打开 Excel 文件
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active
-
-            rows = sheet.max_row
-            columns = sheet.max_column
-
-            data = []
-            columns_stats = ["Mean", "Median", "Standard Deviation", "Minimum", "Maximum", "Range",
-                             "First Quartile (Q1)", "Third Quartile (Q3)", "Interquartile Range (IQR)",
-                             "Kurtosis", "Skewness", "Mode"]
-            explanations = languages[self.current_language]['explanation']
-
-            for col_idx in range(1, columns + 1):
-                column_values = []
-                for row_idx in range(2, rows + 1):
-                    cell_value = sheet.cell(row=row_idx, column=col_idx).value
-                    if isinstance(cell_value, (int, float)):
-                        column_values.append(cell_value)
-
-                if column_values:
-                    col_name = sheet.cell(row=1, column=col_idx).value
-                    mean_val = statistics.mean(column_values)
-                    median_val = statistics.median(column_values)
-                    try:
-                        stdev_val = statistics.stdev(column_values)
-                    except statistics.StatisticsError:
-                        stdev_val = 0
-                    min_val = min(column_values)
-                    max_val = max(column_values)
-                    range_val = max_val - min_val
-                    q1 = np.percentile(column_values, 25)
-                    q3 = np.percentile(column_values, 75)
-                    iqr = q3 - q1
-                    kurtosis_val = stats.kurtosis(column_values)
-                    skewness_val = stats.skew(column_values)
-                    try:
-                        mode_val = statistics.mode(column_values)
-                    except statistics.StatisticsError:
-                        mode_val = None
-
-                    values = [mean_val, median_val, stdev_val, min_val, max_val, range_val,
-                              q1, q3, iqr, kurtosis_val, skewness_val, mode_val]
-                    data.append([col_name] + values)
-
-            headers = ["Column Name"] + columns_stats
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Column Name", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Column Name').T.reset_index().rename(
-                columns={'index': 'Column Name'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加表格数据到 Word 文档
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx in range(transposed_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(transposed_df.iloc[row_idx]):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                for col_idx in range(1, columns + 1):
-                    column_values = []
-                    for row_idx in range(2, rows + 1):
-                        cell_value = sheet.cell(row=row_idx, column=col_idx).value
-                        if isinstance(cell_value, (int, float)):
-                            column_values.append(cell_value)
-
-                    if column_values:
-                        col_name = sheet.cell(row=1, column=col_idx).value
-
-                        # 生成图表
-                        fig, axes = plt.subplots(2, 2, figsize=(10, 8))
-
-                        # 频度分布图
-                        axes[0, 0].hist(column_values, bins=20, edgecolor='k')
-                        axes[0, 0].set_title(f'Frequency Distribution - {col_name}')
-                        axes[0, 0].set_xlabel('Value')
-                        axes[0, 0].set_ylabel('Frequency')
-
-                        # 直方图
-                        axes[0, 1].hist(column_values, bins=20, density=True, edgecolor='k')
-                        axes[0, 1].set_title(f'Histogram - {col_name}')
-                        axes[0, 1].set_xlabel('Value')
-                        axes[0, 1].set_ylabel('Density')
-
-                        # 箱线图
-                        axes[1, 0].boxplot(column_values)
-                        axes[1, 0].set_title(f'Box Plot - {col_name}')
-                        axes[1, 0].set_ylabel('Value')
-
-                        # 散点图（这里简单用索引作为 x 轴）
-                        x = np.arange(len(column_values))
-                        axes[1, 1].scatter(x, column_values)
-                        axes[1, 1].set_title(f'Scatter Plot - {col_name}')
-                        axes[1, 1].set_xlabel('Index')
-                        axes[1, 1].set_ylabel('Value')
-
-                        plt.tight_layout()
-
-                        # 生成图片保存路径
-                        img_name = f"{col_name}_charts.png"
-                        img_path = os.path.join(save_dir, img_name)
-
-                        # 保存图片
-                        plt.savefig(img_path)
-                        plt.close()
-
-                        # 将图片插入到 Word 文档中
-                        doc.add_heading(f'Charts for {col_name}', level=2)
-                        doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                result_msg += languages[self.current_language]['images_saved'].format(save_dir)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        # 以只读模式流式读取 Excel 文件
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze_path, write_report, load=None, params={'exact': self.exact_var.get()},
+                             controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        result_msg = languages[self.current_language]['analysis_success'].format(save_path)
+        result_msg += languages[self.current_language]['images_saved'].format(os.path.dirname(save_path))
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -263,10 +265,12 @@ class DescriptiveStatisticsApp:
         self.select_button.config(text=languages[self.current_language]['select_button'])
         self.analyze_button.config(text=languages[self.current_language]['analyze_button'])
         self.switch_language_label.config(text=languages[self.current_language]['switch_language'])
+        self.exact_check.config(text=languages[self.current_language]['exact_quantiles'])
         # 切换语言时更新提示信息
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, languages[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -275,7 +279,7 @@ class DescriptiveStatisticsApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 400
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -301,11 +305,21 @@ class DescriptiveStatisticsApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建精确计算选项，勾选后再读取一次数据计算精确的分位数和众数
+        self.exact_var = tk.BooleanVar(value=False)
+        self.exact_check = ttk.Checkbutton(frame, text=languages[self.current_language]["exact_quantiles"],
+                                           variable=self.exact_var)
+        self.exact_check.pack(pady=5)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
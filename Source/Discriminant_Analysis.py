@@ -2,16 +2,22 @@ import tkinter as tk
 from tkinter import filedialog
 import os
 import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import pathlib
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
-from sklearn.metrics import classification_report, confusion_matrix
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multivariate import discriminant_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -24,6 +30,7 @@ languages = {
         "analyze_button": "分析文件",
         "file_not_found": "文件不存在，请重新选择。",
         "analysis_success": "分析完成，结果已保存到 {}\n",
+        "images_saved": "结果图片已保存到 {}",
         "no_save_path": "未选择保存路径，结果未保存。",
         "analysis_error": "分析文件时出错: {}",
         "switch_language": "切换语言",
@@ -44,6 +51,7 @@ languages = {
         "analyze_button": "Analyze File",
         "file_not_found": "The file does not exist. Please select again.",
         "analysis_success": "Analysis completed. The results have been saved to {}\n",
+        "images_saved": "The result image has been saved to {}",
         "no_save_path": "No save path selected. The results were not saved.",
         "analysis_error": "An error occurred while analyzing the file: {}",
         "switch_language": "Switch Language",
@@ -61,6 +69,74 @@ languages = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为类别变量，其余列为特征变量
+    :return: DiscriminantResult
+    """
+    return discriminant_analysis(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    document = new_document()
+    document.add_heading('判别分析结果报告', 0)
+    document.add_heading('分类报告', level=1)
+    add_dataframe_table(document, result.report, index=True)
+    document.add_heading('混淆矩阵', level=1)
+    add_dataframe_table(document, result.confusion, index=True)
+    document.add_heading('解释说明', level=1)
+    add_dataframe_table(document, explanation_df)
+    document.add_heading('结果解读', level=1)
+    add_dataframe_table(document, interpretation_df)
+
+    # 生成结果图片（混淆矩阵可视化）
+    cm = result.confusion.to_numpy()
+    plot_path = os.path.join(plot_dir, f"{stem}_confusion_matrix.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    image = ax.imshow(cm, interpolation='nearest', cmap='Blues')
+    ax.set_title('判别分析混淆矩阵' if language == 'zh' else 'Confusion Matrix of Discriminant Analysis')
+    fig.colorbar(image, ax=ax)
+    tick_marks = np.arange(len(result.classes))
+    ax.set_xticks(tick_marks, result.classes, rotation=45)
+    ax.set_yticks(tick_marks, result.classes)
+    thresh = cm.max() / 2.
+    for i in range(cm.shape[0]):
+        for j in range(cm.shape[1]):
+            ax.text(j, i, format(cm[i, j], 'd'), horizontalalignment="center",
+                    color="white" if cm[i, j] > thresh else "black")
+    ax.set_ylabel('真实类别' if language == 'zh' else 'True label')
+    ax.set_xlabel('预测类别' if language == 'zh' else 'Predicted label')
+    fig.tight_layout()
+    fig.savefig(plot_path)
+    document.add_heading('混淆矩阵可视化', level=1)
+    document.add_picture(plot_path, width=Inches(6))
+
+    document.save(save_path)
+    return [plot_path]
+
+
 class DiscriminantAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -96,142 +172,29 @@ class DiscriminantAnalysisApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=languages[self.current_language]['file_not_found'])
+            self.result_label.config(text=languages[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是类别变量，其余列是特征变量
-            X = df.iloc[:, :-1]
-            y = df.iloc[:, -1]
-
-            # 进行判别分析
-            lda = LinearDiscriminantAnalysis()
-            lda.fit(X, y)
-            y_pred = lda.predict(X)
-
-            # 生成分类报告
-            report = classification_report(y, y_pred, output_dict=True)
-            report_df = pd.DataFrame(report).transpose()
-
-            # 生成混淆矩阵
-            cm = confusion_matrix(y, y_pred)
-            cm_df = pd.DataFrame(cm, index=lda.classes_, columns=lda.classes_)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["判别分析" if self.current_language == 'zh' else "Discriminant Analysis"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "准确率" if self.current_language == 'zh' else "Accuracy",
-                "精确率" if self.current_language == 'zh' else "Precision",
-                "召回率" if self.current_language == 'zh' else "Recall",
-                "F1值" if self.current_language == 'zh' else "F1-score"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                document = Document()
-
-                # 添加标题
-                document.add_heading('判别分析结果报告', 0)
-
-                # 添加分类报告表格
-                document.add_heading('分类报告', level=1)
-                table = document.add_table(rows=1, cols=len(report_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col, key in enumerate(report_df.columns):
-                    hdr_cells[col].text = key
-                for index, row in report_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 添加混淆矩阵表格
-                document.add_heading('混淆矩阵', level=1)
-                table = document.add_table(rows=1, cols=len(cm_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col, key in enumerate(cm_df.columns):
-                    hdr_cells[col].text = key
-                for index, row in cm_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 添加解释说明表格
-                document.add_heading('解释说明', level=1)
-                table = document.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col, key in enumerate(explanation_df.columns):
-                    hdr_cells[col].text = key
-                for index, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 添加结果解读表格
-                document.add_heading('结果解读', level=1)
-                table = document.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col, key in enumerate(interpretation_df.columns):
-                    hdr_cells[col].text = key
-                for index, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row):
-                        row_cells[col].text = str(value)
-
-                # 生成结果图片（混淆矩阵可视化）
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = os.path.splitext(save_path)[0] + '_confusion_matrix.png'
-                plt.figure()
-                plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-                plt.title('判别分析混淆矩阵' if self.current_language == 'zh' else 'Confusion Matrix of Discriminant Analysis')
-                plt.colorbar()
-                tick_marks = np.arange(len(lda.classes_))
-                plt.xticks(tick_marks, lda.classes_, rotation=45)
-                plt.yticks(tick_marks, lda.classes_)
-
-                thresh = cm.max() / 2.
-                for i in range(cm.shape[0]):
-                    for j in range(cm.shape[1]):
-                        plt.text(j, i, format(cm[i, j], 'd'),
-                                 horizontalalignment="center",
-                                 color="white" if cm[i, j] > thresh else "black")
-
-                plt.tight_layout()
-                plt.ylabel('真实类别' if self.current_language == 'zh' else 'True label')
-                plt.xlabel('预测类别' if self.current_language == 'zh' else 'Predicted label')
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                document.add_heading('混淆矩阵可视化', level=1)
-                document.add_picture(plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                document.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                result_msg += f"\n结果图片已保存到 {plot_path}" if self.current_language == 'zh' else f"\nThe result image has been saved to {plot_path}"
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = languages[self.current_language]['analysis_success'].format(save_path)
+        result_msg += languages[self.current_language]['images_saved'].format(paths[0])
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -243,6 +206,7 @@ class DiscriminantAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, languages[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -251,7 +215,7 @@ class DiscriminantAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -282,6 +246,10 @@ class DiscriminantAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -1,17 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import efficacy_coefficient
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -70,6 +75,76 @@ LANGUAGES = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，四行依次为各指标实际值、不允许值、满意值和权重
+    :return: EfficacyResult
+    """
+    return efficacy_coefficient(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    efficacy_coefficients = result.coefficients
+
+    # 整理数据
+    data = [
+        ["各指标实际值", result.actual.tolist(), ""],
+        ["各指标不允许值", result.unacceptable.tolist(), ""],
+        ["各指标满意值", result.satisfactory.tolist(), ""],
+        ["功效系数向量", efficacy_coefficients.tolist(), ""],
+        ["综合功效系数", [result.composite], ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('功效系数分析结果', 0)
+    add_table(doc, data, headers=headers)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成功效系数向量柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_efficacy_coefficient.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(range(len(efficacy_coefficients)), efficacy_coefficients)
+    ax.set_title('功效系数向量柱状图' if language == 'zh' else 'Bar Chart of Efficacy Coefficient Vector')
+    ax.set_xlabel('指标' if language == 'zh' else 'Indicators')
+    ax.set_ylabel('功效系数' if language == 'zh' else 'Efficacy Coefficient')
+    fig.savefig(img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class EfficacyCoefficientAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -102,118 +177,31 @@ class EfficacyCoefficientAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def efficacy_coefficient_analysis(self, actual_values, unacceptable_values, satisfactory_values, weights):
-        """
-        进行功效系数分析
-        :param actual_values: 各指标实际值
-        :param unacceptable_values: 各指标不允许值
-        :param satisfactory_values: 各指标满意值
-        :param weights: 各指标权重
-        :return: 功效系数向量和综合功效系数
-        """
-        efficacy_coefficients = (actual_values - unacceptable_values) / (satisfactory_values - unacceptable_values) * 40 + 60
-        comprehensive_efficacy_coefficient = np.dot(efficacy_coefficients, weights)
-        return efficacy_coefficients, comprehensive_efficacy_coefficient
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 假设第一行为各指标实际值，第二行为各指标不允许值，第三行为各指标满意值，第四行为各指标权重
-            actual_values = data[0]
-            unacceptable_values = data[1]
-            satisfactory_values = data[2]
-            weights = data[3]
-
-            # 进行功效系数分析
-            efficacy_coefficients, comprehensive_efficacy_coefficient = self.efficacy_coefficient_analysis(actual_values,
-                                                                                                          unacceptable_values,
-                                                                                                          satisfactory_values,
-                                                                                                          weights)
-
-            # 整理数据
-            data = [
-                ["各指标实际值", actual_values.tolist(), ""],
-                ["各指标不允许值", unacceptable_values.tolist(), ""],
-                ["各指标满意值", satisfactory_values.tolist(), ""],
-                ["功效系数向量", efficacy_coefficients.tolist(), ""],
-                ["综合功效系数", [comprehensive_efficacy_coefficient], ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["各指标实际值", "各指标不允许值", "各指标满意值", "功效系数向量", "综合功效系数"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["各指标实际值", "各指标不允许值", "各指标满意值", "功效系数向量", "综合功效系数"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('功效系数分析结果', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-
-                # 添加数据行
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成功效系数向量柱状图
-                fig, ax = plt.subplots()
-                ax.bar(range(len(efficacy_coefficients)), efficacy_coefficients)
-                ax.set_title(
-                    '功效系数向量柱状图' if self.current_language == 'zh' else 'Bar Chart of Efficacy Coefficient Vector')
-                ax.set_xlabel('指标' if self.current_language == 'zh' else 'Indicators')
-                ax.set_ylabel('功效系数' if self.current_language == 'zh' else 'Efficacy Coefficient')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_efficacy_coefficient.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -225,6 +213,7 @@ class EfficacyCoefficientAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -233,7 +222,7 @@ class EfficacyCoefficientAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -264,6 +253,10 @@ class EfficacyCoefficientAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -1,17 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.forecasting import exponential_smoothing
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -67,6 +72,75 @@ LANGUAGES = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的原始数据
+    :return: SmoothingResult
+    """
+    return exponential_smoothing(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data_list = [
+        ["原始数据", result.data.tolist(), ""],
+        ["一次指数平滑值", result.smoothed.tolist(), ""],
+        ["预测值", result.predictions.tolist(), ""]
+    ]
+    df = pd.DataFrame(data_list, columns=["统计量", "统计量值", "p值"])
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('指数平滑法分析结果', 0)
+    add_dataframe_table(doc, df)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成预测结果折线图
+    img_path = os.path.join(plot_dir, f"{stem}_prediction_chart.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.plot(range(len(result.data)), result.data, label='原始数据' if language == 'zh' else 'Original Data')
+    ax.plot(range(len(result.predictions)), result.predictions,
+            label='预测值' if language == 'zh' else 'Predicted Values', linestyle='--')
+    ax.set_title('预测结果折线图' if language == 'zh' else 'Line Chart of Prediction Results')
+    ax.set_xlabel('时间步' if language == 'zh' else 'Time Step')
+    ax.set_ylabel('值' if language == 'zh' else 'Value')
+    ax.legend()
+    fig.savefig(img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class ExponentialSmoothingMethodAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -119,99 +193,25 @@ class ExponentialSmoothingMethodAnalysisApp:
             self.result_text.delete(1.0, tk.END)
             self.result_text.insert(tk.END, LANGUAGES[self.current_language]['file_not_found'])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values.flatten()
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行指数平滑分析，平滑系数取 0.3
-            alpha = 0.3
-            smoothed_values = self.exponential_smoothing(data, alpha)
-            # 预测值为最后一个平滑值
-            pred_values = smoothed_values + [smoothed_values[-1]]
-
-            # 整理数据
-            data_list = [
-                ["原始数据", data.tolist(), ""],
-                ["一次指数平滑值", smoothed_values, ""],
-                ["预测值", pred_values, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data_list, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["原始数据", "一次指数平滑值", "预测值", "预测结果折线图"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["原始数据", "一次指数平滑值", "预测值", "预测结果折线图"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('指数平滑法分析结果', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, cell_data in enumerate(row):
-                        row_cells[col_idx].text = str(cell_data)
-
-                # 生成预测结果折线图
-                plt.figure()
-                plt.plot(range(len(data)), data, label='原始数据' if self.current_language == 'zh' else 'Original Data')
-                plt.plot(range(len(pred_values)), pred_values,
-                         label='预测值' if self.current_language == 'zh' else 'Predicted Values', linestyle='--')
-                plt.title('预测结果折线图' if self.current_language == 'zh' else 'Line Chart of Prediction Results')
-                plt.xlabel('时间步' if self.current_language == 'zh' else 'Time Step')
-                plt.ylabel('值' if self.current_language == 'zh' else 'Value')
-                plt.legend()
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_prediction_chart.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_text.delete(1.0, tk.END)
-                self.result_text.insert(tk.END, result_msg)
-
-            else:
-                self.result_text.delete(1.0, tk.END)
-                self.result_text.insert(tk.END, LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
             self.result_text.delete(1.0, tk.END)
-            self.result_text.insert(tk.END, LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+            self.result_text.insert(tk.END, LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_text.delete(1.0, tk.END)
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, LANGUAGES[self.current_language]['analysis_success'].format(save_path))
+
+    def on_analysis_error(self, e):
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -223,6 +223,7 @@ class ExponentialSmoothingMethodAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -231,7 +232,7 @@ class ExponentialSmoothingMethodAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -262,6 +263,10 @@ class ExponentialSmoothingMethodAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
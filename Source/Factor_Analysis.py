@@ -1,20 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from factor_analyzer import FactorAnalyzer
-from factor_analyzer.factor_analyzer import calculate_bartlett_sphericity
-from factor_analyzer.factor_analyzer import calculate_kmo
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multivariate import factor_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -77,6 +79,89 @@ LANGUAGES = {
     }
 }
 
+# 报告中解释说明和结果解读表格的列顺序
+EXPLANATION_COLUMNS = ["因子载荷矩阵", "共同度", "特征值和方差贡献率", "Bartlett球形检验", "KMO检验", "碎石图"]
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列一个变量
+    :return: FactorResult
+    """
+    return factor_analysis(df)
+
+
+def plot_scree_plot(ev, img_path, language='en'):
+    """
+    绘制碎石图
+    :param ev: 特征值
+    :param img_path: 图片保存路径
+    :param language: 图中文字的语言
+    """
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(range(1, len(ev) + 1), ev, marker='o')
+    ax.set_title('碎石图' if language == 'zh' else 'Scree Plot')
+    ax.set_xlabel('因子数量' if language == 'zh' else 'Number of Factors')
+    ax.set_ylabel('特征值' if language == 'zh' else 'Eigenvalues')
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和碎石图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 解释说明和分析结果解读
+    explanation_df = pd.DataFrame([texts['explanation']]).reindex(columns=EXPLANATION_COLUMNS)
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+    interpretation_df = pd.DataFrame([texts['interpretation']]).reindex(columns=EXPLANATION_COLUMNS)
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('因子分析结果', 0)
+
+    doc.add_heading('因子载荷矩阵', 1)
+    add_dataframe_table(doc, result.loadings, index=True, index_label='变量')
+
+    doc.add_heading('共同度', 1)
+    add_table(doc, [[name, value] for name, value in result.communalities.items()], headers=['变量', '共同度'])
+
+    doc.add_heading('特征值和方差贡献率', 1)
+    add_table(doc, [[f'因子{i + 1}', ev, v]
+                    for i, (ev, v) in enumerate(zip(result.eigenvalues, result.common_eigenvalues))],
+              headers=['因子', '特征值', '方差贡献率'])
+
+    doc.add_heading('Bartlett球形检验', 1)
+    add_table(doc, [['Bartlett球形检验', result.bartlett_chi2, result.bartlett_p]], headers=['检验名称', '卡方值', 'p值'])
+
+    doc.add_heading('KMO检验', 1)
+    add_table(doc, [['KMO检验', result.kmo]], headers=['检验名称', 'KMO值'])
+
+    doc.add_heading('解释说明', 1)
+    add_dataframe_table(doc, explanation_df)
+
+    doc.add_heading('结果解读', 1)
+    add_dataframe_table(doc, interpretation_df)
+
+    img_path = plot_scree_plot(result.eigenvalues, os.path.join(plot_dir, f"{stem}_scree_plot.png"), language)
+    doc.add_heading('碎石图', 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class FactorAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -109,200 +194,30 @@ class FactorAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def factor_analysis(self, data):
-        """
-        进行因子分析
-        :param data: 输入数据
-        :return: 因子载荷矩阵、共同度、特征值、方差贡献率、Bartlett球形检验结果、KMO检验结果
-        """
-        # Bartlett球形检验
-        chi_square_value, p_value = calculate_bartlett_sphericity(data)
-
-        # KMO检验
-        kmo_all, kmo_model = calculate_kmo(data)
-
-        # 创建因子分析对象
-        fa = FactorAnalyzer()
-        fa.fit(data)
-
-        # 计算特征值和方差贡献率
-        ev, v = fa.get_eigenvalues()
-
-        # 确定因子数量
-        num_factors = sum(ev > 1)
-
-        # 重新进行因子分析
-        fa = FactorAnalyzer(n_factors=num_factors, rotation='varimax')
-        fa.fit(data)
-
-        # 获取因子载荷矩阵
-        loadings = fa.loadings_
-
-        # 获取共同度
-        communalities = fa.get_communalities()
-
-        return loadings, communalities, ev, v, (chi_square_value, p_value), kmo_model
-
-    def plot_scree_plot(self, ev, save_path):
-        """
-        绘制碎石图
-        :param ev: 特征值
-        :param save_path: 图片保存路径
-        """
-        plt.figure(figsize=(10, 5))
-        plt.plot(range(1, len(ev) + 1), ev, marker='o')
-        plt.title('碎石图' if self.current_language == 'zh' else 'Scree Plot')
-        plt.xlabel('因子数量' if self.current_language == 'zh' else 'Number of Factors')
-        plt.ylabel('特征值' if self.current_language == 'zh' else 'Eigenvalues')
-        img_path = os.path.splitext(save_path)[0] + '_scree_plot.png'
-        plt.savefig(img_path)
-        plt.close()
-        return img_path
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-            original_data = df.values
-
-            # 进行因子分析
-            loadings, communalities, ev, v, bartlett_result, kmo_result = self.factor_analysis(df)
-
-            # 整理数据
-            factor_names = [f'因子{i + 1}' for i in range(len(loadings[0]))]
-            loadings_df = pd.DataFrame(loadings, index=df.columns, columns=factor_names)
-            communalities_df = pd.DataFrame(communalities, index=df.columns, columns=['共同度'])
-            ev_df = pd.DataFrame(ev, columns=['特征值'])
-            v_df = pd.DataFrame(v, columns=['方差贡献率'])
-            bartlett_df = pd.DataFrame([bartlett_result], columns=['卡方值', 'p值'], index=['Bartlett球形检验'])
-            kmo_df = pd.DataFrame([kmo_result], columns=['KMO值'], index=['KMO检验'])
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["因子载荷矩阵", "共同度", "特征值和方差贡献率", "Bartlett球形检验", "KMO检验", "碎石图"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["因子载荷矩阵", "共同度", "特征值和方差贡献率", "Bartlett球形检验", "KMO检验", "碎石图"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 创建 Word 文档
-            doc = Document()
-
-            # 添加标题
-            doc.add_heading('因子分析结果', 0)
-
-            # 添加因子载荷矩阵
-            doc.add_heading('因子载荷矩阵', 1)
-            table = doc.add_table(rows=1, cols=len(loadings_df.columns) + 1)
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = '变量'
-            for col_idx, col_name in enumerate(loadings_df.columns):
-                hdr_cells[col_idx + 1].text = col_name
-            for row_idx, row in loadings_df.iterrows():
-                row_cells = table.add_row().cells
-                row_cells[0].text = row_idx
-                for col_idx, value in enumerate(row):
-                    row_cells[col_idx + 1].text = str(value)
-
-            # 添加共同度
-            doc.add_heading('共同度', 1)
-            table = doc.add_table(rows=1, cols=2)
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = '变量'
-            hdr_cells[1].text = '共同度'
-            for row_idx, row in communalities_df.iterrows():
-                row_cells = table.add_row().cells
-                row_cells[0].text = row_idx
-                row_cells[1].text = str(row[0])
-
-            # 添加特征值和方差贡献率
-            doc.add_heading('特征值和方差贡献率', 1)
-            table = doc.add_table(rows=1, cols=3)
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = '因子'
-            hdr_cells[1].text = '特征值'
-            hdr_cells[2].text = '方差贡献率'
-            for i in range(len(ev_df)):
-                row_cells = table.add_row().cells
-                row_cells[0].text = f'因子{i + 1}'
-                row_cells[1].text = str(ev_df.iloc[i, 0])
-                row_cells[2].text = str(v_df.iloc[i, 0])
-
-            # 添加 Bartlett 球形检验
-            doc.add_heading('Bartlett球形检验', 1)
-            table = doc.add_table(rows=1, cols=3)
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = '检验名称'
-            hdr_cells[1].text = '卡方值'
-            hdr_cells[2].text = 'p值'
-            row_cells = table.add_row().cells
-            row_cells[0].text = 'Bartlett球形检验'
-            row_cells[1].text = str(bartlett_df.iloc[0, 0])
-            row_cells[2].text = str(bartlett_df.iloc[0, 1])
-
-            # 添加 KMO 检验
-            doc.add_heading('KMO检验', 1)
-            table = doc.add_table(rows=1, cols=2)
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = '检验名称'
-            hdr_cells[1].text = 'KMO值'
-            row_cells = table.add_row().cells
-            row_cells[0].text = 'KMO检验'
-            row_cells[1].text = str(kmo_df.iloc[0, 0])
-
-            # 添加解释说明
-            doc.add_heading('解释说明', 1)
-            table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-            hdr_cells = table.rows[0].cells
-            for col_idx, col_name in enumerate(explanation_df.columns):
-                hdr_cells[col_idx].text = col_name
-            for row_idx, row in explanation_df.iterrows():
-                row_cells = table.add_row().cells
-                for col_idx, value in enumerate(row):
-                    row_cells[col_idx].text = str(value)
-
-            # 添加分析结果解读
-            doc.add_heading('结果解读', 1)
-            table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-            hdr_cells = table.rows[0].cells
-            for col_idx, col_name in enumerate(interpretation_df.columns):
-                hdr_cells[col_idx].text = col_name
-            for row_idx, row in interpretation_df.iterrows():
-                row_cells = table.add_row().cells
-                for col_idx, value in enumerate(row):
-                    row_cells[col_idx].text = str(value)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 生成碎石图
-                img_path = self.plot_scree_plot(ev, save_path)
-
-                # 添加碎石图到 Word 文档
-                doc.add_heading('碎石图', 1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path), wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -314,6 +229,7 @@ class FactorAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -322,7 +238,7 @@ class FactorAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -353,6 +269,10 @@ class FactorAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
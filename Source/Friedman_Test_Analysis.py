@@ -1,16 +1,18 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
-import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
-from docx.shared import Pt
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import friedman_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.report import add_dataframe_table, add_table, new_document
 
 # 定义语言字典
 LANGUAGES = {
@@ -61,6 +63,56 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列为一种处理，每行为一个区组
+    :return: FriedmanResult
+    """
+    return friedman_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，本分析不生成图片
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+
+    # 整理数据
+    data = [
+        ["Friedman检验", result.statistic, result.p_value],
+        ["样本量", result.summary["N"].to_dict(), ""],
+        ["中位数", result.summary["Median"].to_dict(), ""]
+    ]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df = explanation_df.reindex(columns=["Friedman检验", "样本量", "中位数"])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df = interpretation_df.reindex(columns=["统计量", "p值", "样本量", "中位数"])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('Friedman检验分析结果', 0)
+    add_table(doc, data, headers=["统计量", "统计量值", "p值"])
+
+    doc.add_heading('统计量解释说明', level=1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('统计量结果解读', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    doc.save(save_path)
+    return []
+
+
 class FriedmanTestApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -98,106 +150,26 @@ class FriedmanTestApp:
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行Friedman检验。")
-
-            # 进行Friedman检验
-            stat, p_value = stats.friedmanchisquare(*numerical_df.T.values)
-
-            # 计算样本量和中位数
-            sample_sizes = numerical_df.count()
-            medians = numerical_df.median()
-
-            # 整理数据
-            data = [
-                ["Friedman检验", stat, p_value],
-                ["样本量", sample_sizes.to_dict(), ""],
-                ["中位数", medians.to_dict(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["Friedman检验", "样本量", "中位数"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["统计量", "p值", "样本量", "中位数"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('Friedman检验分析结果', 0)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                    hdr_cells[i].paragraphs[0].runs[0].font.size = Pt(10)
-
-                for _, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-                        row_cells[i].paragraphs[0].runs[0].font.size = Pt(10)
-
-                # 添加解释说明表格
-                doc.add_heading('统计量解释说明', level=1)
-                exp_table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                exp_hdr_cells = exp_table.rows[0].cells
-                for i, col in enumerate(explanation_df.columns):
-                    exp_hdr_cells[i].text = col
-                    exp_hdr_cells[i].paragraphs[0].runs[0].font.size = Pt(10)
-
-                for _, row in explanation_df.iterrows():
-                    exp_row_cells = exp_table.add_row().cells
-                    for i, value in enumerate(row):
-                        exp_row_cells[i].text = str(value)
-                        exp_row_cells[i].paragraphs[0].runs[0].font.size = Pt(10)
-
-                # 添加结果解读表格
-                doc.add_heading('统计量结果解读', level=1)
-                int_table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                int_hdr_cells = int_table.rows[0].cells
-                for i, col in enumerate(interpretation_df.columns):
-                    int_hdr_cells[i].text = col
-                    int_hdr_cells[i].paragraphs[0].runs[0].font.size = Pt(10)
-
-                for _, row in interpretation_df.iterrows():
-                    int_row_cells = int_table.add_row().cells
-                    for i, value in enumerate(row):
-                        int_row_cells[i].text = str(value)
-                        int_row_cells[i].paragraphs[0].runs[0].font.size = Pt(10)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -209,6 +181,7 @@ class FriedmanTestApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -217,7 +190,7 @@ class FriedmanTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -248,6 +221,10 @@ class FriedmanTestApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
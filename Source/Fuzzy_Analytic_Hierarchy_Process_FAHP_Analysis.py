@@ -1,17 +1,21 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.weighting import fuzzy_ahp
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -66,10 +70,75 @@ LANGUAGES = {
     }
 }
 
-# 随机一致性指标 RI 表
-RI_TABLE = {
-    1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45
-}
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的模糊判断矩阵
+    :return: AhpResult
+    """
+    return fuzzy_ahp(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    fuzzy_eigenvector = result.weights
+
+    # 整理数据
+    data = [
+        ["模糊特征向量", fuzzy_eigenvector.tolist(), ""],
+        ["一致性指标 CI", result.ci, ""],
+        ["随机一致性指标 RI", result.ri, ""],
+        ["一致性比率 CR", result.cr, ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    doc = new_document()
+    doc.add_heading('FAHP 分析结果', 0)
+    add_table(doc, data, headers=headers)
+
+    # 添加解释说明
+    doc.add_heading('解释说明', level=1)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加结果解读
+    doc.add_heading('结果解读', level=1)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 生成模糊特征向量柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_fuzzy_eigenvector.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(range(len(fuzzy_eigenvector)), fuzzy_eigenvector)
+    ax.set_title('模糊特征向量柱状图' if language == 'zh' else 'Bar Chart of Fuzzy Eigenvector')
+    ax.set_xlabel('因素' if language == 'zh' else 'Factors')
+    ax.set_ylabel('权重' if language == 'zh' else 'Weights')
+    fig.savefig(img_path)
+    doc.add_heading('模糊特征向量柱状图', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
 
 class FuzzyAnalyticHierarchyProcessFAHPApp:
     def __init__(self, root=None):
@@ -105,117 +174,31 @@ class FuzzyAnalyticHierarchyProcessFAHPApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
             self.file_entry.configure(style="Gray.TEntry")
 
-    def fahp_analysis(self, data):
-        """
-        进行模糊层次分析法 FAHP 分析
-        :param data: 模糊判断矩阵数据
-        :return: 模糊特征向量、一致性指标 CI、一致性比率 CR
-        """
-        # 计算模糊特征向量
-        row_sums = np.sum(data, axis=1)
-        fuzzy_eigenvector = row_sums / np.sum(row_sums)
-
-        # 计算模糊判断矩阵的最大特征值
-        weighted_sum = np.dot(data, fuzzy_eigenvector)
-        max_eigenvalue = np.sum(weighted_sum / (fuzzy_eigenvector * len(data)))
-
-        # 计算一致性指标 CI
-        n = data.shape[0]
-        CI = (max_eigenvalue - n) / (n - 1)
-
-        # 计算随机一致性指标 RI
-        RI = RI_TABLE.get(n, None)
-        if RI is None:
-            raise ValueError("判断矩阵阶数超出支持范围")
-
-        # 计算一致性比率 CR
-        CR = CI / RI
-
-        return fuzzy_eigenvector, CI, RI, CR
-
     def analyze_file(self):
         file_path = self.file_entry.get()
-        if file_path == LANGUAGES[self.current_language]['file_entry_placeholder']:
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行 FAHP 分析
-            fuzzy_eigenvector, CI, RI, CR = self.fahp_analysis(data)
-
-            # 整理数据
-            data = [
-                ["模糊特征向量", fuzzy_eigenvector.tolist(), ""],
-                ["一致性指标 CI", CI, ""],
-                ["随机一致性指标 RI", RI, ""],
-                ["一致性比率 CR", CR, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('FAHP 分析结果', 0)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for col, header in enumerate(headers):
-                    hdr_cells[col].text = header
-                for row_data in data:
-                    row_cells = table.add_row().cells
-                    for col, value in enumerate(row_data):
-                        row_cells[col].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading('解释说明', level=1)
-                for key, value in explanations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 添加结果解读
-                doc.add_heading('结果解读', level=1)
-                for key, value in interpretations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 生成模糊特征向量柱状图
-                fig, ax = plt.subplots()
-                ax.bar(range(len(fuzzy_eigenvector)), fuzzy_eigenvector)
-                ax.set_title('模糊特征向量柱状图' if self.current_language == 'zh' else 'Bar Chart of Fuzzy Eigenvector')
-                ax.set_xlabel('因素' if self.current_language == 'zh' else 'Factors')
-                ax.set_ylabel('权重' if self.current_language == 'zh' else 'Weights')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_fuzzy_eigenvector.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_heading('模糊特征向量柱状图', level=1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -227,6 +210,7 @@ class FuzzyAnalyticHierarchyProcessFAHPApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.configure(style="Gray.TEntry")
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -235,7 +219,7 @@ class FuzzyAnalyticHierarchyProcessFAHPApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -265,6 +249,10 @@ class FuzzyAnalyticHierarchyProcessFAHPApp:
                                          bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(self.root, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建语言切换标签
         self.switch_language_label = ttk.Label(self.root, text=LANGUAGES[self.current_language]['switch_language'], cursor="hand2")
         self.switch_language_label.pack(pady=10)
@@ -1,16 +1,20 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-from statsmodels.sandbox.regression.gmm import GMM
-from docx import Document
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import gmm_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
@@ -20,6 +24,11 @@ plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 LANGUAGES = {
     "zh": {
         "title": "GMM估计分析",
+        "report_title": "GMM 估计分析结果",
+        "target_note": "因变量：{}。以自变量和常数项作为自身的工具变量，采用两步有效权重矩阵。",
+        "statistics_heading": "模型统计量",
+        "coefficients_heading": "GMM 估计结果",
+        "plot_heading": "参数估计值柱状图",
         "select_button_text": "选择文件",
         "file_entry_placeholder": "请输入待分析 Excel 文件的完整路径",
         "analyze_button_text": "分析文件",
@@ -28,11 +37,15 @@ LANGUAGES = {
         "analysis_error": "分析文件时出错: {}",
         "analysis_complete": "分析完成，结果已保存到 {}，相关图片已保存。",
         "no_save_path_selected": "未选择保存路径，结果未保存。",
-        "columns_stats": ["参数", "估计值", "标准误差"],
         "switch_language_button_text": "切换语言"
     },
     "en": {
         "title": "GMM Estimation Analysis",
+        "report_title": "GMM Estimation Analysis Results",
+        "target_note": "Dependent variable: {}. The regressors and the constant serve as their own instruments, with the two-step efficient weight matrix.",
+        "statistics_heading": "Model Statistics",
+        "coefficients_heading": "GMM Estimates",
+        "plot_heading": "Parameter Estimates",
         "select_button_text": "Select File",
         "file_entry_placeholder": "Please enter the full path of the Excel file to be analyzed",
         "analyze_button_text": "Analyze File",
@@ -41,12 +54,66 @@ LANGUAGES = {
         "analysis_error": "An error occurred while analyzing the file: {}",
         "analysis_complete": "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         "no_save_path_selected": "No save path selected. The results were not saved.",
-        "columns_stats": ["Parameter", "Estimated Value", "Standard Error"],
         "switch_language_button_text": "Switch Language"
     }
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量，其余列为自变量
+    :return: RegressionResult
+    """
+    return gmm_regression(df)
+
+
+def plot_estimates(coefficients, path, language):
+    """
+    参数估计值柱状图
+    :param coefficients: RegressionResult 的系数表
+    :param path: 图片保存路径
+    :param language: 图中文字的语言
+    """
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(coefficients[""].astype(str), coefficients["coef"])
+    ax.set_title("GMM 参数估计值" if language == "zh" else "GMM Parameter Estimates")
+    ax.set_xlabel("参数" if language == "zh" else "Parameters")
+    ax.set_ylabel("估计值" if language == "zh" else "Estimated Values")
+    fig.savefig(path)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['target_note'].format(result.target))
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+
+    img_path = os.path.join(plot_dir, f"{stem}_gmm_plot.png")
+    plot_estimates(result.coefficients, img_path, language)
+    doc.add_heading(texts['plot_heading'], 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class GMMEstimationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -79,53 +146,6 @@ class GMMEstimationAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    # 定义 GMM 模型的矩条件函数
-    def moment_condition(self, params, exog, endog):
-        beta = params
-        error = endog - np.dot(exog, beta)
-        moments = exog * error[:, np.newaxis]
-        return moments
-
-    # 计算 GMM 估计的函数
-    def calculate_gmm(self, X, y):
-        nobs = X.shape[0]
-        nvar = X.shape[1]
-
-        # 创建 GMM 模型实例
-        model = GMM(y, X, None, self.moment_condition)
-
-        # 初始参数猜测
-        beta0 = np.zeros(nvar)
-
-        # 进行 GMM 估计
-        result = model.fit(beta0, maxiter=100, optim_method='nm', wargs=dict(centered=False))
-
-        # 提取估计结果
-        params = result.params
-        std_errors = result.bse
-
-        # 创建结果 DataFrame
-        gmm_data = pd.DataFrame({
-            LANGUAGES[self.current_language]["columns_stats"][0]: [f"beta_{i}" for i in range(nvar)],
-            LANGUAGES[self.current_language]["columns_stats"][1]: params,
-            LANGUAGES[self.current_language]["columns_stats"][2]: std_errors
-        })
-
-        # 绘制参数估计值的柱状图
-        plt.figure()
-        plt.bar(gmm_data[LANGUAGES[self.current_language]["columns_stats"][0]],
-                gmm_data[LANGUAGES[self.current_language]["columns_stats"][1]])
-        plt.title("GMM 参数估计值" if self.current_language == "zh" else "GMM Parameter Estimates")
-        plt.xlabel("参数" if self.current_language == "zh" else "Parameters")
-        plt.ylabel("估计值" if self.current_language == "zh" else "Estimated Values")
-
-        # 保存图片
-        image_path = os.path.splitext(self.file_entry.get())[0] + '_gmm_plot.png'
-        plt.savefig(image_path)
-        plt.close()
-
-        return gmm_data
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
@@ -134,58 +154,24 @@ class GMMEstimationAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=LANGUAGES[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            y = df.iloc[:, -1].values
-            X = df.iloc[:, :-1].values
-
-            # 计算 GMM 估计
-            gmm_data = self.calculate_gmm(X, y)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('GMM 估计分析结果', 0)
-
-                # 添加表格标题
-                doc.add_heading('GMM 估计结果', level=1)
-
-                # 创建表格
-                table = doc.add_table(rows=1, cols=len(gmm_data.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(gmm_data.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                # 填充表格数据
-                for _, row in gmm_data.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加图片
-                image_path = os.path.splitext(self.file_entry.get())[0] + '_gmm_plot.png'
-                if os.path.exists(image_path):
-                    doc.add_heading('参数估计值柱状图', level=1)
-                    doc.add_picture(image_path)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=LANGUAGES[self.current_language]["analysis_complete"].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = "en" if self.current_language == "zh" else "zh"
@@ -198,6 +184,7 @@ class GMMEstimationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -206,7 +193,7 @@ class GMMEstimationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -237,6 +224,10 @@ class GMMEstimationAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=LANGUAGES[self.current_language]["switch_language_button_text"],
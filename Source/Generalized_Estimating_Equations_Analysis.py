@@ -1,20 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-import statsmodels.api as sm
-from statsmodels.genmod.families import Poisson
-from statsmodels.genmod.cov_struct import Exchangeable
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import gee_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -62,6 +64,71 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 第一列为聚类标识，最后一列为因变量，其余列为自变量
+    :return: GeeResult
+    """
+    return gee_analysis(df)
+
+
+def plot_coefficients(coefficients, img_path, language='en'):
+    """
+    回归系数条形图（不含常数项）
+    """
+    fig = new_figure()
+    ax = fig.subplots()
+    slopes = coefficients[coefficients[""] != "const"]
+    ax.bar(slopes[""], slopes["coef"])
+    ax.set_xlabel('自变量' if language == 'zh' else 'Independent Variables')
+    ax.set_ylabel('回归系数' if language == 'zh' else 'Regression Coefficients')
+    ax.set_title('广义估计方程回归系数' if language == 'zh'
+                 else 'Generalized Estimating Equations Regression Coefficients')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和回归系数图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 解释说明和分析结果解读，每个条目一列
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('分析结果', level=1)
+    add_dataframe_table(doc, result.coefficients.round(4))
+
+    doc.add_heading('解释说明', level=1)
+    add_dataframe_table(doc, explanation_df)
+
+    doc.add_heading('结果解读', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    img_path = plot_coefficients(result.coefficients,
+                                 os.path.join(plot_dir, f"{stem}_gee_regression_coefficients.png"), language)
+    doc.add_heading('回归系数可视化', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class GeneralizedEstimatingEquationsAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -98,115 +165,28 @@ class GeneralizedEstimatingEquationsAnalysisApp:
 
     def analyze_file(self):
         file_path = self.file_entry.get()
-        if file_path == LANGUAGES[self.current_language]['file_entry_placeholder']:
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设第一列是聚类标识，最后一列是因变量，其余列是自变量
-            cluster_id = df.iloc[:, 0]
-            y = df.iloc[:, -1]
-            X = df.iloc[:, 1:-1]
-            X = sm.add_constant(X)
-
-            # 进行广义估计方程分析
-            fam = Poisson()
-            ind = Exchangeable()
-            model = sm.GEE(y, X, groups=cluster_id, cov_struct=ind, family=fam)
-            result = model.fit()
-
-            # 提取结果
-            summary = result.summary()
-            summary_df = pd.DataFrame(summary.tables[1].data[1:], columns=summary.tables[1].data[0])
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["广义估计方程" if self.current_language == 'zh' else "Generalized Estimating Equations"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "回归系数" if self.current_language == 'zh' else "Regression Coefficient",
-                "标准误" if self.current_language == 'zh' else "Standard Error",
-                "p值" if self.current_language == 'zh' else "p-value"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                doc.add_heading('分析结果', level=1)
-                table = doc.add_table(rows=1, cols=len(summary_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(summary_df.columns):
-                    hdr_cells[i].text = col
-                for _, row in summary_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('解释说明', level=1)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(explanation_df.columns):
-                    hdr_cells[i].text = col
-                for _, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('结果解读', level=1)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(interpretation_df.columns):
-                    hdr_cells[i].text = col
-                for _, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成结果图片（回归系数可视化）
-                plot_path = os.path.splitext(save_path)[0] + '_gee_regression_coefficients.png'
-                plt.figure()
-                coefs = result.params[1:]
-                variables = X.columns[1:]
-                plt.bar(variables, coefs)
-                plt.xlabel('自变量' if self.current_language == 'zh' else 'Independent Variables')
-                plt.ylabel('回归系数' if self.current_language == 'zh' else 'Regression Coefficients')
-                plt.title(
-                    '广义估计方程回归系数' if self.current_language == 'zh' else 'Generalized Estimating Equations Regression Coefficients')
-                plt.xticks(rotation=45)
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_heading('回归系数可视化', level=1)
-                doc.add_picture(plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path), wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -218,6 +198,7 @@ class GeneralizedEstimatingEquationsAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.configure(style="Gray.TEntry")
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -226,7 +207,7 @@ class GeneralizedEstimatingEquationsAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -258,6 +239,10 @@ class GeneralizedEstimatingEquationsAnalysisApp:
                                          bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(self.root, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建语言切换标签
         self.switch_language_label = ttk.Label(self.root, text=LANGUAGES[self.current_language]['switch_language'],
                                                cursor="hand2")
@@ -1,16 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.forecasting import grey_prediction
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -66,6 +72,78 @@ LANGUAGES = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的原始数据
+    :return: GreyPredictionResult
+    """
+    return grey_prediction(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data_list = [
+        ["原始数据", result.data.tolist(), ""],
+        ["累加生成序列", result.accumulated.tolist(), ""],
+        ["预测值", result.predictions.tolist(), ""]
+    ]
+    df = pd.DataFrame(data_list, columns=["统计量", "统计量值", "p值"])
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('分析数据', level=1)
+    add_dataframe_table(doc, df)
+    doc.add_heading('解释说明', level=1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成预测结果折线图
+    img_path = os.path.join(plot_dir, f"{stem}_prediction_chart.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.plot(range(len(result.data)), result.data, label='原始数据' if language == 'zh' else 'Original Data')
+    ax.plot(range(len(result.predictions)), result.predictions,
+            label='预测值' if language == 'zh' else 'Predicted Values', linestyle='--')
+    ax.set_title('预测结果折线图' if language == 'zh' else 'Line Chart of Prediction Results')
+    ax.set_xlabel('时间步' if language == 'zh' else 'Time Step')
+    ax.set_ylabel('值' if language == 'zh' else 'Value')
+    ax.legend()
+    fig.savefig(img_path)
+    doc.add_heading('预测结果折线图', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class GrayPredictionModelAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -100,136 +178,31 @@ class GrayPredictionModelAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
             self.file_entry.configure(style="Gray.TEntry")
 
-    def gm11(self, x0, n_pred):
-        """
-        GM(1,1) 灰色预测模型
-        :param x0: 原始数据序列
-        :param n_pred: 预测步数
-        :return: 预测值序列
-        """
-        x1 = np.cumsum(x0)
-        z1 = (x1[:-1] + x1[1:]) / 2
-        B = np.vstack([-z1, np.ones_like(z1)]).T
-        Y = x0[1:].reshape(-1, 1)
-        # 最小二乘法求解参数
-        a, b = np.linalg.lstsq(B, Y, rcond=None)[0].flatten()
-        # 预测累加序列
-        x1_pred = [(x0[0] - b / a) * np.exp(-a * k) + b / a for k in range(len(x0) + n_pred)]
-        # 还原为原始序列
-        x0_pred = [x1_pred[0]] + [x1_pred[k] - x1_pred[k - 1] for k in range(1, len(x1_pred))]
-        return x0_pred
-
     def analyze_file(self):
         file_path = self.file_entry.get()
-        if file_path == LANGUAGES[self.current_language]['file_entry_placeholder']:
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values.flatten()
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行灰色预测分析，预测未来 5 步
-            n_pred = 5
-            pred_values = self.gm11(data, n_pred)
-
-            # 整理数据
-            data_list = [
-                ["原始数据", data.tolist(), ""],
-                ["累加生成序列", np.cumsum(data).tolist(), ""],
-                ["预测值", pred_values, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data_list, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["原始数据", "累加生成序列", "预测值", "预测结果折线图"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["原始数据", "累加生成序列", "预测值", "预测结果折线图"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格数据
-                doc.add_heading('分析数据', level=1)
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for index, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading('解释说明', level=1)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(explanation_df.columns):
-                    hdr_cells[i].text = header
-                for index, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加分析结果解读
-                doc.add_heading('结果解读', level=1)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(interpretation_df.columns):
-                    hdr_cells[i].text = header
-                for index, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成预测结果折线图
-                plt.figure()
-                plt.plot(range(len(data)), data, label='原始数据' if self.current_language == 'zh' else 'Original Data')
-                plt.plot(range(len(pred_values)), pred_values, label='预测值' if self.current_language == 'zh' else 'Predicted Values',
-                         linestyle='--')
-                plt.title('预测结果折线图' if self.current_language == 'zh' else 'Line Chart of Prediction Results')
-                plt.xlabel('时间步' if self.current_language == 'zh' else 'Time Step')
-                plt.ylabel('值' if self.current_language == 'zh' else 'Value')
-                plt.legend()
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_prediction_chart.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_heading('预测结果折线图', level=1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -241,6 +214,7 @@ class GrayPredictionModelAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.configure(style="Gray.TEntry")
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -249,7 +223,7 @@ class GrayPredictionModelAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -281,6 +255,10 @@ class GrayPredictionModelAnalysisApp:
                                          bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(self.root, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建语言切换标签
         self.switch_language_label = ttk.Label(self.root, text=LANGUAGES[self.current_language]['switch_language'],
                                                cursor="hand2")
@@ -1,17 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import grey_relational
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -70,6 +75,78 @@ LANGUAGES = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df, rho=0.5):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，第一行为参考序列，其余行为比较序列
+    :param rho: 分辨系数
+    :return: GreyRelationalResult
+    """
+    return grey_relational(df, rho)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    relational_degree = result.degrees
+
+    # 整理数据
+    data = [
+        ["参考序列", result.reference.tolist(), ""],
+        ["比较序列", result.comparison.tolist(), ""],
+        ["关联系数矩阵", result.coefficients.tolist(), ""],
+        ["关联度", relational_degree.tolist(), ""],
+        ["关联度排序结果", result.ranking.tolist(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('灰色关联分析结果', 0)
+    add_table(doc, data, headers=headers)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成关联度柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_relational_degree.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(range(len(relational_degree)), relational_degree)
+    ax.set_title('关联度柱状图' if language == 'zh' else 'Bar Chart of Relational Degree')
+    ax.set_xlabel('比较序列编号' if language == 'zh' else 'Comparison Sequence Number')
+    ax.set_ylabel('关联度' if language == 'zh' else 'Relational Degree')
+    fig.savefig(img_path)
+    doc.add_heading('关联度柱状图', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class GreyRelationalAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -104,136 +181,31 @@ class GreyRelationalAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
             self.file_entry.configure(style="Gray.TEntry")
 
-    def grey_relational_analysis(self, reference_sequence, comparison_sequences):
-        """
-        实现灰色关联分析法
-        :param reference_sequence: 参考序列
-        :param comparison_sequences: 比较序列
-        :return: 关联系数矩阵, 关联度, 关联度排序结果
-        """
-        # 数据预处理，这里采用初值化处理
-        reference_sequence = reference_sequence / reference_sequence[0]
-        comparison_sequences = comparison_sequences / comparison_sequences[:, 0].reshape(-1, 1)
-
-        # 计算差序列
-        diff_matrix = np.abs(comparison_sequences - reference_sequence)
-
-        # 计算两级最小差和两级最大差
-        min_min_diff = np.min(np.min(diff_matrix))
-        max_max_diff = np.max(np.max(diff_matrix))
-
-        # 分辨系数
-        rho = 0.5
-
-        # 计算关联系数矩阵
-        relational_coefficient_matrix = (min_min_diff + rho * max_max_diff) / (diff_matrix + rho * max_max_diff)
-
-        # 计算关联度
-        relational_degree = np.mean(relational_coefficient_matrix, axis=1)
-
-        # 对关联度进行排序
-        ranking = np.argsort(-relational_degree) + 1
-
-        return relational_coefficient_matrix, relational_degree, ranking
-
     def analyze_file(self):
         file_path = self.file_entry.get()
-        if file_path == LANGUAGES[self.current_language]['file_entry_placeholder']:
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
             file_path = ""
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 假设第一行为参考序列，其余行为比较序列
-            reference_sequence = data[0]
-            comparison_sequences = data[1:]
-
-            # 进行灰色关联分析
-            relational_coefficient_matrix, relational_degree, ranking = self.grey_relational_analysis(reference_sequence,
-                                                                                                      comparison_sequences)
-
-            # 整理数据
-            data = [
-                ["参考序列", reference_sequence.tolist(), ""],
-                ["比较序列", comparison_sequences.tolist(), ""],
-                ["关联系数矩阵", relational_coefficient_matrix.tolist(), ""],
-                ["关联度", relational_degree.tolist(), ""],
-                ["关联度排序结果", ranking.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["参考序列", "比较序列", "关联系数矩阵", "关联度", "关联度排序结果"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["参考序列", "比较序列", "关联系数矩阵", "关联度", "关联度排序结果"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                document = Document()
-
-                # 添加标题
-                document.add_heading('灰色关联分析结果', 0)
-
-                # 添加分析结果表格
-                table = document.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-
-                for row in combined_df.values.tolist():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成关联度柱状图
-                fig, ax = plt.subplots()
-                ax.bar(range(len(relational_degree)), relational_degree)
-                ax.set_title(
-                    '关联度柱状图' if self.current_language == 'zh' else 'Bar Chart of Relational Degree')
-                ax.set_xlabel('比较序列编号' if self.current_language == 'zh' else 'Comparison Sequence Number')
-                ax.set_ylabel('关联度' if self.current_language == 'zh' else 'Relational Degree')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_relational_degree.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                document.add_heading('关联度柱状图', level=1)
-                document.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                document.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -245,6 +217,7 @@ class GreyRelationalAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.configure(style="Gray.TEntry")
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -253,7 +226,7 @@ class GreyRelationalAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -285,6 +258,10 @@ class GreyRelationalAnalysisApp:
                                          bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(self.root, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建语言切换标签
         self.switch_language_label = ttk.Label(self.root, text=LANGUAGES[self.current_language]['switch_language'],
                                                cursor="hand2")
@@ -1,22 +1,29 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
 from scipy.cluster import hierarchy
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.clustering import N_CLUSTERS, WARD_MODES, hierarchical_clustering
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
 
+# 树状图只画最上面几层，最多显示的叶子数
+DENDROGRAM_LEAVES = 30
+
 # 定义语言字典
 LANGUAGES = {
     'zh': {
@@ -29,6 +36,17 @@ LANGUAGES = {
         'analysis_error': "分析文件时出错: {}",
         'switch_language': "切换语言",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
+        'n_clusters_label': "聚类数量：",
+        'mode_label': "计算方式：",
+        'invalid_n_clusters': "聚类数量须为正整数。",
+        'report_title': "分层聚类分析结果",
+        'mode_note': {
+            "Exact": "在全部 {} 个样本上进行 Ward 聚类。",
+            "Micro-clusters": "样本先用 MiniBatchKMeans 预聚为 {} 个微簇，再以样本数为权重在微簇中心上进行 Ward 聚类。"
+        },
+        'assignments_note': "每个样本所属的类已保存到 {}。",
+        'dendrogram_title': "聚类树状图（最上面 {} 个分支，括号内为样本数）",
+        'dendrogram_ylabel': "距离",
         'explanation': {
             "聚类结果": "每个样本所属的聚类类别",
             "聚类树状图": "展示样本之间的层次聚类关系"
@@ -48,6 +66,17 @@ LANGUAGES = {
         'analysis_error': "An error occurred while analyzing the file: {}",
         'switch_language': "Switch Language",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
+        'n_clusters_label': "Number of clusters: ",
+        'mode_label': "Method: ",
+        'invalid_n_clusters': "The number of clusters must be a positive integer.",
+        'report_title': "Hierarchical Clustering Analysis Results",
+        'mode_note': {
+            "Exact": "Ward clustering on all {} samples.",
+            "Micro-clusters": "Samples were first grouped into {} micro-clusters with MiniBatchKMeans. Ward clustering was then run on the micro-cluster centroids, weighted by their sizes."
+        },
+        'assignments_note': "The cluster of every sample has been saved to {}.",
+        'dendrogram_title': "Dendrogram (top {} branches, sample counts in brackets)",
+        'dendrogram_ylabel': "Distance",
         'explanation': {
             "聚类结果": "The cluster label to which each sample belongs",
             "聚类树状图": "Show the hierarchical clustering relationship between samples"
@@ -59,6 +88,86 @@ LANGUAGES = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df, n_clusters=N_CLUSTERS, mode="Auto"):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据
+    :param n_clusters: 聚类的数量
+    :param mode: 计算方式，WARD_MODES 之一
+    :return: HierarchicalResult
+    """
+    return hierarchical_clustering(df, n_clusters=n_clusters, mode=mode)
+
+
+def plot_dendrogram(result, img_path, language='en'):
+    """
+    绘制截断的聚类树状图，只显示最上面 DENDROGRAM_LEAVES 个分支
+    """
+    texts = LANGUAGES[language]
+    Z = result.linkage
+    n_clusters = len(result.summary)
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    hierarchy.dendrogram(Z, truncate_mode='lastp', p=DENDROGRAM_LEAVES, ax=ax,
+                         color_threshold=Z[-(n_clusters - 1), 2] if n_clusters > 1 else 0,
+                         leaf_label_func=lambda node: f"({int(result.node_sizes[node])})", leaf_rotation=90)
+    ax.set_title(texts['dendrogram_title'].format(min(DENDROGRAM_LEAVES, result.leaves)))
+    ax.set_ylabel(texts['dendrogram_ylabel'])
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告、树状图和每个样本所属类的 CSV 文件
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片和 CSV 文件的保存目录，默认与 Word 文档相同
+    :return: 图片和 CSV 文件的路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 样本较多时 Word 表格过大，每个样本所属的类单独保存
+    csv_path = os.path.join(plot_dir, f"{stem}_clusters.csv")
+    result.assignments.to_csv(csv_path, index=False, encoding="utf-8-sig")
+
+    document = new_document()
+    document.add_heading(texts['report_title'], 0)
+    document.add_paragraph(texts['mode_note'][result.mode].format(
+        len(result.assignments) if result.mode == "Exact" else result.leaves))
+    add_dataframe_table(document, result.summary.round(4))
+    document.add_paragraph(texts['assignments_note'].format(os.path.basename(csv_path)))
+
+    # 添加解释说明
+    document.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    for key, value in texts['explanation'].items():
+        document.add_paragraph(f"{key}: {value}")
+
+    # 添加结果解读
+    document.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    for key, value in texts['interpretation'].items():
+        document.add_paragraph(f"{key}: {value}")
+
+    img_path = plot_dendrogram(result, os.path.join(plot_dir, f"{stem}_hierarchical_clustering_dendrogram.png"),
+                               language)
+    document.add_picture(img_path, width=Inches(6))
+
+    document.save(save_path)
+    return [img_path, csv_path]
+
+
 class HierarchicalClusteringAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -91,19 +200,6 @@ class HierarchicalClusteringAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def hierarchical_clustering(self, data, n_clusters=3):
-        """
-        进行分层聚类分析
-        :param data: 输入数据
-        :param n_clusters: 聚类的数量
-        :return: 聚类标签，聚类树状图的链接矩阵
-        """
-        # 计算距离矩阵
-        y = hierarchy.linkage(data, method='ward')
-        # 切割聚类树以得到指定数量的聚类
-        labels = hierarchy.fcluster(y, n_clusters, criterion='maxclust')
-        return labels, y
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
@@ -113,80 +209,31 @@ class HierarchicalClusteringAnalysisApp:
             self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行分层聚类分析
-            labels, linkage_matrix = self.hierarchical_clustering(data)
-
-            # 整理数据
-            data = [
-                ["聚类结果", labels.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["聚类结果", "聚类树状图"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["聚类结果", "聚类树状图"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                document = Document()
-
-                # 添加标题
-                document.add_heading('分层聚类分析结果', 0)
-
-                # 添加表格
-                table = document.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-
-                for _, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成聚类树状图
-                plt.figure(figsize=(10, 5))
-                hierarchy.dendrogram(linkage_matrix, labels=range(data.shape[0]))
-                plt.title('聚类树状图' if self.current_language == 'zh' else 'Hierarchical Clustering Dendrogram')
-                plt.xlabel('样本编号' if self.current_language == 'zh' else 'Sample Index')
-                plt.ylabel('距离' if self.current_language == 'zh' else 'Distance')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_hierarchical_clustering_dendrogram.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                document.add_picture(img_path, width=Inches(6))
-
-                # 保存文档
-                document.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+            n_clusters = int(self.n_clusters_entry.get())
+            if n_clusters < 1:
+                raise ValueError
+        except ValueError:
+            self.result_label.config(text=LANGUAGES[self.current_language]['invalid_n_clusters'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data,
+                             params={'n_clusters': n_clusters, 'mode': self.mode_var.get()},
+                             controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -194,6 +241,9 @@ class HierarchicalClusteringAnalysisApp:
         self.select_button.config(text=LANGUAGES[self.current_language]['select_button'])
         self.analyze_button.config(text=LANGUAGES[self.current_language]['analyze_button'])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]['switch_language'])
+        self.n_clusters_label.config(text=LANGUAGES[self.current_language]['n_clusters_label'])
+        self.mode_label.config(text=LANGUAGES[self.current_language]['mode_label'])
+        self.job_panel.set_language(self.current_language)
         # 切换语言时更新提示信息
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
@@ -206,7 +256,7 @@ class HierarchicalClusteringAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 420
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -232,11 +282,30 @@ class HierarchicalClusteringAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建聚类数量输入框和计算方式下拉框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.n_clusters_label = ttk.Label(params_frame, text=LANGUAGES[self.current_language]['n_clusters_label'])
+        self.n_clusters_label.grid(row=0, column=0, sticky='e', pady=2)
+        self.n_clusters_entry = ttk.Entry(params_frame, width=6)
+        self.n_clusters_entry.insert(0, str(N_CLUSTERS))
+        self.n_clusters_entry.grid(row=0, column=1, sticky='w', padx=2, pady=2)
+        self.mode_label = ttk.Label(params_frame, text=LANGUAGES[self.current_language]['mode_label'])
+        self.mode_label.grid(row=1, column=0, sticky='e', pady=2)
+        self.mode_var = tk.StringVar(value=WARD_MODES[0])
+        self.mode_combobox = ttk.Combobox(params_frame, textvariable=self.mode_var, values=WARD_MODES,
+                                          state='readonly', width=16)
+        self.mode_combobox.grid(row=1, column=1, sticky='w', padx=2, pady=2)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=LANGUAGES[self.current_language]['analyze_button'],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]['switch_language'],
                                                foreground="gray", cursor="hand2")
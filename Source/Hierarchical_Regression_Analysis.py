@@ -1,17 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import statsmodels.api as sm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hierarchical_regression import hierarchical_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_actual_vs_predicted
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -30,12 +34,21 @@ languages = {
         'images_saved': "图片已保存到 {}",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
+        'blocks_label': "自变量块（留空时每个自变量单独成块）：",
+        'blocks_hint': "格式：块名: 变量, 变量; 块名: 变量，块之间用分号分隔",
+        'report_title': "分层回归分析结果",
+        'steps_heading': "模型摘要",
+        'coefficients_heading': "最终模型的回归系数",
+        'coefficients_saved': "每一步模型的回归系数已保存到 {}",
+        'aliased_note': "以下变量与已进入模型的变量共线，未进入模型：{}",
         'explanation': {
             "Coefficients": "回归系数，表示每个自变量对因变量的影响程度。",
             "Intercept": "截距，是当所有自变量为 0 时因变量的预测值。",
-            "Mean Squared Error (MSE)": "均方误差，衡量预测值与真实值之间的平均误差。",
             "R-squared (R²)": "决定系数，取值范围在 0 到 1 之间，越接近 1 表示模型拟合效果越好。",
             "Adjusted R-squared": "调整决定系数，考虑了模型中自变量的数量，对模型的拟合优度进行了调整。",
+            "ΔR²": "R² 变化量，本步加入的块在已有自变量之外额外解释的因变量方差比例。",
+            "F Change": "F 变化量，检验本步加入的块带来的 R² 增加是否显著，自由度为 df1（本步进入的变量数）和 df2（本步模型的残差自由度）。",
+            "Sig. F Change": "F 变化量的 p 值，小于 0.05 时说明本步加入的块显著提高了模型的解释力。",
             "F-value": "F 统计量，用于检验整个回归模型的显著性。",
             "t-value": "t 统计量，用于检验每个自变量的显著性。",
             "p-value": "p 值，用于判断自变量的显著性，p 值越小，自变量越显著。"
@@ -53,12 +66,21 @@ languages = {
         'images_saved': "Images have been saved to {}",
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
+        'blocks_label': "Predictor blocks (blank for one block per predictor): ",
+        'blocks_hint': "Format: Name: var, var; Name: var. Separate the blocks with semicolons",
+        'report_title': "Hierarchical Regression Analysis Results",
+        'steps_heading': "Model Summary",
+        'coefficients_heading': "Coefficients of the Final Model",
+        'coefficients_saved': "The coefficients of every step have been saved to {}",
+        'aliased_note': "These variables are collinear with the variables already entered and were left out: {}",
         'explanation': {
             "Coefficients": "Regression coefficients, indicating the influence of each independent variable on the dependent variable.",
             "Intercept": "Intercept, which is the predicted value of the dependent variable when all independent variables are 0.",
-            "Mean Squared Error (MSE)": "Mean squared error, measuring the average error between the predicted and actual values.",
             "R-squared (R²)": "Coefficient of determination, ranging from 0 to 1. A value closer to 1 indicates a better fit of the model.",
             "Adjusted R-squared": "Adjusted coefficient of determination, which takes into account the number of independent variables in the model and adjusts the goodness of fit of the model.",
+            "ΔR²": "R-squared change, the share of the variance of the dependent variable that the block added in this step explains beyond the variables already entered.",
+            "F Change": "F change, testing whether the R-squared increase from the block added in this step is significant, with df1 (variables entered in this step) and df2 (residual degrees of freedom of this step's model).",
+            "Sig. F Change": "p value of the F change. A value below 0.05 means the block added in this step significantly improves the model.",
             "F-value": "F statistic, used to test the significance of the entire regression model.",
             "t-value": "t statistic, used to test the significance of each independent variable.",
             "p-value": "p value, used to determine the significance of the independent variable. The smaller the p value, the more significant the independent variable."
@@ -67,6 +89,58 @@ languages = {
 }
 
 
+def analyze(df, blocks=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量，其余列为自变量
+    :param blocks: 块的文本定义，例如 "Demographics: age, sex; Attitude: a1, a2"；None 或空时每个自变量单独成块
+    :return: HierarchicalRegressionResult
+    """
+    return hierarchical_regression(df, blocks)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告、每一步系数的 CSV 文件和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片和 CSV 文件的保存目录，默认与 Word 文档相同
+    :return: 输出文件路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 每一步的系数表可能很长，完整结果写入 CSV，报告中只列最终模型
+    csv_path = os.path.join(plot_dir, f"{stem}_coefficients.csv")
+    result.coefficients.to_csv(csv_path, index=False, encoding="utf-8-sig")
+    final_step = result.steps["Step"].iloc[-1]
+    final = result.coefficients[result.coefficients["Step"] == final_step].drop(columns="Step")
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_heading(texts['steps_heading'], 1)
+    add_dataframe_table(doc, result.steps)
+    if result.aliased:
+        doc.add_paragraph(texts['aliased_note'].format(", ".join(result.aliased)))
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, final)
+    doc.add_paragraph(texts['coefficients_saved'].format(os.path.basename(csv_path)))
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = render_actual_vs_predicted(result.actual, result.fitted,
+                                          os.path.join(plot_dir, f"{stem}_hierarchical_regression_scatter.png"))
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path, csv_path]
+
+
 class HierarchicalRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,6 +173,13 @@ class HierarchicalRegressionAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
+    def read_params(self):
+        """
+        读取块的定义
+        :return: 传给 analyze 的参数
+        """
+        return {'blocks': self.blocks_entry.get().strip() or None}
+
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -107,113 +188,27 @@ class HierarchicalRegressionAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1].values
-            y = df.iloc[:, -1].values
-
-            # 分层回归分析
-            results = []
-            for i in range(1, X.shape[1] + 1):
-                X_current = X[:, :i]
-                model = LinearRegression()
-                model.fit(X_current, y)
-                y_pred = model.predict(X_current)
-
-                # 计算指标
-                coefficients = model.coef_
-                intercept = model.intercept_
-                mse = mean_squared_error(y, y_pred)
-                r2 = r2_score(y, y_pred)
-                n = len(y)
-                p = X_current.shape[1]
-                adjusted_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
-
-                # 计算 t 值和 p 值
-                X_with_const = sm.add_constant(X_current)
-                sm_model = sm.OLS(y, X_with_const).fit()
-                t_values = sm_model.tvalues
-                p_values = sm_model.pvalues
-
-                # 计算 F 值
-                f_value = sm_model.fvalue
-
-                results.append([f"Model {i}"] + list(coefficients) + [intercept, mse, r2, adjusted_r2, f_value] + list(
-                    t_values) + list(p_values))
-
-            # 准备数据
-            columns_stats = ["Coefficients", "t-value", "p-value", "R-squared (R²)", "Adjusted R-squared", "F-value"]
-            explanations = languages[self.current_language]['explanation']
-            # 修正 headers 列表
-            headers = ["Model"] + [f"Coefficient_{i + 1}" for i in range(X.shape[1])] + ["Intercept", "MSE",
-                                                                                         "R-squared (R²)",
-                                                                                         "Adjusted R-squared", "F-value"] + [
-                          f"t-value_{i + 1}" for i in range(X.shape[1])] + [f"p-value_{i + 1}" for i in range(X.shape[1])]
-
-            df_results = pd.DataFrame(results, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df_results, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx, row in transposed_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成散点图
-                plt.figure(figsize=(10, 6))
-                plt.scatter(y, y_pred)
-                plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
-                plt.xlabel('Actual Values')
-                plt.ylabel('Predicted Values')
-                plt.title('Actual vs Predicted Values')
-                img_name = "hierarchical_regression_scatter.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                result_msg += "\n" + languages[self.current_language]['images_saved'].format(save_dir)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+        params = self.read_params()
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
+        result_msg += "\n" + languages[self.current_language]['images_saved'].format(os.path.dirname(paths[0]))
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -227,6 +222,9 @@ class HierarchicalRegressionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.blocks_label.config(text=languages[self.current_language]["blocks_label"])
+        self.blocks_hint.config(text=languages[self.current_language]["blocks_hint"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -235,7 +233,7 @@ class HierarchicalRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 420
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -261,11 +259,23 @@ class HierarchicalRegressionAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建自变量块输入框
+        self.blocks_label = ttk.Label(frame, text=languages[self.current_language]["blocks_label"])
+        self.blocks_label.pack(pady=(5, 0))
+        self.blocks_entry = ttk.Entry(frame, width=50)
+        self.blocks_entry.pack(pady=2)
+        self.blocks_hint = ttk.Label(frame, text=languages[self.current_language]["blocks_hint"], foreground="gray")
+        self.blocks_hint.pack()
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,18 +1,20 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
-import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import independent_t_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_sample_charts
+from dias.report import add_table, new_document
+
 # 定义语言字典
 LANGUAGES = {
     'zh': {
@@ -72,6 +74,61 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，两列数值数据各为一组
+    :return: LocationTestResult
+    """
+    return independent_t_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    test = result.tests.iloc[0]
+    data = [
+        ["独立样本 t 检验", test["Statistic"], test["df"], test["p-value"],
+         f"[{test['CI Lower']:.4f}, {test['CI Upper']:.4f}]"],
+        ["样本量", result.summary["N"].to_dict(), "", "", ""],
+        ["均值", result.summary["Mean"].to_dict(), "", "", ""],
+        ["标准差", result.summary["Std"].to_dict(), "", "", ""]
+    ]
+
+    doc = new_document()
+    doc.add_heading('独立样本 t 检验分析结果', 0)
+    add_table(doc, data, headers=["统计量", "t 统计量", "自由度", "p 值", "置信区间"])
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加分析结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 柱状图、误差线图、箱线图和折线图
+    plot_path = os.path.join(plot_dir, f"{stem}_charts.png")
+    render_sample_charts(result.samples, plot_path, language)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class IndependentSamplesTTestAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -104,141 +161,32 @@ class IndependentSamplesTTestAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def plot_results(self, sample1, sample2):
-        # 柱状图
-        plt.figure(figsize=(12, 8))
-        plt.subplot(2, 2, 1)
-        means = [sample1.mean(), sample2.mean()]
-        labels = ['Sample 1', 'Sample 2']
-        plt.bar(labels, means)
-        plt.title('Bar Chart')
-        plt.xlabel('Samples')
-        plt.ylabel('Mean')
-
-        # 误差线图
-        plt.subplot(2, 2, 2)
-        stds = [sample1.std(), sample2.std()]
-        plt.errorbar(labels, means, yerr=stds, fmt='o')
-        plt.title('Error Bar Chart')
-        plt.xlabel('Samples')
-        plt.ylabel('Mean')
-
-        # 箱线图
-        plt.subplot(2, 2, 3)
-        plt.boxplot([sample1, sample2])
-        plt.title('Box Plot')
-        plt.xlabel('Samples')
-        plt.ylabel('Value')
-
-        # 折线图
-        plt.subplot(2, 2, 4)
-        plt.plot(sample1, label='Sample 1')
-        plt.plot(sample2, label='Sample 2')
-        plt.title('Line Chart')
-        plt.xlabel('Index')
-        plt.ylabel('Value')
-        plt.legend()
-
-        plt.tight_layout()
-        plt.show()
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行独立样本 t 检验。")
-            if len(numerical_df.columns) != 2:
-                raise ValueError("数据必须包含两列数值数据，用于独立样本 t 检验。")
-
-            # 进行独立样本 t 检验
-            sample1 = numerical_df.iloc[:, 0]
-            sample2 = numerical_df.iloc[:, 1]
-            t_stat, p_value = stats.ttest_ind(sample1, sample2)
-            df_value = len(sample1) + len(sample2) - 2
-            mean_diff = sample1.mean() - sample2.mean()
-            std_err = stats.sem(sample1 - sample2)
-            conf_int = stats.t.interval(0.95, df_value, loc=mean_diff, scale=std_err)
-
-            # 计算样本量、均值和标准差
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-            stds = numerical_df.std()
-
-            # 整理数据
-            data = [
-                ["独立样本 t 检验", t_stat, df_value, p_value, conf_int],
-                ["样本量", sample_sizes.to_dict(), "", "", ""],
-                ["均值", means.to_dict(), "", "", ""],
-                ["标准差", stds.to_dict(), "", "", ""]
-            ]
-            headers = ["统计量", "t 统计量", "自由度", "p 值", "置信区间"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["独立样本 t 检验", "样本量", "均值", "标准差", "t 统计量", "自由度", "p 值", "置信区间"])
-            explanation_df.insert(0, "统计量_解释说明",
-                                  "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["t 统计量", "自由度", "p 值", "置信区间"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df],
-                                    ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx",
-                                                     filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-                doc.add_heading('独立样本 t 检验分析结果', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=combined_df.shape[0] + 1,
-                                      cols=combined_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-
-                for row_idx in range(combined_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(combined_df.iloc[row_idx]):
-                        row_cells[col_idx].text = str(value)
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-                # 绘制图表
-                self.plot_results(sample1, sample2)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -250,6 +198,7 @@ class IndependentSamplesTTestAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -258,7 +207,7 @@ class IndependentSamplesTTestAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -295,6 +244,10 @@ class IndependentSamplesTTestAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=LANGUAGES[self.current_language]['switch_language'],
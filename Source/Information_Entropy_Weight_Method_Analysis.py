@@ -1,17 +1,21 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.weighting import entropy_weights
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -67,6 +71,74 @@ LANGUAGES = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，行为评价对象，列为指标
+    :return: EntropyResult
+    """
+    return entropy_weights(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    weights = result.weights
+
+    # 整理数据
+    data = [
+        ["原始数据", result.data.tolist(), ""],
+        ["指标熵值", result.entropy.tolist(), ""],
+        ["指标冗余度", result.redundancy.tolist(), ""],
+        ["信息量权重", weights.tolist(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    doc = new_document()
+    add_table(doc, data, headers=headers)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加分析结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 生成信息量权重分布饼图
+    title = '信息量权重分布饼图' if language == 'zh' else 'Pie Chart of Information Entropy Weights'
+    img_path = os.path.join(plot_dir, f"{stem}_weights_pie_chart.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    labels = [f'指标{i + 1}' if language == 'zh' else f'Indicator {i + 1}' for i in range(len(weights))]
+    ax.pie(weights, labels=labels, autopct='%1.1f%%')
+    ax.set_title(title)
+    fig.savefig(img_path)
+    doc.add_heading(title, level=2)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class InformationEntropyWeightMethodAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,127 +171,32 @@ class InformationEntropyWeightMethodAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def information_entropy_weight_method(self, data):
-        """
-        实现信息量权重法
-        :param data: 原始数据矩阵
-        :return: 指标熵值, 指标冗余度, 信息量权重
-        """
-        # 数据标准化
-        standardized_data = data / data.sum(axis=0)
-
-        # 计算指标熵值
-        entropy = -np.sum(standardized_data * np.log(standardized_data + 1e-8), axis=0) / np.log(data.shape[0])
-
-        # 计算指标冗余度
-        redundancy = 1 - entropy
-
-        # 计算信息量权重
-        weights = redundancy / redundancy.sum()
-
-        return entropy, redundancy, weights
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行信息量权重法分析
-            entropy, redundancy, weights = self.information_entropy_weight_method(data)
-
-            # 整理数据
-            data = [
-                ["原始数据", data.tolist(), ""],
-                ["指标熵值", entropy.tolist(), ""],
-                ["指标冗余度", redundancy.tolist(), ""],
-                ["信息量权重", weights.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["原始数据", "指标熵值", "指标冗余度", "信息量权重"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["原始数据", "指标熵值", "指标冗余度", "信息量权重"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格数据
-                table = doc.add_table(rows=df.shape[0] + 1, cols=df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(df.shape[1]):
-                        row_cells[col_idx].text = str(df.iloc[row_idx, col_idx])
-
-                # 添加解释说明
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                for index, row in explanation_df.iterrows():
-                    for col in explanation_df.columns[1:]:
-                        doc.add_paragraph(f"{col}: {row[col]}")
-
-                # 添加分析结果解读
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                for index, row in interpretation_df.iterrows():
-                    for col in interpretation_df.columns[1:]:
-                        doc.add_paragraph(f"{col}: {row[col]}")
-
-                # 生成信息量权重分布饼图
-                fig, ax = plt.subplots()
-                labels = [f'指标{i + 1}' for i in range(len(weights))] if self.current_language == 'zh' else [
-                    f'Indicator {i + 1}' for i in range(len(weights))]
-                ax.pie(weights, labels=labels, autopct='%1.1f%%')
-                ax.set_title(
-                    '信息量权重分布饼图' if self.current_language == 'zh' else 'Pie Chart of Information Entropy Weights')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_weights_pie_chart.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_heading(
-                    "信息量权重分布饼图" if self.current_language == 'zh' else 'Pie Chart of Information Entropy Weights',
-                    level=2)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         self.current_language = 'en' if self.current_language == 'zh' else 'zh'
@@ -231,6 +208,7 @@ class InformationEntropyWeightMethodAnalysisApp:
         self.file_entry.delete(0, tk.END)
         self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
         self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -239,7 +217,7 @@ class InformationEntropyWeightMethodAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -274,6 +252,10 @@ class InformationEntropyWeightMethodAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]['switch_language'],
                                                foreground="gray", cursor="hand2")
@@ -2,12 +2,18 @@ import tkinter as tk
 from tkinter import filedialog
 import openpyxl
 import os
+import sys
 import pandas as pd
-from scipy import stats
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
-import numpy as np
+
+# 添加父目录到系统路径，以便能够导入 dias 计算层
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.base import check_cancelled
+from dias.compute.normality import normality_battery
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_normality_figures
 
 # 定义语言字典
 languages = {
@@ -43,6 +49,62 @@ languages = {
     }
 }
 
+# 本分析器运行的检验，见 dias.compute.normality.NORMALITY_TESTS
+TEST_NAME = "Jarque-Bera"
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每个含数字的列单独检验
+    :return: NormalityResult
+    """
+    return normality_battery(df, tests=[TEST_NAME])
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Excel 结果表和图片
+    :param result: analyze 返回的结果
+    :param save_path: 保存路径，扩展名替换为 .xlsx
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与结果表相同
+    :return: (结果表路径, 图片路径列表)
+    """
+    headers = ["Column Name"] + languages[language]["columns_stats"]
+    interpretations = {False: languages[language]["interpretation_accept"],
+                       True: languages[language]["interpretation_reject"], None: ""}
+    data = [[name, statistic, second, None, interpretations[reject]]
+            for name, statistic, second, reject in result.rows(TEST_NAME)]
+    df = pd.DataFrame(data, columns=headers)
+
+    # 保存 DataFrame 到 Excel 文件，后台任务已取消时不写出
+    check_cancelled()
+    xlsx_path = os.path.splitext(save_path)[0] + ".xlsx"
+    df.to_excel(xlsx_path, index=False)
+
+    # 打开保存的 Excel 文件并调整列宽
+    wb = openpyxl.load_workbook(xlsx_path)
+    ws = wb.active
+
+    for column in ws.columns:
+        max_length = 0
+        column_letter = openpyxl.utils.get_column_letter(column[0].column)
+        for cell in column:
+            if len(str(cell.value)) > max_length:
+                max_length = len(str(cell.value))
+        adjusted_width = (max_length + 2)
+        ws.column_dimensions[column_letter].width = adjusted_width
+
+    # 保存调整列宽后的 Excel 文件
+    wb.save(xlsx_path)
+
+    # 直方图、PP 图和 QQ 图，每张图片包含多列
+    img_paths = render_normality_figures(result.columns, plot_dir or os.path.dirname(xlsx_path),
+                                         os.path.splitext(os.path.basename(xlsx_path))[0])
+    return xlsx_path, img_paths
+
+
 class JarqueBeraTestApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -83,115 +145,23 @@ class JarqueBeraTestApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active
-
-            rows = sheet.max_row
-            columns = sheet.max_column
-
-            data = []
-            columns_stats = languages[self.current_language]["columns_stats"]
-
-            for col_idx in range(1, columns + 1):
-                column_values = []
-                for row_idx in range(2, rows + 1):
-                    cell_value = sheet.cell(row=row_idx, column=col_idx).value
-                    if isinstance(cell_value, (int, float)):
-                        column_values.append(cell_value)
-
-                if column_values:
-                    col_name = sheet.cell(row=1, column=col_idx).value
-                    # 进行 Jarque - Bera 检验，假设检验样本是否来自正态分布
-                    jb_statistic, p_value = stats.jarque_bera(column_values)
-
-                    # 根据 P 值进行结果解读
-                    if p_value > 0.05:
-                        interpretation = languages[self.current_language]["interpretation_accept"]
-                    else:
-                        interpretation = languages[self.current_language]["interpretation_reject"]
-
-                    values = [jb_statistic, p_value, None, interpretation]
-                    data.append([col_name] + values)
-
-                    # 绘制直方图和拟合的正态分布曲线
-                    plt.figure()
-                    n, bins, patches = plt.hist(column_values, bins=30, density=True, alpha=0.7, color='g')
-                    mu, std = stats.norm.fit(column_values)
-                    xmin, xmax = plt.xlim()
-                    x = np.linspace(xmin, xmax, 100)
-                    p = stats.norm.pdf(x, mu, std)
-                    plt.plot(x, p, 'k', linewidth=2)
-                    title = f'{col_name}: mu = {mu:.2f},  std = {std:.2f}'
-                    plt.title(title)
-                    plt.xlabel('Value')
-                    plt.ylabel('Frequency')
-
-                    # 保存图片
-                    image_path = os.path.splitext(file_path)[0] + f'_{col_name}_normal_distribution.png'
-                    plt.savefig(image_path)
-                    plt.close()
-
-                    # 手动绘制 PP 图
-                    sorted_data = np.sort(column_values)
-                    n = len(sorted_data)
-                    empirical_cdf = np.arange(1, n + 1) / n
-                    theoretical_cdf = stats.norm.cdf(sorted_data, loc=mu, scale=std)
-
-                    plt.figure()
-                    plt.plot(theoretical_cdf, empirical_cdf, 'o')
-                    plt.plot([0, 1], [0, 1], 'r--')
-                    plt.title(f'{col_name} PP Plot')
-                    plt.xlabel('Theoretical CDF')
-                    plt.ylabel('Empirical CDF')
-                    ppplot_path = os.path.splitext(file_path)[0] + f'_{col_name}_ppplot.png'
-                    plt.savefig(ppplot_path)
-                    plt.close()
-
-                    # 绘制 QQ 图
-                    plt.figure()
-                    stats.probplot(column_values, dist="norm", plot=plt)
-                    plt.title(f'{col_name} QQ Plot')
-                    qqplot_path = os.path.splitext(file_path)[0] + f'_{col_name}_qqplot.png'
-                    plt.savefig(qqplot_path)
-                    plt.close()
-
-            headers = ["Column Name"] + columns_stats
-            df = pd.DataFrame(data, columns=headers)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
-            if save_path:
-                # 保存 DataFrame 到 Excel 文件
-                df.to_excel(save_path, index=False)
-
-                # 打开保存的 Excel 文件并调整列宽
-                wb = openpyxl.load_workbook(save_path)
-                ws = wb.active
-
-                for column in ws.columns:
-                    max_length = 0
-                    column_letter = openpyxl.utils.get_column_letter(column[0].column)
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = (max_length + 2)
-                    ws.column_dimensions[column_letter].width = adjusted_width
-
-                # 保存调整列宽后的 Excel 文件
-                wb.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -207,6 +177,7 @@ class JarqueBeraTestApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -215,7 +186,7 @@ class JarqueBeraTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -246,6 +217,10 @@ class JarqueBeraTestApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -2,14 +2,21 @@ import tkinter as tk
 from tkinter import filedialog
 import tkinter.simpledialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
-import pathlib
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.kano import CATEGORY_NAMES, kano_analysis, kano_analysis_stream
+from dias.dataset import iter_numeric_batches, load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
@@ -28,6 +35,11 @@ languages = {
         'analysis_success': "分析完成，结果已保存到 {}",
         'no_save_path': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
+        'positive_prompt': "请输入正向问题的列名，用逗号分隔",
+        'negative_prompt': "请输入负向问题的列名，用逗号分隔",
+        'input_incomplete': "未输入完整的问题列名，分析取消。",
+        'better_worse_saved': "Better-Worse 象限图已保存到 {}",
+        'kano_plot_saved': "KANO 分析图已保存到 {}",
         'explanation': {
             "基本型需求（M）": "用户认为产品必须具备的功能，缺乏这些功能会导致用户不满。",
             "期望型需求（O）": "用户的满意度随该需求的满足程度而线性增加。",
@@ -60,6 +72,11 @@ languages = {
         'analysis_success': "Analysis completed. The results have been saved to {}",
         'no_save_path': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
+        'positive_prompt': "Please enter the names of the positive question columns, separated by commas",
+        'negative_prompt': "Please enter the names of the negative question columns, separated by commas",
+        'input_incomplete': "The question column names are incomplete. Analysis canceled.",
+        'better_worse_saved': "The Better-Worse quadrant plot has been saved to {}",
+        'kano_plot_saved': "The KANO plot has been saved to {}",
         'explanation': {
             "基本型需求（M）": "Basic requirements that users expect the product to have. Lack of these features will lead to user dissatisfaction.",
             "期望型需求（O）": "Expected requirements where user satisfaction increases linearly with the degree of fulfillment.",
@@ -84,6 +101,100 @@ languages = {
 }
 
 
+def analyze(df, positive_columns=None, negative_columns=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每行为一位受访者
+    :param positive_columns: 正向问题的列名，默认相邻两列为一对，前一列为正向问题
+    :param negative_columns: 对应的反向问题列名
+    :return: KanoResult
+    """
+    return kano_analysis(df, positive_columns, negative_columns)
+
+
+def analyze_path(file_path, positive_columns=None, negative_columns=None):
+    """
+    .xlsx 工作簿以只读模式流式读取，不把整个工作簿载入内存；其他格式整表读取
+    :param file_path: 工作簿路径
+    :return: KanoResult
+    """
+    if os.path.splitext(file_path)[1].lower() != '.xlsx':
+        return analyze(load_excel(file_path), positive_columns, negative_columns)
+    return kano_analysis_stream(iter_numeric_batches(file_path), positive_columns, negative_columns)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: [Better-Worse 象限图路径, KANO 分类图路径]
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    better_label, worse_label = texts['better_worse']['better'], texts['better_worse']['worse']
+
+    # 整理数据
+    headers = ["问题", "KANO分类", better_label, worse_label]
+    df_result = pd.DataFrame({
+        "问题": result.category.index,
+        "KANO分类": [CATEGORY_NAMES[code] for code in result.category],
+        better_label: result.better.to_numpy(),
+        worse_label: result.worse.to_numpy(),
+    }, columns=headers)
+
+    doc = new_document()
+    doc.add_heading('KANO模型分析结果' if language == 'zh' else 'KANO Model Analysis Results', level=1)
+    add_dataframe_table(doc, df_result)
+
+    # 添加解释说明
+    doc.add_heading('KANO分类解释说明' if language == 'zh' else 'Explanation of KANO Categories', level=1)
+    for category, explanation in texts['explanation'].items():
+        doc.add_paragraph(f'{category}: {explanation}')
+
+    # 添加分析结果解读
+    doc.add_heading('KANO分类结果解读' if language == 'zh' else 'Interpretation of KANO Categories', level=1)
+    for category, interpretation in texts['interpretation'].items():
+        doc.add_paragraph(f'{category}: {interpretation}')
+
+    # 生成 Better - Worse 象限图
+    better_worse_title = 'Better - Worse 象限图' if language == 'zh' else 'Better - Worse Quadrant Plot'
+    better_worse_path = os.path.join(plot_dir, f"{stem}_better_worse.png")
+    fig = new_figure(figsize=(10, 8))
+    ax = fig.subplots()
+    ax.scatter(result.better, result.worse)
+    for label, better, worse in zip(result.category.index, result.better, result.worse):
+        ax.annotate(label, (better, worse), textcoords="offset points", xytext=(0, 10), ha='center')
+    ax.axhline(y=0, color='k')
+    ax.axvline(x=0, color='k')
+    ax.set_xlabel(better_label)
+    ax.set_ylabel(worse_label)
+    ax.set_title(better_worse_title)
+    fig.savefig(better_worse_path)
+
+    # 生成各 KANO 分类的功能点数柱状图
+    category_counts = df_result['KANO分类'].value_counts()
+    kano_path = os.path.join(plot_dir, f"{stem}_kano.png")
+    fig = new_figure(figsize=(10, 8))
+    ax = fig.subplots()
+    ax.bar(category_counts.index, category_counts.to_numpy())
+    ax.set_xlabel('KANO分类' if language == 'zh' else 'KANO Category')
+    ax.set_ylabel('数量' if language == 'zh' else 'Count')
+    ax.set_title('KANO模型分析结果' if language == 'zh' else 'KANO Model Analysis Results')
+    fig.savefig(kano_path)
+
+    doc.add_heading(better_worse_title, level=1)
+    doc.add_picture(better_worse_path, width=Inches(6))
+    doc.add_heading('KANO 分析图' if language == 'zh' else 'KANO Plot', level=1)
+    doc.add_picture(kano_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [better_worse_path, kano_path]
+
+
 class KANOModelAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,108 +210,6 @@ class KANOModelAnalysisApp:
 
         self.create_ui()
 
-    def kano_analysis(self, data, positive_question_columns, negative_question_columns):
-        kano_results = {}
-        better_worse_results = {}
-        for i in range(len(positive_question_columns)):
-            positive_responses = data[positive_question_columns[i]]
-            negative_responses = data[negative_question_columns[i]]
-            category = self.classify_kano(positive_responses, negative_responses)
-            kano_results[positive_question_columns[i]] = category
-            better, worse = self.calculate_better_worse(positive_responses, negative_responses)
-            better_worse_results[positive_question_columns[i]] = (better, worse)
-        return kano_results, better_worse_results
-
-    def classify_kano(self, positive_responses, negative_responses):
-        counts = {
-            'A': 0, 'O': 0, 'M': 0, 'I': 0, 'R': 0, 'Q': 0
-        }
-        for pos, neg in zip(positive_responses, negative_responses):
-            if pos == 5 and neg == 1:
-                counts['A'] += 1
-            elif pos == 5 and neg == 2:
-                counts['A'] += 1
-            elif pos == 5 and neg == 3:
-                counts['O'] += 1
-            elif pos == 4 and neg == 1:
-                counts['A'] += 1
-            elif pos == 4 and neg == 2:
-                counts['O'] += 1
-            elif pos == 4 and neg == 3:
-                counts['O'] += 1
-            elif pos == 3 and neg == 1:
-                counts['O'] += 1
-            elif pos == 3 and neg == 2:
-                counts['O'] += 1
-            elif pos == 3 and neg == 3:
-                counts['I'] += 1
-            elif pos == 2 and neg == 1:
-                counts['I'] += 1
-            elif pos == 2 and neg == 2:
-                counts['I'] += 1
-            elif pos == 2 and neg == 3:
-                counts['M'] += 1
-            elif pos == 1 and neg == 1:
-                counts['R'] += 1
-            elif pos == 1 and neg == 2:
-                counts['M'] += 1
-            elif pos == 1 and neg == 3:
-                counts['M'] += 1
-            else:
-                counts['Q'] += 1
-        max_count_category = max(counts, key=counts.get)
-        category_mapping = {
-            'A': "兴奋型需求（A）",
-            'O': "期望型需求（O）",
-            'M': "基本型需求（M）",
-            'I': "无差异型需求（I）",
-            'R': "反向型需求（R）",
-            'Q': "可疑结果（Q）"
-        }
-        return category_mapping[max_count_category]
-
-    def calculate_better_worse(self, positive_responses, negative_responses):
-        a_count = 0
-        o_count = 0
-        m_count = 0
-        i_count = 0
-        r_count = 0
-        total_count = len(positive_responses)
-        for pos, neg in zip(positive_responses, negative_responses):
-            if pos == 5 and neg == 1:
-                a_count += 1
-            elif pos == 5 and neg == 2:
-                a_count += 1
-            elif pos == 5 and neg == 3:
-                o_count += 1
-            elif pos == 4 and neg == 1:
-                a_count += 1
-            elif pos == 4 and neg == 2:
-                o_count += 1
-            elif pos == 4 and neg == 3:
-                o_count += 1
-            elif pos == 3 and neg == 1:
-                o_count += 1
-            elif pos == 3 and neg == 2:
-                o_count += 1
-            elif pos == 3 and neg == 3:
-                i_count += 1
-            elif pos == 2 and neg == 1:
-                i_count += 1
-            elif pos == 2 and neg == 2:
-                i_count += 1
-            elif pos == 2 and neg == 3:
-                m_count += 1
-            elif pos == 1 and neg == 1:
-                r_count += 1
-            elif pos == 1 and neg == 2:
-                m_count += 1
-            elif pos == 1 and neg == 3:
-                m_count += 1
-        better = (a_count + o_count) / total_count
-        worse = -(m_count + r_count) / total_count
-        return better, worse
-
     def select_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
         if file_path:
@@ -218,36 +227,17 @@ class KANOModelAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def generate_better_worse_plot(self, df_result, save_path):
-        better = df_result[languages[self.current_language]['better_worse']['better']]
-        worse = df_result[languages[self.current_language]['better_worse']['worse']]
-        labels = df_result['问题']
-
-        plt.figure(figsize=(10, 8))
-        plt.scatter(better, worse)
-        for i, label in enumerate(labels):
-            plt.annotate(label, (better[i], worse[i]), textcoords="offset points", xytext=(0, 10), ha='center')
-        plt.axhline(y=0, color='k')
-        plt.axvline(x=0, color='k')
-        plt.xlabel(languages[self.current_language]['better_worse']['better'])
-        plt.ylabel(languages[self.current_language]['better_worse']['worse'])
-        plt.title('Better - Worse 象限图' if self.current_language == 'zh' else 'Better - Worse Quadrant Plot')
-        img_path = os.path.splitext(save_path)[0] + '_better_worse.png'
-        plt.savefig(img_path)
-        plt.close()
-        return img_path
-
-    def generate_kano_plot(self, df_result, save_path):
-        category_counts = df_result['KANO分类'].value_counts()
-        plt.figure(figsize=(10, 8))
-        plt.bar(category_counts.index, category_counts.values)
-        plt.xlabel('KANO分类' if self.current_language == 'zh' else 'KANO Category')
-        plt.ylabel('数量' if self.current_language == 'zh' else 'Count')
-        plt.title('KANO模型分析结果' if self.current_language == 'zh' else 'KANO Model Analysis Results')
-        img_path = os.path.splitext(save_path)[0] + '_kano.png'
-        plt.savefig(img_path)
-        plt.close()
-        return img_path
+    def read_params(self):
+        """
+        通过对话框输入正向问题和负向问题的列名
+        :return: 传给 analyze_path 的参数；取消或未输入时返回 None
+        """
+        texts = languages[self.current_language]
+        positive = tkinter.simpledialog.askstring("输入信息", texts["positive_prompt"])
+        negative = tkinter.simpledialog.askstring("输入信息", texts["negative_prompt"]) if positive else None
+        if not positive or not negative:
+            return None
+        return {"positive_columns": positive.split(','), "negative_columns": negative.split(',')}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -257,87 +247,33 @@ class KANOModelAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 让用户输入正向问题和负向问题的列名
-            positive_question_columns = tkinter.simpledialog.askstring("输入信息", "请输入正向问题的列名，用逗号分隔").split(',')
-            negative_question_columns = tkinter.simpledialog.askstring("输入信息", "请输入负向问题的列名，用逗号分隔").split(',')
-
-            if not positive_question_columns or not negative_question_columns:
-                self.result_label.config(text="未输入完整的问题列名，分析取消。")
-                return
-
-            # 进行KANO模型分析
-            kano_results, better_worse_results = self.kano_analysis(df, positive_question_columns, negative_question_columns)
-
-            # 整理数据
-            data = []
-            for question, category in kano_results.items():
-                better, worse = better_worse_results[question]
-                data.append([question, category, better, worse])
-            headers = ["问题", "KANO分类", languages[self.current_language]['better_worse']['better'],
-                       languages[self.current_language]['better_worse']['worse']]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                doc.add_heading('KANO模型分析结果', level=1)
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for row in df_result.values.tolist():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading('KANO分类解释说明', level=1)
-                for category, explanation in explanations.items():
-                    doc.add_paragraph(f'{category}: {explanation}')
-
-                # 添加分析结果解读
-                doc.add_heading('KANO分类结果解读', level=1)
-                for category, interpretation in interpretations.items():
-                    doc.add_paragraph(f'{category}: {interpretation}')
-
-                # 生成 Better 和 Worse 象限图
-                better_worse_path = self.generate_better_worse_plot(df_result, save_path)
-                # 生成 KANO 图
-                kano_path = self.generate_kano_plot(df_result, save_path)
-
-                # 添加图片到 Word 文档
-                doc.add_heading('Better - Worse 象限图', level=1)
-                doc.add_picture(better_worse_path, width=Inches(6))
-                doc.add_heading('KANO 分析图', level=1)
-                doc.add_picture(kano_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                result_msg += f"\nBetter-Worse 象限图已保存到 {better_worse_path}"
-                result_msg += f"\nKANO 分析图已保存到 {kano_path}"
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+        params = self.read_params()
+        if params is None:
+            self.result_label.config(text=languages[self.current_language]["input_incomplete"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        # .xlsx 工作簿以只读模式流式读取
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze_path, write_report, load=None, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        texts = languages[self.current_language]
+        result_msg = texts['analysis_success'].format(save_path)
+        result_msg += "\n" + texts['better_worse_saved'].format(paths[0])
+        result_msg += "\n" + texts['kano_plot_saved'].format(paths[1])
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -351,6 +287,7 @@ class KANOModelAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -359,7 +296,7 @@ class KANOModelAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -390,6 +327,10 @@ class KANOModelAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,17 +1,24 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
-from sklearn.metrics import cohen_kappa_score
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from docx import Document
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import kappa_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.report import add_dataframe_table, add_table, new_document
 
 # 定义语言字典
 languages = {
     'zh': {
         'title': "Kappa一致性检验分析",
+        'table_label': "评价者1 \\ 评价者2",
         'select_button_text': "选择文件",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
         'analyze_button_text': "分析文件",
@@ -28,13 +35,14 @@ languages = {
         },
         'interpretation': {
             "统计量": "Kappa一致性检验的统计量值，即 Kappa 值。",
-            "p值": "这里未计算 p 值，Kappa 值本身用于判断一致性。",
+            "p值": "检验 Kappa 值是否为 0 的渐近 p 值，p 值小于 0.05 说明一致性显著高于随机水平；一致性的强弱仍由 Kappa 值判断。",
             "样本量": "样本量的大小会影响 Kappa 值的稳定性，较大的样本量通常能提供更可靠的结果。",
             "Kappa值": "Kappa 值接近 1 表示几乎完全一致；接近 0 表示一致性与随机猜测相当；接近 -1 表示几乎完全不一致。"
         }
     },
     'en': {
         'title': "Kappa Consistency Test Analysis",
+        'table_label': "Rater 1 \\ Rater 2",
         'select_button_text': "Select File",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
         'analyze_button_text': "Analyze File",
@@ -51,13 +59,69 @@ languages = {
         },
         'interpretation': {
             "统计量": "The test statistic value of the Kappa consistency test, i.e., the Kappa value.",
-            "p值": "The p-value is not calculated here. The Kappa value itself is used to judge consistency.",
+            "p值": "The asymptotic p-value of the test that Kappa is 0. A p-value below 0.05 means the agreement is significantly better than chance; the strength of agreement is still judged by the Kappa value.",
             "样本量": "The sample size affects the stability of the Kappa value. A larger sample size usually provides more reliable results.",
             "Kappa值": "A Kappa value close to 1 indicates almost complete agreement; close to 0 indicates agreement similar to random guessing; close to -1 indicates almost complete disagreement."
         }
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，两列分别为两位评价者的分类结果
+    :return: KappaResult
+    """
+    return kappa_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，本分析不生成图片
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+
+    # 整理数据
+    data = [
+        ["Kappa一致性检验", result.kappa, result.p_value],
+        ["样本量", result.nobs, ""],
+        ["Kappa值", result.kappa, ""],
+        ["标准误", result.std_error, ""],
+        ["95%置信区间", f"[{result.ci_lower:.4f}, {result.ci_upper:.4f}]", ""]
+    ]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df = explanation_df.reindex(columns=["Kappa一致性检验", "样本量", "Kappa值"])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df = interpretation_df.reindex(columns=["统计量", "p值", "样本量", "Kappa值"])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_table(doc, data, headers=["统计量", "统计量值", "p值"])
+
+    # 两位评价者的一致性列联表，行为第一列，列为第二列
+    doc.add_paragraph()
+    add_dataframe_table(doc, result.table, index=True, index_label=texts['table_label'])
+
+    doc.add_paragraph()
+    add_dataframe_table(doc, explanation_df)
+    doc.add_paragraph()
+    add_dataframe_table(doc, interpretation_df)
+
+    doc.save(save_path)
+    return []
+
+
 class KappaConsistencyTestApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -98,89 +162,24 @@ class KappaConsistencyTestApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否有两列
-            if df.shape[1] != 2:
-                raise ValueError("数据必须包含两列，用于计算 Kappa 一致性检验。")
-
-            # 进行 Kappa 一致性检验
-            stat = cohen_kappa_score(df.iloc[:, 0], df.iloc[:, 1])
-
-            # 计算样本量
-            sample_size = len(df)
-
-            # 整理数据
-            data = [
-                ["Kappa一致性检验", stat, ""],
-                ["样本量", sample_size, ""],
-                ["Kappa值", stat, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["Kappa一致性检验", "样本量", "Kappa值"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["统计量", "p值", "样本量", "Kappa值"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加结果表格
-                table = doc.add_table(rows=len(df_result) + 1, cols=len(df_result.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in df_result.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_paragraph()
-                table = doc.add_table(rows=len(explanation_df) + 1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in explanation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_paragraph()
-                table = doc.add_table(rows=len(interpretation_df) + 1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in interpretation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -196,6 +195,7 @@ class KappaConsistencyTestApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -204,7 +204,7 @@ class KappaConsistencyTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -235,6 +235,10 @@ class KappaConsistencyTestApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,17 +1,24 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
-from scipy.stats import kendalltau
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from docx import Document
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import kendall_w
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.report import add_dataframe_table, add_table, new_document
 
 # 定义语言字典
 languages = {
     'zh': {
         'title': "Kendall协和系数分析",
+        'chi2_note': "评价者 m = {}，被评对象 n = {}；显著性检验使用 χ² = m(n - 1)W，自由度为 n - 1。",
         'select_button_text': "选择文件",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
         'analyze_button_text': "分析文件",
@@ -27,7 +34,7 @@ languages = {
             "中位数": "样本数据的中间值，将数据分为上下两部分。"
         },
         'interpretation': {
-            "统计量": "Kendall协和系数的值，范围从 -1 到 1，越接近 1 表示一致性越高。",
+            "统计量": "Kendall协和系数的值，范围从 0 到 1，越接近 1 表示一致性越高。",
             "p值": "p值小于显著性水平（通常为0.05）时，拒绝原假设，认为样本之间存在显著一致性；否则，接受原假设，认为样本之间无显著一致性。",
             "样本量": "样本量的大小会影响统计检验的功效，较大的样本量通常能提供更准确的结果。",
             "中位数": "中位数反映了数据的中心位置，可用于比较不同样本的集中趋势。"
@@ -35,6 +42,7 @@ languages = {
     },
     'en': {
         'title': "Kendall's Coordination Coefficient Analysis",
+        'chi2_note': "Raters m = {}, items n = {}; significance is tested with χ² = m(n - 1)W on n - 1 degrees of freedom.",
         'select_button_text': "Select File",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
         'analyze_button_text': "Analyze File",
@@ -50,7 +58,7 @@ languages = {
             "中位数": "The middle value of the sample data, dividing the data into two parts."
         },
         'interpretation': {
-            "统计量": "The value of Kendall's Coordination Coefficient, ranging from -1 to 1. A value closer to 1 indicates higher consistency.",
+            "统计量": "The value of Kendall's Coordination Coefficient, ranging from 0 to 1. A value closer to 1 indicates higher consistency.",
             "p值": "When the p-value is less than the significance level (usually 0.05), the null hypothesis is rejected, indicating significant consistency between samples; otherwise, the null hypothesis is accepted, indicating no significant consistency.",
             "样本量": "The sample size affects the power of the statistical test. A larger sample size usually provides more accurate results.",
             "中位数": "The median reflects the central position of the data and can be used to compare the central tendencies of different samples."
@@ -58,6 +66,60 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每行为一位评价者，每列为一个被评对象
+    :return: KendallWResult
+    """
+    return kendall_w(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，本分析不生成图片
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+
+    # 整理数据
+    data = [
+        ["Kendall协和系数", result.w, result.p_value],
+        ["χ²", result.chi2, ""],
+        ["自由度", result.dof, ""],
+        ["样本量", result.summary["N"].to_dict(), ""],
+        ["中位数", result.summary["Median"].to_dict(), ""]
+    ]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df = explanation_df.reindex(columns=["Kendall协和系数", "样本量", "中位数"])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df = interpretation_df.reindex(columns=["统计量", "p值", "样本量", "中位数"])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('Kendall协和系数分析结果', 0)
+    add_table(doc, data, headers=["统计量", "统计量值", "p值"])
+    doc.add_paragraph(texts['chi2_note'].format(result.n_raters, result.n_items))
+
+    doc.add_heading('统计量解释说明', 1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('统计量结果解读', 1)
+    add_dataframe_table(doc, interpretation_df)
+
+    doc.save(save_path)
+    return []
+
+
 class KendallsCoordinationCoefficientApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -98,101 +160,24 @@ class KendallsCoordinationCoefficientApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行Kendall协和系数分析。")
-
-            # 进行Kendall协和系数分析
-            num_raters = numerical_df.shape[0]
-            num_items = numerical_df.shape[1]
-            ranks = numerical_df.rank(axis=1)
-            s = ((ranks.sum(axis=0) - (num_raters * (num_items + 1) / 2)) ** 2).sum()
-            w = (12 * s) / (num_raters ** 2 * (num_items ** 3 - num_items))
-
-            # 计算p值（这里简化处理，可根据实际情况调整）
-            _, p_value = kendalltau(numerical_df.iloc[0], numerical_df.iloc[1])
-
-            # 计算样本量和中位数
-            sample_sizes = numerical_df.count()
-            medians = numerical_df.median()
-
-            # 整理数据
-            data = [
-                ["Kendall协和系数", w, p_value],
-                ["样本量", sample_sizes.to_dict(), ""],
-                ["中位数", medians.to_dict(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["Kendall协和系数", "样本量", "中位数"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["统计量", "p值", "样本量", "中位数"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('Kendall协和系数分析结果', 0)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for _, row in df_result.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('统计量解释说明', 1)
-                table = doc.add_table(rows=1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(explanation_df.columns):
-                    hdr_cells[i].text = header
-                for _, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('统计量结果解读', 1)
-                table = doc.add_table(rows=1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(interpretation_df.columns):
-                    hdr_cells[i].text = header
-                for _, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -208,6 +193,7 @@ class KendallsCoordinationCoefficientApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -216,7 +202,7 @@ class KendallsCoordinationCoefficientApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -247,6 +233,10 @@ class KendallsCoordinationCoefficientApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,14 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.forecasting import markov_prediction
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -58,6 +66,72 @@ languages = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的状态转移矩阵
+    :return: MarkovResult
+    """
+    return markov_prediction(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    prediction_results = result.states.tolist()
+
+    # 整理数据
+    data = [
+        ["状态转移矩阵", result.transition.tolist(), ""],
+        ["预测结果", prediction_results, ""],
+    ]
+    df = pd.DataFrame(data, columns=["统计量", "统计量值", "p值"])
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('马尔可夫预测分析结果' if language == 'zh' else 'Markov Prediction Analysis Results', level=1)
+    add_dataframe_table(doc, df)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成预测结果折线图
+    img_path = os.path.join(plot_dir, f"{stem}_markov_prediction.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.plot(range(1, len(prediction_results) + 1), prediction_results)
+    ax.set_title('马尔可夫预测结果折线图' if language == 'zh' else 'Line Chart of Markov Prediction Results')
+    ax.set_xlabel('时期' if language == 'zh' else 'Periods')
+    ax.set_ylabel('状态' if language == 'zh' else 'States')
+    fig.savefig(img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class MarkovPredictionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -90,26 +164,6 @@ class MarkovPredictionAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def markov_prediction(self, data, num_periods=5):
-        """
-        进行马尔可夫预测
-        :param data: 状态转移矩阵数据
-        :param num_periods: 预测的时期数
-        :return: 状态转移矩阵，预测结果
-        """
-        # 假设初始状态向量为均匀分布
-        initial_state = np.ones(data.shape[0]) / data.shape[0]
-
-        # 预测未来各时期的状态
-        predictions = [initial_state]
-        for _ in range(num_periods):
-            next_state = np.dot(predictions[-1], data)
-            predictions.append(next_state)
-
-        prediction_states = [np.argmax(state) for state in predictions[1:]]
-
-        return data, prediction_states
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -118,85 +172,24 @@ class MarkovPredictionAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行马尔可夫预测
-            transition_matrix, prediction_results = self.markov_prediction(data)
-
-            # 整理数据
-            data = [
-                ["状态转移矩阵", transition_matrix.tolist(), ""],
-                ["预测结果", prediction_results, ""],
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["状态转移矩阵", "预测结果"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["状态转移矩阵", "预测结果"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格标题
-                doc.add_heading(
-                    '马尔可夫预测分析结果' if self.current_language == 'zh' else 'Markov Prediction Analysis Results',
-                    level=1)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成预测结果折线图
-                fig, ax = plt.subplots()
-                ax.plot(range(1, len(prediction_results) + 1), prediction_results)
-                ax.set_title(
-                    '马尔可夫预测结果折线图' if self.current_language == 'zh' else 'Line Chart of Markov Prediction Results')
-                ax.set_xlabel('时期' if self.current_language == 'zh' else 'Periods')
-                ax.set_ylabel('状态' if self.current_language == 'zh' else 'States')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_markov_prediction.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -212,6 +205,7 @@ class MarkovPredictionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -220,7 +214,7 @@ class MarkovPredictionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -251,6 +245,10 @@ class MarkovPredictionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=languages[self.current_language]["switch_language_button_text"],
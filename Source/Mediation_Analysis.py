@@ -1,16 +1,23 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import tkinter.simpledialog
-import statsmodels.api as sm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.bootstrap import BOOTSTRAP_REPLICATES
+from dias.compute.mediation import mediation_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -28,11 +35,14 @@ languages = {
         'analysis_complete': "分析完成，结果已保存到 {}，相关图片已保存。",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
-        'input_info': "输入信息",
-        'input_ind_var': "请输入自变量的列名",
-        'input_med_var': "请输入中介变量的列名",
-        'input_dep_var': "请输入因变量的列名",
+        'ind_var_label': "自变量列名：",
+        'med_var_label': "中介变量列名：",
+        'dep_var_label': "因变量列名：",
+        'replicates_label': "bootstrap 重抽样次数：",
         'input_incomplete': "未输入完整的变量名，分析取消。",
+        'invalid_replicates': "重抽样次数须为不小于 100 的整数。",
+        'bootstrap_heading': "间接效应的 bootstrap 置信区间",
+        'bootstrap_note': "重抽样 {} 次，随机种子 {}，置信水平 {:.0%}。百分位区间和 BCa 区间不包含 0 时，间接效应显著。",
         'explanation': {
             "自变量对因变量的总效应": "自变量直接对因变量产生的影响。",
             "自变量对中介变量的效应": "自变量对中介变量产生的影响。",
@@ -59,11 +69,14 @@ languages = {
         'analysis_complete': "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
-        'input_info': "Input Information",
-        'input_ind_var': "Please enter the column name of the independent variable",
-        'input_med_var': "Please enter the column name of the mediator variable",
-        'input_dep_var': "Please enter the column name of the dependent variable",
+        'ind_var_label': "Independent variable: ",
+        'med_var_label': "Mediator variable: ",
+        'dep_var_label': "Dependent variable: ",
+        'replicates_label': "Bootstrap replicates: ",
         'input_incomplete': "Incomplete variable names entered, analysis canceled.",
+        'invalid_replicates': "The number of replicates must be an integer of at least 100.",
+        'bootstrap_heading': "Bootstrap Confidence Intervals for the Indirect Effect",
+        'bootstrap_note': "{} replicates, random seed {}, {:.0%} confidence. The indirect effect is significant when the percentile and BCa intervals exclude 0.",
         'explanation': {
             "自变量对因变量的总效应": "The total effect of the independent variable on the dependent variable.",
             "自变量对中介变量的效应": "The effect of the independent variable on the mediator variable.",
@@ -81,6 +94,90 @@ languages = {
     }
 }
 
+# bootstrap 重抽样次数的下限
+MIN_REPLICATES = 100
+
+# 报告第一张表中各统计量的顺序，与 explanation / interpretation 的键一致
+STATISTICS = ["自变量对因变量的总效应", "自变量对中介变量的效应", "中介变量对因变量的效应（控制自变量）", "中介效应", "样本量"]
+
+
+def analyze(df, ind_var=None, med_var=None, dep_var=None, n_boot=BOOTSTRAP_REPLICATES):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :param ind_var: 自变量列名，未指定时取第一列
+    :param med_var: 中介变量列名，未指定时取第二列
+    :param dep_var: 因变量列名，未指定时取第三列
+    :param n_boot: bootstrap 重抽样次数
+    :return: MediationResult
+    """
+    return mediation_analysis(df, ind_var, med_var, dep_var, n_boot=n_boot)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和中介效应柱状图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = [
+        [STATISTICS[0], result.total_effect, result.p_total],
+        [STATISTICS[1], result.effect_ind_med, result.p_ind_med],
+        [STATISTICS[2], result.effect_med_dep, result.p_med_dep],
+        [STATISTICS[3], result.mediation_effect, ""],
+        [STATISTICS[4], result.nobs, ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+    df_result = pd.DataFrame(data, columns=headers)
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']]).reindex(columns=STATISTICS)
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']]).reindex(columns=STATISTICS)
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    # 合并数据、解释说明和结果解读
+    combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
+
+    doc = new_document()
+    add_dataframe_table(doc, combined_df)
+
+    # 添加 bootstrap 置信区间表格
+    bootstrap_table = result.bootstrap
+    doc.add_heading(texts['bootstrap_heading'], level=1)
+    add_dataframe_table(doc, bootstrap_table, index=True)
+    doc.add_paragraph(texts['bootstrap_note'].format(
+        bootstrap_table.attrs['replicates'], bootstrap_table.attrs['seed'], bootstrap_table.attrs['confidence']))
+
+    # 生成图片（中介效应柱状图）
+    fig = new_figure()
+    ax = fig.subplots()
+    effects = [result.total_effect, result.effect_ind_med, result.effect_med_dep, result.mediation_effect]
+    labels = ["自变量对因变量总效应", "自变量对中介变量效应", "中介变量对因变量效应", "中介效应"] if language == 'zh' else [
+        "Total Effect of Independent on Dependent", "Effect of Independent on Mediator",
+        "Effect of Mediator on Dependent (Controlling Independent)", "Mediation Effect"]
+    ax.bar(labels, effects)
+    ax.set_title('中介作用分析结果' if language == 'zh' else 'Mediation Analysis Results')
+    ax.set_ylabel('效应值' if language == 'zh' else 'Effect Value')
+    img_path = os.path.join(plot_dir, f"{stem}.png")
+    fig.savefig(img_path)
+
+    # 将图片插入 Word 文档
+    doc.add_picture(img_path, width=Inches(6))
+    doc.save(save_path)
+    return [img_path]
+
+
 class MediationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -113,34 +210,18 @@ class MediationAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def mediation_analysis(self, data, ind_var, med_var, dep_var):
-        # 第一步：自变量对因变量的总效应
-        X1 = data[ind_var]
-        X1 = sm.add_constant(X1)
-        model1 = sm.OLS(data[dep_var], X1).fit()
-        total_effect = model1.params[ind_var]
-        p_value_total = model1.pvalues[ind_var]
-
-        # 第二步：自变量对中介变量的效应
-        X2 = data[ind_var]
-        X2 = sm.add_constant(X2)
-        model2 = sm.OLS(data[med_var], X2).fit()
-        effect_ind_med = model2.params[ind_var]
-        p_value_ind_med = model2.pvalues[ind_var]
-
-        # 第三步：中介变量对因变量的效应（控制自变量）
-        X3 = data[[ind_var, med_var]]
-        X3 = sm.add_constant(X3)
-        model3 = sm.OLS(data[dep_var], X3).fit()
-        effect_med_dep = model3.params[med_var]
-        p_value_med_dep = model3.pvalues[med_var]
-
-        # 第四步：中介效应
-        mediation_effect = effect_ind_med * effect_med_dep
-
-        sample_size = len(data)
-
-        return total_effect, p_value_total, effect_ind_med, p_value_ind_med, effect_med_dep, p_value_med_dep, mediation_effect, sample_size
+    def read_params(self):
+        """
+        读取变量列名和重抽样次数
+        :return: 传给 analyze 的参数；变量名不完整时返回 None
+        """
+        names = [entry.get().strip() for entry in (self.ind_var_entry, self.med_var_entry, self.dep_var_entry)]
+        if not all(names):
+            return None
+        n_boot = int(self.replicates_entry.get())
+        if n_boot < MIN_REPLICATES:
+            raise ValueError
+        return {'ind_var': names[0], 'med_var': names[1], 'dep_var': names[2], 'n_boot': n_boot}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -151,103 +232,32 @@ class MediationAnalysisApp:
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 让用户输入自变量、中介变量和因变量的列名
-            ind_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_ind_var'])
-            med_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_med_var'])
-            dep_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_dep_var'])
-
-            if not ind_var or not med_var or not dep_var:
-                self.result_label.config(text=languages[self.current_language]['input_incomplete'])
-                return
-
-            # 进行中介作用分析
-            total_effect, p_value_total, effect_ind_med, p_value_ind_med, effect_med_dep, p_value_med_dep, mediation_effect, sample_size = self.mediation_analysis(
-                df, ind_var, med_var, dep_var)
-
-            # 整理数据
-            data = [
-                ["自变量对因变量的总效应", total_effect, p_value_total],
-                ["自变量对中介变量的效应", effect_ind_med, p_value_ind_med],
-                ["中介变量对因变量的效应（控制自变量）", effect_med_dep, p_value_med_dep],
-                ["中介效应", mediation_effect, ""],
-                ["样本量", sample_size, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["自变量对因变量的总效应", "自变量对中介变量的效应", "中介变量对因变量的效应（控制自变量）", "中介效应", "样本量"])
-            explanation_df.insert(0, "统计量_解释说明",
-                                  "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["自变量对因变量的总效应", "自变量对中介变量的效应", "中介变量对因变量的效应（控制自变量）", "中介效应", "样本量"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat(
-                [df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=combined_df.shape[0] + 1, cols=combined_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-
-                for row_idx in range(combined_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(combined_df.shape[1]):
-                        row_cells[col_idx].text = str(combined_df.iloc[row_idx, col_idx])
-
-                # 生成图片（中介效应柱状图）
-                fig, ax = plt.subplots()
-                effects = [total_effect, effect_ind_med, effect_med_dep, mediation_effect]
-                labels = ["自变量对因变量总效应", "自变量对中介变量效应", "中介变量对因变量效应", "中介效应"] if self.current_language == 'zh' else [
-                    "Total Effect of Independent on Dependent", "Effect of Independent on Mediator",
-                    "Effect of Mediator on Dependent (Controlling Independent)", "Mediation Effect"]
-                ax.bar(labels, effects)
-                ax.set_title('中介作用分析结果' if self.current_language == 'zh' else 'Mediation Analysis Results')
-                ax.set_ylabel('效应值' if self.current_language == 'zh' else 'Effect Value')
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入 Word 文档
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=languages[self.current_language]['invalid_replicates'])
+            return
+        if params is None:
+            self.result_label.config(text=languages[self.current_language]['input_incomplete'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -261,6 +271,9 @@ class MediationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        for label, key in self.param_labels:
+            label.config(text=languages[self.current_language][key])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -269,7 +282,7 @@ class MediationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 460
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -295,11 +308,30 @@ class MediationAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建变量列名和重抽样次数输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.param_labels = []
+        entries = []
+        for row, key in enumerate(('ind_var_label', 'med_var_label', 'dep_var_label', 'replicates_label')):
+            label = ttk.Label(params_frame, text=languages[self.current_language][key])
+            label.grid(row=row, column=0, sticky='e', pady=2)
+            entry = ttk.Entry(params_frame, width=20)
+            entry.grid(row=row, column=1, sticky='w', padx=4, pady=2)
+            self.param_labels.append((label, key))
+            entries.append(entry)
+        self.ind_var_entry, self.med_var_entry, self.dep_var_entry, self.replicates_entry = entries
+        self.replicates_entry.insert(0, str(BOOTSTRAP_REPLICATES))
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,16 +1,23 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import tkinter.simpledialog
-import statsmodels.api as sm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.bootstrap import BOOTSTRAP_REPLICATES
+from dias.compute.mediation import moderated_mediation_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -28,12 +35,15 @@ languages = {
       'analysis_complete': "分析完成，结果已保存到 {}，相关图片已保存。",
       'no_save_path_selected': "未选择保存路径，结果未保存。",
       'switch_language_button_text': "切换语言",
-      'input_info': "输入信息",
-      'input_ind_var': "请输入自变量的列名",
-      'input_med_var': "请输入中介变量的列名",
-      'input_dep_var': "请输入因变量的列名",
-      'input_mod_var': "请输入调节变量的列名",
+      'ind_var_label': "自变量列名：",
+      'med_var_label': "中介变量列名：",
+      'dep_var_label': "因变量列名：",
+      'mod_var_label': "调节变量列名：",
+      'replicates_label': "bootstrap 重抽样次数：",
       'input_incomplete': "未输入完整的变量名，分析取消。",
+      'invalid_replicates': "重抽样次数须为不小于 100 的整数。",
+      'bootstrap_heading': "条件间接效应的 bootstrap 置信区间",
+      'bootstrap_note': "调节变量取均值减一个标准差、均值和均值加一个标准差。重抽样 {} 次，随机种子 {}，置信水平 {:.0%}。区间不包含 0 时，该调节变量取值下的间接效应显著。",
         'explanation': {
             "自变量对因变量的总效应": "自变量直接对因变量产生的影响。",
             "自变量对中介变量的效应": "自变量对中介变量产生的影响。",
@@ -64,12 +74,15 @@ languages = {
       'analysis_complete': "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
       'no_save_path_selected': "No save path selected. The results were not saved.",
       'switch_language_button_text': "Switch Language",
-      'input_info': "Input Information",
-      'input_ind_var': "Please enter the column name of the independent variable",
-      'input_med_var': "Please enter the column name of the mediator variable",
-      'input_dep_var': "Please enter the column name of the dependent variable",
-      'input_mod_var': "Please enter the column name of the moderator variable",
+      'ind_var_label': "Independent variable: ",
+      'med_var_label': "Mediator variable: ",
+      'dep_var_label': "Dependent variable: ",
+      'mod_var_label': "Moderator variable: ",
+      'replicates_label': "Bootstrap replicates: ",
       'input_incomplete': "Incomplete variable names entered, analysis canceled.",
+      'invalid_replicates': "The number of replicates must be an integer of at least 100.",
+      'bootstrap_heading': "Bootstrap Confidence Intervals for Conditional Indirect Effects",
+      'bootstrap_note': "The moderator is set to its mean minus one SD, its mean and its mean plus one SD. {} replicates, random seed {}, {:.0%} confidence. An interval that excludes 0 indicates a significant indirect effect at that moderator value.",
         'explanation': {
             "自变量对因变量的总效应": "The total effect of the independent variable on the dependent variable.",
             "自变量对中介变量的效应": "The effect of the independent variable on the mediator variable.",
@@ -91,6 +104,103 @@ languages = {
     }
 }
 
+# bootstrap 重抽样次数的下限
+MIN_REPLICATES = 100
+
+
+def analyze(df, ind_var=None, med_var=None, dep_var=None, mod_var=None, n_boot=BOOTSTRAP_REPLICATES):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :param ind_var: 自变量列名，未指定时取第一列
+    :param med_var: 中介变量列名，未指定时取第二列
+    :param dep_var: 因变量列名，未指定时取第三列
+    :param mod_var: 调节变量列名，未指定时取第四列
+    :param n_boot: bootstrap 重抽样次数
+    :return: ModeratedMediationResult
+    """
+    return moderated_mediation_analysis(df, ind_var, med_var, dep_var, mod_var, n_boot=n_boot)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和中介效应柱状图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = [
+        ["自变量对因变量的总效应", result.total_effect, result.p_total],
+        ["自变量对中介变量的效应", result.effect_ind_med, result.p_ind_med],
+        ["调节变量对自变量 - 中介变量关系的调节效应", result.effect_mod_ind_med, result.p_mod_ind_med],
+        ["中介变量对因变量的效应（控制自变量）", result.effect_med_dep, result.p_med_dep],
+        ["调节变量对中介变量 - 因变量关系的调节效应", result.effect_mod_med_dep, result.p_mod_med_dep],
+        ["中介效应", result.mediation_effect, ""],
+        ["样本量", result.nobs, ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+    df_result = pd.DataFrame(data, columns=headers)
+
+    doc = new_document()
+
+    # 添加标题
+    doc.add_heading('调节中介作用分析结果', 0)
+
+    # 添加分析结果表格
+    add_dataframe_table(doc, df_result, header=headers)
+
+    # 添加 bootstrap 置信区间表格
+    bootstrap_table = result.bootstrap
+    doc.add_heading(texts['bootstrap_heading'], level=1)
+    add_dataframe_table(doc, bootstrap_table, index=True)
+    doc.add_paragraph(texts['bootstrap_note'].format(
+        bootstrap_table.attrs['replicates'], bootstrap_table.attrs['seed'], bootstrap_table.attrs['confidence']))
+
+    # 添加解释说明
+    doc.add_heading('统计量解释说明', level=1)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加分析结果解读
+    doc.add_heading('统计量结果解读', level=1)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 生成图片（中介效应柱状图）
+    fig = new_figure()
+    ax = fig.subplots()
+    effects = [result.total_effect, result.effect_ind_med, result.effect_mod_ind_med, result.effect_med_dep,
+               result.effect_mod_med_dep, result.mediation_effect]
+    labels = ["自变量对因变量总效应", "自变量对中介变量效应", "调节变量对自变量 - 中介变量关系调节效应", "中介变量对因变量效应",
+              "调节变量对中介变量 - 因变量关系调节效应", "中介效应"] if language == 'zh' else [
+        "Total Effect of Independent on Dependent", "Effect of Independent on Mediator",
+        "Moderating Effect of Moderator on Independent - Mediator",
+        "Effect of Mediator on Dependent (Controlling Independent)",
+        "Moderating Effect of Moderator on Mediator - Dependent", "Mediation Effect"]
+    ax.bar(labels, effects)
+    ax.set_title('调节中介作用分析结果' if language == 'zh' else 'Moderated Mediation Analysis Results')
+    ax.set_ylabel('效应值' if language == 'zh' else 'Effect Value')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+    img_path = os.path.join(plot_dir, f"{stem}.png")
+    fig.savefig(img_path)
+
+    # 将图片插入 Word 文档
+    doc.add_heading('中介效应柱状图', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+    doc.save(save_path)
+    return [img_path]
+
+
 class ModeratedMediationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -123,50 +233,20 @@ class ModeratedMediationAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def moderated_mediation_analysis(self, data, ind_var, med_var, dep_var, mod_var):
-        # 第一步：自变量对因变量的总效应
-        X1 = data[ind_var]
-        X1 = sm.add_constant(X1)
-        model1 = sm.OLS(data[dep_var], X1).fit()
-        total_effect = model1.params[ind_var]
-        p_value_total = model1.pvalues[ind_var]
-
-        # 第二步：自变量对中介变量的效应
-        X2 = data[ind_var]
-        X2 = sm.add_constant(X2)
-        model2 = sm.OLS(data[med_var], X2).fit()
-        effect_ind_med = model2.params[ind_var]
-        p_value_ind_med = model2.pvalues[ind_var]
-
-        # 第三步：调节变量对自变量 - 中介变量关系的调节效应
-        data['ind_mod'] = data[ind_var] * data[mod_var]
-        X3 = data[[ind_var, mod_var, 'ind_mod']]
-        X3 = sm.add_constant(X3)
-        model3 = sm.OLS(data[med_var], X3).fit()
-        effect_mod_ind_med = model3.params['ind_mod']
-        p_value_mod_ind_med = model3.pvalues['ind_mod']
-
-        # 第四步：中介变量对因变量的效应（控制自变量）
-        X4 = data[[ind_var, med_var]]
-        X4 = sm.add_constant(X4)
-        model4 = sm.OLS(data[dep_var], X4).fit()
-        effect_med_dep = model4.params[med_var]
-        p_value_med_dep = model4.pvalues[med_var]
-
-        # 第五步：调节变量对中介变量 - 因变量关系的调节效应
-        data['med_mod'] = data[med_var] * data[mod_var]
-        X5 = data[[ind_var, med_var, mod_var, 'med_mod']]
-        X5 = sm.add_constant(X5)
-        model5 = sm.OLS(data[dep_var], X5).fit()
-        effect_mod_med_dep = model5.params['med_mod']
-        p_value_mod_med_dep = model5.pvalues['med_mod']
-
-        # 第六步：中介效应
-        mediation_effect = effect_ind_med * effect_med_dep
-
-        sample_size = len(data)
-
-        return total_effect, p_value_total, effect_ind_med, p_value_ind_med, effect_mod_ind_med, p_value_mod_ind_med, effect_med_dep, p_value_med_dep, effect_mod_med_dep, p_value_mod_med_dep, mediation_effect, sample_size
+    def read_params(self):
+        """
+        读取变量列名和重抽样次数
+        :return: 传给 analyze 的参数；变量名不完整时返回 None
+        """
+        names = [entry.get().strip() for entry in
+                 (self.ind_var_entry, self.med_var_entry, self.dep_var_entry, self.mod_var_entry)]
+        if not all(names):
+            return None
+        n_boot = int(self.replicates_entry.get())
+        if n_boot < MIN_REPLICATES:
+            raise ValueError
+        return {'ind_var': names[0], 'med_var': names[1], 'dep_var': names[2], 'mod_var': names[3],
+                'n_boot': n_boot}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -177,110 +257,32 @@ class ModeratedMediationAnalysisApp:
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 让用户输入自变量、中介变量、因变量和调节变量的列名
-            ind_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_ind_var'])
-            med_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_med_var'])
-            dep_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_dep_var'])
-            mod_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_mod_var'])
-
-            if not ind_var or not med_var or not dep_var or not mod_var:
-                self.result_label.config(text=languages[self.current_language]['input_incomplete'])
-                return
-
-            # 进行调节中介作用分析
-            total_effect, p_value_total, effect_ind_med, p_value_ind_med, effect_mod_ind_med, p_value_mod_ind_med, effect_med_dep, p_value_med_dep, effect_mod_med_dep, p_value_mod_med_dep, mediation_effect, sample_size = self.moderated_mediation_analysis(
-                df, ind_var, med_var, dep_var, mod_var)
-
-            # 整理数据
-            data = [
-                ["自变量对因变量的总效应", total_effect, p_value_total],
-                ["自变量对中介变量的效应", effect_ind_med, p_value_ind_med],
-                ["调节变量对自变量 - 中介变量关系的调节效应", effect_mod_ind_med, p_value_mod_ind_med],
-                ["中介变量对因变量的效应（控制自变量）", effect_med_dep, p_value_med_dep],
-                ["调节变量对中介变量 - 因变量关系的调节效应", effect_mod_med_dep, p_value_mod_med_dep],
-                ["中介效应", mediation_effect, ""],
-                ["样本量", sample_size, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('调节中介作用分析结果', 0)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for index, row in df_result.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading('统计量解释说明', level=1)
-                for key, value in explanations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 添加分析结果解读
-                doc.add_heading('统计量结果解读', level=1)
-                for key, value in interpretations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 生成图片（中介效应柱状图）
-                fig, ax = plt.subplots()
-                effects = [total_effect, effect_ind_med, effect_mod_ind_med, effect_med_dep, effect_mod_med_dep,
-                           mediation_effect]
-                labels = ["自变量对因变量总效应", "自变量对中介变量效应", "调节变量对自变量 - 中介变量关系调节效应", "中介变量对因变量效应",
-                          "调节变量对中介变量 - 因变量关系调节效应", "中介效应"] if self.current_language == 'zh' else [
-                    "Total Effect of Independent on Dependent", "Effect of Independent on Mediator",
-                    "Moderating Effect of Moderator on Independent - Mediator",
-                    "Effect of Mediator on Dependent (Controlling Independent)",
-                    "Moderating Effect of Moderator on Mediator - Dependent", "Mediation Effect"]
-                ax.bar(labels, effects)
-                ax.set_title('调节中介作用分析结果' if self.current_language == 'zh' else 'Moderated Mediation Analysis Results')
-                ax.set_ylabel('效应值' if self.current_language == 'zh' else 'Effect Value')
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入 Word 文档
-                doc.add_heading('中介效应柱状图', level=1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=languages[self.current_language]['invalid_replicates'])
+            return
+        if params is None:
+            self.result_label.config(text=languages[self.current_language]['input_incomplete'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -294,6 +296,9 @@ class ModeratedMediationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        for label, key in self.param_labels:
+            label.config(text=languages[self.current_language][key])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -302,7 +307,7 @@ class ModeratedMediationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 500
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -328,11 +333,31 @@ class ModeratedMediationAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建变量列名和重抽样次数输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.param_labels = []
+        entries = []
+        for row, key in enumerate(('ind_var_label', 'med_var_label', 'dep_var_label', 'mod_var_label',
+                                   'replicates_label')):
+            label = ttk.Label(params_frame, text=languages[self.current_language][key])
+            label.grid(row=row, column=0, sticky='e', pady=2)
+            entry = ttk.Entry(params_frame, width=20)
+            entry.grid(row=row, column=1, sticky='w', padx=4, pady=2)
+            self.param_labels.append((label, key))
+            entries.append(entry)
+        self.ind_var_entry, self.med_var_entry, self.dep_var_entry, self.mod_var_entry, self.replicates_entry = entries
+        self.replicates_entry.insert(0, str(BOOTSTRAP_REPLICATES))
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建结果显示标签
         self.result_label = ttk.Label(self.root, text="", wraplength=400)
         self.result_label.pack(pady=10)
@@ -1,16 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import tkinter.simpledialog
-import statsmodels.api as sm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.mediation import moderation_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -28,10 +34,9 @@ languages = {
         'analysis_complete': "分析完成，结果已保存到 {}，相关图片已保存。",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
-        'input_info': "输入信息",
-        'input_ind_var': "请输入自变量的列名",
-        'input_mod_var': "请输入调节变量的列名",
-        'input_dep_var': "请输入因变量的列名",
+        'ind_var_label': "自变量列名：",
+        'mod_var_label': "调节变量列名：",
+        'dep_var_label': "因变量列名：",
         'input_incomplete': "未输入完整的变量名，分析取消。",
         'explanation': {
             "自变量对因变量的主效应": "不考虑调节变量时，自变量对因变量的影响。",
@@ -57,10 +62,9 @@ languages = {
         'analysis_complete': "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
-        'input_info': "Input Information",
-        'input_ind_var': "Please enter the column name of the independent variable",
-        'input_mod_var': "Please enter the column name of the moderator variable",
-        'input_dep_var': "Please enter the column name of the dependent variable",
+        'ind_var_label': "Independent variable: ",
+        'mod_var_label': "Moderator variable: ",
+        'dep_var_label': "Dependent variable: ",
         'input_incomplete': "Incomplete variable names entered, analysis canceled.",
         'explanation': {
             "自变量对因变量的主效应": "The direct effect of the independent variable on the dependent variable without considering the moderator.",
@@ -77,6 +81,79 @@ languages = {
     }
 }
 
+
+# 报告第一张表中各统计量的顺序，与 explanation / interpretation 的键一致
+STATISTICS = ["自变量对因变量的主效应", "调节变量对因变量的主效应", "调节效应", "样本量"]
+
+
+def analyze(df, ind_var=None, mod_var=None, dep_var=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :param ind_var: 自变量列名，未指定时取第一列
+    :param mod_var: 调节变量列名，未指定时取第二列
+    :param dep_var: 因变量列名，未指定时取第三列
+    :return: ModerationResult
+    """
+    return moderation_analysis(df, ind_var, mod_var, dep_var)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和调节效应柱状图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = [
+        [STATISTICS[0], result.effect_ind, result.p_ind],
+        [STATISTICS[1], result.effect_mod, result.p_mod],
+        [STATISTICS[2], result.moderation_effect, result.p_moderation],
+        [STATISTICS[3], result.nobs, ""]
+    ]
+    df_result = pd.DataFrame(data, columns=["统计量", "统计量值", "p值"])
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']]).reindex(columns=STATISTICS)
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']]).reindex(columns=STATISTICS)
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_dataframe_table(doc, df_result)
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成图片（调节效应柱状图）
+    fig = new_figure()
+    ax = fig.subplots()
+    effects = [result.effect_ind, result.effect_mod, result.moderation_effect]
+    labels = ["自变量主效应", "调节变量主效应", "调节效应"] if language == 'zh' else [
+        "Independent Variable Main Effect", "Moderator Variable Main Effect", "Moderation Effect"]
+    ax.bar(labels, effects)
+    ax.set_title('调节作用分析结果' if language == 'zh' else 'Moderation Analysis Results')
+    ax.set_ylabel('效应值' if language == 'zh' else 'Effect Value')
+    img_path = os.path.join(plot_dir, f"{stem}.png")
+    fig.savefig(img_path)
+
+    # 将图片插入 Word 文档
+    doc.add_heading("调节作用分析结果图" if language == 'zh' else "Moderation Analysis Results Chart", level=2)
+    doc.add_picture(img_path, width=Inches(6))
+    doc.save(save_path)
+    return [img_path]
+
+
 class ModerationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -109,32 +186,15 @@ class ModerationAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def moderation_analysis(self, data, ind_var, mod_var, dep_var):
-        # 第一步：自变量对因变量的主效应
-        X1 = data[ind_var]
-        X1 = sm.add_constant(X1)
-        model1 = sm.OLS(data[dep_var], X1).fit()
-        main_effect_ind = model1.params[ind_var]
-        p_value_ind = model1.pvalues[ind_var]
-
-        # 第二步：调节变量对因变量的主效应
-        X2 = data[mod_var]
-        X2 = sm.add_constant(X2)
-        model2 = sm.OLS(data[dep_var], X2).fit()
-        main_effect_mod = model2.params[mod_var]
-        p_value_mod = model2.pvalues[mod_var]
-
-        # 第三步：调节效应
-        data['interaction'] = data[ind_var] * data[mod_var]
-        X3 = data[[ind_var, mod_var, 'interaction']]
-        X3 = sm.add_constant(X3)
-        model3 = sm.OLS(data[dep_var], X3).fit()
-        moderation_effect = model3.params['interaction']
-        p_value_moderation = model3.pvalues['interaction']
-
-        sample_size = len(data)
-
-        return main_effect_ind, p_value_ind, main_effect_mod, p_value_mod, moderation_effect, p_value_moderation, sample_size
+    def read_params(self):
+        """
+        读取变量列名
+        :return: 传给 analyze 的参数；变量名不完整时返回 None
+        """
+        names = [entry.get().strip() for entry in (self.ind_var_entry, self.mod_var_entry, self.dep_var_entry)]
+        if not all(names):
+            return None
+        return {'ind_var': names[0], 'mod_var': names[1], 'dep_var': names[2]}
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -144,120 +204,30 @@ class ModerationAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 让用户输入自变量、调节变量和因变量的列名
-            ind_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_ind_var'])
-            mod_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_mod_var'])
-            dep_var = tkinter.simpledialog.askstring(languages[self.current_language]['input_info'],
-                                                     languages[self.current_language]['input_dep_var'])
-
-            if not ind_var or not mod_var or not dep_var:
-                self.result_label.config(text=languages[self.current_language]['input_incomplete'])
-                return
-
-            # 进行调节作用分析
-            main_effect_ind, p_value_ind, main_effect_mod, p_value_mod, moderation_effect, p_value_moderation, sample_size = self.moderation_analysis(
-                df, ind_var, mod_var, dep_var)
-
-            # 整理数据
-            data = [
-                ["自变量对因变量的主效应", main_effect_ind, p_value_ind],
-                ["调节变量对因变量的主效应", main_effect_mod, p_value_mod],
-                ["调节效应", moderation_effect, p_value_moderation],
-                ["样本量", sample_size, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["自变量对因变量的主效应", "调节变量对因变量的主效应", "调节效应", "样本量"])
-            explanation_df.insert(0, "统计量_解释说明",
-                                  "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["自变量对因变量的主效应", "调节变量对因变量的主效应", "调节效应", "样本量"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=df_result.shape[0] + 1, cols=df_result.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(df_result.shape[0]):
-                    for col_idx in range(df_result.shape[1]):
-                        table.cell(row_idx + 1, col_idx).text = str(df_result.iloc[row_idx, col_idx])
-
-                # 添加解释说明表格
-                doc.add_paragraph()
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                table = doc.add_table(rows=explanation_df.shape[0] + 1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(explanation_df.shape[0]):
-                    for col_idx in range(explanation_df.shape[1]):
-                        table.cell(row_idx + 1, col_idx).text = str(explanation_df.iloc[row_idx, col_idx])
-
-                # 添加结果解读表格
-                doc.add_paragraph()
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                table = doc.add_table(rows=interpretation_df.shape[0] + 1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(interpretation_df.shape[0]):
-                    for col_idx in range(interpretation_df.shape[1]):
-                        table.cell(row_idx + 1, col_idx).text = str(interpretation_df.iloc[row_idx, col_idx])
-
-                # 生成图片（调节效应柱状图）
-                fig, ax = plt.subplots()
-                effects = [main_effect_ind, main_effect_mod, moderation_effect]
-                labels = ["自变量主效应", "调节变量主效应", "调节效应"] if self.current_language == 'zh' else [
-                    "Independent Variable Main Effect", "Moderator Variable Main Effect", "Moderation Effect"]
-                ax.bar(labels, effects)
-                ax.set_title('调节作用分析结果' if self.current_language == 'zh' else 'Moderation Analysis Results')
-                ax.set_ylabel('效应值' if self.current_language == 'zh' else 'Effect Value')
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_paragraph()
-                doc.add_heading("调节作用分析结果图" if self.current_language == 'zh' else "Moderation Analysis Results Chart", level=2)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+        params = self.read_params()
+        if params is None:
+            self.result_label.config(text=languages[self.current_language]['input_incomplete'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -271,6 +241,9 @@ class ModerationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        for label, key in self.param_labels:
+            label.config(text=languages[self.current_language][key])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -279,7 +252,7 @@ class ModerationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 460
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -305,11 +278,29 @@ class ModerationAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建变量列名输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.param_labels = []
+        entries = []
+        for row, key in enumerate(('ind_var_label', 'mod_var_label', 'dep_var_label')):
+            label = ttk.Label(params_frame, text=languages[self.current_language][key])
+            label.grid(row=row, column=0, sticky='e', pady=2)
+            entry = ttk.Entry(params_frame, width=20)
+            entry.grid(row=row, column=1, sticky='w', padx=4, pady=2)
+            self.param_labels.append((label, key))
+            entries.append(entry)
+        self.ind_var_entry, self.mod_var_entry, self.dep_var_entry = entries
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,15 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from scipy import stats
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.anova import one_way_anova
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -76,6 +83,95 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列为一组
+    :return: AnovaResult
+    """
+    return one_way_anova(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 整理数据
+    means = result.summary["Mean"]
+    data = [
+        ["方差分析", result.f_statistic, result.df_between, result.df_within, result.p_value, result.eta_squared],
+        ["样本量", result.summary["N"].to_dict(), "", "", "", ""],
+        ["均值", means.to_dict(), "", "", "", ""]
+    ]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if zh else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if zh else "Interpretation")
+
+    doc = new_document()
+    add_table(doc, data, headers=["统计量", "F统计量", "组间自由度", "组内自由度", "p值", "效应量（Eta平方）"])
+    doc.add_heading('解释说明' if zh else 'Explanation', level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读' if zh else 'Interpretation', level=2)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 箱线图
+    boxplot_path = os.path.join(plot_dir, f"{stem}_boxplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.boxplot(list(result.samples.values()), tick_labels=list(result.samples))
+    ax.set_title('箱线图' if zh else 'Box Plot')
+    ax.set_xlabel('组' if zh else 'Groups')
+    ax.set_ylabel('数值' if zh else 'Values')
+    fig.savefig(boxplot_path)
+
+    # 柱状图
+    barplot_path = os.path.join(plot_dir, f"{stem}_barplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(means.index, means)
+    ax.bar_label(bars, fmt='%.2f')
+    ax.set_title('柱状图' if zh else 'Bar Chart')
+    ax.set_xlabel('组' if zh else 'Groups')
+    ax.set_ylabel('均值' if zh else 'Mean')
+    fig.savefig(barplot_path)
+
+    # 均值图
+    meanplot_path = os.path.join(plot_dir, f"{stem}_meanplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(means.index, means, marker='o')
+    ax.set_title('均值图' if zh else 'Mean Plot')
+    ax.set_xlabel('组' if zh else 'Groups')
+    ax.set_ylabel('均值' if zh else 'Mean')
+    fig.savefig(meanplot_path)
+
+    doc.add_heading('箱线图' if zh else 'Box Plot', level=2)
+    doc.add_picture(boxplot_path, width=Inches(6))
+    doc.add_heading('柱状图' if zh else 'Bar Chart', level=2)
+    doc.add_picture(barplot_path, width=Inches(6))
+    doc.add_heading('均值图' if zh else 'Mean Plot', level=2)
+    doc.add_picture(meanplot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [boxplot_path, barplot_path, meanplot_path]
+
+
 class MultiSampleANOVAApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -116,147 +212,24 @@ class MultiSampleANOVAApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行方差分析。")
-
-            # 进行方差分析
-            f_stat, p_value = stats.f_oneway(*numerical_df.T.values)
-
-            # 计算自由度
-            df_between = len(numerical_df.columns) - 1
-            df_within = numerical_df.size - len(numerical_df.columns)
-
-            # 计算效应量（Eta平方）
-            sst = ((numerical_df - numerical_df.values.flatten().mean()) ** 2).sum().sum()
-            ssb = sum(
-                [len(numerical_df[col]) * (numerical_df[col].mean() - numerical_df.values.flatten().mean()) ** 2 for col in
-                 numerical_df.columns])
-            eta_squared = ssb / sst
-
-            # 计算样本量和均值
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-
-            # 整理数据
-            data = [
-                ["方差分析", f_stat, df_between, df_within, p_value, eta_squared],
-                ["样本量", sample_sizes.to_dict(), "", "", "", ""],
-                ["均值", means.to_dict(), "", "", "", ""]
-            ]
-            headers = ["统计量", "F统计量", "组间自由度", "组内自由度", "p值", "效应量（Eta平方）"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["多样本方差分析", "样本量", "均值", "F统计量", "自由度", "p值", "效应量"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["F统计量", "p值", "自由度", "样本量", "均值", "效应量"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=df_result.shape[0] + 1, cols=df_result.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(df_result.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(df_result.shape[1]):
-                        row_cells[col_idx].text = str(df_result.iloc[row_idx, col_idx])
-
-                # 添加解释说明表格
-                doc.add_heading('解释说明' if self.current_language == 'zh' else 'Explanation', level=2)
-                table = doc.add_table(rows=explanation_df.shape[0] + 1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(explanation_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(explanation_df.shape[1]):
-                        row_cells[col_idx].text = str(explanation_df.iloc[row_idx, col_idx])
-
-                # 添加分析结果解读表格
-                doc.add_heading('结果解读' if self.current_language == 'zh' else 'Interpretation', level=2)
-                table = doc.add_table(rows=interpretation_df.shape[0] + 1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(interpretation_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(interpretation_df.shape[1]):
-                        row_cells[col_idx].text = str(interpretation_df.iloc[row_idx, col_idx])
-
-                # 绘制箱线图
-                plt.figure(figsize=(10, 6))
-                numerical_df.boxplot()
-                plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-                plt.xlabel('组' if self.current_language == 'zh' else 'Groups')
-                plt.ylabel('数值' if self.current_language == 'zh' else 'Values')
-                boxplot_path = save_path.replace('.docx', '_boxplot.png')
-                plt.savefig(boxplot_path)
-                plt.close()
-
-                # 绘制柱状图
-                plt.figure(figsize=(10, 6))
-                bars = plt.bar(numerical_df.columns, means)
-                for bar in bars:
-                    height = bar.get_height()
-                    plt.annotate(f'{height:.2f}',
-                                 xy=(bar.get_x() + bar.get_width() / 2, height),
-                                 xytext=(0, 3),  # 3 points vertical offset
-                                 textcoords="offset points",
-                                 ha='center', va='bottom')
-                plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-                plt.xlabel('组' if self.current_language == 'zh' else 'Groups')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                barplot_path = save_path.replace('.docx', '_barplot.png')
-                plt.savefig(barplot_path)
-                plt.close()
-
-                # 绘制均值图
-                plt.figure(figsize=(10, 6))
-                plt.plot(numerical_df.columns, means, marker='o')
-                plt.title('均值图' if self.current_language == 'zh' else 'Mean Plot')
-                plt.xlabel('组' if self.current_language == 'zh' else 'Groups')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                meanplot_path = save_path.replace('.docx', '_meanplot.png')
-                plt.savefig(meanplot_path)
-                plt.close()
-
-                # 在 Word 文档中添加图片
-                doc.add_heading('箱线图' if self.current_language == 'zh' else 'Box Plot', level=2)
-                doc.add_picture(boxplot_path, width=Inches(6))
-                doc.add_heading('柱状图' if self.current_language == 'zh' else 'Bar Chart', level=2)
-                doc.add_picture(barplot_path, width=Inches(6))
-                doc.add_heading('均值图' if self.current_language == 'zh' else 'Mean Plot', level=2)
-                doc.add_picture(meanplot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]['analysis_complete'].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -272,6 +245,7 @@ class MultiSampleANOVAApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -280,7 +254,7 @@ class MultiSampleANOVAApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -311,6 +285,10 @@ class MultiSampleANOVAApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
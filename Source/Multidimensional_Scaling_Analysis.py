@@ -1,18 +1,23 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
 from sklearn.manifold import MDS
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multivariate import multidimensional_scaling
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -57,6 +62,67 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 每行为一个对象，每列为一个特征
+    :return: MdsResult
+    """
+    return multidimensional_scaling(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    mds_result = result.coordinates
+
+    # 整理数据
+    all_data = [[f"对象{j + 1}", point[0], point[1]] for j, point in enumerate(mds_result)]
+    df_result = pd.DataFrame(all_data, columns=["对象", "维度1", "维度2"])
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "指标_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "指标_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    # 生成多维尺度分析图
+    image_path = os.path.join(plot_dir, f"{stem}_mds_plot.png")
+    fig = new_figure(figsize=(10, 8))
+    ax = fig.subplots()
+    ax.scatter(mds_result[:, 0], mds_result[:, 1])
+    for j, point in enumerate(mds_result):
+        ax.annotate(f"对象{j + 1}", (point[0], point[1]))
+    ax.set_title('多维尺度分析图' if language == 'zh' else 'Multidimensional Scaling Plot')
+    ax.set_xlabel('维度1' if language == 'zh' else 'Dimension 1')
+    ax.set_ylabel('维度2' if language == 'zh' else 'Dimension 2')
+    fig.savefig(image_path)
+
+    doc = new_document()
+    doc.add_heading('多维尺度分析结果' if language == 'zh' else 'Multidimensional Scaling Analysis Results', 0)
+    add_dataframe_table(doc, df_result)
+    doc.add_paragraph()
+    add_dataframe_table(doc, explanation_df)
+    doc.add_paragraph()
+    add_dataframe_table(doc, interpretation_df)
+    doc.add_picture(image_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [image_path]
+
+
 class MultidimensionalScalingAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -89,16 +155,6 @@ class MultidimensionalScalingAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def mds_analysis(self, data):
-        try:
-            # 进行多维尺度分析
-            mds = MDS(n_components=2, random_state=42)
-            mds_result = mds.fit_transform(data)
-            return mds_result
-        except Exception as e:
-            print(f"多维尺度分析出错: {e}")
-            return None
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -107,110 +163,24 @@ class MultidimensionalScalingAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-            # 将特征名称转换为字符串类型
-            df.columns = df.columns.astype(str)
-
-            # 进行多维尺度分析
-            mds_result = self.mds_analysis(df)
-            if mds_result is None:
-                raise ValueError("多维尺度分析失败")
-
-            # 整理数据
-            all_data = []
-            for j, point in enumerate(mds_result):
-                all_data.append([f"对象{j + 1}", point[0], point[1]])
-            headers = ["对象", "维度1", "维度2"]
-            df_result = pd.DataFrame(all_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["多维尺度分析" if self.current_language == 'zh' else "Multidimensional Scaling Analysis"])
-            explanation_df.insert(0, "指标_解释说明",
-                              "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["多维尺度分析" if self.current_language == 'zh' else "Multidimensional Scaling Analysis"])
-            interpretation_df.insert(0, "指标_结果解读",
-                                 "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 生成多维尺度分析图
-            plt.figure(figsize=(10, 8))
-            plt.scatter(mds_result[:, 0], mds_result[:, 1])
-            for j, point in enumerate(mds_result):
-                plt.annotate(f"对象{j + 1}", (point[0], point[1]))
-            plt.title('多维尺度分析图' if self.current_language == 'zh' else 'Multidimensional Scaling Plot')
-            plt.xlabel('维度1' if self.current_language == 'zh' else 'Dimension 1')
-            plt.ylabel('维度2' if self.current_language == 'zh' else 'Dimension 2')
-
-            # 保存图片
-            image_path = os.path.splitext(file_path)[0] + '_mds_plot.png'
-            plt.savefig(image_path)
-            plt.close()
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('多维尺度分析结果' if self.current_language == 'zh' else 'Multidimensional Scaling Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(df_result.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(df_result.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in df_result.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_paragraph()
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(explanation_df.columns):
-                    hdr_cells[i].text = col
-                for index, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_paragraph()
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(interpretation_df.columns):
-                    hdr_cells[i].text = col
-                for index, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加图片
-                doc.add_picture(image_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -227,6 +197,7 @@ class MultidimensionalScalingAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -234,7 +205,7 @@ class MultidimensionalScalingAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -265,6 +236,10 @@ class MultidimensionalScalingAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,18 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
-import pandas as pd
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, roc_auc_score
-import statsmodels.api as sm
-from sklearn.preprocessing import label_binarize
-from docx import Document
+from sklearn.metrics import roc_curve
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multinomial import multinomial_logit
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -31,11 +35,19 @@ languages = {
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
         'images_saved': "图片已保存到 {}",
+        'report_title': "多分类Logit回归分析结果",
+        'reference_note': "因变量 {} 以类别 {} 为参照，其余每个类别相对参照类别各有一组系数，所有系数在一次联合拟合中求出。",
+        'not_converged': "注意：牛顿法在最大迭代次数内未收敛，可能存在完全分离，系数和标准误仅供参考。",
+        'statistics_heading': "模型统计量",
+        'coefficients_heading': "回归系数",
         'explanation': {
-            "Coefficients": "回归系数，表示每个自变量对因变量的影响程度。",
-            "Intercept": "截距，是当所有自变量为 0 时因变量的预测值。",
+            "Coefficients": "回归系数，表示自变量增加一个单位时，该类别相对参照类别的对数几率的变化。",
+            "Intercept": "截距，是当所有自变量为 0 时该类别相对参照类别的对数几率。",
+            "Relative Risk Ratio": "相对风险比 exp(B)，自变量增加一个单位时，选择该类别与选择参照类别的概率之比变为原来的倍数。",
             "Accuracy": "准确率，衡量模型预测正确的比例。",
-            "ROC-AUC": "ROC曲线下面积，衡量模型的分类能力。",
+            "ROC-AUC": "ROC曲线下面积，衡量模型的分类能力；微平均把所有类别合并计算，宏平均为各类别一对其余 AUC 的平均。",
+            "Pseudo R-squared (McFadden)": "McFadden 伪 R²，1 减去模型与只含截距的模型的对数似然之比。",
+            "LLR": "似然比统计量，检验所有自变量的系数是否同时为 0。",
             "z-value": "z 统计量，用于检验每个自变量的显著性。",
             "p-value": "p 值，用于判断自变量的显著性，p 值越小，自变量越显著。"
         }
@@ -52,17 +64,93 @@ languages = {
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
         'images_saved': "Images have been saved to {}",
+        'report_title': "Multinomial Logit Regression Analysis Results",
+        'reference_note': "The dependent variable {} uses class {} as the reference. Every other class has its own set of coefficients against the reference, and all of them come from one joint fit.",
+        'not_converged': "Note: Newton's method did not converge within the maximum number of iterations. There may be complete separation, so the coefficients and standard errors are for reference only.",
+        'statistics_heading': "Model Statistics",
+        'coefficients_heading': "Coefficients",
         'explanation': {
-            "Coefficients": "Regression coefficients, indicating the influence of each independent variable on the dependent variable.",
-            "Intercept": "Intercept, which is the predicted value of the dependent variable when all independent variables are 0.",
+            "Coefficients": "Regression coefficients, the change in the log odds of the class against the reference class for a one-unit increase in the independent variable.",
+            "Intercept": "Intercept, the log odds of the class against the reference class when all independent variables are 0.",
+            "Relative Risk Ratio": "exp(B), the factor by which the ratio of the probabilities of the class and the reference class changes for a one-unit increase in the independent variable.",
             "Accuracy": "Accuracy, measuring the proportion of correct predictions of the model.",
-            "ROC-AUC": "Area under the ROC curve, measuring the classification ability of the model.",
+            "ROC-AUC": "Area under the ROC curve, measuring the classification ability of the model. The micro-average pools all classes; the macro-average is the mean of the one-vs-rest AUCs.",
+            "Pseudo R-squared (McFadden)": "McFadden pseudo R-squared, 1 minus the ratio of the log-likelihoods of the model and the intercept-only model.",
+            "LLR": "Likelihood ratio statistic, testing whether the coefficients of all independent variables are 0 at once.",
             "z-value": "z statistic, used to test the significance of each independent variable.",
             "p-value": "p value, used to determine the significance of the independent variable. The smaller the p value, the more significant the independent variable."
         }
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量（类别），其余列为自变量；文本型自变量按水平展开
+    :return: MultinomialResult
+    """
+    return multinomial_logit(df)
+
+
+def plot_roc(result, path):
+    """
+    微平均 ROC 曲线
+    :param result: analyze 返回的结果
+    :param path: 图片保存路径
+    """
+    indicator = result.outcomes[:, None] == range(len(result.classes))
+    fpr, tpr, _ = roc_curve(indicator.ravel(), result.probabilities.ravel())
+    auc = result.statistics.set_index("Statistic").loc["ROC-AUC (Micro-average)", "Value"]
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(fpr, tpr, label=f'ROC curve (area = {auc:.2f})')
+    ax.plot([0, 1], [0, 1], 'k--')
+    ax.set_xlim([0.0, 1.0])
+    ax.set_ylim([0.0, 1.05])
+    ax.set_xlabel('False Positive Rate')
+    ax.set_ylabel('True Positive Rate')
+    ax.set_title('Receiver Operating Characteristic (Micro-average)')
+    ax.legend(loc="lower right")
+    fig.savefig(path)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['reference_note'].format(result.target, result.reference))
+    if not result.converged:
+        doc.add_paragraph(texts['not_converged'])
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = os.path.join(plot_dir, f"{stem}_multinomial_logit_regression_roc.png")
+    plot_roc(result, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class MultinomialLogitRegressionApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -103,115 +191,25 @@ class MultinomialLogitRegressionApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1].values
-            y = df.iloc[:, -1].values
-
-            # 进行多分类Logit回归分析
-            logit = LogisticRegression(solver='lbfgs')
-            logit.fit(X, y)
-            y_pred = logit.predict(X)
-            y_pred_proba = logit.predict_proba(X)
-
-            # 计算指标
-            coefficients = logit.coef_
-            intercept = logit.intercept_
-            accuracy = accuracy_score(y, y_pred)
-
-            # 计算多分类的 ROC-AUC（微平均）
-            y_binarized = label_binarize(y, classes=np.unique(y))
-            roc_auc = roc_auc_score(y_binarized, y_pred_proba, multi_class='ovr', average='micro')
-
-            # 计算 z 值和 p 值
-            X_with_const = sm.add_constant(X)
-            unique_classes = np.unique(y)
-            z_values_list = []
-            p_values_list = []
-            for cls in unique_classes:
-                y_binary = (y == cls).astype(int)
-                logit_model = sm.Logit(y_binary, X_with_const).fit()
-                z_values_list.append(logit_model.tvalues)
-                p_values_list.append(logit_model.pvalues)
-
-            # 准备数据
-            columns_stats = ["Coefficients", "z-value", "p-value", "Accuracy", "ROC-AUC"]
-            explanations = languages[self.current_language]['explanation']
-            data = []
-            for i, cls in enumerate(unique_classes):
-                row = [f"Multinomial Logit Regression (Class {cls})"] + list(coefficients[i]) + [intercept[i], accuracy, roc_auc] + list(z_values_list[i]) + list(p_values_list[i])
-                data.append(row)
-
-            headers = ["Model"] + [f"Coefficient_{i+1}" for i in range(len(coefficients[0]))] + ["Intercept"] + columns_stats[3:] + [f"z-value_{i+1}" for i in range(len(z_values_list[0]))] + [f"p-value_{i+1}" for i in range(len(p_values_list[0]))]
-
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df_result, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx, row in transposed_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成ROC曲线（微平均）
-                from sklearn.metrics import roc_curve
-                fpr, tpr, thresholds = roc_curve(y_binarized.ravel(), y_pred_proba.ravel())
-                plt.figure(figsize=(10, 6))
-                plt.plot(fpr, tpr, label=f'ROC curve (area = {roc_auc:.2f})')
-                plt.plot([0, 1], [0, 1], 'k--')
-                plt.xlim([0.0, 1.0])
-                plt.ylim([0.0, 1.05])
-                plt.xlabel('False Positive Rate')
-                plt.ylabel('True Positive Rate')
-                plt.title('Receiver Operating Characteristic (Micro-average)')
-                plt.legend(loc="lower right")
-                img_name = "multinomial_logit_regression_roc.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
-
-    def switch_language(self, event):
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -225,6 +223,7 @@ class MultinomialLogitRegressionApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -233,7 +232,7 @@ class MultinomialLogitRegressionApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -264,6 +263,10 @@ class MultinomialLogitRegressionApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
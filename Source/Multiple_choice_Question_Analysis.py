@@ -2,17 +2,28 @@ import tkinter as tk
 from tkinter import filedialog
 import os
 import numpy as np
-import pandas as pd
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multiple_choice import multiple_choice_analysis, multiple_choice_stream
+from dias.dataset import iter_cell_batches, load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
 
+# 柱状图最多显示的选项数
+MAX_BAR_OPTIONS = 40
+
 # 定义语言字典
 languages = {
     'zh': {
@@ -26,13 +37,23 @@ languages = {
         'analysis_complete': "分析完成，结果已保存到 {}，相关图片已保存。",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
+        'report_title': "问卷多选题分析结果",
+        'sample_summary': "样本量: {}，至少选择一个选项的人数: {}",
+        'counts_heading': "选项选择次数",
+        'cooccurrence_heading': "选项共现矩阵（前 {} 个选项）",
+        'bar_title': "选项选择次数柱状图",
+        'bar_xlabel': "选项",
+        'bar_ylabel': "选择次数",
+        'heatmap_title': "选项共现矩阵",
         'explanation': {
-            "选项选择次数": "每个选项被选择的总次数。",
-            "样本量": "参与问卷的总人数。"
+            "Count": "选择该选项的人数，同一受访者重复选择同一选项只计一次。",
+            "Percent of Respondents": "选择该选项的人数占至少选择了一个选项的人数的百分比，各选项之和可以超过 100%。",
+            "Percent of Responses": "该选项的选择次数占全部选择次数的百分比，各选项之和为 100%。",
+            "Co-occurrence": "共现矩阵中第 i 行第 j 列为同时选择选项 i 和选项 j 的人数，对角线为各选项的选择人数。"
         },
         'interpretation': {
-            "选项选择次数": "选择次数越多，说明该选项在问卷中越受欢迎。",
-            "样本量": "样本量的大小会影响统计结果的可靠性，较大的样本量通常能提供更可靠的结果。"
+            "Count": "选择人数越多，说明该选项越受关注。",
+            "Co-occurrence": "两个选项的共现人数接近其中较少一方的选择人数时，说明这两个选项经常被一起选择。"
         }
     },
     'en': {
@@ -46,17 +67,127 @@ languages = {
         'analysis_complete': "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
+        'report_title': "Multiple-choice Question Analysis Results",
+        'sample_summary': "Sample size: {}, respondents who selected at least one option: {}",
+        'counts_heading': "Option Selection Counts",
+        'cooccurrence_heading': "Option Co-occurrence Matrix (top {} options)",
+        'bar_title': "Bar Chart of Option Selection Counts",
+        'bar_xlabel': "Options",
+        'bar_ylabel': "Selection Counts",
+        'heatmap_title': "Option Co-occurrence Matrix",
         'explanation': {
-            "选项选择次数": "The total number of times each option was selected.",
-            "样本量": "The total number of people participating in the questionnaire."
+            "Count": "The number of respondents who selected the option. Selecting the same option twice counts once.",
+            "Percent of Respondents": "The count as a percentage of respondents who selected at least one option. The percentages can add up to more than 100%.",
+            "Percent of Responses": "The count as a percentage of all selections. The percentages add up to 100%.",
+            "Co-occurrence": "Row i, column j of the co-occurrence matrix is the number of respondents who selected both option i and option j. The diagonal holds the counts of each option."
         },
         'interpretation': {
-            "选项选择次数": "The more times an option is selected, the more popular it is in the questionnaire.",
-            "样本量": "The sample size affects the reliability of the statistical results. A larger sample size usually provides more reliable results."
+            "Count": "A higher count means the option received more attention.",
+            "Co-occurrence": "When the co-occurrence of two options is close to the smaller of their counts, the two options are usually selected together."
         }
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，单元格中的多个选项以逗号分隔
+    :return: MultipleChoiceResult
+    """
+    return multiple_choice_analysis(df)
+
+
+def analyze_path(file_path):
+    """
+    以只读模式流式读取 .xlsx 工作簿并计算，不在内存中保留原始文本；其他格式整表读取
+    :param file_path: 工作簿路径
+    :return: MultipleChoiceResult
+    """
+    if os.path.splitext(file_path)[1].lower() != '.xlsx':
+        return analyze(load_excel(file_path))
+    return multiple_choice_stream(iter_cell_batches(file_path))
+
+
+def plot_counts(counts, img_path, language='en'):
+    """
+    绘制选择人数最多的若干选项的柱状图
+    """
+    texts = languages[language]
+    top = counts["Count"].iloc[:MAX_BAR_OPTIONS]
+    fig = new_figure(figsize=(max(6, 0.3 * len(top) + 2), 5))
+    ax = fig.subplots()
+    ax.bar(np.arange(len(top)), top.to_numpy())
+    ax.set_xticks(np.arange(len(top)), top.index, rotation=90)
+    ax.set_title(texts['bar_title'])
+    ax.set_xlabel(texts['bar_xlabel'])
+    ax.set_ylabel(texts['bar_ylabel'])
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def plot_cooccurrence(cooccurrence, img_path, language='en'):
+    """
+    绘制共现矩阵热图
+    """
+    size = max(5, 0.3 * len(cooccurrence) + 3)
+    fig = new_figure(figsize=(size, size))
+    ax = fig.subplots()
+    image = ax.imshow(cooccurrence.to_numpy(), cmap='Blues')
+    ax.set_xticks(np.arange(len(cooccurrence)), cooccurrence.columns, rotation=90, fontsize=8)
+    ax.set_yticks(np.arange(len(cooccurrence)), cooccurrence.index, fontsize=8)
+    ax.set_title(languages[language]['heatmap_title'])
+    fig.colorbar(image, ax=ax)
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['sample_summary'].format(result.sample_size, result.respondents))
+
+    doc.add_heading(texts['counts_heading'], level=2)
+    add_dataframe_table(doc, result.counts.round(2), index=True, index_label="Option")
+    doc.add_heading(texts['cooccurrence_heading'].format(len(result.cooccurrence)), level=2)
+    add_dataframe_table(doc, result.cooccurrence, index=True, index_label="Option")
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    image_paths = []
+    if len(result.counts):
+        image_paths.append(plot_counts(result.counts, os.path.join(plot_dir, f"{stem}.png"), language))
+        image_paths.append(plot_cooccurrence(result.cooccurrence,
+                                             os.path.join(plot_dir, f"{stem}_cooccurrence.png"), language))
+        for img_path in image_paths:
+            doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return image_paths
+
+
 class MultipleChoiceQuestionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -89,22 +220,6 @@ class MultipleChoiceQuestionAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def multiple_choice_analysis(self, data):
-        # 假设多选题答案以逗号分隔存储在单元格中
-        all_choices = {}
-        for column in data.columns:
-            for cell in data[column].dropna():
-                choices = str(cell).split(',')
-                for choice in choices:
-                    choice = choice.strip()
-                    if choice in all_choices:
-                        all_choices[choice] += 1
-                    else:
-                        all_choices[choice] = 1
-
-        sample_size = len(data)
-        return all_choices, sample_size
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -113,76 +228,24 @@ class MultipleChoiceQuestionAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 进行多选题分析
-            choice_counts, sample_size = self.multiple_choice_analysis(df)
-
-            # 整理数据
-            data = [
-                ["选项选择次数", pd.Series(choice_counts).to_dict(), ""],
-                ["样本量", sample_size, ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["选项选择次数", "样本量"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["选项选择次数", "样本量"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=len(combined_df) + 1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx, row in combined_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成图片（选项选择次数柱状图）
-                fig, ax = plt.subplots()
-                pd.Series(choice_counts).plot(kind='bar', ax=ax)
-                ax.set_title('选项选择次数柱状图' if self.current_language == 'zh' else 'Bar Chart of Option Selection Counts')
-                ax.set_xlabel('选项' if self.current_language == 'zh' else 'Options')
-                ax.set_ylabel('选择次数' if self.current_language == 'zh' else 'Selection Counts')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        # 以只读模式流式读取 Excel 文件
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze_path, write_report, load=None, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -198,6 +261,7 @@ class MultipleChoiceQuestionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -206,7 +270,7 @@ class MultipleChoiceQuestionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -237,6 +301,10 @@ class MultipleChoiceQuestionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,18 +1,24 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
 import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import tkinter.simpledialog
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.survey import nps_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -30,6 +36,9 @@ languages = {
         'analysis_complete': "分析完成，结果已保存到 {}，相关图片已保存。",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
+        'question_column_prompt': "请输入NPS问题的列名（点击取消结束输入）",
+        'empty_question_column': "输入的列名不能为空，请重新输入。",
+        'no_question_columns': "未输入有效的问题列名，分析取消。",
         'explanation': {
             "推荐者": "给出9 - 10分的客户，是产品或服务的忠实拥护者，会积极推荐给他人。",
             "被动者": "给出7 - 8分的客户，对产品或服务基本满意，但不会主动推荐。",
@@ -45,15 +54,18 @@ languages = {
     },
     'en': {
         'title': "NPS Net Promoter Score Analysis",
-        'select_button_text': "Select Files",
+        'select_button_text': "Select File",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
-        'analyze_button_text': "Analyze Files",
+        'analyze_button_text': "Analyze File",
         'no_file_selected': "Please select a valid file path.",
         'file_not_exists': "The file does not exist. Please select again.",
         'analysis_error': "An error occurred while analyzing the file: {}",
         'analysis_complete': "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
+        'question_column_prompt': "Please enter the name of an NPS question column (click Cancel to finish input)",
+        'empty_question_column': "The column name entered cannot be empty. Please re-enter.",
+        'no_question_columns': "No valid question column names entered. Analysis canceled.",
         'explanation': {
             "Promoters": "Customers who give a score of 9 - 10 are loyal advocates of the product or service and will actively recommend it to others.",
             "Passives": "Customers who give a score of 7 - 8 are generally satisfied with the product or service but will not actively recommend it.",
@@ -69,6 +81,83 @@ languages = {
     }
 }
 
+
+def analyze(df, question_columns=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每行为一位受访者
+    :param question_columns: NPS 问题的列名，默认为所有数值列
+    :return: NpsResult
+    """
+    return nps_analysis(df, question_columns)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    all_data = []
+    for question, row in result.table.iterrows():
+        all_data += [
+            [f"{question}_推荐者数量", int(row["Promoters"])],
+            [f"{question}_推荐者比例", row["Promoters (%)"]],
+            [f"{question}_被动者数量", int(row["Passives"])],
+            [f"{question}_被动者比例", row["Passives (%)"]],
+            [f"{question}_贬损者数量", int(row["Detractors"])],
+            [f"{question}_贬损者比例", row["Detractors (%)"]],
+            [f"{question}_NPS净推荐值", row["NPS"]]
+        ]
+    headers = ["指标", "数值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "指标_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "指标_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('NPS净推荐值分析结果' if language == 'zh' else 'NPS Net Promoter Score Analysis Results', 0)
+    add_table(doc, all_data, headers=headers)
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成各类型占比情况柱状图，每个问题一组
+    categories = list(texts['explanation'])[:3]
+    percentages = result.table[["Promoters (%)", "Passives (%)", "Detractors (%)"]]
+    plot_title = '各类型占比情况' if language == 'zh' else 'Percentage of Each Type'
+    img_path = os.path.join(plot_dir, f"{stem}_types.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    x = np.arange(len(categories))
+    width = 0.8 / len(percentages)
+    for i, (question, row) in enumerate(percentages.iterrows()):
+        ax.bar(x + i * width, row.to_numpy(), width, label=str(question))
+    ax.set_title(plot_title)
+    ax.set_ylabel('比例 (%)' if language == 'zh' else 'Percentage (%)')
+    ax.set_xticks(x + width * (len(percentages) - 1) / 2, categories)
+    ax.legend()
+    fig.savefig(img_path)
+    doc.add_heading(plot_title, 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class NPSNetPromoterScoreAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -85,10 +174,10 @@ class NPSNetPromoterScoreAnalysisApp:
         self.create_ui()
         
     def select_file(self):
-        file_paths = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx;*.xls")])
-        if file_paths:
+        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+        if file_path:
             self.file_entry.delete(0, tk.END)
-            self.file_entry.insert(0, ", ".join(file_paths))
+            self.file_entry.insert(0, file_path)
             self.file_entry.config(foreground='black')
 
     def on_entry_click(self, event):
@@ -101,183 +190,57 @@ class NPSNetPromoterScoreAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def nps_analysis(self, data, question_columns):
-        all_results = []
-        for question_column in question_columns:
-            if question_column not in data.columns:
-                print(f"列名 {question_column} 不在文件中，跳过该列分析。")
-                continue
-            responses = data[question_column]
-            promoters = (responses >= 9).sum()
-            passives = ((responses >= 7) & (responses <= 8)).sum()
-            detractors = (responses <= 6).sum()
-            total = len(responses)
-            promoter_percentage = promoters / total * 100
-            passive_percentage = passives / total * 100
-            detractor_percentage = detractors / total * 100
-            nps = promoter_percentage - detractor_percentage
-
-            # 各分数段占比情况
-            score_bins = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
-            score_counts = pd.cut(responses, bins=score_bins, right=False).value_counts().sort_index()
-            score_percentages = score_counts / total * 100
-
-            results = {
-                f"{question_column}_推荐者数量": promoters,
-                f"{question_column}_推荐者比例": promoter_percentage,
-                f"{question_column}_被动者数量": passives,
-                f"{question_column}_被动者比例": passive_percentage,
-                f"{question_column}_贬损者数量": detractors,
-                f"{question_column}_贬损者比例": detractor_percentage,
-                f"{question_column}_NPS净推荐值": nps,
-                f"{question_column}_各分数段占比情况": score_percentages
-            }
-            all_results.append(results)
-        return all_results
+    def read_params(self):
+        """
+        通过对话框依次输入 NPS 问题的列名
+        :return: 传给 analyze 的参数；没有输入列名时返回 None
+        """
+        question_columns = []
+        while True:
+            question_column = tkinter.simpledialog.askstring(
+                "输入信息", languages[self.current_language]["question_column_prompt"])
+            if question_column is None:
+                break
+            if question_column.strip():
+                question_columns.append(question_column.strip())
+            else:
+                self.result_label.config(text=languages[self.current_language]["empty_question_column"])
+        if not question_columns:
+            return None
+        return {"question_columns": question_columns}
 
     def analyze_file(self):
-        file_paths = self.file_entry.get().split(", ")
-        if not file_paths or file_paths[0] == languages[self.current_language]["file_entry_placeholder"]:
+        file_path = self.file_entry.get()
+        if file_path == languages[self.current_language]["file_entry_placeholder"]:
             self.result_label.config(text=languages[self.current_language]["no_file_selected"])
             return
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                self.result_label.config(text=languages[self.current_language]["file_not_exists"])
-                return
-        try:
-            question_columns = []
-            while True:
-                question_column = tkinter.simpledialog.askstring("输入信息", "请输入NPS问题的列名（点击取消结束输入）")
-                if question_column is None:
-                    break
-                if question_column.strip():
-                    question_columns.append(question_column.strip())
-                else:
-                    print("输入的列名不能为空，请重新输入。")
-
-            if not question_columns:
-                self.result_label.config(text="未输入有效的问题列名，分析取消。")
-                return
-
-            all_results = []
-            all_score_percentages = []
-            file_names = []
-            for file_path in file_paths:
-                # 打开 Excel 文件
-                df = pd.read_excel(file_path)
-
-                # 进行NPS分析
-                nps_results = self.nps_analysis(df, question_columns)
-                all_results.extend(nps_results)
-                for result in nps_results:
-                    for key, value in result.items():
-                        if "_各分数段占比情况" in key:
-                            all_score_percentages.append(value)
-                file_names.extend([os.path.basename(file_path)] * len([res for res in nps_results if res]))
-
-            # 整理数据
-            all_data = []
-            for i, results in enumerate(all_results):
-                if results:
-                    data = []
-                    for key, value in results.items():
-                        if "_各分数段占比情况" not in key:
-                            data.append([f"{file_names[i]}_{key}", value])
-                    all_data.extend(data)
-            headers = ["指标", "数值"]
-            df_result = pd.DataFrame(all_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["推荐者" if self.current_language == 'zh' else "Promoters", 
-                         "被动者" if self.current_language == 'zh' else "Passives", 
-                         "贬损者" if self.current_language == 'zh' else "Detractors", 
-                         "NPS净推荐值" if self.current_language == 'zh' else "NPS Net Promoter Score"])
-            explanation_df.insert(0, "指标_解释说明",
-                              "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["推荐者" if self.current_language == 'zh' else "Promoters", 
-                         "被动者" if self.current_language == 'zh' else "Passives", 
-                         "贬损者" if self.current_language == 'zh' else "Detractors", 
-                         "NPS净推荐值" if self.current_language == 'zh' else "NPS Net Promoter Score"])
-            interpretation_df.insert(0, "指标_结果解读",
-                                 "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat(
-                [df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('NPS净推荐值分析结果' if self.current_language == 'zh' else 'NPS Net Promoter Score Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(combined_df.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成各类型占比情况柱状图
-                categories = ["推荐者" if self.current_language == 'zh' else "Promoters", 
-                             "被动者" if self.current_language == 'zh' else "Passives", 
-                             "贬损者" if self.current_language == 'zh' else "Detractors"]
-                percentages_list = []
-                valid_results = [res for res in all_results if res]
-                for result in valid_results:
-                    base_key = list(result.keys())[0].split('_')[0]
-                    keys = [f"{base_key}_推荐者比例", f"{base_key}_被动者比例", f"{base_key}_贬损者比例"]
-                    if all(key in result for key in keys):
-                        percentages = [result[key] for key in keys]
-                        percentages_list.append(percentages)
-
-                # 绘制柱状图
-                plt.figure(figsize=(10, 6))
-                x = np.arange(len(categories))
-                width = 0.8 / len(percentages_list) if percentages_list else 0.8
-                for i, percentages in enumerate(percentages_list):
-                    plt.bar(x + i * width, percentages, width, label=f"File {i+1}")
-
-                plt.title('各类型占比情况' if self.current_language == 'zh' else 'Percentage of Each Type')
-                plt.ylabel('比例 (%)' if self.current_language == 'zh' else 'Percentage (%)')
-                plt.xticks(x + width * (len(percentages_list) - 1) / 2 if percentages_list else x, categories)
-                plt.legend()
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_types.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 添加图片到文档
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+        if not os.path.exists(file_path):
+            self.result_label.config(text=languages[self.current_language]["file_not_exists"])
+            return
+        params = self.read_params()
+        if params is None:
+            self.result_label.config(text=languages[self.current_language]["no_question_columns"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
 
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
-    def switch_language(self, event):
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -292,6 +255,7 @@ class NPSNetPromoterScoreAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -299,7 +263,7 @@ class NPSNetPromoterScoreAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -330,6 +294,10 @@ class NPSNetPromoterScoreAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
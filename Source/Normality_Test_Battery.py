@@ -0,0 +1,265 @@
+import tkinter as tk
+from tkinter import filedialog
+import os
+import sys
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+import matplotlib.pyplot as plt
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias 计算层
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.normality import NORMALITY_TESTS, normality_battery
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_normality_figures
+from dias.report import add_table, new_document
+
+# 设置 matplotlib 支持中文
+plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
+plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+
+# 定义语言字典
+LANGUAGES = {
+    'zh': {
+        'title': "正态性检验组合",
+        'select_button': "选择文件",
+        'analyze_button': "分析文件",
+        'file_not_found': "文件不存在，请重新选择。",
+        'no_test_selected': "请至少选择一种检验。",
+        'analysis_success': "分析完成，结果已保存到 {}\n",
+        'no_save_path': "未选择保存路径，结果未保存。",
+        'analysis_error': "分析文件时出错: {}",
+        'switch_language': "切换语言",
+        'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
+        'report_title': "正态性检验结果",
+        'figures_title': "正态分布相关图",
+        'skipped_title': "未能进行的检验",
+        'headers': ["列名", "检验", "统计量", "p值 / 临界值(0.05)", "结果解读"],
+        'interpretation_accept': "在 0.05 的显著性水平下，不能拒绝原假设，样本可能来自正态分布。",
+        'interpretation_reject': "在 0.05 的显著性水平下，拒绝原假设，样本不太可能来自正态分布。"
+    },
+    'en': {
+        'title': "Normality Test Battery",
+        'select_button': "Select File",
+        'analyze_button': "Analyze File",
+        'file_not_found': "The file does not exist. Please select again.",
+        'no_test_selected': "Please select at least one test.",
+        'analysis_success': "Analysis completed. The results have been saved to {}\n",
+        'no_save_path': "No save path selected. The results were not saved.",
+        'analysis_error': "An error occurred while analyzing the file: {}",
+        'switch_language': "Switch Language",
+        'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
+        'report_title': "Normality Test Results",
+        'figures_title': "Normal Distribution Plots",
+        'skipped_title': "Tests that could not be run",
+        'headers': ["Column Name", "Test", "Statistic", "P-value / Critical Value (0.05)", "Result Interpretation"],
+        'interpretation_accept': "At the 0.05 significance level, the null hypothesis cannot be rejected. The sample may come from a normal distribution.",
+        'interpretation_reject': "At the 0.05 significance level, the null hypothesis is rejected. The sample is unlikely to come from a normal distribution."
+    }
+}
+
+
+def analyze(df, tests=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每个含数字的列单独检验
+    :param tests: 要运行的检验名称，默认运行全部检验
+    :return: NormalityResult
+    """
+    return normality_battery(df, tests=tests)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    interpretations = {False: texts['interpretation_accept'], True: texts['interpretation_reject'], None: ""}
+
+    # 创建 Word 文档
+    doc = new_document()
+
+    # 添加标题
+    doc.add_heading(texts['report_title'], 0)
+
+    # 添加表格，每列数据的每个检验占一行
+    rows_by_test = [(test, result.rows(test)) for test in result.tests]
+    data = []
+    for k in range(len(result.statistics.index)):
+        for test, rows in rows_by_test:
+            name, statistic, second, reject = rows[k]
+            data.append([name, test, statistic, second, interpretations[reject]])
+    add_table(doc, data, headers=texts['headers'])
+
+    # 样本量不足等原因未能进行的检验
+    if result.errors:
+        doc.add_heading(texts['skipped_title'], 1)
+        for key, message in result.errors.items():
+            doc.add_paragraph(f"{key}: {message}")
+
+    # 直方图、PP 图和 QQ 图，每张图片包含多列，并行渲染
+    img_paths = render_normality_figures(result.columns, plot_dir or os.path.dirname(save_path),
+                                         os.path.splitext(os.path.basename(save_path))[0])
+    doc.add_heading(texts['figures_title'], 1)
+    for img_path in img_paths:
+        doc.add_picture(img_path, width=Inches(6))
+
+    # 保存 Word 文档
+    doc.save(save_path)
+    return img_paths
+
+
+class NormalityTestBatteryApp:
+    def __init__(self, root=None):
+        # 当前语言，默认为英文
+        self.current_language = "en"
+
+        # 如果没有提供root，则创建一个新窗口
+        if root is None:
+            self.root = ttk.Window(themename="flatly")
+            self.root.title(LANGUAGES[self.current_language]["title"])
+        else:
+            self.root = root
+            self.root.title(LANGUAGES[self.current_language]["title"])
+
+        self.create_ui()
+
+    def select_file(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+        if file_path:
+            self.file_entry.delete(0, tk.END)
+            self.file_entry.insert(0, file_path)
+            self.file_entry.config(foreground='black')
+
+    def on_entry_click(self, event):
+        if self.file_entry.get() == LANGUAGES[self.current_language]["file_entry_placeholder"]:
+            self.file_entry.delete(0, tk.END)
+            self.file_entry.config(foreground='black')
+
+    def on_focusout(self, event):
+        if self.file_entry.get() == "":
+            self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
+            self.file_entry.config(foreground='gray')
+
+    def analyze_file(self):
+        file_path = self.file_entry.get()
+        if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        if not os.path.exists(file_path):
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
+            return
+        tests = [test for test, var in self.test_vars.items() if var.get()]
+        if not tests:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_test_selected"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, params={'tests': tests}, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+
+    def switch_language(self, event=None):
+        self.current_language = 'en' if self.current_language == 'zh' else 'zh'
+        self.root.title(LANGUAGES[self.current_language]['title'])
+        self.select_button.config(text=LANGUAGES[self.current_language]['select_button'])
+        self.analyze_button.config(text=LANGUAGES[self.current_language]['analyze_button'])
+        self.switch_language_label.config(text=LANGUAGES[self.current_language]['switch_language'])
+        # 切换语言时更新提示信息
+        self.file_entry.delete(0, tk.END)
+        self.file_entry.insert(0, LANGUAGES[self.current_language]['file_entry_placeholder'])
+        self.file_entry.config(foreground='gray')
+        self.job_panel.set_language(self.current_language)
+
+    def create_ui(self):
+        # 获取屏幕的宽度和高度
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+
+        # 设置窗口的宽度和高度
+        window_width = 500
+        window_height = 520
+
+        # 计算窗口应该放置的位置
+        x = (screen_width - window_width) // 2
+        y = (screen_height - window_height) // 2
+
+        # 设置窗口的位置和大小
+        self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
+
+        # 创建一个框架来包含按钮和输入框
+        frame = ttk.Frame(self.root)
+        frame.pack(expand=True)
+
+        # 创建文件选择按钮
+        self.select_button = ttk.Button(frame, text=LANGUAGES[self.current_language]["select_button"],
+                                        command=self.select_file, bootstyle=PRIMARY)
+        self.select_button.pack(pady=10)
+
+        # 创建文件路径输入框
+        self.file_entry = ttk.Entry(frame, width=50)
+        self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
+        self.file_entry.config(foreground='gray')
+        self.file_entry.bind('<FocusIn>', self.on_entry_click)
+        self.file_entry.bind('<FocusOut>', self.on_focusout)
+        self.file_entry.pack(pady=5)
+
+        # 创建检验选择框，默认全部选中，两列排列
+        tests_frame = ttk.Frame(frame)
+        tests_frame.pack(pady=5)
+        self.test_vars = {}
+        for i, test in enumerate(NORMALITY_TESTS):
+            self.test_vars[test] = tk.BooleanVar(value=True)
+            ttk.Checkbutton(tests_frame, text=test, variable=self.test_vars[test]).grid(
+                row=i // 2, column=i % 2, sticky='w', padx=10, pady=2)
+
+        # 创建分析按钮
+        self.analyze_button = ttk.Button(frame, text=LANGUAGES[self.current_language]["analyze_button"],
+                                         command=self.analyze_file, bootstyle=SUCCESS)
+        self.analyze_button.pack(pady=10)
+
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
+        # 创建切换语言标签
+        self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
+                                               foreground="gray", cursor="hand2")
+        self.switch_language_label.bind("<Button-1>", self.switch_language)
+        self.switch_language_label.pack(pady=10)
+
+        # 创建结果显示标签
+        self.result_label = ttk.Label(self.root, text="", justify=tk.LEFT)
+        self.result_label.pack(pady=10)
+
+    def run(self):
+        # 运行主循环
+        self.root.mainloop()
+
+
+# 为了向后兼容，保留原来的运行方式
+def run_app():
+    app = NormalityTestBatteryApp()
+    app.run()
+
+
+if __name__ == "__main__":
+    run_app()
@@ -1,17 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import obstacle_degree
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -60,6 +65,77 @@ languages = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，第一列是因素权重，第二列是因素状态值
+    :return: ObstacleResult
+    """
+    return obstacle_degree(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+    obstacle_degrees = result.obstacle
+
+    # 整理数据
+    factor_names = [f"因素{i + 1}" if zh else f"Factor {i + 1}" for i in range(len(obstacle_degrees))]
+    data = [
+        ["障碍度" if zh else "Obstacle Degree", obstacle_degrees.tolist(), ""],
+        ["障碍度占比" if zh else "Share of Obstacle Degree", result.share.tolist(), ""]
+    ]
+    headers = ["统计量" if zh else "Statistic",
+               "统计量值" if zh else "Value",
+               "p值" if zh else "p-value"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if zh else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if zh else "Interpretation")
+
+    # 生成障碍度柱状图
+    image_path = os.path.join(plot_dir, f"{stem}_obstacle_degree_bar.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(factor_names, obstacle_degrees)
+    ax.set_title('障碍度柱状图' if zh else 'Bar Chart of Obstacle Degree')
+    ax.set_xlabel('因素' if zh else 'Factors')
+    ax.set_ylabel('障碍度' if zh else 'Obstacle Degree')
+    fig.savefig(image_path)
+
+    doc = new_document()
+    doc.add_heading('障碍度模型分析结果' if zh else 'Obstacle Degree Model Analysis Results', 0)
+    add_table(doc, data, headers=headers)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+    doc.add_picture(image_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [image_path]
+
+
 class ObstacleDegreeModelAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -92,17 +168,6 @@ class ObstacleDegreeModelAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def obstacle_degree_method(self, data):
-        """
-        计算障碍度
-        :param data: 原始数据矩阵，假设第一列是因素权重，第二列是因素状态值
-        :return: 障碍度数组
-        """
-        weights = data[:, 0]
-        status_values = data[:, 1]
-        obstacle_degrees = weights * (1 - status_values)
-        return obstacle_degrees
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -111,94 +176,24 @@ class ObstacleDegreeModelAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行障碍度计算
-            obstacle_degrees = self.obstacle_degree_method(data)
-
-            # 整理数据
-            factor_names = [f"因素{i + 1}" if self.current_language == 'zh' else f"Factor {i + 1}" for i in range(data.shape[0])]
-            data = [
-                ["障碍度" if self.current_language == 'zh' else "Obstacle Degree", obstacle_degrees.tolist(), ""]
-            ]
-            headers = ["统计量" if self.current_language == 'zh' else "Statistic", 
-                      "统计量值" if self.current_language == 'zh' else "Value", 
-                      "p值" if self.current_language == 'zh' else "p-value"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["障碍度" if self.current_language == 'zh' else "Obstacle Degree", 
-                         "障碍度柱状图" if self.current_language == 'zh' else "Obstacle Degree Bar Chart"])
-            explanation_df.insert(0, "统计量_解释说明", 
-                                "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["障碍度" if self.current_language == 'zh' else "Obstacle Degree", 
-                         "障碍度柱状图" if self.current_language == 'zh' else "Obstacle Degree Bar Chart"])
-            interpretation_df.insert(0, "统计量_结果解读", 
-                                   "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 生成障碍度柱状图
-            plt.figure(figsize=(10, 6))
-            plt.bar(factor_names, obstacle_degrees)
-            plt.title('障碍度柱状图' if self.current_language == 'zh' else 'Bar Chart of Obstacle Degree')
-            plt.xlabel('因素' if self.current_language == 'zh' else 'Factors')
-            plt.ylabel('障碍度' if self.current_language == 'zh' else 'Obstacle Degree')
-            
-            # 保存图片
-            image_path = os.path.splitext(file_path)[0] + '_obstacle_degree_bar.png'
-            plt.savefig(image_path)
-            plt.close()
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('障碍度模型分析结果' if self.current_language == 'zh' else 'Obstacle Degree Model Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(combined_df.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加图片
-                doc.add_picture(image_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -215,6 +210,7 @@ class ObstacleDegreeModelAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -222,7 +218,7 @@ class ObstacleDegreeModelAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -253,6 +249,10 @@ class ObstacleDegreeModelAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
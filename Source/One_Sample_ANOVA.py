@@ -1,19 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
-import matplotlib.pyplot as plt
-import pathlib
 import matplotlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import one_sample_t_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 matplotlib.rcParams['font.family'] = 'SimHei'
 matplotlib.rcParams['axes.unicode_minus'] = False
@@ -80,6 +83,88 @@ languages = {
     }
 }
 
+
+def analyze(df, popmean=0.0):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每个数值列分别检验
+    :param popmean: 假设的总体均值
+    :return: LocationTestResult
+    """
+    return one_sample_t_test(df, popmean)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 整理数据：每列一行，效应量 Cohen's d = 均值差 / 标准差
+    tests = result.tests.set_index("Variable")
+    summary = result.summary
+    cohen_d = tests["Mean Difference"] / summary["Std"]
+    data = []
+    for name in tests.index:
+        data.append([f"{'方差分析' if zh else 'ANOVA'} ({name})", tests.loc[name, "Statistic"], tests.loc[name, "df"],
+                     tests.loc[name, "p-value"], cohen_d[name]])
+    data.append(["样本量" if zh else "Sample Size", summary["N"].to_dict(), "", "", ""])
+    data.append(["均值" if zh else "Mean", summary["Mean"].to_dict(), "", "", ""])
+    headers = ["统计量" if zh else "Statistic",
+               "t统计量" if zh else "t-statistic",
+               "自由度" if zh else "Degrees of Freedom",
+               "p值" if zh else "p-value",
+               "效应量（Cohen's d）" if zh else "Effect Size (Cohen's d)"]
+    df_result = pd.DataFrame(data, columns=headers)
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if zh else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if zh else "Interpretation")
+
+    # 绘制箱线图
+    box_plot_path = os.path.join(plot_dir, f"{stem}_boxplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.boxplot(list(result.samples.values()), tick_labels=list(result.samples))
+    ax.set_title('箱线图' if zh else 'Box Plot')
+    ax.set_ylabel('数值' if zh else 'Values')
+    fig.savefig(box_plot_path)
+
+    # 绘制柱状图
+    bar_plot_path = os.path.join(plot_dir, f"{stem}_barplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(summary.index, summary["Mean"])
+    ax.bar_label(bars, fmt='%.2f')
+    ax.set_title('柱状图' if zh else 'Bar Chart')
+    ax.set_ylabel('均值' if zh else 'Mean')
+    fig.savefig(bar_plot_path)
+
+    doc = new_document()
+    doc.add_heading('单样本方差分析结果' if zh else 'One-sample ANOVA Results', 0)
+    add_dataframe_table(doc, df_result)
+    doc.add_heading('解释说明' if zh else 'Explanation', level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读' if zh else 'Interpretation', level=2)
+    add_dataframe_table(doc, interpretation_df)
+    doc.add_picture(box_plot_path, width=Inches(6))
+    doc.add_picture(bar_plot_path, width=Inches(6))
+    doc.save(save_path)
+    return [box_plot_path, bar_plot_path]
+
+
 class OneSampleANOVAApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -120,135 +205,24 @@ class OneSampleANOVAApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行方差分析。")
-
-            # 假设总体均值为 0
-            population_mean = 0
-
-            # 取第一列数据进行单样本 t 检验
-            sample = numerical_df.iloc[:, 0]
-            t_stat, p_value = stats.ttest_1samp(sample, population_mean)
-
-            # 计算自由度
-            df_value = len(sample) - 1
-
-            # 计算效应量（Cohen's d）
-            cohen_d = (sample.mean() - population_mean) / sample.std()
-
-            # 计算样本量和均值
-            sample_size = len(sample)
-            mean = sample.mean()
-
-            # 整理数据
-            data = [
-                ["方差分析" if self.current_language == 'zh' else "ANOVA", t_stat, df_value, p_value, cohen_d],
-                ["样本量" if self.current_language == 'zh' else "Sample Size", sample_size, "", "", ""],
-                ["均值" if self.current_language == 'zh' else "Mean", mean, "", "", ""]
-            ]
-            headers = ["统计量" if self.current_language == 'zh' else "Statistic", 
-                      "t统计量" if self.current_language == 'zh' else "t-statistic", 
-                      "自由度" if self.current_language == 'zh' else "Degrees of Freedom", 
-                      "p值" if self.current_language == 'zh' else "p-value", 
-                      "效应量（Cohen's d）" if self.current_language == 'zh' else "Effect Size (Cohen's d)"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["单样本方差分析" if self.current_language == 'zh' else "One-sample ANOVA", 
-                         "样本量" if self.current_language == 'zh' else "Sample Size", 
-                         "均值" if self.current_language == 'zh' else "Mean", 
-                         "t统计量" if self.current_language == 'zh' else "t-statistic", 
-                         "自由度" if self.current_language == 'zh' else "Degrees of Freedom", 
-                         "p值" if self.current_language == 'zh' else "p-value", 
-                         "效应量" if self.current_language == 'zh' else "Effect Size"])
-            explanation_df.insert(0, "统计量_解释说明", 
-                                "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["t统计量" if self.current_language == 'zh' else "t-statistic", 
-                         "p值" if self.current_language == 'zh' else "p-value", 
-                         "自由度" if self.current_language == 'zh' else "Degrees of Freedom", 
-                         "样本量" if self.current_language == 'zh' else "Sample Size", 
-                         "均值" if self.current_language == 'zh' else "Mean", 
-                         "效应量" if self.current_language == 'zh' else "Effect Size"])
-            interpretation_df.insert(0, "统计量_结果解读", 
-                                   "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 绘制箱线图
-            plt.figure(figsize=(10, 6))
-            numerical_df.iloc[:, 0].plot.box()
-            plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-            plt.ylabel('数值' if self.current_language == 'zh' else 'Values')
-            box_plot_path = os.path.splitext(file_path)[0] + '_boxplot.png'
-            plt.savefig(box_plot_path)
-            plt.close()
-
-            # 绘制柱状图
-            plt.figure(figsize=(10, 6))
-            bars = plt.bar(['样本' if self.current_language == 'zh' else 'Sample'], [mean])
-            for bar in bars:
-                height = bar.get_height()
-                plt.annotate(f'{height:.2f}',
-                             xy=(bar.get_x() + bar.get_width() / 2, height),
-                             xytext=(0, 3),  # 3 points vertical offset
-                             textcoords="offset points",
-                             ha='center', va='bottom')
-            plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-            plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-            bar_plot_path = os.path.splitext(file_path)[0] + '_barplot.png'
-            plt.savefig(bar_plot_path)
-            plt.close()
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('单样本方差分析结果' if self.current_language == 'zh' else 'One-sample ANOVA Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(combined_df.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加图片
-                doc.add_picture(box_plot_path, width=Inches(6))
-                doc.add_picture(bar_plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -265,6 +239,7 @@ class OneSampleANOVAApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -272,7 +247,7 @@ class OneSampleANOVAApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -303,6 +278,10 @@ class OneSampleANOVAApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,16 +1,21 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import one_sample_wilcoxon
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_sample_charts
+from dias.report import add_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -75,6 +80,62 @@ LANGUAGES = {
     }
 }
 
+
+def analyze(df, median=0.0):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列分别检验
+    :param median: 假设的中位数
+    :return: LocationTestResult
+    """
+    return one_sample_wilcoxon(df, median)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 整理数据，每列一行检验结果
+    data = [[f"单样本Wilcoxon检验 ({row['Variable']})", row["Statistic"], row["df"], row["p-value"],
+             f"[{row['CI Lower']:.4f}, {row['CI Upper']:.4f}]"] for _, row in result.tests.iterrows()]
+    data += [
+        ["样本量", result.summary["N"].to_dict(), "", "", ""],
+        ["中位数", result.summary["Median"].to_dict(), "", "", ""]
+    ]
+
+    doc = new_document()
+    add_table(doc, data, headers=["统计量", "t统计量", "自由度", "p值", "均值差异的置信区间"])
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if zh else "Explanation", level=2)
+    for stat, explanation in texts['explanation'].items():
+        doc.add_paragraph(f"{stat}: {explanation}")
+
+    # 添加分析结果解读
+    doc.add_heading("结果解读" if zh else "Interpretation", level=2)
+    for stat, interpretation in texts['interpretation'].items():
+        doc.add_paragraph(f"{stat}: {interpretation}")
+
+    # 柱状图、误差线图、箱线图和折线图
+    chart_path = os.path.join(plot_dir, f"{stem}_charts.png")
+    render_sample_charts(result.samples, chart_path, language)
+    doc.add_heading("图表" if zh else "Charts", level=2)
+    doc.add_picture(chart_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [chart_path]
+
+
 class OneSampleWilcoxonTestAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -110,140 +171,29 @@ class OneSampleWilcoxonTestAnalysisApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行单样本Wilcoxon检验。")
-
-            # 假设中位数为 0
-            hypothesized_median = 0
-
-            # 进行单样本Wilcoxon检验
-            t_stat, p_value = stats.wilcoxon(numerical_df.squeeze() - hypothesized_median)
-
-            # 计算样本量、中位数
-            sample_size = numerical_df.count().values[0]
-            median = numerical_df.median().values[0]
-
-            # 计算自由度
-            degrees_of_freedom = sample_size - 1
-
-            # 计算均值差异的置信区间
-            mean_diff = numerical_df.squeeze().mean() - hypothesized_median
-            std_err = numerical_df.squeeze().std() / np.sqrt(sample_size)
-            confidence_interval = stats.t.interval(0.95, degrees_of_freedom, loc=mean_diff, scale=std_err)
-
-            # 整理数据
-            data = [
-                ["单样本Wilcoxon检验", t_stat, degrees_of_freedom, p_value, confidence_interval],
-                ["样本量", sample_size, "", "", ""],
-                ["中位数", median, "", "", ""]
-            ]
-            headers = ["统计量", "t统计量", "自由度", "p值", "均值差异的置信区间"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["单样本Wilcoxon检验", "样本量", "中位数", "t统计量", "自由度", "p值", "均值差异的置信区间"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["t统计量", "自由度", "p值", "样本量", "中位数", "均值差异的置信区间"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格数据
-                table = doc.add_table(rows=df.shape[0] + 1, cols=df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(df.shape[1]):
-                        row_cells[col_idx].text = str(df.iloc[row_idx, col_idx])
-
-                # 添加解释说明
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                for stat, explanation in explanations.items():
-                    doc.add_paragraph(f"{stat}: {explanation}")
-
-                # 添加分析结果解读
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                for stat, interpretation in interpretations.items():
-                    doc.add_paragraph(f"{stat}: {interpretation}")
-
-                # 绘制柱状图
-                plt.figure(figsize=(8, 6))
-                plt.bar(['样本'], [numerical_df.squeeze().mean()])
-                plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                bar_chart_path = save_path.replace('.docx', '_bar_chart.png')
-                plt.savefig(bar_chart_path)
-                plt.close()
-
-                # 绘制误差线图
-                plt.figure(figsize=(8, 6))
-                plt.errorbar(['样本'], [numerical_df.squeeze().mean()], yerr=[std_err], fmt='o')
-                plt.title('误差线图' if self.current_language == 'zh' else 'Error Bar Chart')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                error_bar_chart_path = save_path.replace('.docx', '_error_bar_chart.png')
-                plt.savefig(error_bar_chart_path)
-                plt.close()
-
-                # 绘制箱线图
-                plt.figure(figsize=(8, 6))
-                numerical_df.squeeze().plot(kind='box')
-                plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-                plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-                box_plot_path = save_path.replace('.docx', '_box_plot.png')
-                plt.savefig(box_plot_path)
-                plt.close()
-
-                # 绘制折线图
-                plt.figure(figsize=(8, 6))
-                numerical_df.squeeze().plot(kind='line')
-                plt.title('折线图' if self.current_language == 'zh' else 'Line Chart')
-                plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-                line_chart_path = save_path.replace('.docx', '_line_chart.png')
-                plt.savefig(line_chart_path)
-                plt.close()
-
-                # 将图表插入 Word 文档
-                doc.add_heading("图表" if self.current_language == 'zh' else "Charts", level=2)
-                doc.add_picture(bar_chart_path, width=Inches(6))
-                doc.add_picture(error_bar_chart_path, width=Inches(6))
-                doc.add_picture(box_plot_path, width=Inches(6))
-                doc.add_picture(line_chart_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -259,6 +209,7 @@ class OneSampleWilcoxonTestAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -267,7 +218,7 @@ class OneSampleWilcoxonTestAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -298,6 +249,10 @@ class OneSampleWilcoxonTestAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
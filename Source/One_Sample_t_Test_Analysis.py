@@ -1,18 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import one_sample_t_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_sample_charts
+from dias.report import add_dataframe_table, new_document
+
 # 设置字体为支持中文的字体，如 SimHei
 plt.rcParams['font.family'] = 'SimHei'
 # 解决负号显示问题
@@ -80,6 +84,70 @@ languages = {
     }
 }
 
+
+def analyze(df, popmean=0.0):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列分别检验
+    :param popmean: 假设的总体均值
+    :return: LocationTestResult
+    """
+    return one_sample_t_test(df, popmean)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 整理数据
+    tests = result.tests.set_index("Variable")
+    df_result = pd.DataFrame({
+        "变量" if zh else "Variable": tests.index,
+        "t 统计量" if zh else "t-statistic": tests["Statistic"].to_numpy(),
+        "自由度" if zh else "Degrees of Freedom": tests["df"].to_numpy(),
+        "p 值" if zh else "p-value": tests["p-value"].to_numpy(),
+        "均值差异的置信区间" if zh else "Confidence Interval":
+            [f"[{low:.4f}, {high:.4f}]" for low, high in zip(tests["CI Lower"], tests["CI Upper"])],
+        "样本均值" if zh else "Sample Mean": result.summary.loc[tests.index, "Mean"].to_numpy(),
+        "样本标准差" if zh else "Sample Standard Deviation": result.summary.loc[tests.index, "Std"].to_numpy(),
+    })
+
+    doc = new_document()
+    doc.add_heading('单样本 t 检验分析结果' if zh else 'One-Sample t-Test Analysis Results', 0)
+    add_dataframe_table(doc, df_result)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if zh else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加分析结果解读
+    doc.add_heading("结果解读" if zh else "Interpretation", 2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 每列一张图：柱状图、误差线图、箱线图和折线图
+    image_paths = []
+    for i, (column, values) in enumerate(result.samples.items()):
+        chart_path = os.path.join(plot_dir, f"{stem}_charts_{i + 1}.png")
+        render_sample_charts({column: values}, chart_path, language)
+        doc.add_picture(chart_path, width=Inches(6))
+        image_paths.append(chart_path)
+
+    doc.save(save_path)
+    return image_paths
+
+
 class OneSampleTTestAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -123,141 +191,25 @@ class OneSampleTTestAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行单样本 t 检验。")
-
-            # 进行单样本 t 检验
-            results = []
-            for column in numerical_df.columns:
-                data = numerical_df[column].dropna()
-                t_stat, p_value = stats.ttest_1samp(data, self.population_mean)
-                degrees_of_freedom = len(data) - 1
-                sample_mean = data.mean()
-                sample_std = data.std()
-                confidence_interval = stats.t.interval(0.95, degrees_of_freedom, loc=sample_mean - self.population_mean,
-                                                   scale=stats.sem(data))
-
-                results.append([column, t_stat, degrees_of_freedom, p_value, confidence_interval, sample_mean, sample_std])
-
-            # 整理数据
-            headers = ["变量" if self.current_language == 'zh' else "Variable", 
-                      "t 统计量" if self.current_language == 'zh' else "t-statistic", 
-                      "自由度" if self.current_language == 'zh' else "Degrees of Freedom", 
-                      "p 值" if self.current_language == 'zh' else "p-value", 
-                      "均值差异的置信区间" if self.current_language == 'zh' else "Confidence Interval", 
-                      "样本均值" if self.current_language == 'zh' else "Sample Mean", 
-                      "样本标准差" if self.current_language == 'zh' else "Sample Standard Deviation"]
-            df_result = pd.DataFrame(results, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["单样本 t 检验" if self.current_language == 'zh' else "One-Sample t-Test", 
-                         "t 统计量" if self.current_language == 'zh' else "t-statistic", 
-                         "自由度" if self.current_language == 'zh' else "Degrees of Freedom", 
-                         "p 值" if self.current_language == 'zh' else "p-value", 
-                         "均值差异的置信区间" if self.current_language == 'zh' else "Confidence Interval", 
-                         "样本均值" if self.current_language == 'zh' else "Sample Mean", 
-                         "样本标准差" if self.current_language == 'zh' else "Sample Standard Deviation"])
-            explanation_df.insert(0, "统计量_解释说明", 
-                                "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["t 统计量" if self.current_language == 'zh' else "t-statistic", 
-                         "p 值" if self.current_language == 'zh' else "p-value", 
-                         "自由度" if self.current_language == 'zh' else "Degrees of Freedom", 
-                         "均值差异的置信区间" if self.current_language == 'zh' else "Confidence Interval", 
-                         "样本均值" if self.current_language == 'zh' else "Sample Mean", 
-                         "样本标准差" if self.current_language == 'zh' else "Sample Standard Deviation"])
-            interpretation_df.insert(0, "统计量_结果解读", 
-                                   "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('单样本 t 检验分析结果' if self.current_language == 'zh' else 'One-Sample t-Test Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(combined_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(combined_df.columns):
-                    hdr_cells[i].text = col
-
-                # 添加数据到表格
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 获取桌面路径
-                desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-
-                # 绘制图形
-                for column in numerical_df.columns:
-                    data = numerical_df[column].dropna()
-                    plt.figure(figsize=(12, 8))
-
-                    # 柱状图
-                    plt.subplot(2, 2, 1)
-                    plt.bar([column], [data.mean()], yerr=data.std(), capsize=5)
-                    plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-                    plt.ylabel('值' if self.current_language == 'zh' else 'Value')
-
-                    # 误差线图
-                    plt.subplot(2, 2, 2)
-                    plt.errorbar(range(len(data)), data, yerr=data.std(), fmt='o', capsize=5)
-                    plt.title('误差线图' if self.current_language == 'zh' else 'Error Bar Chart')
-                    plt.ylabel('值' if self.current_language == 'zh' else 'Value')
-
-                    # 箱线图
-                    plt.subplot(2, 2, 3)
-                    plt.boxplot(data)
-                    plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-                    plt.ylabel('值' if self.current_language == 'zh' else 'Value')
-
-                    # 折线图
-                    plt.subplot(2, 2, 4)
-                    plt.plot(range(len(data)), data)
-                    plt.title('折线图' if self.current_language == 'zh' else 'Line Chart')
-                    plt.ylabel('值' if self.current_language == 'zh' else 'Value')
-
-                    plt.tight_layout()
-
-                    # 保存图片
-                    chart_path = os.path.splitext(save_path)[0] + f"_{column}_charts.png"
-                    plt.savefig(chart_path)
-                    plt.close()
-                    
-                    # 添加图片到文档
-                    doc.add_picture(chart_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel,
+                             params={"popmean": self.population_mean}, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -274,6 +226,7 @@ class OneSampleTTestAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         
+        self.job_panel.set_language(self.current_language)
     def create_ui(self):
         # 获取屏幕的宽度和高度
         screen_width = self.root.winfo_screenwidth()
@@ -281,7 +234,7 @@ class OneSampleTTestAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -312,6 +265,10 @@ class OneSampleTTestAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                               foreground="gray", cursor="hand2")
@@ -1,18 +1,18 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
-import pandas as pd
+import sys
 from tkinter import filedialog
 import tkinter as tk
-from sklearn.metrics import accuracy_score
 import matplotlib.pyplot as plt
-import statsmodels.api as sm
-from statsmodels.miscmodels.ordinal_model import OrderedModel  # 修正导入路径
-from docx import Document
-from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import ordered_logit
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.report import add_dataframe_table, new_document
 
 # 设置中文字体，确保中文正常显示
 plt.rcParams["font.family"] = ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"]
@@ -22,6 +22,10 @@ plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
 LANGUAGES = {
     'zh': {
         'title': "有序Logit回归分析",
+        'report_title': "有序Logit回归分析结果",
+        'target_note': "因变量：{}（按取值从小到大作为有序类别）",
+        'statistics_heading': "模型统计量",
+        'coefficients_heading': "回归系数与阈值",
         'select_button': "选择文件",
         'analyze_button': "分析文件",
         'file_not_found': "文件不存在，请重新选择。",
@@ -50,6 +54,10 @@ LANGUAGES = {
     },
     'en': {
         'title': "Ordered Logit Regression Analysis",
+        'report_title': "Ordered Logit Regression Analysis Results",
+        'target_note': "Dependent variable: {} (its values in ascending order are the ordered categories)",
+        'statistics_heading': "Model Summary",
+        'coefficients_heading': "Coefficients and Thresholds",
         'select_button': "Select File",
         'analyze_button': "Analyze File",
         'file_not_found': "The file does not exist. Please select again.",
@@ -79,6 +87,48 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为有序的因变量，其余列为自变量
+    :return: RegressionResult
+    """
+    return ordered_logit(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['target_note'].format(result.target))
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", 2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    doc.save(save_path)
+    return []
+
+
 class OrderedLogitRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -114,178 +164,29 @@ class OrderedLogitRegressionAnalysisApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否包含足够的列
-            if df.shape[1] < 2:
-                raise ValueError("数据至少需要两列（自变量和因变量）。")
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1]
-            y = df.iloc[:, -1]
-
-            # 检查因变量是否为有序分类变量
-            if not isinstance(y.dtype, pd.CategoricalDtype) or not (hasattr(y, 'ordered') and y.ordered):
-                # 尝试将因变量转换为有序分类
-                y = pd.Categorical(y, ordered=True)
-                if not y.ordered:
-                    # 如果无法自动转换，提示用户
-                    unique_values = y.unique()
-                    if len(unique_values) < 2:
-                        raise ValueError("因变量必须至少有两个不同的值。")
-                    # 尝试按值的顺序排序
-                    y = pd.Categorical(y, categories=sorted(unique_values), ordered=True)
-                    if not y.ordered:
-                        raise ValueError("因变量需要是有序分类变量。请确保数据中的因变量列具有有序分类性质。")
-
-            # 移除添加常数项的步骤
-            # X_with_const = sm.add_constant(X)  # 注释掉这行代码
-            logit_model = OrderedModel(y, X, distr='logit')  # 直接使用 X
-            result = logit_model.fit()
-
-            # 预测类别
-            y_pred = result.predict().argmax(axis=1)
-            # 将预测结果转换为与原始数据相同的类别
-            # 修正此处，直接使用 y.categories
-            y_pred_categorical = pd.Categorical.from_codes(y_pred, categories=y.categories)
-
-            # 计算指标
-            coefficients = result.params[:len(X.columns)]  # 前n个是系数
-            z_values = result.tvalues[:len(X.columns)]
-            p_values = result.pvalues[:len(X.columns)]
-            accuracy = accuracy_score(y, y_pred_categorical)
-            # 修改此处，使用 result.params[len(X.columns):] 获取阈值参数
-            thresholds = result.params[len(X.columns):]
-
-            # 准备数据
-            columns_stats = ["Coefficients", "z-value", "p-value"]
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-
-            # 准备系数数据
-            coef_data = []
-            for i, col in enumerate(X.columns):
-                coef_data.append([
-                    col,
-                    coefficients[i],  # 不需要 +1
-                    z_values[i],
-                    p_values[i],
-                    interpretations["Coefficients"]
-                ])
-
-            # 移除添加常数项的部分
-            # 添加常数项
-            # coef_data.append([
-            #     "const",
-            #     coefficients[0],
-            #     z_values[0],
-            #     p_values[0],
-            #     interpretations["Intercept"]
-            # ])
-
-            # 创建系数表格
-            coef_df = pd.DataFrame(coef_data, columns=[
-                "Variable",
-                "Coefficients",
-                "z-value",
-                "p-value",
-                "Interpretation"
-            ])
-
-            # 创建阈值表格
-            threshold_data = []
-            for i, threshold in enumerate(thresholds):
-                threshold_data.append([
-                    f"Threshold {i + 1}",
-                    threshold,
-                    "",
-                    "",
-                    interpretations["Thresholds"]
-                ])
-
-            threshold_df = pd.DataFrame(threshold_data, columns=[
-                "Variable",
-                "Coefficients",
-                "z-value",
-                "p-value",
-                "Interpretation"
-            ])
-
-            # 创建模型汇总表格
-            model_summary = pd.DataFrame({
-                "Metric": ["Accuracy", "No. Observations", "Log-Likelihood", "LL-Null", "LLR p-value"],
-                "Value": [
-                    accuracy,
-                    len(y),
-                    result.llf,
-                    result.llnull,
-                    # 修改此处，使用 result.llr_pvalue（不带括号）
-                    result.llr_pvalue
-                ],
-                "Interpretation": [
-                    interpretations["Accuracy"],
-                    "",
-                    "",
-                    "",
-                    "如果p值小于0.05，表示模型显著优于空模型"
-                ]
-            })
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('Ordered Logit Regression Analysis Results', 0)
-
-                # 添加模型摘要
-                doc.add_heading('Model Summary', 1)
-                self._add_dataframe_to_doc(doc, model_summary)
-
-                # 添加系数表格
-                doc.add_heading('Coefficients', 1)
-                self._add_dataframe_to_doc(doc, coef_df)
-
-                # 添加阈值表格
-                doc.add_heading('Thresholds', 1)
-                self._add_dataframe_to_doc(doc, threshold_df)
-
-                # 添加解释说明
-                doc.add_heading('Explanations', 1)
-                for stat, explanation in explanations.items():
-                    doc.add_paragraph(f"{stat}: {explanation}")
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
-
-    def _add_dataframe_to_doc(self, doc, df):
-        """将DataFrame添加到Word文档中"""
-        table = doc.add_table(rows=df.shape[0] + 1, cols=df.shape[1])
-        hdr_cells = table.rows[0].cells
-        for col_idx, header in enumerate(df.columns):
-            hdr_cells[col_idx].text = header
-
-        for row_idx, row in enumerate(df.values):
-            row_cells = table.rows[row_idx + 1].cells
-            for col_idx, value in enumerate(row):
-                row_cells[col_idx].text = str(value)
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -301,6 +202,7 @@ class OrderedLogitRegressionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -309,7 +211,7 @@ class OrderedLogitRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 250
+        window_height = 310
 
         # 计算窗口的 x 和 y 坐标，使其居中
         x = (screen_width - window_width) // 2
@@ -340,6 +242,10 @@ class OrderedLogitRegressionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
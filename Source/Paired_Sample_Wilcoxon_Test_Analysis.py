@@ -1,16 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import paired_wilcoxon
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_sample_charts
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'  # 可以根据系统情况选择 'Microsoft YaHei' 等
 # 解决负号显示问题
@@ -76,6 +82,62 @@ LANGUAGES = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，两列数值数据为配对的两次观测，只使用两列都有值的行
+    :return: LocationTestResult
+    """
+    return paired_wilcoxon(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据，样本量和中位数均为差值的统计量
+    test = result.tests.iloc[0]
+    difference = result.summary.loc["Difference"]
+    data = [
+        ["配对样本Wilcoxon检验", test["Statistic"], test["df"], test["p-value"],
+         f"[{test['CI Lower']:.4f}, {test['CI Upper']:.4f}]"],
+        ["样本量", int(difference["N"]), "", "", ""],
+        ["中位数", difference["Median"], "", "", ""]
+    ]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading(texts["title"], 0)
+    add_table(doc, data, headers=["统计量", "t统计量", "自由度", "p值", "均值差异的置信区间"])
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 柱状图、误差线图、箱线图和折线图
+    chart_path = os.path.join(plot_dir, f"{stem}_charts.png")
+    render_sample_charts(result.samples, chart_path, language)
+    doc.add_picture(chart_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [chart_path]
+
+
 class PairedSampleWilcoxonTestAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -111,155 +173,29 @@ class PairedSampleWilcoxonTestAnalysisApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行配对样本Wilcoxon检验。")
-            if numerical_df.shape[1] != 2:
-                raise ValueError("数据必须包含两列数值数据，用于配对样本Wilcoxon检验。")
-
-            # 进行配对样本Wilcoxon检验
-            t_stat, p_value = stats.wilcoxon(numerical_df.iloc[:, 0], numerical_df.iloc[:, 1])
-
-            # 计算样本量、中位数
-            sample_size = numerical_df.count().values[0]
-            differences = numerical_df.iloc[:, 0] - numerical_df.iloc[:, 1]
-            median = differences.median()
-
-            # 计算自由度
-            degrees_of_freedom = sample_size - 1
-
-            # 计算均值差异的置信区间
-            mean_diff = differences.mean()
-            std_err = differences.std() / np.sqrt(sample_size)
-            confidence_interval = stats.t.interval(0.95, degrees_of_freedom, loc=mean_diff, scale=std_err)
-
-            # 整理数据
-            data = [
-                ["配对样本Wilcoxon检验", t_stat, degrees_of_freedom, p_value, confidence_interval],
-                ["样本量", sample_size, "", "", ""],
-                ["中位数", median, "", "", ""]
-            ]
-            headers = ["统计量", "t统计量", "自由度", "p值", "均值差异的置信区间"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["配对样本Wilcoxon检验", "样本量", "中位数", "t统计量", "自由度", "p值", "均值差异的置信区间"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["t统计量", "自由度", "p值", "样本量", "中位数", "均值差异的置信区间"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading(LANGUAGES[self.current_language]["title"], 0)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for index, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明表格
-                explanation_table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = explanation_table.rows[0].cells
-                for i, header in enumerate(explanation_df.columns):
-                    hdr_cells[i].text = header
-                for index, row in explanation_df.iterrows():
-                    row_cells = explanation_table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加结果解读表格
-                interpretation_table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = interpretation_table.rows[0].cells
-                for i, header in enumerate(interpretation_df.columns):
-                    hdr_cells[i].text = header
-                for index, row in interpretation_df.iterrows():
-                    row_cells = interpretation_table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 绘制柱状图
-                plt.figure(figsize=(8, 6))
-                plt.bar(['样本1', '样本2'], [numerical_df.iloc[:, 0].mean(), numerical_df.iloc[:, 1].mean()])
-                plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                bar_chart_path = save_path.replace('.docx', '_bar_chart.png')
-                plt.savefig(bar_chart_path)
-                plt.close()
-
-                # 绘制误差线图
-                plt.figure(figsize=(8, 6))
-                plt.errorbar(['样本1', '样本2'], [numerical_df.iloc[:, 0].mean(), numerical_df.iloc[:, 1].mean()],
-                             yerr=[numerical_df.iloc[:, 0].std() / np.sqrt(sample_size),
-                                   numerical_df.iloc[:, 1].std() / np.sqrt(sample_size)], fmt='o')
-                plt.title('误差线图' if self.current_language == 'zh' else 'Error Bar Chart')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                error_bar_chart_path = save_path.replace('.docx', '_error_bar_chart.png')
-                plt.savefig(error_bar_chart_path)
-                plt.close()
-
-                # 绘制箱线图
-                plt.figure(figsize=(8, 6))
-                numerical_df.plot(kind='box')
-                plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-                plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-                box_plot_path = save_path.replace('.docx', '_box_plot.png')
-                plt.savefig(box_plot_path)
-                plt.close()
-
-                # 绘制折线图
-                plt.figure(figsize=(8, 6))
-                numerical_df.plot(kind='line')
-                plt.title('折线图' if self.current_language == 'zh' else 'Line Chart')
-                plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-                line_chart_path = save_path.replace('.docx', '_line_chart.png')
-                plt.savefig(line_chart_path)
-                plt.close()
-
-                # 在Word文档中插入图表
-                doc.add_heading('图表', 1)
-                doc.add_picture(bar_chart_path, width=Inches(6))
-                doc.add_picture(error_bar_chart_path, width=Inches(6))
-                doc.add_picture(box_plot_path, width=Inches(6))
-                doc.add_picture(line_chart_path, width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -275,6 +211,7 @@ class PairedSampleWilcoxonTestAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -283,7 +220,7 @@ class PairedSampleWilcoxonTestAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -314,6 +251,10 @@ class PairedSampleWilcoxonTestAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -1,18 +1,22 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
-import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy import stats
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import paired_t_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_sample_charts
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 指定中文字体，SimHei 是黑体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -74,6 +78,63 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，两列数值数据为配对的两次观测，只使用两列都有值的行
+    :return: LocationTestResult
+    """
+    return paired_t_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    test = result.tests.iloc[0]
+    data = [
+        ["配对 t 检验", test["Statistic"], test["df"], test["p-value"],
+         f"[{test['CI Lower']:.4f}, {test['CI Upper']:.4f}]"],
+        ["样本量", result.summary["N"].to_dict(), "", "", ""],
+        ["均值", result.summary["Mean"].to_dict(), "", "", ""]
+    ]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('分析结果', level=1)
+    add_table(doc, data, headers=["统计量", "t 统计量", "自由度", "p 值", "置信区间"])
+    doc.add_heading('解释说明', level=1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 柱状图、误差线图、箱线图和折线图
+    plot_path = os.path.join(plot_dir, f"{stem}_plots.png")
+    render_sample_charts(result.samples, plot_path, language)
+    doc.add_heading('图表', level=1)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class PairedTTestAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -109,159 +170,29 @@ class PairedTTestAnalysisApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行配对 t 检验。")
-            if numerical_df.shape[1] != 2:
-                raise ValueError("数据必须包含且仅包含两列数值数据，才能进行配对 t 检验。")
-
-            # 进行配对 t 检验
-            t_stat, p_value = stats.ttest_rel(*numerical_df.T.values)
-            df_value = len(numerical_df) - 1  # 自由度
-            mean_diff = numerical_df.iloc[:, 0].mean() - numerical_df.iloc[:, 1].mean()
-            std_err = stats.sem(numerical_df.iloc[:, 0] - numerical_df.iloc[:, 1])
-            conf_int = stats.t.interval(0.95, df_value, loc=mean_diff, scale=std_err)
-
-            # 计算样本量和均值
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-
-            # 整理数据
-            data = [
-                ["配对 t 检验", t_stat, df_value, p_value, conf_int],
-                ["样本量", sample_sizes.to_dict(), "", "", ""],
-                ["均值", means.to_dict(), "", "", ""]
-            ]
-            headers = ["统计量", "t 统计量", "自由度", "p 值", "置信区间"]
-            result_df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["配对 t 检验", "样本量", "均值", "t 统计量", "自由度", "p 值", "置信区间"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["t 统计量", "p 值", "自由度", "置信区间"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                doc.add_heading('分析结果', level=1)
-                table = doc.add_table(rows=result_df.shape[0] + 1, cols=result_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(result_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in result_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('解释说明', level=1)
-                table = doc.add_table(rows=explanation_df.shape[0] + 1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in explanation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('结果解读', level=1)
-                table = doc.add_table(rows=interpretation_df.shape[0] + 1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in interpretation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 绘制图表
-                plot_path = self.plot_results(numerical_df, save_path)
-                if plot_path:
-                    doc.add_heading('图表', level=1)
-                    doc.add_picture(plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
-
-    def plot_results(self, numerical_df, save_path):
-        # 柱状图
-        plt.figure(figsize=(12, 8))
-        plt.subplot(2, 2, 1)
-        means = numerical_df.mean()
-        bars = plt.bar(means.index, means)
-        for bar in bars:
-            height = bar.get_height()
-            plt.annotate(f'{height:.2f}',
-                         xy=(bar.get_x() + bar.get_width() / 2, height),
-                         xytext=(0, 3),  # 3 points vertical offset
-                         textcoords="offset points",
-                         ha='center', va='bottom')
-        plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-        plt.xlabel('样本' if self.current_language == 'zh' else 'Sample')
-        plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-
-        # 误差线图
-        plt.subplot(2, 2, 2)
-        means = numerical_df.mean()
-        stds = numerical_df.std()
-        plt.errorbar(means.index, means, yerr=stds, fmt='o')
-        plt.title('误差线图' if self.current_language == 'zh' else 'Error Bar Chart')
-        plt.xlabel('样本' if self.current_language == 'zh' else 'Sample')
-        plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-
-        # 箱线图
-        plt.subplot(2, 2, 3)
-        numerical_df.boxplot()
-        plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-        plt.xlabel('样本' if self.current_language == 'zh' else 'Sample')
-        plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-
-        # 折线图
-        plt.subplot(2, 2, 4)
-        plt.plot(numerical_df)
-        plt.title('折线图' if self.current_language == 'zh' else 'Line Chart')
-        plt.xlabel('观测值' if self.current_language == 'zh' else 'Observation')
-        plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-        plt.legend(numerical_df.columns)
-
-        plt.tight_layout()
-        plot_path = save_path.replace('.docx', '_plots.png')
-        plt.savefig(plot_path)
-        plt.close()
-        return plot_path
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -277,6 +208,7 @@ class PairedTTestAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -285,7 +217,7 @@ class PairedTTestAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -316,6 +248,10 @@ class PairedTTestAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -1,22 +1,31 @@
 import tkinter as tk
 from tkinter import filedialog
-import openpyxl
 import os
-import pandas as pd
+import sys
 import numpy as np
-from scipy import stats
+import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
 import matplotlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.correlation import partial_correlation_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 matplotlib.rcParams['font.family'] = 'SimHei'
 # 解决负号显示问题
 matplotlib.rcParams['axes.unicode_minus'] = False
 
+# 热力图中变量不超过该个数时在格子里标注系数
+HEATMAP_ANNOTATE_MAX = 15
+
 # 定义语言字典
 languages = {
     "zh": {
@@ -32,7 +41,14 @@ languages = {
         "columns_stats": ["变量对", "偏相关系数", "p 值", "结果解读"],
         "interpretation_low_p": "p 值小于 0.05，表明该变量对之间的偏相关性显著。",
         "interpretation_high_p": "p 值大于等于 0.05，表明该变量对之间的偏相关性不显著。",
-        "switch_language_button_text": "切换语言"
+        "interpretation_undefined": "该变量与其他变量精确线性相关，偏相关系数没有定义。",
+        "switch_language_button_text": "切换语言",
+        "controls_label": "控制变量（以逗号分隔，留空时以其余全部变量为控制）：",
+        "report_title": "偏相关分析结果",
+        "controls_note": "控制变量：{}。所有变量在一次最小二乘中对控制变量回归，偏相关系数为残差之间的相关系数。",
+        "all_controls_note": "每一对变量都以其余全部变量为控制，偏相关系数由相关矩阵的逆（精度矩阵）得到。",
+        "sample_note": "完整行数 n = {}，t 检验的自由度为 {}。",
+        "singular_note": "相关矩阵奇异，与其他变量精确线性相关的变量的偏相关系数没有定义。"
     },
     "en": {
         "title": "Partial Correlation Analysis",
@@ -47,11 +63,90 @@ languages = {
         "columns_stats": ["Variable Pair", "Partial Correlation Coefficient", "p-value", "Result Interpretation"],
         "interpretation_low_p": "The p-value is less than 0.05, indicating that the partial correlation between this variable pair is significant.",
         "interpretation_high_p": "The p-value is greater than or equal to 0.05, indicating that the partial correlation between this variable pair is not significant.",
-        "switch_language_button_text": "Switch Language"
+        "interpretation_undefined": "One of the variables is an exact linear combination of the others, so the partial correlation is undefined.",
+        "switch_language_button_text": "Switch Language",
+        "controls_label": "Control variables (comma-separated, blank to control for all other variables): ",
+        "report_title": "Partial Correlation Analysis Results",
+        "controls_note": "Control variables: {}. All variables are regressed on the controls in one least-squares solve, and the partial correlations are the correlations of the residuals.",
+        "all_controls_note": "Every pair is controlled for all other variables. The partial correlations come from the inverse of the correlation matrix (the precision matrix).",
+        "sample_note": "Complete rows n = {}; the t tests have {} degrees of freedom.",
+        "singular_note": "The correlation matrix is singular. Partial correlations involving variables that are exact linear combinations of the others are undefined."
     }
 }
 
 
+def analyze(df, controls=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :param controls: 控制变量名列表或以逗号分隔的文本，为空时以其余全部变量为控制
+    :return: PartialCorrelationResult
+    """
+    return partial_correlation_analysis(df, controls)
+
+
+def plot_heatmap(corr, path):
+    """
+    偏相关系数热力图
+    """
+    fig = new_figure(figsize=(10, 8))
+    ax = fig.subplots()
+    image = ax.imshow(corr.to_numpy(), cmap='coolwarm', vmin=-1, vmax=1, interpolation='nearest')
+    fig.colorbar(image)
+    if len(corr) <= HEATMAP_ANNOTATE_MAX:
+        ax.set_xticks(range(len(corr.columns)), corr.columns, rotation=45)
+        ax.set_yticks(range(len(corr.columns)), corr.columns)
+        for i in range(len(corr)):
+            for j in range(len(corr)):
+                ax.text(j, i, f'{corr.iloc[i, j]:.2f}', ha='center', va='center', color='black')
+    ax.set_title('Partial Correlation Heatmap')
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    results = []
+    for x, y, corr, p in result.pairs():
+        if np.isnan(p):
+            interpretation = texts["interpretation_undefined"]
+        elif p < 0.05:
+            interpretation = texts["interpretation_low_p"]
+        else:
+            interpretation = texts["interpretation_high_p"]
+        results.append([f"{x} - {y}", corr, p, interpretation])
+    result_df = pd.DataFrame(results, columns=texts["columns_stats"])
+
+    doc = new_document()
+    doc.add_heading(texts["report_title"], 0)
+    if result.controls:
+        doc.add_paragraph(texts["controls_note"].format(", ".join(result.controls)))
+    else:
+        doc.add_paragraph(texts["all_controls_note"])
+    doc.add_paragraph(texts["sample_note"].format(result.nobs, result.dof))
+    if result.singular:
+        doc.add_paragraph(texts["singular_note"])
+    add_dataframe_table(doc, result_df)
+
+    img_path = os.path.join(plot_dir, f"{stem}_partial_corr_plot.png")
+    plot_heatmap(result.corr, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class PartialCorrelationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -84,19 +179,6 @@ class PartialCorrelationAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    # 计算偏相关系数的函数
-    def partial_corr(self, data, x, y, z):
-        sub_data = data[[x, y] + z]
-        sub_data = sub_data.dropna()
-        X = sub_data[[x] + z]
-        Y = sub_data[[y] + z]
-        beta_x = np.linalg.lstsq(X, sub_data[x], rcond=None)[0]
-        beta_y = np.linalg.lstsq(Y, sub_data[y], rcond=None)[0]
-        resid_x = sub_data[x] - np.dot(X, beta_x)
-        resid_y = sub_data[y] - np.dot(Y, beta_y)
-        corr, p = stats.pearsonr(resid_x, resid_y)
-        return corr, p
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -105,84 +187,27 @@ class PartialCorrelationAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 获取所有变量名
-            variables = df.columns.tolist()
-
-            # 存储结果的列表
-            results = []
-
-            # 进行偏相关分析
-            for i in range(len(variables)):
-                for j in range(i + 1, len(variables)):
-                    x = variables[i]
-                    y = variables[j]
-                    other_vars = [var for var in variables if var not in [x, y]]
-                    corr, p = self.partial_corr(df, x, y, other_vars)
-                    pair = f"{x} - {y}"
-                    if p < 0.05:
-                        interpretation = languages[self.current_language]["interpretation_low_p"]
-                    else:
-                        interpretation = languages[self.current_language]["interpretation_high_p"]
-                    results.append([pair, corr, p, interpretation])
-
-            # 创建结果 DataFrame
-            result_df = pd.DataFrame(results, columns=languages[self.current_language]["columns_stats"])
-
-            # 绘制偏相关系数的柱状图
-            plt.figure()
-            plt.bar(result_df["变量对" if self.current_language == "zh" else "Variable Pair"],
-                    result_df["偏相关系数" if self.current_language == "zh" else "Partial Correlation Coefficient"])
-            plt.xlabel('变量对' if self.current_language == "zh" else 'Variable Pair')
-            plt.ylabel('偏相关系数' if self.current_language == "zh" else 'Partial Correlation Coefficient')
-            plt.title('偏相关系数分析结果' if self.current_language == "zh" else 'Partial Correlation Analysis Results')
-            plt.xticks(rotation=45)
-
-            # 保存图片
-            image_path = os.path.splitext(file_path)[0] + '_partial_corr_plot.png'
-            plt.savefig(image_path)
-            plt.close()
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading(
-                    '偏相关分析结果' if self.current_language == "zh" else 'Partial Correlation Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(result_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(result_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for index, row in result_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加图片
-                doc.add_picture(image_path, width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
-
-    def switch_language(self, event):
+        params = {'controls': self.controls_entry.get().strip() or None}
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -196,6 +221,8 @@ class PartialCorrelationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.controls_label.config(text=languages[self.current_language]["controls_label"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -204,7 +231,7 @@ class PartialCorrelationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 420
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -230,11 +257,22 @@ class PartialCorrelationAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建控制变量输入框
+        self.controls_label = ttk.Label(frame, text=languages[self.current_language]["controls_label"],
+                                        wraplength=450)
+        self.controls_label.pack(pady=(5, 0))
+        self.controls_entry = ttk.Entry(frame, width=50)
+        self.controls_entry.pack(pady=2)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=languages[self.current_language]["switch_language_button_text"],
@@ -1,22 +1,28 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
-import numpy as np
-from sklearn.cross_decomposition import PLSRegression
-from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
-import statsmodels.api as sm
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import pls_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_actual_vs_predicted
+from dias.report import add_dataframe_table, new_document
+
 # 定义语言字典
 LANGUAGES = {
     'zh': {
         'title': "偏最小二乘回归分析",
+        'report_title': "偏最小二乘回归分析结果",
+        'target_note': "因变量：{}",
+        'statistics_heading': "模型统计量",
+        'coefficients_heading': "回归系数",
         'select_button': "选择文件",
         'analyze_button': "分析文件",
         'file_not_found': "文件不存在，请重新选择。",
@@ -39,6 +45,10 @@ LANGUAGES = {
     },
     'en': {
         'title': "Partial Least Squares Regression Analysis",
+        'report_title': "Partial Least Squares Regression Results",
+        'target_note': "Dependent variable: {}",
+        'statistics_heading': "Model Statistics",
+        'coefficients_heading': "Coefficients",
         'select_button': "Select File",
         'analyze_button': "Analyze File",
         'file_not_found': "The file does not exist. Please select again.",
@@ -62,6 +72,50 @@ LANGUAGES = {
 }
 
 
+def analyze(df, n_components=1):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量，其余列为自变量
+    :param n_components: 提取的成分个数
+    :return: RegressionResult
+    """
+    return pls_regression(df, n_components=n_components)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['target_note'].format(result.target))
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = os.path.join(plot_dir, f"{stem}_pls_regression_scatter.png")
+    render_actual_vs_predicted(result.actual, result.fitted, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class PartialLeastSquaresRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -97,124 +151,29 @@ class PartialLeastSquaresRegressionAnalysisApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1].values
-            y = df.iloc[:, -1].values
-
-            # 进行偏最小二乘回归分析
-            # 将 n_components 调整为 1
-            pls = PLSRegression(n_components=1)
-            pls.fit(X, y)
-            y_pred = pls.predict(X)
-
-            # 计算指标
-            coefficients = pls.coef_.flatten()
-            intercept = pls.intercept_[0]
-            mse = mean_squared_error(y, y_pred)
-            r2 = r2_score(y, y_pred)
-            n = len(y)
-            p = X.shape[1]
-            adjusted_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
-
-            # 计算 t 值和 p 值
-            X_with_const = sm.add_constant(X)
-            model = sm.OLS(y, X_with_const).fit()
-            t_values = model.tvalues
-            p_values = model.pvalues
-
-            # 计算标准化系数
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
-            # 将 n_components 调整为 1
-            pls_scaled = PLSRegression(n_components=1)
-            pls_scaled.fit(X_scaled, y)
-            standardized_coefficients = pls_scaled.coef_.flatten()
-
-            # 计算 F 值
-            f_value = model.fvalue
-
-            # 准备数据
-            columns_stats = ["Coefficients", "Standardized Coefficients", "t-value", "p-value", "R-squared (R²)",
-                             "Adjusted R-squared", "F-value"]
-            explanations = LANGUAGES[self.current_language]['explanation']
-            data = [["Partial Least Squares Regression"] + list(coefficients) + [intercept, mse, r2, adjusted_r2,
-                                                                                 f_value] + list(
-                standardized_coefficients) + list(t_values) + list(p_values)]
-            headers = ["Model"] + [f"Coefficient_{i + 1}" for i in range(len(coefficients))] + ["Intercept",
-                                                                                                "MSE"] + columns_stats[
-                                                                                                         4:] + [
-                          f"Standardized Coefficient_{i + 1}" for i in range(len(standardized_coefficients))] + [
-                          f"t-value_{i + 1}" for i in range(len(t_values))] + [f"p-value_{i + 1}" for i in
-                                                                               range(len(p_values))]
-
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df_result, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx, row in transposed_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成散点图
-                plt.figure(figsize=(10, 6))
-                plt.scatter(y, y_pred)
-                plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
-                plt.xlabel('Actual Values')
-                plt.ylabel('Predicted Values')
-                plt.title('Actual vs Predicted Values')
-                img_name = "pls_regression_scatter.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片添加到Word文档中
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                result_msg += LANGUAGES[self.current_language]['images_saved'].format(save_dir)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -230,6 +189,7 @@ class PartialLeastSquaresRegressionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -238,7 +198,7 @@ class PartialLeastSquaresRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -269,6 +229,10 @@ class PartialLeastSquaresRegressionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
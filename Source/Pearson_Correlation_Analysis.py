@@ -1,17 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
-from scipy import stats
-import matplotlib.pyplot as plt
 import pathlib
 import pandas.plotting as pd_plotting
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias 计算层
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.correlation import correlation_analysis
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 定义语言字典
 LANGUAGES = {
     'zh': {
@@ -53,6 +58,106 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :return: CorrelationResult
+    """
+    return correlation_analysis(df, method='pearson')
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认为桌面
+    :return: 相关性热力图、散点图矩阵和相关性柱状图的路径
+    """
+    pearson_corr = result.corr
+    numerical_df = result.data
+
+    # 整理数据
+    correlation_type = "Pearson相关系数"
+    explanations = LANGUAGES[language]['explanation']
+    interpretations = LANGUAGES[language]['interpretation']
+
+    data = [[f"{correlation_type} ({col1} vs {col2})", r, p] for col1, col2, r, p in result.pairs()]
+
+    headers = ["统计量", "相关系数", "p值"]
+    df_result = pd.DataFrame(data, columns=headers)
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([explanations])
+    explanation_df = explanation_df.reindex(columns=[correlation_type])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([interpretations])
+    interpretation_df = interpretation_df.reindex(columns=["相关系数", "p值"])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    # 合并数据、解释说明和结果解读
+    combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
+
+    # 创建一个新的Word文档
+    doc = new_document()
+
+    # 添加表格
+    add_dataframe_table(doc, combined_df, header=headers)
+
+    # 生成相关性热力图
+    plot_dir = pathlib.Path(plot_dir) if plot_dir else pathlib.Path.home() / 'Desktop'
+    plot_path = plot_dir / 'correlation_heatmap.png'
+    fig = new_figure(figsize=(10, 8))
+    ax = fig.subplots()
+    image = ax.imshow(pearson_corr, cmap='coolwarm', interpolation='nearest')
+    fig.colorbar(image)
+    ax.set_xticks(range(len(pearson_corr.columns)), pearson_corr.columns, rotation=45)
+    ax.set_yticks(range(len(pearson_corr.columns)), pearson_corr.columns)
+    for i in range(len(pearson_corr.columns)):
+        for j in range(len(pearson_corr.columns)):
+            ax.text(j, i, f'{pearson_corr.iloc[i, j]:.2f}', ha='center', va='center', color='black')
+    ax.set_title('Correlation Heatmap')
+    fig.savefig(plot_path)
+
+    # 生成散点图矩阵
+    scatter_matrix_path = plot_dir / 'scatter_matrix.png'
+    fig = new_figure(figsize=(10, 10))
+    n_vars = numerical_df.shape[1]
+    pd_plotting.scatter_matrix(numerical_df, alpha=0.8, diagonal='hist', ax=fig.subplots(n_vars, n_vars, squeeze=False))
+    fig.suptitle('Scatter Matrix')
+    fig.savefig(scatter_matrix_path)
+
+    # 生成相关性柱状图
+    selected_variable = numerical_df.columns[0]
+    correlation_column = pearson_corr[selected_variable]
+    bar_plot_path = plot_dir / 'correlation_bar_plot.png'
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    correlation_column.plot(kind='bar', ax=ax)
+    ax.set_title(f'Correlation with {selected_variable}')
+    ax.set_xlabel('Variables')
+    ax.set_ylabel('Correlation Coefficient')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(bar_plot_path)
+
+    # 在Word文档中添加图片
+    doc.add_heading('Correlation Heatmap', level=2)
+    doc.add_picture(str(plot_path), width=Inches(6))
+    doc.add_heading('Scatter Matrix', level=2)
+    doc.add_picture(str(scatter_matrix_path), width=Inches(6))
+    doc.add_heading('Correlation Bar Plot', level=2)
+    doc.add_picture(str(bar_plot_path), width=Inches(6))
+
+    # 保存Word文档
+    doc.save(save_path)
+    return plot_path, scatter_matrix_path, bar_plot_path
+
+
 class PearsonCorrelationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -93,133 +198,27 @@ class PearsonCorrelationAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行相关性分析。")
-
-            # 计算Pearson相关性
-            pearson_corr = numerical_df.corr(method='pearson')
-
-            # 计算p值
-            def calculate_pvalues(df):
-                df = df.dropna()._get_numeric_data()
-                dfcols = pd.DataFrame(columns=df.columns)
-                pvalues = dfcols.transpose().join(dfcols, how='outer')
-                for r in df.columns:
-                    for c in df.columns:
-                        _, p = stats.pearsonr(df[r], df[c])
-                        pvalues.loc[r, c] = p
-                return pvalues
-
-            pearson_pvalues = calculate_pvalues(numerical_df)
-
-            # 整理数据
-            data = []
-            correlation_types = ["Pearson相关系数"]
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-
-            for i, (corr, pvalues) in enumerate(zip([pearson_corr], [pearson_pvalues])):
-                for col1 in corr.columns:
-                    for col2 in corr.columns:
-                        if col1 != col2:
-                            data.append([f"{correlation_types[i]} ({col1} vs {col2})", corr.loc[col1, col2],
-                                         pvalues.loc[col1, col2]])
-
-            headers = ["统计量", "相关系数", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=correlation_types)
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["相关系数", "p值"])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=combined_df.shape[0] + 1, cols=combined_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(combined_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx in range(combined_df.shape[1]):
-                        row_cells[col_idx].text = str(combined_df.iloc[row_idx, col_idx])
-
-                # 生成相关性热力图
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = desktop_path / 'correlation_heatmap.png'
-                plt.figure(figsize=(10, 8))
-                plt.imshow(pearson_corr, cmap='coolwarm', interpolation='nearest')
-                plt.colorbar()
-                plt.xticks(range(len(pearson_corr.columns)), pearson_corr.columns, rotation=45)
-                plt.yticks(range(len(pearson_corr.columns)), pearson_corr.columns)
-                for i in range(len(pearson_corr.columns)):
-                    for j in range(len(pearson_corr.columns)):
-                        plt.text(j, i, f'{pearson_corr.iloc[i, j]:.2f}', ha='center', va='center', color='black')
-                plt.title('Correlation Heatmap')
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 生成散点图矩阵
-                scatter_matrix_path = desktop_path / 'scatter_matrix.png'
-                pd_plotting.scatter_matrix(numerical_df, alpha=0.8, figsize=(10, 10), diagonal='hist')
-                plt.suptitle('Scatter Matrix')
-                plt.savefig(scatter_matrix_path)
-                plt.close()
-
-                # 生成相关性柱状图
-                selected_variable = numerical_df.columns[0]
-                correlation_column = pearson_corr[selected_variable]
-                bar_plot_path = desktop_path / 'correlation_bar_plot.png'
-                plt.figure(figsize=(10, 6))
-                correlation_column.plot(kind='bar')
-                plt.title(f'Correlation with {selected_variable}')
-                plt.xlabel('Variables')
-                plt.ylabel('Correlation Coefficient')
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                plt.savefig(bar_plot_path)
-                plt.close()
-
-                # 在Word文档中添加图片
-                doc.add_heading('Correlation Heatmap', level=2)
-                doc.add_picture(str(plot_path), width=Inches(6))
-                doc.add_heading('Scatter Matrix', level=2)
-                doc.add_picture(str(scatter_matrix_path), width=Inches(6))
-                doc.add_heading('Correlation Bar Plot', level=2)
-                doc.add_picture(str(bar_plot_path), width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path) + f"相关性热力图已保存到 {plot_path}"
-                result_msg += f"\n散点图矩阵已保存到 {scatter_matrix_path}"
-                result_msg += f"\n相关性柱状图已保存到 {bar_plot_path}"
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        plot_path, scatter_matrix_path, bar_plot_path = report
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
+            save_path) + f"相关性热力图已保存到 {plot_path}"
+        result_msg += f"\n散点图矩阵已保存到 {scatter_matrix_path}"
+        result_msg += f"\n相关性柱状图已保存到 {bar_plot_path}"
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -235,6 +234,7 @@ class PearsonCorrelationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -243,7 +243,7 @@ class PearsonCorrelationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -274,6 +274,10 @@ class PearsonCorrelationAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
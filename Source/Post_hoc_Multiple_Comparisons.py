@@ -1,16 +1,19 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
+import sys
 import numpy as np
-from scipy import stats
-import matplotlib.pyplot as plt
-import pathlib
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from docx import Document
-from docx.shared import Pt
+from docx.shared import Inches
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.posthoc import ALPHA, POSTHOC_METHODS, posthoc_tests
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 定义语言字典
 LANGUAGES = {
@@ -24,15 +27,22 @@ LANGUAGES = {
         'analysis_error': "分析文件时出错: {}",
         'switch_language': "切换语言",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
+        'no_method_selected': "请至少选择一种检验方法。",
+        'report_title': "事后多重比较结果",
+        'skipped': "以下因变量没有可用数据或方差为零，未进行检验：{}",
+        'heatmap_title': "{} 调整后 p 值",
         'explanation': {
-            "Tukey's HSD": "用于方差分析后，检验多组均值之间的差异是否显著。",
+            "Tukey HSD": "用于方差分析后，检验多组均值之间的差异是否显著，组间样本量不等时为 Tukey-Kramer 法。",
+            "Bonferroni": "以合并方差进行两两 t 检验，p 值乘以比较次数。",
+            "Holm": "以合并方差进行两两 t 检验，按 Holm 逐步法调整 p 值，比 Bonferroni 法更有检验力。",
+            "Games-Howell": "不假定各组方差相等，适用于方差不齐的情形。",
         },
         'interpretation': {
             "p-adj": "经过校正后的 p 值，小于显著性水平（通常为 0.05）时，拒绝原假设，认为两组均值之间存在显著差异。",
-            "meandiff": "两组均值的差值，反映了两组之间的差异大小。",
-            "lower": "差异的置信区间下限。",
-            "upper": "差异的置信区间上限。",
-            "reject": "是否拒绝原假设，True 表示拒绝，认为两组均值有显著差异。"
+            "Mean Difference": "两组均值的差值，反映了两组之间的差异大小。",
+            "Lower": "差异的置信区间下限。",
+            "Upper": "差异的置信区间上限。",
+            "Reject": "是否拒绝原假设，True 表示拒绝，认为两组均值有显著差异。"
         }
     },
     'en': {
@@ -45,20 +55,98 @@ LANGUAGES = {
         'analysis_error': "An error occurred while analyzing the file: {}",
         'switch_language': "Switch Language",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
+        'no_method_selected': "Please select at least one test.",
+        'report_title': "Post-hoc Multiple Comparison Results",
+        'skipped': "The following dependent variables have no usable data or zero variance and were not tested: {}",
+        'heatmap_title': "{} adjusted p-values",
         'explanation': {
-            "Tukey's HSD": "Used after ANOVA to test whether the differences between the means of multiple groups are significant.",
+            "Tukey HSD": "Used after ANOVA to test whether the differences between the means of multiple groups are significant. With unequal group sizes this is the Tukey-Kramer method.",
+            "Bonferroni": "Pairwise t-tests on the pooled variance, with p-values multiplied by the number of comparisons.",
+            "Holm": "Pairwise t-tests on the pooled variance, with p-values adjusted by Holm's step-down method. More powerful than Bonferroni.",
+            "Games-Howell": "Does not assume equal group variances. Suitable when variances differ.",
         },
         'interpretation': {
             "p-adj": "The adjusted p-value. When it is less than the significance level (usually 0.05), the null hypothesis is rejected, indicating a significant difference between the means of two groups.",
-            "meandiff": "The difference between the means of two groups, reflecting the magnitude of the difference between the two groups.",
-            "lower": "The lower limit of the confidence interval for the difference.",
-            "upper": "The upper limit of the confidence interval for the difference.",
-            "reject": "Whether to reject the null hypothesis. True indicates rejection, suggesting a significant difference between the means of two groups."
+            "Mean Difference": "The difference between the means of two groups, reflecting the magnitude of the difference between the two groups.",
+            "Lower": "The lower limit of the confidence interval for the difference.",
+            "Upper": "The upper limit of the confidence interval for the difference.",
+            "Reject": "Whether to reject the null hypothesis. True indicates rejection, suggesting a significant difference between the means of two groups."
         }
     }
 }
 
 
+def analyze(df, methods=None, alpha=ALPHA):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 第一列为分组变量，其余列为因变量
+    :param methods: 检验方法，默认全部
+    :param alpha: 显著性水平
+    :return: PostHocResult
+    """
+    return posthoc_tests(df, methods=methods, alpha=alpha)
+
+
+def plot_pvalue_heatmap(table, method, img_path, language='en'):
+    """
+    绘制某一方法下各因变量、各组对的调整后 p 值热图
+    """
+    subset = table[table["Method"] == method]
+    pairs = subset["Group 1"].astype(str) + " - " + subset["Group 2"].astype(str)
+    matrix = subset.assign(Pair=pairs).pivot_table(index="Pair", columns="Dependent Variable", values="p-adj",
+                                                   sort=False)
+    fig = new_figure(figsize=(max(6, 0.25 * matrix.shape[1] + 3), max(4, 0.3 * matrix.shape[0] + 2)))
+    ax = fig.subplots()
+    image = ax.imshow(matrix.to_numpy(), aspect='auto', cmap='viridis_r', vmin=0, vmax=1)
+    ax.set_xticks(np.arange(matrix.shape[1]), matrix.columns, rotation=90, fontsize=7)
+    ax.set_yticks(np.arange(matrix.shape[0]), matrix.index, fontsize=8)
+    ax.set_title(LANGUAGES[language]['heatmap_title'].format(method))
+    fig.colorbar(image, ax=ax)
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和 p 值热图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    add_dataframe_table(doc, result.table.round(4))
+    if result.skipped:
+        doc.add_paragraph(texts['skipped'].format(", ".join(result.skipped)))
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    for method in result.table["Method"].unique():
+        doc.add_paragraph(f"{method}: {texts['explanation'][method]}")
+
+    # 添加结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    image_paths = []
+    for i, method in enumerate(result.table["Method"].unique()):
+        img_path = os.path.join(plot_dir, f"{stem}_posthoc_{i + 1}.png")
+        image_paths.append(plot_pvalue_heatmap(result.table, method, img_path, language))
+        doc.add_heading(texts['heatmap_title'].format(method), level=2)
+        doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return image_paths
+
+
 class PostHocMultipleComparisonsApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,88 +187,27 @@ class PostHocMultipleComparisonsApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否有标准差为零的列
-            std_values = df.iloc[:, 1:].std()
-            zero_std_columns = std_values[std_values == 0].index
-            if len(zero_std_columns) > 0:
-                print(f"以下列的标准差为零，将被移除: {zero_std_columns}")
-                df = df.drop(zero_std_columns, axis=1)
-
-            # 假设数据的第一列为分组变量，其余列为观测值
-            group = df.iloc[:, 0]
-            values = df.iloc[:, 1:].values.flatten()
-            groups = np.repeat(group, df.shape[1] - 1)
-
-            # 进行 Tukey's HSD 事后多重比较
-            tukey = pairwise_tukeyhsd(endog=values, groups=groups, alpha=0.05)
-            tukey_df = pd.DataFrame(data=tukey._results_table.data[1:], columns=tukey._results_table.data[0])
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["Tukey's HSD"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "p-adj", "meandiff", "lower", "upper", "reject"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加 Tukey's HSD 结果表格
-                table = doc.add_table(rows=tukey_df.shape[0] + 1, cols=tukey_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(tukey_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for row_idx, row in tukey_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明
-                doc.add_paragraph()
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                for idx, row in explanation_df.iterrows():
-                    for col in explanation_df.columns[1:]:
-                        doc.add_paragraph(f"{col}: {row[col]}")
-
-                # 添加结果解读
-                doc.add_paragraph()
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                for idx, row in interpretation_df.iterrows():
-                    for col in interpretation_df.columns[1:]:
-                        doc.add_paragraph(f"{col}: {row[col]}")
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 生成结果图片
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = desktop_path / 'tukey_plot.png'
-                fig = tukey.plot_simultaneous()
-                fig.savefig(plot_path)
-                plt.close()
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path) + f"结果图片已保存到 {plot_path}"
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        methods = [method for method, var in self.method_vars.items() if var.get()]
+        if not methods:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_method_selected'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, params={'methods': methods}, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -196,6 +223,7 @@ class PostHocMultipleComparisonsApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -204,7 +232,7 @@ class PostHocMultipleComparisonsApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 420
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -230,11 +258,24 @@ class PostHocMultipleComparisonsApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建检验方法复选框
+        methods_frame = ttk.Frame(frame)
+        methods_frame.pack(pady=5)
+        self.method_vars = {}
+        for i, method in enumerate(POSTHOC_METHODS):
+            self.method_vars[method] = tk.BooleanVar(value=True)
+            ttk.Checkbutton(methods_frame, text=method, variable=self.method_vars[method]).grid(
+                row=i // 2, column=i % 2, sticky='w', padx=10, pady=2)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=LANGUAGES[self.current_language]["analyze_button"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
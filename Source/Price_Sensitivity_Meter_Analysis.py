@@ -1,13 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.survey import PSM_COLUMNS, price_sensitivity_meter
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 定义语言字典
 languages = {
     "zh": {
@@ -21,6 +29,8 @@ languages = {
         "analysis_complete": "分析完成，结果已保存到 {}，PSM 图已保存。",
         "no_save_path_selected": "未选择保存路径，结果未保存。",
         "columns_stats": ["价格点", "太便宜比例", "便宜比例", "贵比例", "太贵比例"],
+        "points_stats": ["无差异价格点", "最优价格点", "可接受价格下限", "可接受价格上限"],
+        "points_headers": ["价格点", "价格"],
         "switch_language_button_text": "切换语言",
         "column_name_hint": "列名应为 TooCheap, Cheap, Expensive, TooExpensive"
     },
@@ -35,12 +45,70 @@ languages = {
         "analysis_complete": "Analysis completed. The results have been saved to {}, and the PSM plot has been saved.",
         "no_save_path_selected": "No save path selected. The results were not saved.",
         "columns_stats": ["Price Point", "Too Cheap Ratio", "Cheap Ratio", "Expensive Ratio", "Too Expensive Ratio"],
+        "points_stats": ["Indifference Price Point", "Optimal Price Point", "Lower Bound of Acceptable Price", "Upper Bound of Acceptable Price"],
+        "points_headers": ["Price Point", "Price"],
         "switch_language_button_text": "Switch Language",
         "column_name_hint": "Column names should be TooCheap, Cheap, Expensive, TooExpensive"
     }
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 每行为一个价格点，包含 TooCheap、Cheap、Expensive、TooExpensive 四列人数
+    :return: PsmResult
+    """
+    return price_sensitivity_meter(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    points = [result.indifference_point, result.optimal_price_point, result.lower_bound, result.upper_bound]
+
+    # 绘制 PSM 图
+    img_path = os.path.join(plot_dir, f"{stem}_psm_plot.png")
+    price_points = result.ratios["Price"]
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for column, label in zip(PSM_COLUMNS, ['Too Cheap', 'Cheap', 'Expensive', 'Too Expensive']):
+        ax.plot(price_points, result.ratios[column], label=label)
+    for point, color, label in zip(points, ['r', 'g', 'b', 'm'],
+                                   ['Indifference Point', 'Optimal Price Point', 'Lower Bound', 'Upper Bound']):
+        if point is not None:
+            ax.axvline(x=point, color=color, linestyle='--', label=f'{label}: {point:g}')
+    ax.set_title('Price Sensitivity Meter (PSM)')
+    ax.set_xlabel('Price')
+    ax.set_ylabel('Ratio')
+    ax.legend()
+    fig.savefig(img_path)
+
+    # 保存结果到 DataFrame
+    result_df = result.ratios.copy()
+    result_df.columns = texts["columns_stats"]
+    points_df = pd.DataFrame({texts["points_headers"][0]: texts["points_stats"],
+                              texts["points_headers"][1]: ["-" if point is None else point for point in points]})
+
+    doc = new_document()
+    doc.add_heading('Price Sensitivity Meter (PSM) Analysis Results', 0)
+    add_dataframe_table(doc, result_df)
+    add_dataframe_table(doc, points_df)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class PriceSensitivityMeterAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -81,105 +149,24 @@ class PriceSensitivityMeterAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 读取 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设数据集中包含 'TooCheap', 'Cheap', 'Expensive', 'TooExpensive' 列
-            price_points = df.index
-            too_cheap_ratio = df['TooCheap'] / df['TooCheap'].sum()
-            cheap_ratio = df['Cheap'] / df['Cheap'].sum()
-            expensive_ratio = df['Expensive'] / df['Expensive'].sum()
-            too_expensive_ratio = df['TooExpensive'] / df['TooExpensive'].sum()
-
-            # 计算交叉点
-            indifference_point = None
-            optimal_price_point = None
-            lower_bound = None
-            upper_bound = None
-
-            for i in range(len(price_points) - 1):
-                if cheap_ratio[i] < expensive_ratio[i] and cheap_ratio[i + 1] > expensive_ratio[i + 1]:
-                    indifference_point = price_points[i]
-                if too_cheap_ratio[i] < too_expensive_ratio[i] and too_cheap_ratio[i + 1] > too_expensive_ratio[i + 1]:
-                    optimal_price_point = price_points[i]
-                if too_cheap_ratio[i] < cheap_ratio[i] and too_cheap_ratio[i + 1] > cheap_ratio[i + 1]:
-                    lower_bound = price_points[i]
-                if too_expensive_ratio[i] < expensive_ratio[i] and too_expensive_ratio[i + 1] > expensive_ratio[i + 1]:
-                    upper_bound = price_points[i]
-
-            # 绘制 PSM 图
-            plt.figure(figsize=(10, 6))
-            plt.plot(price_points, too_cheap_ratio, label='Too Cheap')
-            plt.plot(price_points, cheap_ratio, label='Cheap')
-            plt.plot(price_points, expensive_ratio, label='Expensive')
-            plt.plot(price_points, too_expensive_ratio, label='Too Expensive')
-
-            if indifference_point:
-                plt.axvline(x=indifference_point, color='r', linestyle='--',
-                            label=f'Indifference Point: {indifference_point}')
-            if optimal_price_point:
-                plt.axvline(x=optimal_price_point, color='g', linestyle='--',
-                            label=f'Optimal Price Point: {optimal_price_point}')
-            if lower_bound:
-                plt.axvline(x=lower_bound, color='b', linestyle='--', label=f'Lower Bound: {lower_bound}')
-            if upper_bound:
-                plt.axvline(x=upper_bound, color='m', linestyle='--', label=f'Upper Bound: {upper_bound}')
-
-            plt.title('Price Sensitivity Meter (PSM)')
-            plt.xlabel('Price')
-            plt.ylabel('Ratio')
-            plt.legend()
-
-            psm_plot_path = os.path.splitext(file_path)[0] + '_psm_plot.png'
-            plt.savefig(psm_plot_path)
-            plt.close()
-
-            # 保存结果到 DataFrame
-            columns_stats = languages[self.current_language]["columns_stats"]
-            data = {
-                columns_stats[0]: price_points,
-                columns_stats[1]: too_cheap_ratio,
-                columns_stats[2]: cheap_ratio,
-                columns_stats[3]: expensive_ratio,
-                columns_stats[4]: too_expensive_ratio
-            }
-            result_df = pd.DataFrame(data)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('Price Sensitivity Meter (PSM) Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(result_df.columns))
-                hdr_cells = table.rows[0].cells
-                for i, col in enumerate(result_df.columns):
-                    hdr_cells[i].text = col
-
-                for index, row in result_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加 PSM 图
-                doc.add_picture(psm_plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                # 设置 wraplength 属性让文本自动换行
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -196,6 +183,7 @@ class PriceSensitivityMeterAnalysisApp:
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
         self.column_name_hint_label.config(text=languages[self.current_language]["column_name_hint"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -204,7 +192,7 @@ class PriceSensitivityMeterAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -235,6 +223,10 @@ class PriceSensitivityMeterAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建列名提示标签
         self.column_name_hint_label = ttk.Label(frame, text=languages[self.current_language]["column_name_hint"],
                                                 foreground="gray")
@@ -1,15 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.multivariate import principal_components
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -67,6 +74,72 @@ languages = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 每列一个变量
+    :return: PcaResult
+    """
+    return principal_components(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    ev_df = pd.DataFrame({
+        '特征值': result.eigenvalues,
+        '方差贡献率': result.variance_ratio
+    }, index=range(1, len(result.eigenvalues) + 1))
+
+    doc = new_document()
+
+    # 添加主成分载荷矩阵
+    doc.add_heading('主成分载荷矩阵', level=1)
+    add_dataframe_table(doc, result.loadings, index=True, index_label='变量')
+
+    # 添加主成分得分
+    doc.add_heading('主成分得分', level=1)
+    add_dataframe_table(doc, result.scores, index=True, index_label='样本')
+
+    # 添加特征值和方差贡献率
+    doc.add_heading('特征值和方差贡献率', level=1)
+    add_dataframe_table(doc, ev_df, index=True, index_label='主成分')
+
+    # 添加解释说明
+    doc.add_heading('解释说明', level=1)
+    for key, value in texts["explanation"].items():
+        doc.add_paragraph(f'{key}: {value}')
+
+    # 添加结果解读
+    doc.add_heading('结果解读', level=1)
+    for key, value in texts["interpretation"].items():
+        doc.add_paragraph(f'{key}: {value}')
+
+    # 生成碎石图
+    img_path = os.path.join(plot_dir, f"{stem}_scree_plot.png")
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(range(1, len(result.eigenvalues) + 1), result.eigenvalues, marker='o')
+    ax.set_title('碎石图' if language == 'zh' else 'Scree Plot')
+    ax.set_xlabel('主成分数量' if language == 'zh' else 'Number of Principal Components')
+    ax.set_ylabel('特征值' if language == 'zh' else 'Eigenvalues')
+    fig.savefig(img_path)
+    doc.add_heading('碎石图', level=1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class PrincipalComponentAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,47 +172,6 @@ class PrincipalComponentAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def pca_analysis(self, data):
-        """
-        进行主成分分析
-        :param data: 输入数据
-        :return: 主成分载荷矩阵、主成分得分、特征值、方差贡献率
-        """
-        # 创建主成分分析对象
-        pca = PCA()
-        pca.fit(data)
-
-        # 计算特征值和方差贡献率
-        ev = pca.explained_variance_
-        v = pca.explained_variance_ratio_
-
-        # 确定主成分数量
-        num_components = sum(ev > 1)
-        num_components = max(1, num_components)  # 确保至少有一个主成分
-
-        # 重新进行主成分分析
-        pca = PCA(n_components=num_components)
-        scores = pca.fit_transform(data)
-        loadings = pca.components_.T
-
-        return loadings, scores, ev, v
-
-    def plot_scree_plot(self, ev, save_path):
-        """
-        绘制碎石图
-        :param ev: 特征值
-        :param save_path: 图片保存路径
-        """
-        plt.figure(figsize=(10, 5))
-        plt.plot(range(1, len(ev) + 1), ev, marker='o')
-        plt.title('碎石图' if self.current_language == 'zh' else 'Scree Plot')
-        plt.xlabel('主成分数量' if self.current_language == 'zh' else 'Number of Principal Components')
-        plt.ylabel('特征值' if self.current_language == 'zh' else 'Eigenvalues')
-        img_path = os.path.splitext(save_path)[0] + '_scree_plot.png'
-        plt.savefig(img_path)
-        plt.close()
-        return img_path
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -148,92 +180,24 @@ class PrincipalComponentAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 进行主成分分析
-            loadings, scores, ev, v = self.pca_analysis(df)
-
-            # 整理数据
-            component_names = [f'主成分{i + 1}' for i in range(len(loadings[0]))]
-            loadings_df = pd.DataFrame(loadings, index=df.columns, columns=component_names)
-            scores_df = pd.DataFrame(scores, columns=component_names)
-            ev_df = pd.DataFrame(ev, columns=['特征值'])
-            v_df = pd.DataFrame(v, columns=['方差贡献率'])
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加主成分载荷矩阵
-                doc.add_heading('主成分载荷矩阵', level=1)
-                table = doc.add_table(rows=loadings_df.shape[0] + 1, cols=loadings_df.shape[1] + 1)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = '变量'
-                for col_num, col_name in enumerate(loadings_df.columns):
-                    hdr_cells[col_num + 1].text = col_name
-                for row_num, (index, row) in enumerate(loadings_df.iterrows()):
-                    row_cells = table.rows[row_num + 1].cells
-                    row_cells[0].text = index
-                    for col_num, value in enumerate(row):
-                        row_cells[col_num + 1].text = str(value)
-
-                # 添加主成分得分
-                doc.add_heading('主成分得分', level=1)
-                table = doc.add_table(rows=scores_df.shape[0] + 1, cols=scores_df.shape[1] + 1)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = '样本'
-                for col_num, col_name in enumerate(scores_df.columns):
-                    hdr_cells[col_num + 1].text = col_name
-                for row_num, (index, row) in enumerate(scores_df.iterrows()):
-                    row_cells = table.rows[row_num + 1].cells
-                    row_cells[0].text = str(index)
-                    for col_num, value in enumerate(row):
-                        row_cells[col_num + 1].text = str(value)
-
-                # 添加特征值和方差贡献率
-                doc.add_heading('特征值和方差贡献率', level=1)
-                table = doc.add_table(rows=ev_df.shape[0] + 1, cols=ev_df.shape[1] + v_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = '主成分'
-                hdr_cells[1].text = '特征值'
-                hdr_cells[2].text = '方差贡献率'
-                for row_num, ((_, ev_row), (_, v_row)) in enumerate(zip(ev_df.iterrows(), v_df.iterrows())):
-                    row_cells = table.rows[row_num + 1].cells
-                    row_cells[0].text = str(row_num + 1)
-                    row_cells[1].text = str(ev_row[0])
-                    row_cells[2].text = str(v_row[0])
-
-                # 添加解释说明
-                doc.add_heading('解释说明', level=1)
-                for key, value in languages[self.current_language]["explanation"].items():
-                    doc.add_paragraph(f'{key}: {value}')
-
-                # 添加结果解读
-                doc.add_heading('结果解读', level=1)
-                for key, value in languages[self.current_language]["interpretation"].items():
-                    doc.add_paragraph(f'{key}: {value}')
-
-                # 生成碎石图
-                img_path = self.plot_scree_plot(ev, save_path)
-
-                # 添加碎石图到文档
-                doc.add_heading('碎石图', level=1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -249,6 +213,7 @@ class PrincipalComponentAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -257,7 +222,7 @@ class PrincipalComponentAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -288,6 +253,10 @@ class PrincipalComponentAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=languages[self.current_language]["switch_language_button_text"],
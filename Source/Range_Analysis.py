@@ -1,16 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import openpyxl
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import range_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -57,6 +63,70 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 正交试验数据，最后一列为试验结果，其余各列为各因素的水平
+    :return: RangeAnalysisResult
+    """
+    return range_analysis(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = []
+    for factor in result.factors:
+        for level, mean in result.level_means[factor].items():
+            data.append([f"{factor} 水平{level:g} 均值", mean])
+        data.append([f"{factor} 极差", result.ranges[factor]])
+        data.append([f"{factor} 最优水平", f"{result.best_levels[factor]:g}"])
+    headers = ["统计量", "值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_table(doc, data, headers=headers)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成极差分析图
+    plot_path = os.path.join(plot_dir, f"{stem}_range_analysis_plot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for factor in result.factors:
+        means = result.level_means[factor]
+        ax.plot(means.index, means.values, marker='o', label=factor)
+    ax.set_title('Range Analysis - Mean Values by Factor and Level')
+    ax.set_xlabel('Level')
+    ax.set_ylabel('Mean Value')
+    ax.legend()
+    ax.grid(True)
+    fig.savefig(plot_path)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class RangeAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -97,111 +167,24 @@ class RangeAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active
-
-            rows = sheet.max_row
-            columns = sheet.max_column
-
-            data = []
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-
-            # 读取数据
-            table = []
-            for row_idx in range(1, rows + 1):
-                row = []
-                for col_idx in range(1, columns + 1):
-                    cell_value = sheet.cell(row=row_idx, column=col_idx).value
-                    if isinstance(cell_value, (int, float)):
-                        row.append(cell_value)
-                if row:
-                    table.append(row)
-            table = np.array(table)
-
-            num_factors = columns - 1  # 减去结果列
-            levels = np.unique(table[:, :-1], axis=0).shape[0]
-            results = table[:, -1]
-
-            # 计算各因素各水平下的均值和极差
-            factor_means = []
-            factor_ranges = []
-            for factor in range(num_factors):
-                level_means = []
-                for level in np.unique(table[:, factor]):
-                    level_results = results[table[:, factor] == level]
-                    level_mean = np.mean(level_results)
-                    level_means.append(level_mean)
-                factor_means.append(level_means)
-                factor_range = np.max(level_means) - np.min(level_means)
-                factor_ranges.append(factor_range)
-
-            # 整理数据
-            for i in range(num_factors):
-                for j in range(levels):
-                    data.append([f"因素{i + 1} 水平{j + 1} 均值", factor_means[i][j]])
-                data.append([f"因素{i + 1} 极差", factor_ranges[i]])
-
-            headers = ["统计量", "值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["极差"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["极差", "均值"])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('统计量').T.reset_index().rename(columns={'index': '统计量'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0], cols=transposed_df.shape[1])
-                for i, row in enumerate(transposed_df.values):
-                    for j, value in enumerate(row):
-                        table.cell(i, j).text = str(value)
-
-                # 生成极差分析图
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = os.path.splitext(save_path)[0] + '_range_analysis_plot.png'
-                plt.figure(figsize=(10, 6))
-                for i in range(num_factors):
-                    plt.plot(np.arange(1, levels + 1), factor_means[i], marker='o', label=f'Factor {i + 1}')
-                plt.title('Range Analysis - Mean Values by Factor and Level')
-                plt.xlabel('Level')
-                plt.ylabel('Mean Value')
-                plt.legend()
-                plt.grid(True)
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -217,6 +200,7 @@ class RangeAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -225,7 +209,7 @@ class RangeAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -256,6 +240,10 @@ class RangeAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
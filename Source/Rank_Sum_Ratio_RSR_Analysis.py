@@ -1,14 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import rank_sum_ratio
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -69,6 +77,75 @@ languages = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，行为评价对象，列为指标
+    :return: RsrResult
+    """
+    return rank_sum_ratio(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    result_data = [
+        ["秩矩阵", result.ranks.tolist(), ""],
+        ["秩和比(RSR)", result.rsr.tolist(), ""],
+        ["RSR 排序结果", result.ranking.tolist(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_table(doc, result_data, headers=headers)
+    doc.add_heading('解释说明', level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读', level=2)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成 RSR 分布直方图
+    img_path = os.path.join(plot_dir, f"{stem}_rsr_histogram.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.hist(result.rsr, bins=10)
+    ax.set_title('RSR 分布直方图' if language == 'zh' else 'Histogram of RSR Distribution')
+    ax.set_xlabel('秩和比(RSR)' if language == 'zh' else 'Rank - Sum Ratio (RSR)')
+    ax.set_ylabel('频数' if language == 'zh' else 'Frequency')
+    fig.savefig(img_path)
+    doc.add_heading('RSR 分布直方图', level=2)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class RankSumRatioRSRAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -101,23 +178,6 @@ class RankSumRatioRSRAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def rsr_method(self, data):
-        """
-        实现秩和比(RSR)法
-        :param data: 原始数据矩阵
-        :return: 秩矩阵, 秩和比(RSR), RSR 排序结果
-        """
-        # 计算秩矩阵
-        rank_matrix = np.apply_along_axis(lambda x: pd.Series(x).rank().values, 0, data)
-
-        # 计算秩和比(RSR)
-        RSR = rank_matrix.sum(axis=1) / (rank_matrix.shape[0] * rank_matrix.shape[1])
-
-        # 对 RSR 进行排序
-        ranking = np.argsort(-RSR) + 1
-
-        return rank_matrix, RSR, ranking
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -126,105 +186,24 @@ class RankSumRatioRSRAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 进行 RSR 分析
-            rank_matrix, RSR, ranking = self.rsr_method(data)
-
-            # 整理数据
-            result_data = [
-                ["秩矩阵", rank_matrix.tolist(), ""],
-                ["秩和比(RSR)", RSR.tolist(), ""],
-                ["RSR 排序结果", ranking.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            result_df = pd.DataFrame(result_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["秩矩阵", "秩和比(RSR)", "RSR 分布直方图", "回归方程", "RSR 排序结果"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["秩矩阵", "秩和比(RSR)", "RSR 分布直方图", "回归方程", "RSR 排序结果"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 生成 RSR 分布直方图
-            fig, ax = plt.subplots()
-            ax.hist(RSR, bins=10)
-            ax.set_title(
-                'RSR 分布直方图' if self.current_language == 'zh' else 'Histogram of RSR Distribution')
-            ax.set_xlabel('秩和比(RSR)' if self.current_language == 'zh' else 'Rank - Sum Ratio (RSR)')
-            ax.set_ylabel('频数' if self.current_language == 'zh' else 'Frequency')
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for _, row in result_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('解释说明', level=2)
-                exp_table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                exp_hdr_cells = exp_table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    exp_hdr_cells[col_idx].text = header
-                for _, row in explanation_df.iterrows():
-                    exp_row_cells = exp_table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        exp_row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('结果解读', level=2)
-                int_table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                int_hdr_cells = int_table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    int_hdr_cells[col_idx].text = header
-                for _, row in interpretation_df.iterrows():
-                    int_row_cells = int_table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        int_row_cells[col_idx].text = str(value)
-
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_rsr_histogram.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 添加图片到 Word 文档
-                doc.add_heading('RSR 分布直方图', level=2)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -240,6 +219,7 @@ class RankSumRatioRSRAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -248,7 +228,7 @@ class RankSumRatioRSRAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -279,6 +259,10 @@ class RankSumRatioRSRAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,18 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
-import numpy as np
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from sklearn.metrics import accuracy_score, roc_auc_score
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import label_binarize
-from sklearn.metrics import roc_curve
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import LOGISTIC_C, regularized_logistic_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_roc_curve
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -21,6 +24,10 @@ plt.rcParams['axes.unicode_minus'] = False
 languages = {
     "zh": {
         "title": "正则化多项逻辑回归分析",
+        "report_title": "正则化多项逻辑回归分析结果",
+        "target_note": "因变量：{}",
+        "statistics_heading": "模型统计量",
+        "coefficients_heading": "回归系数",
         "select_button_text": "选择文件",
         "file_entry_placeholder": "请输入待分析 Excel 文件的完整路径",
         "analyze_button_text": "分析文件",
@@ -39,6 +46,10 @@ languages = {
     },
     "en": {
         "title": "Regularized Multinomial Logistic Regression Analysis",
+        "report_title": "Regularized Multinomial Logistic Regression Analysis Results",
+        "target_note": "Dependent variable: {}",
+        "statistics_heading": "Model Statistics",
+        "coefficients_heading": "Coefficients",
         "select_button_text": "Select File",
         "file_entry_placeholder": "Please enter the full path of the Excel file to be analyzed",
         "analyze_button_text": "Analyze File",
@@ -57,6 +68,51 @@ languages = {
     }
 }
 
+
+def analyze(df, C=LOGISTIC_C):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量（类别），其余列为自变量
+    :param C: 正则化强度的倒数，越小正则化越强
+    :return: RegressionResult
+    """
+    return regularized_logistic_regression(df, C=C)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['target_note'].format(result.target))
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = os.path.join(plot_dir, f"{stem}_regularized_multinomial_logistic_regression_roc.png")
+    render_roc_curve(result.actual, result.fitted, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class RegularizedMultinomialLogisticRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -97,98 +153,24 @@ class RegularizedMultinomialLogisticRegressionAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1].values
-            y = df.iloc[:, -1].values
-
-            # 创建正则化多项逻辑回归模型
-            model = LogisticRegression(multi_class='multinomial', solver='lbfgs', penalty='l2', C=1.0)
-            model.fit(X, y)
-
-            # 预测概率和类别
-            y_pred_proba = model.predict_proba(X)
-            y_pred = model.predict(X)
-
-            # 计算指标
-            coefficients = model.coef_
-            intercept = model.intercept_
-            accuracy = accuracy_score(y, y_pred)
-
-            # 计算多分类 AUC
-            y_bin = label_binarize(y, classes=np.unique(y))
-            auc = roc_auc_score(y_bin, y_pred_proba, multi_class='ovr')
-
-            # 准备数据
-            columns_stats = ["Coefficients", "Intercept", "Accuracy", "AUC"]
-            explanations = languages[self.current_language]['explanation']
-            data = [["Regularized Multinomial Logistic Regression"] + [coefficients] + [intercept] + [accuracy, auc]]
-            headers = ["Model"] + [f"Coefficient_{i + 1}" for i in range(len(coefficients))] + ["Intercept"] + columns_stats[2:]
-
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df_result, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx, row in transposed_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成 ROC 曲线（这里只展示第一个类别的 ROC 曲线作为示例）
-                fpr, tpr, thresholds = roc_curve(y_bin[:, 0], y_pred_proba[:, 0])
-                plt.figure(figsize=(10, 6))
-                plt.plot(fpr, tpr, label='ROC curve (area = %0.2f)' % auc)
-                plt.plot([0, 1], [0, 1], 'k--')
-                plt.xlim([0.0, 1.0])
-                plt.ylim([0.0, 1.05])
-                plt.xlabel('False Positive Rate')
-                plt.ylabel('True Positive Rate')
-                plt.title('Receiver Operating Characteristic')
-                plt.legend(loc="lower right")
-                img_name = "regularized_multinomial_logistic_regression_roc.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path, save_dir), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -204,6 +186,7 @@ class RegularizedMultinomialLogisticRegressionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -212,7 +195,7 @@ class RegularizedMultinomialLogisticRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -243,6 +226,10 @@ class RegularizedMultinomialLogisticRegressionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -3,16 +3,21 @@ from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 import openpyxl
 import os
-import numpy as np
+import sys
 import pandas as pd
 from tkinter import filedialog
 import tkinter as tk
-from scipy.stats import pearsonr
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias 计算层
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.reliability import reliability_analysis
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -64,6 +69,77 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :return: ReliabilityResult
+    """
+    return reliability_analysis(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 均值柱状图的路径
+    """
+    # 整理数据
+    data = [
+        ["Cronbach's Alpha系数", result.alpha, ""],
+        ["样本量", result.sample_sizes.to_dict(), ""],
+        ["均值", result.means.to_dict(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanations = LANGUAGES[language]['explanation']
+    interpretations = LANGUAGES[language]['interpretation']
+
+    # 创建 Word 文档
+    doc = new_document()
+
+    # 添加标题
+    doc.add_heading('信度分析结果' if language == 'zh' else 'Reliability Analysis Results', 0)
+
+    # 添加表格
+    add_table(doc, data, headers=headers)
+
+    # 添加解释说明
+    doc.add_heading('解释说明' if language == 'zh' else 'Explanation', 1)
+    for key, value in explanations.items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加分析结果解读
+    doc.add_heading('结果解读' if language == 'zh' else 'Interpretation', 1)
+    for key, value in interpretations.items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 生成图片（均值柱状图）
+    fig = new_figure()
+    ax = fig.subplots()
+    result.means.plot(kind='bar', ax=ax)
+    ax.set_title('变量均值柱状图' if language == 'zh' else 'Bar Chart of Variable Means')
+    ax.set_xlabel('变量' if language == 'zh' else 'Variables')
+    ax.set_ylabel('均值' if language == 'zh' else 'Mean')
+    # 保存图片
+    img_path = os.path.splitext(save_path)[0] + '.png'
+    if plot_dir:
+        img_path = os.path.join(plot_dir, os.path.basename(img_path))
+    fig.savefig(img_path)
+
+    # 将图片插入 Word 文档
+    doc.add_heading('变量均值柱状图' if language == 'zh' else 'Bar Chart of Variable Means', 1)
+    doc.add_picture(img_path, width=Inches(6))
+
+    # 保存 Word 文档
+    doc.save(save_path)
+    return img_path
+
+
 class ReliabilityAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -96,18 +172,6 @@ class ReliabilityAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def cronbach_alpha(self, data):
-        num_items = data.shape[1]
-        item_variances = data.var(axis=0, ddof=1)
-        total_variance = data.sum(axis=1).var(ddof=1)
-        alpha = (num_items / (num_items - 1)) * (1 - (item_variances.sum() / total_variance))
-        return alpha
-
-    def reliability_analysis(self, data):
-        # 计算Cronbach's Alpha系数
-        alpha = self.cronbach_alpha(data)
-        return alpha
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
@@ -116,91 +180,24 @@ class ReliabilityAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行信度分析。")
-
-            # 进行信度分析
-            alpha = self.reliability_analysis(numerical_df)
-
-            # 计算样本量和均值
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-
-            # 整理数据
-            data = [
-                ["Cronbach's Alpha系数", alpha, ""],
-                ["样本量", sample_sizes.to_dict(), ""],
-                ["均值", means.to_dict(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加标题
-                doc.add_heading('信度分析结果' if self.current_language == 'zh' else 'Reliability Analysis Results', 0)
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-
-                for row in data:
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading('解释说明' if self.current_language == 'zh' else 'Explanation', 1)
-                for key, value in explanations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 添加分析结果解读
-                doc.add_heading('结果解读' if self.current_language == 'zh' else 'Interpretation', 1)
-                for key, value in interpretations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 生成图片（均值柱状图）
-                fig, ax = plt.subplots()
-                means.plot(kind='bar', ax=ax)
-                ax.set_title('变量均值柱状图' if self.current_language == 'zh' else 'Bar Chart of Variable Means')
-                ax.set_xlabel('变量' if self.current_language == 'zh' else 'Variables')
-                ax.set_ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入 Word 文档
-                doc.add_heading('变量均值柱状图' if self.current_language == 'zh' else 'Bar Chart of Variable Means', 1)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
+            save_path)
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event=None):
         if self.current_language == "zh":
@@ -216,6 +213,7 @@ class ReliabilityAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -224,7 +222,7 @@ class ReliabilityAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -255,6 +253,10 @@ class ReliabilityAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
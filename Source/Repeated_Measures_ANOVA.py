@@ -1,16 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import pathlib
-import pingouin as pg
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.anova import repeated_measures_anova
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'
 # 用于解决负号显示问题
@@ -24,6 +30,7 @@ LANGUAGES = {
         'analyze_button': "分析文件",
         'file_not_found': "文件不存在，请重新选择。",
         'analysis_success': "分析完成，结果已保存到 {}\n",
+        'images_saved': "结果图片已保存到 {}",
         'no_save_path': "未选择保存路径，结果未保存。",
         'analysis_error': "分析文件时出错: {}",
         'switch_language': "切换语言",
@@ -43,6 +50,7 @@ LANGUAGES = {
         'analyze_button': "Analyze File",
         'file_not_found': "The file does not exist. Please select again.",
         'analysis_success': "Analysis completed. The results have been saved to {}\n",
+        'images_saved': "The result image has been saved to {}",
         'no_save_path': "No save path selected. The results were not saved.",
         'analysis_error': "An error occurred while analyzing the file: {}",
         'switch_language': "Switch Language",
@@ -59,6 +67,58 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，第一列为被试编号，其余列为不同处理水平下的测量值
+    :return: RepeatedMeasuresResult
+    """
+    return repeated_measures_anova(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_dataframe_table(doc, result.table)
+    add_dataframe_table(doc, explanation_df)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 每个被试一条折线
+    plot_path = os.path.join(plot_dir, f"{stem}_repeated_measures_anova_plot.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    for subj, values in result.data.iterrows():
+        ax.plot(result.conditions, values, marker='o', label=f'Subject {subj}')
+    ax.set_xlabel('Treatment')
+    ax.set_ylabel('Value')
+    ax.set_title('重复测量方差分析结果' if language == 'zh' else 'Repeated Measures ANOVA Results')
+    ax.legend()
+    fig.savefig(plot_path)
+    doc.add_picture(plot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [plot_path]
+
+
 class RepeatedMeasuresANOVAApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -94,90 +154,29 @@ class RepeatedMeasuresANOVAApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设第一列是被试编号，其余列是不同处理水平下的测量值
-            subject = df.iloc[:, 0]
-            measures = df.iloc[:, 1:]
-
-            # 将数据转换为长格式
-            long_df = pd.melt(df, id_vars=df.columns[0], var_name='Treatment', value_name='Value')
-
-            # 进行重复测量方差分析
-            anova = pg.rm_anova(data=long_df, dv='Value', within='Treatment', subject=df.columns[0])
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["重复测量方差分析" if self.current_language == 'zh' else "Repeated Measures ANOVA"])
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=[
-                "F值" if self.current_language == 'zh' else "F value",
-                "p值" if self.current_language == 'zh' else "p value",
-                "偏 eta 平方" if self.current_language == 'zh' else "Partial eta squared"
-            ])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([anova, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的Word文档
-                doc = Document()
-
-                # 添加表格到文档
-                table = doc.add_table(rows=combined_df.shape[0] + 1, cols=combined_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for row_idx in range(combined_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(combined_df.iloc[row_idx]):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成结果图片
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = desktop_path / 'repeated_measures_anova_plot.png'
-                plt.figure()
-                for subj in subject.unique():
-                    subj_data = long_df[long_df[df.columns[0]] == subj]
-                    plt.plot(subj_data['Treatment'], subj_data['Value'], marker='o', label=f'Subject {subj}')
-                plt.xlabel('Treatment')
-                plt.ylabel('Value')
-                plt.title(
-                    '重复测量方差分析结果' if self.current_language == 'zh' else 'Repeated Measures ANOVA Results')
-                plt.legend()
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 将图片插入到文档中
-                doc.add_picture(str(plot_path), width=Inches(6))
-
-                # 保存Word文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path) + f"结果图片已保存到 {plot_path}" if self.current_language == 'zh' else f"The result image has been saved to {plot_path}"
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
+        result_msg += LANGUAGES[self.current_language]['images_saved'].format(paths[0])
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -193,6 +192,7 @@ class RepeatedMeasuresANOVAApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -201,7 +201,7 @@ class RepeatedMeasuresANOVAApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -232,6 +232,10 @@ class RepeatedMeasuresANOVAApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
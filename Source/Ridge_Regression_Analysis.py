@@ -1,18 +1,25 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
-import numpy as np
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from sklearn.linear_model import Ridge
-from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.preprocessing import StandardScaler
-import statsmodels.api as sm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regularization import CV_FOLDS, regularized_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_regularization_figures
+from dias.report import add_dataframe_table, new_document
+
+# 设置支持中文的字体
+plt.rcParams['font.family'] = 'SimHei'  # 使用黑体字体，可根据系统情况修改
+plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+
 # 定义语言字典
 LANGUAGES = {
     'zh': {
@@ -26,15 +33,28 @@ LANGUAGES = {
         'images_saved': "图片已保存到 {}",
         'switch_language': "切换语言",
         'file_entry_placeholder': "请输入待分析 Excel 文件的完整路径",
+        'alpha_label': "alpha（留空按交叉验证选择）：",
+        'folds_label': "交叉验证折数：",
+        'parallel_check': "多进程并行计算各折",
+        'invalid_params': "alpha 须为正数，折数须为不小于 2 的整数。",
+        'report_title': "岭回归分析结果",
+        'alpha_mode': {"CV": "交叉验证均方误差最小", "Specified": "指定"},
+        'alpha_note': "alpha = {:.6g}（{}），自变量标准化后计算，各折在同一组 alpha 上求整条路径。",
+        'statistics_heading': "模型统计量",
+        'coefficients_heading': "回归系数",
+        'cv_heading': "交叉验证",
         'explanation': {
             "Coefficients": "回归系数，表示每个自变量对因变量的影响程度。",
+            "Standardized Coefficients": "标准化系数，自变量标准化后的系数，可在变量之间比较大小。",
             "Intercept": "截距，是当所有自变量为 0 时因变量的预测值。",
+            "alpha": "正则化强度，越大系数被压缩得越多；由 K 折交叉验证选择均方误差最小的值。",
+            "Effective Degrees of Freedom": "有效自由度：Σ s²/(s²+α)，s 为标准化设计矩阵的奇异值，用于计算调整决定系数。",
             "Mean Squared Error (MSE)": "均方误差，衡量预测值与真实值之间的平均误差。",
             "R-squared (R²)": "决定系数，取值范围在 0 到 1 之间，越接近 1 表示模型拟合效果越好。",
             "Adjusted R-squared": "调整决定系数，考虑了模型中自变量的数量，对模型的拟合优度进行了调整。",
-            "F-value": "F 统计量，用于检验整个回归模型的显著性。",
-            "t-value": "t 统计量，用于检验每个自变量的显著性。",
-            "p-value": "p 值，用于判断自变量的显著性，p 值越小，自变量越显著。"
+            "F-value": "F 统计量，用于检验整个回归模型的显著性（普通最小二乘模型）。",
+            "t-value": "t 统计量，用于检验每个自变量的显著性（普通最小二乘模型，仅供参考）。",
+            "p-value": "p 值，用于判断自变量的显著性，p 值越小，自变量越显著（普通最小二乘模型，仅供参考）。"
         }
     },
     'en': {
@@ -48,20 +68,81 @@ LANGUAGES = {
         'images_saved': "Images have been saved to {}",
         'switch_language': "Switch Language",
         'file_entry_placeholder': "Please enter the full path of the Excel file to be analyzed",
+        'alpha_label': "alpha (blank to choose by cross-validation): ",
+        'folds_label': "Cross-validation folds: ",
+        'parallel_check': "Run the folds in parallel processes",
+        'invalid_params': "alpha must be positive and the number of folds must be an integer of at least 2.",
+        'report_title': "Ridge Regression Analysis Results",
+        'alpha_mode': {"CV": "lowest cross-validated MSE", "Specified": "specified"},
+        'alpha_note': "alpha = {:.6g} ({}). The variables are standardized, and every fold computes the whole path on the same alphas.",
+        'statistics_heading': "Model Statistics",
+        'coefficients_heading': "Coefficients",
+        'cv_heading': "Cross-validation",
         'explanation': {
             "Coefficients": "Regression coefficients, indicating the influence of each independent variable on the dependent variable.",
+            "Standardized Coefficients": "Coefficients on the standardized independent variables, comparable across variables.",
             "Intercept": "Intercept, which is the predicted value of the dependent variable when all independent variables are 0.",
+            "alpha": "Regularization strength. Larger values shrink the coefficients more. K-fold cross-validation picks the value with the lowest mean squared error.",
+            "Effective Degrees of Freedom": "Σ s²/(s²+α), where s are the singular values of the standardized design matrix. It is used for the adjusted R-squared.",
             "Mean Squared Error (MSE)": "Mean squared error, measuring the average error between the predicted and actual values.",
             "R-squared (R²)": "Coefficient of determination, ranging from 0 to 1. A value closer to 1 indicates a better fit of the model.",
             "Adjusted R-squared": "Adjusted coefficient of determination, which takes into account the number of independent variables in the model and adjusts the goodness of fit of the model.",
-            "F-value": "F statistic, used to test the significance of the entire regression model.",
-            "t-value": "t statistic, used to test the significance of each independent variable.",
-            "p-value": "p value, used to determine the significance of the independent variable. The smaller the p value, the more significant the independent variable."
+            "F-value": "F statistic, used to test the significance of the entire regression model (ordinary least squares model).",
+            "t-value": "t statistic, used to test the significance of each independent variable (ordinary least squares model, for reference only).",
+            "p-value": "p value, used to determine the significance of the independent variable. The smaller the p value, the more significant the independent variable (ordinary least squares model, for reference only)."
         }
     }
 }
 
 
+def analyze(df, alpha=None, folds=CV_FOLDS, parallel=True):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量，其余列为自变量
+    :param alpha: 采用的 alpha，None 时按交叉验证选择
+    :param folds: 交叉验证的折数
+    :param parallel: 是否在进程池中并行计算各折
+    :return: RegularizationResult
+    """
+    return regularized_regression(df, method="Ridge", alpha=alpha, folds=folds, parallel=parallel)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['alpha_note'].format(result.alpha, texts['alpha_mode'][result.alpha_mode]))
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+    doc.add_heading(texts['cv_heading'], 1)
+    add_dataframe_table(doc, result.cv)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_paths = render_regularization_figures(result, plot_dir, f"{stem}_ridge_regression")
+    for img_path in img_paths:
+        doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return img_paths
+
+
 class RidgeRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -94,6 +175,18 @@ class RidgeRegressionAnalysisApp:
             self.file_entry.insert(0, LANGUAGES[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
+    def read_params(self):
+        """
+        读取 alpha、折数和并行选项
+        :return: 传给 analyze 的参数
+        """
+        alpha = self.alpha_entry.get().strip()
+        alpha = float(alpha) if alpha else None
+        folds = int(self.folds_entry.get())
+        if (alpha is not None and not alpha > 0) or folds < 2:
+            raise ValueError
+        return {'alpha': alpha, 'folds': folds, 'parallel': self.parallel_var.get()}
+
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
@@ -103,141 +196,30 @@ class RidgeRegressionAnalysisApp:
             self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1].values
-            y = df.iloc[:, -1].values
-
-            # 进行岭回归分析
-            ridge = Ridge(alpha=1.0)
-            ridge.fit(X, y)
-            y_pred = ridge.predict(X)
-
-            # 计算指标
-            coefficients = ridge.coef_
-            intercept = ridge.intercept_
-            mse = mean_squared_error(y, y_pred)
-            r2 = r2_score(y, y_pred)
-            n = len(y)
-            p = X.shape[1]
-            adjusted_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
-
-            # 计算 t 值和 p 值
-            X_with_const = sm.add_constant(X)
-            model = sm.OLS(y, X_with_const).fit()
-            t_values = model.tvalues
-            p_values = model.pvalues
-
-            # 计算标准化系数
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
-            ridge_scaled = Ridge(alpha=1.0)
-            ridge_scaled.fit(X_scaled, y)
-            standardized_coefficients = ridge_scaled.coef_
-
-            # 计算 F 值
-            f_value = model.fvalue
-
-            # 准备数据
-            columns_stats = ["Coefficients", "Standardized Coefficients", "t-value", "p-value", "R-squared (R²)",
-                             "Adjusted R-squared", "F-value"]
-            explanations = LANGUAGES[self.current_language]['explanation']
-            data = [["Ridge Regression"] + list(coefficients) + [intercept, mse, r2, adjusted_r2, f_value] + list(
-                standardized_coefficients) + list(t_values) + list(p_values)]
-            headers = ["Model"] + [f"Coefficient_{i + 1}" for i in range(len(coefficients))] + ["Intercept",
-                                                                                                "MSE"] + columns_stats[
-                                                                                                         4:] + [
-                          f"Standardized Coefficient_{i + 1}" for i in range(len(standardized_coefficients))] + [
-                          f"t-value_{i + 1}" for i in range(len(t_values))] + [f"p-value_{i + 1}" for i in
-                                                                               range(len(p_values))]
-
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df_result, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = col_name
-
-                for row_idx, row in transposed_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成散点图
-                plt.figure(figsize=(10, 6))
-                plt.scatter(y, y_pred)
-                plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
-                plt.xlabel('Actual Values')
-                plt.ylabel('Predicted Values')
-                plt.title('Actual vs Predicted Values')
-                img_name = "ridge_regression_scatter.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 生成岭迹图
-                alphas = np.logspace(-2, 2, 50)
-                coefs = []
-                for a in alphas:
-                    ridge = Ridge(alpha=a)
-                    ridge.fit(X, y)
-                    coefs.append(ridge.coef_)
-
-                plt.figure(figsize=(10, 6))
-                ax = plt.gca()
-                ax.plot(alphas, coefs)
-                ax.set_xscale('log')
-                plt.xlabel('Alpha')
-                plt.ylabel('Coefficients')
-                plt.title('Ridge coefficients as a function of the regularization')
-                plt.axis('tight')
-                img_name_ridge_trace = "ridge_regression_trace.png"
-                img_path_ridge_trace = os.path.join(save_dir, img_name_ridge_trace)
-                plt.savefig(img_path_ridge_trace)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_heading('Actual vs Predicted Values', level=2)
-                doc.add_picture(img_path, width=Inches(6))
-                doc.add_heading('Ridge coefficients as a function of the regularization', level=2)
-                doc.add_picture(img_path_ridge_trace, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
-                result_msg += LANGUAGES[self.current_language]['images_saved'].format(save_dir)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=LANGUAGES[self.current_language]['invalid_params'])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path, paths),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, paths):
+        result_msg = LANGUAGES[self.current_language]['analysis_success'].format(save_path)
+        result_msg += LANGUAGES[self.current_language]['images_saved'].format(os.path.dirname(paths[0]))
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -251,6 +233,10 @@ class RidgeRegressionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.alpha_label.config(text=LANGUAGES[self.current_language]["alpha_label"])
+        self.folds_label.config(text=LANGUAGES[self.current_language]["folds_label"])
+        self.parallel_check.config(text=LANGUAGES[self.current_language]["parallel_check"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -259,7 +245,7 @@ class RidgeRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 250
+        window_height = 420
 
         # 计算窗口的 x 和 y 坐标，使其居中
         x = (screen_width - window_width) // 2
@@ -285,11 +271,34 @@ class RidgeRegressionAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建 alpha 和折数输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.alpha_label = ttk.Label(params_frame, text=LANGUAGES[self.current_language]["alpha_label"])
+        self.alpha_label.grid(row=0, column=0, sticky='e', pady=2)
+        self.alpha_entry = ttk.Entry(params_frame, width=8)
+        self.alpha_entry.grid(row=0, column=1, sticky='w', padx=4, pady=2)
+        self.folds_label = ttk.Label(params_frame, text=LANGUAGES[self.current_language]["folds_label"])
+        self.folds_label.grid(row=1, column=0, sticky='e', pady=2)
+        self.folds_entry = ttk.Entry(params_frame, width=8)
+        self.folds_entry.insert(0, str(CV_FOLDS))
+        self.folds_entry.grid(row=1, column=1, sticky='w', padx=4, pady=2)
+
+        # 创建并行计算复选框
+        self.parallel_var = tk.BooleanVar(value=True)
+        self.parallel_check = ttk.Checkbutton(frame, text=LANGUAGES[self.current_language]["parallel_check"],
+                                              variable=self.parallel_var)
+        self.parallel_check.pack(pady=5)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=LANGUAGES[self.current_language]["analyze_button"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
@@ -312,4 +321,4 @@ def run_app():
 
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    run_app()
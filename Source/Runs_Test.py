@@ -1,15 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
-import numpy as np
-from statsmodels.sandbox.stats.runs import runstest_1samp
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import runs_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置支持中文的字体
 plt.rcParams['font.family'] = 'SimHei'
 # 用于解决负号显示问题
@@ -64,6 +70,64 @@ LANGUAGES = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，每列分别检验，以中位数为分界
+    :return: RunsResult
+    """
+    return runs_test(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = LANGUAGES[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    doc = new_document()
+
+    # 添加结果表格
+    add_dataframe_table(doc, result.tests, header=["列名", "游程数", "期望游程数", "Z统计量", "p值"])
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if zh else "Explanation", level=2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加分析结果解读
+    doc.add_heading("结果解读" if zh else "Interpretation", level=2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 绘制折线图并插入到 Word 文档中
+    image_paths = []
+    for i, (column, values) in enumerate(result.samples.items()):
+        title = f'{column} 数据折线图' if zh else f'{column} Data Line Plot'
+        fig = new_figure(figsize=(10, 6))
+        ax = fig.subplots()
+        ax.plot(values)
+        ax.set_title(title)
+        ax.set_xlabel('序号' if zh else 'Index')
+        ax.set_ylabel('数值' if zh else 'Value')
+        plot_path = os.path.join(plot_dir, f"{stem}_lineplot_{i + 1}.png")
+        fig.savefig(plot_path)
+        doc.add_heading(title, level=2)
+        doc.add_picture(plot_path, width=Inches(6))
+        image_paths.append(plot_path)
+
+    doc.save(save_path)
+    return image_paths
+
+
 class RunsTestApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -99,90 +163,29 @@ class RunsTestApp:
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == LANGUAGES[self.current_language]["file_entry_placeholder"]:
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
         if not os.path.exists(file_path):
-            self.result_label.config(text=LANGUAGES[self.current_language]['file_not_found'])
+            self.result_label.config(text=LANGUAGES[self.current_language]["file_not_found"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行游程检验。")
-
-            # 对每列数据进行游程检验
-            results = []
-            for column in numerical_df.columns:
-                data = numerical_df[column].dropna()
-                z_stat, p_value = runstest_1samp(data)
-                runs = runstest_1samp(data, cutoff='median')[1]
-                results.append([column, runs, z_stat, p_value])
-
-            # 整理数据
-            headers = ["列名", "游程数", "Z统计量", "p值"]
-            result_df = pd.DataFrame(results, columns=headers)
-
-            # 添加解释说明
-            explanations = LANGUAGES[self.current_language]['explanation']
-            interpretations = LANGUAGES[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-                for _, row in result_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 添加解释说明
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                for key, value in explanations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 添加分析结果解读
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                for key, value in interpretations.items():
-                    doc.add_paragraph(f"{key}: {value}")
-
-                # 绘制折线图并插入到 Word 文档中
-                for column in numerical_df.columns:
-                    data = numerical_df[column].dropna()
-                    plt.figure(figsize=(10, 6))
-                    plt.plot(data)
-                    plt.title(f'{column} 数据折线图' if self.current_language == 'zh' else f'{column} Data Line Plot')
-                    plt.xlabel('序号' if self.current_language == 'zh' else 'Index')
-                    plt.ylabel('数值' if self.current_language == 'zh' else 'Value')
-                    plot_path = save_path.replace('.docx', f'_{column}_lineplot.png')
-                    plt.savefig(plot_path)
-                    plt.close()
-                    doc.add_heading(
-                        f'{column} 数据折线图' if self.current_language == 'zh' else f'{column} Data Line Plot',
-                        level=2)
-                    doc.add_picture(plot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = LANGUAGES[self.current_language]['analysis_success'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=LANGUAGES[self.current_language]['no_save_path'])
-
-        except Exception as e:
-            self.result_label.config(text=LANGUAGES[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=LANGUAGES[self.current_language]["no_save_path"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_success"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=LANGUAGES[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -198,6 +201,7 @@ class RunsTestApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=LANGUAGES[self.current_language]["analyze_button"])
         self.switch_language_label.config(text=LANGUAGES[self.current_language]["switch_language"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -206,7 +210,7 @@ class RunsTestApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -237,6 +241,10 @@ class RunsTestApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=LANGUAGES[self.current_language]["switch_language"],
                                                foreground="gray", cursor="hand2")
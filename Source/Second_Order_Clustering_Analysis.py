@@ -1,19 +1,29 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
-from sklearn.cluster import AgglomerativeClustering
-from scipy.cluster.hierarchy import dendrogram
+from scipy.cluster import hierarchy
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.clustering import hierarchical_clustering
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
 
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
 
+# 树状图只画最上面几层，最多显示的叶子数
+DENDROGRAM_LEAVES = 30
+
 # 定义语言字典
 languages = {
     "zh": {
@@ -58,6 +68,80 @@ languages = {
     }
 }
 
+
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，每行为一个样本
+    :return: HierarchicalResult
+    """
+    return hierarchical_clustering(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    df = pd.DataFrame([["聚类结果", result.assignments["Cluster"].tolist(), ""]], columns=["统计量", "统计量值", "p值"])
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('Analysis Results', level=1)
+    add_dataframe_table(doc, df)
+    add_dataframe_table(doc, result.summary.round(4))
+    doc.add_heading('Explanation', level=1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('Interpretation', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成聚类树状图，叶子为单个样本时标出 Excel 行号，为合并的节点时标出样本数
+    rows = result.assignments["Row"].to_numpy()
+
+    def leaf_label(node):
+        if result.mode == "Exact" and node < len(rows):
+            return str(rows[node])
+        return f"({int(result.node_sizes[node])})"
+
+    img_path = os.path.join(plot_dir, f"{stem}_second_order_clustering_dendrogram.png")
+    fig = new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    hierarchy.dendrogram(result.linkage, truncate_mode='lastp', p=DENDROGRAM_LEAVES, ax=ax,
+                         leaf_label_func=leaf_label)
+    ax.set_title('聚类树状图' if language == 'zh' else 'Second-Order Clustering Dendrogram')
+    ax.set_xlabel('样本编号' if language == 'zh' else 'Sample Index')
+    ax.set_ylabel('距离' if language == 'zh' else 'Distance')
+    fig.savefig(img_path)
+    doc.add_heading('Second-Order Clustering Dendrogram', level=1)
+    doc.add_picture(img_path)
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class SecondOrderClusteringAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -90,36 +174,6 @@ class SecondOrderClusteringAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def second_order_clustering(self, data, n_clusters=3):
-        """
-        进行二阶聚类分析
-        :param data: 输入数据
-        :param n_clusters: 聚类的数量
-        :return: 聚类标签
-        """
-        model = AgglomerativeClustering(n_clusters=n_clusters, linkage='ward')
-        labels = model.fit_predict(data)
-        return labels, model
-
-    def plot_dendrogram(self, model, **kwargs):
-        # 生成树状图所需的链接矩阵
-        counts = np.zeros(model.children_.shape[0])
-        n_samples = len(model.labels_)
-        for i, merge in enumerate(model.children_):
-            current_count = 0
-            for child_idx in merge:
-                if child_idx < n_samples:
-                    current_count += 1
-                else:
-                    current_count += counts[child_idx - n_samples]
-            counts[i] = current_count
-
-        linkage_matrix = np.column_stack([model.children_, model.distances_,
-                                          counts]).astype(float)
-
-        # 绘制树状图
-        dendrogram(linkage_matrix, **kwargs)
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -128,98 +182,24 @@ class SecondOrderClusteringAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 进行二阶聚类分析
-            labels, model = self.second_order_clustering(data)
-
-            # 整理数据
-            data = [
-                ["聚类结果", labels.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["聚类结果", "聚类树状图"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["聚类结果", "聚类树状图"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                doc.add_heading('Analysis Results', level=1)
-                table = doc.add_table(rows=df.shape[0] + 1, cols=df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('Explanation', level=1)
-                table = doc.add_table(rows=explanation_df.shape[0] + 1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in explanation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('Interpretation', level=1)
-                table = doc.add_table(rows=interpretation_df.shape[0] + 1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in interpretation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成聚类树状图
-                plt.figure(figsize=(10, 5))
-                self.plot_dendrogram(model, labels=range(data.shape[0]))
-                plt.title('聚类树状图' if self.current_language == 'zh' else 'Second-Order Clustering Dendrogram')
-                plt.xlabel('样本编号' if self.current_language == 'zh' else 'Sample Index')
-                plt.ylabel('距离' if self.current_language == 'zh' else 'Distance')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_second_order_clustering_dendrogram.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入树状图
-                doc.add_heading('Second-Order Clustering Dendrogram', level=1)
-                doc.add_picture(img_path)
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -235,6 +215,7 @@ class SecondOrderClusteringAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -243,7 +224,7 @@ class SecondOrderClusteringAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -274,6 +255,10 @@ class SecondOrderClusteringAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,17 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
+import sys
 import pandas as pd
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
 import pathlib
 import pandas.plotting as pd_plotting
-from scipy import stats
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias 计算层
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.correlation import correlation_analysis
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 定义语言字典
 languages = {
     "zh": {
@@ -54,6 +59,107 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :return: CorrelationResult
+    """
+    return correlation_analysis(df, method='spearman')
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认为桌面
+    :return: 相关性热力图、散点图矩阵和相关性柱状图的路径
+    """
+    spearman_corr = result.corr
+    numerical_df = result.data
+
+    # 整理数据
+    correlation_types = ["Spearman相关系数"]
+    explanations = languages[language]['explanation']
+    interpretations = languages[language]['interpretation']
+
+    data = [[f"{correlation_types[0]} ({col1} vs {col2})", r, p] for col1, col2, r, p in result.pairs()]
+
+    headers = ["统计量", "相关系数", "p值"]
+    df = pd.DataFrame(data, columns=headers)
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([explanations])
+    explanation_df = explanation_df.reindex(columns=correlation_types)
+    explanation_df.insert(0, "统计量", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([interpretations])
+    interpretation_df = interpretation_df.reindex(columns=["相关系数", "p值"])
+    interpretation_df.insert(0, "统计量", "结果解读" if language == 'zh' else "Interpretation")
+
+    # 合并数据、解释说明和结果解读
+    combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
+
+    # 创建一个新的 Word 文档
+    doc = new_document()
+
+    # 添加表格
+    add_dataframe_table(doc, combined_df, header=headers)
+
+    # 生成相关性热力图
+    plot_dir = pathlib.Path(plot_dir) if plot_dir else pathlib.Path.home() / 'Desktop'
+    plot_path = plot_dir / 'correlation_heatmap.png'
+    fig = new_figure(figsize=(10, 8))
+    ax = fig.subplots()
+    image = ax.imshow(spearman_corr, cmap='coolwarm', interpolation='nearest')
+    fig.colorbar(image)
+    ax.set_xticks(range(len(spearman_corr.columns)), spearman_corr.columns, rotation=45)
+    ax.set_yticks(range(len(spearman_corr.columns)), spearman_corr.columns)
+    for i in range(len(spearman_corr.columns)):
+        for j in range(len(spearman_corr.columns)):
+            ax.text(j, i, f'{spearman_corr.iloc[i, j]:.2f}', ha='center', va='center', color='black')
+    ax.set_title('Spearman Correlation Heatmap')
+    fig.savefig(plot_path)
+
+    # 生成散点图矩阵
+    scatter_matrix_path = plot_dir / 'scatter_matrix.png'
+    fig = new_figure(figsize=(10, 10))
+    n_vars = numerical_df.shape[1]
+    pd_plotting.scatter_matrix(numerical_df, alpha=0.8, diagonal='hist', ax=fig.subplots(n_vars, n_vars, squeeze=False))
+    fig.suptitle('Scatter Matrix')
+    fig.savefig(scatter_matrix_path)
+
+    # 生成相关性柱状图
+    selected_variable = numerical_df.columns[0]
+    correlation_column = spearman_corr[selected_variable]
+    bar_plot_path = plot_dir / 'correlation_bar_plot.png'
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    correlation_column.plot(kind='bar', ax=ax)
+    ax.set_title(f'Correlation with {selected_variable}')
+    ax.set_xlabel('Variables')
+    ax.set_ylabel('Correlation Coefficient')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(bar_plot_path)
+
+    # 在 Word 文档中添加图片
+    doc.add_heading('Spearman Correlation Heatmap', level=2)
+    doc.add_picture(str(plot_path), width=Inches(6))
+    doc.add_heading('Scatter Matrix', level=2)
+    doc.add_picture(str(scatter_matrix_path), width=Inches(6))
+    doc.add_heading(f'Correlation with {selected_variable}', level=2)
+    doc.add_picture(str(bar_plot_path), width=Inches(6))
+
+    # 保存 Word 文档
+    doc.save(save_path)
+    return plot_path, scatter_matrix_path, bar_plot_path
+
+
 class SpearmanCorrelationAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -94,133 +200,27 @@ class SpearmanCorrelationAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行相关性分析。")
-
-            # 计算Spearman相关性
-            spearman_corr = numerical_df.corr(method='spearman')
-
-            # 计算p值
-            def calculate_pvalues(df):
-                df = df.dropna()._get_numeric_data()
-                dfcols = pd.DataFrame(columns=df.columns)
-                pvalues = dfcols.transpose().join(dfcols, how='outer')
-                for r in df.columns:
-                    for c in df.columns:
-                        _, p = stats.spearmanr(df[r], df[c])
-                        pvalues.loc[r, c] = p
-                return pvalues
-
-            spearman_pvalues = calculate_pvalues(numerical_df)
-
-            # 整理数据
-            data = []
-            correlation_types = ["Spearman相关系数"]
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-
-            for i, (corr, pvalues) in enumerate(zip([spearman_corr], [spearman_pvalues])):
-                for col1 in corr.columns:
-                    for col2 in corr.columns:
-                        if col1 != col2:
-                            data.append([f"{correlation_types[i]} ({col1} vs {col2})", corr.loc[col1, col2], pvalues.loc[col1, col2]])
-
-            headers = ["统计量", "相关系数", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=correlation_types)
-            explanation_df.insert(0, "统计量", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["相关系数", "p值"])
-            interpretation_df.insert(0, "统计量", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for i, header in enumerate(headers):
-                    hdr_cells[i].text = header
-
-                for index, row in combined_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for i, value in enumerate(row):
-                        row_cells[i].text = str(value)
-
-                # 生成相关性热力图
-                desktop_path = pathlib.Path.home() / 'Desktop'
-                plot_path = desktop_path / 'correlation_heatmap.png'
-                plt.figure(figsize=(10, 8))
-                plt.imshow(spearman_corr, cmap='coolwarm', interpolation='nearest')
-                plt.colorbar()
-                plt.xticks(range(len(spearman_corr.columns)), spearman_corr.columns, rotation=45)
-                plt.yticks(range(len(spearman_corr.columns)), spearman_corr.columns)
-                for i in range(len(spearman_corr.columns)):
-                    for j in range(len(spearman_corr.columns)):
-                        plt.text(j, i, f'{spearman_corr.iloc[i, j]:.2f}', ha='center', va='center', color='black')
-                plt.title('Spearman Correlation Heatmap')
-                plt.savefig(plot_path)
-                plt.close()
-
-                # 生成散点图矩阵
-                scatter_matrix_path = desktop_path / 'scatter_matrix.png'
-                pd_plotting.scatter_matrix(numerical_df, alpha=0.8, figsize=(10, 10), diagonal='hist')
-                plt.suptitle('Scatter Matrix')
-                plt.savefig(scatter_matrix_path)
-                plt.close()
-
-                # 生成相关性柱状图
-                selected_variable = numerical_df.columns[0]
-                correlation_column = spearman_corr[selected_variable]
-                bar_plot_path = desktop_path / 'correlation_bar_plot.png'
-                plt.figure(figsize=(10, 6))
-                correlation_column.plot(kind='bar')
-                plt.title(f'Correlation with {selected_variable}')
-                plt.xlabel('Variables')
-                plt.ylabel('Correlation Coefficient')
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                plt.savefig(bar_plot_path)
-                plt.close()
-
-                # 在 Word 文档中添加图片
-                doc.add_heading('Spearman Correlation Heatmap', level=2)
-                doc.add_picture(str(plot_path), width=Inches(6))
-                doc.add_heading('Scatter Matrix', level=2)
-                doc.add_picture(str(scatter_matrix_path), width=Inches(6))
-                doc.add_heading(f'Correlation with {selected_variable}', level=2)
-                doc.add_picture(str(bar_plot_path), width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(
-                    save_path) + f"相关性热力图已保存到 {plot_path}"
-                result_msg += f"\n散点图矩阵已保存到 {scatter_matrix_path}"
-                result_msg += f"\n相关性柱状图已保存到 {bar_plot_path}"
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        plot_path, scatter_matrix_path, bar_plot_path = report
+        result_msg = languages[self.current_language]['analysis_complete'].format(
+            save_path) + f"相关性热力图已保存到 {plot_path}"
+        result_msg += f"\n散点图矩阵已保存到 {scatter_matrix_path}"
+        result_msg += f"\n相关性柱状图已保存到 {bar_plot_path}"
+        self.result_label.config(text=result_msg, wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -236,6 +236,7 @@ class SpearmanCorrelationAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -244,7 +245,7 @@ class SpearmanCorrelationAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -275,6 +276,10 @@ class SpearmanCorrelationAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,15 +1,20 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
-import pandas as pd
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-import pathlib
-from docx import Document
 from docx.shared import Inches
-from scipy.stats import pearsonr
+
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.reliability import split_half_reliability
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_table, new_document
 
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
@@ -64,6 +69,68 @@ languages = {
 }
 
 
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :return: SplitHalfResult
+    """
+    return split_half_reliability(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据
+    data = [
+        ["折半信度系数", result.coefficient, ""],
+        ["样本量", result.sample_sizes.to_dict(), ""],
+        ["均值", result.means.to_dict(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    doc = new_document()
+    doc.add_heading('分析结果' if language == 'zh' else 'Analysis Results', level=1)
+    add_table(doc, data, headers=headers)
+
+    # 添加解释说明
+    doc.add_heading('统计量解释说明' if language == 'zh' else 'Explanation of Statistics', level=2)
+    for stat, explanation in texts['explanation'].items():
+        doc.add_paragraph(f'{stat}: {explanation}')
+
+    # 添加结果解读
+    doc.add_heading('统计量结果解读' if language == 'zh' else 'Interpretation of Statistics', level=2)
+    for stat, interpretation in texts['interpretation'].items():
+        doc.add_paragraph(f'{stat}: {interpretation}')
+
+    # 生成图片（均值柱状图）
+    plot_title = '变量均值柱状图' if language == 'zh' else 'Bar Chart of Variable Means'
+    img_path = os.path.join(plot_dir, f"{stem}.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    result.means.plot(kind='bar', ax=ax)
+    ax.set_title(plot_title)
+    ax.set_xlabel('变量' if language == 'zh' else 'Variables')
+    ax.set_ylabel('均值' if language == 'zh' else 'Mean')
+    fig.tight_layout()
+    fig.savefig(img_path)
+    doc.add_heading(plot_title, level=2)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class SplitHalfReliabilityAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -96,22 +163,6 @@ class SplitHalfReliabilityAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def split_half_reliability(self, data):
-        # 将数据分成两半
-        half1 = data.iloc[:, :data.shape[1] // 2]
-        half2 = data.iloc[:, data.shape[1] // 2:]
-
-        # 计算两半的总分
-        sum_half1 = half1.sum(axis=1)
-        sum_half2 = half2.sum(axis=1)
-
-        # 计算皮尔逊相关系数
-        r, _ = pearsonr(sum_half1, sum_half2)
-
-        # 使用斯皮尔曼-布朗公式校正
-        split_half = (2 * r) / (1 + r)
-        return split_half
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -120,92 +171,24 @@ class SplitHalfReliabilityAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行折半信度分析。")
-
-            # 进行折半信度分析
-            split_half = self.split_half_reliability(numerical_df)
-
-            # 计算样本量和均值
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-
-            # 整理数据
-            data = [
-                ["折半信度系数", split_half, ""],
-                ["样本量", sample_sizes.to_dict(), ""],
-                ["均值", means.to_dict(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格标题
-                doc.add_heading('分析结果', level=1)
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=len(headers))
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-
-                for _, row in df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明标题
-                doc.add_heading('统计量解释说明', level=2)
-                for stat, explanation in explanations.items():
-                    doc.add_paragraph(f'{stat}: {explanation}')
-
-                # 添加结果解读标题
-                doc.add_heading('统计量结果解读', level=2)
-                for stat, interpretation in interpretations.items():
-                    doc.add_paragraph(f'{stat}: {interpretation}')
-
-                # 生成图片（均值柱状图）
-                fig, ax = plt.subplots()
-                means.plot(kind='bar', ax=ax)
-                ax.set_title('变量均值柱状图' if self.current_language == 'zh' else 'Bar Chart of Variable Means')
-                ax.set_xlabel('变量' if self.current_language == 'zh' else 'Variables')
-                ax.set_ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_heading('变量均值柱状图', level=2)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(
-                    save_path)
-                self.result_label.config(text=result_msg, wraplength=400)
-
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -221,6 +204,7 @@ class SplitHalfReliabilityAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -229,7 +213,7 @@ class SplitHalfReliabilityAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -260,6 +244,10 @@ class SplitHalfReliabilityAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=languages[self.current_language]["switch_language_button_text"],
@@ -1,21 +1,29 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import numpy as np
-import pandas as pd
+import sys
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, r2_score
-import statsmodels.api as sm
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.regression import stepwise_regression
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import render_actual_vs_predicted
+from dias.report import add_dataframe_table, new_document
+
 # 定义语言字典
 languages = {
     "zh": {
         "title": "逐步回归分析",
+        "report_title": "逐步回归分析结果",
+        "target_note": "因变量：{}",
+        "statistics_heading": "模型统计量",
+        "coefficients_heading": "回归系数（入选变量）",
+        "steps_heading": "逐步选择过程",
         "select_button_text": "选择文件",
         "file_entry_placeholder": "请输入待分析 Excel 文件的完整路径",
         "analyze_button_text": "分析文件",
@@ -39,6 +47,11 @@ languages = {
     },
     "en": {
         "title": "Stepwise Regression Analysis",
+        "report_title": "Stepwise Regression Results",
+        "target_note": "Dependent variable: {}",
+        "statistics_heading": "Model Statistics",
+        "coefficients_heading": "Coefficients (Selected Variables)",
+        "steps_heading": "Selection Steps",
         "select_button_text": "Select File",
         "file_entry_placeholder": "Please enter the full path of the Excel file to be analyzed",
         "analyze_button_text": "Analyze File",
@@ -63,6 +76,53 @@ languages = {
 }
 
 
+def analyze(df, threshold_in=0.05, threshold_out=0.10):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 最后一列为因变量，其余列为自变量
+    :param threshold_in: 加入变量的 p 值阈值
+    :param threshold_out: 移除变量的 p 值阈值
+    :return: RegressionResult
+    """
+    return stepwise_regression(df, threshold_in=threshold_in, threshold_out=threshold_out)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['target_note'].format(result.target))
+    doc.add_heading(texts['statistics_heading'], 1)
+    add_dataframe_table(doc, result.statistics)
+    doc.add_heading(texts['coefficients_heading'], 1)
+    add_dataframe_table(doc, result.coefficients)
+    doc.add_heading(texts['steps_heading'], 1)
+    add_dataframe_table(doc, result.steps)
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", 2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = os.path.join(plot_dir, f"{stem}_stepwise_regression_scatter.png")
+    render_actual_vs_predicted(result.actual, result.fitted, img_path)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class StepwiseRegressionAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -95,42 +155,6 @@ class StepwiseRegressionAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def stepwise_selection(self, X, y, initial_list=[], threshold_in=0.05, threshold_out=0.10, verbose=True):
-        """
-        逐步回归选择自变量的函数
-        """
-        included = list(initial_list)
-        while True:
-            changed = False
-            # 尝试添加变量
-            excluded = list(set(X.columns) - set(included))
-            new_pval = pd.Series(index=excluded)
-            for new_column in excluded:
-                model = sm.OLS(y, sm.add_constant(pd.DataFrame(X[included + [new_column]]))).fit()
-                new_pval[new_column] = model.pvalues[new_column]
-            best_pval = new_pval.min()
-            if best_pval < threshold_in:
-                best_feature = new_pval.idxmin()
-                included.append(best_feature)
-                changed = True
-                if verbose:
-                    print('Add  {:30} with p-value {:.6}'.format(best_feature, best_pval))
-
-            # 尝试移除变量
-            model = sm.OLS(y, sm.add_constant(pd.DataFrame(X[included]))).fit()
-            # 排除常数项
-            pvalues = model.pvalues.iloc[1:]
-            worst_pval = pvalues.max()
-            if worst_pval > threshold_out:
-                changed = True
-                worst_feature = pvalues.idxmax()
-                included.remove(worst_feature)
-                if verbose:
-                    print('Drop {:30} with p-value {:.6}'.format(worst_feature, worst_pval))
-            if not changed:
-                break
-        return included
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -139,117 +163,26 @@ class StepwiseRegressionAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 假设最后一列是因变量，其余列是自变量
-            X = df.iloc[:, :-1]
-            y = df.iloc[:, -1].values
-
-            # 逐步回归分析
-            selected_features = self.stepwise_selection(X, y)
-            X_selected = X[selected_features]
-
-            model = LinearRegression()
-            model.fit(X_selected, y)
-            y_pred = model.predict(X_selected)
-
-            # 计算指标
-            coefficients = model.coef_
-            intercept = model.intercept_
-            mse = mean_squared_error(y, y_pred)
-            r2 = r2_score(y, y_pred)
-            n = len(y)
-            p = X_selected.shape[1]
-            adjusted_r2 = 1 - (1 - r2) * (n - 1) / (n - p - 1)
-
-            # 计算 t 值和 p 值
-            X_with_const = sm.add_constant(X_selected)
-            sm_model = sm.OLS(y, X_with_const).fit()
-            t_values = sm_model.tvalues
-            p_values = sm_model.pvalues
-
-            # 计算 F 值
-            f_value = sm_model.fvalue
-
-            results = [["Stepwise Model"] + list(coefficients) + [intercept, mse, r2, adjusted_r2, f_value] + list(
-                t_values) + list(p_values)]
-
-            # 准备数据
-            columns_stats = ["Coefficients", "t-value", "p-value", "R-squared (R²)", "Adjusted R-squared", "F-value"]
-            explanations = languages[self.current_language]['explanation']
-            headers = ["Model"] + [f"Coefficient_{i + 1}" for i in range(len(selected_features))] + ["Intercept", "MSE",
-                                                                                                    "R-squared (R²)",
-                                                                                                    "Adjusted R-squared",
-                                                                                                    "F-value"] + [
-                          f"t-value_{i + 1}" for i in range(len(selected_features))] + [
-                          f"p-value_{i + 1}" for i in range(len(selected_features))]
-
-            df_results = pd.DataFrame(results, columns=headers)
-
-            # 添加解释说明
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=columns_stats)
-            explanation_df.insert(0, "Model", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 合并数据和解释说明
-            combined_df = pd.concat([df_results, explanation_df], ignore_index=True)
-
-            # 转置数据框
-            transposed_df = combined_df.set_index('Model').T.reset_index().rename(columns={'index': 'Model'})
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建一个新的 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=transposed_df.shape[0] + 1, cols=transposed_df.shape[1])
-
-                # 添加表头
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(transposed_df.columns):
-                    hdr_cells[col_idx].text = header
-
-                # 添加表格数据
-                for row_idx, row in transposed_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 获取保存路径的目录
-                save_dir = os.path.dirname(save_path)
-
-                # 生成散点图
-                plt.figure(figsize=(10, 6))
-                plt.scatter(y, y_pred)
-                plt.plot([y.min(), y.max()], [y.min(), y.max()], 'r--', lw=2)
-                plt.xlabel('Actual Values')
-                plt.ylabel('Predicted Values')
-                plt.title('Actual vs Predicted Values')
-                img_name = "stepwise_regression_scatter.png"
-                img_path = os.path.join(save_dir, img_name)
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                result_msg = languages[self.current_language]['analysis_complete'].format(save_path)
-                result_msg += languages[self.current_language]['images_saved'].format(save_dir)
-                self.result_label.config(text=result_msg, wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]['no_save_path_selected'])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]['analysis_error'].format(str(e)))
-
-    def switch_language(self, event):
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -263,6 +196,7 @@ class StepwiseRegressionAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -271,7 +205,7 @@ class StepwiseRegressionAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -302,6 +236,10 @@ class StepwiseRegressionAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,14 +1,22 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.evaluation import topsis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'
 plt.rcParams['axes.unicode_minus'] = False
@@ -82,6 +90,84 @@ languages = {
 }
 
 
+def load_data(file_path):
+    """
+    读取工作簿，不把第一行当作表头
+    """
+    return load_excel(file_path, header=None)
+
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: load_data 读取的数据，第一行为属性权重向量，其余行为决策矩阵
+    :return: TopsisResult
+    """
+    return topsis(df)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    relative_closeness = result.closeness
+
+    # 整理数据
+    data = [
+        ["标准化决策矩阵", result.standardized.tolist(), ""],
+        ["加权标准化决策矩阵", result.weighted.tolist(), ""],
+        ["正理想解", result.positive_ideal.tolist(), ""],
+        ["负理想解", result.negative_ideal.tolist(), ""],
+        ["各方案到正理想解的距离", result.distance_positive.tolist(), ""],
+        ["各方案到负理想解的距离", result.distance_negative.tolist(), ""],
+        ["各方案的相对贴近度", relative_closeness.tolist(), ""],
+        ["方案排序结果", result.ranking.tolist(), ""]
+    ]
+    headers = ["统计量", "统计量值", "p值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    add_table(doc, data, headers=headers)
+    doc.add_paragraph()
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_paragraph()
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成各方案相对贴近度柱状图
+    title = '各方案相对贴近度柱状图' if language == 'zh' else 'Bar Chart of Relative Closeness of Each Alternative'
+    img_path = os.path.join(plot_dir, f"{stem}_relative_closeness.png")
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.bar(range(len(relative_closeness)), relative_closeness)
+    ax.set_title(title)
+    ax.set_xlabel('方案编号' if language == 'zh' else 'Alternative Number')
+    ax.set_ylabel('相对贴近度' if language == 'zh' else 'Relative Closeness')
+    fig.savefig(img_path)
+    doc.add_paragraph()
+    doc.add_heading(title, level=2)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class TOPSISMethodAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -114,36 +200,6 @@ class TOPSISMethodAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def topsis_method(self, decision_matrix, weight_vector):
-        """
-        实现 TOPSIS 法
-        :param decision_matrix: 决策矩阵
-        :param weight_vector: 属性权重向量
-        :return: 各方案的相对贴近度和方案排序结果
-        """
-        # 标准化决策矩阵
-        standardized_matrix = decision_matrix / np.sqrt(np.sum(decision_matrix ** 2, axis=0))
-
-        # 加权标准化决策矩阵
-        weighted_matrix = standardized_matrix * weight_vector
-
-        # 正理想解和负理想解
-        positive_ideal_solution = np.max(weighted_matrix, axis=0)
-        negative_ideal_solution = np.min(weighted_matrix, axis=0)
-
-        # 各方案到正理想解和负理想解的距离
-        distances_to_positive = np.sqrt(np.sum((weighted_matrix - positive_ideal_solution) ** 2, axis=1))
-        distances_to_negative = np.sqrt(np.sum((weighted_matrix - negative_ideal_solution) ** 2, axis=1))
-
-        # 各方案的相对贴近度
-        relative_closeness = distances_to_negative / (distances_to_positive + distances_to_negative)
-
-        # 方案排序结果
-        ranking = np.argsort(-relative_closeness) + 1
-
-        return standardized_matrix, weighted_matrix, positive_ideal_solution, negative_ideal_solution, \
-            distances_to_positive, distances_to_negative, relative_closeness, ranking
-
     def analyze_file(self):
         file_path = self.file_entry.get()
         if file_path == languages[self.current_language]["file_entry_placeholder"]:
@@ -152,124 +208,24 @@ class TOPSISMethodAnalysisApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path, header=None)
-            data = df.values
-
-            # 将数据转换为浮点类型
-            data = data.astype(float)
-
-            # 假设第一行为属性权重向量，其余行为决策矩阵
-            weight_vector = data[0]
-            decision_matrix = data[1:]
-
-            # 进行 TOPSIS 分析
-            standardized_matrix, weighted_matrix, positive_ideal_solution, negative_ideal_solution, \
-                distances_to_positive, distances_to_negative, relative_closeness, ranking = self.topsis_method(
-                decision_matrix,
-                weight_vector)
-
-            # 整理数据
-            data = [
-                ["标准化决策矩阵", standardized_matrix.tolist(), ""],
-                ["加权标准化决策矩阵", weighted_matrix.tolist(), ""],
-                ["正理想解", positive_ideal_solution.tolist(), ""],
-                ["负理想解", negative_ideal_solution.tolist(), ""],
-                ["各方案到正理想解的距离", distances_to_positive.tolist(), ""],
-                ["各方案到负理想解的距离", distances_to_negative.tolist(), ""],
-                ["各方案的相对贴近度", relative_closeness.tolist(), ""],
-                ["方案排序结果", ranking.tolist(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["标准化决策矩阵", "加权标准化决策矩阵", "正理想解", "负理想解", "各方案到正理想解的距离",
-                         "各方案到负理想解的距离", "各方案的相对贴近度", "方案排序结果"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["标准化决策矩阵", "加权标准化决策矩阵", "正理想解", "负理想解", "各方案到正理想解的距离",
-                         "各方案到负理想解的距离", "各方案的相对贴近度", "方案排序结果"])
-            interpretation_df.insert(0, "统计量_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加结果表格
-                table = doc.add_table(rows=df_result.shape[0] + 1, cols=df_result.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in df_result.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_paragraph()
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                table = doc.add_table(rows=explanation_df.shape[0] + 1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in explanation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加分析结果解读表格
-                doc.add_paragraph()
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                table = doc.add_table(rows=interpretation_df.shape[0] + 1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in interpretation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成各方案相对贴近度柱状图
-                fig, ax = plt.subplots()
-                ax.bar(range(len(relative_closeness)), relative_closeness)
-                ax.set_title(
-                    '各方案相对贴近度柱状图' if self.current_language == 'zh' else 'Bar Chart of Relative Closeness of Each Alternative')
-                ax.set_xlabel('方案编号' if self.current_language == 'zh' else 'Alternative Number')
-                ax.set_ylabel('相对贴近度' if self.current_language == 'zh' else 'Relative Closeness')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '_relative_closeness.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 将图片插入到 Word 文档中
-                doc.add_paragraph()
-                doc.add_heading(
-                    "各方案相对贴近度柱状图" if self.current_language == 'zh' else 'Bar Chart of Relative Closeness of Each Alternative',
-                    level=2)
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_data, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -285,6 +241,7 @@ class TOPSISMethodAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -293,7 +250,7 @@ class TOPSISMethodAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -324,6 +281,10 @@ class TOPSISMethodAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=languages[self.current_language]["switch_language_button_text"],
@@ -1,14 +1,21 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
-import pandas as pd
+import sys
 import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.turf import TURF_METHODS, TURF_SIZE, TURF_THRESHOLD, turf_analysis
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -26,17 +33,29 @@ languages = {
         'analysis_complete': "分析完成，结果已保存到 {}，相关图片已保存。",
         'no_save_path_selected': "未选择保存路径，结果未保存。",
         'switch_language_button_text': "切换语言",
+        'size_label': "组合中的项目数：",
+        'threshold_label': "到达阈值（回答不小于该值）：",
+        'method_label': "搜索方式：",
+        'parallel_check': "多进程并行搜索",
+        'invalid_params': "项目数须为整数，到达阈值须为数字。",
+        'report_title': "Turf组合模型分析结果",
+        'summary': "受访者人数: {}，组合中的项目数: {}，搜索方式: {}，评估的组合 / 节点数: {}",
+        'combinations_heading': "最优组合",
+        'curve_heading': "到达曲线（贪心逐步加入项目）",
+        'items_heading': "单个项目的到达人数",
+        'curve_title': "到达曲线",
+        'curve_xlabel': "组合中的项目数",
+        'curve_ylabel': "到达率（%）",
         'explanation': {
-            "Turf组合得分": "Turf组合模型中每个组合的得分，反映了该组合的吸引力。",
-            "最优组合": "得分最高的组合，代表了最有吸引力的产品或服务组合。",
-            "样本量": "每个样本中的观测值数量。",
-            "均值": "样本数据的平均值。"
+            "Reach": "组合中至少有一个项目到达的受访者人数（不重复计数），Reach (%) 为其占受访者人数的百分比。",
+            "Frequency": "组合中各项目到达人数之和，即被到达的总次数。",
+            "Average Frequency": "被到达的受访者平均被组合中几个项目到达。",
+            "Incremental Reach": "加入该项目后新增的到达人数。"
         },
         'interpretation': {
-            "Turf组合得分": "Turf组合得分越高，说明该组合越受用户欢迎。",
-            "最优组合": "最优组合是最能满足用户需求的组合，可作为产品或服务的推荐组合。",
-            "样本量": "样本量的大小会影响统计检验的稳定性，较大的样本量通常能提供更可靠的结果。",
-            "均值": "均值反映了数据的平均水平，可用于比较不同变量的集中趋势。"
+            "Reach": "到达率越高，说明该组合能覆盖越多的用户，可作为产品或服务的推荐组合。",
+            "Incremental Reach": "新增到达人数明显下降时，继续增加项目的收益有限。",
+            "Average Frequency": "到达率相同时，平均频次越高，说明组合中的项目越能同时满足同一批用户。"
         }
     },
     'en': {
@@ -50,21 +69,107 @@ languages = {
         'analysis_complete': "Analysis completed. The results have been saved to {}, and the relevant images have been saved.",
         'no_save_path_selected': "No save path selected. The results were not saved.",
         'switch_language_button_text': "Switch Language",
+        'size_label': "Items per combination: ",
+        'threshold_label': "Reach threshold (answer at least): ",
+        'method_label': "Search method: ",
+        'parallel_check': "Search in parallel processes",
+        'invalid_params': "The number of items must be an integer and the threshold must be a number.",
+        'report_title': "Turf Combination Model Analysis Results",
+        'summary': "Respondents: {}, items per combination: {}, search method: {}, combinations / nodes evaluated: {}",
+        'combinations_heading': "Best Combinations",
+        'curve_heading': "Reach Curve (greedy, one item at a time)",
+        'items_heading': "Reach of Single Items",
+        'curve_title': "Reach Curve",
+        'curve_xlabel': "Items in combination",
+        'curve_ylabel': "Reach (%)",
         'explanation': {
-            "Turf组合得分": "The score of each combination in the Turf combination model, reflecting the attractiveness of the combination.",
-            "最优组合": "The combination with the highest score, representing the most attractive product or service combination.",
-            "样本量": "The number of observations in each sample.",
-            "均值": "The average value of the sample data."
+            "Reach": "The number of respondents reached by at least one item in the combination, counted once. Reach (%) is its share of all respondents.",
+            "Frequency": "The sum of the reach of each item in the combination, i.e. the total number of times respondents are reached.",
+            "Average Frequency": "The average number of items in the combination that reach a reached respondent.",
+            "Incremental Reach": "The number of respondents newly reached by adding the item."
         },
         'interpretation': {
-            "Turf组合得分": "The higher the Turf combination score, the more popular the combination is among users.",
-            "最优组合": "The optimal combination is the one that best meets the needs of users and can be recommended as a product or service combination.",
-            "样本量": "The sample size affects the stability of the statistical test. A larger sample size usually provides more reliable results.",
-            "均值": "The mean reflects the average level of the data and can be used to compare the central tendencies of different variables."
+            "Reach": "The higher the reach, the more users the combination covers, and the better it serves as a recommended product or service combination.",
+            "Incremental Reach": "When the incremental reach drops sharply, adding more items brings little benefit.",
+            "Average Frequency": "Among combinations with the same reach, a higher average frequency means the items appeal to the same users more often."
         }
     }
 }
 
+
+def analyze(df, size=TURF_SIZE, method="Auto", threshold=TURF_THRESHOLD, parallel=True):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 每行为一位受访者，每个数值列为一个项目
+    :param size: 组合中的项目数
+    :param method: 搜索方式，TURF_METHODS 之一
+    :param threshold: 回答不小于该值视为被该项目到达
+    :param parallel: 是否在进程池中并行搜索
+    :return: TurfResult
+    """
+    return turf_analysis(df, size=size, method=method, threshold=threshold, parallel=parallel)
+
+
+def plot_reach_curve(reach_curve, img_path, language='en'):
+    """
+    绘制贪心到达曲线
+    """
+    texts = languages[language]
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.plot(reach_curve["Size"], reach_curve["Reach (%)"], marker='o')
+    for x, y, item in zip(reach_curve["Size"], reach_curve["Reach (%)"], reach_curve["Added Item"]):
+        ax.annotate(item, (x, y), textcoords='offset points', xytext=(0, 6), ha='center', fontsize=8)
+    ax.set_xticks(reach_curve["Size"])
+    ax.set_title(texts['curve_title'])
+    ax.set_xlabel(texts['curve_xlabel'])
+    ax.set_ylabel(texts['curve_ylabel'])
+    fig.tight_layout()
+    fig.savefig(img_path)
+    return img_path
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和到达曲线图
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    doc = new_document()
+    doc.add_heading(texts['report_title'], 0)
+    doc.add_paragraph(texts['summary'].format(result.respondents, result.size, result.method, result.evaluated))
+    doc.add_heading(texts['combinations_heading'], level=2)
+    add_dataframe_table(doc, result.combinations.round(2))
+    doc.add_heading(texts['curve_heading'], level=2)
+    add_dataframe_table(doc, result.reach_curve.round(2))
+    doc.add_heading(texts['items_heading'], level=2)
+    add_dataframe_table(doc, result.items.sort_values("Reach", ascending=False).round(2), index=True,
+                        index_label="Item")
+
+    # 添加解释说明
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    for key, value in texts['explanation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    # 添加结果解读
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    for key, value in texts['interpretation'].items():
+        doc.add_paragraph(f"{key}: {value}")
+
+    img_path = plot_reach_curve(result.reach_curve, os.path.join(plot_dir, f"{stem}.png"), language)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class TurfCombinationModelAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -97,15 +202,17 @@ class TurfCombinationModelAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def turf_analysis(self, data):
-        # 这里简单模拟Turf组合模型分析，实际应用中需要根据具体需求实现
-        # 假设数据的每一行代表一个样本，每一列代表一个产品或服务
-        # 计算每个组合的得分
-        combination_scores = data.sum(axis=0)
-        # 找到最优组合
-        optimal_combination = combination_scores.idxmax()
-
-        return combination_scores, optimal_combination
+    def read_params(self):
+        """
+        读取项目数、到达阈值、搜索方式和并行选项
+        :return: 传给 analyze 的参数
+        """
+        return {
+            "size": int(self.size_entry.get()),
+            "method": self.method_var.get(),
+            "threshold": float(self.threshold_entry.get()),
+            "parallel": self.parallel_var.get(),
+        }
 
     def analyze_file(self):
         file_path = self.file_entry.get()
@@ -116,85 +223,27 @@ class TurfCombinationModelAnalysisApp:
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
         try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行Turf组合模型分析。")
-
-            # 进行Turf组合模型分析
-            combination_scores, optimal_combination = self.turf_analysis(numerical_df)
-
-            # 计算样本量和均值
-            sample_sizes = numerical_df.count()
-            means = numerical_df.mean()
-
-            # 整理数据
-            data = [
-                ["Turf组合得分", combination_scores.to_dict(), ""],
-                ["最优组合", optimal_combination, ""],
-                ["样本量", sample_sizes.to_dict(), ""],
-                ["均值", means.to_dict(), ""]
-            ]
-            headers = ["统计量", "统计量值", "p值"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(columns=["Turf组合得分", "最优组合", "样本量", "均值"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["Turf组合得分", "最优组合", "样本量", "均值"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 合并数据、解释说明和结果解读
-            combined_df = pd.concat([df_result, explanation_df, interpretation_df], ignore_index=True)
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加表格
-                table = doc.add_table(rows=combined_df.shape[0] + 1, cols=combined_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(combined_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx in range(combined_df.shape[0]):
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(combined_df.iloc[row_idx]):
-                        row_cells[col_idx].text = str(value)
-
-                # 生成图片（Turf组合得分柱状图）
-                fig, ax = plt.subplots()
-                combination_scores.plot(kind='bar', ax=ax)
-                ax.set_title('Turf组合得分柱状图' if self.current_language == 'zh' else 'Bar Chart of Turf Combination Scores')
-                ax.set_xlabel('组合' if self.current_language == 'zh' else 'Combinations')
-                ax.set_ylabel('得分' if self.current_language == 'zh' else 'Scores')
-                # 保存图片
-                img_path = os.path.splitext(save_path)[0] + '.png'
-                plt.savefig(img_path)
-                plt.close()
-
-                # 在 Word 文档中插入图片
-                doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+            params = self.read_params()
+        except ValueError:
+            self.result_label.config(text=languages[self.current_language]["invalid_params"])
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, params=params, controls=(self.analyze_button,),
+                             on_done=lambda report: self.on_analysis_done(save_path, report),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path, report):
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -210,6 +259,11 @@ class TurfCombinationModelAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.size_label.config(text=languages[self.current_language]["size_label"])
+        self.threshold_label.config(text=languages[self.current_language]["threshold_label"])
+        self.method_label.config(text=languages[self.current_language]["method_label"])
+        self.parallel_check.config(text=languages[self.current_language]["parallel_check"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -218,7 +272,7 @@ class TurfCombinationModelAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 480
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -244,11 +298,43 @@ class TurfCombinationModelAnalysisApp:
         self.file_entry.bind('<FocusOut>', self.on_focusout)
         self.file_entry.pack(pady=5)
 
+        # 创建项目数和到达阈值输入框
+        params_frame = ttk.Frame(frame)
+        params_frame.pack(pady=5)
+        self.size_label = ttk.Label(params_frame, text=languages[self.current_language]["size_label"])
+        self.size_label.grid(row=0, column=0, sticky='e', pady=2)
+        self.size_entry = ttk.Entry(params_frame, width=6)
+        self.size_entry.insert(0, str(TURF_SIZE))
+        self.size_entry.grid(row=0, column=1, sticky='w', padx=2, pady=2)
+        self.threshold_label = ttk.Label(params_frame, text=languages[self.current_language]["threshold_label"])
+        self.threshold_label.grid(row=1, column=0, sticky='e', pady=2)
+        self.threshold_entry = ttk.Entry(params_frame, width=6)
+        self.threshold_entry.insert(0, str(TURF_THRESHOLD))
+        self.threshold_entry.grid(row=1, column=1, sticky='w', padx=2, pady=2)
+
+        # 创建搜索方式下拉框
+        self.method_label = ttk.Label(params_frame, text=languages[self.current_language]["method_label"])
+        self.method_label.grid(row=2, column=0, sticky='e', pady=2)
+        self.method_var = tk.StringVar(value=TURF_METHODS[0])
+        self.method_combobox = ttk.Combobox(params_frame, textvariable=self.method_var, values=TURF_METHODS,
+                                            state='readonly', width=16)
+        self.method_combobox.grid(row=2, column=1, sticky='w', padx=2, pady=2)
+
+        # 创建并行搜索复选框
+        self.parallel_var = tk.BooleanVar(value=True)
+        self.parallel_check = ttk.Checkbutton(frame, text=languages[self.current_language]["parallel_check"],
+                                              variable=self.parallel_var)
+        self.parallel_check.pack(pady=5)
+
         # 创建分析按钮
         self.analyze_button = ttk.Button(frame, text=languages[self.current_language]["analyze_button_text"],
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
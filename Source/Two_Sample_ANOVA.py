@@ -1,15 +1,23 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
 import numpy as np
-from scipy import stats
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.hypothesis import independent_t_test
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文显示
 plt.rcParams['font.family'] = 'SimHei'  # 指定支持中文的字体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -76,6 +84,91 @@ languages = {
     }
 }
 
+
+def analyze(df):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据，取前两列数值数据作为两个样本
+    :return: LocationTestResult
+    """
+    return independent_t_test(df, first_two=True)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+    zh = language == 'zh'
+
+    # 计算效应量（Cohen's d），使用合并标准差
+    test = result.tests.iloc[0]
+    summary = result.summary
+    sizes, stds = summary["N"], summary["Std"]
+    pooled_std = np.sqrt(((sizes - 1) * stds ** 2).sum() / test["df"])
+    cohen_d = test["Mean Difference"] / pooled_std
+
+    # 整理数据
+    data = [
+        ["方差分析", test["Statistic"], test["df"], test["p-value"], cohen_d],
+        ["样本量", sizes.tolist(), "", "", ""],
+        ["均值", summary["Mean"].tolist(), "", "", ""]
+    ]
+    headers = ["统计量", "t统计量", "自由度", "p值", "效应量（Cohen's d）"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "统计量_解释说明", "解释说明" if zh else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "统计量_结果解读", "结果解读" if zh else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading('分析结果', level=1)
+    add_table(doc, data, headers=headers)
+    doc.add_heading('解释说明', level=1)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading('结果解读', level=1)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 绘制箱线图
+    boxplot_path = os.path.join(plot_dir, f"{stem}_boxplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.boxplot(list(result.samples.values()), tick_labels=list(result.samples))
+    ax.set_title('箱线图' if zh else 'Box Plot')
+    ax.set_xlabel('组' if zh else 'Groups')
+    ax.set_ylabel('数值' if zh else 'Values')
+    fig.savefig(boxplot_path)
+
+    # 绘制柱状图
+    barplot_path = os.path.join(plot_dir, f"{stem}_barplot.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(['样本1', '样本2'] if zh else ['Sample 1', 'Sample 2'], summary["Mean"])
+    ax.bar_label(bars, fmt='%.2f')
+    ax.set_title('柱状图' if zh else 'Bar Chart')
+    ax.set_xlabel('组' if zh else 'Groups')
+    ax.set_ylabel('均值' if zh else 'Mean')
+    fig.savefig(barplot_path)
+
+    doc.add_heading('箱线图', level=1)
+    doc.add_picture(boxplot_path, width=Inches(6))
+    doc.add_heading('柱状图', level=1)
+    doc.add_picture(barplot_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [boxplot_path, barplot_path]
+
+
 class TwoSampleANOVAApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -116,138 +209,24 @@ class TwoSampleANOVAApp:
         if not os.path.exists(file_path):
             self.result_label.config(text=languages[self.current_language]["file_not_exists"])
             return
-        try:
-            # 打开 Excel 文件
-            df = pd.read_excel(file_path)
-
-            # 检查数据是否为数值类型
-            numerical_df = df.select_dtypes(include=[np.number])
-            if numerical_df.empty:
-                raise ValueError("数据中没有数值列，无法进行方差分析。")
-
-            # 确保有两列数值数据
-            if len(numerical_df.columns) < 2:
-                raise ValueError("数据中至少需要两列数值数据才能进行双样本方差分析。")
-
-            # 取前两列数据进行双样本 t 检验
-            sample1 = numerical_df.iloc[:, 0]
-            sample2 = numerical_df.iloc[:, 1]
-            t_stat, p_value = stats.ttest_ind(sample1, sample2)
-
-            # 计算自由度
-            df_value = len(sample1) + len(sample2) - 2
-
-            # 计算效应量（Cohen's d）
-            pooled_std = np.sqrt(((len(sample1) - 1) * sample1.std()**2 + (len(sample2) - 1) * sample2.std()**2) / (len(sample1) + len(sample2) - 2))
-            cohen_d = (sample1.mean() - sample2.mean()) / pooled_std
-
-            # 计算样本量和均值
-            sample_sizes = [len(sample1), len(sample2)]
-            means = [sample1.mean(), sample2.mean()]
-
-            # 整理数据
-            data = [
-                ["方差分析", t_stat, df_value, p_value, cohen_d],
-                ["样本量", sample_sizes, "", "", ""],
-                ["均值", means, "", "", ""]
-            ]
-            headers = ["统计量", "t统计量", "自由度", "p值", "效应量（Cohen's d）"]
-            df_result = pd.DataFrame(data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["双样本方差分析", "样本量", "均值", "t统计量", "自由度", "p值", "效应量"])
-            explanation_df.insert(0, "统计量_解释说明", "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(columns=["t统计量", "p值", "自由度", "样本量", "均值", "效应量"])
-            interpretation_df.insert(0, "统计量_结果解读", "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                doc.add_heading('分析结果', level=1)
-                table = doc.add_table(rows=df_result.shape[0] + 1, cols=df_result.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(headers):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in df_result.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加解释说明表格
-                doc.add_heading('解释说明', level=1)
-                table = doc.add_table(rows=explanation_df.shape[0] + 1, cols=explanation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in explanation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 添加结果解读表格
-                doc.add_heading('结果解读', level=1)
-                table = doc.add_table(rows=interpretation_df.shape[0] + 1, cols=interpretation_df.shape[1])
-                hdr_cells = table.rows[0].cells
-                for col_idx, header in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = header
-                for row_idx, row in interpretation_df.iterrows():
-                    row_cells = table.rows[row_idx + 1].cells
-                    for col_idx, value in enumerate(row):
-                        row_cells[col_idx].text = str(value)
-
-                # 绘制箱线图
-                plt.figure(figsize=(10, 6))
-                numerical_df.iloc[:, :2].boxplot()
-                plt.title('箱线图' if self.current_language == 'zh' else 'Box Plot')
-                plt.xlabel('组' if self.current_language == 'zh' else 'Groups')
-                plt.ylabel('数值' if self.current_language == 'zh' else 'Values')
-                boxplot_path = save_path.replace('.docx', '_boxplot.png')
-                plt.savefig(boxplot_path)
-                plt.close()
-
-                # 绘制柱状图
-                plt.figure(figsize=(10, 6))
-                bars = plt.bar(['样本1', '样本2'] if self.current_language == 'zh' else ['Sample 1', 'Sample 2'], means)
-                for bar in bars:
-                    height = bar.get_height()
-                    plt.annotate(f'{height:.2f}',
-                                 xy=(bar.get_x() + bar.get_width() / 2, height),
-                                 xytext=(0, 3),  # 3 points vertical offset
-                                 textcoords="offset points",
-                                 ha='center', va='bottom')
-                plt.title('柱状图' if self.current_language == 'zh' else 'Bar Chart')
-                plt.xlabel('组' if self.current_language == 'zh' else 'Groups')
-                plt.ylabel('均值' if self.current_language == 'zh' else 'Mean')
-                barplot_path = save_path.replace('.docx', '_barplot.png')
-                plt.savefig(barplot_path)
-                plt.close()
-
-                # 在 Word 文档中添加图片
-                doc.add_heading('箱线图', level=1)
-                doc.add_picture(boxplot_path, width=Inches(6))
-                doc.add_heading('柱状图', level=1)
-                doc.add_picture(barplot_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path), wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
-
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
+
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
+
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
     def switch_language(self, event):
         if self.current_language == "zh":
@@ -263,6 +242,7 @@ class TwoSampleANOVAApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -271,7 +251,7 @@ class TwoSampleANOVAApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -302,6 +282,10 @@ class TwoSampleANOVAApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame, text=languages[self.current_language]["switch_language_button_text"],
                                                foreground="gray", cursor="hand2")
@@ -1,16 +1,23 @@
 import tkinter as tk
 from tkinter import filedialog
 import os
+import sys
 import pandas as pd
-import numpy as np
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import matplotlib.pyplot as plt
 import tkinter.simpledialog
-import pingouin as pg
-from docx import Document
 from docx.shared import Inches
 
+# 添加父目录到系统路径，以便能够导入 dias
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.reliability import rwg_analysis
+from dias.dataset import load_excel
+from dias.jobs import JobPanel, analysis_job
+from dias.plots import new_figure
+from dias.report import add_dataframe_table, add_table, new_document
+
 # 设置 matplotlib 支持中文
 plt.rcParams['font.family'] = 'SimHei'  # 设置字体为黑体，可根据系统情况修改为其他支持中文的字体
 plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
@@ -63,9 +70,9 @@ languages = {
     },
     "en": {
         "title": "Within-Group Inter-Rater Reliability rwg Analysis",
-        "select_button_text": "Select Files",
+        "select_button_text": "Select File",
         "file_entry_placeholder": "Please enter the full path of the Excel file to be analyzed",
-        "analyze_button_text": "Analyze Files",
+        "analyze_button_text": "Analyze File",
         "no_file_selected": "Please select a valid file path.",
         "file_not_exists": "The file does not exist. Please select again.",
         "analysis_error": "An error occurred while analyzing the file: {}",
@@ -108,6 +115,83 @@ languages = {
 }
 
 
+def analyze(df, group_column=None, rating_columns=None):
+    """
+    无界面计算入口，界面和批处理共用
+    :param df: 输入数据
+    :param group_column: 分组列的列名，默认为第一列
+    :param rating_columns: 评分列的列名列表，默认为分组列以外的所有数值列
+    :return: RwgResult
+    """
+    return rwg_analysis(df, group_column=group_column, rating_columns=rating_columns)
+
+
+def write_report(result, save_path, language='en', plot_dir=None):
+    """
+    根据计算结果生成 Word 报告和图片
+    :param result: analyze 返回的结果
+    :param save_path: Word 文档保存路径
+    :param language: 报告语言
+    :param plot_dir: 图片保存目录，默认与 Word 文档相同
+    :return: 图片路径列表
+    """
+    texts = languages[language]
+    plot_dir = plot_dir or os.path.dirname(os.path.abspath(save_path))
+    stem = os.path.splitext(os.path.basename(save_path))[0]
+
+    # 整理数据：各组的 rwg 值和 rwg 值的统计量
+    all_data = [[f"{group}_rwg值", value] for group, value in result.rwg.items()]
+    all_data += [
+        ["Rwg值标准差SD", result.rwg_sd],
+        ["P25", result.p25],
+        ["中位数", result.median],
+        ["P75", result.p75],
+        ["ICC1", result.icc1],
+        ["ICC2", result.icc2],
+        ["MSB", result.msb],
+        ["MSW", result.msw],
+        ["F值", result.f_value],
+        ["p值", result.p_value]
+    ]
+    headers = ["指标", "数值"]
+
+    # 添加解释说明
+    explanation_df = pd.DataFrame([texts['explanation']])
+    explanation_df.insert(0, "指标_解释说明", "解释说明" if language == 'zh' else "Explanation")
+
+    # 添加分析结果解读
+    interpretation_df = pd.DataFrame([texts['interpretation']])
+    interpretation_df.insert(0, "指标_结果解读", "结果解读" if language == 'zh' else "Interpretation")
+
+    doc = new_document()
+    doc.add_heading(texts['title'], 0)
+    add_table(doc, all_data, headers=headers)
+    for group in result.skipped_groups or []:
+        doc.add_paragraph(texts["group_less_than_2"].format(group))
+    doc.add_heading("解释说明" if language == 'zh' else "Explanation", level=2)
+    add_dataframe_table(doc, explanation_df)
+    doc.add_heading("结果解读" if language == 'zh' else "Interpretation", level=2)
+    add_dataframe_table(doc, interpretation_df)
+
+    # 生成rwg值柱状图
+    img_path = os.path.join(plot_dir, f"{stem}_rwg.png")
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar([str(group) for group in result.rwg.index], result.rwg.to_numpy())
+    ax.set_title('组内评分者信度rwg值' if language == 'zh' else 'Within-Group Inter-Rater Reliability rwg Values')
+    ax.set_ylabel('rwg值' if language == 'zh' else 'rwg Value')
+    ax.set_xlabel('分组' if language == 'zh' else 'Group')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    fig.savefig(img_path)
+    doc.add_heading("组内评分者信度rwg值柱状图" if language == 'zh' else
+                    "Within-Group Inter-Rater Reliability rwg Values Bar Chart", level=2)
+    doc.add_picture(img_path, width=Inches(6))
+
+    doc.save(save_path)
+    return [img_path]
+
+
 class WithinGroupInterRaterReliabilityRwgAnalysisApp:
     def __init__(self, root=None):
         # 当前语言，默认为英文
@@ -124,10 +208,10 @@ class WithinGroupInterRaterReliabilityRwgAnalysisApp:
         self.create_ui()
 
     def select_file(self):
-        file_paths = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx;*.xls")])
-        if file_paths:
+        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+        if file_path:
             self.file_entry.delete(0, tk.END)
-            self.file_entry.insert(0, ", ".join(file_paths))
+            self.file_entry.insert(0, file_path)
             self.file_entry.config(foreground='black')
 
     def on_entry_click(self, event):
@@ -140,225 +224,65 @@ class WithinGroupInterRaterReliabilityRwgAnalysisApp:
             self.file_entry.insert(0, languages[self.current_language]["file_entry_placeholder"])
             self.file_entry.config(foreground='gray')
 
-    def rwg_analysis(self, data, group_column, rating_columns):
-        all_results = []
-        rwg_values = []
-        groups = data[group_column].unique()
-
-        for group in groups:
-            group_data = data[data[group_column] == group][rating_columns]
-            # 检查数据是否为空或者只有一个样本
-            if group_data.shape[0] < 2:
-                print(languages[self.current_language]["group_less_than_2"].format(group))
-                continue
-            k = group_data.shape[1]  # 评分者数量
-            n = group_data.shape[0]  # 项目数量
-            var_within = group_data.var(axis=1).mean()
-            expected_var = (k ** 2 - 1) / 12
-            rwg = 1 - (var_within / expected_var)
-            rwg_values.append(rwg)
-            result = {
-                f"{group}_rwg值": rwg
-            }
-            all_results.append(result)
-
-        # 计算 Rwg 值的统计量
-        if rwg_values:
-            rwg_sd = np.std(rwg_values)
-            rwg_p25 = np.percentile(rwg_values, 25)
-            rwg_median = np.median(rwg_values)
-            rwg_p75 = np.percentile(rwg_values, 75)
-
-            # 计算 ICC1 和 ICC2
-            icc_data = pd.melt(data, id_vars=[group_column], value_vars=rating_columns)
-            icc_data.columns = ['Group', 'Rater', 'Score']
-            icc = pg.intraclass_corr(data=icc_data, targets='Group', raters='Rater', ratings='Score')
-            icc1 = icc[icc['Type'] == 'ICC1']['ICC'].values[0]
-            icc2 = icc[icc['Type'] == 'ICC2']['ICC'].values[0]
-
-            # 计算 MSB, MSW, F 值, p 值
-            anova = pg.anova(data=icc_data, dv='Score', between='Group')
-            msb = anova['MS'][0]
-            msw = anova['MS'][1]
-            f_value = anova['F'][0]
-            p_value = anova['p-unc'][0]
-
-            additional_stats = {
-                "Rwg值标准差SD": rwg_sd,
-                "P25": rwg_p25,
-                "中位数": rwg_median,
-                "P75": rwg_p75,
-                "ICC1": icc1,
-                "ICC2": icc2,
-                "MSB": msb,
-                "MSW": msw,
-                "F值": f_value,
-                "p值": p_value
-            }
-            all_results.append(additional_stats)
-
-        return all_results, rwg_values
+    def read_params(self):
+        """
+        通过对话框依次输入分组列和评分列的列名
+        :return: 传给 analyze 的参数；取消输入时返回 None
+        """
+        # 获取分组列名
+        group_column = tkinter.simpledialog.askstring("输入信息", languages[self.current_language]["group_column_prompt"])
+        if not group_column:
+            self.result_label.config(text=languages[self.current_language]["no_group_column"])
+            return None
+
+        # 获取评分列名
+        rating_columns = []
+        while True:
+            rating_column = tkinter.simpledialog.askstring("输入信息",
+                                                           languages[self.current_language]["rating_column_prompt"])
+            if rating_column is None:
+                break
+            if rating_column.strip():
+                rating_columns.append(rating_column.strip())
+            else:
+                self.result_label.config(text=languages[self.current_language]["empty_rating_column"])
+
+        if not rating_columns:
+            self.result_label.config(text=languages[self.current_language]["no_rating_columns"])
+            return None
+        return {"group_column": group_column, "rating_columns": rating_columns}
 
     def analyze_file(self):
-        file_paths = self.file_entry.get().split(", ")
-        if file_paths[0] == languages[self.current_language]["file_entry_placeholder"]:
+        file_path = self.file_entry.get()
+        if file_path == languages[self.current_language]["file_entry_placeholder"]:
             self.result_label.config(text=languages[self.current_language]["no_file_selected"])
             return
+        if not os.path.exists(file_path):
+            self.result_label.config(text=languages[self.current_language]["file_not_exists"])
+            return
+        params = self.read_params()
+        if params is None:
+            return
+        # 先选择保存路径，读取数据、计算和生成报告在后台线程中进行，窗口保持响应
+        save_path = filedialog.asksaveasfilename(defaultextension=".docx", filetypes=[("Word files", "*.docx")])
+        if not save_path:
+            self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+            return
+        self.result_label.config(text="")
+        self.job_panel.start(analysis_job, file_path, save_path, self.current_language,
+                             analyze, write_report, load=load_excel, params=params, controls=(self.analyze_button,),
+                             on_done=lambda paths: self.on_analysis_done(save_path),
+                             on_error=self.on_analysis_error)
 
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                self.result_label.config(text=languages[self.current_language]["file_not_exists"])
-                return
-
-        try:
-            # 获取分组列名
-            group_column = tkinter.simpledialog.askstring("输入信息",
-                                                          languages[self.current_language]["group_column_prompt"])
-            if not group_column:
-                self.result_label.config(text=languages[self.current_language]["no_group_column"])
-                return
-
-            # 获取评分列名
-            rating_columns = []
-            while True:
-                rating_column = tkinter.simpledialog.askstring("输入信息",
-                                                               languages[self.current_language]["rating_column_prompt"])
-                if rating_column is None:
-                    break
-                if rating_column.strip():
-                    rating_columns.append(rating_column.strip())
-                else:
-                    print(languages[self.current_language]["empty_rating_column"])
-
-            if not rating_columns:
-                self.result_label.config(text=languages[self.current_language]["no_rating_columns"])
-                return
-
-            all_results = []
-            file_names = []
-            rwg_values_all = []
-            group_names_all = []
-
-            for file_path in file_paths:
-                # 打开 Excel 文件
-                df = pd.read_excel(file_path)
-
-                # 进行rwg分析
-                rwg_results, rwg_values = self.rwg_analysis(df, group_column, rating_columns)
-                all_results.extend(rwg_results)
-                file_names.extend([os.path.basename(file_path)] * len(rwg_results))
-
-                # 收集rwg值和组名用于绘图
-                if rwg_values:
-                    for i, result in enumerate(rwg_results):
-                        if i < len(rwg_results) - 1:  # 最后一个是统计结果
-                            key = list(result.keys())[0]
-                            group = key.split('_')[0]
-                            rwg_values_all.append(result[key])
-                            group_names_all.append(f"{os.path.basename(file_path)}_{group}")
-
-            # 整理数据
-            all_data = []
-            for i, results in enumerate(all_results):
-                if results:
-                    data = []
-                    for key, value in results.items():
-                        data.append([f"{file_names[i]}_{key}", value])
-                    all_data.extend(data)
-
-            headers = ["指标", "数值"]
-            df_result = pd.DataFrame(all_data, columns=headers)
-
-            # 添加解释说明
-            explanations = languages[self.current_language]['explanation']
-            interpretations = languages[self.current_language]['interpretation']
-            explanation_df = pd.DataFrame([explanations])
-            explanation_df = explanation_df.reindex(
-                columns=["rwg值", "Rwg值标准差SD", "P25", "中位数", "P75", "ICC1", "ICC2", "MSB", "MSW", "F值", "p值"])
-            explanation_df.insert(0, "指标_解释说明",
-                                  "解释说明" if self.current_language == 'zh' else "Explanation")
-
-            # 添加分析结果解读
-            interpretation_df = pd.DataFrame([interpretations])
-            interpretation_df = interpretation_df.reindex(
-                columns=["rwg值", "Rwg值标准差SD", "P25", "中位数", "P75", "ICC1", "ICC2", "MSB", "MSW", "F值", "p值"])
-            interpretation_df.insert(0, "指标_结果解读",
-                                     "结果解读" if self.current_language == 'zh' else "Interpretation")
-
-            # 让用户选择保存路径
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".docx", filetypes=[("Word files", "*.docx")])
-
-            if save_path:
-                # 创建 Word 文档
-                doc = Document()
-
-                # 添加分析结果表格
-                table = doc.add_table(rows=1, cols=2)
-                hdr_cells = table.rows[0].cells
-                hdr_cells[0].text = headers[0]
-                hdr_cells[1].text = headers[1]
-                for index, row in df_result.iterrows():
-                    row_cells = table.add_row().cells
-                    row_cells[0].text = str(row[headers[0]])
-                    row_cells[1].text = str(row[headers[1]])
-
-                # 添加解释说明表格
-                doc.add_heading("解释说明" if self.current_language == 'zh' else "Explanation", level=2)
-                table = doc.add_table(rows=1, cols=len(explanation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(explanation_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for index, row in explanation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, col_name in enumerate(explanation_df.columns):
-                        row_cells[col_idx].text = str(row[col_name])
-
-                # 添加分析结果解读表格
-                doc.add_heading("结果解读" if self.current_language == 'zh' else "Interpretation", level=2)
-                table = doc.add_table(rows=1, cols=len(interpretation_df.columns))
-                hdr_cells = table.rows[0].cells
-                for col_idx, col_name in enumerate(interpretation_df.columns):
-                    hdr_cells[col_idx].text = col_name
-                for index, row in interpretation_df.iterrows():
-                    row_cells = table.add_row().cells
-                    for col_idx, col_name in enumerate(interpretation_df.columns):
-                        row_cells[col_idx].text = str(row[col_name])
-
-                # 生成rwg值柱状图
-                if rwg_values_all:
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.bar(group_names_all, rwg_values_all)
-                    ax.set_title(
-                        '组内评分者信度rwg值' if self.current_language == 'zh' else 'Within-Group Inter-Rater Reliability rwg Values')
-                    ax.set_ylabel('rwg值' if self.current_language == 'zh' else 'rwg Value')
-                    ax.set_xlabel('分组' if self.current_language == 'zh' else 'Group')
-                    plt.xticks(rotation=45, ha='right')
-                    plt.tight_layout()
-
-                    # 保存图片
-                    img_path = os.path.splitext(save_path)[0] + '_rwg.png'
-                    plt.savefig(img_path)
-                    plt.close()
-
-                    # 将图片插入 Word 文档
-                    doc.add_heading(
-                        "组内评分者信度rwg值柱状图" if self.current_language == 'zh' else "Within-Group Inter-Rater Reliability rwg Values Bar Chart",
-                        level=2)
-                    doc.add_picture(img_path, width=Inches(6))
-
-                # 保存 Word 文档
-                doc.save(save_path)
-
-                self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
-                                         wraplength=400)
-            else:
-                self.result_label.config(text=languages[self.current_language]["no_save_path_selected"])
+    def on_analysis_done(self, save_path):
+        # 设置 wraplength 属性让文本自动换行
+        self.result_label.config(text=languages[self.current_language]["analysis_complete"].format(save_path),
+                                 wraplength=400)
 
-        except Exception as e:
-            self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
+    def on_analysis_error(self, e):
+        self.result_label.config(text=languages[self.current_language]["analysis_error"].format(str(e)))
 
-    def switch_language(self, event):
+    def switch_language(self, event=None):
         if self.current_language == "zh":
             self.current_language = "en"
         else:
@@ -372,6 +296,7 @@ class WithinGroupInterRaterReliabilityRwgAnalysisApp:
         self.file_entry.config(foreground='gray')
         self.analyze_button.config(text=languages[self.current_language]["analyze_button_text"])
         self.switch_language_label.config(text=languages[self.current_language]["switch_language_button_text"])
+        self.job_panel.set_language(self.current_language)
 
     def create_ui(self):
         # 获取屏幕的宽度和高度
@@ -380,7 +305,7 @@ class WithinGroupInterRaterReliabilityRwgAnalysisApp:
 
         # 设置窗口的宽度和高度
         window_width = 500
-        window_height = 300
+        window_height = 360
 
         # 计算窗口应该放置的位置
         x = (screen_width - window_width) // 2
@@ -411,6 +336,10 @@ class WithinGroupInterRaterReliabilityRwgAnalysisApp:
                                          command=self.analyze_file, bootstyle=SUCCESS)
         self.analyze_button.pack(pady=10)
 
+        # 创建后台任务的进度条和取消按钮
+        self.job_panel = JobPanel(frame, self.current_language)
+        self.job_panel.pack(pady=5)
+
         # 创建切换语言标签
         self.switch_language_label = ttk.Label(frame,
                                                text=languages[self.current_language]["switch_language_button_text"],
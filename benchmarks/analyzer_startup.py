@@ -0,0 +1,90 @@
+"""
+分析器窗口启动基准测试
+
+分别在独立子进程中测量两种加载方式:
+    eager: 启动时导入 MODULE_MAP 中的全部分析器模块（改造前的行为）
+    lazy:  只导入 Source.Analyzer，分析器在首次点击时才导入（当前行为）
+
+输出首个窗口绘制完成的耗时以及已导入的模块数量。
+用法: python benchmarks/analyzer_startup.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行的测量脚本
+CHILD_SCRIPT = r"""
+import importlib
+import json
+import sys
+import time
+
+mode = sys.argv[1]
+start = time.perf_counter()
+modules_before = len(sys.modules)
+
+import Source.Analyzer as analyzer
+
+failed = 0
+if mode == "eager":
+    for entry in analyzer.MODULE_MAP.values():
+        try:
+            importlib.import_module(entry["module"])
+        except Exception:
+            failed += 1
+import_time = time.perf_counter() - start
+
+window_time = None
+try:
+    app = analyzer.AnalyzerApp()
+    app.root.update()
+    window_time = time.perf_counter() - start
+    app.root.destroy()
+except Exception:
+    # 无显示环境时只统计导入耗时
+    pass
+
+print(json.dumps({
+    "import_time": import_time,
+    "window_time": window_time,
+    "imported_modules": len(sys.modules) - modules_before,
+    "failed_imports": failed,
+}))
+"""
+
+
+def measure(mode):
+    """
+    在新的解释器中测量一次启动
+    :param mode: "eager" 或 "lazy"
+    :return: 测量结果字典
+    """
+    output = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, mode], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def format_seconds(value):
+    return "n/a" if value is None else f"{value:.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyzer startup benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复测量的次数")
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'import':>9} {'first window':>13} {'modules':>8} {'failed':>7}")
+    for mode in ("eager", "lazy"):
+        runs = [measure(mode) for _ in range(args.repeat)]
+        # 取最快的一次，减少磁盘缓存等外部因素的干扰
+        best = min(runs, key=lambda r: r["import_time"])
+        print(f"{mode:<6} {format_seconds(best['import_time']):>9} {format_seconds(best['window_time']):>13} "
+              f"{best['imported_modules']:>8} {best['failed_imports']:>7}")
+
+
+if __name__ == "__main__":
+    main()
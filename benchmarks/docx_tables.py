@@ -0,0 +1,75 @@
+"""
+Word 表格写入基准测试
+
+对比改造前逐格赋值 table.rows[i].cells[j].text 与 dias.report.add_dataframe_table 的批量写入，
+数据为 items × items 的相关系数矩阵（含表头行和列名列）。
+用法: python benchmarks/docx_tables.py [--items 300] [--skip-baseline]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from docx import Document
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.report import add_dataframe_table, new_document
+
+
+def baseline_table(doc, df):
+    # 改造前分析器中的写法
+    table = doc.add_table(rows=df.shape[0] + 1, cols=df.shape[1] + 1)
+    hdr_cells = table.rows[0].cells
+    for col_idx, header in enumerate([""] + list(df.columns)):
+        hdr_cells[col_idx].text = str(header)
+    for row_idx in range(df.shape[0]):
+        row_cells = table.rows[row_idx + 1].cells
+        row_cells[0].text = str(df.index[row_idx])
+        for col_idx in range(df.shape[1]):
+            row_cells[col_idx + 1].text = str(df.iloc[row_idx, col_idx])
+
+
+def timed(build, path):
+    start = time.perf_counter()
+    doc = build()
+    written = time.perf_counter() - start
+    doc.save(path)
+    return written, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docx table writer benchmark")
+    parser.add_argument("--items", type=int, default=300, help="相关矩阵的变量数")
+    parser.add_argument("--skip-baseline", action="store_true", help="不运行改造前的实现")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = [f"Q{i + 1}" for i in range(args.items)]
+    corr = pd.DataFrame(np.corrcoef(rng.normal(size=(args.items, 200))), index=names, columns=names)
+
+    def bulk():
+        doc = new_document()
+        add_dataframe_table(doc, corr, index=True)
+        return doc
+
+    def baseline():
+        doc = Document()
+        baseline_table(doc, corr)
+        return doc
+
+    print(f"{args.items} x {args.items} table ({corr.size} cells)")
+    with tempfile.TemporaryDirectory() as tmp:
+        written, total = timed(bulk, os.path.join(tmp, "bulk.docx"))
+        print(f"bulk      table {written:8.2f}s   with save {total:8.2f}s", flush=True)
+        if not args.skip_baseline:
+            base_written, base_total = timed(baseline, os.path.join(tmp, "baseline.docx"))
+            print(f"baseline  table {base_written:8.2f}s   with save {base_total:8.2f}s   "
+                  f"speedup {base_written / written:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+逐步回归基准测试
+
+对比改造前每个候选变量逐个拟合 statsmodels OLS 的实现与 dias.compute.stepwise 的增量实现，
+数据为 rows 行、items 个候选变量，因变量由其中 active 个变量线性生成。
+两种实现选出的变量和顺序应完全相同。
+用法: python benchmarks/stepwise_regression.py [--items 200] [--rows 1000] [--skip-baseline]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.compute.stepwise import stepwise_selection
+
+
+def baseline_selection(X, y, initial_list=[], threshold_in=0.05, threshold_out=0.10):
+    # 改造前 StepwiseRegressionAnalysisApp.stepwise_selection 的写法，
+    # 候选变量按列顺序遍历，使并列时的选择与增量实现一致
+    included = list(initial_list)
+    while True:
+        changed = False
+        excluded = [c for c in X.columns if c not in included]
+        new_pval = pd.Series(index=excluded, dtype=float)
+        for new_column in excluded:
+            model = sm.OLS(y, sm.add_constant(pd.DataFrame(X[included + [new_column]]))).fit()
+            new_pval[new_column] = model.pvalues[new_column]
+        best_pval = new_pval.min()
+        if best_pval < threshold_in:
+            included.append(new_pval.idxmin())
+            changed = True
+
+        model = sm.OLS(y, sm.add_constant(pd.DataFrame(X[included]))).fit()
+        pvalues = model.pvalues.iloc[1:]
+        worst_pval = pvalues.max()
+        if worst_pval > threshold_out:
+            changed = True
+            included.remove(pvalues.idxmax())
+        if not changed:
+            break
+    return included
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stepwise regression benchmark")
+    parser.add_argument("--items", type=int, default=200, help="候选变量数")
+    parser.add_argument("--rows", type=int, default=1000, help="样本量")
+    parser.add_argument("--active", type=int, default=12, help="真正影响因变量的变量数")
+    parser.add_argument("--skip-baseline", action="store_true", help="不运行改造前的实现")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(args.rows, args.items)), columns=[f"A{i + 1}" for i in range(args.items)])
+    beta = np.zeros(args.items)
+    beta[:args.active] = rng.uniform(0.1, 0.5, args.active)
+    y = X.to_numpy() @ beta + rng.normal(size=args.rows)
+
+    print(f"{args.rows} rows, {args.items} candidates")
+    start = time.perf_counter()
+    result = stepwise_selection(X, y)
+    incremental = time.perf_counter() - start
+    print(f"incremental {incremental:8.3f}s   {len(result.steps)} steps, {len(result.selected)} selected", flush=True)
+    if not args.skip_baseline:
+        start = time.perf_counter()
+        selected = baseline_selection(X, y)
+        baseline = time.perf_counter() - start
+        print(f"baseline    {baseline:8.3f}s   speedup {baseline / incremental:6.1f}x   "
+              f"same selection: {selected == result.selected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+DIAS 设计信息学分析系统的无界面核心
+
+dias.compute 提供不依赖 Tk 窗口和文件对话框的纯计算函数，
+Source 目录下的各分析器窗口只负责读取文件、调用计算层并生成报告。
+"""
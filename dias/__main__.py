@@ -0,0 +1,88 @@
+"""
+命令行入口
+
+    python -m dias list
+    python -m dias run "Pearson Correlation Analysis" "wave3/*.xlsx" -o results --workers 8
+    python -m dias clear-cache
+"""
+import argparse
+import os
+import sys
+
+# 保证从任意目录运行时都能导入 Source 下的分析器
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dias.batch import analyzer_registry, expand_inputs, is_headless, resolve_analyzer, run_batch, write_summary
+from dias.dataset import clear_cache
+from dias.results import clear_results
+
+
+def command_list(args):
+    for name, entry in analyzer_registry().items():
+        try:
+            mode = "headless" if is_headless(entry) else "window only"
+        except Exception as e:
+            mode = f"unavailable ({type(e).__name__})"
+        print(f"{name:<60} {mode}")
+    return 0
+
+
+def command_run(args):
+    try:
+        analyzer, entry = resolve_analyzer(args.analyzer)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("没有找到匹配的输入文件", file=sys.stderr)
+        return 2
+
+    def report(status):
+        line = f"[{status.status:>6}] {status.file} ({status.seconds:.1f}s{', cached' if status.cached else ''})"
+        if status.error:
+            line += f"  {status.error}"
+        print(line, flush=True)
+
+    statuses = run_batch(analyzer, files, args.output, workers=args.workers,
+                         language=args.language, progress=report, use_cache=not args.no_cache)
+    summary_path = write_summary(statuses, args.output, analyzer)
+
+    failed = sum(s.status != "ok" for s in statuses)
+    print(f"{analyzer}: {len(statuses) - failed} ok, {failed} failed. Summary: {summary_path}")
+    return 1 if failed else 0
+
+
+def command_clear_cache(args):
+    datasets = clear_cache()
+    results = clear_results()
+    print(f"Removed {datasets} cached workbooks and {results} cached results.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m dias", description="DIAS batch runner")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="列出分析器及其是否支持无界面运行")
+    list_parser.set_defaults(func=command_list)
+
+    run_parser = subparsers.add_parser("run", help="在多个工作簿上批量运行分析器")
+    run_parser.add_argument("analyzer", help="MODULE_MAP 中的分析器名称，例如 \"Pearson Correlation Analysis\"")
+    run_parser.add_argument("inputs", nargs="+", help="输入工作簿路径或通配符，支持 ** 递归匹配")
+    run_parser.add_argument("-o", "--output", default="dias_output", help="输出目录")
+    run_parser.add_argument("-w", "--workers", type=int, default=None, help="工作进程数，默认等于 CPU 核数")
+    run_parser.add_argument("--language", choices=["en", "zh"], default="en", help="报告语言")
+    run_parser.add_argument("--no-cache", action="store_true", help="不读取也不写入结果缓存，全部重新计算")
+    run_parser.set_defaults(func=command_run)
+
+    clear_parser = subparsers.add_parser("clear-cache", help="删除工作簿缓存和结果缓存")
+    clear_parser.set_defaults(func=command_clear_cache)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+
+from dias.dataset import load_excel
+from dias.results import analyzer_name, cached_analyze
+
+# 批处理中每个工作进程的环境变量：没有显示器，统一使用非交互式绘图后端；
+# 批处理已经按文件并行，报告图片和逐列计算在各自的工作进程中进行，不再嵌套进程池
+WORKER_ENV = {"MPLBACKEND": "Agg", "DIAS_PLOT_WORKERS": "1", "DIAS_COMPUTE_WORKERS": "1"}
+
+# 工作进程中登记已开始的文件编号的队列，见 _init_worker
+_started = None
+
+
+@dataclass
+class FileStatus:
+    file: str
+    status: str
+    seconds: float = 0.0
+    error: str = ""
+    outputs: list = field(default_factory=list)
+    # 计算结果是否来自结果缓存
+    cached: bool = False
+
+
+def analyzer_registry():
+    """
+    读取分析器窗口中的模块映射表
+    :return: MODULE_MAP
+    """
+    from Source.Analyzer import MODULE_MAP
+    return MODULE_MAP
+
+
+def resolve_analyzer(name):
+    """
+    按 MODULE_MAP 中的名称查找分析器，忽略大小写，也接受模块文件名
+    :param name: 分析器名称，例如 "Pearson Correlation Analysis"
+    :return: (标准名称, 映射表条目)
+    """
+    registry = analyzer_registry()
+    wanted = name.strip().lower()
+    for key, entry in registry.items():
+        if wanted in (key.lower(), entry["module"].lower(), entry["module"].split(".")[-1].lower()):
+            return key, entry
+    raise KeyError(f"未知的分析器: {name}")
+
+
+def is_headless(entry):
+    """
+    判断分析器模块是否提供无界面入口 analyze / write_report
+    :param entry: MODULE_MAP 条目
+    :return: bool
+    """
+    module = importlib.import_module(entry["module"])
+    return hasattr(module, "analyze") and hasattr(module, "write_report")
+
+
+def expand_inputs(patterns):
+    """
+    展开输入的通配符，保持顺序并去重
+    :param patterns: 文件路径或通配符列表
+    :return: 文件路径列表
+    """
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if os.path.isfile(pattern) else [])
+        for path in matches:
+            if os.path.isfile(path) and path not in files:
+                files.append(path)
+    return files
+
+
+def output_names(files):
+    """
+    为每个输入文件分配唯一的输出子目录名，避免不同目录下的同名工作簿互相覆盖
+    :param files: 文件路径列表
+    :return: 与 files 对应的名称列表
+    """
+    names = []
+    seen = {}
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        count = seen.get(stem, 0)
+        seen[stem] = count + 1
+        names.append(stem if count == 0 else f"{stem}_{count}")
+    return names
+
+
+def run_file(module_path, file_path, output_dir, name, language="en", use_cache=True):
+    """
+    在单个工作簿上运行分析器，生成 docx / png / JSON 输出
+    在工作进程中执行，任何异常都转换为失败状态而不会中断整个批次
+    :param module_path: 分析器模块路径
+    :param file_path: 输入工作簿
+    :param output_dir: 输出根目录
+    :param name: 该工作簿的输出子目录名
+    :param language: 报告语言
+    :param use_cache: 是否使用结果缓存
+    :return: FileStatus
+    """
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_path)
+        if not (hasattr(module, "analyze") and hasattr(module, "write_report")):
+            raise RuntimeError("该分析器尚未提供无界面入口，只能在窗口中运行")
+
+        if hasattr(module, "analyze_path"):
+            # 分析器自行流式读取工作簿，不需要先载入整个 DataFrame
+            analyze, data = module.analyze_path, file_path
+        else:
+            # 需要特殊读取方式（例如以第一列为时间索引）的分析器提供 load_data
+            load = getattr(module, "load_data", load_excel)
+            analyze, data = module.analyze, load(file_path)
+        # 内容和参数都未改变的工作簿直接复用上次的计算结果
+        result, cached = cached_analyze(analyzer_name(analyze), analyze, data, enabled=use_cache)
+
+        target_dir = os.path.join(output_dir, name)
+        os.makedirs(target_dir, exist_ok=True)
+        docx_path = os.path.join(target_dir, f"{name}.docx")
+        json_path = os.path.join(target_dir, f"{name}.json")
+        module.write_report(result, docx_path, language, plot_dir=target_dir)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f, ensure_ascii=False, indent=2)
+
+        outputs = sorted(os.path.join(target_dir, f) for f in os.listdir(target_dir))
+        return FileStatus(file_path, "ok", time.perf_counter() - start, outputs=outputs, cached=cached)
+    except Exception as e:
+        return FileStatus(file_path, "failed", time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+
+
+def _init_worker(started=None):
+    global _started
+    os.environ.update(WORKER_ENV)
+    _started = started
+
+
+def _run_tracked(index, *args):
+    # 先登记文件编号，进程池崩溃时据此找出当时正在运行的文件
+    if _started is not None:
+        _started.put(index)
+    return run_file(*args)
+
+
+def _run_pool(indices, workers, task_args, statuses, progress):
+    """
+    在一个新的进程池中运行一组文件
+    :return: (进程池崩溃时正在运行的文件编号, 尚未开始的文件编号)；进程池未崩溃时均为空
+    """
+    started = multiprocessing.SimpleQueue()
+    with ProcessPoolExecutor(max_workers=min(workers, len(indices)), initializer=_init_worker,
+                             initargs=(started,)) as pool:
+        futures = {pool.submit(_run_tracked, i, *task_args(i)): i for i in indices}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                statuses[i] = future.result()
+            except BrokenProcessPool:
+                # 进程池中的某个工作进程异常退出（例如内存耗尽），其余未完成的文件都收到该异常
+                continue
+            except Exception as e:
+                statuses[i] = FileStatus(task_args(i)[1], "failed", error=f"{type(e).__name__}: {e}")
+            if progress:
+                progress(statuses[i])
+    running = set()
+    while not started.empty():
+        running.add(started.get())
+    unfinished = [i for i in indices if statuses[i] is None]
+    return [i for i in unfinished if i in running], [i for i in unfinished if i not in running]
+
+
+def run_batch(analyzer, files, output_dir, workers=None, language="en", progress=None, use_cache=True):
+    """
+    使用进程池在多个工作簿上并行运行同一个分析器
+    :param analyzer: MODULE_MAP 中的分析器名称
+    :param files: 输入文件列表
+    :param output_dir: 输出根目录
+    :param workers: 工作进程数，默认等于 CPU 核数
+    :param language: 报告语言
+    :param progress: 每完成一个文件时调用的回调，参数为 FileStatus
+    :param use_cache: 是否使用结果缓存
+    :return: 与 files 顺序一致的 FileStatus 列表
+    """
+    _, entry = resolve_analyzer(analyzer)
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_names(files)
+    workers = workers or os.cpu_count() or 1
+
+    statuses = [None] * len(files)
+    if workers == 1:
+        # 在当前进程中依次运行，结束后恢复调用方的环境变量
+        saved = {key: os.environ.get(key) for key in WORKER_ENV}
+        os.environ.update(WORKER_ENV)
+        try:
+            for i, (path, name) in enumerate(zip(files, names)):
+                statuses[i] = run_file(entry["module"], path, output_dir, name, language, use_cache)
+                if progress:
+                    progress(statuses[i])
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        return statuses
+
+    def task_args(i):
+        return entry["module"], files[i], output_dir, names[i], language, use_cache
+
+    remaining = list(range(len(files)))
+    while remaining:
+        running, remaining = _run_pool(remaining, workers, task_args, statuses, progress)
+        if not running and remaining:
+            # 进程池在任何文件开始之前就已崩溃，剩余文件逐个单独运行
+            running, remaining = remaining, []
+        # 崩溃时正在运行的文件各自在单独的进程池中重试一次，再次崩溃的才记为失败；
+        # 尚未开始的文件在新的进程池中继续运行
+        for i in running:
+            _run_pool([i], 1, task_args, statuses, progress)
+            if statuses[i] is None:
+                statuses[i] = FileStatus(files[i], "failed",
+                                         error="BrokenProcessPool: 工作进程在处理该文件时异常退出")
+                if progress:
+                    progress(statuses[i])
+    return statuses
+
+
+def write_summary(statuses, output_dir, analyzer):
+    """
+    将每个文件的运行状态写入 summary.json
+    :return: summary.json 路径
+    """
+    summary_path = os.path.join(output_dir, "summary.json")
+    summary = {
+        "analyzer": analyzer,
+        "total": len(statuses),
+        "ok": sum(s.status == "ok" for s in statuses),
+        "failed": sum(s.status != "ok" for s in statuses),
+        "files": [asdict(s) for s in statuses],
+    }
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary_path
@@ -0,0 +1,60 @@
+"""
+无界面计算层
+
+每个函数接收 DataFrame / ndarray，返回带类型的结果对象，不读写文件、不绘图、不弹出对话框。
+"""
+from dias.compute.anova import (AncovaResult, AnovaResult, ManovaResult, RepeatedMeasuresResult, ancova, manova,
+                                one_way_anova, repeated_measures_anova)
+from dias.compute.arima import ArimaResult, arima_analysis, search_order, select_d
+from dias.compute.base import (AnalysisResult, ComputationCancelled, cancellation, check_cancelled, run_tasks,
+                               select_numeric, to_serializable)
+from dias.compute.bootstrap import bootstrap_ci, loo_lstsq, resample_weights, weighted_lstsq
+from dias.compute.clustering import (DensityResult, HierarchicalResult, KMeansResult, NeighborIndex,
+                                     dbscan_labels, density_clustering, hierarchical_clustering, kmeans_sweep,
+                                     micro_clusters, neighbor_index, weighted_ward)
+from dias.compute.collinearity import CollinearityResult, collinearity_analysis, correlation_inverse, vif_elimination
+from dias.compute.correlation import (CorrelationResult, PartialCorrelationResult, correlation_analysis,
+                                      correlation_matrix, correlation_pvalues, partial_correlation_analysis,
+                                      partial_correlation_matrix)
+from dias.compute.descriptive import DescriptiveResult, descriptive_statistics, descriptive_statistics_stream
+from dias.compute.evaluation import (DELPHI_CONVERGENCE, CompositeIndexResult, CouplingResult, DelphiResult,
+                                     DematelResult, EfficacyResult, FuzzyEvaluationResult, GreyRelationalResult,
+                                     ObstacleResult, RangeAnalysisResult, RsrResult, TopsisResult, composite_index,
+                                     coupling_coordination, delphi, dematel, efficacy_coefficient,
+                                     fuzzy_comprehensive, grey_relational, obstacle_degree, range_analysis,
+                                     rank_sum_ratio, topsis)
+from dias.compute.forecasting import (PREDICTION_STEPS, SMOOTHING_ALPHA, AdfResult, GreyPredictionResult, MarkovResult,
+                                      SmoothingResult, adf_test, exponential_smoothing, grey_prediction,
+                                      markov_prediction)
+from dias.compute.hierarchical_regression import (BlockQR, HierarchicalRegressionResult, hierarchical_regression,
+                                                  parse_blocks)
+from dias.compute.hypothesis import (ContingencyResult, FriedmanResult, GoodnessOfFitResult, HomogeneityResult,
+                                     KappaResult, KendallWResult, LocationTestResult, RunsResult, bartlett_test,
+                                     chi_square_goodness_of_fit, chi_square_independence, friedman_test,
+                                     independent_t_test, kappa_test, kendall_w, levene_test, one_sample_t_test,
+                                     one_sample_wilcoxon, paired_t_test, paired_wilcoxon, runs_test)
+from dias.compute.kano import KanoResult, kano_analysis, kano_analysis_stream, paired_columns
+from dias.compute.mediation import (ModerationResult, conditional_indirect_ci, indirect_effect_ci, mediation_analysis,
+                                    moderated_mediation_analysis, moderation_analysis)
+from dias.compute.multinomial import MultinomialResult, design_matrix, information_matrix, multinomial_logit
+from dias.compute.multiple_choice import MultipleChoiceResult, multiple_choice_analysis, multiple_choice_stream
+from dias.compute.multivariate import (CanonicalResult, DiscriminantResult, FactorResult, MdsResult, PcaResult,
+                                       canonical_correlation, discriminant_analysis, factor_analysis,
+                                       multidimensional_scaling, principal_components)
+from dias.compute.normality import NormalityResult, normality_battery
+from dias.compute.posthoc import PostHocResult, posthoc_tests, studentized_range_sf
+from dias.compute.regression import (GeeResult, RegressionResult, Tobit, coefficient_table, gee_analysis,
+                                     gmm_regression, logistic_regression, ols_regression, ordered_logit,
+                                     pls_regression, polynomial_regression, regularized_logistic_regression,
+                                     robust_regression, stepwise_regression, tobit_regression)
+from dias.compute.regularization import RegularizationResult, coefficient_path, regularized_regression
+from dias.compute.reliability import (ContentValidityResult, ReliabilityResult, RwgResult, SplitHalfResult,
+                                      TestRetestResult, ValidityResult, content_validity, cronbach_alpha,
+                                      half_totals, reliability_analysis, rwg_analysis, split_half_reliability,
+                                      test_retest_reliability, validity_analysis)
+from dias.compute.stepwise import IncrementalOLS, StepwiseResult, stepwise_selection
+from dias.compute.survey import (NPS_DETRACTOR_MAX, NPS_PROMOTER_MIN, PSM_COLUMNS, ConjointResult, NpsResult,
+                                 PsmResult, conjoint_analysis, nps_analysis, price_sensitivity_meter)
+from dias.compute.turf import TurfResult, greedy_turf, pack_coverage, turf_analysis
+from dias.compute.weighting import (RI_TABLE, AhpResult, CriticResult, EntropyResult, IndependenceResult, ahp,
+                                   critic_weights, entropy_weights, fuzzy_ahp, independence_weights)
@@ -0,0 +1,193 @@
+"""
+方差分析：单因素（每列一组）、协方差分析、多元方差分析和重复测量方差分析
+
+表格的列名沿用 pingouin 的输出（Source、SS、DF、F、p-unc、np2 等），计算只依赖 statsmodels 和 scipy。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from scipy import stats
+from statsmodels.multivariate.manova import MANOVA
+from statsmodels.stats.anova import anova_lm
+
+from dias.compute.base import AnalysisResult, numeric_cells
+from dias.compute.hypothesis import numeric_columns, sample_summary
+
+
+@dataclass
+class AnovaResult(AnalysisResult):
+    f_statistic: float
+    df_between: int
+    df_within: int
+    p_value: float
+    # 效应量 η² = 组间平方和 / 总平方和
+    eta_squared: float
+    # 各组的样本量、均值、标准差和中位数
+    summary: pd.DataFrame
+    # 各组的数值，用于绘图
+    samples: dict = field(default=None, metadata={"export": False})
+
+
+def one_way_anova(df):
+    """
+    单因素方差分析，每列为一组，各列的缺失值分别去掉
+    :return: AnovaResult
+    """
+    columns = numeric_columns(df, 2, "至少需要两列数值数据才能进行方差分析。")
+    f_stat, p_value = stats.f_oneway(*columns.values())
+    values = np.concatenate(list(columns.values()))
+    grand_mean = values.mean()
+    ss_between = sum(len(v) * (v.mean() - grand_mean) ** 2 for v in columns.values())
+    ss_total = ((values - grand_mean) ** 2).sum()
+    return AnovaResult(f_statistic=float(f_stat), df_between=len(columns) - 1, df_within=len(values) - len(columns),
+                       p_value=float(p_value), eta_squared=float(ss_between / ss_total),
+                       summary=sample_summary(columns), samples=columns)
+
+
+@dataclass
+class AncovaResult(AnalysisResult):
+    group_var: str
+    dep_var: str
+    covariates: list
+    # 每个效应一行（分组变量、各协变量和残差）：Source、SS、DF、F、p-unc、np2，平方和为 II 型
+    table: pd.DataFrame
+    nobs: int
+    # 参与分析的数据，用于散点图
+    data: pd.DataFrame = field(default=None, metadata={"export": False})
+
+
+def ancova(df):
+    """
+    协方差分析
+    :param df: 第一列为分组变量，最后一列为因变量，中间各列为协变量
+    :return: AncovaResult
+    """
+    if df.shape[1] < 3:
+        raise ValueError("数据至少需要三列：分组变量、协变量和因变量。")
+    group_var, dep_var = str(df.columns[0]), str(df.columns[-1])
+    covariates = [str(c) for c in df.columns[1:-1]]
+    # 列名可能含有空格或中文，统一换成公式中可用的名称
+    data = pd.DataFrame({"g": df.iloc[:, 0], "y": numeric_cells(df.iloc[:, -1])})
+    for i in range(len(covariates)):
+        data[f"c{i}"] = numeric_cells(df.iloc[:, i + 1])
+    data = data.dropna()
+    if data["g"].nunique() < 2:
+        raise ValueError("分组变量至少需要两个组。")
+    terms = " + ".join(["C(g)"] + [f"c{i}" for i in range(len(covariates))])
+    aov = anova_lm(smf.ols(f"y ~ {terms}", data=data).fit(), typ=2)
+    ss_resid = aov.loc["Residual", "sum_sq"]
+    table = pd.DataFrame({
+        "Source": [group_var] + covariates + ["Residual"],
+        "SS": aov["sum_sq"].to_numpy(),
+        "DF": aov["df"].to_numpy().astype(int),
+        "F": aov["F"].to_numpy(),
+        "p-unc": aov["PR(>F)"].to_numpy(),
+        "np2": (aov["sum_sq"] / (aov["sum_sq"] + ss_resid)).to_numpy(),
+    })
+    table.loc[table["Source"] == "Residual", ["F", "p-unc", "np2"]] = np.nan
+    data.columns = [group_var, dep_var] + covariates
+    return AncovaResult(group_var=group_var, dep_var=dep_var, covariates=covariates, table=table, nobs=len(data),
+                        data=data)
+
+
+@dataclass
+class ManovaResult(AnalysisResult):
+    group_var: str
+    dependent_vars: list
+    # 分组效应的四种检验：Wilks' lambda、Pillai's trace、Hotelling-Lawley trace、Roy's greatest root
+    tests: pd.DataFrame
+    # 多元偏 η² = 1 - Λ^(1/s)，s = min(因变量个数, 组数 - 1)
+    eta_squared: float
+    group_sizes: pd.Series
+    # 每组各因变量的均值，行为组
+    group_means: pd.DataFrame
+    # 参与分析的因变量数据，用于箱线图
+    data: pd.DataFrame = field(default=None, metadata={"export": False})
+
+
+def manova(df):
+    """
+    单因素多元方差分析
+    :param df: 最后一列为分组变量，其余数值列为因变量，只使用所有列都有值的行
+    :return: ManovaResult
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列因变量和一列分组变量。")
+    group_var = str(df.columns[-1])
+    dependent = pd.DataFrame({str(name): numeric_cells(series) for name, series in df.iloc[:, :-1].items()})
+    dependent = dependent.dropna(axis=1, how='all')
+    if dependent.empty:
+        raise ValueError("数据中没有数值列，无法进行方差分析。")
+    data = dependent.assign(**{group_var: df.iloc[:, -1].to_numpy()}).dropna()
+    groups = data[group_var].astype(str)
+    if groups.nunique() < 2:
+        raise ValueError("分组变量至少需要两个组。")
+    # 列名可能含有空格或中文，统一换成公式中可用的名称
+    renamed = pd.DataFrame(data[dependent.columns].to_numpy(), columns=[f"y{i}" for i in range(dependent.shape[1])])
+    renamed["g"] = groups.to_numpy()
+    formula = " + ".join(renamed.columns[:-1]) + " ~ C(g)"
+    stat = MANOVA.from_formula(formula, data=renamed).mv_test().results["C(g)"]["stat"]
+    tests = stat.astype(float)
+    s = min(dependent.shape[1], groups.nunique() - 1)
+    wilks = tests.loc["Wilks' lambda", "Value"]
+    means = data[dependent.columns].groupby(groups).mean()
+    return ManovaResult(group_var=group_var, dependent_vars=list(dependent.columns), tests=tests,
+                        eta_squared=float(1 - wilks ** (1 / s)), group_sizes=groups.value_counts().sort_index(),
+                        group_means=means, data=data[dependent.columns])
+
+
+@dataclass
+class RepeatedMeasuresResult(AnalysisResult):
+    subject_var: str
+    conditions: list
+    # 处理效应和误差两行：Source、SS、DF、MS、F、p-unc、np2、eps、p-GG-corr
+    table: pd.DataFrame
+    n_subjects: int
+    # 各处理水平的均值
+    means: pd.Series
+    # 参与分析的宽格式数据（每行一个被试），用于折线图
+    data: pd.DataFrame = field(default=None, metadata={"export": False})
+
+
+def repeated_measures_anova(df):
+    """
+    单因素重复测量方差分析，p 值另给出 Greenhouse-Geisser 校正的结果
+    :param df: 第一列为被试编号，其余各列为同一被试在不同处理水平下的测量值，只使用各列都有值的被试
+    :return: RepeatedMeasuresResult
+    """
+    if df.shape[1] < 3:
+        raise ValueError("数据至少需要三列：被试编号和两个以上处理水平的测量值。")
+    subject_var = str(df.columns[0])
+    measures = pd.DataFrame({str(name): numeric_cells(series) for name, series in df.iloc[:, 1:].items()})
+    measures.index = df.iloc[:, 0].to_numpy()
+    measures = measures.dropna()
+    n, k = measures.shape
+    if n < 2:
+        raise ValueError("至少需要两个测量完整的被试。")
+    y = measures.to_numpy()
+    grand_mean = y.mean()
+    ss_conditions = n * ((y.mean(axis=0) - grand_mean) ** 2).sum()
+    ss_subjects = k * ((y.mean(axis=1) - grand_mean) ** 2).sum()
+    ss_error = ((y - grand_mean) ** 2).sum() - ss_conditions - ss_subjects
+    df_conditions, df_error = k - 1, (n - 1) * (k - 1)
+    ms_conditions, ms_error = ss_conditions / df_conditions, ss_error / df_error
+    f_stat = ms_conditions / ms_error
+    # Greenhouse-Geisser ε：双中心化协方差矩阵
+    cov = np.cov(y, rowvar=False)
+    centered = cov - cov.mean(axis=0) - cov.mean(axis=1)[:, None] + cov.mean()
+    eps = np.trace(centered) ** 2 / (df_conditions * (centered ** 2).sum())
+    table = pd.DataFrame({
+        "Source": ["Treatment", "Error"],
+        "SS": [ss_conditions, ss_error],
+        "DF": [df_conditions, df_error],
+        "MS": [ms_conditions, ms_error],
+        "F": [f_stat, np.nan],
+        "p-unc": [stats.f.sf(f_stat, df_conditions, df_error), np.nan],
+        "np2": [ss_conditions / (ss_conditions + ss_error), np.nan],
+        "eps": [eps, np.nan],
+        "p-GG-corr": [stats.f.sf(f_stat, eps * df_conditions, eps * df_error), np.nan],
+    })
+    return RepeatedMeasuresResult(subject_var=subject_var, conditions=list(measures.columns), table=table,
+                                  n_subjects=n, means=measures.mean(), data=measures)
@@ -0,0 +1,224 @@
+"""
+ARIMA 阶数搜索
+
+每列时间序列独立搜索 (p, d, q)：差分阶数 d 由 KPSS 检验确定，p 和 q 按 Hyndman–Khandakar 逐步搜索
+（与 pmdarima.auto_arima 的默认策略相同），以 AIC 选择模型。
+搜索中拟合的最优模型直接用于 AIC/BIC 和预测，不再重新拟合。
+多列在进程池中并行搜索，每列可以设置阶数上限和时间预算。
+每列只去掉首尾的缺失值，中间的缺失值交给 statsmodels ARIMA 的卡尔曼滤波处理，不改变观测之间的间隔。
+"""
+import time
+import warnings
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import kpss
+
+from dias.compute.base import AnalysisResult, numeric_cells, run_tasks
+
+# 阶数上限的默认值，与 pmdarima.auto_arima 相同
+MAX_P, MAX_D, MAX_Q = 5, 2, 5
+# 预测步数
+FORECAST_STEPS = 10
+# KPSS 检验的显著性水平
+KPSS_ALPHA = 0.05
+
+
+@dataclass
+class ArimaFit:
+    """
+    单列的搜索结果，由工作进程返回，只包含少量数组
+    """
+    name: object
+    order: tuple = None
+    aic: float = np.nan
+    bic: float = np.nan
+    forecast: np.ndarray = None
+    # 已拟合的候选模型数
+    models: int = 0
+    seconds: float = 0.0
+    # 时间预算用完时为 True，结果为已搜索范围内的最优模型
+    timed_out: bool = False
+    error: str = ""
+
+
+def select_d(values, max_d=MAX_D, alpha=KPSS_ALPHA):
+    """
+    用 KPSS 平稳性检验确定差分阶数，与 pmdarima.arima.ndiffs(test='kpss') 相同
+    序列中间的缺失值在差分时保留位置，检验只使用非缺失的值
+    :return: 0 到 max_d 之间的整数
+    """
+    x = np.asarray(values, dtype=float)
+    d = 0
+    while d < max_d:
+        observed = x[~np.isnan(x)]
+        if len(observed) < 3 or np.ptp(observed) == 0:
+            break
+        with warnings.catch_warnings():
+            # KPSS 的 p 值超出查表范围时只给出警告
+            warnings.simplefilter("ignore")
+            p_value = kpss(observed, regression="c", nlags="auto")[1]
+        if p_value >= alpha:
+            break
+        x = np.diff(x)
+        d += 1
+    return d
+
+
+def _fit(values, order):
+    with warnings.catch_warnings():
+        # 收敛警告不影响按信息准则比较候选模型
+        warnings.simplefilter("ignore")
+        return ARIMA(values, order=order).fit()
+
+
+def search_order(name, values, max_p=MAX_P, max_d=MAX_D, max_q=MAX_Q, time_budget=None,
+                 forecast_steps=FORECAST_STEPS):
+    """
+    对单列做逐步搜索，返回最优模型的阶数、信息准则和预测
+    :param name: 列名
+    :param values: 去除首尾缺失值后的一维数组，中间的缺失值为 NaN
+    :param max_p: p 的上限
+    :param max_d: d 的上限
+    :param max_q: q 的上限
+    :param time_budget: 该列的时间预算（秒），在拟合每个候选模型前检查；None 表示不限
+    :param forecast_steps: 预测步数
+    :return: ArimaFit
+    """
+    start = time.perf_counter()
+    deadline = None if time_budget is None else start + time_budget
+    result = ArimaFit(name)
+    try:
+        d = select_d(values, max_d)
+        fitted = {}
+
+        def consider(p, q):
+            # 超出范围、已拟合过或时间用完的候选模型跳过；拟合失败的记为无穷大
+            if not (0 <= p <= max_p and 0 <= q <= max_q) or (p, q) in fitted:
+                return
+            if deadline is not None and fitted and time.perf_counter() > deadline:
+                result.timed_out = True
+                return
+            try:
+                fitted[(p, q)] = _fit(values, (p, d, q))
+            except (ValueError, np.linalg.LinAlgError):
+                fitted[(p, q)] = None
+
+        def best():
+            candidates = [(fit.aic, key) for key, fit in fitted.items() if fit is not None and np.isfinite(fit.aic)]
+            return min(candidates)[1] if candidates else None
+
+        for p, q in ((2, 2), (0, 0), (1, 0), (0, 1)):
+            consider(min(p, max_p), min(q, max_q))
+        current = best()
+        while current is not None and not result.timed_out:
+            p, q = current
+            for dp, dq in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)):
+                consider(p + dp, q + dq)
+            improved = best()
+            if improved == current:
+                break
+            current = improved
+
+        result.models = len(fitted)
+        if current is None:
+            raise ValueError("没有可以收敛的候选模型")
+        model = fitted[current]
+        result.order = (current[0], d, current[1])
+        result.aic, result.bic = float(model.aic), float(model.bic)
+        result.forecast = np.asarray(model.forecast(forecast_steps), dtype=float)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _search_task(args):
+    name, values, options = args
+    return search_order(name, values, **options)
+
+
+def infer_frequency(index):
+    """
+    日期索引的频率，无法推断或不是日期索引时返回 None
+    """
+    if isinstance(index, pd.DatetimeIndex) and len(index) >= 3:
+        return index.freq or pd.infer_freq(index)
+    return None
+
+
+def forecast_index(index, steps, freq=None):
+    """
+    预测值的索引：日期索引按频率从最后一个观测延伸，否则按序号延伸
+    :param index: 序列（去除首尾缺失值后）的索引
+    :param steps: 预测步数
+    :param freq: 频率，默认由 index 推断；应由原始数据的完整索引推断后传入
+    """
+    freq = freq or infer_frequency(index)
+    if freq is not None and isinstance(index, pd.DatetimeIndex) and len(index):
+        return pd.date_range(start=index[-1], periods=steps + 1, freq=freq)[1:]
+    return pd.RangeIndex(len(index), len(index) + steps)
+
+
+@dataclass
+class ArimaResult(AnalysisResult):
+    table: pd.DataFrame
+    forecasts: dict
+    # 时间预算用完、结果为部分搜索的列
+    timed_out: list
+    errors: dict
+    series: dict = field(repr=False, metadata={"export": False})
+
+
+def arima_analysis(df, max_p=MAX_P, max_d=MAX_D, max_q=MAX_Q, time_budget=None, forecast_steps=FORECAST_STEPS,
+                   parallel=True, workers=None):
+    """
+    对每个数值列搜索 ARIMA 阶数并预测
+    :param df: 以时间为索引的数据，每列为一条时间序列
+    :param max_p: p 的上限
+    :param max_d: d 的上限
+    :param max_q: q 的上限
+    :param time_budget: 每列的时间预算（秒）
+    :param forecast_steps: 预测步数
+    :param parallel: 是否在进程池中并行搜索各列
+    :param workers: 工作进程数，默认取环境变量 DIAS_COMPUTE_WORKERS，未设置时等于 CPU 核数
+    :return: ArimaResult
+    """
+    series = {}
+    for name, column in df.items():
+        values = numeric_cells(column)
+        observed = np.flatnonzero(~np.isnan(values))
+        if len(observed):
+            # 只去掉首尾的缺失值，保留中间缺失值的位置
+            rows = slice(observed[0], observed[-1] + 1)
+            series[name] = pd.Series(values[rows], index=df.index[rows])
+    if not series:
+        raise ValueError("数据中没有数值列，无法进行 ARIMA 分析。")
+
+    options = {"max_p": max_p, "max_d": max_d, "max_q": max_q, "time_budget": time_budget,
+               "forecast_steps": forecast_steps}
+    tasks = [(name, values.to_numpy(), options) for name, values in series.items()]
+    # ARIMA 拟合主要是 Python 代码，受 GIL 限制，使用进程而不是线程
+    fits = run_tasks(_search_task, [(task,) for task in tasks], parallel, workers)
+
+    # 频率由原始数据的完整索引推断，不受各列缺失值的影响
+    freq = infer_frequency(df.index)
+    forecasts, errors = {}, {}
+    for fit in fits:
+        if fit.error:
+            errors[fit.name] = fit.error
+        else:
+            index = forecast_index(series[fit.name].index, forecast_steps, freq)
+            forecasts[fit.name] = pd.Series(fit.forecast, index=index)
+    table = pd.DataFrame({
+        "Variable Name": [fit.name for fit in fits],
+        "ARIMA Parameters (p, d, q)": [str(fit.order) if fit.order else "Error" for fit in fits],
+        "AIC Value": [fit.aic for fit in fits],
+        "BIC Value": [fit.bic for fit in fits],
+        "Models Fitted": [fit.models for fit in fits],
+        "Search Seconds": [round(fit.seconds, 2) for fit in fits],
+    })
+    return ArimaResult(table=table, forecasts=forecasts, timed_out=[fit.name for fit in fits if fit.timed_out],
+                       errors=errors, series=series)
@@ -0,0 +1,164 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# 进程池执行任务时检查取消标记的间隔（秒）
+CANCEL_POLL_SECONDS = 0.1
+
+# 当前线程登记的取消标记，见 cancellation
+_cancel_state = threading.local()
+
+
+def to_serializable(value):
+    """
+    将计算结果中的 pandas / numpy 对象转换为可写入 JSON 的基本类型
+    :param value: 任意结果值
+    :return: 由 dict、list、str、数字和 None 组成的对象
+    """
+    if isinstance(value, AnalysisResult):
+        return value.to_dict()
+    if isinstance(value, pd.DataFrame):
+        return {
+            "columns": [str(c) for c in value.columns],
+            "index": [to_serializable(i) for i in value.index],
+            "data": to_serializable(value.to_numpy().tolist()),
+        }
+    if isinstance(value, pd.Series):
+        return {str(k): to_serializable(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return to_serializable(value.tolist())
+    if isinstance(value, dict):
+        return {str(k): to_serializable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_serializable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+@dataclass
+class AnalysisResult:
+    """
+    所有计算结果的基类
+    字段的 metadata 中设置 export=False 时，该字段不会被导出到 JSON（例如原始数据）
+    """
+
+    def to_dict(self):
+        return {f.name: to_serializable(getattr(self, f.name))
+                for f in fields(self) if f.metadata.get("export", True)}
+
+
+def select_numeric(df, error_message="数据中没有数值列，无法进行分析。"):
+    """
+    选取数据中的数值列
+    :param df: 输入数据
+    :param error_message: 没有数值列时的错误信息
+    :return: 只包含数值列的 DataFrame
+    """
+    numerical_df = df.select_dtypes(include=[np.number])
+    if numerical_df.empty:
+        raise ValueError(error_message)
+    return numerical_df
+
+
+def numeric_cells(series):
+    """
+    与逐格读取工作表时的判断一致：只保留数字单元格，文本、日期、空白等记为 NaN
+    :param series: 一列数据
+    :return: 浮点数组
+    """
+    if series.dtype == object:
+        series = series.map(lambda v: v if isinstance(v, (int, float)) else np.nan)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+
+
+def numeric_matrix(df, error_message="数据中没有数值，无法进行分析。"):
+    """
+    不带表头读取的工作表转成浮点矩阵：非数字单元格记为 NaN，整行或整列都不是数字的（例如表头行、名称列）去掉
+    :param df: 输入数据
+    :param error_message: 没有数字单元格时的错误信息
+    :return: 二维浮点数组，其余位置仍可能是 NaN
+    """
+    values = np.column_stack([numeric_cells(df.iloc[:, i]) for i in range(df.shape[1])]) if df.shape[1] else None
+    if values is None or np.isnan(values).all():
+        raise ValueError(error_message)
+    values = values[~np.isnan(values).all(axis=1)]
+    return values[:, ~np.isnan(values).all(axis=0)]
+
+
+class ComputationCancelled(Exception):
+    """
+    计算已被取消，由 check_cancelled 在登记了取消标记的线程中抛出
+    """
+
+
+@contextmanager
+def cancellation(event):
+    """
+    在当前线程中登记取消标记，期间 run_tasks 在任务之间、报告在保存之前检查该标记
+    :param event: threading.Event，被设置时表示已取消
+    """
+    previous = getattr(_cancel_state, "event", None)
+    _cancel_state.event = event
+    try:
+        yield
+    finally:
+        _cancel_state.event = previous
+
+
+def cancel_requested():
+    """
+    :return: 当前线程登记的取消标记是否已被设置；未登记时为 False
+    """
+    event = getattr(_cancel_state, "event", None)
+    return event is not None and event.is_set()
+
+
+def check_cancelled():
+    """
+    已取消时抛出 ComputationCancelled
+    """
+    if cancel_requested():
+        raise ComputationCancelled()
+
+
+def run_tasks(func, tasks, parallel=True, workers=None):
+    """
+    依次或在进程池中执行一组任务
+    :param func: 模块级函数，以 func(*task) 调用
+    :param tasks: 参数元组的列表
+    :param parallel: 是否使用进程池
+    :param workers: 工作进程数，默认取环境变量 DIAS_COMPUTE_WORKERS，未设置时等于 CPU 核数
+    :return: 与 tasks 顺序相同的结果列表
+    """
+    workers = workers or int(os.environ.get("DIAS_COMPUTE_WORKERS", 0)) or os.cpu_count() or 1
+    workers = min(workers, len(tasks)) if parallel else 1
+    if workers <= 1:
+        results = []
+        for task in tasks:
+            check_cancelled()
+            results.append(func(*task))
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *task) for task in tasks]
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            if any(future.exception() is not None for future in done):
+                pool.shutdown(cancel_futures=True)
+                break
+            if cancel_requested():
+                # 撤销尚未开始的任务，并等待正在执行的任务结束，返回时不再有工作进程在运行
+                pool.shutdown(cancel_futures=True)
+                raise ComputationCancelled()
+        return [future.result() for future in futures]
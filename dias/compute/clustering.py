@@ -0,0 +1,506 @@
+"""
+聚类分析
+
+Ward 层次聚类需要 n² 的距离矩阵，样本量较大时改为两阶段：
+先用 MiniBatchKMeans 把样本聚成若干个微簇，再以微簇的样本数为权重、在微簇中心上做 Ward 聚类，
+最后每个样本沿所属微簇得到聚类标签。带权重的 Ward 聚类用最近邻链算法和 Lance-Williams 公式在
+m×m 的矩阵上完成，微簇数为 m 时内存为 O(m²)，与样本量无关。
+
+K-Means 对一组 k 分别聚类（可在多个进程中并行），比较肘部法的组内平方和、抽样计算的轮廓系数和
+Calinski-Harabasz 指数；样本量较大时改用 MiniBatchKMeans。
+
+DBSCAN 在标准化后的数据上用 KD 树（高维时为球树）查询邻居。min_samples 对应的 k 距离曲线只计算一次，
+未指定 eps 时取曲线的拐点；半径邻居图按最大的 eps 缓存，同一数据以更小的 eps 或其他 min_samples
+再次聚类时直接筛选已有的邻居，不再重新查询。核心点的连通分量用稀疏图算法一次求出。
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.cluster import hierarchy
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import calinski_harabasz_score, silhouette_score
+from sklearn.neighbors import NearestNeighbors
+
+from dias.compute.base import AnalysisResult, run_tasks
+
+N_CLUSTERS = 3
+# 自动模式下样本量不超过该值时直接在全部样本上做 Ward 聚类（距离矩阵约 100 MB）
+WARD_EXACT_LIMIT = 5000
+# 两阶段模式的微簇数
+MICRO_CLUSTERS = 2000
+WARD_MODES = ["Auto", "Exact", "Micro-clusters"]
+RANDOM_STATE = 42
+# K-Means 默认比较的 k 范围
+K_MIN, K_MAX = 2, 10
+# 样本量超过该值时使用 MiniBatchKMeans
+MINIBATCH_THRESHOLD = 10_000
+# 轮廓系数需要两两距离，在该数量的随机样本上计算
+SILHOUETTE_SAMPLE = 5000
+# DBSCAN 形成核心点所需的最小样本数（含样本自身）
+DENSITY_MIN_SAMPLES = 5
+# 报告中比较的 eps 倍数
+EPS_FACTORS = [0.75, 1.0, 1.25]
+# 变量数超过该值时 KD 树的剪枝效果变差，改用球树
+KD_TREE_MAX_DIMS = 15
+# 进程内缓存的邻居索引个数
+NEIGHBOR_CACHE_SIZE = 4
+_NEIGHBOR_CACHE = OrderedDict()
+
+
+def clustering_matrix(df):
+    """
+    整理聚类用的数值矩阵
+    数据以 header=None 读取，第一行全为文本时作为变量名；含缺失值或非数值的行不参与聚类
+    :param df: 输入数据
+    :return: (浮点数组, 参与聚类的行在 df 中的位置, 变量名列表)
+    """
+    values = df.apply(pd.to_numeric, errors="coerce")
+    names = [f"Feature {j + 1}" for j in range(df.shape[1])]
+    start = 0
+    if len(df) and values.iloc[0].isna().all() and df.iloc[0].notna().all():
+        names = [str(v) for v in df.iloc[0]]
+        start = 1
+    matrix = values.to_numpy(dtype=float)[start:]
+    keep = ~np.isnan(matrix).any(axis=1)
+    if not keep.any():
+        raise ValueError("数据中没有完整的数值行，无法进行聚类分析。")
+    return matrix[keep], np.flatnonzero(keep) + start, names
+
+
+def micro_clusters(X, n_micro=MICRO_CLUSTERS, random_state=RANDOM_STATE):
+    """
+    用 MiniBatchKMeans 把样本预聚为微簇
+    :param X: (样本数, 变量数) 的数组
+    :param n_micro: 微簇数
+    :param random_state: 随机种子
+    :return: (微簇中心, 微簇样本数, 每个样本所属的微簇编号)；空微簇已去掉，中心为所属样本的精确均值
+    """
+    n_micro = min(n_micro, len(X))
+    # 微簇只是 Ward 聚类的输入，随机初始化一次即可；k-means++ 在数千个中心上的初始化比迭代本身还慢
+    model = MiniBatchKMeans(n_clusters=n_micro, init="random", n_init=1, random_state=random_state).fit(X)
+    labels = model.labels_
+    weights = np.bincount(labels, minlength=n_micro)
+    used = np.flatnonzero(weights)
+    remap = np.full(n_micro, -1)
+    remap[used] = np.arange(len(used))
+    assignment = remap[labels]
+    onehot = sparse.csr_matrix((np.ones(len(X)), (assignment, np.arange(len(X)))), shape=(len(used), len(X)))
+    centroids = (onehot @ X) / weights[used][:, None]
+    return centroids, weights[used], assignment
+
+
+def weighted_ward(centroids, weights):
+    """
+    带权重的 Ward 层次聚类
+    每个点视为已有 weights 个样本的簇，初始距离为两簇合并的 Ward 距离，
+    权重全为 1 时与 scipy.cluster.hierarchy.linkage(method='ward') 相同
+    :param centroids: (m, 变量数) 的簇中心
+    :param weights: 每个簇的样本数
+    :return: (scipy 格式的链接矩阵, 每个节点的样本数)；链接矩阵第四列按 scipy 的约定为叶子数，
+             节点编号 0..m-1 为输入的簇，m + t 为第 t 次合并得到的簇
+    """
+    m = len(centroids)
+    size = np.asarray(weights, dtype=float).copy()
+    sq_norm = (centroids ** 2).sum(axis=1)
+    squared = np.maximum(sq_norm[:, None] + sq_norm[None, :] - 2 * centroids @ centroids.T, 0)
+    # D 保存 Ward 距离的平方：2·ni·nj/(ni+nj)·||ci - cj||²
+    D = 2 * size[:, None] * size[None, :] / (size[:, None] + size[None, :]) * squared
+    np.fill_diagonal(D, np.inf)
+
+    merges = []
+    chain = []
+    active = np.ones(m, dtype=bool)
+    for _ in range(m - 1):
+        if not chain:
+            chain.append(int(np.flatnonzero(active)[0]))
+        # 最近邻链：沿最近邻延伸，直到两个簇互为最近邻
+        while True:
+            x = chain[-1]
+            y = int(np.argmin(D[x]))
+            if len(chain) > 1 and D[x, chain[-2]] <= D[x, y]:
+                y = chain[-2]
+            if len(chain) > 1 and y == chain[-2]:
+                break
+            chain.append(y)
+        y, x = chain.pop(), chain.pop()
+        height = D[x, y]
+        nx, ny = size[x], size[y]
+        # Lance-Williams 公式，合并后的簇保存在 y 的位置
+        updated = ((nx + size) * D[x] + (ny + size) * D[y] - size * height) / (nx + ny + size)
+        D[y, :] = updated
+        D[:, y] = updated
+        D[x, :] = np.inf
+        D[:, x] = np.inf
+        D[y, y] = np.inf
+        active[x] = False
+        size[y] = nx + ny
+        merges.append((x, y, np.sqrt(height), nx + ny))
+
+    # 按合并高度排序，并用并查集把位置编号换成 scipy 的簇编号
+    merges.sort(key=lambda r: r[2])
+    parent = np.arange(2 * m - 1)
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    Z = np.empty((m - 1, 4))
+    leaves = np.ones(2 * m - 1)
+    node_sizes = np.concatenate([np.asarray(weights, dtype=float), np.zeros(m - 1)])
+    for t, (x, y, height, count) in enumerate(merges):
+        a, b = sorted((find(x), find(y)))
+        parent[a] = parent[b] = m + t
+        leaves[m + t] = leaves[a] + leaves[b]
+        node_sizes[m + t] = count
+        Z[t] = (a, b, height, leaves[m + t])
+    return Z, node_sizes
+
+
+@dataclass
+class HierarchicalResult(AnalysisResult):
+    # 每个参与聚类的样本（Excel 中的行号，从 1 开始）所属的类
+    assignments: pd.DataFrame
+    # 各类的样本数、占比和各变量均值
+    summary: pd.DataFrame
+    # 实际使用的方式："Exact" 或 "Micro-clusters"
+    mode: str
+    # 链接矩阵的叶子数：精确模式为样本数，两阶段模式为微簇数
+    leaves: int
+    # 链接矩阵和每个节点的样本数，用于绘制树状图
+    linkage: np.ndarray = field(default=None, metadata={"export": False})
+    node_sizes: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def cluster_summary(X, labels, names):
+    """
+    各类的样本数、占比和各变量均值
+    """
+    frame = pd.DataFrame(X, columns=names)
+    frame.insert(0, "Cluster", labels)
+    grouped = frame.groupby("Cluster")
+    summary = grouped.mean()
+    summary.insert(0, "Size", grouped.size())
+    summary.insert(1, "Percent", summary["Size"] / len(X) * 100)
+    return summary.reset_index()
+
+
+def hierarchical_clustering(df, n_clusters=N_CLUSTERS, mode="Auto", n_micro=MICRO_CLUSTERS,
+                            random_state=RANDOM_STATE):
+    """
+    Ward 层次聚类
+    :param df: 以 header=None 读取的数据，每行为一个样本
+    :param n_clusters: 聚类的数量
+    :param mode: WARD_MODES 之一；Auto 在样本量超过 WARD_EXACT_LIMIT 时使用两阶段模式
+    :param n_micro: 两阶段模式的微簇数
+    :param random_state: MiniBatchKMeans 的随机种子
+    :return: HierarchicalResult
+    """
+    if mode not in WARD_MODES:
+        raise ValueError(f"未知的聚类方式: {mode}")
+    X, rows, names = clustering_matrix(df)
+    if mode == "Auto":
+        mode = "Exact" if len(X) <= WARD_EXACT_LIMIT else "Micro-clusters"
+    if len(X) < 2:
+        raise ValueError("至少需要两个样本才能进行聚类分析。")
+
+    if mode == "Exact":
+        Z = hierarchy.linkage(X, method='ward')
+        node_sizes = np.concatenate([np.ones(len(X)), Z[:, 3]])
+        labels = hierarchy.fcluster(Z, n_clusters, criterion='maxclust')
+    else:
+        centroids, weights, assignment = micro_clusters(X, n_micro, random_state)
+        Z, node_sizes = weighted_ward(centroids, weights)
+        labels = hierarchy.fcluster(Z, n_clusters, criterion='maxclust')[assignment]
+
+    assignments = pd.DataFrame({"Row": rows + 1, "Cluster": labels})
+    return HierarchicalResult(assignments=assignments, summary=cluster_summary(X, labels, names), mode=mode,
+                              leaves=len(Z) + 1, linkage=Z, node_sizes=node_sizes)
+
+
+def _kmeans_task(X, k, minibatch, random_state):
+    """
+    对一个 k 聚类并计算评价指标
+    :return: (标签, 聚类中心, 组内平方和, 轮廓系数, Calinski-Harabasz 指数)
+    """
+    if minibatch:
+        model = MiniBatchKMeans(n_clusters=k, n_init=3, random_state=random_state)
+    else:
+        model = KMeans(n_clusters=k, n_init=10, random_state=random_state)
+    labels = model.fit_predict(X)
+    if len(np.unique(labels)) < 2:
+        return labels, model.cluster_centers_, model.inertia_, np.nan, np.nan
+    sample_size = SILHOUETTE_SAMPLE if len(X) > SILHOUETTE_SAMPLE else None
+    silhouette = silhouette_score(X, labels, sample_size=sample_size, random_state=random_state)
+    # MiniBatchKMeans 拟合结束后对全部样本重新分配并计算 inertia_，与 KMeans 可比
+    return labels, model.cluster_centers_, model.inertia_, silhouette, calinski_harabasz_score(X, labels)
+
+
+@dataclass
+class KMeansResult(AnalysisResult):
+    # 每个 k 的组内平方和（肘部法）、轮廓系数和 Calinski-Harabasz 指数
+    comparison: pd.DataFrame
+    # 采用的 k：指定时为指定值，否则为轮廓系数最大的 k
+    k: int
+    # "Specified" 或 "Silhouette"
+    selected_by: str
+    # "KMeans" 或 "MiniBatchKMeans"
+    algorithm: str
+    # 采用的 k 下各类的中心
+    centers: pd.DataFrame
+    # 各类的样本数、占比和各变量均值
+    summary: pd.DataFrame
+    # 每个参与聚类的样本（Excel 中的行号，从 1 开始）所属的类
+    assignments: pd.DataFrame
+    # 绘图用的数据，样本较多时为随机抽取的 SILHOUETTE_SAMPLE 行
+    plot_data: np.ndarray = field(default=None, metadata={"export": False})
+    plot_labels: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def kmeans_sweep(df, k_min=K_MIN, k_max=K_MAX, k=None, parallel=True, workers=None, random_state=RANDOM_STATE):
+    """
+    在一组 k 上进行 K-Means 聚类并比较
+    :param df: 以 header=None 读取的数据，每行为一个样本
+    :param k_min: 比较的最小 k
+    :param k_max: 比较的最大 k
+    :param k: 采用的 k，None 时取轮廓系数最大的 k；不在比较范围内时也一并计算
+    :param parallel: 是否在进程池中并行计算各个 k
+    :param workers: 工作进程数，默认取环境变量 DIAS_COMPUTE_WORKERS，未设置时等于 CPU 核数
+    :param random_state: 随机种子
+    :return: KMeansResult
+    """
+    X, rows, names = clustering_matrix(df)
+    k_values = sorted(set(range(max(k_min, 1), min(k_max, len(X)) + 1)) | ({k} if k else set()))
+    if not k_values or (k and not 1 <= k <= len(X)):
+        raise ValueError(f"k 须在 1 到样本量 {len(X)} 之间。")
+    minibatch = len(X) > MINIBATCH_THRESHOLD
+    outcomes = run_tasks(_kmeans_task, [(X, kk, minibatch, random_state) for kk in k_values], parallel, workers)
+
+    comparison = pd.DataFrame({
+        "k": k_values,
+        "Inertia": [o[2] for o in outcomes],
+        "Silhouette": [o[3] for o in outcomes],
+        "Calinski-Harabasz": [o[4] for o in outcomes],
+    })
+    selected_by = "Specified" if k else "Silhouette"
+    if k is None:
+        scores = comparison["Silhouette"]
+        k = int(comparison["k"][scores.idxmax()]) if scores.notna().any() else k_values[0]
+    labels, centers = outcomes[k_values.index(k)][:2]
+    labels = labels + 1
+
+    rng = np.random.default_rng(random_state)
+    shown = np.sort(rng.choice(len(X), SILHOUETTE_SAMPLE, replace=False)) if len(X) > SILHOUETTE_SAMPLE \
+        else np.arange(len(X))
+    return KMeansResult(comparison=comparison, k=k, selected_by=selected_by, algorithm="MiniBatchKMeans" if minibatch else "KMeans",
+                        centers=pd.DataFrame(centers, columns=names, index=pd.RangeIndex(1, k + 1, name="Cluster")),
+                        summary=cluster_summary(X, labels, names),
+                        assignments=pd.DataFrame({"Row": rows + 1, "Cluster": labels}),
+                        plot_data=X[shown], plot_labels=labels[shown])
+
+
+class NeighborIndex:
+    """
+    标准化后的样本及其空间索引，缓存 k 近邻距离和半径邻居图
+    """
+
+    def __init__(self, X, scale=True):
+        """
+        :param X: (样本数, 变量数) 的数组
+        :param scale: 是否把每个变量标准化为均值 0、标准差 1（标准差为 0 的变量只去均值）
+        """
+        if scale:
+            std = X.std(axis=0)
+            X = (X - X.mean(axis=0)) / np.where(std > 0, std, 1)
+        self.X = X
+        algorithm = "kd_tree" if X.shape[1] <= KD_TREE_MAX_DIMS else "ball_tree"
+        self.tree = NearestNeighbors(algorithm=algorithm).fit(X)
+        self._distances = np.empty((len(X), 0))
+        self._graph = None
+        self._graph_eps = -np.inf
+
+    def k_distances(self, k):
+        """
+        每个样本到第 k 个近邻的距离，样本自身算作第 1 个，与 DBSCAN 的 min_samples 一致
+        已查询过更大的 k 时直接取已有结果
+        """
+        k = min(k, len(self.X))
+        if self._distances.shape[1] < k:
+            self._distances, _ = self.tree.kneighbors(self.X, n_neighbors=k)
+        return self._distances[:, k - 1]
+
+    def radius_graph(self, eps):
+        """
+        半径邻居图：每行为一个样本距离不超过半径的邻居（含自身），列按编号排列
+        已查询过更大的半径时直接返回已有的图，调用方按 eps 筛选
+        :return: (稀疏距离矩阵, 图的半径)
+        """
+        if eps > self._graph_eps:
+            self._graph = self.tree.radius_neighbors_graph(self.X, radius=eps, mode="distance")
+            self._graph.sort_indices()
+            self._graph_eps = eps
+        return self._graph, self._graph_eps
+
+
+def neighbor_index(X, scale=True):
+    """
+    取得 X 的邻居索引，同一进程中内容相同的数据复用已建立的索引
+    :param X: (样本数, 变量数) 的数组
+    :param scale: 是否标准化
+    :return: NeighborIndex
+    """
+    key = (hashlib.sha1(np.ascontiguousarray(X).tobytes()).hexdigest(), X.shape, scale)
+    if key in _NEIGHBOR_CACHE:
+        _NEIGHBOR_CACHE.move_to_end(key)
+        return _NEIGHBOR_CACHE[key]
+    index = NeighborIndex(X, scale)
+    _NEIGHBOR_CACHE[key] = index
+    while len(_NEIGHBOR_CACHE) > NEIGHBOR_CACHE_SIZE:
+        _NEIGHBOR_CACHE.popitem(last=False)
+    return index
+
+
+def knee_point(curve):
+    """
+    递增曲线的拐点：归一化后离首尾两点连线最远的点（Kneedle 法）
+    :param curve: 从小到大排列的数组
+    :return: 拐点的下标
+    """
+    span = curve[-1] - curve[0]
+    if len(curve) < 3 or span <= 0:
+        return len(curve) - 1
+    x = np.linspace(0, 1, len(curve))
+    return int(np.argmax(x - (curve - curve[0]) / span))
+
+
+def dbscan_labels(index, eps, min_samples):
+    """
+    在邻居图上完成 DBSCAN：邻居数（含自身）不少于 min_samples 的为核心点，
+    相邻核心点的连通分量为一类，非核心点归入最近的核心邻居所在的类，其余为噪声
+    :param index: NeighborIndex
+    :param eps: 邻域半径
+    :param min_samples: 形成核心点所需的最小样本数
+    :return: 聚类标签，噪声为 -1，各类按其第一个样本的位置从 1 开始编号
+    """
+    n = len(index.X)
+    graph, _ = index.radius_graph(eps)
+    within = graph.data <= eps
+    counts = np.add.reduceat(within, graph.indptr[:-1]) if graph.nnz else np.zeros(n, dtype=int)
+    # 邻居图中每个样本至少包含自身，reduceat 不会遇到空行
+    core = counts >= min_samples
+    rows = np.repeat(np.arange(n), np.diff(graph.indptr))
+    linked = within & core[rows] & core[graph.indices]
+
+    # 核心点之间的邻接矩阵是对称的，强连通分量即连通分量；各行的列编号有序，免去 scipy 的排序和转置
+    indptr = np.concatenate([[0], np.cumsum(np.add.reduceat(linked, graph.indptr[:-1]))])
+    adjacency = sparse.csr_matrix((np.ones(indptr[-1]), graph.indices[linked], indptr), shape=(n, n))
+    adjacency.has_canonical_format = True
+    _, components = csgraph.connected_components(adjacency, directed=True, connection="strong")
+
+    labels = np.full(n, -1)
+    core_rows = np.flatnonzero(core)
+    _, first, inverse = np.unique(components[core_rows], return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=int)
+    rank[np.argsort(first)] = np.arange(len(first))
+    labels[core_rows] = rank[inverse] + 1
+    # 非核心点归入距离最近的核心邻居所在的类
+    border = within & ~core[rows] & core[graph.indices]
+    border_rows, border_cols = rows[border], graph.indices[border]
+    order = np.lexsort((graph.data[border], border_rows))
+    border_rows, position = np.unique(border_rows[order], return_index=True)
+    labels[border_rows] = labels[border_cols[order][position]]
+    return labels
+
+
+def _clustered_silhouette(X, labels, random_state):
+    # 只在非噪声样本上计算，样本较多时抽样
+    clustered = labels > 0
+    if len(np.unique(labels[clustered])) < 2:
+        return np.nan
+    n = int(clustered.sum())
+    sample_size = SILHOUETTE_SAMPLE if n > SILHOUETTE_SAMPLE else None
+    return silhouette_score(X[clustered], labels[clustered], sample_size=sample_size, random_state=random_state)
+
+
+@dataclass
+class DensityResult(AnalysisResult):
+    # 采用的 eps 以及 "Auto"（k 距离曲线的拐点）或 "Specified"
+    eps: float
+    eps_mode: str
+    min_samples: int
+    scaled: bool
+    n_clusters: int
+    noise: int
+    silhouette: float
+    # 采用的 min_samples 下不同 eps 的聚类数、噪声点数和轮廓系数
+    comparison: pd.DataFrame
+    # 各类的样本数、占比和各变量均值，噪声为 -1
+    summary: pd.DataFrame
+    # 每个参与聚类的样本（Excel 中的行号，从 1 开始）所属的类
+    assignments: pd.DataFrame
+    # 从小到大排列的 k 距离，以及绘图用的数据（样本较多时为随机抽取的 SILHOUETTE_SAMPLE 行）
+    k_distance: np.ndarray = field(default=None, metadata={"export": False})
+    plot_data: np.ndarray = field(default=None, metadata={"export": False})
+    plot_labels: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def density_clustering(df, eps=None, min_samples=DENSITY_MIN_SAMPLES, scale=True, random_state=RANDOM_STATE):
+    """
+    DBSCAN 密度聚类
+    :param df: 以 header=None 读取的数据，每行为一个样本
+    :param eps: 邻域半径（标准化后的距离），None 时取 k 距离曲线的拐点
+    :param min_samples: 形成核心点所需的最小样本数（含样本自身）
+    :param scale: 是否先把每个变量标准化
+    :param random_state: 轮廓系数抽样和绘图抽样的随机种子
+    :return: DensityResult
+    """
+    X, rows, names = clustering_matrix(df)
+    if min_samples < 1:
+        raise ValueError("min_samples 须为正整数。")
+    if eps is not None and eps <= 0:
+        raise ValueError("eps 须大于 0。")
+    index = neighbor_index(X, scale)
+    k_distance = np.sort(index.k_distances(min_samples))
+    eps_mode = "Specified" if eps is not None else "Auto"
+    if eps is None:
+        eps = float(k_distance[knee_point(k_distance)])
+        if eps <= 0:
+            # 重复样本较多时拐点处的距离可能为 0，取最小的正距离
+            positive = k_distance[k_distance > 0]
+            eps = float(positive[0]) if len(positive) else 1.0
+
+    # 先对最大的 eps 查询一次邻居，较小的 eps 都从这张邻居图中筛选
+    index.radius_graph(max(EPS_FACTORS) * eps)
+    records = []
+    labels = None
+    for factor in EPS_FACTORS:
+        trial = dbscan_labels(index, factor * eps, min_samples)
+        if factor == 1.0:
+            labels = trial
+        records.append({
+            "eps": factor * eps,
+            "Clusters": int(trial.max(initial=0)),
+            "Noise": int((trial < 0).sum()),
+            "Noise (%)": (trial < 0).mean() * 100,
+            "Silhouette": _clustered_silhouette(index.X, trial, random_state),
+        })
+    comparison = pd.DataFrame(records)
+    current = comparison[np.isclose(comparison["eps"], eps)].iloc[0]
+
+    rng = np.random.default_rng(random_state)
+    shown = np.sort(rng.choice(len(X), SILHOUETTE_SAMPLE, replace=False)) if len(X) > SILHOUETTE_SAMPLE \
+        else np.arange(len(X))
+    return DensityResult(eps=eps, eps_mode=eps_mode, min_samples=min_samples, scaled=scale,
+                         n_clusters=int(current["Clusters"]), noise=int(current["Noise"]),
+                         silhouette=float(current["Silhouette"]), comparison=comparison,
+                         summary=cluster_summary(X, labels, names),
+                         assignments=pd.DataFrame({"Row": rows + 1, "Cluster": labels}),
+                         k_distance=k_distance, plot_data=X[shown], plot_labels=labels[shown])
@@ -0,0 +1,134 @@
+"""
+共线性诊断：方差膨胀因子（VIF）与条件指数
+
+自变量的相关矩阵 R 的逆矩阵的对角线元素即各变量的 VIF（等价于每个变量对其余变量做辅助回归的 1 / (1 - R²)），
+对 R 做一次特征分解即可得到全部 VIF，不再逐个变量拟合辅助回归：
+- R⁻¹ = V Λ⁻¹ V'，特征值接近 0 时改用伪逆，落在零空间上的变量（参与精确线性相关）的 VIF 记为无穷大
+- 条件指数 sqrt(λmax / λ) 来自同一组特征值
+- 逐步剔除时每次删去 VIF 最大的变量，删除第 j 个变量后的逆矩阵由秩一修正
+  S₋ⱼ₋ⱼ - S₋ⱼⱼ Sⱼ₋ⱼ / Sⱼⱼ 得到，不再重新求逆
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+# VIF 的解读界限
+VIF_MODERATE = 5
+VIF_THRESHOLD = 10
+# 条件指数超过该值时认为存在严重的共线性
+CONDITION_INDEX_LIMIT = 30
+# 零空间特征向量上的载荷平方超过该值的变量视为参与精确线性相关
+ALIAS_TOLERANCE = 1e-6
+
+
+def correlation_inverse(R):
+    """
+    相关矩阵的逆矩阵，奇异时取伪逆
+    :param R: 相关矩阵
+    :return: (逆矩阵或伪逆, 从小到大排列的特征值, 参与精确线性相关的变量的掩码)
+    """
+    eigenvalues, vectors = np.linalg.eigh(R)
+    # 与 numpy.linalg.matrix_rank 相同的数值零判断
+    null = eigenvalues <= len(R) * np.finfo(float).eps * max(eigenvalues[-1], 1.0)
+    inverse = (vectors[:, ~null] / eigenvalues[~null]) @ vectors[:, ~null].T
+    aliased = (vectors[:, null] ** 2).sum(axis=1) > ALIAS_TOLERANCE
+    return inverse, eigenvalues, aliased
+
+
+def vif_from_inverse(inverse, aliased):
+    """
+    逆相关矩阵的对角线即 VIF，参与精确线性相关的变量记为无穷大
+    """
+    return np.where(aliased, np.inf, np.diag(inverse))
+
+
+def vif_elimination(R, threshold=VIF_THRESHOLD):
+    """
+    逐步删去 VIF 最大的变量，直到所有 VIF 小于阈值
+    :param R: 相关矩阵
+    :param threshold: VIF 阈值
+    :return: (保留的变量下标, [(删除的变量下标, 删除时的 VIF), ...], 保留变量的 VIF)
+    """
+    active = np.arange(len(R))
+    inverse, _, aliased = correlation_inverse(R)
+    removed = []
+    while True:
+        vif = vif_from_inverse(inverse, aliased)
+        worst = int(np.argmax(vif))
+        if len(active) <= 1 or vif[worst] < threshold:
+            return active, removed, vif
+        removed.append((int(active[worst]), float(vif[worst])))
+        rest = np.delete(np.arange(len(active)), worst)
+        active = active[rest]
+        if aliased.any():
+            # 伪逆不满足秩一修正公式，奇异时删除后重新分解
+            inverse, _, aliased = correlation_inverse(R[np.ix_(active, active)])
+        else:
+            column = inverse[rest, worst]
+            inverse = inverse[np.ix_(rest, rest)] - np.outer(column, column) / inverse[worst, worst]
+            aliased = aliased[rest]
+
+
+@dataclass
+class CollinearityResult(AnalysisResult):
+    # 每个自变量的 VIF 和容忍度 1 / VIF
+    vif: pd.DataFrame
+    # 相关矩阵的特征值和条件指数，从大到小排列
+    condition: pd.DataFrame
+    # 最大的条件指数
+    condition_number: float
+    # 相关矩阵是否奇异（改用伪逆）
+    singular: bool
+    # 方差为 0、未参与计算的变量
+    constant: list
+    # 逐步剔除时的阈值、删除的变量和删除时的 VIF、剔除后保留变量的 VIF；未剔除时为 None
+    threshold: float = None
+    eliminated: pd.DataFrame = None
+    retained: pd.DataFrame = None
+
+
+def collinearity_analysis(df, threshold=None):
+    """
+    共线性诊断
+    :param df: 最后一列为因变量，其余列为自变量；只使用数字单元格，含缺失值的行不参与计算
+    :param threshold: VIF 阈值；指定时逐步删去 VIF 最大的变量，直到所有 VIF 小于该值
+    :return: CollinearityResult
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列自变量和一列因变量。")
+    predictors = df.iloc[:, :-1]
+    values = np.column_stack([numeric_cells(predictors.iloc[:, j]) for j in range(predictors.shape[1])])
+    values = values[~np.isnan(values).any(axis=1)]
+    if len(values) < 3:
+        raise ValueError("完整的数值行少于 3 行，无法计算方差膨胀因子。")
+    std = values.std(axis=0)
+    names = [str(c) for c in predictors.columns]
+    constant = [name for name, s in zip(names, std) if s == 0]
+    names = [name for name, s in zip(names, std) if s > 0]
+    if len(names) < 2:
+        raise ValueError("至少需要两个方差不为 0 的自变量才能计算方差膨胀因子。")
+    Z = (values[:, std > 0] - values[:, std > 0].mean(axis=0)) / std[std > 0]
+    R = Z.T @ Z / len(Z)
+
+    inverse, eigenvalues, aliased = correlation_inverse(R)
+    vif = vif_from_inverse(inverse, aliased)
+    eigenvalues = eigenvalues[::-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        condition_index = np.sqrt(eigenvalues[0] / np.clip(eigenvalues, 0, None))
+    result = CollinearityResult(
+        vif=pd.DataFrame({"Variable Name": names, "Variance Inflation Factor (VIF)": vif, "Tolerance": 1 / vif}),
+        condition=pd.DataFrame({"Dimension": np.arange(1, len(names) + 1), "Eigenvalue": eigenvalues,
+                                "Condition Index": condition_index}),
+        condition_number=float(condition_index[-1]), singular=bool(aliased.any()), constant=constant)
+    if threshold is not None:
+        active, removed, retained_vif = vif_elimination(R, threshold)
+        result.threshold = threshold
+        result.eliminated = pd.DataFrame({"Step": np.arange(1, len(removed) + 1),
+                                          "Variable Name": [names[j] for j, _ in removed],
+                                          "Variance Inflation Factor (VIF)": [v for _, v in removed]})
+        result.retained = pd.DataFrame({"Variable Name": [names[j] for j in active],
+                                        "Variance Inflation Factor (VIF)": retained_vif})
+    return result
@@ -0,0 +1,462 @@
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dias.compute.base import AnalysisResult, select_numeric
+from dias.compute.collinearity import correlation_inverse
+
+CORRELATION_METHODS = ("pearson", "spearman", "kendall")
+
+# 每次计算的列块大小，限制 p×p 中间矩阵占用的内存
+DEFAULT_CHUNK_SIZE = 512
+# 取值个数不超过该值的列（如李克特量表）使用列联表计算秩相关
+KENDALL_MAX_LEVELS = 16
+# 列联表 (列块 × 列块 × 取值 × 取值) 数组的元素上限
+KENDALL_BLOCK_ELEMENTS = 4_000_000
+# 构造示性矩阵时每次处理的行数
+ROW_CHUNK_SIZE = 8192
+
+
+@dataclass
+class CorrelationResult(AnalysisResult):
+    method: str
+    corr: pd.DataFrame
+    pvalues: pd.DataFrame
+    nobs: pd.DataFrame
+    data: pd.DataFrame = field(repr=False, metadata={"export": False})
+
+    def pairs(self):
+        """
+        列出所有不同变量对的相关系数和 p 值
+        :return: [(变量1, 变量2, 相关系数, p值), ...]
+        """
+        return [(col1, col2, self.corr.loc[col1, col2], self.pvalues.loc[col1, col2])
+                for col1 in self.corr.columns for col2 in self.corr.columns if col1 != col2]
+
+
+def _column_blocks(p, chunk_size):
+    """
+    将 p 列划分为若干列块，只返回上三角（含对角）的列块组合
+    """
+    starts = list(range(0, p, chunk_size))
+    for i, a in enumerate(starts):
+        for b in starts[i:]:
+            yield slice(a, min(a + chunk_size, p)), slice(b, min(b + chunk_size, p))
+
+
+def _complete_corr(a, b):
+    """
+    无缺失值时两组列之间的 Pearson 相关系数矩阵
+    """
+    a = a - a.mean(axis=0)
+    b = b - b.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = a / np.sqrt((a ** 2).sum(axis=0))
+        b = b / np.sqrt((b ** 2).sum(axis=0))
+    return a.T @ b
+
+
+def _pairwise_corr(xa, ma, xb, mb):
+    """
+    按成对删除计算两组列之间的 Pearson 相关系数
+    :param xa, xb: 已中心化、缺失值置 0 的数据
+    :param ma, mb: 非缺失示性矩阵（浮点）
+    :return: 相关系数矩阵, 成对样本量矩阵
+    """
+    n = ma.T @ mb
+    sum_a = xa.T @ mb
+    sum_b = ma.T @ xb
+    ss_a = (xa ** 2).T @ mb
+    ss_b = ma.T @ (xb ** 2)
+    cross = xa.T @ xb
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = cross - sum_a * sum_b / n
+        var_a = ss_a - sum_a ** 2 / n
+        var_b = ss_b - sum_b ** 2 / n
+        r = cov / np.sqrt(var_a * var_b)
+    return r, n
+
+
+def _pearson_matrix(values, chunk_size):
+    p = values.shape[1]
+    mask = ~np.isnan(values)
+    r = np.empty((p, p))
+    n = np.empty((p, p))
+    if mask.all():
+        # 无缺失值：一次矩阵乘法得到全部相关系数
+        for rows, cols in _column_blocks(p, chunk_size):
+            r[rows, cols] = _complete_corr(values[:, rows], values[:, cols])
+            r[cols, rows] = r[rows, cols].T
+        n[:] = values.shape[0]
+        return r, n
+
+    # 先按列均值中心化，降低矩量公式的舍入误差
+    centered = np.where(mask, values - np.nanmean(values, axis=0), 0.0)
+    weights = mask.astype(float)
+    for rows, cols in _column_blocks(p, chunk_size):
+        r[rows, cols], n[rows, cols] = _pairwise_corr(centered[:, rows], weights[:, rows],
+                                                      centered[:, cols], weights[:, cols])
+        r[cols, rows] = r[rows, cols].T
+        n[cols, rows] = n[rows, cols].T
+    return r, n
+
+
+def _spearman_from_tables(tables):
+    """
+    由列联表计算 Spearman 系数：每个取值的秩次为该列在成对样本中的平均秩
+    :return: 相关系数, 样本量
+    """
+    row_counts = tables.sum(axis=-1)
+    col_counts = tables.sum(axis=-2)
+    n = row_counts.sum(axis=-1)
+    centre = ((n + 1) / 2)[..., None]
+    dx = row_counts.cumsum(axis=-1) - (row_counts - 1) / 2 - centre
+    dy = col_counts.cumsum(axis=-1) - (col_counts - 1) / 2 - centre
+    cov = np.einsum('...ab,...a,...b->...', tables, dx, dy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = cov / np.sqrt((row_counts * dx ** 2).sum(axis=-1) * (col_counts * dy ** 2).sum(axis=-1))
+    return r, n
+
+
+def _spearman_matrix(values, chunk_size):
+    p = values.shape[1]
+    mask = ~np.isnan(values)
+    if mask.all():
+        # 无缺失值时 Spearman 系数就是秩次的 Pearson 系数，每列只需排序一次
+        return _pearson_matrix(stats.rankdata(values, axis=0), chunk_size)
+
+    # 成对删除时秩次取决于两列共同的非缺失行
+    r = np.empty((p, p))
+    n = mask.T.astype(float) @ mask.astype(float)
+    codes, levels = _dense_codes(values)
+    ordinal = _ordinal_columns(levels)
+    for ia, ib, tables in _ordinal_tables(codes, levels, ordinal, chunk_size):
+        r[np.ix_(ia, ib)], _ = _spearman_from_tables(tables)
+        r[np.ix_(ib, ia)] = r[np.ix_(ia, ib)].T
+
+    # 其余列对按缺失模式相同的列分组，在两组共同的非缺失行上排序
+    others = np.setdiff1d(np.arange(p), ordinal)
+    if len(others):
+        groups_a = _mask_groups(mask, others)
+        groups_b = _mask_groups(mask, np.arange(p))
+        for pattern_a, cols_a in groups_a:
+            ranks_cache = {}
+            for pattern_b, cols_b in groups_b:
+                rows = pattern_a & pattern_b
+                key = rows.tobytes()
+                if key not in ranks_cache:
+                    ranks_cache[key] = stats.rankdata(values[np.ix_(rows, cols_a)], axis=0)
+                ranks_b = stats.rankdata(values[np.ix_(rows, cols_b)], axis=0)
+                block = _complete_corr(ranks_cache[key], ranks_b)
+                r[np.ix_(cols_a, cols_b)] = block
+                r[np.ix_(cols_b, cols_a)] = block.T
+    return r, n
+
+
+def _mask_groups(mask, columns):
+    """
+    将缺失模式相同的列分为一组
+    :return: [(非缺失行示性向量, 列序号数组), ...]
+    """
+    patterns, group_of = np.unique(mask[:, columns].T, axis=0, return_inverse=True)
+    group_of = group_of.ravel()
+    return [(patterns[g], columns[group_of == g]) for g in range(len(patterns))]
+
+
+def _dense_codes(values):
+    """
+    将每列转换为按取值排序的整数编码，缺失值为 -1
+    :return: 编码矩阵, 每列的取值个数
+    """
+    codes = np.full(values.shape, -1, dtype=np.int64)
+    levels = np.zeros(values.shape[1], dtype=np.int64)
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        present = ~np.isnan(column)
+        uniques, inverse = np.unique(column[present], return_inverse=True)
+        codes[present, j] = inverse
+        levels[j] = len(uniques)
+    return codes, levels
+
+
+def _contingency_tables(codes_a, codes_b, k):
+    """
+    计算两组列之间所有列对的 k×k 列联表
+    :return: 形状为 (列数a, 列数b, k, k) 的计数数组
+    """
+    pa, pb = codes_a.shape[1], codes_b.shape[1]
+    counts = np.zeros((pa * k, pb * k))
+    for start in range(0, codes_a.shape[0], ROW_CHUNK_SIZE):
+        block_a = codes_a[start:start + ROW_CHUNK_SIZE]
+        block_b = codes_b[start:start + ROW_CHUNK_SIZE]
+        counts += _one_hot(block_a, k).T @ _one_hot(block_b, k)
+    return counts.reshape(pa, k, pb, k).transpose(0, 2, 1, 3)
+
+
+def _one_hot(codes, k):
+    rows, cols = np.nonzero(codes >= 0)
+    indicator = np.zeros((codes.shape[0], codes.shape[1] * k))
+    indicator[rows, cols * k + codes[rows, cols]] = 1.0
+    return indicator
+
+
+def _ordinal_columns(levels):
+    """
+    取值个数不超过 KENDALL_MAX_LEVELS 的列，这些列可以用列联表批量计算秩相关
+    """
+    return np.flatnonzero((levels >= 1) & (levels <= KENDALL_MAX_LEVELS))
+
+
+def _ordinal_tables(codes, levels, ordinal, chunk_size):
+    """
+    按列块计算取值较少的列之间的列联表
+    :return: 逐块产生 (列序号a, 列序号b, 列联表)
+    """
+    if not len(ordinal):
+        return
+    k = int(levels[ordinal].max())
+    block = max(1, min(chunk_size, int(np.sqrt(KENDALL_BLOCK_ELEMENTS / (k * k)))))
+    for rows, cols in _column_blocks(len(ordinal), block):
+        ia, ib = ordinal[rows], ordinal[cols]
+        yield ia, ib, _contingency_tables(codes[:, ia], codes[:, ib], k)
+
+
+def _tie_statistics(counts):
+    # 与 scipy.stats.kendalltau 相同的结统计量
+    return ((counts * (counts - 1) / 2).sum(axis=-1),
+            (counts * (counts - 1) * (counts - 2)).sum(axis=-1),
+            (counts * (counts - 1) * (2 * counts + 5)).sum(axis=-1))
+
+
+def _kendall_from_tables(tables):
+    """
+    由列联表计算 Kendall tau-b 及其渐近 p 值（与 scipy.stats.kendalltau 的 asymptotic 方法一致）
+    :return: tau, p值, 样本量, 是否两列都无结
+    """
+    k = tables.shape[-1]
+    # suffix[..., a, b] = 行 >= a 且列 >= b 的计数和
+    suffix = tables[..., ::-1, ::-1].cumsum(axis=-2).cumsum(axis=-1)[..., ::-1, ::-1]
+    # lower_left[..., a, b] = 行 >= a 且列 <= b 的计数和
+    lower_left = tables[..., ::-1, :].cumsum(axis=-2)[..., ::-1, :].cumsum(axis=-1)
+    padded_suffix = np.zeros(tables.shape[:-2] + (k + 1, k + 1))
+    padded_suffix[..., :k, :k] = suffix
+    padded_lower = np.zeros(tables.shape[:-2] + (k + 1, k + 1))
+    padded_lower[..., :k, 1:] = lower_left
+    concordant = (tables * padded_suffix[..., 1:, 1:]).sum(axis=(-2, -1))
+    discordant = (tables * padded_lower[..., 1:, :k]).sum(axis=(-2, -1))
+
+    n = tables.sum(axis=(-2, -1))
+    x_tie, x0, x1 = _tie_statistics(tables.sum(axis=-1))
+    y_tie, y0, y1 = _tie_statistics(tables.sum(axis=-2))
+    total = n * (n - 1) / 2
+    s = concordant - discordant
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = np.clip(s / np.sqrt(total - x_tie) / np.sqrt(total - y_tie), -1.0, 1.0)
+        m = n * (n - 1.0)
+        var = ((m * (2 * n + 5) - x1 - y1) / 18 + (2 * x_tie * y_tie) / m + x0 * y0 / (9 * m * (n - 2)))
+        pvalue = 2 * stats.norm.sf(np.abs(s / np.sqrt(var)))
+    degenerate = (x_tie == total) | (y_tie == total) | (n < 2)
+    tau[degenerate] = np.nan
+    pvalue[degenerate] = np.nan
+    return tau, pvalue, n, (x_tie == 0) & (y_tie == 0)
+
+
+def _kendall_pair(x, y):
+    present = ~(np.isnan(x) | np.isnan(y))
+    if present.sum() < 2:
+        return np.nan, np.nan, present.sum()
+    # scipy 的实现基于归并排序，复杂度为 O(n log n)
+    tau, pvalue = stats.kendalltau(x[present], y[present])
+    return tau, pvalue, present.sum()
+
+
+def _kendall_matrix(values, chunk_size):
+    p = values.shape[1]
+    r = np.full((p, p), np.nan)
+    pvalues = np.full((p, p), np.nan)
+    n = np.zeros((p, p))
+    codes, levels = _dense_codes(values)
+
+    # 取值较少的列用列联表批量计算，其余列对逐对计算
+    ordinal = _ordinal_columns(levels)
+    exact_pairs = []
+    for ia, ib, tables in _ordinal_tables(codes, levels, ordinal, chunk_size):
+        tau, pv, nobs, no_ties = _kendall_from_tables(tables)
+        r[np.ix_(ia, ib)], pvalues[np.ix_(ia, ib)], n[np.ix_(ia, ib)] = tau, pv, nobs
+        r[np.ix_(ib, ia)], pvalues[np.ix_(ib, ia)], n[np.ix_(ib, ia)] = tau.T, pv.T, nobs.T
+        # 两列都无结时 scipy 可能使用精确分布，这些列对交给 scipy 计算
+        for a, b in zip(*np.nonzero(no_ties)):
+            if ia[a] < ib[b]:
+                exact_pairs.append((ia[a], ib[b]))
+
+    in_tables = np.zeros(p, dtype=bool)
+    in_tables[ordinal] = True
+    for i in range(p):
+        for j in range(i + 1, p):
+            if not (in_tables[i] and in_tables[j]):
+                exact_pairs.append((i, j))
+    for i, j in exact_pairs:
+        r[i, j], pvalues[i, j], n[i, j] = _kendall_pair(values[:, i], values[:, j])
+        r[j, i], pvalues[j, i], n[j, i] = r[i, j], pvalues[i, j], n[i, j]
+
+    diagonal = np.arange(p)
+    n[diagonal, diagonal] = (~np.isnan(values)).sum(axis=0)
+    r[diagonal, diagonal] = np.where(levels > 1, 1.0, np.nan)
+    pvalues[diagonal, diagonal] = np.where(levels > 1, 0.0, np.nan)
+    return r, pvalues, n
+
+
+def correlation_pvalues_from_r(r, n):
+    """
+    由相关系数和样本量批量计算双侧 t 检验 p 值（自由度 n-2）
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df = n - 2
+        t = r * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        pvalues = 2 * stats.t.sf(np.abs(t), df)
+    pvalues[np.abs(r) >= 1.0] = 0.0
+    pvalues[(df < 1) | np.isnan(r)] = np.nan
+    return pvalues
+
+
+def correlation_matrix(values, method="pearson", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    计算全部变量对的相关系数矩阵、p 值矩阵和成对样本量，缺失值按成对删除处理
+    :param values: 二维数值数组，每列为一个变量
+    :param method: pearson / spearman / kendall
+    :param chunk_size: 每次计算的列块大小
+    :return: 相关系数矩阵, p 值矩阵, 样本量矩阵
+    """
+    values = np.asarray(values, dtype=float)
+    if method == "kendall":
+        return _kendall_matrix(values, chunk_size)
+    if method == "spearman":
+        r, n = _spearman_matrix(values, chunk_size)
+    else:
+        r, n = _pearson_matrix(values, chunk_size)
+    r = np.clip(r, -1.0, 1.0)
+    diagonal = np.arange(r.shape[0])
+    r[diagonal, diagonal] = np.where(np.isnan(r[diagonal, diagonal]), np.nan, 1.0)
+    return r, correlation_pvalues_from_r(r, n), n
+
+
+def correlation_pvalues(df, method="pearson"):
+    """
+    计算两两变量之间相关系数的 p 值
+    :param df: 数值数据
+    :param method: pearson / spearman / kendall
+    :return: p 值矩阵
+    """
+    _, pvalues, _ = correlation_matrix(df.to_numpy(dtype=float), method)
+    return pd.DataFrame(pvalues, index=df.columns, columns=df.columns)
+
+
+def correlation_analysis(df, method="pearson", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    相关性分析
+    :param df: 输入数据，只使用其中的数值列
+    :param method: pearson / spearman / kendall
+    :param chunk_size: 每次计算的列块大小，列数很多时可调小以降低内存占用
+    :return: CorrelationResult
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"不支持的相关方法: {method}")
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行相关性分析。")
+    r, pvalues, n = correlation_matrix(numerical_df.to_numpy(dtype=float), method, chunk_size)
+    columns = numerical_df.columns
+    return CorrelationResult(method=method,
+                             corr=pd.DataFrame(r, index=columns, columns=columns),
+                             pvalues=pd.DataFrame(pvalues, index=columns, columns=columns),
+                             nobs=pd.DataFrame(n, index=columns, columns=columns),
+                             data=numerical_df)
+
+
+@dataclass
+class PartialCorrelationResult(AnalysisResult):
+    corr: pd.DataFrame
+    pvalues: pd.DataFrame
+    # 控制变量；为空时每一对变量都以其余全部变量为控制
+    controls: list
+    # 参与计算的完整行数和 t 检验的自由度 n - 2 - 控制变量个数
+    nobs: int
+    dof: int
+    # 以其余全部变量为控制时相关矩阵是否奇异
+    singular: bool
+
+    def pairs(self):
+        """
+        列出所有不同变量对（每对一次）的偏相关系数和 p 值
+        :return: [(变量1, 变量2, 偏相关系数, p值), ...]
+        """
+        columns = self.corr.columns
+        return [(columns[i], columns[j], self.corr.iloc[i, j], self.pvalues.iloc[i, j])
+                for i in range(len(columns)) for j in range(i + 1, len(columns))]
+
+
+def partial_correlation_matrix(values, controls=None):
+    """
+    所有变量对的偏相关系数矩阵
+    - 指定控制变量 Z 时，全部变量在一次最小二乘中对 [1, Z] 回归，偏相关系数即残差的相关系数
+    - 未指定时以其余全部变量为控制：偏相关系数为 -Ω_ij / sqrt(Ω_ii Ω_jj)，Ω 为相关矩阵的逆（精度矩阵）
+    :param values: 无缺失值的二维数组，每列为一个变量
+    :param controls: 无缺失值的控制变量数组，None 表示以其余全部变量为控制
+    :return: 偏相关系数矩阵, p 值矩阵, 控制变量个数, 相关矩阵是否奇异
+    """
+    values = np.asarray(values, dtype=float)
+    n, p = values.shape
+    singular = False
+    if controls is None:
+        precision, _, aliased = correlation_inverse(np.corrcoef(values, rowvar=False))
+        scale = np.sqrt(np.diag(precision))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = -precision / np.outer(scale, scale)
+        # 精确线性相关的变量的偏相关没有定义
+        r[aliased, :] = np.nan
+        r[:, aliased] = np.nan
+        singular = bool(aliased.any())
+        k = p - 2
+    else:
+        design = np.column_stack([np.ones(n), np.asarray(controls, dtype=float)])
+        coefficients, _, rank, _ = np.linalg.lstsq(design, values, rcond=None)
+        residuals = values - design @ coefficients
+        cross = residuals.T @ residuals
+        scale = np.sqrt(np.diag(cross))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = cross / np.outer(scale, scale)
+        k = rank - 1
+    r = np.clip(r, -1.0, 1.0)
+    diagonal = np.arange(p)
+    r[diagonal, diagonal] = np.where(np.isnan(r[diagonal, diagonal]), np.nan, 1.0)
+    # t 检验的自由度为 n - 2 - k
+    return r, correlation_pvalues_from_r(r, np.full((p, p), float(n - k))), k, singular
+
+
+def partial_correlation_analysis(df, controls=None):
+    """
+    偏相关分析，含缺失值的行不参与计算
+    :param df: 输入数据，只使用其中的数值列
+    :param controls: 控制变量名列表，或以逗号分隔的文本；为空时每一对变量都以其余全部变量为控制
+    :return: PartialCorrelationResult
+    """
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行偏相关分析。")
+    if isinstance(controls, str):
+        controls = [c.strip() for c in re.split(r"[,，]", controls) if c.strip()]
+    controls = list(controls or [])
+    columns = [str(c) for c in numerical_df.columns]
+    missing = [c for c in controls if c not in columns]
+    if missing:
+        raise KeyError(f"找不到控制变量列: {', '.join(missing)}")
+    numerical_df = numerical_df.set_axis(columns, axis=1).dropna()
+    variables = [c for c in columns if c not in controls]
+    if len(variables) < 2:
+        raise ValueError("除控制变量外至少需要两个数值变量。")
+    r, pvalues, k, singular = partial_correlation_matrix(
+        numerical_df[variables].to_numpy(dtype=float),
+        numerical_df[controls].to_numpy(dtype=float) if controls else None)
+    return PartialCorrelationResult(corr=pd.DataFrame(r, index=variables, columns=variables),
+                                    pvalues=pd.DataFrame(pvalues, index=variables, columns=variables),
+                                    controls=controls, nobs=len(numerical_df), dof=len(numerical_df) - 2 - k,
+                                    singular=singular)
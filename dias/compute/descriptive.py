@@ -0,0 +1,329 @@
+"""
+流式描述性统计
+
+数据按行分批输入，每批只更新各列的累加器，内存占用与行数无关：
+- 均值、标准差、偏度、峰度：合并各批的中心矩（Welford / Pébay 公式）
+- 中位数、四分位数：t-digest 分位数草图
+- 众数：取值计数，不同取值过多时放弃
+- 绘图：每列保留固定大小的均匀随机样本
+需要精确的分位数和众数时，可再遍历一次数据（exact=True）。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+STAT_NAMES = ["Mean", "Median", "Standard Deviation", "Minimum", "Maximum", "Range",
+              "First Quartile (Q1)", "Third Quartile (Q3)", "Interquartile Range (IQR)",
+              "Kurtosis", "Skewness", "Mode"]
+
+# t-digest 的压缩参数，越大越精确，质心数约为其 1~2 倍
+DIGEST_COMPRESSION = 200
+# 众数计数保留的不同取值上限，超过后流式模式不再给出众数
+MODE_MAX_DISTINCT = 10_000
+# 每列为绘图保留的样本数
+PLOT_SAMPLE_SIZE = 5_000
+# DataFrame 输入时每批的行数
+FRAME_BATCH_SIZE = 4096
+
+
+class StreamingMoments:
+    """
+    多列的一至四阶中心矩累加器，每次用一批数据整体更新
+    """
+
+    def __init__(self, p):
+        self.n = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.m3 = np.zeros(p)
+        self.m4 = np.zeros(p)
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+
+    def update(self, batch):
+        """
+        :param batch: 形状为 (行数, 列数) 的浮点数组，缺失值为 NaN
+        """
+        present = ~np.isnan(batch)
+        nb = present.sum(axis=0).astype(float)
+        if not nb.any():
+            return
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_b = np.where(nb > 0, np.nansum(batch, axis=0) / nb, 0.0)
+            d = np.where(present, batch - mean_b, 0.0)
+            m2_b, m3_b, m4_b = (d ** 2).sum(axis=0), (d ** 3).sum(axis=0), (d ** 4).sum(axis=0)
+
+            # 合并两组数据的中心矩
+            na = self.n
+            n = na + nb
+            delta = mean_b - self.mean
+            safe_n = np.where(n > 0, n, 1.0)
+            self.m4 = (self.m4 + m4_b
+                       + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / safe_n ** 3
+                       + 6 * delta ** 2 * (na ** 2 * m2_b + nb ** 2 * self.m2) / safe_n ** 2
+                       + 4 * delta * (na * m3_b - nb * self.m3) / safe_n)
+            self.m3 = (self.m3 + m3_b
+                       + delta ** 3 * na * nb * (na - nb) / safe_n ** 2
+                       + 3 * delta * (na * m2_b - nb * self.m2) / safe_n)
+            self.m2 = self.m2 + m2_b + delta ** 2 * na * nb / safe_n
+            self.mean = self.mean + delta * nb / safe_n
+            self.n = n
+        self.min = np.fmin(self.min, np.nanmin(np.where(present, batch, np.inf), axis=0))
+        self.max = np.fmax(self.max, np.nanmax(np.where(present, batch, -np.inf), axis=0))
+
+    def std(self):
+        # 样本标准差，只有一个值时记为 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.n > 1, np.sqrt(self.m2 / (self.n - 1)), 0.0)
+
+    def skewness(self):
+        # 与 scipy.stats.skew 的默认（有偏）估计一致
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.n) * self.m3 / self.m2 ** 1.5
+
+    def kurtosis(self):
+        # 与 scipy.stats.kurtosis 的默认（Fisher、有偏）估计一致
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.n * self.m4 / self.m2 ** 2 - 3
+
+
+class TDigest:
+    """
+    单列的合并式 t-digest 分位数草图
+    每批数据与已有质心一起排序，按尺度函数 k(q) 分桶合并，尾部的质心更小，因此极端分位数也较准确
+    """
+
+    def __init__(self, compression=DIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return self.weights.sum()
+
+    def update(self, values):
+        """
+        :param values: 不含 NaN 的一维数组
+        """
+        if not len(values):
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(len(values))])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        # 每个质心中点的累计比例映射到 k 尺度，同一整数区间内的质心合并
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bucket = np.floor(k - k[0]).astype(np.int64)
+        bucket = np.unique(bucket, return_inverse=True)[1].ravel()
+        merged_weights = np.bincount(bucket, weights=weights)
+        self.means = np.bincount(bucket, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, q):
+        """
+        与 np.percentile 的线性插值定义对应：质心较少时结果是精确的
+        :param q: 0~1 之间的分位点，可为数组
+        """
+        n = self.count
+        if n == 0:
+            return np.full(np.shape(q), np.nan)
+        # 第 i 个质心的位置为其覆盖样本的中点（从 0.5 开始计）
+        centres = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.5], centres, [n - 0.5]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q) * (n - 1) + 0.5, positions, values)
+
+
+class ValueCounter:
+    """
+    单列的取值计数，用于众数；记录每个取值首次出现的位置，平局时与 statistics.mode 一样取最先出现的值
+    """
+
+    def __init__(self, max_distinct=MODE_MAX_DISTINCT):
+        self.max_distinct = max_distinct
+        self.counts = {}
+        self.seen = 0
+        self.overflowed = False
+
+    def update(self, values):
+        if not self.overflowed and len(values):
+            uniques, first, counts = np.unique(values, return_index=True, return_counts=True)
+            for value, position, count in zip(uniques.tolist(), first.tolist(), counts.tolist()):
+                if value in self.counts:
+                    self.counts[value][0] += count
+                else:
+                    self.counts[value] = [count, self.seen + position]
+            if len(self.counts) > self.max_distinct:
+                self.overflowed = True
+                self.counts = {}
+        self.seen += len(values)
+
+    def mode(self):
+        if self.overflowed or not self.counts:
+            return None
+        return min(self.counts.items(), key=lambda item: (-item[1][0], item[1][1]))[0]
+
+
+class ReservoirSample:
+    """
+    单列的均匀随机样本（bottom-k 抽样），保留样本在该列数值序列中的位置，供绘图使用
+    """
+
+    def __init__(self, size=PLOT_SAMPLE_SIZE, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.positions = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)
+        self.seen = 0
+
+    def update(self, values):
+        count = len(values)
+        if not count:
+            return
+        keys = np.concatenate([self.keys, self.rng.random(count)])
+        positions = np.concatenate([self.positions, self.seen + np.arange(count)])
+        values = np.concatenate([self.values, values])
+        self.seen += count
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, positions, values = keys[keep], positions[keep], values[keep]
+        order = np.argsort(positions)
+        self.keys, self.positions, self.values = keys[order], positions[order], values[order]
+
+
+@dataclass
+class ColumnSketch:
+    """
+    单列的流式摘要，以及精确模式下的完整数值
+    """
+    name: object
+    digest: TDigest = field(default_factory=TDigest)
+    counter: ValueCounter = field(default_factory=ValueCounter)
+    sample: ReservoirSample = field(default_factory=ReservoirSample)
+    values: np.ndarray = None
+
+    def update(self, values):
+        self.digest.update(values)
+        self.counter.update(values)
+        self.sample.update(values)
+
+
+@dataclass
+class DescriptiveResult(AnalysisResult):
+    stats: pd.DataFrame
+    exact: bool
+    columns: list = field(repr=False, metadata={"export": False})
+
+
+class DescriptiveAccumulator:
+    """
+    逐批接收数据的描述性统计累加器
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.moments = StreamingMoments(len(self.names))
+        self.columns = [ColumnSketch(name) for name in self.names]
+
+    def update(self, batch):
+        """
+        :param batch: 形状为 (行数, 列数) 的浮点数组，缺失值或非数字单元格为 NaN
+        """
+        self.moments.update(batch)
+        for j, column in enumerate(self.columns):
+            values = batch[:, j]
+            column.update(values[~np.isnan(values)])
+
+    def result(self, exact_batches=None):
+        """
+        :param exact_batches: 再次遍历数据的批次迭代器；提供时分位数和众数按完整数据精确计算
+        :return: DescriptiveResult
+        """
+        if exact_batches is not None:
+            chunks = [[] for _ in self.columns]
+            for batch in exact_batches:
+                for j, values in enumerate(batch.T):
+                    chunks[j].append(values[~np.isnan(values)])
+            for column, parts in zip(self.columns, chunks):
+                column.values = np.concatenate(parts) if parts else np.empty(0)
+
+        m = self.moments
+        std, kurtosis, skewness = m.std(), m.kurtosis(), m.skewness()
+        rows, names, kept = [], [], []
+        for j, column in enumerate(self.columns):
+            # 没有数值的列不参与统计
+            if m.n[j] == 0:
+                continue
+            if column.values is not None:
+                q1, median, q3 = np.percentile(column.values, [25, 50, 75])
+                mode = _exact_mode(column.values)
+            else:
+                q1, median, q3 = column.digest.quantile([0.25, 0.5, 0.75])
+                mode = column.counter.mode()
+            rows.append([m.mean[j], median, std[j], m.min[j], m.max[j], m.max[j] - m.min[j],
+                         q1, q3, q3 - q1, kurtosis[j], skewness[j], mode])
+            names.append(column.name)
+            kept.append(column)
+        stats = pd.DataFrame(rows, index=pd.Index(names, name="Column Name"), columns=STAT_NAMES)
+        return DescriptiveResult(stats=stats, exact=exact_batches is not None, columns=kept)
+
+
+def _exact_mode(values):
+    # 出现次数最多的值，平局时取最先出现的值
+    uniques, first, counts = np.unique(values, return_index=True, return_counts=True)
+    candidates = np.flatnonzero(counts == counts.max())
+    return uniques[candidates[np.argmin(first[candidates])]].item()
+
+
+def _frame_batches(df, batch_size=FRAME_BATCH_SIZE):
+    """
+    将 DataFrame 转换为浮点批次，非数字单元格记为 NaN
+    """
+    for start in range(0, len(df), batch_size):
+        block = df.iloc[start:start + batch_size]
+        columns = [numeric_cells(series) for _, series in block.items()]
+        yield np.column_stack(columns) if columns else np.empty((len(block), 0))
+
+
+def descriptive_statistics(df, exact=False):
+    """
+    描述性统计
+    :param df: 输入数据，每列单独统计，只使用其中的数字
+    :param exact: 是否再遍历一次数据，精确计算分位数和众数
+    :return: DescriptiveResult
+    """
+    accumulator = DescriptiveAccumulator(df.columns)
+    for batch in _frame_batches(df):
+        accumulator.update(batch)
+    return accumulator.result(_frame_batches(df) if exact else None)
+
+
+def descriptive_statistics_stream(batches, exact_batches=None):
+    """
+    对流式数据进行描述性统计
+    :param batches: 产生 (表头, 浮点数组) 的迭代器，例如 dias.dataset.iter_numeric_batches
+    :param exact_batches: 第二次遍历同一数据的迭代器，提供时精确计算分位数和众数
+    :return: DescriptiveResult
+    """
+    accumulator = None
+    for header, batch in batches:
+        if accumulator is None:
+            accumulator = DescriptiveAccumulator(header)
+        accumulator.update(batch)
+    if accumulator is None:
+        raise ValueError("工作表中没有数据行，无法进行描述性统计。")
+    if exact_batches is not None:
+        exact_batches = (batch for _, batch in exact_batches)
+    return accumulator.result(exact_batches)
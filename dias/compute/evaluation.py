@@ -0,0 +1,378 @@
+"""
+综合评价模型：TOPSIS、功效系数、耦合协调度、障碍度、灰色关联、秩和比、综合指数、模糊综合评价、
+DEMATEL、德尔菲法和正交试验的极差分析
+
+除极差分析外，数据都以不带表头的方式读取，按各方法约定的行列含义解释；表头行和名称列在 numeric_matrix 中去掉。
+排序结果沿用原有约定：按得分从高到低排列的方案（序列、样本）编号，编号从 1 开始。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dias.compute.base import AnalysisResult, numeric_cells, numeric_matrix
+
+
+def complete_matrix(df, error_message="数据中存在缺失值或非数字单元格。"):
+    """
+    读取数据矩阵，要求每个单元格都是数字
+    :return: 二维浮点数组
+    """
+    data = numeric_matrix(df)
+    if np.isnan(data).any():
+        raise ValueError(error_message)
+    return data
+
+
+def _row(values):
+    """
+    取一行中的数字，去掉末尾的空白单元格
+    """
+    return values[~np.isnan(values)]
+
+
+def descending_order(scores):
+    """
+    按得分从高到低排列的编号，从 1 开始
+    """
+    return np.argsort(-np.asarray(scores), kind='stable') + 1
+
+
+@dataclass
+class TopsisResult(AnalysisResult):
+    weights: np.ndarray
+    # 向量归一化后的决策矩阵
+    standardized: np.ndarray
+    weighted: np.ndarray
+    positive_ideal: np.ndarray
+    negative_ideal: np.ndarray
+    # 各方案到正理想解、负理想解的欧氏距离
+    distance_positive: np.ndarray
+    distance_negative: np.ndarray
+    # 相对贴近度 = D- / (D+ + D-)
+    closeness: np.ndarray
+    ranking: np.ndarray
+
+
+def topsis(df):
+    """
+    TOPSIS 法，所有属性都按效益型处理
+    :param df: 第一行为属性权重向量，其余各行为方案的属性值
+    :return: TopsisResult
+    """
+    data = complete_matrix(df, "决策矩阵中存在缺失值或非数字单元格。")
+    if data.shape[0] < 3:
+        raise ValueError("数据至少需要三行：权重向量和两个以上的方案。")
+    weights, matrix = data[0], data[1:]
+    norms = np.sqrt(np.sum(matrix ** 2, axis=0))
+    if (norms == 0).any():
+        raise ValueError("存在全为 0 的属性，无法标准化决策矩阵。")
+    standardized = matrix / norms
+    weighted = standardized * weights
+    positive, negative = weighted.max(axis=0), weighted.min(axis=0)
+    d_positive = np.sqrt(np.sum((weighted - positive) ** 2, axis=1))
+    d_negative = np.sqrt(np.sum((weighted - negative) ** 2, axis=1))
+    total = d_positive + d_negative
+    # 所有方案完全相同时距离都为 0，贴近度记为 0.5
+    closeness = np.divide(d_negative, total, out=np.full_like(total, 0.5), where=total > 0)
+    return TopsisResult(weights=weights, standardized=standardized, weighted=weighted, positive_ideal=positive,
+                        negative_ideal=negative, distance_positive=d_positive, distance_negative=d_negative,
+                        closeness=closeness, ranking=descending_order(closeness))
+
+
+@dataclass
+class EfficacyResult(AnalysisResult):
+    actual: np.ndarray
+    # 不允许值（下限）和满意值（上限）
+    unacceptable: np.ndarray
+    satisfactory: np.ndarray
+    weights: np.ndarray
+    # 单项功效系数 = (实际值 - 不允许值) / (满意值 - 不允许值) × 40 + 60
+    coefficients: np.ndarray
+    # 综合功效系数，权重加权求和
+    composite: float
+
+
+def efficacy_coefficient(df):
+    """
+    功效系数法
+    :param df: 四行数据，依次为各指标实际值、不允许值、满意值和权重
+    :return: EfficacyResult
+    """
+    data = complete_matrix(df, "指标数据中存在缺失值或非数字单元格。")
+    if data.shape[0] < 4:
+        raise ValueError("数据需要四行：各指标实际值、不允许值、满意值和权重。")
+    actual, unacceptable, satisfactory, weights = data[:4]
+    if (satisfactory == unacceptable).any():
+        raise ValueError("指标的满意值不能等于不允许值。")
+    coefficients = (actual - unacceptable) / (satisfactory - unacceptable) * 40 + 60
+    return EfficacyResult(actual=actual, unacceptable=unacceptable, satisfactory=satisfactory, weights=weights,
+                          coefficients=coefficients, composite=float(coefficients @ weights))
+
+
+@dataclass
+class CouplingResult(AnalysisResult):
+    # 各系统的综合发展水平（各列均值）
+    development: np.ndarray
+    # 耦合度 C = n × (Πu)^(1/n) / Σu
+    coupling: float
+    # 综合发展指数 T，各系统等权平均
+    development_index: float
+    # 耦合协调度 D = √(C × T)
+    coordination: float
+    # 逐行（例如逐年）计算的耦合度和耦合协调度
+    row_coupling: np.ndarray
+    row_coordination: np.ndarray
+
+
+def _coupling(u):
+    n = u.shape[-1]
+    total = u.sum(axis=-1)
+    c = np.divide(n * np.power(np.prod(u, axis=-1), 1 / n), total, out=np.zeros_like(total), where=total > 0)
+    t = total / n
+    return c, t, np.sqrt(c * t)
+
+
+def coupling_coordination(df):
+    """
+    耦合协调度模型
+    :param df: 每列代表一个系统的综合评价值（通常已归一化到 0-1），每行为一个观测
+    :return: CouplingResult
+    """
+    data = complete_matrix(df, "系统数据中存在缺失值或非数字单元格。")
+    if data.shape[1] < 2:
+        raise ValueError("至少需要两个系统（两列数据）才能计算耦合度。")
+    if (data < 0).any():
+        raise ValueError("耦合协调度模型要求系统评价值非负。")
+    development = data.mean(axis=0)
+    c, t, d = _coupling(development)
+    row_c, _, row_d = _coupling(data)
+    return CouplingResult(development=development, coupling=float(c), development_index=float(t),
+                          coordination=float(d), row_coupling=row_c, row_coordination=row_d)
+
+
+@dataclass
+class ObstacleResult(AnalysisResult):
+    weights: np.ndarray
+    status: np.ndarray
+    # 障碍度 = 因素权重 × (1 - 因素状态值)
+    obstacle: np.ndarray
+    # 各因素障碍度占总障碍度的比例
+    share: np.ndarray
+
+
+def obstacle_degree(df):
+    """
+    障碍度模型
+    :param df: 第一列为因素权重，第二列为因素状态值（已归一化到 0-1），每行一个因素
+    :return: ObstacleResult
+    """
+    data = complete_matrix(df, "因素数据中存在缺失值或非数字单元格。")
+    if data.shape[1] < 2:
+        raise ValueError("数据需要两列：因素权重和因素状态值。")
+    weights, status = data[:, 0], data[:, 1]
+    obstacle = weights * (1 - status)
+    total = obstacle.sum()
+    share = obstacle / total if total else np.zeros_like(obstacle)
+    return ObstacleResult(weights=weights, status=status, obstacle=obstacle, share=share)
+
+
+@dataclass
+class GreyRelationalResult(AnalysisResult):
+    reference: np.ndarray
+    comparison: np.ndarray
+    # 关联系数矩阵，行为比较序列
+    coefficients: np.ndarray
+    # 关联度，关联系数按行取平均
+    degrees: np.ndarray
+    ranking: np.ndarray
+    rho: float
+
+
+def grey_relational(df, rho=0.5):
+    """
+    灰色关联分析，序列先做初值化处理
+    :param df: 第一行为参考序列，其余各行为比较序列
+    :param rho: 分辨系数，取值 0-1
+    :return: GreyRelationalResult
+    """
+    if not 0 < rho <= 1:
+        raise ValueError("分辨系数必须在 0 到 1 之间。")
+    data = complete_matrix(df, "序列中存在缺失值或非数字单元格。")
+    if data.shape[0] < 2:
+        raise ValueError("数据至少需要两行：参考序列和比较序列。")
+    if (data[:, 0] == 0).any():
+        raise ValueError("序列的第一个值不能为 0，无法做初值化处理。")
+    reference, comparison = data[0], data[1:]
+    diff = np.abs(comparison / comparison[:, [0]] - reference / reference[0])
+    min_diff, max_diff = diff.min(), diff.max()
+    if max_diff == 0:
+        coefficients = np.ones_like(diff)
+    else:
+        coefficients = (min_diff + rho * max_diff) / (diff + rho * max_diff)
+    degrees = coefficients.mean(axis=1)
+    return GreyRelationalResult(reference=reference, comparison=comparison, coefficients=coefficients,
+                                degrees=degrees, ranking=descending_order(degrees), rho=rho)
+
+
+@dataclass
+class RsrResult(AnalysisResult):
+    # 按列编秩的秩矩阵，相同值取平均秩
+    ranks: np.ndarray
+    # 秩和比 RSR = 行秩和 / (行数 × 列数)
+    rsr: np.ndarray
+    ranking: np.ndarray
+
+
+def rank_sum_ratio(df):
+    """
+    秩和比法，所有指标都按高优指标编秩
+    :param df: 行为评价对象，列为指标
+    :return: RsrResult
+    """
+    data = complete_matrix(df, "指标数据中存在缺失值或非数字单元格。")
+    ranks = pd.DataFrame(data).rank().to_numpy()
+    rsr = ranks.sum(axis=1) / ranks.size
+    return RsrResult(ranks=ranks, rsr=rsr, ranking=descending_order(rsr))
+
+
+@dataclass
+class CompositeIndexResult(AnalysisResult):
+    weights: np.ndarray
+    # 各样本的综合指数，指标值的加权和
+    indices: np.ndarray
+
+
+def composite_index(df):
+    """
+    综合指数法，各指标等权
+    :param df: 行为样本，列为指标
+    :return: CompositeIndexResult
+    """
+    data = complete_matrix(df, "指标数据中存在缺失值或非数字单元格。")
+    weights = np.full(data.shape[1], 1 / data.shape[1])
+    return CompositeIndexResult(weights=weights, indices=data @ weights)
+
+
+@dataclass
+class FuzzyEvaluationResult(AnalysisResult):
+    weights: np.ndarray
+    # 模糊评价矩阵，行为因素，列为评价等级
+    matrix: np.ndarray
+    # 综合评价结果向量，归一化后各评价等级的隶属度
+    membership: np.ndarray
+    # 最大隶属度对应的评价等级编号，从 1 开始
+    grade: int
+
+
+def fuzzy_comprehensive(df):
+    """
+    模糊综合评价，加权平均型合成算子 M(·, +)
+    :param df: 第一行为因素权重向量，其余各行为各因素对各评价等级的隶属度
+    :return: FuzzyEvaluationResult
+    """
+    data = numeric_matrix(df)
+    weights, matrix = _row(data[0]), data[1:]
+    if np.isnan(matrix).any() or not len(matrix):
+        raise ValueError("模糊评价矩阵中存在缺失值或非数字单元格。")
+    if len(weights) != matrix.shape[0]:
+        raise ValueError(f"权重向量有 {len(weights)} 个值，而模糊评价矩阵有 {matrix.shape[0]} 个因素。")
+    result = weights @ matrix
+    membership = result / result.sum()
+    return FuzzyEvaluationResult(weights=weights, matrix=matrix, membership=membership,
+                                 grade=int(np.argmax(membership)) + 1)
+
+
+@dataclass
+class DematelResult(AnalysisResult):
+    factors: list
+    # 综合影响矩阵 T = D (I - D)^-1，D 为规范化的直接影响矩阵
+    total_relation: pd.DataFrame
+    # 原因度 = 影响度 - 被影响度，正值为原因因素
+    causal_degree: pd.Series
+    # 中心度 = 影响度 + 被影响度
+    centrality: pd.Series
+
+
+def dematel(df):
+    """
+    DEMATEL 分析
+    :param df: 直接影响矩阵（方阵）
+    :return: DematelResult
+    """
+    data = complete_matrix(df, "直接影响矩阵中存在缺失值或非数字单元格。")
+    n = data.shape[0]
+    if data.shape[1] != n:
+        raise ValueError("直接影响矩阵必须是方阵。")
+    scale = max(data.sum(axis=1).max(), data.sum(axis=0).max())
+    if scale <= 0:
+        raise ValueError("直接影响矩阵不能全为 0。")
+    normalized = data / scale
+    total = normalized @ np.linalg.inv(np.eye(n) - normalized)
+    factors = [f"因素{i + 1}" for i in range(n)]
+    rows, cols = total.sum(axis=1), total.sum(axis=0)
+    return DematelResult(factors=factors, total_relation=pd.DataFrame(total, index=factors, columns=factors),
+                         causal_degree=pd.Series(rows - cols, index=factors),
+                         centrality=pd.Series(rows + cols, index=factors))
+
+
+# 德尔菲法的收敛标准：最后一轮评分的标准差小于该值
+DELPHI_CONVERGENCE = 1.0
+
+
+@dataclass
+class DelphiResult(AnalysisResult):
+    # 各轮评分的均值和标准差
+    means: np.ndarray
+    stds: np.ndarray
+    # 最后一轮评分的均值作为最终共识评分
+    consensus: float
+    converged: bool
+    threshold: float
+    last_round: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def delphi(df, threshold=DELPHI_CONVERGENCE):
+    """
+    德尔菲专家法，各轮的缺失评分分别去掉
+    :param df: 每一行代表一轮评分，每列代表一位专家
+    :param threshold: 收敛标准
+    :return: DelphiResult
+    """
+    data = numeric_matrix(df, "数据中没有评分，无法进行德尔菲分析。")
+    rounds = [_row(r) for r in data]
+    means = np.array([r.mean() for r in rounds])
+    stds = np.array([r.std() for r in rounds])
+    return DelphiResult(means=means, stds=stds, consensus=float(means[-1]), converged=bool(stds[-1] < threshold),
+                        threshold=threshold, last_round=rounds[-1])
+
+
+@dataclass
+class RangeAnalysisResult(AnalysisResult):
+    factors: list
+    result_var: str
+    # 每个因素一个 Series：各水平下试验结果的均值（K 值 / 试验次数）
+    level_means: dict
+    # 各因素的极差 R，越大说明该因素对试验结果的影响越大
+    ranges: pd.Series
+    # 每个因素均值最大的水平
+    best_levels: pd.Series
+
+
+def range_analysis(df):
+    """
+    正交试验的极差分析
+    :param df: 第一行为表头，最后一列为试验结果，其余各列为各因素的水平，只使用所有列都是数字的行
+    :return: RangeAnalysisResult
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列因素水平和一列试验结果。")
+    data = pd.DataFrame({str(name): numeric_cells(series) for name, series in df.items()}).dropna()
+    if data.empty:
+        raise ValueError("数据中没有完整的试验记录，无法进行极差分析。")
+    factors, result_var = list(data.columns[:-1]), data.columns[-1]
+    level_means = {factor: data.groupby(factor)[result_var].mean() for factor in factors}
+    ranges = pd.Series({factor: means.max() - means.min() for factor, means in level_means.items()})
+    best = pd.Series({factor: means.idxmax() for factor, means in level_means.items()})
+    return RangeAnalysisResult(factors=factors, result_var=result_var, level_means=level_means, ranges=ranges,
+                               best_levels=best)
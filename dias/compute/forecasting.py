@@ -0,0 +1,146 @@
+"""
+时间序列检验与预测：ADF 平稳性检验、一次指数平滑、灰色预测 GM(1,1) 和马尔可夫预测
+
+ADF 检验以带表头的方式读取，每列一个序列；指数平滑和灰色预测以不带表头的方式读取，所有数字按行展开成一个序列；
+马尔可夫预测读取的是状态转移矩阵。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import adfuller
+
+from dias.compute.base import AnalysisResult, numeric_matrix
+from dias.compute.hypothesis import numeric_columns
+
+# 一次指数平滑的平滑系数
+SMOOTHING_ALPHA = 0.3
+# 灰色预测和马尔可夫预测向后预测的步数
+PREDICTION_STEPS = 5
+
+
+@dataclass
+class AdfResult(AnalysisResult):
+    # 每列一行：Variable Name、ADF Test Statistic、p-value、Lags
+    table: pd.DataFrame
+
+
+def adf_test(df):
+    """
+    对每列分别做 ADF 单位根检验，各列的缺失值分别去掉
+    :param df: 每列一个时间序列
+    :return: AdfResult
+    """
+    columns = numeric_columns(df, 1, "数据中没有数值列，无法进行 ADF 检验。")
+    rows = []
+    for name, values in columns.items():
+        statistic, p_value, lags = adfuller(values)[:3]
+        rows.append([name, statistic, p_value, lags])
+    table = pd.DataFrame(rows, columns=["Variable Name", "ADF Test Statistic", "p-value", "Lags"])
+    return AdfResult(table=table)
+
+
+def series_values(df, min_length, error_message):
+    """
+    把不带表头读取的数据按行展开成一个序列，去掉非数字单元格
+    :param min_length: 至少需要的观测数
+    :param error_message: 观测数不足时的错误信息
+    :return: 一维浮点数组
+    """
+    values = numeric_matrix(df, "数据中没有数值，无法进行预测。").flatten()
+    values = values[~np.isnan(values)]
+    if len(values) < min_length:
+        raise ValueError(error_message)
+    return values
+
+
+@dataclass
+class SmoothingResult(AnalysisResult):
+    alpha: float
+    data: np.ndarray
+    # 一次指数平滑值 S_t = αx_t + (1 - α)S_{t-1}，S_1 = x_1
+    smoothed: np.ndarray
+    # 第 t 期的预测值为第 t - 1 期的平滑值（第 1 期取 x_1），末尾多出的一个为下一期的预测
+    predictions: np.ndarray
+
+
+def exponential_smoothing(df, alpha=SMOOTHING_ALPHA):
+    """
+    一次指数平滑法
+    :param df: 原始数据
+    :param alpha: 平滑系数，取值 0-1
+    :return: SmoothingResult
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError("平滑系数必须在 0 到 1 之间。")
+    data = series_values(df, 2, "至少需要两个观测值才能进行指数平滑。")
+    smoothed = np.empty_like(data)
+    smoothed[0] = data[0]
+    for i in range(1, len(data)):
+        smoothed[i] = alpha * data[i] + (1 - alpha) * smoothed[i - 1]
+    return SmoothingResult(alpha=alpha, data=data, smoothed=smoothed, predictions=np.insert(smoothed, 0, data[0]))
+
+
+@dataclass
+class GreyPredictionResult(AnalysisResult):
+    data: np.ndarray
+    # 一次累加生成序列
+    accumulated: np.ndarray
+    # 发展系数 a 和灰色作用量 b
+    a: float
+    b: float
+    steps: int
+    # 原始序列各期的拟合值和向后 steps 期的预测值
+    predictions: np.ndarray
+
+
+def grey_prediction(df, steps=PREDICTION_STEPS):
+    """
+    灰色预测 GM(1,1)，参数由最小二乘法估计
+    :param df: 原始数据
+    :param steps: 预测步数
+    :return: GreyPredictionResult
+    """
+    data = series_values(df, 3, "至少需要三个观测值才能建立灰色预测模型。")
+    accumulated = np.cumsum(data)
+    background = (accumulated[:-1] + accumulated[1:]) / 2
+    B = np.column_stack([-background, np.ones_like(background)])
+    a, b = np.linalg.lstsq(B, data[1:], rcond=None)[0]
+    if a == 0:
+        raise ValueError("发展系数为 0，无法建立灰色预测模型。")
+    # 预测累加序列，再还原为原始序列
+    k = np.arange(len(data) + steps)
+    accumulated_pred = (data[0] - b / a) * np.exp(-a * k) + b / a
+    predictions = np.concatenate([accumulated_pred[:1], np.diff(accumulated_pred)])
+    return GreyPredictionResult(data=data, accumulated=accumulated, a=float(a), b=float(b), steps=steps,
+                                predictions=predictions)
+
+
+@dataclass
+class MarkovResult(AnalysisResult):
+    transition: np.ndarray
+    # 各期的状态概率分布，初始状态为均匀分布
+    distributions: np.ndarray
+    # 各期概率最大的状态，编号从 0 开始
+    states: np.ndarray
+
+
+def markov_prediction(df, periods=PREDICTION_STEPS):
+    """
+    马尔可夫预测
+    :param df: 状态转移矩阵
+    :param periods: 预测的时期数
+    :return: MarkovResult
+    """
+    transition = numeric_matrix(df, "数据中没有数值，无法读取状态转移矩阵。")
+    if transition.shape[0] != transition.shape[1]:
+        raise ValueError("状态转移矩阵必须是方阵。")
+    if np.isnan(transition).any() or (transition < 0).any():
+        raise ValueError("状态转移矩阵的元素必须都是非负数。")
+    state = np.full(len(transition), 1 / len(transition))
+    distributions = []
+    for _ in range(periods):
+        state = state @ transition
+        distributions.append(state)
+    distributions = np.array(distributions)
+    return MarkovResult(transition=transition, distributions=distributions, states=distributions.argmax(axis=1))
@@ -0,0 +1,208 @@
+"""
+分层（按块）回归
+
+自变量按研究者指定的块依次进入模型。常数项和已进入的自变量的 QR 分解 X = QR 逐块扩展：
+新块先对当前的 Q 做 Gram-Schmidt 正交化（必要时再做一次），再对残差做列主元 QR，R 增加右上角的 Q'B 和右下角的新三角块。
+与已进入变量共线的列在列主元 QR 中被识别出来，不进入模型。
+第 s 步的模型正好是 R 左上角的子矩阵：
+- 残差平方和为 TSS - Σ (Q'y)_j²，ΔR² 和 F 变化量只需新块对应的 (Q'y) 分量
+- 系数为 R_s⁻¹ (Q'y)_s，上三角矩阵的逆的左上角子矩阵等于左上角子矩阵的逆，
+  因此只对最终的 R 求一次逆，所有步骤的系数和标准误都由它的子矩阵得到
+整个过程只做一次分解，不再每步重新拟合模型，自变量有数百个时也很快。
+"""
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.linalg import qr, solve_triangular
+
+from dias.compute.base import AnalysisResult
+from dias.compute.regularization import regression_matrix
+from dias.compute.stepwise import COLLINEAR_TOLERANCE
+
+# 块之间用分号或换行分隔，块内变量用逗号分隔，"名称: 变量, 变量" 可为块命名
+BLOCK_SEPARATOR = re.compile(r"[;\n]")
+VARIABLE_SEPARATOR = re.compile(r"[,，]")
+
+
+def parse_blocks(text, names):
+    """
+    解析块的文本定义
+    :param text: 例如 "Demographics: age, sex; Attitude: a1, a2, a3"；为空时每个自变量单独成块
+    :param names: 可用的自变量名
+    :return: [(块名, [变量名, ...]), ...]
+    """
+    if not text or not text.strip():
+        return [(name, [name]) for name in names]
+    blocks = []
+    for i, part in enumerate(p for p in BLOCK_SEPARATOR.split(text) if p.strip()):
+        label, _, variables = part.rpartition(":")
+        variables = [v.strip() for v in VARIABLE_SEPARATOR.split(variables) if v.strip()]
+        blocks.append((label.strip() or f"Block {i + 1}", variables))
+    return blocks
+
+
+class BlockQR:
+    """
+    带常数项的设计矩阵的 QR 分解，支持逐块追加自变量
+    Q 和 R 按最大列数预先分配，追加时只写入新列，不复制已有的列
+    """
+
+    def __init__(self, n, capacity):
+        """
+        :param n: 样本量
+        :param capacity: 最多追加的自变量个数
+        """
+        # 按列存储，左侧若干列的切片是连续内存，矩阵乘法直接调用 BLAS
+        self._Q = np.zeros((n, capacity + 1), order="F")
+        self._R = np.zeros((capacity + 1, capacity + 1))
+        self._Q[:, 0] = 1 / np.sqrt(n)
+        self._R[0, 0] = np.sqrt(n)
+        self.size = 1
+        # 已进入模型的列在原自变量矩阵中的位置（不含常数项）
+        self.columns = []
+
+    @property
+    def Q(self):
+        return self._Q[:, :self.size]
+
+    @property
+    def R(self):
+        return self._R[:self.size, :self.size]
+
+    def append(self, B, positions, scale):
+        """
+        追加一块自变量
+        :param B: (n, b) 的新块
+        :param positions: 新块各列在原自变量矩阵中的位置
+        :param scale: 新块各列的离差平方和，用于判断共线
+        :return: (进入模型的位置列表（按列主元顺序）, 因共线未进入的位置列表)
+        """
+        Q = self.Q
+        C = Q.T @ B
+        residual = B - Q @ C
+        # 残差的范数明显小于原列时正交性有损失，再正交化一次即可（Kahan 的 "twice is enough"）
+        if (np.linalg.norm(residual, axis=0) < 0.7 * np.linalg.norm(B, axis=0)).any():
+            C2 = Q.T @ residual
+            residual -= Q @ C2
+            C += C2
+        Q_b, R_b, pivot = qr(residual, mode="economic", pivoting=True)
+        rank = 0
+        for i in range(min(R_b.shape)):
+            if R_b[i, i] ** 2 <= COLLINEAR_TOLERANCE * scale[pivot[i]]:
+                break
+            rank += 1
+        keep = pivot[:rank]
+        p = self.size
+        self._R[:p, p:p + rank] = C[:, keep]
+        self._R[p:p + rank, p:p + rank] = R_b[:rank, :rank]
+        self._Q[:, p:p + rank] = Q_b[:, :rank]
+        self.size += rank
+        entered = [positions[j] for j in keep]
+        self.columns.extend(entered)
+        return entered, [positions[j] for j in pivot[rank:]]
+
+
+@dataclass
+class HierarchicalRegressionResult(AnalysisResult):
+    # 每一步：块、进入的变量、R²、调整 R²、ΔR²、F 变化量及其自由度和 p 值、整体 F 检验
+    steps: pd.DataFrame
+    # 每一步模型的系数、标准误、t 值和 p 值（长表）
+    coefficients: pd.DataFrame
+    # 与已进入变量共线、未进入模型的变量
+    aliased: list
+    target: str
+    actual: np.ndarray = field(default=None, metadata={"export": False})
+    fitted: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def hierarchical_regression(df, blocks=None):
+    """
+    分层回归
+    :param df: 最后一列为因变量，其余列为自变量
+    :param blocks: 块的定义：parse_blocks 的文本，或 [(块名, [变量名, ...]), ...]；None 时每个自变量单独成块
+    :return: HierarchicalRegressionResult
+    """
+    X, y, names, target = regression_matrix(df)
+    if blocks is None or isinstance(blocks, str):
+        blocks = parse_blocks(blocks, names)
+    seen = set()
+    for _, variables in blocks:
+        missing = [v for v in variables if v not in names]
+        if missing:
+            raise KeyError(f"找不到自变量列: {', '.join(missing)}")
+        repeated = seen.intersection(variables)
+        if repeated:
+            raise ValueError(f"变量在多个块中出现: {', '.join(sorted(repeated))}")
+        seen.update(variables)
+
+    n = len(y)
+    position = {name: j for j, name in enumerate(names)}
+    scale = ((X - X.mean(axis=0)) ** 2).sum(axis=0)
+    tss = float(((y - y.mean()) ** 2).sum())
+    decomposition = BlockQR(n, sum(len(variables) for _, variables in blocks))
+    # 列主元会改变块内变量的顺序，报告中按块定义中的顺序列出
+    order = {name: i for i, name in enumerate(v for _, variables in blocks for v in variables)}
+    records, aliased, sizes = [], [], []
+    rss_previous = tss
+    for step, (label, variables) in enumerate(blocks, start=1):
+        positions = [position[v] for v in variables]
+        entered, dropped = decomposition.append(X[:, positions], positions, scale[positions])
+        aliased.extend(names[j] for j in dropped)
+        sizes.append(len(decomposition.columns))
+        k = sizes[-1]
+        # 新进入的列对应的 Q'y 分量即该块解释的平方和
+        qy_block = decomposition.Q[:, k + 1 - len(entered):k + 1].T @ y
+        rss = max(rss_previous - float(qy_block @ qy_block), 0.0)
+        df2 = n - k - 1
+        r2 = 1 - rss / tss if tss > 0 else np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f_change = ((rss_previous - rss) / len(entered)) / (rss / df2) if entered and df2 > 0 else np.nan
+            f_value = (r2 / k) / ((1 - r2) / df2) if k and df2 > 0 else np.nan
+        records.append({
+            "Step": step,
+            "Block": label,
+            "Variables Entered": ", ".join(sorted((names[j] for j in entered), key=order.get)),
+            "R-squared (R²)": r2,
+            "Adjusted R-squared": 1 - (1 - r2) * (n - 1) / df2 if df2 > 0 else np.nan,
+            "ΔR²": (rss_previous - rss) / tss if tss > 0 else np.nan,
+            "F Change": f_change,
+            "df1": len(entered),
+            "df2": df2,
+            "Sig. F Change": stats.f.sf(f_change, len(entered), df2) if np.isfinite(f_change) else np.nan,
+            "F-value": f_value,
+            "p-value": stats.f.sf(f_value, k, df2) if np.isfinite(f_value) else np.nan,
+        })
+        rss_previous = rss
+    steps = pd.DataFrame(records)
+
+    # 所有步骤共用最终 R 的逆的左上角子矩阵
+    R = decomposition.R
+    R_inv = solve_triangular(R, np.eye(len(R)))
+    qy = decomposition.Q.T @ y
+    labels = np.array(["Intercept"] + [names[j] for j in decomposition.columns], dtype=object)
+    display = np.argsort([-1] + [order[names[j]] for j in decomposition.columns], kind="stable")
+    frames = []
+    for step, k in enumerate(sizes, start=1):
+        sub = R_inv[:k + 1, :k + 1]
+        beta = sub @ qy[:k + 1]
+        df2 = n - k - 1
+        rss = max(tss - float(qy[1:k + 1] @ qy[1:k + 1]), 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            se = np.sqrt(rss / df2 * (sub ** 2).sum(axis=1)) if df2 > 0 else np.full(k + 1, np.nan)
+            t = beta / se
+        rows = display[display <= k]
+        frames.append(pd.DataFrame({
+            "Step": step,
+            "Variable": labels[rows],
+            "Coefficient": beta[rows],
+            "Std. Error": se[rows],
+            "t-value": t[rows],
+            "p-value": 2 * stats.t.sf(np.abs(t[rows]), df2) if df2 > 0 else np.nan,
+        }))
+    coefficients = pd.concat(frames, ignore_index=True)
+    fitted = decomposition.Q @ qy
+    return HierarchicalRegressionResult(steps=steps, coefficients=coefficients, aliased=aliased, target=target,
+                                        actual=y, fitted=fitted)
@@ -0,0 +1,430 @@
+"""
+假设检验：方差齐性、卡方、t 检验、Wilcoxon 检验、Friedman 检验、游程检验和一致性系数
+
+只使用数字单元格；除配对检验外，各列的缺失值分别去掉，配对检验只使用两列都有值的行。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from statsmodels.sandbox.stats.runs import runstest_1samp
+from statsmodels.stats.inter_rater import cohens_kappa
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+# 显著性水平和置信区间的置信水平
+ALPHA = 0.05
+CONFIDENCE_LEVEL = 0.95
+
+
+def numeric_columns(df, min_columns=1, error_message="数据中没有数值列，无法进行分析。"):
+    """
+    每列只保留数字单元格，去掉没有数字的列
+    :param df: 输入数据
+    :param min_columns: 至少需要的列数
+    :param error_message: 列数不足时的错误信息
+    :return: {列名: 浮点数组}，保持列的顺序
+    """
+    columns = {}
+    for name, series in df.items():
+        values = numeric_cells(series)
+        values = values[~np.isnan(values)]
+        if len(values):
+            columns[str(name)] = values
+    if len(columns) < min_columns:
+        raise ValueError(error_message)
+    return columns
+
+
+def numeric_rows(df, error_message="数据中没有数值列，无法进行分析。"):
+    """
+    只保留所有数值列都有值的行，用于配对和重复测量的数据
+    :param df: 输入数据
+    :param error_message: 没有数值列时的错误信息
+    :return: DataFrame，列名为字符串
+    """
+    data = pd.DataFrame({str(name): numeric_cells(series) for name, series in df.items()})
+    data = data.dropna(axis=1, how='all')
+    if data.empty:
+        raise ValueError(error_message)
+    return data.dropna()
+
+
+def sample_summary(columns):
+    """
+    各列的样本量、均值、标准差和中位数
+    :param columns: {列名: 数组}
+    :return: DataFrame，行为列名
+    """
+    return pd.DataFrame({
+        "N": {name: len(v) for name, v in columns.items()},
+        "Mean": {name: v.mean() for name, v in columns.items()},
+        "Std": {name: v.std(ddof=1) if len(v) > 1 else np.nan for name, v in columns.items()},
+        "Median": {name: np.median(v) for name, v in columns.items()},
+    })
+
+
+def t_interval(estimate, se, dof, confidence=CONFIDENCE_LEVEL):
+    """
+    以 t 分布为基础的置信区间
+    :return: (下限, 上限)
+    """
+    return tuple(float(v) for v in stats.t.interval(confidence, dof, loc=estimate, scale=se))
+
+
+@dataclass
+class HomogeneityResult(AnalysisResult):
+    method: str
+    statistic: float
+    p_value: float
+    columns: list
+    # 各列的数值，用于箱线图
+    samples: dict = field(default=None, metadata={"export": False})
+
+
+def _homogeneity_test(df, test, method):
+    columns = numeric_columns(df, 2, "至少需要两列数值数据才能进行方差齐性检验。")
+    statistic, p_value = test(*columns.values())
+    return HomogeneityResult(method=method, statistic=float(statistic), p_value=float(p_value),
+                             columns=list(columns), samples=columns)
+
+
+def bartlett_test(df):
+    """
+    Bartlett 方差齐性检验，每列为一个样本
+    :return: HomogeneityResult
+    """
+    return _homogeneity_test(df, stats.bartlett, "Bartlett")
+
+
+def levene_test(df):
+    """
+    Levene 方差齐性检验（以中位数为中心），每列为一个样本
+    :return: HomogeneityResult
+    """
+    return _homogeneity_test(df, stats.levene, "Levene")
+
+
+@dataclass
+class GoodnessOfFitResult(AnalysisResult):
+    chi2: float
+    p_value: float
+    dof: int
+    # 每个类别的观测频数和按观测总数缩放后的理论频数
+    frequencies: pd.DataFrame
+
+
+def chi_square_goodness_of_fit(df):
+    """
+    卡方拟合优度检验
+    :param df: 第一列为观测频数，第二列为理论频数或理论比例，两列都有值的行为一个类别
+    :return: GoodnessOfFitResult
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要两列：观测频数和理论频数。")
+    data = numeric_rows(df.iloc[:, :2])
+    observed, expected = data.iloc[:, 0].to_numpy(), data.iloc[:, 1].to_numpy()
+    if len(observed) < 2:
+        raise ValueError("至少需要两个类别才能进行卡方拟合优度检验。")
+    if (expected <= 0).any():
+        raise ValueError("理论频数必须大于 0。")
+    # 理论频数按观测总数缩放，第二列也可以直接填写理论比例
+    expected = expected * observed.sum() / expected.sum()
+    chi2, p_value = stats.chisquare(observed, expected)
+    frequencies = pd.DataFrame({"Observed": observed, "Expected": expected}, index=data.index)
+    return GoodnessOfFitResult(chi2=float(chi2), p_value=float(p_value), dof=len(observed) - 1,
+                               frequencies=frequencies)
+
+
+@dataclass
+class ContingencyResult(AnalysisResult):
+    # 列联表，行为第一列的类别，列为第二列的类别
+    table: pd.DataFrame
+    # 各检验方法的统计量、自由度和 p 值
+    tests: pd.DataFrame
+    # 效应量：2×2 表为 Phi 系数，其他为 Cramer's V
+    effect_name: str
+    effect_size: float
+    min_expected: float
+    nobs: int
+
+
+def chi_square_independence(df):
+    """
+    两个分类变量的独立性卡方检验：Pearson、似然比和线性趋势卡方，2×2 表另有 Yates 校正和 Fisher 精确检验
+    :param df: 前两列为两个分类变量的原始观测，每行一个个体
+    :return: ContingencyResult
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要两列分类变量。")
+    data = df.iloc[:, :2].dropna()
+    table = pd.crosstab(data.iloc[:, 0], data.iloc[:, 1])
+    if table.shape[0] < 2 or table.shape[1] < 2:
+        raise ValueError("每个变量至少需要两个类别才能进行卡方检验。")
+    observed = table.to_numpy()
+    n = int(observed.sum())
+
+    chi2, p, dof, expected = stats.chi2_contingency(observed, correction=False)
+    g, p_g, _, _ = stats.chi2_contingency(observed, correction=False, lambda_="log-likelihood")
+    rows = [("Pearson", chi2, dof, p), ("Likelihood Ratio", g, dof, p_g)]
+    if observed.shape == (2, 2):
+        yates, p_yates, _, _ = stats.chi2_contingency(observed, correction=True)
+        odds_ratio, p_fisher = stats.fisher_exact(observed)
+        rows += [("Yates Continuity Correction", yates, dof, p_yates), ("Fisher Exact (odds ratio)", odds_ratio, np.nan,
+                                                                         p_fisher)]
+    # 线性趋势卡方 M² = (n - 1) r²，类别按排序后的顺序取 1, 2, ... 为分值
+    row_scores = np.repeat(np.arange(observed.shape[0]), observed.shape[1])
+    col_scores = np.tile(np.arange(observed.shape[1]), observed.shape[0])
+    weights = observed.ravel()
+    r = _weighted_correlation(row_scores, col_scores, weights)
+    trend = (n - 1) * r ** 2
+    rows.append(("Linear-by-Linear Association", trend, 1, stats.chi2.sf(trend, 1)))
+
+    tests = pd.DataFrame(rows, columns=["Method", "Statistic", "df", "p-value"])
+    if observed.shape == (2, 2):
+        effect_name, effect_size = "Phi", np.sqrt(chi2 / n)
+    else:
+        effect_name, effect_size = "Cramer's V", np.sqrt(chi2 / (n * (min(observed.shape) - 1)))
+    return ContingencyResult(table=table, tests=tests, effect_name=effect_name, effect_size=float(effect_size),
+                             min_expected=float(expected.min()), nobs=n)
+
+
+def _weighted_correlation(x, y, w):
+    mx, my = np.average(x, weights=w), np.average(y, weights=w)
+    cov = np.average((x - mx) * (y - my), weights=w)
+    sx = np.sqrt(np.average((x - mx) ** 2, weights=w))
+    sy = np.sqrt(np.average((y - my) ** 2, weights=w))
+    return cov / (sx * sy) if sx > 0 and sy > 0 else 0.0
+
+
+@dataclass
+class FriedmanResult(AnalysisResult):
+    statistic: float
+    p_value: float
+    # 各列（处理）的样本量和中位数
+    summary: pd.DataFrame
+
+
+def friedman_test(df):
+    """
+    Friedman 检验，每列为一种处理，每行为一个区组，只使用各列都有值的行
+    :return: FriedmanResult
+    """
+    data = numeric_rows(df, "数据中没有数值列，无法进行Friedman检验。")
+    if data.shape[1] < 3:
+        raise ValueError("Friedman检验至少需要三列数值数据。")
+    statistic, p_value = stats.friedmanchisquare(*data.T.to_numpy())
+    columns = {name: data[name].to_numpy() for name in data.columns}
+    return FriedmanResult(statistic=float(statistic), p_value=float(p_value),
+                          summary=sample_summary(columns)[["N", "Median"]])
+
+
+@dataclass
+class RunsResult(AnalysisResult):
+    # 每列一行：游程数、期望游程数、Z 统计量和 p 值，以中位数为分界
+    tests: pd.DataFrame
+    # 各列的数值，用于折线图
+    samples: dict = field(default=None, metadata={"export": False})
+
+
+def runs_test(df):
+    """
+    单样本游程检验，检验每列数据的随机性；不小于中位数记为一类，小于中位数记为另一类
+    :return: RunsResult
+    """
+    columns = numeric_columns(df, 1, "数据中没有数值列，无法进行游程检验。")
+    rows = []
+    for name, values in columns.items():
+        above = values >= np.median(values)
+        n1, n2 = int(above.sum()), int((~above).sum())
+        runs = int(1 + np.count_nonzero(above[1:] != above[:-1]))
+        expected = 2 * n1 * n2 / (n1 + n2) + 1
+        if n1 and n2:
+            z, p_value = runstest_1samp(values, cutoff='median')
+        else:
+            # 所有值都相同，无法检验
+            z, p_value = np.nan, np.nan
+        rows.append((name, runs, expected, z, p_value))
+    tests = pd.DataFrame(rows, columns=["Column", "Runs", "Expected Runs", "Z", "p-value"])
+    return RunsResult(tests=tests, samples=columns)
+
+
+@dataclass
+class KappaResult(AnalysisResult):
+    kappa: float
+    std_error: float
+    z: float
+    p_value: float
+    ci_lower: float
+    ci_upper: float
+    nobs: int
+    # 两位评价者的一致性列联表
+    table: pd.DataFrame
+
+
+def kappa_test(df):
+    """
+    Cohen's Kappa 一致性检验
+    :param df: 两列，分别为两位评价者对同一批对象的分类
+    :return: KappaResult
+    """
+    if df.shape[1] != 2:
+        raise ValueError("数据必须包含两列，用于计算 Kappa 一致性检验。")
+    data = df.dropna()
+    categories = sorted(set(data.iloc[:, 0]) | set(data.iloc[:, 1]), key=str)
+    table = pd.crosstab(pd.Categorical(data.iloc[:, 0], categories=categories),
+                        pd.Categorical(data.iloc[:, 1], categories=categories), dropna=False)
+    table.index, table.columns = [str(c) for c in categories], [str(c) for c in categories]
+    result = cohens_kappa(table.to_numpy())
+    return KappaResult(kappa=float(result.kappa), std_error=float(result.std_kappa), z=float(result.z_value),
+                       p_value=float(result.pvalue_two_sided), ci_lower=float(result.kappa_low),
+                       ci_upper=float(result.kappa_upp), nobs=len(data), table=table)
+
+
+@dataclass
+class KendallWResult(AnalysisResult):
+    w: float
+    chi2: float
+    dof: int
+    p_value: float
+    # 评价者（行）和被评对象（列）的个数
+    n_raters: int
+    n_items: int
+    # 各被评对象的样本量和中位数
+    summary: pd.DataFrame
+
+
+def kendall_w(df):
+    """
+    Kendall 协和系数 W，每行为一位评价者，每列为一个被评对象；显著性检验用 χ² = m(n - 1)W
+    :return: KendallWResult
+    """
+    data = numeric_rows(df, "数据中没有数值列，无法进行Kendall协和系数分析。")
+    m, n = data.shape
+    if m < 2 or n < 2:
+        raise ValueError("Kendall协和系数至少需要两位评价者和两个被评对象。")
+    ranks = data.rank(axis=1)
+    s = ((ranks.sum(axis=0) - m * (n + 1) / 2) ** 2).sum()
+    w = 12 * s / (m ** 2 * (n ** 3 - n))
+    chi2 = m * (n - 1) * w
+    columns = {name: data[name].to_numpy() for name in data.columns}
+    return KendallWResult(w=float(w), chi2=float(chi2), dof=n - 1, p_value=float(stats.chi2.sf(chi2, n - 1)),
+                          n_raters=m, n_items=n, summary=sample_summary(columns)[["N", "Median"]])
+
+
+@dataclass
+class LocationTestResult(AnalysisResult):
+    method: str
+    # 每个检验一行：Variable、Statistic、df、p-value、均值差及其 95% 置信区间
+    tests: pd.DataFrame
+    # 各列的样本量、均值、标准差和中位数
+    summary: pd.DataFrame
+    # 各列的数值，用于绘图
+    samples: dict = field(default=None, metadata={"export": False})
+
+
+TEST_COLUMNS = ["Variable", "Statistic", "df", "p-value", "Mean Difference", "CI Lower", "CI Upper"]
+
+
+def _two_columns(columns, method):
+    if len(columns) != 2:
+        raise ValueError(f"数据必须包含两列数值数据，用于{method}。")
+    return list(columns.values())
+
+
+def independent_t_test(df, first_two=False):
+    """
+    独立样本 t 检验（方差齐性假定），两列各为一组
+    :param first_two: 为 True 时只比较前两列数值数据，否则数据必须恰好包含两列数值数据
+    :return: LocationTestResult
+    """
+    columns = numeric_columns(df, 1, "数据中没有数值列，无法进行独立样本 t 检验。")
+    if first_two:
+        if len(columns) < 2:
+            raise ValueError("数据中至少需要两列数值数据才能进行独立样本 t 检验。")
+        columns = dict(list(columns.items())[:2])
+    a, b = _two_columns(columns, "独立样本 t 检验")
+    t_stat, p_value = stats.ttest_ind(a, b)
+    dof = len(a) + len(b) - 2
+    diff = a.mean() - b.mean()
+    pooled = ((len(a) - 1) * a.var(ddof=1) + (len(b) - 1) * b.var(ddof=1)) / dof
+    se = np.sqrt(pooled * (1 / len(a) + 1 / len(b)))
+    tests = pd.DataFrame([("Independent t", t_stat, dof, p_value, diff, *t_interval(diff, se, dof))],
+                         columns=TEST_COLUMNS)
+    return LocationTestResult(method="Independent Samples t-Test", tests=tests, summary=sample_summary(columns),
+                              samples=columns)
+
+
+def one_sample_t_test(df, popmean=0.0):
+    """
+    单样本 t 检验，每列分别与总体均值比较
+    :param popmean: 假设的总体均值
+    :return: LocationTestResult
+    """
+    columns = numeric_columns(df, 1, "数据中没有数值列，无法进行单样本 t 检验。")
+    rows = []
+    for name, values in columns.items():
+        t_stat, p_value = stats.ttest_1samp(values, popmean)
+        diff = values.mean() - popmean
+        rows.append((name, t_stat, len(values) - 1, p_value, diff,
+                     *t_interval(diff, stats.sem(values), len(values) - 1)))
+    return LocationTestResult(method="One-Sample t-Test", tests=pd.DataFrame(rows, columns=TEST_COLUMNS),
+                              summary=sample_summary(columns), samples=columns)
+
+
+def paired_t_test(df):
+    """
+    配对 t 检验，只使用两列都有值的行
+    :return: LocationTestResult
+    """
+    data = numeric_rows(df, "数据中没有数值列，无法进行配对 t 检验。")
+    if data.shape[1] != 2:
+        raise ValueError("数据必须包含且仅包含两列数值数据，才能进行配对 t 检验。")
+    a, b = data.iloc[:, 0].to_numpy(), data.iloc[:, 1].to_numpy()
+    t_stat, p_value = stats.ttest_rel(a, b)
+    differences = a - b
+    dof = len(differences) - 1
+    tests = pd.DataFrame([("Paired t", t_stat, dof, p_value, differences.mean(),
+                           *t_interval(differences.mean(), stats.sem(differences), dof))], columns=TEST_COLUMNS)
+    columns = {name: data[name].to_numpy() for name in data.columns}
+    return LocationTestResult(method="Paired t-Test", tests=tests, summary=sample_summary(columns), samples=columns)
+
+
+def one_sample_wilcoxon(df, median=0.0):
+    """
+    单样本 Wilcoxon 符号秩检验，每列分别与假设的中位数比较
+    :param median: 假设的中位数
+    :return: LocationTestResult，Statistic 为 W 统计量，置信区间为均值差的 t 区间
+    """
+    columns = numeric_columns(df, 1, "数据中没有数值列，无法进行单样本Wilcoxon检验。")
+    rows = []
+    for name, values in columns.items():
+        w_stat, p_value = stats.wilcoxon(values - median)
+        diff = values.mean() - median
+        rows.append((name, w_stat, len(values) - 1, p_value, diff,
+                     *t_interval(diff, stats.sem(values), len(values) - 1)))
+    return LocationTestResult(method="One-Sample Wilcoxon Signed-Rank Test",
+                              tests=pd.DataFrame(rows, columns=TEST_COLUMNS), summary=sample_summary(columns),
+                              samples=columns)
+
+
+def paired_wilcoxon(df):
+    """
+    配对样本 Wilcoxon 符号秩检验，只使用两列都有值的行
+    :return: LocationTestResult，Statistic 为 W 统计量，置信区间为差值均值的 t 区间
+    """
+    data = numeric_rows(df, "数据中没有数值列，无法进行配对样本Wilcoxon检验。")
+    if data.shape[1] != 2:
+        raise ValueError("数据必须包含两列数值数据，用于配对样本Wilcoxon检验。")
+    a, b = data.iloc[:, 0].to_numpy(), data.iloc[:, 1].to_numpy()
+    w_stat, p_value = stats.wilcoxon(a, b)
+    differences = a - b
+    dof = len(differences) - 1
+    tests = pd.DataFrame([("Paired Wilcoxon", w_stat, dof, p_value, differences.mean(),
+                           *t_interval(differences.mean(), stats.sem(differences), dof))], columns=TEST_COLUMNS)
+    columns = {name: data[name].to_numpy() for name in data.columns}
+    summary = sample_summary(columns)
+    summary.loc["Difference"] = sample_summary({"Difference": differences}).iloc[0]
+    return LocationTestResult(method="Paired Samples Wilcoxon Signed-Rank Test", tests=tests, summary=summary,
+                              samples=columns)
@@ -0,0 +1,170 @@
+"""
+KANO 模型分类
+
+每对（正向问题, 反向问题）回答通过 KANO 评价表映射为一个类别，评价表保存为 6×6 的查找表，
+所有功能点的回答一次性用 NumPy 花式索引查表，再用 bincount 按功能点统计各类别的人数。
+数据可以分块传入，只累计计数矩阵，内存占用与受访者人数无关。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+# 类别代码，顺序也是人数相同时的优先顺序
+CATEGORIES = ["A", "O", "M", "I", "R", "Q"]
+CATEGORY_NAMES = {
+    'A': "兴奋型需求（A）",
+    'O': "期望型需求（O）",
+    'M': "基本型需求（M）",
+    'I': "无差异型需求（I）",
+    'R': "反向型需求（R）",
+    'Q': "可疑结果（Q）"
+}
+_A, _O, _M, _I, _R, _Q = range(len(CATEGORIES))
+
+# KANO 评价表：行为正向问题的回答，列为反向问题的回答，取值 1-5；
+# 第 0 行 / 列表示无效回答（缺失、非整数或超出 1-5），表中未列出的组合均为可疑结果 Q
+KANO_TABLE = np.full((6, 6), _Q, dtype=np.intp)
+KANO_TABLE[5, 1:4] = [_A, _A, _O]
+KANO_TABLE[4, 1:4] = [_A, _O, _O]
+KANO_TABLE[3, 1:4] = [_O, _O, _I]
+KANO_TABLE[2, 1:4] = [_I, _I, _M]
+KANO_TABLE[1, 1:4] = [_R, _M, _M]
+
+# 整表计算时每块的行数，限制查表产生的临时数组大小
+KANO_CHUNK_ROWS = 65536
+
+
+def answer_index(values):
+    """
+    将回答转换为查找表的下标
+    :param values: 浮点数组
+    :return: 同形状的整数数组，1-5 的整数回答为其本身，其余为 0
+    """
+    valid = (values >= 1) & (values <= 5) & (values == np.floor(values))
+    return np.where(valid, values, 0).astype(np.intp)
+
+
+@dataclass
+class KanoResult(AnalysisResult):
+    # 行为功能点（正向问题列名），列为各类别的人数
+    counts: pd.DataFrame
+    # 人数最多的类别代码
+    category: pd.Series
+    better: pd.Series
+    worse: pd.Series
+
+    def table(self, language='zh'):
+        """
+        报告用的结果表：功能点、KANO 分类、各类别人数、Better 和 Worse 系数
+        """
+        return pd.DataFrame({
+            "Feature": self.counts.index,
+            "Category": [CATEGORY_NAMES[c] if language == 'zh' else c for c in self.category],
+            **{c: self.counts[c].to_numpy() for c in CATEGORIES},
+            "Better": self.better.to_numpy(),
+            "Worse": self.worse.to_numpy(),
+        })
+
+
+class KanoAccumulator:
+    """
+    分块累计各功能点的类别人数
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.counts = np.zeros((len(self.features), len(CATEGORIES)), dtype=np.int64)
+
+    def update(self, positive, negative):
+        """
+        :param positive: (行数, 功能点数) 的正向问题回答
+        :param negative: 同形状的反向问题回答
+        """
+        codes = KANO_TABLE[answer_index(positive), answer_index(negative)]
+        # 每个功能点的类别代码偏移到各自的区间，一次 bincount 统计所有功能点
+        offsets = codes + len(CATEGORIES) * np.arange(codes.shape[1])
+        self.counts += np.bincount(offsets.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+
+    def result(self):
+        counts = pd.DataFrame(self.counts, index=self.features, columns=CATEGORIES)
+        total = counts.sum(axis=1).replace(0, np.nan)
+        category = pd.Series([CATEGORIES[i] for i in self.counts.argmax(axis=1)], index=self.features)
+        better = (counts["A"] + counts["O"]) / total
+        worse = -(counts["M"] + counts["R"]) / total
+        return KanoResult(counts=counts, category=category, better=better, worse=worse)
+
+
+def _column_positions(header, names):
+    labels = [str(h).strip() for h in header]
+    missing = [name for name in names if name not in labels]
+    if missing:
+        raise KeyError(f"找不到问题列: {', '.join(missing)}")
+    return [labels.index(name) for name in names]
+
+
+def paired_columns(header):
+    """
+    未指定问题列时的默认布局：相邻两列为一对，前一列为正向问题，后一列为反向问题
+    :param header: 表头
+    :return: (正向问题列名, 反向问题列名)
+    """
+    labels = [str(h).strip() for h in header]
+    if len(labels) < 2 or len(labels) % 2:
+        raise ValueError("未指定问题列时，数据必须由成对的正向问题列和反向问题列组成。")
+    return labels[0::2], labels[1::2]
+
+
+def _check_pairs(positive_columns, negative_columns):
+    positive_columns = [str(c).strip() for c in positive_columns]
+    negative_columns = [str(c).strip() for c in negative_columns]
+    if len(positive_columns) != len(negative_columns):
+        raise ValueError("正向问题和反向问题的列数不一致。")
+    return positive_columns, negative_columns
+
+
+def kano_analysis(df, positive_columns=None, negative_columns=None):
+    """
+    KANO 分类和 Better-Worse 系数
+    :param df: 输入数据，每行为一位受访者
+    :param positive_columns: 正向问题的列名，默认按 paired_columns 取相邻两列为一对
+    :param negative_columns: 对应的反向问题列名
+    :return: KanoResult
+    """
+    if positive_columns is None:
+        positive_columns, negative_columns = paired_columns(df.columns)
+    positive_columns, negative_columns = _check_pairs(positive_columns, negative_columns)
+    positive = _column_positions(df.columns, positive_columns)
+    negative = _column_positions(df.columns, negative_columns)
+    accumulator = KanoAccumulator(positive_columns)
+    for start in range(0, len(df), KANO_CHUNK_ROWS):
+        block = df.iloc[start:start + KANO_CHUNK_ROWS]
+        accumulator.update(np.column_stack([numeric_cells(block.iloc[:, i]) for i in positive]),
+                           np.column_stack([numeric_cells(block.iloc[:, i]) for i in negative]))
+    return accumulator.result()
+
+
+def kano_analysis_stream(batches, positive_columns=None, negative_columns=None):
+    """
+    对流式数据进行 KANO 分类
+    :param batches: 产生 (表头, 浮点数组) 的迭代器，例如 dias.dataset.iter_numeric_batches
+    :param positive_columns: 正向问题的列名，默认按 paired_columns 取相邻两列为一对
+    :param negative_columns: 对应的反向问题列名
+    :return: KanoResult
+    """
+    accumulator = None
+    for header, batch in batches:
+        if accumulator is None:
+            # 默认的问题列要等读到表头后才能确定
+            if positive_columns is None:
+                positive_columns, negative_columns = paired_columns(header)
+            positive_columns, negative_columns = _check_pairs(positive_columns, negative_columns)
+            positive = _column_positions(header, positive_columns)
+            negative = _column_positions(header, negative_columns)
+            accumulator = KanoAccumulator(positive_columns)
+        accumulator.update(batch[:, positive], batch[:, negative])
+    if accumulator is None:
+        raise ValueError("工作簿中没有数据。")
+    return accumulator.result()
@@ -0,0 +1,252 @@
+"""
+中介效应和调节中介效应：逐步回归的系数和 p 值，以及间接效应的 bootstrap 区间；调节效应：交互项回归
+
+间接效应 a·b 的抽样分布不是正态分布，用 bootstrap 区间代替 Sobel 检验。
+每个统计量函数接收 (B, n) 的权重矩阵，用 weighted_lstsq 一次求解 B 组回归；
+BCa 所需的刀切值由 loo_lstsq 的留一法闭式解得到，两者共用同一段由系数计算效应的代码。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from dias.compute.base import AnalysisResult
+from dias.compute.bootstrap import BOOTSTRAP_REPLICATES, CONFIDENCE_LEVEL, bootstrap_ci, loo_lstsq, weighted_lstsq
+
+# 条件间接效应取调节变量的均值减一个标准差、均值、均值加一个标准差
+MODERATOR_LEVELS = (-1, 0, 1)
+
+
+def _complete_rows(df, columns):
+    # 未指定列名时按列的顺序取用；只使用完整的数值行
+    if any(c is None for c in columns):
+        if df.shape[1] < len(columns):
+            raise ValueError(f"数据至少需要 {len(columns)} 列。")
+        columns = [df.columns[j] if c is None else c for j, c in enumerate(columns)]
+    missing = [str(c) for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"找不到列：{', '.join(missing)}")
+    data = df[list(columns)].apply(pd.to_numeric, errors='coerce').dropna()
+    if len(data) <= len(columns) + 1:
+        raise ValueError("完整的数值行太少，无法进行回归。")
+    return data, columns
+
+
+def _fit(data, target, predictors, term):
+    model = sm.OLS(data[target], sm.add_constant(data[predictors])).fit()
+    return float(model.params[term]), float(model.pvalues[term])
+
+
+def _mediation_effects(solve, x, m, y):
+    ones = np.ones_like(x)
+    # M = i1 + a·X，Y = i2 + c'·X + b·M
+    a = solve(np.column_stack([ones, x]), m)[:, 1]
+    coef = solve(np.column_stack([ones, x, m]), y)
+    direct, b = coef[:, 1], coef[:, 2]
+    return np.column_stack([a, b, a * b, direct, a * b + direct])
+
+
+def _mediation_statistic(W, x, m, y):
+    return _mediation_effects(lambda X, target: weighted_lstsq(W, X, target), x, m, y)
+
+
+def _mediation_jackknife(x, m, y):
+    return _mediation_effects(loo_lstsq, x, m, y)
+
+
+@dataclass
+class MediationResult(AnalysisResult):
+    ind_var: str
+    med_var: str
+    dep_var: str
+    # 总效应 c、路径 a (X→M)、路径 b (M→Y | X) 的系数和 p 值，间接效应 a·b
+    total_effect: float
+    p_total: float
+    effect_ind_med: float
+    p_ind_med: float
+    effect_med_dep: float
+    p_med_dep: float
+    mediation_effect: float
+    nobs: int
+    # 间接效应等的 bootstrap 区间，attrs 中记录重抽样次数、随机种子和置信水平
+    bootstrap: pd.DataFrame
+
+
+def mediation_analysis(df, ind_var=None, med_var=None, dep_var=None, n_boot=BOOTSTRAP_REPLICATES, seed=None,
+                       workers=None):
+    """
+    简单中介模型：三步回归的系数和 p 值，以及间接效应的 bootstrap 区间
+    :param df: 输入数据，含缺失值或非数字单元格的行不参与计算
+    :param ind_var: 自变量列名，未指定时取第一列
+    :param med_var: 中介变量列名，未指定时取第二列
+    :param dep_var: 因变量列名，未指定时取第三列
+    :param n_boot: 重抽样次数
+    :param seed: 随机种子
+    :param workers: 工作进程数
+    :return: MediationResult
+    """
+    data, (ind_var, med_var, dep_var) = _complete_rows(df, (ind_var, med_var, dep_var))
+    total_effect, p_total = _fit(data, dep_var, [ind_var], ind_var)
+    effect_ind_med, p_ind_med = _fit(data, med_var, [ind_var], ind_var)
+    effect_med_dep, p_med_dep = _fit(data, dep_var, [ind_var, med_var], med_var)
+    return MediationResult(
+        ind_var=str(ind_var), med_var=str(med_var), dep_var=str(dep_var),
+        total_effect=total_effect, p_total=p_total, effect_ind_med=effect_ind_med, p_ind_med=p_ind_med,
+        effect_med_dep=effect_med_dep, p_med_dep=p_med_dep, mediation_effect=effect_ind_med * effect_med_dep,
+        nobs=len(data),
+        bootstrap=indirect_effect_ci(data, ind_var, med_var, dep_var, n_boot=n_boot, seed=seed, workers=workers))
+
+
+def indirect_effect_ci(df, ind_var, med_var, dep_var, n_boot=BOOTSTRAP_REPLICATES, confidence=CONFIDENCE_LEVEL,
+                       seed=None, workers=None):
+    """
+    简单中介模型的 bootstrap 区间
+    :param df: 输入数据，含缺失值的行不参与计算
+    :param ind_var: 自变量列名
+    :param med_var: 中介变量列名
+    :param dep_var: 因变量列名
+    :param n_boot: 重抽样次数
+    :param confidence: 置信水平
+    :param seed: 随机种子
+    :param workers: 工作进程数
+    :return: bootstrap_ci 返回的 DataFrame，行为 a、b、间接效应 a·b、直接效应 c' 和总效应
+    """
+    data = df[[ind_var, med_var, dep_var]].astype(float).dropna()
+    names = ["a (X→M)", "b (M→Y | X)", "Indirect effect a·b", "Direct effect c'", "Total effect c"]
+    return bootstrap_ci(_mediation_statistic, (data[ind_var], data[med_var], data[dep_var]), names,
+                        n_boot=n_boot, confidence=confidence, seed=seed, workers=workers,
+                        jackknife=_mediation_jackknife)
+
+
+@dataclass
+class ModerationResult(AnalysisResult):
+    ind_var: str
+    mod_var: str
+    dep_var: str
+    # 自变量、调节变量各自单独回归的主效应，以及含交互项回归中交互项 X·W 的系数和 p 值
+    effect_ind: float
+    p_ind: float
+    effect_mod: float
+    p_mod: float
+    moderation_effect: float
+    p_moderation: float
+    nobs: int
+
+
+def moderation_analysis(df, ind_var=None, mod_var=None, dep_var=None):
+    """
+    调节效应：Y 对 X、W 和交互项 X·W 回归，交互项显著即存在调节作用
+    :param df: 输入数据，含缺失值或非数字单元格的行不参与计算
+    :param ind_var: 自变量列名，未指定时取第一列
+    :param mod_var: 调节变量列名，未指定时取第二列
+    :param dep_var: 因变量列名，未指定时取第三列
+    :return: ModerationResult
+    """
+    data, (ind_var, mod_var, dep_var) = _complete_rows(df, (ind_var, mod_var, dep_var))
+    effect_ind, p_ind = _fit(data, dep_var, [ind_var], ind_var)
+    effect_mod, p_mod = _fit(data, dep_var, [mod_var], mod_var)
+    data = data.assign(interaction=data[ind_var] * data[mod_var])
+    moderation_effect, p_moderation = _fit(data, dep_var, [ind_var, mod_var, 'interaction'], 'interaction')
+    return ModerationResult(
+        ind_var=str(ind_var), mod_var=str(mod_var), dep_var=str(dep_var), effect_ind=effect_ind, p_ind=p_ind,
+        effect_mod=effect_mod, p_mod=p_mod, moderation_effect=moderation_effect, p_moderation=p_moderation,
+        nobs=len(data))
+
+
+def _moderated_mediation_effects(solve, x, m, y, w, levels):
+    ones = np.ones_like(x)
+    # M = i1 + a1·X + a2·W + a3·X·W，Y = i2 + c'·X + b1·M + b2·W + b3·M·W
+    a = solve(np.column_stack([ones, x, w, x * w]), m)
+    b = solve(np.column_stack([ones, x, m, w, m * w]), y)
+    # 调节变量取 levels 中各值时的条件间接效应 (a1 + a3·w)(b1 + b3·w)
+    first = a[:, [1]] + a[:, [3]] * levels[None, :]
+    second = b[:, [2]] + b[:, [4]] * levels[None, :]
+    return first * second
+
+
+def _moderated_mediation_statistic(W, x, m, y, w, levels):
+    return _moderated_mediation_effects(lambda X, target: weighted_lstsq(W, X, target), x, m, y, w, levels)
+
+
+def _moderated_mediation_jackknife(x, m, y, w, levels):
+    return _moderated_mediation_effects(loo_lstsq, x, m, y, w, levels)
+
+
+def conditional_indirect_ci(df, ind_var, med_var, dep_var, mod_var, n_boot=BOOTSTRAP_REPLICATES,
+                            confidence=CONFIDENCE_LEVEL, seed=None, workers=None):
+    """
+    调节中介模型（调节变量同时调节前后两段路径）在调节变量不同取值处的条件间接效应及其 bootstrap 区间
+    :param df: 输入数据，含缺失值的行不参与计算
+    :param ind_var: 自变量列名
+    :param med_var: 中介变量列名
+    :param dep_var: 因变量列名
+    :param mod_var: 调节变量列名
+    :param n_boot: 重抽样次数
+    :param confidence: 置信水平
+    :param seed: 随机种子
+    :param workers: 工作进程数
+    :return: bootstrap_ci 返回的 DataFrame，行为调节变量的均值 -1SD、均值、+1SD 处的条件间接效应
+    """
+    data = df[[ind_var, med_var, dep_var, mod_var]].astype(float).dropna()
+    mean, sd = data[mod_var].mean(), data[mod_var].std()
+    levels = np.array([mean + k * sd for k in MODERATOR_LEVELS])
+    names = [f"{mod_var} = {level:.4g} ({label})" for level, label in zip(levels, ("M-1SD", "M", "M+1SD"))]
+    return bootstrap_ci(_moderated_mediation_statistic, (data[ind_var], data[med_var], data[dep_var], data[mod_var]),
+                        names, args=(levels,), n_boot=n_boot, confidence=confidence, seed=seed, workers=workers,
+                        jackknife=_moderated_mediation_jackknife)
+
+
+@dataclass
+class ModeratedMediationResult(AnalysisResult):
+    ind_var: str
+    med_var: str
+    dep_var: str
+    mod_var: str
+    # 各步回归中关注的系数和 p 值，间接效应 a·b 取不含交互项的两段路径
+    total_effect: float
+    p_total: float
+    effect_ind_med: float
+    p_ind_med: float
+    effect_mod_ind_med: float
+    p_mod_ind_med: float
+    effect_med_dep: float
+    p_med_dep: float
+    effect_mod_med_dep: float
+    p_mod_med_dep: float
+    mediation_effect: float
+    nobs: int
+    # 条件间接效应的 bootstrap 区间
+    bootstrap: pd.DataFrame
+
+
+def moderated_mediation_analysis(df, ind_var=None, med_var=None, dep_var=None, mod_var=None,
+                                 n_boot=BOOTSTRAP_REPLICATES, seed=None, workers=None):
+    """
+    调节中介模型：逐步回归的系数和 p 值，以及条件间接效应的 bootstrap 区间
+    :param df: 输入数据，含缺失值或非数字单元格的行不参与计算
+    :param ind_var: 自变量列名，未指定时取第一列
+    :param med_var: 中介变量列名，未指定时取第二列
+    :param dep_var: 因变量列名，未指定时取第三列
+    :param mod_var: 调节变量列名，未指定时取第四列
+    :param n_boot: 重抽样次数
+    :param seed: 随机种子
+    :param workers: 工作进程数
+    :return: ModeratedMediationResult
+    """
+    data, (ind_var, med_var, dep_var, mod_var) = _complete_rows(df, (ind_var, med_var, dep_var, mod_var))
+    data = data.assign(ind_mod=data[ind_var] * data[mod_var], med_mod=data[med_var] * data[mod_var])
+    total_effect, p_total = _fit(data, dep_var, [ind_var], ind_var)
+    effect_ind_med, p_ind_med = _fit(data, med_var, [ind_var], ind_var)
+    effect_mod_ind_med, p_mod_ind_med = _fit(data, med_var, [ind_var, mod_var, 'ind_mod'], 'ind_mod')
+    effect_med_dep, p_med_dep = _fit(data, dep_var, [ind_var, med_var], med_var)
+    effect_mod_med_dep, p_mod_med_dep = _fit(data, dep_var, [ind_var, med_var, mod_var, 'med_mod'], 'med_mod')
+    return ModeratedMediationResult(
+        ind_var=str(ind_var), med_var=str(med_var), dep_var=str(dep_var), mod_var=str(mod_var),
+        total_effect=total_effect, p_total=p_total, effect_ind_med=effect_ind_med, p_ind_med=p_ind_med,
+        effect_mod_ind_med=effect_mod_ind_med, p_mod_ind_med=p_mod_ind_med,
+        effect_med_dep=effect_med_dep, p_med_dep=p_med_dep,
+        effect_mod_med_dep=effect_mod_med_dep, p_mod_med_dep=p_mod_med_dep,
+        mediation_effect=effect_ind_med * effect_med_dep, nobs=len(data),
+        bootstrap=conditional_indirect_ci(data, ind_var, med_var, dep_var, mod_var, n_boot=n_boot, seed=seed,
+                                          workers=workers))
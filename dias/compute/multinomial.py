@@ -0,0 +1,209 @@
+"""
+多分类 Logit 回归（以第一个类别为参照的多项 Logit 模型）
+
+所有类别的系数在一次最大似然估计中联合求出：
+- 对数似然的梯度 X'(Y - P) 和海森矩阵的各块 -X' diag(p_j (δ_jl - p_l)) X 都有解析式，用牛顿法迭代，
+  对数似然下降时步长减半；稠密时所有块的交叉项由一次矩阵乘法 M'M 得到，M 的每行为 p_i ⊗ x_i
+- 标准误取收敛点的信息矩阵（负海森矩阵）的逆，z 值、p 值、准确率和 AUC 都来自同一个模型
+- 文本型自变量按水平展开为 0/1 变量（第一个水平为参照），此时设计矩阵为 CSR 稀疏矩阵，
+  加权的 X'WX 只在非零元上计算
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from scipy.linalg import LinAlgError, cho_factor, cho_solve
+from scipy.special import logsumexp
+from sklearn.metrics import roc_auc_score
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+MAX_ITER = 100
+# 参数的最大变化量小于该值时认为收敛
+TOLERANCE = 1e-8
+# 分类自变量展开后，设计矩阵非零元的比例低于该值时保持稀疏存储，否则转为稠密数组
+SPARSE_DENSITY = 0.1
+# 计算信息矩阵时每次处理的行数，限制 M 的内存占用
+ROW_CHUNK = 4096
+
+
+def design_matrix(df):
+    """
+    最后一列为因变量（类别），其余列为自变量；含非数字单元格的自变量按分类变量展开，含缺失值的行不参与分析
+    :param df: 输入数据
+    :return: (含常数项的设计矩阵（分类自变量展开后足够稀疏时为 CSR 稀疏矩阵）, 因变量的类别编码, 类别列表, 设计矩阵的列名, 因变量名)
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列自变量和一列因变量。")
+    target = df.iloc[:, -1]
+    keep = target.notna().to_numpy().copy()
+    numeric, categorical = [], []
+    for name, column in df.iloc[:, :-1].items():
+        values = numeric_cells(column)
+        present = column.notna().to_numpy()
+        if (np.isnan(values) & present).any():
+            categorical.append((str(name), column))
+            keep &= present
+        else:
+            numeric.append((str(name), values))
+            keep &= ~np.isnan(values)
+    n = int(keep.sum())
+    codes, classes = pd.factorize(target[keep], sort=True)
+    if len(classes) < 2:
+        raise ValueError("因变量至少需要两个类别。")
+
+    names = ["Intercept"] + [name for name, _ in numeric]
+    X = np.column_stack([np.ones(n)] + [values[keep] for _, values in numeric])
+    if categorical:
+        blocks = [sparse.csr_matrix(X)]
+        for name, column in categorical:
+            level_codes, levels = pd.factorize(column[keep].astype(str), sort=True)
+            rows = np.flatnonzero(level_codes > 0)
+            blocks.append(sparse.csr_matrix((np.ones(len(rows)), (rows, level_codes[rows] - 1)),
+                                            shape=(n, len(levels) - 1)))
+            names.extend(f"{name}={level}" for level in levels[1:])
+        X = sparse.hstack(blocks, format="csr")
+        if X.nnz > SPARSE_DENSITY * n * X.shape[1]:
+            X = X.toarray()
+    if n <= len(names):
+        raise ValueError("完整的行数少于参数个数，无法进行多分类 Logit 回归。")
+    return X, codes, list(classes), names, str(df.columns[-1])
+
+
+def weighted_gram(X, w):
+    """
+    X' diag(w) X，X 可以是稠密数组或稀疏矩阵
+    """
+    if sparse.issparse(X):
+        return (X.T @ sparse.csr_matrix(X.multiply(w[:, None]))).toarray()
+    return X.T @ (X * w[:, None])
+
+
+def information_matrix(X, P):
+    """
+    多项 Logit 模型的信息矩阵（负的海森矩阵），参数按类别分块排列
+    :param X: 设计矩阵
+    :param P: 非参照类别的预测概率，(n, 类别数 - 1)
+    :return: 第 (j, l) 块为 X' diag(p_j (δ_jl - p_l)) X 的对称矩阵
+    """
+    p, m = X.shape[1], P.shape[1]
+    info = np.zeros((p * m, p * m))
+    if sparse.issparse(X):
+        # 稀疏时逐块计算，利用对称性只计算 j ≤ l 的块
+        for j in range(m):
+            for l in range(j, m):
+                block = weighted_gram(X, P[:, j] * ((j == l) - P[:, l]))
+                info[j * p:(j + 1) * p, l * p:(l + 1) * p] = block
+                if l != j:
+                    info[l * p:(l + 1) * p, j * p:(j + 1) * p] = block.T
+        return info
+    # 稠密时 info = blockdiag(X' diag(p_j) X) - M'M，按行分段累加
+    for start in range(0, len(X), ROW_CHUNK):
+        rows = slice(start, start + ROW_CHUNK)
+        M = (P[rows, :, None] * X[rows, None, :]).reshape(-1, p * m)
+        info -= M.T @ M
+    for j in range(m):
+        info[j * p:(j + 1) * p, j * p:(j + 1) * p] += weighted_gram(X, P[:, j])
+    return info
+
+
+def _log_likelihood(X, beta, codes):
+    # 参照类别的线性预测值为 0，返回 (对数似然, 各类别的预测概率)
+    eta = np.zeros((X.shape[0], beta.shape[1] + 1))
+    eta[:, 1:] = X @ beta
+    log_norm = logsumexp(eta, axis=1)
+    return float(eta[np.arange(len(codes)), codes].sum() - log_norm.sum()), np.exp(eta - log_norm[:, None])
+
+
+@dataclass
+class MultinomialResult(AnalysisResult):
+    classes: list
+    # 参照类别
+    reference: object
+    # 每个非参照类别、每个变量的系数、标准误、z 值、p 值和相对风险比 exp(B)
+    coefficients: pd.DataFrame
+    # 对数似然、似然比检验、伪 R²、AIC、BIC、准确率、ROC-AUC 和迭代次数
+    statistics: pd.DataFrame
+    converged: bool
+    target: str
+    outcomes: np.ndarray = field(default=None, metadata={"export": False})
+    probabilities: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def multinomial_logit(df, max_iter=MAX_ITER, tol=TOLERANCE):
+    """
+    多分类 Logit 回归，一次联合拟合得到所有类别的系数和标准误
+    :param df: 最后一列为因变量，其余列为自变量
+    :param max_iter: 牛顿法的最大迭代次数
+    :param tol: 参数的最大变化量小于该值时停止迭代
+    :return: MultinomialResult
+    """
+    X, codes, classes, names, target = design_matrix(df)
+    n, p = X.shape
+    K = len(classes)
+    Y = np.eye(K)[codes]
+    counts = Y.sum(axis=0)
+
+    # 初值：只有常数项的模型的最大似然估计
+    beta = np.zeros((p, K - 1))
+    beta[0] = np.log(counts[1:] / counts[0])
+    ll, P = _log_likelihood(X, beta, codes)
+    converged = False
+    iterations = 0
+    while True:
+        info = information_matrix(X, P[:, 1:])
+        if converged or iterations == max_iter:
+            break
+        gradient = np.asarray(X.T @ (Y[:, 1:] - P[:, 1:])).T.ravel()
+        try:
+            step = cho_solve(cho_factor(info), gradient)
+        except LinAlgError:
+            step = np.linalg.lstsq(info, gradient, rcond=None)[0]
+        step = step.reshape(K - 1, p).T
+        t = 1.0
+        while True:
+            candidate_ll, candidate_P = _log_likelihood(X, beta + t * step, codes)
+            if candidate_ll >= ll or t < 1e-10:
+                break
+            t /= 2
+        beta = beta + t * step
+        ll, P = candidate_ll, candidate_P
+        iterations += 1
+        converged = np.abs(t * step).max() < tol
+
+    try:
+        covariance = cho_solve(cho_factor(info), np.eye(len(info)))
+    except LinAlgError:
+        # 完全分离或共线时信息矩阵奇异，取伪逆
+        covariance = np.linalg.pinv(info, hermitian=True)
+    se = np.sqrt(np.clip(np.diag(covariance), 0, None)).reshape(K - 1, p)
+    coef = beta.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = coef / se
+    coefficients = pd.DataFrame({
+        "Class": np.repeat(classes[1:], p),
+        "Variable": np.tile(names, K - 1),
+        "Coefficient": coef.ravel(),
+        "Std. Error": se.ravel(),
+        "z-value": z.ravel(),
+        "p-value": 2 * stats.norm.sf(np.abs(z.ravel())),
+        "Relative Risk Ratio": np.exp(coef.ravel()),
+    })
+
+    ll_null = float(counts @ np.log(counts / n))
+    k = p * (K - 1)
+    llr = 2 * (ll - ll_null)
+    if K == 2:
+        macro_auc = roc_auc_score(codes, P[:, 1])
+    else:
+        macro_auc = roc_auc_score(codes, P, multi_class="ovr")
+    statistics = pd.DataFrame({
+        "Statistic": ["Log-Likelihood", "LL-Null", "LLR", "LLR p-value", "Pseudo R-squared (McFadden)", "AIC", "BIC",
+                      "Accuracy", "ROC-AUC (Micro-average)", "ROC-AUC (Macro-average)", "Iterations"],
+        "Value": [ll, ll_null, llr, stats.chi2.sf(llr, k - (K - 1)) if k > K - 1 else np.nan, 1 - ll / ll_null,
+                  2 * k - 2 * ll, k * np.log(n) - 2 * ll, float((P.argmax(axis=1) == codes).mean()),
+                  roc_auc_score(Y.ravel(), P.ravel()), macro_auc, iterations],
+    })
+    return MultinomialResult(classes=classes, reference=classes[0], coefficients=coefficients, statistics=statistics,
+                             converged=bool(converged), target=target, outcomes=codes, probabilities=P)
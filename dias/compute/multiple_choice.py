@@ -0,0 +1,169 @@
+"""
+多选题分析
+
+每个单元格中的多个选项以分隔符（默认逗号）隔开，所有列的选项合并为一个选项集合。
+数据按行分批处理：每批的单元格用 pandas 字符串方法一次切分，选项通过逐批增长的词表映射为编号，
+构成 (受访者, 选项) 的稀疏 0/1 指示矩阵 X。选项的选择人数为 X 的列和，共现矩阵为 X'X，
+两者逐批累加，原始文本在一批处理完后即被释放，内存占用只与选项数有关。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # 未安装 pyarrow 时用 pandas 字符串方法切分
+    pa = None
+
+from dias.compute.base import AnalysisResult
+
+SEPARATOR = ","
+# DataFrame 输入时每批的行数
+FRAME_BATCH_SIZE = 65536
+# 报告中共现矩阵最多包含的选项数（按选择人数取前若干个）
+MAX_MATRIX_OPTIONS = 30
+
+
+def _cell_text(values):
+    # 整数值的浮点数（例如含缺失值的数字列中的 1.0）按整数输出，与单元格中的写法一致
+    return values.astype(str).str.replace(r"^(-?\d+)\.0$", r"\1", regex=True)
+
+
+def _split_arrow(text, separator):
+    # Arrow 的字符串内核一次切分整列，父索引即每个选项所在的单元格
+    lists = pc.split_pattern(pa.array(text, type=pa.string()), separator)
+    tokens = pc.utf8_trim_whitespace(pc.list_flatten(lists))
+    parents = pc.list_parent_indices(lists).to_numpy()
+    keep = pc.not_equal(tokens, "")
+    encoded = pc.filter(tokens, keep).dictionary_encode()
+    return (parents[keep.to_numpy(zero_copy_only=False)], encoded.indices.to_numpy(zero_copy_only=False),
+            pd.Index(encoded.dictionary.to_pylist(), dtype=object))
+
+
+def _split_pandas(text, separator):
+    tokens = pd.Series(text).str.split(separator).explode().str.strip()
+    tokens = tokens[tokens != ""]
+    codes, uniques = pd.factorize(tokens)
+    return tokens.index.to_numpy(), codes, pd.Index(uniques, dtype=object)
+
+
+def tokenize(cells, separator=SEPARATOR):
+    """
+    切分一批单元格
+    :param cells: (行数, 列数) 的对象数组或 DataFrame，空白单元格为 None / NaN
+    :param separator: 选项分隔符
+    :return: (行号, 批内选项编号, 批内选项)，前两者为长度相同的数组，每个元素为一次选择；行号为批内的行序号
+    """
+    frame = pd.DataFrame(np.asarray(cells, dtype=object))
+    # 展开为以 (行号, 列号) 为索引的一列，去掉空白单元格
+    stacked = frame.stack()
+    stacked = stacked[stacked.notna()]
+    text = _cell_text(stacked).to_numpy(dtype=object)
+    cell_rows = stacked.index.get_level_values(0).to_numpy()
+    if pa is not None:
+        parents, codes, uniques = _split_arrow(text, separator)
+    else:
+        parents, codes, uniques = _split_pandas(text, separator)
+    return cell_rows[parents], codes, uniques
+
+
+@dataclass
+class MultipleChoiceResult(AnalysisResult):
+    # 行为选项（按选择人数从多到少），列为选择人数、占受访者百分比、占全部选择百分比
+    counts: pd.DataFrame
+    # 选择人数最多的 MAX_MATRIX_OPTIONS 个选项之间的共现人数，对角线为选择人数
+    cooccurrence: pd.DataFrame
+    # 总行数和至少选择了一个选项的人数
+    sample_size: int
+    respondents: int
+    # 全部选项的稀疏共现矩阵，行列顺序与 counts 相同
+    matrix: sparse.csr_matrix = field(default=None, metadata={"export": False})
+
+
+class MultipleChoiceAccumulator:
+    """
+    分批累计选项的选择人数和共现矩阵
+    """
+
+    def __init__(self, separator=SEPARATOR):
+        self.separator = separator
+        self.options = pd.Index([], dtype=object)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.cooccurrence = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self.sample_size = 0
+        self.respondents = 0
+
+    def _codes(self, codes, uniques):
+        # 批内的选项查词表，词表中没有的按出现顺序追加，再把批内编号映射为全局编号
+        mapping = self.options.get_indexer(uniques)
+        if (mapping < 0).any():
+            self.options = self.options.append(uniques[mapping < 0])
+            mapping = self.options.get_indexer(uniques)
+        return mapping[codes]
+
+    def update(self, cells):
+        """
+        :param cells: 一批数据，(行数, 列数) 的对象数组或 DataFrame
+        """
+        n_rows = len(cells)
+        rows, codes, uniques = tokenize(cells, self.separator)
+        codes = self._codes(codes, uniques)
+        k = len(self.options)
+        # 同一受访者重复选择同一选项只计一次
+        indicator = sparse.csr_matrix((np.ones(len(codes), dtype=np.int64), (rows, codes)), shape=(n_rows, k))
+        indicator.sum_duplicates()
+        indicator.data[:] = 1
+
+        if k > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(k - len(self.counts), dtype=np.int64)])
+            self.cooccurrence.resize((k, k))
+        self.counts += np.asarray(indicator.sum(axis=0)).ravel()
+        self.cooccurrence = self.cooccurrence + (indicator.T @ indicator).tocsr()
+        self.sample_size += n_rows
+        self.respondents += int((np.diff(indicator.indptr) > 0).sum())
+
+    def result(self, max_matrix_options=MAX_MATRIX_OPTIONS):
+        order = np.argsort(-self.counts, kind="stable")
+        options = [str(o) for o in self.options[order]]
+        total = self.counts.sum()
+        counts = pd.DataFrame({
+            "Count": self.counts[order],
+            "Percent of Respondents": self.counts[order] / self.respondents * 100 if self.respondents else np.nan,
+            "Percent of Responses": self.counts[order] / total * 100 if total else np.nan,
+        }, index=options)
+        matrix = self.cooccurrence[order][:, order].tocsr()
+        top = slice(0, max_matrix_options)
+        cooccurrence = pd.DataFrame(matrix[top, top].toarray(), index=options[top], columns=options[top])
+        return MultipleChoiceResult(counts=counts, cooccurrence=cooccurrence, sample_size=self.sample_size,
+                                    respondents=self.respondents, matrix=matrix)
+
+
+def multiple_choice_analysis(df, separator=SEPARATOR, max_matrix_options=MAX_MATRIX_OPTIONS):
+    """
+    多选题的选项选择人数和共现矩阵
+    :param df: 输入数据，每行为一位受访者，所有列的选项合并统计
+    :param separator: 选项分隔符
+    :param max_matrix_options: 结果中共现矩阵表保留的选项数
+    :return: MultipleChoiceResult
+    """
+    accumulator = MultipleChoiceAccumulator(separator)
+    for start in range(0, len(df), FRAME_BATCH_SIZE):
+        accumulator.update(df.iloc[start:start + FRAME_BATCH_SIZE])
+    return accumulator.result(max_matrix_options)
+
+
+def multiple_choice_stream(batches, separator=SEPARATOR, max_matrix_options=MAX_MATRIX_OPTIONS):
+    """
+    对流式数据进行多选题分析
+    :param batches: 产生 (表头, 对象数组) 的迭代器，例如 dias.dataset.iter_cell_batches
+    :param separator: 选项分隔符
+    :param max_matrix_options: 结果中共现矩阵表保留的选项数
+    :return: MultipleChoiceResult
+    """
+    accumulator = MultipleChoiceAccumulator(separator)
+    for _, batch in batches:
+        accumulator.update(batch)
+    return accumulator.result(max_matrix_options)
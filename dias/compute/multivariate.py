@@ -0,0 +1,188 @@
+"""
+多元统计：因子分析、主成分分析、典型相关分析、判别分析和多维尺度分析
+
+主成分分析、典型相关分析和判别分析以带表头的方式读取，只使用所有变量都有值的行；
+多维尺度分析的表头行和名称列在 numeric_matrix 中去掉。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sklearn.cross_decomposition import CCA
+from sklearn.decomposition import PCA
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from sklearn.manifold import MDS
+from sklearn.metrics import classification_report, confusion_matrix
+
+from dias.compute.base import AnalysisResult, numeric_cells, numeric_matrix
+from dias.compute.hypothesis import numeric_rows
+
+RANDOM_STATE = 42
+
+
+@dataclass
+class FactorResult(AnalysisResult):
+    # 旋转后的因子载荷矩阵，行为变量，列为因子
+    loadings: pd.DataFrame
+    # 各变量的共同度
+    communalities: pd.Series
+    # 相关矩阵的特征值（原始特征值）和公因子特征值
+    eigenvalues: np.ndarray
+    common_eigenvalues: np.ndarray
+    # Bartlett 球形检验的卡方值和 p 值
+    bartlett_chi2: float
+    bartlett_p: float
+    # 总体 KMO 值
+    kmo: float
+
+
+def factor_analysis(df):
+    """
+    探索性因子分析：保留特征值大于 1 的因子，做方差最大旋转
+    :param df: 每列一个变量
+    :return: FactorResult
+    """
+    # factor_analyzer 只在因子分析中使用，按需导入，使 dias.compute 在未安装时仍可导入
+    from factor_analyzer import FactorAnalyzer
+    from factor_analyzer.factor_analyzer import calculate_bartlett_sphericity, calculate_kmo
+
+    chi_square_value, p_value = calculate_bartlett_sphericity(df)
+    _, kmo_model = calculate_kmo(df)
+
+    # 先以默认设置拟合一次，得到特征值以确定因子数量
+    fa = FactorAnalyzer()
+    fa.fit(df)
+    ev, v = fa.get_eigenvalues()
+    num_factors = int(np.sum(ev > 1))
+    if num_factors == 0:
+        raise ValueError("没有特征值大于 1 的因子，无法进行因子分析。")
+
+    fa = FactorAnalyzer(n_factors=num_factors, rotation='varimax')
+    fa.fit(df)
+    columns = [str(c) for c in df.columns]
+    factor_names = [f'因子{i + 1}' for i in range(num_factors)]
+    return FactorResult(
+        loadings=pd.DataFrame(fa.loadings_, index=columns, columns=factor_names),
+        communalities=pd.Series(fa.get_communalities(), index=columns),
+        eigenvalues=np.asarray(ev), common_eigenvalues=np.asarray(v),
+        bartlett_chi2=float(chi_square_value), bartlett_p=float(p_value), kmo=float(kmo_model))
+
+
+@dataclass
+class PcaResult(AnalysisResult):
+    # 各变量在保留的主成分上的载荷（主成分方向向量），行为变量
+    loadings: pd.DataFrame
+    # 各样本在保留的主成分上的得分
+    scores: pd.DataFrame
+    # 全部主成分的特征值和方差贡献率
+    eigenvalues: np.ndarray
+    variance_ratio: np.ndarray
+
+
+def principal_components(df):
+    """
+    主成分分析：保留特征值大于 1 的主成分，至少保留一个
+    :param df: 每列一个变量
+    :return: PcaResult
+    """
+    data = numeric_rows(df, "数据中没有数值列，无法进行主成分分析。")
+    if data.shape[0] < 2:
+        raise ValueError("至少需要两个完整的样本才能进行主成分分析。")
+    full = PCA().fit(data)
+    num_components = max(1, int(np.sum(full.explained_variance_ > 1)))
+    pca = PCA(n_components=num_components)
+    scores = pca.fit_transform(data)
+    names = [f'主成分{i + 1}' for i in range(num_components)]
+    return PcaResult(loadings=pd.DataFrame(pca.components_.T, index=data.columns, columns=names),
+                     scores=pd.DataFrame(scores, columns=names), eigenvalues=full.explained_variance_,
+                     variance_ratio=full.explained_variance_ratio_)
+
+
+@dataclass
+class CanonicalResult(AnalysisResult):
+    x_vars: list
+    y_vars: list
+    # 各对典型变量之间的相关系数
+    correlations: np.ndarray
+    # 两组典型变量的得分，用于散点图
+    x_scores: np.ndarray = field(default=None, metadata={"export": False})
+    y_scores: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def canonical_correlation(df):
+    """
+    典型相关分析，前一半列为第一组变量，后一半列为第二组变量，典型变量对数为两组变量数的较小者
+    :param df: 每列一个变量
+    :return: CanonicalResult
+    """
+    data = numeric_rows(df, "数据中没有数值列，无法进行典型相关分析。")
+    if data.shape[1] < 2:
+        raise ValueError("至少需要两列数值数据才能进行典型相关分析。")
+    mid = data.shape[1] // 2
+    X, Y = data.iloc[:, :mid], data.iloc[:, mid:]
+    n_components = min(X.shape[1], Y.shape[1])
+    if data.shape[0] <= n_components:
+        raise ValueError("完整样本数太少，无法进行典型相关分析。")
+    x_scores, y_scores = CCA(n_components=n_components).fit(X, Y).transform(X, Y)
+    correlations = np.array([np.corrcoef(x_scores[:, i], y_scores[:, i])[0, 1] for i in range(n_components)])
+    return CanonicalResult(x_vars=list(X.columns), y_vars=list(Y.columns), correlations=correlations,
+                           x_scores=x_scores, y_scores=y_scores)
+
+
+@dataclass
+class DiscriminantResult(AnalysisResult):
+    classes: list
+    # 在训练样本上回代的分类报告：各类别及 accuracy、macro avg、weighted avg 的 precision、recall、f1-score、support
+    report: pd.DataFrame
+    # 混淆矩阵，行为真实类别，列为预测类别
+    confusion: pd.DataFrame
+    accuracy: float
+
+
+def discriminant_analysis(df):
+    """
+    线性判别分析
+    :param df: 最后一列为类别变量，其余数值列为特征变量，只使用所有列都有值的行
+    :return: DiscriminantResult
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列特征变量和一列类别变量。")
+    features = pd.DataFrame({str(name): numeric_cells(series) for name, series in df.iloc[:, :-1].items()})
+    features = features.dropna(axis=1, how='all')
+    if features.empty:
+        raise ValueError("数据中没有数值特征，无法进行判别分析。")
+    data = features.assign(_class=df.iloc[:, -1].to_numpy()).dropna()
+    X, y = data[features.columns], data["_class"].astype(str)
+    if y.nunique() < 2:
+        raise ValueError("类别变量至少需要两个类别。")
+    lda = LinearDiscriminantAnalysis().fit(X, y)
+    y_pred = lda.predict(X)
+    classes = [str(c) for c in lda.classes_]
+    report = pd.DataFrame(classification_report(y, y_pred, output_dict=True, zero_division=0)).transpose()
+    confusion = pd.DataFrame(confusion_matrix(y, y_pred, labels=lda.classes_), index=classes, columns=classes)
+    return DiscriminantResult(classes=classes, report=report, confusion=confusion,
+                              accuracy=float((y_pred == y.to_numpy()).mean()))
+
+
+@dataclass
+class MdsResult(AnalysisResult):
+    # 每个对象在二维空间中的坐标
+    coordinates: np.ndarray
+    stress: float
+
+
+def multidimensional_scaling(df, random_state=RANDOM_STATE):
+    """
+    度量型多维尺度分析，降到二维；固定随机种子，相同数据得到相同的坐标
+    :param df: 每行为一个对象
+    :param random_state: 随机种子
+    :return: MdsResult
+    """
+    data = numeric_matrix(df, "数据中没有数值，无法进行多维尺度分析。")
+    if np.isnan(data).any():
+        raise ValueError("数据中存在缺失值或非数字单元格。")
+    if data.shape[0] < 3:
+        raise ValueError("至少需要三个对象才能进行多维尺度分析。")
+    mds = MDS(n_components=2, random_state=random_state)
+    coordinates = mds.fit_transform(data)
+    return MdsResult(coordinates=coordinates, stress=float(mds.stress_))
@@ -0,0 +1,247 @@
+"""
+正态性检验组合
+
+每列数据只整理一次（去除非数字单元格、排序、估计均值和标准差、计算标准正态分布函数值和各阶矩），
+所有选中的检验共用这些中间结果。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+# 显著性水平
+ALPHA = 0.05
+
+# Anderson–Darling 检验 5% 显著性水平的临界值（未修正），与 scipy.stats.anderson 相同
+ANDERSON_CRITICAL_5 = 0.752
+
+
+@dataclass
+class PreparedColumn:
+    """
+    各检验共用的单列中间结果
+    """
+    name: object
+    values: np.ndarray
+    sorted: np.ndarray
+    n: int
+    mean: float
+    # 极大似然估计的标准差（ddof=0），与 scipy.stats.norm.fit 相同，用于绘图
+    std: float
+    # 样本标准差（ddof=1）
+    sample_std: float
+    # 排序后数据在标准正态分布下的分布函数值
+    standard_cdf: np.ndarray
+    # 中心矩 m2, m3, m4（除以 n）
+    moments: tuple
+
+    @property
+    def skewness(self):
+        return self.moments[1] / self.moments[0] ** 1.5
+
+    @property
+    def kurtosis(self):
+        # Pearson 峰度（正态分布为 3）
+        return self.moments[2] / self.moments[0] ** 2
+
+
+def prepare_column(name, values):
+    """
+    :param name: 列名
+    :param values: 已去除缺失值的一维数组，保持原顺序
+    :return: PreparedColumn
+    """
+    values = np.asarray(values, dtype=float)
+    ordered = np.sort(values)
+    n = len(values)
+    mean = values.mean()
+    centered = values - mean
+    m2 = (centered ** 2).mean()
+    return PreparedColumn(name=name, values=values, sorted=ordered, n=n, mean=mean,
+                          std=np.sqrt(m2), sample_std=values.std(ddof=1) if n > 1 else np.nan,
+                          standard_cdf=stats.norm.cdf(ordered),
+                          moments=(m2, (centered ** 3).mean(), (centered ** 4).mean()))
+
+
+def _ks_statistic(sorted_cdf):
+    # 双侧 Kolmogorov–Smirnov 统计量
+    n = len(sorted_cdf)
+    d_plus = (np.arange(1, n + 1) / n - sorted_cdf).max()
+    d_minus = (sorted_cdf - np.arange(n) / n).max()
+    return max(d_plus, d_minus)
+
+
+def anderson_darling(column):
+    """
+    Anderson–Darling 检验，参数由样本估计
+    :return: (统计量, p值, 5% 临界值)
+    """
+    n = column.n
+    w = (column.sorted - column.mean) / column.sample_std
+    i = np.arange(1, n + 1)
+    a2 = -n - np.sum((2 * i - 1.0) / n * (stats.norm.logcdf(w) + stats.norm.logsf(w)[::-1]))
+    critical = np.around(ANDERSON_CRITICAL_5 / (1.0 + 0.75 / n + 2.25 / n / n), 3)
+    return a2, np.nan, critical
+
+
+def shapiro_wilk(column):
+    statistic, p_value = stats.shapiro(column.sorted)
+    return statistic, p_value, np.nan
+
+
+def kolmogorov_smirnov(column):
+    # 与 scipy.stats.kstest(x, 'norm') 相同：与标准正态分布比较，精确分布的 p 值
+    statistic = _ks_statistic(column.standard_cdf)
+    return statistic, float(np.clip(stats.kstwo.sf(statistic, column.n), 0, 1)), np.nan
+
+
+def lilliefors(column):
+    # 与 statsmodels 的 lilliefors 相同：按样本均值和样本标准差标准化后的 KS 统计量，查表得到 p 值
+    from statsmodels.stats._lilliefors import get_lilliefors_table
+    if column.n < 4:
+        raise ValueError("Lilliefors 检验至少需要 4 个样本")
+    statistic = _ks_statistic(stats.norm.cdf((column.sorted - column.mean) / column.sample_std))
+    return statistic, get_lilliefors_table(dist="norm").prob(statistic, column.n), np.nan
+
+
+def jarque_bera(column):
+    n = column.n
+    statistic = n / 6 * (column.skewness ** 2 + (column.kurtosis - 3) ** 2 / 4)
+    return statistic, stats.chi2.sf(statistic, 2), np.nan
+
+
+def _skew_z(column):
+    # 与 scipy.stats.skewtest 相同的正态化偏度
+    n = column.n
+    y = column.skewness * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+    beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) /
+             ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = 1 if y == 0 else y
+    return delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+
+def _kurtosis_z(column):
+    # 与 scipy.stats.kurtosistest 相同的正态化峰度
+    n = column.n
+    expected = 3.0 * (n - 1) / (n + 1)
+    variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.) * (n + 3) * (n + 5))
+    x = (column.kurtosis - expected) / np.sqrt(variance)
+    sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) *
+                  np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3))))
+    a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / (sqrt_beta1 ** 2)))
+    term1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    term2 = np.sign(denom) * ((1 - 2.0 / a) / np.abs(denom)) ** (1 / 3.0) if denom != 0 else np.nan
+    return (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+
+def dagostino_k_squared(column):
+    if column.n < 8:
+        raise ValueError("D'Agostino K² 检验至少需要 8 个样本")
+    statistic = _skew_z(column) ** 2 + _kurtosis_z(column) ** 2
+    return statistic, stats.chi2.sf(statistic, 2), np.nan
+
+
+def cramer_von_mises(column):
+    # 与 scipy.stats.cramervonmises(x, 'norm') 相同：与标准正态分布比较
+    result = stats.cramervonmises(column.sorted, 'norm')
+    return result.statistic, result.pvalue, np.nan
+
+
+def chen_shapiro(column):
+    # 排序数据与 Blom 正态分位数的相关系数平方，p 值为近似值
+    n = column.n
+    if n < 3:
+        raise ValueError("样本数量必须大于等于 3")
+    theoretical_quantiles = stats.norm.ppf((np.arange(1, n + 1) - 0.375) / (n + 0.25))
+    w = np.corrcoef(column.sorted, theoretical_quantiles)[0, 1] ** 2
+    return w, 1 - stats.chi2.cdf(n * (1 - w), 1), np.nan
+
+
+# 检验名称 -> 计算函数，每个函数返回 (统计量, p值, 临界值)
+NORMALITY_TESTS = {
+    "Anderson-Darling": anderson_darling,
+    "Shapiro-Wilk": shapiro_wilk,
+    "Kolmogorov-Smirnov": kolmogorov_smirnov,
+    "Lilliefors": lilliefors,
+    "Jarque-Bera": jarque_bera,
+    "D'Agostino K-squared": dagostino_k_squared,
+    "Cramer-von Mises": cramer_von_mises,
+    "Chen-Shapiro": chen_shapiro,
+}
+
+
+@dataclass
+class NormalityResult(AnalysisResult):
+    tests: list
+    statistics: pd.DataFrame
+    pvalues: pd.DataFrame
+    critical_values: pd.DataFrame
+    # True 表示在 5% 水平拒绝正态分布假设
+    reject: pd.DataFrame
+    fits: pd.DataFrame
+    errors: dict
+    columns: list = field(repr=False, metadata={"export": False})
+
+    def rows(self, test):
+        """
+        单个检验的结果行
+        :return: [(列名, 统计量, p值或临界值, 是否拒绝), ...]；检验无法进行时统计量为 NaN，是否拒绝为 None
+        """
+        second = self.critical_values if test == "Anderson-Darling" else self.pvalues
+        rows = []
+        for name in self.statistics.index:
+            statistic = self.statistics.loc[name, test]
+            reject = None if np.isnan(statistic) else bool(self.reject.loc[name, test])
+            rows.append((name, statistic, second.loc[name, test], reject))
+        return rows
+
+
+def normality_battery(df, tests=None):
+    """
+    对每个数值列运行一组正态性检验
+    :param df: 输入数据，只使用其中的数字单元格，没有数字的列被跳过
+    :param tests: NORMALITY_TESTS 中的检验名称列表，默认运行全部检验
+    :return: NormalityResult
+    """
+    tests = list(NORMALITY_TESTS) if tests is None else list(tests)
+    unknown = [t for t in tests if t not in NORMALITY_TESTS]
+    if unknown:
+        raise ValueError(f"未知的正态性检验: {', '.join(unknown)}")
+
+    columns = []
+    for name, series in df.items():
+        values = numeric_cells(series)
+        values = values[~np.isnan(values)]
+        if len(values):
+            columns.append(prepare_column(name, values))
+    if not columns:
+        raise ValueError("数据中没有数值列，无法进行正态性检验。")
+
+    names = pd.Index([c.name for c in columns], name="Column Name")
+    statistics = pd.DataFrame(np.nan, index=names, columns=tests)
+    pvalues = statistics.copy()
+    critical_values = statistics.copy()
+    errors = {}
+    for i, column in enumerate(columns):
+        for j, test in enumerate(tests):
+            try:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    statistic, p_value, critical = NORMALITY_TESTS[test](column)
+                statistics.iat[i, j], pvalues.iat[i, j], critical_values.iat[i, j] = statistic, p_value, critical
+            except (ValueError, ZeroDivisionError) as e:
+                # 样本量不足等情况只影响该列的该检验
+                errors[f"{column.name} / {test}"] = str(e)
+
+    # p 值大于 0.05（Anderson–Darling 为统计量小于临界值）时不拒绝正态分布假设
+    reject = (pvalues <= ALPHA) | (statistics >= critical_values)
+    fits = pd.DataFrame({"n": [c.n for c in columns], "mean": [c.mean for c in columns],
+                         "std": [c.std for c in columns]}, index=names)
+    return NormalityResult(tests=tests, statistics=statistics, pvalues=pvalues, critical_values=critical_values,
+                           reject=reject, fits=fits, errors=errors, columns=columns)
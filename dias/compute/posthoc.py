@@ -0,0 +1,237 @@
+"""
+事后多重比较
+
+第一列为分组变量，其余每列为一个因变量。各组的样本量、均值和方差对所有因变量一次性按矩阵计算，
+所有因变量、所有组对的 Tukey HSD、Bonferroni、Holm 和 Games-Howell 检验以 (组对数, 因变量数) 的数组批量求值，
+结果整理为一张长表，每行为一个因变量、一种方法下的一对组。
+学生化极差分布的尾概率用数值积分批量计算，scipy.stats.studentized_range 逐点积分，在上千个组对上过慢。
+Tukey HSD 和 Games-Howell 置信区间的临界值由同一尾概率函数求根得到，置信区间与 p 值相互一致。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import special, stats
+from statsmodels.stats.libqsturng import qsturng
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+POSTHOC_METHODS = ["Tukey HSD", "Bonferroni", "Holm", "Games-Howell"]
+ALPHA = 0.05
+
+# 学生化极差分布的积分节点：z 为正态变量，u 为卡方分位数对应的概率
+_Z, _Z_WEIGHTS = np.polynomial.legendre.leggauss(96)
+_Z, _Z_WEIGHTS = 8 * _Z, 8 * _Z_WEIGHTS * stats.norm.pdf(8 * _Z)
+# u = t³ 使节点集中在 s 较小的一端，尾概率主要来自这一段
+_T, _T_WEIGHTS = np.polynomial.legendre.leggauss(64)
+_T, _T_WEIGHTS = (_T + 1) / 2, _T_WEIGHTS / 2
+_U, _U_WEIGHTS = _T ** 3, 3 * _T ** 2 * _T_WEIGHTS
+_PHI_Z = special.ndtr(_Z)
+# 每次积分的元素数，限制临时数组的大小
+_SF_BLOCK = 256
+# 临界值牛顿迭代的相对容差和最大迭代次数
+_ISF_TOL = 1e-10
+_ISF_MAX_ITER = 50
+
+
+def _range_cdf(w, k, density=False):
+    # k 个独立标准正态变量的极差不超过 w 的概率；density 为 True 时同时返回极差的密度
+    shifted = _Z - w[..., None]
+    diff = _PHI_Z - special.ndtr(shifted)
+    power = diff ** (k[..., None] - 2)
+    cdf = k * (_Z_WEIGHTS * power * diff).sum(axis=-1)
+    if not density:
+        return cdf
+    density_z = np.exp(-0.5 * shifted ** 2) / np.sqrt(2 * np.pi)
+    pdf = k * (k - 1) * (_Z_WEIGHTS * power * density_z).sum(axis=-1)
+    return cdf, pdf
+
+
+def _studentized_range(q, k, df, density=False):
+    # 上尾概率，density 为 True 时同时返回密度；输入为同形状的一维数组
+    sf = np.full(q.shape, np.nan)
+    pdf = np.full(q.shape, np.nan)
+    valid = np.flatnonzero(np.isfinite(q) & (k >= 2) & (df > 0))
+    for start in range(0, len(valid), _SF_BLOCK):
+        idx = valid[start:start + _SF_BLOCK]
+        # Q = R / s，s = sqrt(chi2(df) / df)；对 s 的分布按分位数积分
+        s = np.sqrt(stats.chi2.ppf(_U, df[idx, None]) / df[idx, None])
+        if density:
+            cdf, range_pdf = _range_cdf(q[idx, None] * s, k[idx, None], density=True)
+            pdf[idx] = (range_pdf * s * _U_WEIGHTS).sum(axis=-1)
+        else:
+            cdf = _range_cdf(q[idx, None] * s, k[idx, None])
+        sf[idx] = np.clip(1 - (cdf * _U_WEIGHTS).sum(axis=-1), 0, 1)
+    return (sf, pdf) if density else sf
+
+
+def studentized_range_sf(q, k, df):
+    """
+    学生化极差分布的上尾概率 P(Q > q)，对数组逐元素批量计算
+    :param q: 统计量
+    :param k: 组数
+    :param df: 误差自由度
+    :return: 与广播后的输入同形状的数组
+    """
+    q, k, df = (np.asarray(a, dtype=float) for a in np.broadcast_arrays(q, k, df))
+    return _studentized_range(q.ravel(), k.ravel(), df.ravel()).reshape(q.shape)
+
+
+def _studentized_range_isf(alpha, k, df):
+    # 临界值：studentized_range_sf(q) = alpha 的根，对不同的 (k, df) 批量求解
+    # 以 qsturng 近似值为初值，用同一积分得到的密度做牛顿迭代，步长限制在 q 的一半到一倍之间
+    k, df = np.broadcast_arrays(np.asarray(k, dtype=float), np.asarray(df, dtype=float))
+    result = np.full(k.shape, np.nan)
+    valid = (k >= 2) & (df > 0) & np.isfinite(df)
+    if not valid.any():
+        return result
+    pairs, inverse = np.unique(np.column_stack([k[valid], df[valid]]), axis=0, return_inverse=True)
+    kk, dd = pairs[:, 0], pairs[:, 1]
+    q = np.atleast_1d(qsturng(1 - alpha, kk, np.maximum(dd, 2))).astype(float)
+    active = np.arange(len(q))
+    for _ in range(_ISF_MAX_ITER):
+        sf, pdf = _studentized_range(q[active], kk[active], dd[active], density=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (sf - alpha) / pdf
+        current = q[active]
+        updated = np.clip(np.where(np.isfinite(step), current + step, current * 2), current / 2, current * 2)
+        q[active] = updated
+        # 牛顿法二次收敛：步长小于 sqrt(容差)·q 时，这一步之后的误差已在容差之内
+        active = active[np.abs(updated - current) > np.sqrt(_ISF_TOL) * current]
+        if not len(active):
+            break
+    result[valid] = q[inverse.ravel()]
+    return result
+
+
+def _holm(pvalues):
+    # 每列（因变量）内按 Holm 逐步法调整
+    m = np.isfinite(pvalues).sum(axis=0)
+    order = np.argsort(np.where(np.isnan(pvalues), np.inf, pvalues), axis=0)
+    sorted_p = np.take_along_axis(pvalues, order, axis=0)
+    factors = m[None, :] - np.arange(pvalues.shape[0])[:, None]
+    adjusted = np.minimum(np.fmax.accumulate(sorted_p * factors, axis=0), 1)
+    result = np.empty_like(pvalues)
+    np.put_along_axis(result, order, adjusted, axis=0)
+    return result
+
+
+def group_summaries(values, codes, n_groups):
+    """
+    一次计算所有因变量的组内样本量、均值和方差
+    :param values: (样本数, 因变量数) 的浮点数组，缺失值为 NaN
+    :param codes: 每个样本的组编号 0..n_groups-1
+    :param n_groups: 组数
+    :return: (样本量, 均值, 方差)，形状均为 (组数, 因变量数)；方差自由度为 n - 1
+    """
+    onehot = np.zeros((len(codes), n_groups))
+    onehot[np.arange(len(codes)), codes] = 1
+    mask = ~np.isnan(values)
+    filled = np.where(mask, values, 0)
+    counts = onehot.T @ mask
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (onehot.T @ filled) / counts
+        centered = np.where(mask, values - means[codes], 0)
+        variances = (onehot.T @ centered ** 2) / (counts - 1)
+    return counts, means, variances
+
+
+@dataclass
+class PostHocResult(AnalysisResult):
+    # 长表：因变量、方法、组对、均值差、标准误、统计量、自由度、调整后 p 值、置信区间、是否拒绝原假设
+    table: pd.DataFrame
+    groups: list
+    # 无法检验的因变量（无数据或各组方差均为零）
+    skipped: list
+    alpha: float
+
+
+def posthoc_tests(df, methods=None, alpha=ALPHA):
+    """
+    对每个因变量进行事后多重比较
+    :param df: 第一列为分组变量，其余列为因变量
+    :param methods: POSTHOC_METHODS 的子集，默认全部
+    :param alpha: 显著性水平
+    :return: PostHocResult
+    """
+    methods = [m for m in POSTHOC_METHODS if methods is None or m in methods]
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列分组变量和一列因变量。")
+    labels, groups = pd.factorize(df.iloc[:, 0], sort=True)
+    keep = labels >= 0
+    codes = labels[keep]
+    values = np.column_stack([numeric_cells(df.iloc[:, j]) for j in range(1, df.shape[1])])[keep]
+    dvs = [str(c) for c in df.columns[1:]]
+    if len(groups) < 2:
+        raise ValueError("分组变量至少需要两个组。")
+
+    counts, means, variances = group_summaries(values, codes, len(groups))
+    present = counts > 0
+    k = present.sum(axis=0)
+    n_total = counts.sum(axis=0)
+    df_error = n_total - k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mse = np.nansum((counts - 1) * variances, axis=0) / df_error
+    testable = (k >= 2) & (df_error > 0) & (mse > 0)
+    skipped = [dv for dv, ok in zip(dvs, testable) if not ok]
+
+    first, second = np.triu_indices(len(groups), 1)
+    n1, n2 = counts[first], counts[second]
+    diff = means[second] - means[first]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se_pooled = np.sqrt(mse * (1 / n1 + 1 / n2))
+        welch_terms = (variances[first] / n1, variances[second] / n2)
+        se_welch = np.sqrt(welch_terms[0] + welch_terms[1])
+        df_welch = (se_welch ** 4) / (welch_terms[0] ** 2 / (n1 - 1) + welch_terms[1] ** 2 / (n2 - 1))
+    pairs_per_dv = (present[first] & present[second]).sum(axis=0)
+    df_pairs = np.broadcast_to(df_error, diff.shape).astype(float)
+    k_pairs = np.broadcast_to(k, diff.shape)
+
+    blocks = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "Tukey HSD" in methods:
+            # Tukey-Kramer：q = |均值差| / sqrt(MSE / 2 · (1/n1 + 1/n2))
+            q = np.abs(diff) / se_pooled * np.sqrt(2)
+            half = _studentized_range_isf(alpha, k, df_error) / np.sqrt(2) * se_pooled
+            blocks["Tukey HSD"] = (se_pooled, q, df_pairs, studentized_range_sf(q, k_pairs, df_pairs), half)
+        if "Bonferroni" in methods or "Holm" in methods:
+            # 以合并方差为误差项的两两 t 检验
+            t = diff / se_pooled
+            raw = 2 * stats.t.sf(np.abs(t), df_pairs)
+            if "Bonferroni" in methods:
+                half = stats.t.ppf(1 - alpha / (2 * pairs_per_dv), df_error) * se_pooled
+                blocks["Bonferroni"] = (se_pooled, t, df_pairs, np.minimum(raw * pairs_per_dv, 1), half)
+            if "Holm" in methods:
+                # Holm 法没有对应的同时置信区间
+                blocks["Holm"] = (se_pooled, t, df_pairs, _holm(raw), np.full(diff.shape, np.nan))
+        if "Games-Howell" in methods:
+            q = np.abs(diff) / se_welch * np.sqrt(2)
+            half = _studentized_range_isf(alpha, k_pairs, df_welch) / np.sqrt(2) * se_welch
+            blocks["Games-Howell"] = (se_welch, q, df_welch, studentized_range_sf(q, k_pairs, df_welch), half)
+
+    frames = []
+    n_pairs = len(first)
+    for method, (se, statistic, dof, pvalue, half) in blocks.items():
+        # (组对, 因变量) 数组按因变量优先展开为长表
+        frames.append(pd.DataFrame({
+            "Dependent Variable": np.repeat(dvs, n_pairs),
+            "Method": method,
+            "Group 1": np.tile(groups[first], len(dvs)),
+            "Group 2": np.tile(groups[second], len(dvs)),
+            "Mean Difference": diff.T.ravel(),
+            "Std. Error": se.T.ravel(),
+            "Statistic": statistic.T.ravel(),
+            "df": dof.T.ravel(),
+            "p-adj": pvalue.T.ravel(),
+            "Lower": (diff - half).T.ravel(),
+            "Upper": (diff + half).T.ravel(),
+        }))
+    table = pd.concat(frames, ignore_index=True)
+    table = table[table["Dependent Variable"].isin([dv for dv in dvs if dv not in skipped])]
+    table = table[np.isfinite(table["Mean Difference"])]
+    table["Reject"] = table["p-adj"] < alpha
+    # 按因变量、方法的顺序排列，同一因变量的各方法相邻，组对保持原顺序
+    dv_rank = table["Dependent Variable"].map({dv: i for i, dv in enumerate(dvs)})
+    method_rank = table["Method"].map({m: i for i, m in enumerate(POSTHOC_METHODS)})
+    table = table.iloc[np.lexsort((table.index, method_rank, dv_rank))].reset_index(drop=True)
+    return PostHocResult(table=table, groups=list(groups), skipped=skipped, alpha=alpha)
@@ -0,0 +1,374 @@
+"""
+回归模型：线性、稳健、多项式、偏最小二乘、Tobit、GMM、Logistic、有序 Logit、逐步回归和广义估计方程
+
+除特别说明外，数据表的最后一列为因变量，其余列为自变量；只使用数字单元格，含缺失值的行不参与计算。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from scipy import stats
+from sklearn.cross_decomposition import PLSRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.preprocessing import PolynomialFeatures
+from statsmodels.base.model import GenericLikelihoodModel
+from statsmodels.genmod.cov_struct import Exchangeable
+from statsmodels.genmod.families import Poisson
+from statsmodels.miscmodels.ordinal_model import OrderedModel
+from statsmodels.sandbox.regression.gmm import LinearIVGMM
+
+from dias.compute.base import AnalysisResult, numeric_cells
+from dias.compute.stepwise import stepwise_selection
+
+# 正则化 Logistic 回归的默认正则化强度的倒数
+LOGISTIC_C = 1.0
+# 二分类时预测为正类的概率阈值
+CLASSIFICATION_THRESHOLD = 0.5
+
+
+def regression_data(df, min_rows=3):
+    """
+    拆分自变量和因变量
+    :param df: 最后一列为因变量，其余列为自变量
+    :param min_rows: 完整行的最少行数
+    :return: (自变量 DataFrame, 因变量 ndarray, 因变量列名)
+    """
+    if df.shape[1] < 2:
+        raise ValueError("数据至少需要一列自变量和一列因变量。")
+    values = np.column_stack([numeric_cells(df.iloc[:, j]) for j in range(df.shape[1])])
+    values = values[~np.isnan(values).any(axis=1)]
+    if len(values) < min_rows:
+        raise ValueError(f"完整的数值行少于 {min_rows} 行，无法进行回归分析。")
+    X = pd.DataFrame(values[:, :-1], columns=[str(c) for c in df.columns[:-1]])
+    return X, values[:, -1], str(df.columns[-1])
+
+
+def coefficient_table(fit, statistic='z'):
+    """
+    statsmodels 拟合结果的系数表，列与 summary() 的系数表相同
+    :param fit: statsmodels 拟合结果
+    :param statistic: 检验统计量的列名，'z' 或 't'
+    :return: DataFrame，第一列为变量名
+    """
+    ci = np.asarray(fit.conf_int())
+    return pd.DataFrame({
+        "": [str(name) for name in fit.model.exog_names],
+        "coef": np.asarray(fit.params),
+        "std err": np.asarray(fit.bse),
+        statistic: np.asarray(fit.tvalues),
+        f"P>|{statistic}|": np.asarray(fit.pvalues),
+        "[0.025": ci[:, 0],
+        "0.975]": ci[:, 1],
+    })
+
+
+def fit_statistics(actual, fitted, n_predictors):
+    """
+    预测值的均方误差、R² 和调整 R²
+    :param actual: 因变量
+    :param fitted: 预测值
+    :param n_predictors: 自变量个数（不含常数项）
+    :return: [(指标名, 值), ...]
+    """
+    n = len(actual)
+    mse = float(np.mean((actual - fitted) ** 2))
+    ss_tot = float(np.sum((actual - actual.mean()) ** 2))
+    r2 = 1 - mse * n / ss_tot if ss_tot > 0 else np.nan
+    dof = n - n_predictors - 1
+    adjusted = 1 - (1 - r2) * (n - 1) / dof if dof > 0 else np.nan
+    return [("MSE", mse), ("R-squared (R²)", r2), ("Adjusted R-squared", adjusted)]
+
+
+def statistics_table(rows):
+    """
+    :param rows: [(指标名, 值), ...]
+    :return: 两列 DataFrame：Statistic、Value
+    """
+    return pd.DataFrame(rows, columns=["Statistic", "Value"])
+
+
+@dataclass
+class RegressionResult(AnalysisResult):
+    method: str
+    # 每个参数（含常数项）的系数、标准误、检验统计量、p 值和 95% 置信区间
+    coefficients: pd.DataFrame
+    # 模型的拟合指标：Statistic、Value 两列
+    statistics: pd.DataFrame
+    target: str
+    # 逐步回归每一步加入或移除的变量及其 p 值，其他方法为 None
+    steps: pd.DataFrame = None
+    # 因变量和预测值（Logistic 回归为预测概率），用于绘图
+    actual: np.ndarray = field(default=None, metadata={"export": False})
+    fitted: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def _ols_result(method, X, y, target, extra=()):
+    """
+    带常数项的 OLS 拟合，系数表为 t 检验
+    """
+    fit = sm.OLS(y, sm.add_constant(X, has_constant='add')).fit()
+    fitted = np.asarray(fit.fittedvalues)
+    rows = fit_statistics(y, fitted, X.shape[1]) + [("F-value", fit.fvalue), ("F p-value", fit.f_pvalue),
+                                                    ("Observations", int(fit.nobs))]
+    return RegressionResult(method=method, coefficients=coefficient_table(fit, 't'),
+                            statistics=statistics_table(rows + list(extra)), target=target, actual=y,
+                            fitted=fitted)
+
+
+def ols_regression(df):
+    """
+    普通最小二乘线性回归
+    :return: RegressionResult
+    """
+    X, y, target = regression_data(df)
+    return _ols_result("Ordinary Least Squares Regression", X, y, target)
+
+
+def polynomial_regression(df, degree=2):
+    """
+    多项式回归：自变量展开为不超过 degree 次的各项及交互项后做 OLS
+    :param degree: 多项式次数
+    :return: RegressionResult
+    """
+    X, y, target = regression_data(df)
+    poly = PolynomialFeatures(degree=degree, include_bias=False)
+    X_poly = pd.DataFrame(poly.fit_transform(X), columns=poly.get_feature_names_out(X.columns))
+    if X_poly.shape[1] + 1 >= len(y):
+        raise ValueError("展开后的项数不少于样本量，无法拟合多项式回归。")
+    return _ols_result("Polynomial Regression", X_poly, y, target, [("Degree", degree)])
+
+
+def robust_regression(df):
+    """
+    稳健线性回归（Huber M 估计）
+    :return: RegressionResult
+    """
+    X, y, target = regression_data(df)
+    fit = sm.RLM(y, sm.add_constant(X, has_constant='add')).fit()
+    fitted = np.asarray(fit.fittedvalues)
+    rows = fit_statistics(y, fitted, X.shape[1]) + [("Scale", fit.scale), ("Observations", int(fit.nobs))]
+    return RegressionResult(method="Robust Linear Regression", coefficients=coefficient_table(fit),
+                            statistics=statistics_table(rows), target=target, actual=y, fitted=fitted)
+
+
+def pls_regression(df, n_components=1):
+    """
+    偏最小二乘回归，附普通最小二乘的 t 检验作参考
+    :param n_components: 成分个数
+    :return: RegressionResult
+    """
+    X, y, target = regression_data(df)
+    n_components = min(n_components, X.shape[1])
+    pls = PLSRegression(n_components=n_components, scale=False).fit(X, y)
+    fitted = pls.predict(X).ravel()
+    # 标准化系数：自变量标准化后的 PLS 系数
+    standardized = PLSRegression(n_components=n_components, scale=False).fit(
+        (X - X.mean()) / X.std(ddof=0).replace(0, 1), y).coef_.ravel()
+    ols = sm.OLS(y, sm.add_constant(X, has_constant='add')).fit()
+    coefficients = pd.DataFrame({
+        "": ["const"] + list(X.columns),
+        "coef": np.r_[np.ravel(pls.intercept_)[0], pls.coef_.ravel()],
+        "Standardized coef": np.r_[np.nan, standardized],
+        "OLS t": np.asarray(ols.tvalues),
+        "OLS P>|t|": np.asarray(ols.pvalues),
+    })
+    rows = fit_statistics(y, fitted, X.shape[1]) + [("OLS F-value", ols.fvalue), ("Components", n_components),
+                                                    ("Observations", len(y))]
+    return RegressionResult(method="Partial Least Squares Regression", coefficients=coefficients,
+                            statistics=statistics_table(rows), target=target, actual=y, fitted=fitted)
+
+
+class Tobit(GenericLikelihoodModel):
+    """
+    左截尾的 Tobit 模型，参数为回归系数和 log(sigma)
+    """
+
+    def __init__(self, endog, exog, lower, **kwargs):
+        self.lower = lower
+        super().__init__(endog, exog, extra_params_names=["log(sigma)"], **kwargs)
+
+    def loglikeobs(self, params):
+        beta, sigma = params[:-1], np.exp(params[-1])
+        xb = self.exog @ beta
+        censored = self.endog <= self.lower
+        return np.where(censored, stats.norm.logcdf((self.lower - xb) / sigma),
+                        stats.norm.logpdf((self.endog - xb) / sigma) - np.log(sigma))
+
+
+def _fit_tobit(y, X, lower):
+    beta = np.linalg.lstsq(X, y, rcond=None)[0]
+    start = np.r_[beta, np.log(max(np.std(y - X @ beta), 1e-8))]
+    return Tobit(y, X, lower).fit(start_params=start, method='bfgs', maxiter=1000, disp=False)
+
+
+def tobit_regression(df, lower=None):
+    """
+    Tobit 回归（左截尾的线性模型，最大似然估计）
+    :param lower: 截尾下限，因变量不大于该值的观测视为截尾；None 时取因变量的最小值
+    :return: RegressionResult
+    """
+    X, y, target = regression_data(df)
+    lower = float(y.min()) if lower is None else float(lower)
+    exog = sm.add_constant(X, has_constant='add')
+    fit = _fit_tobit(y, exog.to_numpy(), lower)
+    null = _fit_tobit(y, np.ones((len(y), 1)), lower)
+    coefficients = coefficient_table(fit)
+    coefficients[""] = list(exog.columns) + ["log(sigma)"]
+    # 预测值取截尾后的条件期望 E[y|x] = Φ(α)·L + (1 - Φ(α))·xb + σ·φ(α)，α = (L - xb) / σ
+    xb, sigma = exog.to_numpy() @ fit.params[:-1], np.exp(fit.params[-1])
+    alpha = (lower - xb) / sigma
+    fitted = stats.norm.cdf(alpha) * lower + stats.norm.sf(alpha) * xb + sigma * stats.norm.pdf(alpha)
+    rows = fit_statistics(y, fitted, X.shape[1]) + [
+        ("Log Likelihood", fit.llf), ("Pseudo R-squared", 1 - fit.llf / null.llf),
+        ("Lower limit", lower), ("Censored observations", int(np.sum(y <= lower))), ("Observations", len(y))]
+    return RegressionResult(method="Tobit Regression", coefficients=coefficients,
+                            statistics=statistics_table(rows), target=target, actual=y, fitted=fitted)
+
+
+def gmm_regression(df):
+    """
+    线性模型的 GMM 估计，以自变量（含常数项）作为自身的工具变量，两步迭代的最优权重矩阵
+    :return: RegressionResult
+    """
+    X, y, target = regression_data(df)
+    exog = sm.add_constant(X, has_constant='add')
+    fit = LinearIVGMM(y, exog, exog).fit(maxiter=2, optim_method='bfgs', optim_args={'disp': False})
+    coefficients = coefficient_table(fit)
+    coefficients[""] = list(exog.columns)
+    fitted = exog.to_numpy() @ np.asarray(fit.params)
+    rows = fit_statistics(y, fitted, X.shape[1]) + [("Observations", len(y))]
+    return RegressionResult(method="GMM Estimation", coefficients=coefficients, statistics=statistics_table(rows),
+                            target=target, actual=y, fitted=fitted)
+
+
+def class_labels(values):
+    """
+    类别取值的显示文本，整数值不带小数点
+    """
+    return [f"{v:g}" for v in values]
+
+
+def binary_target(y):
+    """
+    检查二分类因变量只取 0 和 1
+    """
+    if not np.isin(y, (0, 1)).all() or len(np.unique(y)) < 2:
+        raise ValueError("因变量必须只取 0 和 1 两个值。")
+    return y.astype(int)
+
+
+def logistic_regression(df):
+    """
+    二元 Logistic 回归（最大似然估计）
+    :param df: 最后一列为取 0 / 1 的因变量
+    :return: RegressionResult，fitted 为预测为 1 的概率
+    """
+    X, y, target = regression_data(df)
+    y = binary_target(y)
+    fit = sm.Logit(y, sm.add_constant(X, has_constant='add')).fit(disp=False)
+    probabilities = np.asarray(fit.predict())
+    rows = [("Accuracy", accuracy_score(y, probabilities > CLASSIFICATION_THRESHOLD)),
+            ("AUC", roc_auc_score(y, probabilities)), ("Log-Likelihood", fit.llf), ("LL-Null", fit.llnull),
+            ("LLR p-value", fit.llr_pvalue), ("Pseudo R-squared (McFadden)", fit.prsquared),
+            ("Observations", int(fit.nobs))]
+    return RegressionResult(method="Binary Logistic Regression", coefficients=coefficient_table(fit),
+                            statistics=statistics_table(rows), target=target, actual=y, fitted=probabilities)
+
+
+def regularized_logistic_regression(df, C=LOGISTIC_C, binary=False):
+    """
+    L2 正则化的 Logistic 回归，因变量有两个以上类别时为多项 Logistic 回归
+    :param C: 正则化强度的倒数，越小正则化越强
+    :param binary: 是否要求因变量只取 0 和 1
+    :return: RegressionResult；系数表每行为一个类别（二分类时为正类）的一个变量，fitted 为各类别的预测概率
+    """
+    X, y, target = regression_data(df)
+    if binary:
+        y = binary_target(y)
+    classes = np.unique(y)
+    if len(classes) < 2:
+        raise ValueError("因变量至少需要两个不同的值。")
+    model = LogisticRegression(penalty='l2', C=C, max_iter=1000).fit(X, y)
+    probabilities = model.predict_proba(X)
+    labels = classes[1:] if len(classes) == 2 else classes
+    coefficients = pd.DataFrame({
+        "Class": np.repeat(class_labels(labels), X.shape[1] + 1),
+        "Variable": np.tile(["const"] + list(X.columns), len(labels)),
+        "Coefficient": np.column_stack([model.intercept_, model.coef_]).ravel(),
+    })
+    if len(classes) == 2:
+        auc = roc_auc_score(y, probabilities[:, 1])
+    else:
+        auc = roc_auc_score(y, probabilities, multi_class='ovr')
+    rows = [("C", C), ("Accuracy", accuracy_score(y, model.predict(X))), ("AUC", auc), ("Observations", len(y))]
+    return RegressionResult(method="Regularized Logistic Regression", coefficients=coefficients,
+                            statistics=statistics_table(rows), target=target,
+                            actual=np.searchsorted(classes, y), fitted=probabilities)
+
+
+def ordered_logit(df):
+    """
+    有序 Logit 回归，因变量的取值按从小到大排序作为有序类别
+    :return: RegressionResult；系数表包含各阈值（切点），fitted 为预测类别的序号
+    """
+    X, y, target = regression_data(df)
+    categories = np.unique(y)
+    if len(categories) < 2:
+        raise ValueError("因变量必须至少有两个不同的值。")
+    codes = np.searchsorted(categories, y)
+    model = OrderedModel(pd.Categorical(y, categories=categories, ordered=True), X, distr='logit')
+    fit = model.fit(method='bfgs', disp=False)
+    k = X.shape[1]
+    coefficients = coefficient_table(fit).iloc[:k]
+    cutpoints = model.transform_threshold_params(fit.params)[1:-1]
+    labels = class_labels(categories)
+    thresholds = pd.DataFrame({"": [f"{labels[i]}/{labels[i + 1]}" for i in range(len(cutpoints))],
+                               "coef": cutpoints})
+    predicted = np.asarray(fit.predict()).argmax(axis=1)
+    rows = [("Accuracy", accuracy_score(codes, predicted)), ("Observations", len(y)), ("Log-Likelihood", fit.llf),
+            ("LL-Null", fit.llnull), ("LLR p-value", fit.llr_pvalue)]
+    return RegressionResult(method="Ordered Logit Regression",
+                            coefficients=pd.concat([coefficients, thresholds], ignore_index=True),
+                            statistics=statistics_table(rows), target=target, actual=codes, fitted=predicted)
+
+
+def stepwise_regression(df, threshold_in=0.05, threshold_out=0.10):
+    """
+    双向逐步回归选择自变量后做 OLS
+    :param threshold_in: 加入变量的 p 值阈值
+    :param threshold_out: 移除变量的 p 值阈值
+    :return: RegressionResult，steps 为每一步的操作
+    """
+    X, y, target = regression_data(df)
+    selection = stepwise_selection(X, y, threshold_in=threshold_in, threshold_out=threshold_out)
+    result = _ols_result("Stepwise Regression", X[selection.selected], y, target)
+    result.steps = pd.DataFrame(selection.steps, columns=["Action", "Variable", "p-value"])
+    return result
+
+
+@dataclass
+class GeeResult(AnalysisResult):
+    # 系数表：变量、系数、标准误、z 值、p 值和 95% 置信区间
+    coefficients: pd.DataFrame
+    # 聚类数和观测数
+    n_clusters: int
+    nobs: int
+
+
+def gee_analysis(df):
+    """
+    泊松族、可交换相关结构的广义估计方程
+    :param df: 第一列为聚类标识，最后一列为因变量，其余列为自变量
+    :return: GeeResult
+    """
+    if df.shape[1] < 3:
+        raise ValueError("数据至少需要聚类标识、一个自变量和因变量三列。")
+    cluster_id = df.iloc[:, 0]
+    y = df.iloc[:, -1]
+    X = sm.add_constant(df.iloc[:, 1:-1])
+    model = sm.GEE(y, X, groups=cluster_id, cov_struct=Exchangeable(), family=Poisson())
+    fit = model.fit()
+    return GeeResult(coefficients=coefficient_table(fit), n_clusters=int(cluster_id.nunique()),
+                     nobs=int(fit.nobs))
@@ -0,0 +1,245 @@
+"""
+信度与效度分析：Cronbach's Alpha、折半信度、重测信度、内容效度比、结构效度（KMO 与因子载荷）和组内评分者信度 rwg
+
+题项数据以带表头的方式读取，每列为一个题项，只使用其中的数值列。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dias.compute.base import AnalysisResult, numeric_cells, select_numeric
+
+
+@dataclass
+class ReliabilityResult(AnalysisResult):
+    alpha: float
+    sample_sizes: pd.Series
+    means: pd.Series
+
+
+def cronbach_alpha(data):
+    """
+    计算 Cronbach's Alpha 系数
+    :param data: 题项数据，每列为一个题项
+    :return: Alpha 系数
+    """
+    num_items = data.shape[1]
+    item_variances = data.var(axis=0, ddof=1)
+    total_variance = data.sum(axis=1).var(ddof=1)
+    alpha = (num_items / (num_items - 1)) * (1 - (item_variances.sum() / total_variance))
+    return alpha
+
+
+def reliability_analysis(df):
+    """
+    信度分析
+    :param df: 输入数据，只使用其中的数值列
+    :return: ReliabilityResult
+    """
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行信度分析。")
+    return ReliabilityResult(alpha=cronbach_alpha(numerical_df),
+                             sample_sizes=numerical_df.count(),
+                             means=numerical_df.mean())
+
+
+def half_totals(numerical_df):
+    """
+    把题项按列分成前后两半，分别计算每行的总分
+    :param numerical_df: 只包含数值列的题项数据
+    :return: (前一半的总分, 后一半的总分)
+    """
+    if numerical_df.shape[1] < 2:
+        raise ValueError("至少需要两列数值数据才能分成两半。")
+    half = numerical_df.shape[1] // 2
+    return numerical_df.iloc[:, :half].sum(axis=1), numerical_df.iloc[:, half:].sum(axis=1)
+
+
+@dataclass
+class SplitHalfResult(AnalysisResult):
+    # 经斯皮尔曼-布朗公式校正的折半信度系数 2r / (1 + r)
+    coefficient: float
+    # 两半总分的皮尔逊相关系数 r
+    correlation: float
+    sample_sizes: pd.Series
+    means: pd.Series
+
+
+def split_half_reliability(df):
+    """
+    折半信度分析，前一半题项与后一半题项的总分求相关
+    :param df: 输入数据，只使用其中的数值列
+    :return: SplitHalfResult
+    """
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行折半信度分析。")
+    r, _ = stats.pearsonr(*half_totals(numerical_df))
+    return SplitHalfResult(coefficient=float(2 * r / (1 + r)), correlation=float(r),
+                           sample_sizes=numerical_df.count(), means=numerical_df.mean())
+
+
+@dataclass
+class TestRetestResult(AnalysisResult):
+    # 两次测量总分的皮尔逊相关系数
+    coefficient: float
+    p_value: float
+    sample_sizes: pd.Series
+    means: pd.Series
+
+
+def test_retest_reliability(df):
+    """
+    重测信度分析
+    :param df: 输入数据，数值列的前一半为第一次测量结果，后一半为第二次测量结果
+    :return: TestRetestResult
+    """
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行重测信度分析。")
+    r, p_value = stats.pearsonr(*half_totals(numerical_df))
+    return TestRetestResult(coefficient=float(r), p_value=float(p_value),
+                            sample_sizes=numerical_df.count(), means=numerical_df.mean())
+
+
+@dataclass
+class ContentValidityResult(AnalysisResult):
+    # 各题项的内容效度比 CVR = (ne - n / 2) / (n / 2)
+    cvr: pd.Series
+    average_cvr: float
+    sample_sizes: pd.Series
+    means: pd.Series
+    stds: pd.Series
+    medians: pd.Series
+    skewness: pd.Series
+    kurtosis: pd.Series
+
+
+def content_validity(df):
+    """
+    内容效度分析
+    :param df: 专家对每个题项与测量内容相关性的评分（1 表示相关，0 表示不相关），每行一位专家，每列一个题项
+    :return: ContentValidityResult
+    """
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行内容效度分析。")
+    # n 为给出评分的专家人数，ne 为认为题项相关的人数
+    n = numerical_df.count()
+    if (n == 0).any():
+        raise ValueError("存在没有任何评分的题项，无法计算内容效度比。")
+    cvr = (numerical_df.sum() - n / 2) / (n / 2)
+    return ContentValidityResult(cvr=cvr, average_cvr=float(cvr.mean()), sample_sizes=n,
+                                 means=numerical_df.mean(), stds=numerical_df.std(),
+                                 medians=numerical_df.median(), skewness=numerical_df.skew(),
+                                 kurtosis=numerical_df.kurt())
+
+
+@dataclass
+class ValidityResult(AnalysisResult):
+    kmo: float
+    bartlett_chi2: float
+    bartlett_p: float
+    # 未旋转的因子载荷矩阵，行为题项，因子数等于题项数
+    loadings: pd.DataFrame
+    sample_sizes: pd.Series
+    means: pd.Series
+
+
+def validity_analysis(df):
+    """
+    结构效度分析：KMO 检验、Bartlett 球形检验和因子载荷
+    :param df: 输入数据，只使用其中的数值列
+    :return: ValidityResult
+    """
+    # factor_analyzer 只在效度分析中使用，按需导入，使 dias.compute 在未安装时仍可导入
+    from factor_analyzer import FactorAnalyzer
+    from factor_analyzer.factor_analyzer import calculate_bartlett_sphericity, calculate_kmo
+
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行效度分析。")
+    _, kmo_model = calculate_kmo(numerical_df)
+    chi_square_value, p_value = calculate_bartlett_sphericity(numerical_df)
+    fa = FactorAnalyzer(n_factors=numerical_df.shape[1], rotation=None)
+    fa.fit(numerical_df)
+    loadings = pd.DataFrame(fa.loadings_, index=numerical_df.columns,
+                            columns=[f"Factor{i + 1}" for i in range(fa.loadings_.shape[1])])
+    return ValidityResult(kmo=float(kmo_model), bartlett_chi2=float(chi_square_value), bartlett_p=float(p_value),
+                          loadings=loadings, sample_sizes=numerical_df.count(), means=numerical_df.mean())
+
+
+@dataclass
+class RwgResult(AnalysisResult):
+    group_column: str
+    rating_columns: list
+    # 各组的 rwg = 1 - 组内各行评分方差的均值 / ((k² - 1) / 12)，k 为评分列数；样本数少于 2 的组不计算
+    rwg: pd.Series
+    # rwg 值的标准差（总体标准差）和分位数
+    rwg_sd: float
+    p25: float
+    median: float
+    p75: float
+    # 以分组为因素对全部评分做单因素方差分析
+    msb: float
+    msw: float
+    f_value: float
+    p_value: float
+    # ICC1 = (MSB - MSW) / (MSB + (m - 1) MSW)，m 为每组的平均评分个数；ICC2 = (MSB - MSW) / MSB
+    icc1: float
+    icc2: float
+    # 跳过的组（样本数少于 2）
+    skipped_groups: list = field(default=None, metadata={"export": False})
+
+
+def rwg_analysis(df, group_column=None, rating_columns=None):
+    """
+    组内评分者信度 rwg 分析
+    :param df: 输入数据
+    :param group_column: 分组列的列名，默认为第一列
+    :param rating_columns: 评分列的列名列表，默认为分组列以外的所有数值列
+    :return: RwgResult
+    """
+    group_column = str(df.columns[0]) if group_column is None else str(group_column)
+    columns = {str(name): name for name in df.columns}
+    if group_column not in columns:
+        raise ValueError(f"数据中没有分组列 {group_column}。")
+    if rating_columns is None:
+        rating_columns = [name for name in columns if name != group_column]
+    else:
+        rating_columns = [str(name) for name in rating_columns]
+        missing = [name for name in rating_columns if name not in columns]
+        if missing:
+            raise ValueError(f"数据中没有评分列 {', '.join(missing)}。")
+    ratings = pd.DataFrame({name: numeric_cells(df[columns[name]]) for name in rating_columns})
+    ratings = ratings.dropna(axis=1, how='all')
+    if ratings.empty:
+        raise ValueError("没有数值型的评分列，无法进行 rwg 分析。")
+    groups = df[columns[group_column]].to_numpy()
+    ratings = ratings[pd.notna(groups)]
+    groups = groups[pd.notna(groups)]
+
+    k = ratings.shape[1]
+    expected_var = (k ** 2 - 1) / 12
+    rwg, skipped = {}, []
+    for group in pd.unique(groups):
+        group_data = ratings[groups == group]
+        if group_data.shape[0] < 2:
+            skipped.append(group)
+            continue
+        rwg[group] = 1 - group_data.var(axis=1).mean() / expected_var
+    if not rwg:
+        raise ValueError("没有样本数不少于 2 的组，无法计算 rwg。")
+    rwg = pd.Series(rwg, dtype=float)
+
+    # 单因素方差分析：把所有评分按所在的组展开
+    scores = ratings.assign(_group=groups).melt(id_vars="_group", value_name="score").dropna()
+    samples = [values.to_numpy() for _, values in scores.groupby("_group")["score"]]
+    if len(samples) < 2:
+        raise ValueError("分组列至少需要两个组。")
+    grand_mean = scores["score"].mean()
+    ss_between = sum(len(v) * (v.mean() - grand_mean) ** 2 for v in samples)
+    ss_within = sum(((v - v.mean()) ** 2).sum() for v in samples)
+    df_between, df_within = len(samples) - 1, len(scores) - len(samples)
+    msb, msw = ss_between / df_between, ss_within / df_within
+    f_value = msb / msw
+    m = len(scores) / len(samples)
+    return RwgResult(group_column=group_column, rating_columns=list(ratings.columns), rwg=rwg,
+                     rwg_sd=float(np.std(rwg)), p25=float(np.percentile(rwg, 25)), median=float(np.median(rwg)),
+                     p75=float(np.percentile(rwg, 75)), msb=float(msb), msw=float(msw), f_value=float(f_value),
+                     p_value=float(stats.f.sf(f_value, df_between, df_within)),
+                     icc1=float((msb - msw) / (msb + (m - 1) * msw)), icc2=float((msb - msw) / msb),
+                     skipped_groups=skipped)
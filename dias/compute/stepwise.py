@@ -0,0 +1,167 @@
+"""
+增量逐步回归
+
+当前模型（常数项加已选变量）的设计矩阵保存为正交基 Q（QR 分解），
+所有候选变量和因变量都保存为对当前模型的残差。
+候选变量 j 加入模型后的 t 统计量只需要残差的内积：
+    t_j² = (r_j·r_y)² / (r_j·r_j) / (RSS_new / df)，RSS_new = RSS - (r_j·r_y)² / (r_j·r_j)
+因此每一步用一次矩阵乘法给所有候选变量打分，不再逐个拟合 OLS；
+加入变量时对 Q 和残差做秩一更新，移除检验用 QR 的 R 因子求系数的标准误。
+p 值与 statsmodels OLS 的 t 检验相同，选择结果与逐个拟合的实现一致。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.linalg import solve_triangular
+
+from dias.compute.base import AnalysisResult
+
+# 候选变量对当前模型的残差平方和与其离差平方和之比低于该值时，视为与已选变量共线，不参与选择
+COLLINEAR_TOLERANCE = 1e-10
+
+
+@dataclass
+class StepwiseResult(AnalysisResult):
+    # 按加入顺序排列的最终变量
+    selected: list
+    # 每一步的操作：("add" / "drop", 变量名, p 值)
+    steps: list
+
+
+class IncrementalOLS:
+    """
+    带常数项的 OLS 模型，支持逐个加入、移除变量，并一次性计算所有候选变量加入后的 p 值
+    """
+
+    def __init__(self, X, y):
+        """
+        :param X: 候选变量矩阵 (n, k)
+        :param y: 因变量 (n,)
+        """
+        self.X = np.asarray(X, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.n = len(self.y)
+        self.included = []
+        # 各候选变量的离差平方和，用于判断共线
+        self._scale = ((self.X - self.X.mean(axis=0)) ** 2).sum(axis=0)
+        self._rebuild()
+
+    def _rebuild(self):
+        # 由已选变量重新做 QR 分解，并重新计算残差
+        design = np.column_stack([np.ones(self.n)] + [self.X[:, j] for j in self.included])
+        self.Q = np.linalg.qr(design)[0]
+        self.R_x = self.X - self.Q @ (self.Q.T @ self.X)
+        self.r_y = self.y - self.Q @ (self.Q.T @ self.y)
+
+    @property
+    def df_resid(self):
+        return self.n - len(self.included) - 1
+
+    def candidate_pvalues(self):
+        """
+        所有未选变量单独加入当前模型后，其系数的 t 检验 p 值
+        :return: 长度为 k 的数组，已选变量和共线变量为 NaN
+        """
+        pvalues = np.full(self.X.shape[1], np.nan)
+        df = self.df_resid - 1
+        if df <= 0:
+            return pvalues
+        ss = (self.R_x ** 2).sum(axis=0)
+        cross = self.R_x.T @ self.r_y
+        valid = ss > COLLINEAR_TOLERANCE * self._scale
+        valid[self.included] = False
+        if not valid.any():
+            return pvalues
+        explained = cross[valid] ** 2 / ss[valid]
+        rss = np.maximum(float(self.r_y @ self.r_y) - explained, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.sqrt(explained / (rss / df))
+        pvalues[valid] = 2 * stats.t.sf(t, df)
+        return pvalues
+
+    def included_pvalues(self):
+        """
+        当前模型中各变量系数的 t 检验 p 值（不含常数项），顺序与 included 相同
+        """
+        if not self.included or self.df_resid <= 0:
+            return np.full(len(self.included), np.nan)
+        design = np.column_stack([np.ones(self.n)] + [self.X[:, j] for j in self.included])
+        # Q 与 design 的列顺序相同，Q^T design 即 QR 分解的上三角因子
+        R = self.Q.T @ design
+        R_inv = solve_triangular(R, np.eye(R.shape[0]))
+        beta = R_inv @ (self.Q.T @ self.y)
+        sigma2 = float(self.r_y @ self.r_y) / self.df_resid
+        se = np.sqrt(sigma2 * (R_inv ** 2).sum(axis=1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.abs(beta / se)
+        return (2 * stats.t.sf(t, self.df_resid))[1:]
+
+    def add(self, j):
+        """
+        加入变量 j：Q 增加一列，候选变量和因变量的残差做秩一更新
+        """
+        q = self.R_x[:, j].copy()
+        # 再正交化一次，减小累积的舍入误差
+        q -= self.Q @ (self.Q.T @ q)
+        q /= np.linalg.norm(q)
+        self.Q = np.column_stack([self.Q, q])
+        self.R_x -= np.outer(q, q @ self.R_x)
+        self.r_y -= q * (q @ self.r_y)
+        self.included.append(j)
+
+    def drop(self, j):
+        """
+        移除变量 j，重新分解当前模型
+        """
+        self.included.remove(j)
+        self._rebuild()
+
+
+def stepwise_selection(X, y, initial_list=(), threshold_in=0.05, threshold_out=0.10, verbose=False):
+    """
+    双向逐步回归：每一步先加入 p 值最小且低于 threshold_in 的变量，再移除 p 值最大且高于 threshold_out 的变量，
+    直到模型不再变化
+    :param X: 候选自变量 DataFrame
+    :param y: 因变量
+    :param initial_list: 初始模型中的变量
+    :param threshold_in: 加入变量的 p 值阈值
+    :param threshold_out: 移除变量的 p 值阈值
+    :param verbose: 是否打印每一步的操作
+    :return: StepwiseResult
+    """
+    X = pd.DataFrame(X)
+    columns = list(X.columns)
+    model = IncrementalOLS(X.to_numpy(dtype=float), y)
+    for name in initial_list:
+        model.add(columns.index(name))
+
+    steps = []
+    while True:
+        changed = False
+        # 尝试添加变量
+        pvalues = model.candidate_pvalues()
+        if not np.isnan(pvalues).all():
+            best = int(np.nanargmin(pvalues))
+            if pvalues[best] < threshold_in:
+                model.add(best)
+                changed = True
+                steps.append(("add", columns[best], float(pvalues[best])))
+                if verbose:
+                    print('Add  {:30} with p-value {:.6}'.format(columns[best], pvalues[best]))
+
+        # 尝试移除变量
+        pvalues = model.included_pvalues()
+        if len(pvalues) and not np.isnan(pvalues).all():
+            worst = int(np.nanargmax(pvalues))
+            if pvalues[worst] > threshold_out:
+                changed = True
+                worst_feature = model.included[worst]
+                model.drop(worst_feature)
+                steps.append(("drop", columns[worst_feature], float(pvalues[worst])))
+                if verbose:
+                    print('Drop {:30} with p-value {:.6}'.format(columns[worst_feature], pvalues[worst]))
+        if not changed:
+            break
+    return StepwiseResult(selected=[columns[j] for j in model.included], steps=steps)
@@ -0,0 +1,187 @@
+"""
+问卷调查分析：NPS 净推荐值、联合分析和价格敏感度测试（PSM）
+
+数据以带表头的方式读取。需要指定列的分析在未指定时使用默认布局，便于批处理直接运行。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+
+from dias.compute.base import AnalysisResult, numeric_cells
+
+# 推荐者的最低分和贬损者的最高分，评分范围为 0-10
+NPS_PROMOTER_MIN = 9
+NPS_DETRACTOR_MAX = 6
+NPS_SCORES = list(range(11))
+
+# PSM 数据的四列：各价格点认为太便宜、便宜、贵和太贵的人数
+PSM_COLUMNS = ["TooCheap", "Cheap", "Expensive", "TooExpensive"]
+# 价格点所在的列，没有该列时以行号作为价格点
+PSM_PRICE_COLUMN = "Price"
+
+
+def _column_lookup(df):
+    """
+    列名统一转换为字符串后的查找表
+    :return: {字符串列名: 原列名}
+    """
+    return {str(name).strip(): name for name in df.columns}
+
+
+def _check_columns(lookup, names, kind):
+    missing = [name for name in names if name not in lookup]
+    if missing:
+        raise ValueError(f"数据中没有{kind} {', '.join(missing)}。")
+
+
+@dataclass
+class NpsResult(AnalysisResult):
+    # 每个问题一行：Promoters、Promoters (%)、Passives、Passives (%)、Detractors、Detractors (%)、NPS
+    table: pd.DataFrame
+    # 每个问题一行，列为 0-10 各分数所占的百分比
+    distribution: pd.DataFrame
+
+
+def nps_analysis(df, question_columns=None):
+    """
+    NPS 净推荐值分析，比例的分母为各问题的有效回答数
+    :param df: 输入数据，每行为一位受访者
+    :param question_columns: NPS 问题的列名，默认为所有数值列
+    :return: NpsResult
+    """
+    lookup = _column_lookup(df)
+    if question_columns is None:
+        question_columns = [name for name, column in lookup.items() if not np.isnan(numeric_cells(df[column])).all()]
+    else:
+        question_columns = [str(name).strip() for name in question_columns]
+        _check_columns(lookup, question_columns, "NPS 问题列")
+    if not question_columns:
+        raise ValueError("数据中没有数值列，无法进行 NPS 分析。")
+    rows, distribution = {}, {}
+    for name in question_columns:
+        responses = pd.Series(numeric_cells(df[lookup[name]])).dropna()
+        total = len(responses)
+        if total == 0:
+            raise ValueError(f"问题 {name} 没有有效回答。")
+        promoters = int((responses >= NPS_PROMOTER_MIN).sum())
+        detractors = int((responses <= NPS_DETRACTOR_MAX).sum())
+        passives = total - promoters - detractors
+        rows[name] = {
+            "Promoters": promoters, "Promoters (%)": promoters / total * 100,
+            "Passives": passives, "Passives (%)": passives / total * 100,
+            "Detractors": detractors, "Detractors (%)": detractors / total * 100,
+            "NPS": (promoters - detractors) / total * 100,
+        }
+        distribution[name] = responses.round().value_counts().reindex(NPS_SCORES, fill_value=0) / total * 100
+    return NpsResult(table=pd.DataFrame.from_dict(rows, orient='index'),
+                     distribution=pd.DataFrame.from_dict(distribution, orient='index'))
+
+
+@dataclass
+class ConjointResult(AnalysisResult):
+    preference_column: str
+    attribute_columns: list
+    r_squared: float
+    nobs: int
+    # 各属性的相对重要性（%）= 该属性水平效应的极差 / 所有属性极差之和
+    importance: pd.Series
+    # 各属性水平的效应（成分效用），每个属性内部中心化为均值 0；列为 Attribute、Level、Part-worth
+    part_worths: pd.DataFrame
+
+
+def conjoint_analysis(df, preference_column=None, attribute_columns=None):
+    """
+    联合分析：偏好评分对各属性（作为分类变量）做 OLS 回归，由回归系数得到各水平的成分效用
+    :param df: 输入数据，每行为一个产品组合
+    :param preference_column: 偏好列的列名，默认为最后一列
+    :param attribute_columns: 属性列的列名列表，默认为偏好列以外的所有列
+    :return: ConjointResult
+    """
+    lookup = _column_lookup(df)
+    preference_column = list(lookup)[-1] if preference_column is None else str(preference_column).strip()
+    _check_columns(lookup, [preference_column], "偏好列")
+    if attribute_columns is None:
+        attribute_columns = [name for name in lookup if name != preference_column]
+    else:
+        attribute_columns = [str(name).strip() for name in attribute_columns]
+        _check_columns(lookup, attribute_columns, "属性列")
+    if not attribute_columns:
+        raise ValueError("至少需要一个属性列才能进行联合分析。")
+    # 列名可能含有空格或中文，统一换成公式中可用的名称
+    data = pd.DataFrame({"y": numeric_cells(df[lookup[preference_column]])})
+    for i, name in enumerate(attribute_columns):
+        data[f"x{i}"] = df[lookup[name]].to_numpy()
+    data = data.dropna()
+    levels = [sorted(data[f"x{i}"].unique()) for i in range(len(attribute_columns))]
+    if any(len(values) < 2 for values in levels):
+        raise ValueError("每个属性至少需要两个水平。")
+    terms = " + ".join(f"C(x{i})" for i in range(len(attribute_columns)))
+    model = smf.ols(f"y ~ {terms}", data=data).fit()
+    if model.df_resid <= 0:
+        raise ValueError("产品组合数太少，无法估计所有属性水平的效应。")
+
+    rows, ranges = [], {}
+    for i, name in enumerate(attribute_columns):
+        # 第一个水平为参照水平，效应为 0
+        utilities = np.array([0.0] + [model.params[f"C(x{i})[T.{level}]"] for level in levels[i][1:]])
+        utilities -= utilities.mean()
+        ranges[name] = utilities.max() - utilities.min()
+        rows.extend([name, level, utility] for level, utility in zip(levels[i], utilities))
+    ranges = pd.Series(ranges)
+    if ranges.sum() == 0:
+        raise ValueError("各属性水平的效应都为 0，无法计算属性的相对重要性。")
+    return ConjointResult(preference_column=preference_column, attribute_columns=attribute_columns,
+                          r_squared=float(model.rsquared), nobs=int(model.nobs),
+                          importance=ranges / ranges.sum() * 100,
+                          part_worths=pd.DataFrame(rows, columns=["Attribute", "Level", "Part-worth"]))
+
+
+@dataclass
+class PsmResult(AnalysisResult):
+    # 每个价格点一行：Price 和 PSM_COLUMNS 四列各自除以列和后的比例
+    ratios: pd.DataFrame
+    # 各对曲线交叉处的价格点，没有交叉时为 None
+    indifference_point: float
+    optimal_price_point: float
+    lower_bound: float
+    upper_bound: float
+
+
+def _crossing(prices, first, second):
+    """
+    两条曲线第一次交叉的位置：差值变号（或恰好相等）前的价格点
+    :return: 价格点，没有交叉时为 None
+    """
+    sign = np.sign(first - second)
+    crossings = np.flatnonzero((sign[:-1] * sign[1:] < 0) | (sign[:-1] == 0))
+    return float(prices[crossings[0]]) if len(crossings) else None
+
+
+def price_sensitivity_meter(df):
+    """
+    价格敏感度测试（Van Westendorp PSM）
+    :param df: 每行为一个价格点，包含 PSM_COLUMNS 四列人数；有 Price 列时以其为价格点，否则以行号为价格点
+    :return: PsmResult
+    """
+    lookup = _column_lookup(df)
+    _check_columns(lookup, PSM_COLUMNS, "PSM 数据列")
+    counts = pd.DataFrame({name: numeric_cells(df[lookup[name]]) for name in PSM_COLUMNS})
+    prices = numeric_cells(df[lookup[PSM_PRICE_COLUMN]]) if PSM_PRICE_COLUMN in lookup else df.index.to_numpy()
+    counts.insert(0, "Price", prices)
+    counts = counts.dropna().reset_index(drop=True)
+    if len(counts) < 2:
+        raise ValueError("至少需要两个价格点才能进行价格敏感度测试。")
+    totals = counts[PSM_COLUMNS].sum()
+    if (totals == 0).any():
+        raise ValueError("存在人数全为 0 的列，无法计算比例。")
+    ratios = counts.copy()
+    ratios[PSM_COLUMNS] = counts[PSM_COLUMNS] / totals
+    price = ratios["Price"].to_numpy()
+    too_cheap, cheap, expensive, too_expensive = (ratios[name].to_numpy() for name in PSM_COLUMNS)
+    return PsmResult(ratios=ratios,
+                     indifference_point=_crossing(price, cheap, expensive),
+                     optimal_price_point=_crossing(price, too_cheap, too_expensive),
+                     lower_bound=_crossing(price, too_cheap, cheap),
+                     upper_bound=_crossing(price, too_expensive, expensive))
@@ -0,0 +1,240 @@
+"""
+TURF（Total Unduplicated Reach and Frequency）组合分析
+
+每个项目覆盖的受访者压缩为一个位集（每 64 位受访者占一个 uint64），
+组合的到达人数为各项目位集按位或之后的 popcount，频次为各项目到达人数之和。
+搜索方式：
+- 穷举：按第一个项目划分任务，每个任务把后续组合分块取出，一次按位或、一次 popcount，给出前若干名组合
+- 贪心：每步加入新增到达人数最多的项目，同时给出 1..k 个项目的到达曲线
+- 分支定界：以贪心解为初始下界；到达人数是次模函数，当前到达人数加上剩余候选中前 r 个边际增量之和是上界，
+  不超过已知最优解的分支被剪去，最优组合的到达人数和频次与穷举相同
+穷举和分支定界的顶层分支分配到多个进程中计算。
+"""
+import heapq
+from dataclasses import dataclass
+from itertools import combinations, islice
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from dias.compute.base import AnalysisResult, run_tasks, select_numeric
+
+TURF_METHODS = ["Auto", "Exhaustive", "Greedy", "Branch and Bound"]
+# 回答不小于该值视为被该项目到达（0/1 数据取 1，五级量表的前两项取 4）
+TURF_THRESHOLD = 1
+TURF_SIZE = 3
+# 穷举时报告的前若干名组合
+TURF_TOP = 20
+# 自动模式下组合数不超过该值时穷举，否则分支定界
+EXHAUSTIVE_LIMIT = 1_000_000
+# 穷举时每块临时数组的字节数上限
+_BLOCK_BYTES = 32 * 1024 * 1024
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        """
+        位集中 1 的个数
+        :param words: (..., 字数) 的 uint64 数组
+        :return: (...) 的整数数组
+        """
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:  # NumPy 2.0 之前没有 bitwise_count，按字节查表
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+    def popcount(words):
+        bytes_ = np.ascontiguousarray(words).view(np.uint8)
+        return _BYTE_COUNTS[bytes_].sum(axis=-1)
+
+
+def pack_coverage(reached):
+    """
+    将到达矩阵压缩为每个项目一个位集
+    :param reached: (受访者数, 项目数) 的布尔数组
+    :return: (项目数, 字数) 的 uint64 数组
+    """
+    n, m = reached.shape
+    packed = np.packbits(reached.T, axis=1, bitorder="little")
+    padded = np.zeros((m, -(-n // 64) * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view(np.uint64)
+
+
+def _better(a, b):
+    # 到达人数多者为优，其次频次高者，再次项目编号的字典序小者
+    return (a[0], a[1], [-i for i in a[2]]) > (b[0], b[1], [-i for i in b[2]])
+
+
+def _exhaustive_task(bits, counts, size, first, top):
+    """
+    以 first 为第一个项目的全部组合
+    :return: (前 top 名 [(到达人数, 频次, 项目编号元组)], 评估的组合数)
+    """
+    m, words = bits.shape
+    rest = combinations(range(first + 1, m), size - 1)
+    block = max(1, _BLOCK_BYTES // (max(size - 1, 1) * words * 8))
+    best, evaluated = [], 0
+    while True:
+        chunk = list(islice(rest, block))
+        if not chunk:
+            break
+        combos = np.array(chunk, dtype=np.intp).reshape(len(chunk), size - 1)
+        covered = bits[first] | np.bitwise_or.reduce(bits[combos], axis=1)
+        reach = popcount(covered)
+        frequency = counts[first] + counts[combos].sum(axis=1)
+        evaluated += len(chunk)
+        # 每块只保留前 top 名参与合并
+        keep = np.lexsort((-frequency, -reach))[:top]
+        for i in keep:
+            best.append((int(reach[i]), int(frequency[i]), (first, *combos[i])))
+        best = heapq.nlargest(top, best, key=lambda r: (r[0], r[1], [-i for i in r[2]]))
+    return best, evaluated
+
+
+def greedy_turf(bits, counts, size):
+    """
+    贪心选择：每步加入新增到达人数最多的项目（相同时取频次高者）
+    :param bits: pack_coverage 的结果
+    :param counts: 每个项目的到达人数
+    :param size: 项目数
+    :return: (项目编号列表, 每步之后的到达人数列表)
+    """
+    m, words = bits.shape
+    covered = np.zeros(words, dtype=np.uint64)
+    chosen, reaches = [], []
+    for _ in range(min(size, m)):
+        gains = popcount(bits & ~covered)
+        gains[chosen] = -1
+        best = int(np.lexsort((np.arange(m), -counts, -gains))[0])
+        chosen.append(best)
+        covered |= bits[best]
+        reaches.append(int(popcount(covered)))
+    return chosen, reaches
+
+
+def _branch_and_bound_task(bits, counts, size, chosen, candidates, incumbent):
+    """
+    在已选 chosen 的前提下，从 candidates 中再选 size - len(chosen) 个项目的最优组合
+    :param incumbent: 初始的最优解 (到达人数, 频次, 项目编号元组)
+    :return: (最优解, 访问的节点数)
+    """
+    best = incumbent
+    nodes = 0
+    top_counts = np.sort(counts)[::-1]
+
+    def search(chosen, covered, reach, frequency, candidates):
+        nonlocal best, nodes
+        nodes += 1
+        r = size - len(chosen)
+        if r == 0:
+            result = (reach, frequency, tuple(sorted(chosen)))
+            if _better(result, best):
+                best = result
+            return
+        if len(candidates) < r:
+            return
+        gains = popcount(bits[candidates] & ~covered)
+        # 候选按边际增量从大到小排列，第 i 个子分支只能再从其后的候选中选择
+        order = np.lexsort((-counts[candidates], -gains))
+        candidates, gains = candidates[order], gains[order]
+        frequency_bound = frequency + top_counts[:r].sum()
+        for i in range(len(candidates) - r + 1):
+            # 次模性：子分支的到达人数不超过当前值加上该候选及其后 r - 1 个候选的增量之和
+            bound = reach + gains[i:i + r].sum()
+            if bound < best[0] or (bound == best[0] and frequency_bound <= best[1]):
+                # 之后的候选增量更小，上界也不会更大
+                break
+            item = candidates[i]
+            search(chosen + [int(item)], covered | bits[item], reach + int(gains[i]),
+                   frequency + int(counts[item]), candidates[i + 1:])
+
+    covered = np.bitwise_or.reduce(bits[chosen], axis=0) if chosen else np.zeros(bits.shape[1], dtype=np.uint64)
+    search(list(chosen), covered, int(popcount(covered)), int(counts[chosen].sum()), np.asarray(candidates))
+    return best, nodes
+
+
+@dataclass
+class TurfResult(AnalysisResult):
+    # 最优组合（穷举时为前 TURF_TOP 名）：项目、到达人数、到达率、频次、平均频次
+    combinations: pd.DataFrame
+    # 贪心到达曲线：每步加入的项目、累计到达人数、到达率、新增到达人数
+    reach_curve: pd.DataFrame
+    # 每个项目单独的到达人数和到达率
+    items: pd.DataFrame
+    method: str
+    size: int
+    respondents: int
+    # 穷举为评估的组合数，分支定界为访问的节点数，贪心为步数
+    evaluated: int
+
+
+def turf_analysis(df, size=TURF_SIZE, method="Auto", threshold=TURF_THRESHOLD, top=TURF_TOP, parallel=True,
+                  workers=None):
+    """
+    TURF 组合分析
+    :param df: 每行为一位受访者，每个数值列为一个项目，缺失值视为未到达
+    :param size: 组合中的项目数
+    :param method: TURF_METHODS 之一
+    :param threshold: 回答不小于该值视为被该项目到达
+    :param top: 穷举时报告的组合数
+    :param parallel: 是否在进程池中并行搜索
+    :param workers: 工作进程数，默认取环境变量 DIAS_COMPUTE_WORKERS，未设置时等于 CPU 核数
+    :return: TurfResult
+    """
+    if method not in TURF_METHODS:
+        raise ValueError(f"未知的搜索方式: {method}")
+    numerical_df = select_numeric(df, "数据中没有数值列，无法进行Turf组合模型分析。")
+    names = [str(c) for c in numerical_df.columns]
+    m = len(names)
+    if not 1 <= size <= m:
+        raise ValueError(f"组合中的项目数须在 1 到 {m} 之间。")
+    reached = numerical_df.to_numpy(dtype=float) >= threshold
+    n = len(reached)
+    bits = pack_coverage(reached)
+    counts = reached.sum(axis=0).astype(np.int64)
+
+    if method == "Auto":
+        method = "Exhaustive" if comb(m, size) <= EXHAUSTIVE_LIMIT else "Branch and Bound"
+
+    greedy_items, greedy_reaches = greedy_turf(bits, counts, size)
+    greedy = (greedy_reaches[-1], int(counts[greedy_items].sum()), tuple(sorted(greedy_items)))
+    if method == "Exhaustive":
+        tasks = [(bits, counts, size, first, top) for first in range(m - size + 1)]
+        outcomes = run_tasks(_exhaustive_task, tasks, parallel, workers)
+        best = heapq.nlargest(top, [r for found, _ in outcomes for r in found],
+                              key=lambda r: (r[0], r[1], [-i for i in r[2]]))
+        evaluated = sum(e for _, e in outcomes)
+    elif method == "Branch and Bound":
+        # 顶层按单个项目的到达人数排序，第 i 个分支包含第 i 个项目、只从其后的项目中继续选择
+        order = np.lexsort((np.arange(m), -counts))
+        tasks = [(bits, counts, size, [int(order[i])], order[i + 1:], greedy) for i in range(m - size + 1)]
+        outcomes = run_tasks(_branch_and_bound_task, tasks, parallel, workers)
+        best_found = greedy
+        for found, _ in outcomes:
+            if _better(found, best_found):
+                best_found = found
+        best = [best_found]
+        evaluated = sum(e for _, e in outcomes)
+    else:
+        best = [greedy]
+        evaluated = size
+
+    combos = pd.DataFrame({
+        "Rank": np.arange(1, len(best) + 1),
+        "Items": [", ".join(names[i] for i in items) for _, _, items in best],
+        "Reach": [reach for reach, _, _ in best],
+        "Reach (%)": [reach / n * 100 if n else np.nan for reach, _, _ in best],
+        "Frequency": [frequency for _, frequency, _ in best],
+        "Average Frequency": [frequency / reach if reach else np.nan for reach, frequency, _ in best],
+    })
+    curve = np.array(greedy_reaches)
+    reach_curve = pd.DataFrame({
+        "Size": np.arange(1, len(curve) + 1),
+        "Added Item": [names[i] for i in greedy_items],
+        "Reach": curve,
+        "Reach (%)": curve / n * 100 if n else np.nan,
+        "Incremental Reach": np.diff(curve, prepend=0),
+    })
+    items = pd.DataFrame({"Reach": counts, "Reach (%)": counts / n * 100 if n else np.nan}, index=names)
+    return TurfResult(combinations=combos, reach_curve=reach_curve, items=items, method=method, size=size,
+                      respondents=n, evaluated=evaluated)
@@ -0,0 +1,174 @@
+"""
+指标赋权：CRITIC 法、熵值法、独立性权重法和层次分析法（AHP / FAHP）
+
+指标数据以不带表头的方式读取，行为评价对象，列为指标；表头行和名称列在 numeric_matrix 中去掉。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from dias.compute.base import AnalysisResult, numeric_matrix
+
+# 随机一致性指标 RI，键为判断矩阵的阶数
+RI_TABLE = {
+    1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45
+}
+
+# 一致性比率小于该值时认为判断矩阵的一致性可以接受
+CR_THRESHOLD = 0.1
+
+
+def indicator_matrix(df):
+    """
+    读取指标数据矩阵，要求每个单元格都是数字
+    :return: 二维浮点数组，行为评价对象，列为指标
+    """
+    data = numeric_matrix(df, "数据中没有数值，无法计算指标权重。")
+    if np.isnan(data).any():
+        raise ValueError("指标数据中存在缺失值或非数字单元格。")
+    if data.shape[0] < 2:
+        raise ValueError("至少需要两个评价对象才能计算指标权重。")
+    return data
+
+
+@dataclass
+class CriticResult(AnalysisResult):
+    # 各指标的标准差（对比强度）
+    std: np.ndarray
+    # 指标间的相关系数矩阵
+    correlation: np.ndarray
+    # 各指标的信息量 = 标准差 × Σ(1 - 相关系数)
+    information: np.ndarray
+    weights: np.ndarray
+    data: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def critic_weights(df):
+    """
+    CRITIC 权重法
+    :param df: 指标数据
+    :return: CriticResult
+    """
+    data = indicator_matrix(df)
+    std = np.std(data, axis=0)
+    if (std == 0).any():
+        raise ValueError("存在取值完全相同的指标，无法计算相关系数。")
+    correlation = np.corrcoef(data, rowvar=False)
+    information = std * np.sum(1 - correlation, axis=0)
+    return CriticResult(std=std, correlation=correlation, information=information,
+                        weights=information / information.sum(), data=data)
+
+
+@dataclass
+class EntropyResult(AnalysisResult):
+    # 各指标的信息熵，取值 0-1
+    entropy: np.ndarray
+    # 冗余度（差异系数）= 1 - 熵值
+    redundancy: np.ndarray
+    weights: np.ndarray
+    data: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def entropy_weights(df):
+    """
+    熵值法（信息熵权重法），各指标按列和归一化后计算熵值
+    :param df: 指标数据，要求非负
+    :return: EntropyResult
+    """
+    data = indicator_matrix(df)
+    if (data < 0).any():
+        raise ValueError("熵值法要求指标数据非负。")
+    totals = data.sum(axis=0)
+    if (totals == 0).any():
+        raise ValueError("存在全为 0 的指标，无法计算熵值。")
+    proportions = data / totals
+    entropy = -np.sum(proportions * np.log(proportions + 1e-8), axis=0) / np.log(data.shape[0])
+    redundancy = 1 - entropy
+    return EntropyResult(entropy=entropy, redundancy=redundancy, weights=redundancy / redundancy.sum(), data=data)
+
+
+@dataclass
+class IndependenceResult(AnalysisResult):
+    # 各指标的标准差
+    std: np.ndarray
+    weights: np.ndarray
+    data: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def independence_weights(df):
+    """
+    独立性权重法，权重与各指标的标准差成正比
+    :param df: 指标数据
+    :return: IndependenceResult
+    """
+    data = indicator_matrix(df)
+    std = np.std(data, axis=0)
+    if std.sum() == 0:
+        raise ValueError("所有指标的取值都相同，无法计算权重。")
+    return IndependenceResult(std=std, weights=std / std.sum(), data=data)
+
+
+@dataclass
+class AhpResult(AnalysisResult):
+    method: str
+    # 各因素的权重（归一化的特征向量）
+    weights: np.ndarray
+    max_eigenvalue: float
+    # 一致性指标 CI = (λmax - n) / (n - 1)
+    ci: float
+    ri: float
+    # 一致性比率 CR = CI / RI，阶数不超过 2 时 RI 为 0，CR 记为 0
+    cr: float
+    consistent: bool
+    matrix: np.ndarray = field(default=None, metadata={"export": False})
+
+
+def judgement_matrix(df):
+    """
+    读取判断矩阵，要求为方阵且元素为正数
+    :return: 二维浮点数组
+    """
+    matrix = numeric_matrix(df, "数据中没有数值，无法读取判断矩阵。")
+    n = matrix.shape[0]
+    if matrix.shape[1] != n:
+        raise ValueError("判断矩阵必须是方阵。")
+    if np.isnan(matrix).any() or (matrix <= 0).any():
+        raise ValueError("判断矩阵的元素必须都是正数。")
+    if n not in RI_TABLE or n < 2:
+        raise ValueError("判断矩阵阶数超出支持范围")
+    return matrix
+
+
+def _ahp_result(method, matrix, weights, max_eigenvalue):
+    n = matrix.shape[0]
+    ci = (max_eigenvalue - n) / (n - 1)
+    ri = RI_TABLE[n]
+    cr = ci / ri if ri else 0.0
+    return AhpResult(method=method, weights=weights, max_eigenvalue=float(max_eigenvalue), ci=float(ci), ri=ri,
+                     cr=float(cr), consistent=bool(cr < CR_THRESHOLD), matrix=matrix)
+
+
+def ahp(df):
+    """
+    层次分析法，权重为判断矩阵最大特征值对应的特征向量
+    :param df: 判断矩阵
+    :return: AhpResult
+    """
+    matrix = judgement_matrix(df)
+    eigenvalues, eigenvectors = np.linalg.eig(matrix)
+    index = np.argmax(eigenvalues.real)
+    eigenvector = eigenvectors[:, index].real
+    return _ahp_result("AHP", matrix, eigenvector / eigenvector.sum(), eigenvalues[index].real)
+
+
+def fuzzy_ahp(df):
+    """
+    模糊层次分析法，权重由模糊判断矩阵的行和归一化得到，λmax 用 Σ(Aw)_i / (n w_i) 估计
+    :param df: 模糊判断矩阵
+    :return: AhpResult
+    """
+    matrix = judgement_matrix(df)
+    row_sums = matrix.sum(axis=1)
+    weights = row_sums / row_sums.sum()
+    max_eigenvalue = np.sum(matrix @ weights / (weights * len(matrix)))
+    return _ahp_result("FAHP", matrix, weights, max_eigenvalue)
@@ -0,0 +1,298 @@
+"""
+Excel 工作簿的列式缓存
+
+工作簿第一次读取时用 pandas 解析，并转换为 Arrow IPC 文件保存在缓存目录中；
+之后再次读取同一文件（路径、修改时间、大小、工作表和读取参数均相同）时，
+直接内存映射 Arrow 文件，不再重新解析 Excel。
+缓存目录超过容量上限时，按最近使用时间淘汰最旧的条目。
+"""
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # 未安装 pyarrow 时直接读取 Excel，不使用缓存
+    pa = None
+
+# 缓存目录和容量上限，可通过环境变量修改
+CACHE_DIR = os.environ.get("DIAS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".dias", "cache", "datasets"))
+CACHE_SIZE_LIMIT = int(os.environ.get("DIAS_CACHE_SIZE_MB", "1024")) * 1024 * 1024
+# 流式读取时每批的行数
+ROW_BATCH_SIZE = 4096
+
+# 写入 Arrow schema 元数据中的原始列名，用于还原 header=None 时的整数列名
+COLUMNS_METADATA_KEY = b"dias_columns"
+# 以结构列保存的混合类型列
+MIXED_METADATA_KEY = b"dias_mixed_columns"
+
+
+def cache_key(file_path, sheet_name=0, **kwargs):
+    """
+    根据文件路径、修改时间、文件大小、工作表和读取参数生成缓存键
+    :return: 十六进制字符串
+    """
+    stat = os.stat(file_path)
+    parts = [os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, sheet_name, sorted(kwargs.items())]
+    return hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.arrow")
+
+
+# 混合类型列中每个值的类型编码
+KIND_NULL, KIND_INT, KIND_FLOAT, KIND_TEXT, KIND_BOOL = range(5)
+
+
+def _encode_mixed(series):
+    """
+    将混有数字和文本的对象列编码为 Arrow 结构列 (kind, number, text)
+    :return: StructArray；遇到无法编码的值（如日期与文本混合）时返回 None
+    """
+    kinds, numbers, texts = [], [], []
+    for value in series:
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            kind = KIND_NULL
+        elif isinstance(value, bool):
+            kind = KIND_BOOL
+        elif isinstance(value, int):
+            kind = KIND_INT
+        elif isinstance(value, float):
+            kind = KIND_FLOAT
+        elif isinstance(value, str):
+            kind = KIND_TEXT
+        else:
+            return None
+        kinds.append(kind)
+        numbers.append(float(value) if kind in (KIND_INT, KIND_FLOAT, KIND_BOOL) else None)
+        texts.append(value if kind == KIND_TEXT else None)
+    return pa.StructArray.from_arrays(
+        [pa.array(kinds, pa.int8()), pa.array(numbers, pa.float64()), pa.array(texts, pa.string())],
+        names=["kind", "number", "text"])
+
+
+def _decode_mixed(column):
+    """
+    将结构列还原为与 pd.read_excel 相同的对象数组
+    """
+    struct = column.combine_chunks()
+    kinds = struct.field("kind").to_numpy(zero_copy_only=False)
+    numbers = struct.field("number").to_numpy(zero_copy_only=False)
+    texts = struct.field("text").to_numpy(zero_copy_only=False)
+    values = np.full(len(kinds), np.nan, dtype=object)
+    for kind, converted in ((KIND_INT, lambda m: numbers[m].astype(np.int64)),
+                            (KIND_FLOAT, lambda m: numbers[m]),
+                            (KIND_BOOL, lambda m: numbers[m].astype(bool)),
+                            (KIND_TEXT, lambda m: texts[m])):
+        mask = kinds == kind
+        if mask.any():
+            values[mask] = converted(mask).astype(object)
+    return values
+
+
+def _read_cached(path):
+    # 内存映射读取，避免把整个文件先读入内存
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    metadata = table.schema.metadata or {}
+    mixed = json.loads(metadata.get(MIXED_METADATA_KEY, b"[]"))
+    df = table.drop_columns(mixed).to_pandas() if mixed else table.to_pandas()
+    for column in mixed:
+        df.insert(table.schema.get_field_index(column), column, _decode_mixed(table.column(column)))
+    if COLUMNS_METADATA_KEY in metadata:
+        df.columns = json.loads(metadata[COLUMNS_METADATA_KEY])
+    return df
+
+
+def _to_table(df):
+    """
+    将 DataFrame 转换为 Arrow 表
+    :return: Arrow 表；存在无法保存的列时返回 None
+    """
+    stored = df.copy(deep=False)
+    metadata = {}
+    if not all(isinstance(c, str) for c in df.columns):
+        # Arrow 只接受字符串列名，其他类型的列名先转为字符串并记录原值
+        labels = list(df.columns)
+        if not all(isinstance(c, (str, int, float)) for c in labels):
+            return None
+        metadata[COLUMNS_METADATA_KEY] = json.dumps(labels).encode("utf-8")
+        stored.columns = [str(c) for c in labels]
+    if stored.columns.duplicated().any():
+        return None
+
+    mixed = {}
+    for position, column in enumerate(stored.columns):
+        if stored[column].dtype != object:
+            continue
+        try:
+            pa.array(stored[column], from_pandas=True)
+        except (pa.ArrowException, ValueError, TypeError):
+            # 同一列中混有数字和文本（例如 header=None 时的表头行），改用结构列保存
+            encoded = _encode_mixed(stored[column])
+            if encoded is None:
+                return None
+            mixed[column] = (position, encoded)
+
+    try:
+        table = pa.Table.from_pandas(stored.drop(columns=list(mixed)), preserve_index=True)
+    except (pa.ArrowException, ValueError, TypeError):
+        return None
+    for column, (position, encoded) in mixed.items():
+        table = table.add_column(position, column, encoded)
+    if mixed:
+        metadata[MIXED_METADATA_KEY] = json.dumps(list(mixed)).encode("utf-8")
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+
+def _write_cached(df, path):
+    table = _to_table(df)
+    if table is None:
+        return False
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # 先写临时文件再重命名，多个进程同时写同一条目时不会读到半个文件
+    os.replace(tmp_path, path)
+    return True
+
+
+def evict_lru(directory, suffix, limit):
+    """
+    按最近使用时间（文件修改时间）淘汰目录中的缓存文件，直到总大小不超过上限
+    :param directory: 缓存目录
+    :param suffix: 缓存文件的扩展名
+    :param limit: 容量上限（字节）
+    :return: 被删除的文件数
+    """
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(suffix):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            # 其他进程正在使用（例如 Windows 上仍被映射）时跳过
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def evict(limit=None):
+    """
+    按最近使用时间淘汰缓存条目，直到总大小不超过上限
+    :param limit: 容量上限（字节），默认为 CACHE_SIZE_LIMIT
+    :return: 被删除的文件数
+    """
+    return evict_lru(CACHE_DIR, ".arrow", CACHE_SIZE_LIMIT if limit is None else limit)
+
+
+def clear_cache():
+    """
+    删除全部缓存条目
+    """
+    return evict(limit=0)
+
+
+def load_excel(file_path, sheet_name=0, **kwargs):
+    """
+    读取 Excel 工作表，参数与 pd.read_excel 相同，结果通过 Arrow 缓存复用
+    :param file_path: 工作簿路径
+    :param sheet_name: 工作表名称或序号
+    :param kwargs: 传给 pd.read_excel 的其他参数，例如 header=None
+    :return: DataFrame
+    """
+    if pa is None or not isinstance(sheet_name, (str, int)):
+        return pd.read_excel(file_path, sheet_name=sheet_name, **kwargs)
+
+    path = _cache_path(cache_key(file_path, sheet_name, **kwargs))
+    if os.path.exists(path):
+        try:
+            df = _read_cached(path)
+            # 更新修改时间，作为 LRU 淘汰的最近使用时间
+            os.utime(path)
+            return df
+        except (OSError, pa.ArrowException):
+            # 缓存文件损坏或已被淘汰，重新读取 Excel
+            pass
+
+    df = pd.read_excel(file_path, sheet_name=sheet_name, **kwargs)
+    try:
+        if _write_cached(df, path):
+            evict()
+    except OSError:
+        # 缓存目录不可写时不影响分析本身
+        pass
+    return df
+
+
+def _numeric_or_nan(value):
+    # 与逐格读取时的判断一致：只有数字单元格参与计算
+    return value if isinstance(value, (int, float)) else np.nan
+
+
+def _iter_row_batches(file_path, batch_size, convert, dtype):
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        width = len(header)
+        batch = []
+        for row in rows:
+            values = [convert(v) for v in row[:width]]
+            values.extend([convert(None)] * (width - len(values)))
+            batch.append(values)
+            if len(batch) == batch_size:
+                yield header, np.array(batch, dtype=dtype)
+                batch = []
+        if batch:
+            yield header, np.array(batch, dtype=dtype)
+    finally:
+        # 只读模式会一直占用文件句柄，必须显式关闭
+        workbook.close()
+
+
+def iter_numeric_batches(file_path, batch_size=ROW_BATCH_SIZE):
+    """
+    以只读模式流式读取活动工作表，不把整个工作簿载入内存
+    第一行为表头，其余行中的非数字单元格（文本、空白、日期等）记为 NaN
+    :param file_path: 工作簿路径（.xlsx）
+    :param batch_size: 每批的行数
+    :return: 逐批产生 (表头列表, 形状为 (行数, 列数) 的浮点数组)
+    """
+    return _iter_row_batches(file_path, batch_size, _numeric_or_nan, float)
+
+
+def iter_cell_batches(file_path, batch_size=ROW_BATCH_SIZE):
+    """
+    以只读模式流式读取活动工作表的原始单元格值，用于文本列
+    第一行为表头，空白单元格为 None
+    :param file_path: 工作簿路径（.xlsx）
+    :param batch_size: 每批的行数
+    :return: 逐批产生 (表头列表, 形状为 (行数, 列数) 的对象数组)
+    """
+    return _iter_row_batches(file_path, batch_size, lambda v: v, object)
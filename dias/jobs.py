@@ -0,0 +1,301 @@
+"""
+分析任务的后台执行
+
+计算和生成报告在工作线程中进行，进度、结果和异常通过队列传回，
+由 Tk 主线程用 root.after 定时取出并更新界面，因此长时间的分析不会让窗口失去响应，
+多个分析器窗口也可以同时运行各自的任务。
+
+取消是协作式的：取消标记在工作线程中登记（dias.compute.base.cancellation），
+工作线程在每个阶段开始前、run_tasks 在任务之间（撤销进程池中尚未开始的任务）、
+报告在保存之前检查该标记。工作线程真正退出之前任务仍视为运行中，不能开始新的任务。
+"""
+import queue
+import threading
+import tkinter as tk
+
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+from dias.compute.base import ComputationCancelled, cancellation
+from dias.dataset import load_excel
+from dias.results import analyzer_name, cached_analyze
+
+# 主线程检查任务队列的间隔（毫秒）
+POLL_INTERVAL_MS = 100
+
+# 进度面板的界面文字
+LANGUAGES = {
+    'zh': {
+        'cancel': "取消",
+        'loading': "正在读取数据…",
+        'analyzing': "正在分析…",
+        'writing': "正在生成报告…",
+        'writing_cached': "数据和参数未改变，使用上次的计算结果，正在生成报告…",
+        'cancelling': "正在取消，等待当前步骤结束…",
+        'cancelled': "已取消。",
+    },
+    'en': {
+        'cancel': "Cancel",
+        'loading': "Reading data...",
+        'analyzing': "Analyzing...",
+        'writing': "Writing report...",
+        'writing_cached': "Data and parameters unchanged, reusing the previous results. Writing report...",
+        'cancelling': "Cancelling, waiting for the current step to finish...",
+        'cancelled': "Cancelled.",
+    }
+}
+
+
+class JobCancelled(ComputationCancelled):
+    """
+    任务已被取消，由 Job.progress 在工作线程中抛出
+    """
+
+
+class Job:
+    """
+    在工作线程中传给任务函数的句柄，用于报告进度和检查是否已取消
+    """
+
+    def __init__(self):
+        self._events = queue.Queue()
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self, fraction, message=""):
+        """
+        报告进度，任务已取消时抛出 JobCancelled
+        :param fraction: 0 到 1 之间的完成比例
+        :param message: 进度说明，进度面板会先在 LANGUAGES 中查找同名的键
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        self._events.put(("progress", (fraction, message)))
+
+
+class JobRunner:
+    """
+    在工作线程中运行任务函数，并在 Tk 主线程中回调
+    """
+
+    def __init__(self, widget, on_progress=None, on_done=None, on_error=None, on_cancelled=None):
+        """
+        :param widget: 用于 after 定时检查的 Tk 控件
+        :param on_progress: on_progress(fraction, message)
+        :param on_done: on_done(任务函数的返回值)
+        :param on_error: on_error(异常)
+        :param on_cancelled: on_cancelled()，已取消的任务的工作线程退出后调用
+        """
+        self.widget = widget
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.job = None
+        self._thread = None
+        self._outcome = None
+        self._after_id = None
+
+    @property
+    def running(self):
+        # 取消后工作线程退出之前仍视为运行中
+        return self._thread is not None
+
+    def start(self, func, *args, **kwargs):
+        """
+        在工作线程中运行 func(job, *args, **kwargs)
+        :return: Job
+        """
+        if self.running:
+            raise RuntimeError("上一个任务尚未结束")
+        job = self.job = Job()
+
+        def work():
+            # 计算函数中的 run_tasks 和报告的保存通过线程中登记的取消标记响应取消
+            with cancellation(job._cancel):
+                try:
+                    job._events.put(("done", func(job, *args, **kwargs)))
+                except ComputationCancelled:
+                    pass
+                except Exception as e:
+                    job._events.put(("error", e))
+
+        # 守护线程：关闭窗口或退出程序时不等待未完成的任务
+        self._thread = threading.Thread(target=work, daemon=True)
+        self._outcome = None
+        self._thread.start()
+        self._after_id = self.widget.after(POLL_INTERVAL_MS, self._poll)
+        return job
+
+    def cancel(self):
+        """
+        取消当前任务，不再回调 on_done / on_error；工作线程退出后回调 on_cancelled
+        """
+        if self.job is not None:
+            self.job.cancel()
+
+    def close(self):
+        """
+        取消当前任务并停止检查，不再有任何回调（用于窗口关闭）
+        """
+        self.cancel()
+        self._thread = None
+        self._stop()
+
+    def _stop(self):
+        self.job = None
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+    def _poll(self):
+        self._after_id = None
+        job = self.job
+        if job is None:
+            return
+        while True:
+            try:
+                kind, payload = job._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind != "progress":
+                self._outcome = (kind, payload)
+            elif self.on_progress and not job.cancelled:
+                self.on_progress(*payload)
+        if self._thread.is_alive():
+            self._after_id = self.widget.after(POLL_INTERVAL_MS, self._poll)
+            return
+
+        self._thread = None
+        self._stop()
+        if job.cancelled or self._outcome is None:
+            if self.on_cancelled:
+                self.on_cancelled()
+            return
+        kind, payload = self._outcome
+        callback = self.on_done if kind == "done" else self.on_error
+        if callback:
+            callback(payload)
+
+
+class JobPanel(ttk.Frame):
+    """
+    分析器窗口中的进度条、取消按钮和进度说明
+    """
+
+    def __init__(self, master, language='en', **kwargs):
+        super().__init__(master, **kwargs)
+        self.language = language
+        self.runner = JobRunner(self, on_progress=self._on_progress, on_done=self._on_done, on_error=self._on_error,
+                                on_cancelled=self._on_cancelled)
+        self._callbacks = (None, None)
+        self._controls = ()
+        self._message = ""
+
+        row = ttk.Frame(self)
+        row.pack()
+        self.progress_bar = ttk.Progressbar(row, length=300, maximum=1.0, bootstyle=SUCCESS)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(row, text=LANGUAGES[language]['cancel'], command=self.cancel,
+                                        bootstyle=DANGER, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        self.status_label = ttk.Label(self, text="", foreground="gray")
+        self.status_label.pack(pady=2)
+
+        # 窗口关闭时取消任务，避免回调已销毁的控件
+        self.bind("<Destroy>", lambda event: self.runner.close() if event.widget is self else None)
+
+    @property
+    def running(self):
+        return self.runner.running
+
+    def start(self, func, *args, on_done=None, on_error=None, controls=(), **kwargs):
+        """
+        在后台运行任务，运行期间禁用 controls 中的控件
+        :param func: func(job, *args, **kwargs)
+        :param on_done: 在主线程中以任务返回值调用
+        :param on_error: 在主线程中以异常调用
+        :param controls: 运行期间需要禁用的按钮等控件
+        """
+        self._callbacks = (on_done, on_error)
+        self._controls = tuple(controls)
+        for control in self._controls:
+            control.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self._on_progress(0, "")
+        return self.runner.start(func, *args, **kwargs)
+
+    def cancel(self):
+        if not self.running:
+            return
+        # 控件在工作线程退出后才恢复，避免在仍在运行的任务之上开始新的任务
+        self.runner.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+        self._message = 'cancelling'
+        self.status_label.config(text=LANGUAGES[self.language]['cancelling'])
+
+    def _on_cancelled(self):
+        self._finish()
+        self._message = 'cancelled'
+        self.status_label.config(text=LANGUAGES[self.language]['cancelled'])
+
+    def set_language(self, language):
+        self.language = language
+        self.cancel_button.config(text=LANGUAGES[language]['cancel'])
+        self.status_label.config(text=LANGUAGES[language].get(self._message, self._message))
+
+    def _on_progress(self, fraction, message):
+        self._message = message
+        self.progress_bar.config(value=fraction)
+        self.status_label.config(text=LANGUAGES[self.language].get(message, message))
+
+    def _finish(self):
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_bar.config(value=0)
+        self._message = ""
+        self.status_label.config(text="")
+        for control in self._controls:
+            control.config(state=tk.NORMAL)
+
+    def _on_done(self, value):
+        self._finish()
+        if self._callbacks[0]:
+            self._callbacks[0](value)
+
+    def _on_error(self, error):
+        self._finish()
+        if self._callbacks[1]:
+            self._callbacks[1](error)
+
+
+def analysis_job(job, file_path, save_path, language, analyze, write_report, load=load_excel, params=None,
+                 cache=None):
+    """
+    分析器的标准任务：读取数据、计算（结果经过缓存）、生成报告
+    :param job: Job
+    :param file_path: 输入 Excel 文件
+    :param save_path: 报告保存路径
+    :param language: 报告语言
+    :param analyze: 计算函数，以 analyze(load 的返回值, **params) 调用
+    :param write_report: write_report(result, save_path, language)
+    :param load: 读取函数；为 None 时 analyze 直接接收文件路径（自行流式读取的分析器）
+    :param params: 传给 analyze 的参数，同时作为结果缓存键的一部分
+    :param cache: 是否使用结果缓存，默认取 dias.results.RESULT_CACHE_ENABLED
+    :return: write_report 的返回值
+    """
+    job.progress(0.05, 'loading')
+    data = file_path if load is None else load(file_path)
+    job.progress(0.35, 'analyzing')
+    result, cached = cached_analyze(analyzer_name(analyze), analyze, data, params, enabled=cache)
+    job.progress(0.7, 'writing_cached' if cached else 'writing')
+    # 生成报告期间取消时，new_document 返回的文档在保存前抛出 ComputationCancelled
+    return write_report(result, save_path, language)
@@ -0,0 +1,278 @@
+"""
+报告图片的批量渲染
+
+图片直接用 matplotlib.figure.Figure 绘制，不经过 pyplot 的全局状态，因此可以在工作进程中并行渲染，
+也不依赖界面所用的绘图后端。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy import stats
+from sklearn.metrics import auc, roc_curve
+
+# 每张正态性检验图片包含的列数，每列一行（直方图、PP 图、QQ 图）
+NORMALITY_COLUMNS_PER_FIGURE = 4
+# PP 图和 QQ 图最多绘制的点数，样本更大时按分位数均匀抽取
+PLOT_POINTS = 2000
+# 需要传给工作进程的字体设置（各分析器在导入时设置了中文字体）
+FONT_RC_KEYS = ("font.family", "font.sans-serif", "axes.unicode_minus")
+
+
+def _thin(n):
+    # 均匀抽取的下标，始终包含首尾两个点
+    if n <= PLOT_POINTS:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, PLOT_POINTS).round().astype(np.int64))
+
+
+def _init_worker(rc):
+    matplotlib.rcParams.update(rc)
+
+
+def normality_panel(column):
+    """
+    计算单列三幅图所需的数据，只把绘图用到的少量数组传给工作进程
+    :param column: dias.compute.normality.PreparedColumn
+    :return: dict
+    """
+    n = column.n
+    density, edges = np.histogram(column.sorted, bins=30, density=True)
+    keep = _thin(n)
+    (osm, osr), (slope, intercept, _) = stats.probplot(column.sorted, dist="norm")
+    return {
+        "name": column.name,
+        "mean": column.mean,
+        "std": column.std,
+        "density": density,
+        "edges": edges,
+        "pp_theoretical": stats.norm.cdf(column.sorted[keep], loc=column.mean, scale=column.std),
+        "pp_empirical": (keep + 1) / n,
+        "qq_theoretical": osm[keep],
+        "qq_ordered": osr[keep],
+        "qq_line": (slope, intercept),
+    }
+
+
+def new_figure(**kwargs):
+    """
+    创建不经过 pyplot 的 Figure，绑定 Agg 画布，可以在后台线程和工作进程中绘图
+    :param kwargs: 传给 Figure 的参数，如 figsize
+    :return: Figure
+    """
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_normality_figure(panels, path):
+    """
+    将若干列的直方图（含拟合的正态分布曲线）、PP 图和 QQ 图绘制到一张图片中
+    :param panels: normality_panel 返回的 dict 列表
+    :param path: 图片保存路径
+    :return: path
+    """
+    fig = new_figure(figsize=(15, 4 * len(panels)))
+    axes = fig.subplots(len(panels), 3, squeeze=False)
+    for row, panel in zip(axes, panels):
+        name, mu, std = panel["name"], panel["mean"], panel["std"]
+
+        # 直方图和拟合的正态分布曲线
+        edges = panel["edges"]
+        row[0].hist(edges[:-1], bins=edges, weights=panel["density"], alpha=0.7, color='g')
+        x = np.linspace(edges[0], edges[-1], 100)
+        row[0].plot(x, stats.norm.pdf(x, mu, std), 'k', linewidth=2)
+        row[0].set_title(f'{name}: mu = {mu:.2f},  std = {std:.2f}')
+        row[0].set_xlabel('Value')
+        row[0].set_ylabel('Frequency')
+
+        # PP 图
+        row[1].plot(panel["pp_theoretical"], panel["pp_empirical"], 'o')
+        row[1].plot([0, 1], [0, 1], 'r--')
+        row[1].set_title(f'{name} PP Plot')
+        row[1].set_xlabel('Theoretical CDF')
+        row[1].set_ylabel('Empirical CDF')
+
+        # QQ 图
+        slope, intercept = panel["qq_line"]
+        theoretical = panel["qq_theoretical"]
+        row[2].plot(theoretical, panel["qq_ordered"], 'o')
+        row[2].plot(theoretical, slope * theoretical + intercept, 'r-')
+        row[2].set_title(f'{name} QQ Plot')
+        row[2].set_xlabel('Theoretical quantiles')
+        row[2].set_ylabel('Ordered Values')
+    # 子图网格固定，直接按英寸设置边距，省去 tight_layout 对每个刻度标签的测量
+    height = 4 * len(panels)
+    fig.subplots_adjust(left=0.05, right=0.98, bottom=0.6 / height, top=1 - 0.4 / height, wspace=0.25, hspace=0.45)
+    fig.savefig(path)
+    return path
+
+
+def render_normality_figures(columns, plot_dir, prefix, per_figure=NORMALITY_COLUMNS_PER_FIGURE, workers=None):
+    """
+    为所有列生成正态性检验图片，每张图片包含 per_figure 列，多张图片在进程池中并行渲染
+    :param columns: PreparedColumn 列表
+    :param plot_dir: 图片保存目录
+    :param prefix: 图片文件名前缀
+    :param per_figure: 每张图片的列数
+    :param workers: 工作进程数，默认取环境变量 DIAS_PLOT_WORKERS，未设置时等于 CPU 核数；
+                    为 1 或只有一张图片时在当前进程中渲染
+    :return: 图片路径列表
+    """
+    panels = [normality_panel(column) for column in columns]
+    pages = [panels[i:i + per_figure] for i in range(0, len(panels), per_figure)]
+    paths = [os.path.join(plot_dir, f"{prefix}_normality_{i + 1}.png") for i in range(len(pages))]
+    workers = workers or int(os.environ.get("DIAS_PLOT_WORKERS", 0)) or os.cpu_count() or 1
+    workers = min(workers, len(pages))
+    if workers <= 1:
+        return [render_normality_figure(page, path) for page, path in zip(pages, paths)]
+    rc = {key: matplotlib.rcParams[key] for key in FONT_RC_KEYS}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rc,)) as pool:
+        return list(pool.map(render_normality_figure, pages, paths))
+
+
+def render_actual_vs_predicted(actual, fitted, path):
+    """
+    回归的实际值与预测值散点图，样本过多时抽稀
+    :param actual: 因变量的实际值
+    :param fitted: 预测值
+    :param path: 图片保存路径
+    :return: 图片路径
+    """
+    keep = _thin(len(actual))
+    actual, fitted = actual[keep], fitted[keep]
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.scatter(actual, fitted)
+    ax.plot([actual.min(), actual.max()], [actual.min(), actual.max()], 'r--', lw=2)
+    ax.set_xlabel('Actual Values')
+    ax.set_ylabel('Predicted Values')
+    ax.set_title('Actual vs Predicted Values')
+    fig.savefig(path)
+    return path
+
+
+def render_roc_curve(outcomes, probabilities, path):
+    """
+    分类模型的 ROC 曲线；多分类时为各类别一对其余合并后的微平均曲线
+    :param outcomes: 二分类时为 0 / 1，多分类时为类别序号
+    :param probabilities: 二分类时为正类的预测概率 (n,)，多分类时为各类别的预测概率 (n, K)
+    :param path: 图片保存路径
+    :return: 图片路径
+    """
+    probabilities = np.asarray(probabilities)
+    title = 'Receiver Operating Characteristic'
+    if probabilities.ndim == 2:
+        outcomes = np.asarray(outcomes)[:, None] == np.arange(probabilities.shape[1])
+        title += ' (Micro-average)'
+    fpr, tpr, _ = roc_curve(np.ravel(outcomes), probabilities.ravel())
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(fpr, tpr, label=f'ROC curve (area = {auc(fpr, tpr):.2f})')
+    ax.plot([0, 1], [0, 1], 'k--')
+    ax.set_xlim([0.0, 1.0])
+    ax.set_ylim([0.0, 1.05])
+    ax.set_xlabel('False Positive Rate')
+    ax.set_ylabel('True Positive Rate')
+    ax.set_title(title)
+    ax.legend(loc="lower right")
+    fig.savefig(path)
+    return path
+
+
+def render_boxplot(samples, path):
+    """
+    各列数据的箱线图
+    :param samples: {列名: 数组}
+    :param path: 图片保存路径
+    :return: 图片路径
+    """
+    fig = new_figure()
+    ax = fig.subplots()
+    ax.boxplot(list(samples.values()), tick_labels=list(samples))
+    ax.set_title("Boxplot of Columns")
+    ax.set_xlabel("Columns")
+    ax.set_ylabel("Values")
+    fig.savefig(path)
+    return path
+
+
+def render_sample_charts(samples, path, language='en'):
+    """
+    样本的柱状图（均值 ± 标准差）、误差线图、箱线图和折线图，2×2 排列在一张图片中
+    :param samples: {列名: 数组}
+    :param path: 图片保存路径
+    :param language: 标题和坐标轴的语言
+    :return: 图片路径
+    """
+    zh = language == 'zh'
+    labels = list(samples)
+    means = [np.mean(v) for v in samples.values()]
+    stds = [np.std(v, ddof=1) if len(v) > 1 else 0.0 for v in samples.values()]
+    fig = new_figure(figsize=(12, 8))
+    (bar_ax, error_ax), (box_ax, line_ax) = fig.subplots(2, 2)
+
+    bars = bar_ax.bar(labels, means, yerr=stds, capsize=5)
+    bar_ax.bar_label(bars, fmt='%.2f')
+    bar_ax.set_title('柱状图' if zh else 'Bar Chart')
+    bar_ax.set_ylabel('均值' if zh else 'Mean')
+
+    error_ax.errorbar(labels, means, yerr=stds, fmt='o', capsize=5)
+    error_ax.set_title('误差线图' if zh else 'Error Bar Chart')
+    error_ax.set_ylabel('均值' if zh else 'Mean')
+
+    box_ax.boxplot(list(samples.values()), tick_labels=labels)
+    box_ax.set_title('箱线图' if zh else 'Box Plot')
+    box_ax.set_ylabel('数值' if zh else 'Value')
+
+    for label, values in samples.items():
+        keep = _thin(len(values))
+        line_ax.plot(np.arange(len(values))[keep], values[keep], label=label)
+    line_ax.set_title('折线图' if zh else 'Line Chart')
+    line_ax.set_xlabel('观测值' if zh else 'Observation')
+    line_ax.set_ylabel('数值' if zh else 'Value')
+    line_ax.legend()
+
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+def render_regularization_figures(result, plot_dir, prefix):
+    """
+    Lasso / 岭回归的三张图片：实际值与预测值散点图、系数路径图和交叉验证误差曲线，所选 alpha 以虚线标出
+    :param result: dias.compute.regularization.RegularizationResult
+    :param plot_dir: 图片保存目录
+    :param prefix: 图片文件名前缀
+    :return: 图片路径列表
+    """
+    paths = [os.path.join(plot_dir, f"{prefix}_{name}.png") for name in ("scatter", "trace", "cv")]
+    render_actual_vs_predicted(result.actual, result.fitted, paths[0])
+
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(result.path.index, result.path.to_numpy())
+    ax.axvline(result.alpha, color='gray', linestyle='--')
+    ax.set_xscale('log')
+    ax.set_xlabel('Alpha')
+    ax.set_ylabel('Standardized Coefficients')
+    ax.set_title(f'{result.method} coefficients as a function of the regularization')
+    if result.path.shape[1] <= 20:
+        ax.legend(result.path.columns, fontsize='small')
+    ax.axis('tight')
+    fig.savefig(paths[1])
+
+    fig = new_figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.errorbar(result.cv["alpha"], result.cv["CV MSE"], yerr=result.cv["CV MSE Std. Error"], marker='o',
+                markersize=3, capsize=2)
+    ax.axvline(result.alpha, color='gray', linestyle='--')
+    ax.set_xscale('log')
+    ax.set_xlabel('Alpha')
+    ax.set_ylabel('Cross-validated MSE')
+    ax.set_title(f'{result.method} cross-validation')
+    fig.savefig(paths[2])
+    return paths
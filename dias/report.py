@@ -0,0 +1,133 @@
+"""
+Word 报告的批量写入
+
+python-docx 每次访问 table.rows / row.cells 都会重新遍历表格的 XML，
+逐格赋值 .text 的写法在大表格上耗时随单元格数平方增长。
+这里一次性拼接整张表格的 XML 再解析插入，耗时与单元格数成正比；
+生成的单元格结构与 python-docx 逐格赋值的结果相同。
+new_document 返回的文档在保存前检查后台任务是否已取消，已取消的任务不会写出报告。
+"""
+import functools
+import io
+import re
+from itertools import zip_longest
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.document import Document as DocxDocument
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.table import Table
+from lxml import etree
+
+from dias.compute.base import check_cancelled
+
+# XML 1.0 不允许的控制字符，python-docx 遇到时会报错，这里直接去除
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# 单元格文本中的换行和制表符，与 python-docx 一样转换为 <w:br/> 和 <w:tab/>
+_BREAKS = re.compile('(\n|\t)')
+
+
+@functools.lru_cache(maxsize=None)
+def _template_bytes(template):
+    if template is None:
+        buffer = io.BytesIO()
+        Document().save(buffer)
+        return buffer.getvalue()
+    with open(template, 'rb') as f:
+        return f.read()
+
+
+class ReportDocument(DocxDocument):
+    """
+    保存前检查取消标记的 Word 文档
+    """
+
+    def save(self, path_or_stream):
+        check_cancelled()
+        super().save(path_or_stream)
+
+
+def new_document(template=None):
+    """
+    基于模板新建 Word 文档，模板（含样式）只读取一次
+    :param template: 模板 .docx 路径，默认使用 python-docx 自带的模板
+    :return: ReportDocument
+    """
+    document = Document(io.BytesIO(_template_bytes(template)))
+    # python-docx 由文档部件创建 Document 对象，这里只替换类以加入保存前的检查
+    document.__class__ = ReportDocument
+    return document
+
+
+def _paragraph_xml(value):
+    text = _INVALID_XML_CHARS.sub('', str(value))
+    if not text:
+        return '<w:p/>'
+    parts = []
+    for piece in _BREAKS.split(text):
+        if piece == '\n':
+            parts.append('<w:br/>')
+        elif piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece:
+            space = ' xml:space="preserve"' if piece[0].isspace() or piece[-1].isspace() else ''
+            parts.append(f'<w:t{space}>{escape(piece)}</w:t>')
+    return f'<w:p><w:r>{"".join(parts)}</w:r></w:p>'
+
+
+def add_table(doc, rows, headers=None, style=None):
+    """
+    将二维数据一次性写成 Word 表格
+    :param doc: docx.Document
+    :param rows: 行的可迭代对象，每行为单元格值的序列，单元格文本为 str(value)
+    :param headers: 表头，默认无表头
+    :param style: 表格样式名，如 'Table Grid'
+    :return: docx.table.Table
+    """
+    rows = list(rows)
+    if headers is not None:
+        rows.insert(0, list(headers))
+    n_cols = max((len(row) for row in rows), default=0)
+    table = doc.add_table(rows=0, cols=n_cols)
+    if style:
+        table.style = style
+
+    # 表格属性和列宽沿用 python-docx 生成的结果，行和单元格拼接后整体解析，替换原表格元素
+    tbl = table._tbl
+    widths = [col.get(qn('w:w')) for col in tbl.tblGrid.iterchildren(qn('w:gridCol'))]
+    cell_open = [f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/></w:tcPr>' for width in widths]
+    parts = [f'<w:tbl {nsdecls("w")}>', etree.tostring(tbl.tblPr, encoding='unicode'),
+             etree.tostring(tbl.tblGrid, encoding='unicode')]
+    for row in rows:
+        parts.append('<w:tr>')
+        for opening, value in zip_longest(cell_open, row, fillvalue=''):
+            parts.append(opening)
+            parts.append(_paragraph_xml(value))
+            parts.append('</w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    new_tbl = parse_xml(''.join(parts))
+    tbl.getparent().replace(tbl, new_tbl)
+    return Table(new_tbl, table._parent)
+
+
+def add_dataframe_table(doc, df, index=False, header=True, style=None, index_label=""):
+    """
+    将 DataFrame 一次性写成 Word 表格
+    :param doc: docx.Document
+    :param df: pandas.DataFrame
+    :param index: 是否把行索引写为第一列
+    :param header: 是否写表头（列名）；也可以直接传入表头列表
+    :param style: 表格样式名
+    :param index_label: 写行索引时第一列的表头
+    :return: docx.table.Table
+    """
+    rows = df.itertuples(index=index, name=None)
+    if header is True:
+        headers = ([index_label] if index else []) + list(df.columns)
+    elif header is False or header is None:
+        headers = None
+    else:
+        headers = list(header)
+    return add_table(doc, rows, headers=headers, style=style)
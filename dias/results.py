@@ -0,0 +1,206 @@
+"""
+分析结果的内容寻址缓存
+
+缓存键由输入数据的内容指纹、分析器名称、参数和代码指纹共同决定，
+同一工作簿（内容不变）以相同参数再次分析时，直接读取上次的结果对象，只重新生成报告。
+代码指纹取分析器模块及其导入的 dias 模块的源代码，升级或修改计算代码后旧条目自动失效。
+结果对象用 pickle 保存在缓存目录中，总大小超过上限时按最近使用时间淘汰。
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+
+import pandas as pd
+
+from dias.dataset import evict_lru
+
+# 缓存目录和容量上限，可通过环境变量修改；DIAS_RESULT_CACHE=0 时不使用缓存
+RESULT_CACHE_DIR = os.environ.get("DIAS_RESULT_CACHE_DIR",
+                                  os.path.join(os.path.expanduser("~"), ".dias", "cache", "results"))
+RESULT_CACHE_SIZE_LIMIT = int(os.environ.get("DIAS_RESULT_CACHE_MB", "512")) * 1024 * 1024
+RESULT_CACHE_ENABLED = os.environ.get("DIAS_RESULT_CACHE", "1") != "0"
+# 缓存文件的格式改变时递增，使旧条目失效；计算代码的改变由 code_fingerprint 反映
+RESULT_CACHE_VERSION = 1
+# 代码指纹包含的模块所在的包（分析器模块本身总是包含在内）
+CODE_PACKAGES = ("dias",)
+# 计算文件指纹时每次读取的字节数
+_CHUNK_SIZE = 1 << 20
+
+
+def data_fingerprint(data):
+    """
+    输入数据的内容指纹
+    :param data: DataFrame，或由分析器自行读取的文件路径
+    :return: 十六进制字符串；数据无法计算指纹时返回 None
+    """
+    digest = hashlib.sha1()
+    if isinstance(data, (str, os.PathLike)):
+        # 流式分析器直接读取文件，按文件内容计算，与路径和修改时间无关
+        with open(data, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return "file:" + digest.hexdigest()
+    if not isinstance(data, pd.DataFrame):
+        return None
+    try:
+        hashes = pd.util.hash_pandas_object(data, index=True)
+    except TypeError:
+        # 单元格中含有无法哈希的对象
+        return None
+    digest.update(json.dumps([list(map(str, data.columns)), list(map(str, data.dtypes))]).encode("utf-8"))
+    digest.update(hashes.to_numpy().tobytes())
+    return "frame:" + digest.hexdigest()
+
+
+def analyzer_name(func):
+    """
+    计算函数所属分析器的名称，用作缓存键的一部分
+    :param func: 分析器模块中的 analyze / analyze_path 函数
+    :return: 模块路径加函数名，例如 "Source.Pearson_Correlation_Analysis.analyze"
+    """
+    module = func.__module__
+    if module == "__main__":
+        # 直接运行分析器脚本时以文件名代替模块路径
+        module = os.path.splitext(os.path.basename(inspect.getsourcefile(func)))[0]
+    return f"{module}.{func.__qualname__}"
+
+
+def _imported_modules(module):
+    # 模块全局变量中的模块，以及函数、类所属的模块，只保留 CODE_PACKAGES 中的
+    names = set()
+    for value in vars(module).values():
+        name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+        if isinstance(name, str) and name.split(".")[0] in CODE_PACKAGES:
+            names.add(name)
+    return names
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint(module_name):
+    """
+    分析器的代码指纹：分析器模块及其直接或间接导入的 dias 模块的源代码的哈希
+    :param module_name: 分析器模块名，即 analyze 函数的 __module__
+    :return: 十六进制字符串
+    """
+    digest = hashlib.sha1()
+    seen, pending = set(), [module_name]
+    while pending:
+        name = pending.pop()
+        module = sys.modules.get(name)
+        if name in seen or module is None:
+            continue
+        seen.add(name)
+        pending.extend(_imported_modules(module) - seen)
+    for name in sorted(seen):
+        try:
+            source = inspect.getsource(sys.modules[name])
+        except (OSError, TypeError):
+            # 没有源文件（例如交互式定义的模块）时只记录模块名
+            source = ""
+        digest.update(name.encode("utf-8"))
+        digest.update(hashlib.sha1(source.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def result_key(analyzer, fingerprint, params=None, code=None):
+    """
+    :param analyzer: 分析器名称，通常为模块路径
+    :param fingerprint: data_fingerprint 的返回值
+    :param params: 影响计算结果的参数
+    :param code: code_fingerprint 的返回值
+    :return: 缓存键
+    """
+    parts = [RESULT_CACHE_VERSION, analyzer, fingerprint, sorted((params or {}).items()), code]
+    return hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+def _result_path(key):
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.pickle")
+
+
+def load_result(key):
+    """
+    :return: 缓存的结果对象；不存在或无法读取时返回 None
+    """
+    path = _result_path(key)
+    try:
+        with open(path, "rb") as f:
+            result = pickle.load(f)
+        # 更新修改时间，作为 LRU 淘汰的最近使用时间
+        os.utime(path)
+        return result
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        # 缓存文件损坏，或结果类已改名
+        return None
+
+
+def store_result(key, result):
+    """
+    保存结果对象并按容量上限淘汰旧条目
+    :return: 是否保存成功
+    """
+    try:
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        # 结果中含有无法序列化的对象时不缓存
+        return False
+    path = _result_path(key)
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        # 先写临时文件再重命名，多个进程同时写同一条目时不会读到半个文件
+        os.replace(tmp_path, path)
+        evict_results()
+    except OSError:
+        # 缓存目录不可写时不影响分析本身
+        return False
+    return True
+
+
+def evict_results(limit=None):
+    """
+    按最近使用时间淘汰结果缓存，直到总大小不超过上限
+    :param limit: 容量上限（字节），默认为 RESULT_CACHE_SIZE_LIMIT
+    :return: 被删除的文件数
+    """
+    return evict_lru(RESULT_CACHE_DIR, ".pickle", RESULT_CACHE_SIZE_LIMIT if limit is None else limit)
+
+
+def clear_results():
+    """
+    删除全部结果缓存
+    """
+    return evict_results(limit=0)
+
+
+def cached_analyze(analyzer, analyze, data, params=None, enabled=None):
+    """
+    以缓存方式调用 analyze(data, **params)
+    :param analyzer: 分析器名称，通常为模块路径
+    :param analyze: 计算函数
+    :param data: DataFrame 或文件路径
+    :param params: 传给 analyze 的关键字参数，同时作为缓存键的一部分
+    :param enabled: 是否使用缓存，默认取 RESULT_CACHE_ENABLED
+    :return: (结果对象, 是否来自缓存)
+    """
+    params = params or {}
+    enabled = RESULT_CACHE_ENABLED if enabled is None else enabled
+    fingerprint = data_fingerprint(data) if enabled else None
+    if fingerprint is None:
+        return analyze(data, **params), False
+
+    key = result_key(analyzer, fingerprint, params, code_fingerprint(analyze.__module__))
+    result = load_result(key)
+    if result is not None:
+        return result, True
+    result = analyze(data, **params)
+    store_result(key, result)
+    return result, False
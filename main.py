@@ -3,6 +3,7 @@ from ttkbootstrap.constants import *
 from tkinter import messagebox, PhotoImage
 import subprocess
 import os
+import multiprocessing
 
 # 导入模块
 from Dataset import DatasetApp
@@ -205,150 +206,155 @@ def hide_details(event):
     # 鼠标离开时不清除详情内容，保持当前显示
     pass
 
-# 创建主窗口
-root = ttk.Window(themename="flatly")
-root.title(LANGUAGES[current_language]['title'])
-
-# 加载图标
-icon_path = os.path.join(current_dir, 'icon', 'icon.gif')
-print(f"尝试加载图标: {icon_path}")  # 添加调试输出
-
-# 检查文件是否存在
-if not os.path.exists(icon_path):
-    print(f"错误: 图标文件不存在 - {icon_path}")
-else:
-    # 检查文件是否为有效文件
-    if not os.path.isfile(icon_path):
-        print(f"错误: 图标路径不是一个文件 - {icon_path}")
-    else:
-        try:
-            icon = PhotoImage(file=icon_path)
-            root.iconphoto(True, icon)
-            print("图标加载成功")
-        except Exception as e:
-            print(f"图标加载失败: {str(e)}")
-            messagebox.showerror("图标加载错误", f"加载图标时出错: {e}\n\n请确保图标文件存在于指定路径且格式正确。")
-
-# 获取屏幕的宽度和高度
-screen_width = root.winfo_screenwidth()
-screen_height = root.winfo_screenheight()
-
-# 设置窗口的宽度和高度
-window_width = 940
-window_height = 780
-
-# 计算窗口应该放置的位置
-x = (screen_width - window_width) // 2
-y = (screen_height - window_height) // 2
-
-# 设置窗口的位置和大小
-root.geometry(f"{window_width}x{window_height}+{x}+{y}")
-
-# 创建一个主框架，用于居中内容
-main_frame = ttk.Frame(root)
-main_frame.pack(expand=True, fill=BOTH, anchor='n')  # 使用 anchor='n' 让框架在顶部居中
-
-# 创建四个子框架来放置每组按钮
-group1_frame = ttk.Frame(main_frame)
-group1_frame.pack(expand=True, anchor='center')
-group2_frame = ttk.Frame(main_frame)
-group2_frame.pack(expand=True, anchor='center')
-group3_frame = ttk.Frame(main_frame)
-group3_frame.pack(expand=True, anchor='center')
-group4_frame = ttk.Frame(main_frame)
-group4_frame.pack(expand=True, anchor='center')
-
-# 添加每组的标题标签
-group1_label = ttk.Label(group1_frame, text=LANGUAGES[current_language]['group1'])
-group1_label.pack()
-group2_label = ttk.Label(group2_frame, text=LANGUAGES[current_language]['group2'])
-group2_label.pack()
-group3_label = ttk.Label(group3_frame, text=LANGUAGES[current_language]['group3'])
-group3_label.pack()
-group4_label = ttk.Label(group4_frame, text=LANGUAGES[current_language]['group4'])
-group4_label.pack()
-
-# 存储所有按钮的列表
-button_list = []
-button_texts = []
-file_paths = []
-
-
-def create_buttons(frame, texts, paths, bootstyle=PRIMARY):
-    current_row_frame = ttk.Frame(frame)
-    current_row_frame.pack(anchor='center')
-    total_width = 0
-    # 留出一定的余量
-    margin = 20
-    for text, path in zip(texts, paths):
-        # 计算该按钮在两种语言下的最大宽度
-        zh_text = BUTTON_TEXTS['zh'][text]
-        en_text = BUTTON_TEXTS['en'][text]
-        max_width = max(len(zh_text), len(en_text))
-
-        display_text = BUTTON_TEXTS[current_language][text]
-        button = ttk.Button(current_row_frame, text=display_text, bootstyle=bootstyle, width=max_width)
-        button.pack(side=ttk.LEFT, padx=5, pady=5)
-        button.bind("<Button-1>", lambda event, p=path: run_script(p))
-        button.bind("<Enter>", lambda event, t=text: show_details(event, t))
-        button.bind("<Leave>", hide_details)
-        button_list.append(button)
-        button_texts.append(text)
-        file_paths.append(path)
-        button.update_idletasks()
-        # 记录按钮的最大宽度
-        button_max_widths.append(max_width)
-        # 计算按钮宽度加上左右内边距
-        button_width = button.winfo_width() + 10
-        if total_width + button_width > window_width - margin:
-            current_row_frame = ttk.Frame(frame)
-            current_row_frame.pack(anchor='center')
-            total_width = button_width
-        else:
-            total_width += button_width
-
-
-# 第一行按钮
-create_buttons(group1_frame, ["数据库"], ['Dataset'])
-
-# 第二行按钮
-create_buttons(group2_frame, ["数据描述与检验", "问卷分析"],
-               ['Data Description and Validation', 'Questionnaire analysis'])
-
-# 第三行按钮
-third_row_texts = ["相关性分析", "差异性分析", "设计方案选择与综合评价",
-                   "回归预测模型与影响关系", "聚类", "统计建模", "计量经济模型"]
-third_row_paths = ['Correlation analysis', 'Difference analysis',
-                   'Design scheme selection and comprehensive evaluation', 'Regression prediction model and influence relationship',
-                   'Clustering', 'Statistical Modeling', 'Econometric Model']
-create_buttons(group3_frame, third_row_texts, third_row_paths)
-
-# 第四行按钮，将 bootstyle 设置为 SUCCESS 以显示绿色按钮
-create_buttons(group4_frame, ["分析器"], ['Analyzer'], bootstyle=SUCCESS)
+if __name__ == "__main__":
+    # 打包为可执行文件后，报告图片的并行渲染进程需要 freeze_support；
+    # 工作进程会重新导入本模块，因此界面只在主进程中创建
+    multiprocessing.freeze_support()
 
-# 创建详情框
-details_frame = ttk.Frame(main_frame)
-details_frame.pack(expand=True, fill=BOTH, padx=10, pady=10)
-
-details_label = ttk.Label(details_frame, text=LANGUAGES[current_language]['details'])
-details_label.pack()
-
-# 修改 font 参数，使用元组指定字体和大小
-details_text = ttk.Text(details_frame, height=15, font=('TkDefaultFont', 12))
-details_text.pack(fill=BOTH, expand=True)
-
-# 初始化详情框内容
-details_text.insert(ttk.END, LANGUAGES[current_language]['no_details'])
-
-# 创建语言切换标签，点击可切换语言，颜色设为灰色
-switch_language_label = ttk.Label(root, text=LANGUAGES[current_language]['switch_language'], foreground='gray',
-                                  cursor='hand2')
-switch_language_label.pack(pady=5)
-switch_language_label.bind("<Button-1>", lambda event: switch_language())
+    # 创建主窗口
+    root = ttk.Window(themename="flatly")
+    root.title(LANGUAGES[current_language]['title'])
 
-# 创建版权标签，并设置字体大小为 10
-copyright_label = ttk.Label(root, text=LANGUAGES[current_language]['copyright'], foreground='gray', font=('TkDefaultFont', 8))
-copyright_label.pack(pady=5)
+    # 加载图标
+    icon_path = os.path.join(current_dir, 'icon', 'icon.gif')
+    print(f"尝试加载图标: {icon_path}")  # 添加调试输出
 
-# 运行主循环
-root.mainloop()
\ No newline at end of file
+    # 检查文件是否存在
+    if not os.path.exists(icon_path):
+        print(f"错误: 图标文件不存在 - {icon_path}")
+    else:
+        # 检查文件是否为有效文件
+        if not os.path.isfile(icon_path):
+            print(f"错误: 图标路径不是一个文件 - {icon_path}")
+        else:
+            try:
+                icon = PhotoImage(file=icon_path)
+                root.iconphoto(True, icon)
+                print("图标加载成功")
+            except Exception as e:
+                print(f"图标加载失败: {str(e)}")
+                messagebox.showerror("图标加载错误", f"加载图标时出错: {e}\n\n请确保图标文件存在于指定路径且格式正确。")
+
+    # 获取屏幕的宽度和高度
+    screen_width = root.winfo_screenwidth()
+    screen_height = root.winfo_screenheight()
+
+    # 设置窗口的宽度和高度
+    window_width = 940
+    window_height = 780
+
+    # 计算窗口应该放置的位置
+    x = (screen_width - window_width) // 2
+    y = (screen_height - window_height) // 2
+
+    # 设置窗口的位置和大小
+    root.geometry(f"{window_width}x{window_height}+{x}+{y}")
+
+    # 创建一个主框架，用于居中内容
+    main_frame = ttk.Frame(root)
+    main_frame.pack(expand=True, fill=BOTH, anchor='n')  # 使用 anchor='n' 让框架在顶部居中
+
+    # 创建四个子框架来放置每组按钮
+    group1_frame = ttk.Frame(main_frame)
+    group1_frame.pack(expand=True, anchor='center')
+    group2_frame = ttk.Frame(main_frame)
+    group2_frame.pack(expand=True, anchor='center')
+    group3_frame = ttk.Frame(main_frame)
+    group3_frame.pack(expand=True, anchor='center')
+    group4_frame = ttk.Frame(main_frame)
+    group4_frame.pack(expand=True, anchor='center')
+
+    # 添加每组的标题标签
+    group1_label = ttk.Label(group1_frame, text=LANGUAGES[current_language]['group1'])
+    group1_label.pack()
+    group2_label = ttk.Label(group2_frame, text=LANGUAGES[current_language]['group2'])
+    group2_label.pack()
+    group3_label = ttk.Label(group3_frame, text=LANGUAGES[current_language]['group3'])
+    group3_label.pack()
+    group4_label = ttk.Label(group4_frame, text=LANGUAGES[current_language]['group4'])
+    group4_label.pack()
+
+    # 存储所有按钮的列表
+    button_list = []
+    button_texts = []
+    file_paths = []
+
+
+    def create_buttons(frame, texts, paths, bootstyle=PRIMARY):
+        current_row_frame = ttk.Frame(frame)
+        current_row_frame.pack(anchor='center')
+        total_width = 0
+        # 留出一定的余量
+        margin = 20
+        for text, path in zip(texts, paths):
+            # 计算该按钮在两种语言下的最大宽度
+            zh_text = BUTTON_TEXTS['zh'][text]
+            en_text = BUTTON_TEXTS['en'][text]
+            max_width = max(len(zh_text), len(en_text))
+
+            display_text = BUTTON_TEXTS[current_language][text]
+            button = ttk.Button(current_row_frame, text=display_text, bootstyle=bootstyle, width=max_width)
+            button.pack(side=ttk.LEFT, padx=5, pady=5)
+            button.bind("<Button-1>", lambda event, p=path: run_script(p))
+            button.bind("<Enter>", lambda event, t=text: show_details(event, t))
+            button.bind("<Leave>", hide_details)
+            button_list.append(button)
+            button_texts.append(text)
+            file_paths.append(path)
+            button.update_idletasks()
+            # 记录按钮的最大宽度
+            button_max_widths.append(max_width)
+            # 计算按钮宽度加上左右内边距
+            button_width = button.winfo_width() + 10
+            if total_width + button_width > window_width - margin:
+                current_row_frame = ttk.Frame(frame)
+                current_row_frame.pack(anchor='center')
+                total_width = button_width
+            else:
+                total_width += button_width
+
+
+    # 第一行按钮
+    create_buttons(group1_frame, ["数据库"], ['Dataset'])
+
+    # 第二行按钮
+    create_buttons(group2_frame, ["数据描述与检验", "问卷分析"],
+                   ['Data Description and Validation', 'Questionnaire analysis'])
+
+    # 第三行按钮
+    third_row_texts = ["相关性分析", "差异性分析", "设计方案选择与综合评价",
+                       "回归预测模型与影响关系", "聚类", "统计建模", "计量经济模型"]
+    third_row_paths = ['Correlation analysis', 'Difference analysis',
+                       'Design scheme selection and comprehensive evaluation', 'Regression prediction model and influence relationship',
+                       'Clustering', 'Statistical Modeling', 'Econometric Model']
+    create_buttons(group3_frame, third_row_texts, third_row_paths)
+
+    # 第四行按钮，将 bootstyle 设置为 SUCCESS 以显示绿色按钮
+    create_buttons(group4_frame, ["分析器"], ['Analyzer'], bootstyle=SUCCESS)
+
+    # 创建详情框
+    details_frame = ttk.Frame(main_frame)
+    details_frame.pack(expand=True, fill=BOTH, padx=10, pady=10)
+
+    details_label = ttk.Label(details_frame, text=LANGUAGES[current_language]['details'])
+    details_label.pack()
+
+    # 修改 font 参数，使用元组指定字体和大小
+    details_text = ttk.Text(details_frame, height=15, font=('TkDefaultFont', 12))
+    details_text.pack(fill=BOTH, expand=True)
+
+    # 初始化详情框内容
+    details_text.insert(ttk.END, LANGUAGES[current_language]['no_details'])
+
+    # 创建语言切换标签，点击可切换语言，颜色设为灰色
+    switch_language_label = ttk.Label(root, text=LANGUAGES[current_language]['switch_language'], foreground='gray',
+                                      cursor='hand2')
+    switch_language_label.pack(pady=5)
+    switch_language_label.bind("<Button-1>", lambda event: switch_language())
+
+    # 创建版权标签，并设置字体大小为 10
+    copyright_label = ttk.Label(root, text=LANGUAGES[current_language]['copyright'], foreground='gray', font=('TkDefaultFont', 8))
+    copyright_label.pack(pady=5)
+
+    # 运行主循环
+    root.mainloop()
\ No newline at end of file